@@ -8,6 +8,7 @@ Hauptanwendung mit Flask Application Factory Pattern
 
 import os
 import sys
+import time
 from datetime import datetime, date, timedelta
 from flask import Flask, render_template, redirect, url_for, flash, request, send_from_directory, g
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
@@ -61,11 +62,54 @@ if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
 
+def _elapsed_ms(start):
+    """Millisekunden seit start (time.perf_counter) fuer die Startzeit-Messung"""
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def get_database_uri():
+    """
+    Datenbank-URI: PostgreSQL via DATABASE_URL oder SQLite als Fallback
+    """
+    db_url = os.environ.get('DATABASE_URL')
+    if db_url:
+        return db_url
+    instance_dir = os.path.join(DATA_DIR, 'instance')
+    os.makedirs(instance_dir, exist_ok=True)
+    return f"sqlite:///{os.path.join(instance_dir, 'stitchadmin.db')}"
+
+
+def run_schema_migrations():
+    """
+    Einmalige Migrations-Stufe ohne Blueprints und Scheduler.
+    Fuer den Gunicorn-Master (on_starting) bzw. migrations/run_all_migrations.py,
+    damit die Worker beim Start nur noch die Schema-Version pruefen.
+    """
+    from src.models.models import db
+    from src.utils.schema_migrations import ensure_schema, format_phases
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = get_database_uri()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        report = ensure_schema(db)
+        status = 'WARN' if report['failed'] is not None else 'OK'
+        print(f"[{status}] Datenbankschema v{report['version']} ({format_phases(report['phases'])})")
+        db.session.remove()
+        db.engine.dispose()  # keine Verbindungen an Worker vererben (fork)
+    return report
+
+
 def create_app():
     """
     Flask Application Factory
     Erstellt und konfiguriert die Flask-Anwendung
     """
+    startup_begin = time.perf_counter()
+    startup_phases = {}
+
     # Template und Static Pfade (EXE-kompatibel)
     template_path = os.path.join(BASE_DIR, 'src', 'templates')
     static_path = os.path.join(BASE_DIR, 'src', 'static')
@@ -99,12 +143,7 @@ def create_app():
     os.makedirs(upload_dir, exist_ok=True)
 
     # Datenbank-Konfiguration (PostgreSQL via DATABASE_URL oder SQLite als Fallback)
-    db_url = os.environ.get('DATABASE_URL')
-    if db_url:
-        app.config['SQLALCHEMY_DATABASE_URI'] = db_url
-    else:
-        db_path = os.path.join(instance_dir, 'stitchadmin.db')
-        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_DATABASE_URI'] = get_database_uri()
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=30)
     app.config['TEMPLATES_AUTO_RELOAD'] = True
@@ -118,6 +157,24 @@ def create_app():
     # Upload-Konfiguration
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
     app.config['UPLOAD_FOLDER'] = upload_dir
+    # Analyse-Cache fuer Stickdateien (Inhalts-Hash -> Ergebnis)
+    app.config['ANALYSIS_CACHE_DIR'] = os.path.join(instance_dir, 'analysis_cache')
+    # Gerenderte PDFs finalisierter Dokumente (Inhalts-Hash -> Datei)
+    app.config['PDF_STORE_DIR'] = os.path.join(instance_dir, 'pdf_store')
+    # Buchhaltungs-Exporte aus der Job-Queue (DATEV/GoBD-ZIPs)
+    app.config['EXPORT_DIR'] = os.path.join(instance_dir, 'exports')
+    # Worker-Prozesse fuer PDF-Batches (0 = bis zu 4, je nach CPU-Kernen)
+    app.config['PDF_BATCH_WORKERS'] = int(os.environ.get('PDF_BATCH_WORKERS', '0'))
+    # Nur ein Prozess fuehrt Scheduler-Jobs aus (Lease in der Datenbank)
+    app.config['SCHEDULER_LEADER_ELECTION'] = os.environ.get(
+        'SCHEDULER_LEADER_ELECTION', '0' if os.environ.get('TESTING') == '1' else '1') == '1'
+    # Worker-Threads der Job-Queue (IMAP-/Bank-/Kalender-Sync), 0 = keine
+    app.config['JOB_QUEUE_WORKERS'] = int(os.environ.get(
+        'JOB_QUEUE_WORKERS', '0' if os.environ.get('TESTING') == '1' else '2'))
+    # Shelly-Energie im Hintergrund aufzeichnen, Intervall in Sekunden (0 = aus)
+    app.config['SHELLY_SAMPLE_SECONDS'] = int(os.environ.get('SHELLY_SAMPLE_SECONDS', '0'))
+    # Shelly-Rohdaten nach N Tagen loeschen, Stunden-/Tageswerte bleiben (0 = nie)
+    app.config['SHELLY_RAW_RETENTION_DAYS'] = int(os.environ.get('SHELLY_RAW_RETENTION_DAYS', '30'))
 
     # Multi-Tenant (Phase 1: deaktiviert, wird in Phase 2 aktiviert)
     app.config['MULTI_TENANT_ENABLED'] = os.environ.get('MULTI_TENANT_ENABLED', 'False') == 'True'
@@ -125,6 +182,8 @@ def create_app():
     # ==========================================
     # DATENBANK INITIALISIERUNG
     # ==========================================
+    startup_phases['config'] = _elapsed_ms(startup_begin)
+    phase_start = time.perf_counter()
     try:
         from src.models.models import db, User, Customer, Article, Order, Machine, Thread, ActivityLog, Supplier
         db.init_app(app)
@@ -148,6 +207,8 @@ def create_app():
         traceback.print_exc()
         return None
 
+    startup_phases['models'] = _elapsed_ms(phase_start)
+
     # ==========================================
     # LOGIN MANAGER
     # ==========================================
@@ -284,6 +345,7 @@ def create_app():
     # ==========================================
     # BLUEPRINT REGISTRIERUNG
     # ==========================================
+    phase_start = time.perf_counter()
     blueprints_registered = []
 
     def register_blueprint_safe(import_path, blueprint_name, display_name):
@@ -479,7 +541,14 @@ def create_app():
     # Feedback / Bug-Melder
     register_blueprint_safe('src.controllers.feedback_controller', 'feedback_bp', 'Feedback')
 
+    # PDF-Batch (Sammelrechnungen, Packlisten, Monatsabschluss)
+    register_blueprint_safe('src.controllers.pdf_batch_controller', 'pdf_batch_bp', 'PDF-Batch')
+
+    # Hintergrund-Jobs (Status der Sync-Auftraege)
+    register_blueprint_safe('src.controllers.jobs_controller', 'jobs_bp', 'Hintergrund-Jobs')
+
     # Dashboard ist als Thin-Wrapper in app.py, Logik in src/controllers/dashboard_controller.py
+    startup_phases['blueprints'] = _elapsed_ms(phase_start)
 
     # CSRF-Ausnahmen fuer oeffentliche Blueprints und JSON-APIs
     for bp_name in ['shop', 'inquiry', 'tracking', 'website', 'design_approval', 'quote_approval', 'production_time', 'kasse', 'rechnung']:
@@ -721,61 +790,10 @@ def create_app():
     # ==========================================
     # CONTEXT PROCESSORS
     # ==========================================
-    @app.context_processor
-    def inject_globals():
-        """Globale Template-Variablen, inkl. Branding."""
-        from datetime import date
-        
-        try:
-            from src.models.branding_settings import BrandingSettings
-            branding_settings = BrandingSettings.get_settings()
-        except (ImportError, Exception):
-            branding_settings = None
-
-        
-        # Permission-Helper registrieren
-        try:
-            from src.utils.permissions import register_permission_helpers
-            register_permission_helpers(app)
-        except (ImportError, Exception):
-            pass
-
-        # Tenant-Plan-Info fuer Templates (Trial-Banner, etc.)
-        tenant_plan = None
-        try:
-            from src.utils.plan_gate import get_tenant_plan_info
-            tenant_plan = get_tenant_plan_info()
-        except (ImportError, Exception):
-            pass
-
-        # Dynamische Position/Veredelungs-Choices
-        position_choices = []
-        design_type_choices = []
-        try:
-            from src.models.order_workflow import OrderDesign
-            position_choices = OrderDesign.get_position_choices_dynamic()
-            design_type_choices = OrderDesign.get_design_type_choices_dynamic()
-        except Exception:
-            pass
-
-        # Demo-Modus: Branding ueberschreiben
-        if current_user.is_authenticated and getattr(current_user, 'is_demo', False):
-            class DemoBranding:
-                company_name = 'Muster Stickerei GmbH'
-                logo_path = None
-                primary_color = '#1a6b5a'
-                secondary_color = '#6c757d'
-            branding_settings = DemoBranding()
-
-        return {
-            'app_name': 'StitchAdmin 2.0',
-            'app_version': '2.0.2',
-            'branding': branding_settings,
-            'today': date.today(),
-            'tenant_plan': tenant_plan,
-            'position_choices': position_choices,
-            'design_type_choices': design_type_choices,
-        }
+    # Einmalig registriert, Werte pro Request und pro Tenant gecacht
+    # (siehe src/utils/template_context.py)
+    from src.utils.template_context import init_template_context
+    init_template_context(app)
 
     # ==========================================
     # ERROR HANDLERS
@@ -786,584 +804,93 @@ def create_app():
     # DATENBANK-TABELLEN ERSTELLEN (auch für Gunicorn)
     # ==========================================
     with app.app_context():
-        from src.models.models import db as _db, User
-        # Tenant-Models importieren damit create_all() die Tabellen kennt
-        from src.models.tenant import Tenant, UserTenant, TenantPayment  # noqa: F401
-        from src.models.csv_import import CSVImportJob  # noqa: F401
-        from src.models.contracts import Contract, ContractContact, ContractCommunication  # noqa: F401
-        from src.models.email_automation import EmailAutomationRule, EmailAutomationLog  # noqa: F401
-        from src.models.banking import BankAccount, BankTransaction  # noqa: F401
-        from src.models.calendar_sync import CalendarConnection, CalendarSyncMapping  # noqa: F401
-        from src.models.social_media import SocialMediaAccount, SocialMediaPost  # noqa: F401
-        from src.models.order_workflow import VeredelungsArt, PositionTyp  # noqa: F401
-        from src.models.veredelung import VeredelungsVerfahren, VeredelungsPosition, VeredelungsParameter, ArtikelVeredelung  # noqa: F401
-        from src.models.production_job import ProductionJob  # noqa: F401
-        from src.models.energie import StromAblesung, StromTarif  # noqa: F401
-        try:
-            _db.create_all()
+        from src.models.models import db as _db
+
+        # Versionierte Schema-Migrationen: im Normalfall nur eine Versions-Abfrage
+        # (siehe src/utils/schema_migrations.py)
+        phase_start = time.perf_counter()
+        try:
+            from src.utils.schema_migrations import ensure_schema, format_phases
+            schema_report = ensure_schema(_db)
+            app.extensions['schema_report'] = schema_report
+            status = 'WARN' if schema_report['failed'] is not None else 'OK'
+            print(f"[{status}] Datenbankschema v{schema_report['version']} "
+                  f"({format_phases(schema_report['phases'])})")
         except Exception as e:
             _db.session.rollback()
-            print(f"[WARN] create_all() Worker-Race-Condition: {e}")
-
-        # Standard-Veredelungsarten und Positionstypen erstellen
-        try:
-            VeredelungsArt.ensure_defaults()
-            PositionTyp.ensure_defaults()
-        except Exception as e:
-            _db.session.rollback()
-            print(f"[INFO] ensure_defaults: {e}")
+            print(f"[FEHLER] Schema-Pruefung fehlgeschlagen: {e}")
+        startup_phases['schema'] = _elapsed_ms(phase_start)
 
         # APScheduler fuer Hintergrund-Jobs (Social Media, E-Mail, Bank-Sync)
+        phase_start = time.perf_counter()
         try:
             from src.services.scheduler_service import init_scheduler
             init_scheduler(app)
         except ImportError:
             print("[INFO] APScheduler nicht installiert - Hintergrund-Jobs deaktiviert")
+        startup_phases['scheduler'] = _elapsed_ms(phase_start)
 
-        # Migriere neue Spalte: customers.is_active
-        try:
-            _db.session.execute(_db.text(
-                "ALTER TABLE customers ADD COLUMN is_active BOOLEAN DEFAULT TRUE"
-            ))
-            _db.session.commit()
-            print("[OK] customers.is_active Spalte hinzugefuegt")
-        except Exception:
-            _db.session.rollback()
-
-        # Migriere neue Spalte: users.is_system_admin
-        try:
-            _db.session.execute(_db.text(
-                "ALTER TABLE users ADD COLUMN is_system_admin BOOLEAN DEFAULT FALSE"
-            ))
-            _db.session.commit()
-            print("[OK] users.is_system_admin Spalte hinzugefuegt")
-        except Exception:
-            _db.session.rollback()  # Spalte existiert bereits
-
-        # Migriere Billing-Spalten fuer Tenants
-        billing_columns = [
-            ("tenants", "billing_status", "VARCHAR(30) DEFAULT 'active'"),
-            ("tenants", "billing_cycle", "VARCHAR(20) DEFAULT 'monthly'"),
-            ("tenants", "next_billing_date", "DATE"),
-            ("tenants", "last_payment_date", "DATE"),
-            ("tenants", "last_payment_amount", "NUMERIC(10,2)"),
-            ("tenants", "stripe_customer_id", "VARCHAR(100)"),
-            ("tenants", "stripe_subscription_id", "VARCHAR(100)"),
-            ("tenants", "tax_id", "VARCHAR(50)"),
-        ]
-        for table, col, col_type in billing_columns:
-            try:
-                _db.session.execute(_db.text(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}"))
-                _db.session.commit()
-            except Exception:
-                _db.session.rollback()
-
-        # Migriere Auftrags-Feature-Spalten (Rechnungsempfaenger, Sublimation etc.)
-        feature_columns = [
-            ("orders", "billing_customer_id", "VARCHAR(50)"),
-            ("order_items", "sublimation_position", "VARCHAR(50)"),
-            ("order_items", "is_non_textile", "BOOLEAN DEFAULT FALSE"),
-            ("order_items", "non_textile_type", "VARCHAR(100)"),
-        ]
-        for table, col, col_type in feature_columns:
-            try:
-                _db.session.execute(_db.text(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}"))
-                _db.session.commit()
-            except Exception:
-                _db.session.rollback()
-
-        # Migriere neue Spalten fuer Shop + Anfragen
-        shop_columns = [
-            ("orders", "source", "VARCHAR(20)"),
-            ("orders", "tracking_token", "VARCHAR(64)"),
-            ("orders", "customer_email_for_tracking", "VARCHAR(200)"),
-            ("orders", "archived_at", "DATETIME"),
-            ("orders", "archived_by", "VARCHAR(80)"),
-            ("orders", "archive_reason", "VARCHAR(200)"),
-            ("articles", "show_in_shop", "BOOLEAN DEFAULT FALSE"),
-            ("articles", "shop_description", "TEXT"),
-            ("articles", "shop_image_path", "VARCHAR(255)"),
-            ("articles", "shop_category_id", "INTEGER"),
-            ("articles", "shop_sort_order", "INTEGER DEFAULT 0"),
-            ("articles", "shop_min_quantity", "INTEGER DEFAULT 1"),
-        ]
-        for table, col, col_type in shop_columns:
-            try:
-                _db.session.execute(_db.text(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}"))
-                _db.session.commit()
-            except Exception:
-                _db.session.rollback()
-
-        # Migriere OrderDesign: Notizen + Externe Bestellung + Druckdatei
-        design_supplier_columns = [
-            ("order_designs", "notes", "TEXT"),
-            ("order_designs", "supplier_id", "VARCHAR(50)"),
-            ("order_designs", "supplier_order_status", "VARCHAR(50) DEFAULT 'none'"),
-            ("order_designs", "supplier_order_date", "DATE"),
-            ("order_designs", "supplier_expected_date", "DATE"),
-            ("order_designs", "supplier_delivered_date", "DATE"),
-            ("order_designs", "supplier_order_notes", "TEXT"),
-            ("order_designs", "supplier_cost", "FLOAT"),
-            ("order_designs", "supplier_order_id", "VARCHAR(50)"),
-            ("order_designs", "supplier_reference", "VARCHAR(100)"),
-            ("order_designs", "print_file_path", "VARCHAR(255)"),
-            ("order_designs", "print_file_name", "VARCHAR(255)"),
-        ]
-        for table, col, col_type in design_supplier_columns:
-            try:
-                _db.session.execute(_db.text(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}"))
-                _db.session.commit()
-            except Exception:
-                _db.session.rollback()
-
-        # SumUp-Felder in CompanySettings
-        sumup_columns = [
-            ("company_settings", "sumup_api_key", "VARCHAR(500)"),
-            ("company_settings", "sumup_merchant_code", "VARCHAR(100)"),
-        ]
-        for table, col, col_type in sumup_columns:
-            try:
-                _db.session.execute(_db.text(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}"))
-                _db.session.commit()
-            except Exception:
-                _db.session.rollback()
-
-        # Artikelbild-Felder + Google API Keys
-        image_columns = [
-            ("articles", "image_url", "VARCHAR(500)"),
-            ("articles", "image_path", "VARCHAR(255)"),
-            ("articles", "image_thumbnail_path", "VARCHAR(255)"),
-            ("company_settings", "google_api_key", "VARCHAR(200)"),
-            ("company_settings", "google_search_cx", "VARCHAR(100)"),
-        ]
-        for table, col, col_type in image_columns:
-            try:
-                _db.session.execute(_db.text(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}"))
-                _db.session.commit()
-            except Exception:
-                _db.session.rollback()
-
-        # Lieferantenbestellungen: Wareneingang-Felder
-        so_columns = [
-            ("supplier_orders", "delivery_note_photo", "VARCHAR(500)"),
-            ("supplier_orders", "actual_delivery_date", "DATE"),
-            ("supplier_orders", "receiving_notes", "TEXT"),
-        ]
-        for table, col, col_type in so_columns:
-            try:
-                _db.session.execute(_db.text(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}"))
-                _db.session.commit()
-            except Exception:
-                _db.session.rollback()
-
-        # Performance-Indexes fuer haeufig gefilterte Spalten
-        order_indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_order_workflow_status ON orders (workflow_status)",
-            "CREATE INDEX IF NOT EXISTS idx_order_design_approval_status ON orders (design_approval_status)",
-            "CREATE INDEX IF NOT EXISTS idx_order_payment_status ON orders (payment_status)",
-            "CREATE INDEX IF NOT EXISTS idx_order_archived_at ON orders (archived_at)",
-            "CREATE INDEX IF NOT EXISTS idx_order_active ON orders (archived_at, workflow_status)",
-            "CREATE INDEX IF NOT EXISTS idx_order_customer_created ON orders (customer_id, created_at)",
-            "CREATE INDEX IF NOT EXISTS idx_inquiry_status ON inquiries (status)",
-            "CREATE INDEX IF NOT EXISTS idx_inquiry_created ON inquiries (created_at)",
-            "CREATE INDEX IF NOT EXISTS idx_supplier_order_status ON supplier_orders (status)",
-            "CREATE INDEX IF NOT EXISTS idx_supplier_order_delivery ON supplier_orders (delivery_date)",
-        ]
-        for idx_sql in order_indexes:
-            try:
-                _db.session.execute(_db.text(idx_sql))
-                _db.session.commit()
-            except Exception:
-                _db.session.rollback()
-
-        # scan_foto Spalte fuer Rechnungs-Scanner
+        # Materialisierte Dashboard-Kennzahlen (Session-Events + Scheduler-Job)
         try:
-            _db.session.execute(_db.text("ALTER TABLE rechnungen ADD COLUMN scan_foto VARCHAR(500)"))
-            _db.session.commit()
-        except Exception:
-            _db.session.rollback()
-
-        # DPD-Kundennummer in CompanySettings
-        try:
-            _db.session.execute(_db.text("ALTER TABLE company_settings ADD COLUMN dpd_customer_number VARCHAR(20)"))
-            _db.session.commit()
-        except Exception:
-            _db.session.rollback()
-
-        # Angebots-Verknüpfung in Inquiries
-        try:
-            _db.session.execute(_db.text("ALTER TABLE inquiries ADD COLUMN angebot_id INTEGER REFERENCES angebote(id)"))
-            _db.session.commit()
-        except Exception:
-            _db.session.rollback()
-
-        # Aufgaben: Privat/Öffentlich Sichtbarkeit
-        try:
-            _db.session.execute(_db.text("ALTER TABLE todos ADD COLUMN is_private BOOLEAN DEFAULT TRUE"))
-            _db.session.commit()
-        except Exception:
-            _db.session.rollback()
-
-        # Tracking-Token für Angebote (einheitliches Tracking)
-        try:
-            _db.session.execute(_db.text("ALTER TABLE angebote ADD COLUMN tracking_token VARCHAR(64) UNIQUE"))
-            _db.session.execute(_db.text("CREATE INDEX idx_angebote_tracking_token ON angebote(tracking_token)"))
-            _db.session.commit()
-        except Exception:
-            _db.session.rollback()
-
-        # Bestehende Angebote ohne Token mit Token versehen
-        try:
-            import uuid as _uuid
-            result = _db.session.execute(_db.text("SELECT id FROM angebote WHERE tracking_token IS NULL"))
-            for row in result.fetchall():
-                _db.session.execute(_db.text("UPDATE angebote SET tracking_token = :token WHERE id = :id"),
-                                    {'token': _uuid.uuid4().hex, 'id': row[0]})
-            _db.session.commit()
-        except Exception:
-            _db.session.rollback()
-
-        # Kundenware-Felder
-        try:
-            _db.session.execute(_db.text("ALTER TABLE orders ADD COLUMN is_kundenware BOOLEAN DEFAULT FALSE"))
-            _db.session.commit()
-        except Exception:
-            _db.session.rollback()
-
-        try:
-            _db.session.execute(_db.text("ALTER TABLE angebote ADD COLUMN is_kundenware BOOLEAN DEFAULT FALSE"))
-            _db.session.commit()
-        except Exception:
-            _db.session.rollback()
-
-        # Auftragstyp fuer Angebote (wird bei Umwandlung an Auftrag uebergeben)
-        try:
-            _db.session.execute(_db.text("ALTER TABLE angebote ADD COLUMN auftragstyp VARCHAR(20) DEFAULT 'embroidery'"))
-            _db.session.commit()
-        except Exception:
-            _db.session.rollback()
-
-        # Rechtliche Texte in Firmeneinstellungen
-        try:
-            _db.session.execute(_db.text("ALTER TABLE company_settings ADD COLUMN haftungsausschluss_kundenware TEXT DEFAULT ''"))
-            _db.session.execute(_db.text("ALTER TABLE company_settings ADD COLUMN agb_text TEXT DEFAULT ''"))
-            _db.session.commit()
-        except Exception:
-            _db.session.rollback()
-
-        # Textbausteine-Tabelle fuer Angebote (wiederverwendbare Textbloecke)
-        try:
-            _db.session.execute(_db.text("""
-                CREATE TABLE IF NOT EXISTS textbausteine (
-                    id SERIAL PRIMARY KEY,
-                    titel VARCHAR(200) NOT NULL,
-                    inhalt TEXT NOT NULL,
-                    kategorie VARCHAR(50) DEFAULT 'sonstiges',
-                    sort_order INTEGER DEFAULT 0,
-                    aktiv BOOLEAN DEFAULT TRUE,
-                    ist_standard BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    created_by VARCHAR(80),
-                    updated_at TIMESTAMP
-                )
-            """))
-            _db.session.commit()
-            print('[OK] Textbausteine-Tabelle erstellt')
-        except Exception:
-            _db.session.rollback()
-
-        # Textbausteine-Feld im Angebot (JSON mit ausgewaehlten IDs)
-        try:
-            _db.session.execute(_db.text("ALTER TABLE angebote ADD COLUMN textbausteine_ids TEXT DEFAULT ''"))
-            _db.session.execute(_db.text("ALTER TABLE angebote ADD COLUMN textbausteine_text TEXT DEFAULT ''"))
-            _db.session.commit()
-        except Exception:
-            _db.session.rollback()
-
-        # Standard-Textbausteine anlegen
-        try:
-            from src.models.textbaustein import Textbaustein
-            Textbaustein.ensure_defaults()
+            from src.services.dashboard_stats_service import init_dashboard_stats
+            init_dashboard_stats(app)
         except Exception as e:
-            _db.session.rollback()
-            print(f'[WARN] Textbausteine defaults: {e}')
-
-        # Angebots-Freigabe Felder
-        for col in [
-            "approval_token VARCHAR(100) UNIQUE",
-            "approval_status VARCHAR(50)",
-            "approval_sent_at TIMESTAMP",
-            "approval_date TIMESTAMP",
-            "approval_signature TEXT",
-            "approval_ip VARCHAR(50)",
-            "approval_user_agent VARCHAR(500)",
-            "approval_notes TEXT",
-            "approved_by_name VARCHAR(200)"
-        ]:
-            try:
-                _db.session.execute(_db.text(f"ALTER TABLE angebote ADD COLUMN {col}"))
-                _db.session.commit()
-            except Exception:
-                _db.session.rollback()
+            print(f"[WARN] Dashboard-Statistik nicht initialisiert: {e}")
 
-        # Standard E-Mail-Templates fuer Kunden-Benachrichtigungen
+        # Kunden-Kennzahlen (CRM-Rankings) per Session-Events pflegen, naechtlich neu aufbauen
         try:
-            from src.models.crm_contact import EmailTemplate, EmailTemplateCategory
-            from src.models.email_automation import EmailAutomationRule
-
-            if EmailTemplate.query.filter_by(category=EmailTemplateCategory.AUFTRAG_BESTAETIGUNG).count() == 0:
-                _templates = [
-                    (EmailTemplateCategory.AUFTRAG_BESTAETIGUNG, 'Auftragsbestaetigung',
-                     'Ihr Auftrag {auftragsnummer} wurde angenommen',
-                     'Guten Tag {anrede} {kunde_name},\n\nvielen Dank fuer Ihren Auftrag {auftragsnummer}.\nWir haben Ihren Auftrag erhalten und werden ihn schnellstmoeglich bearbeiten.\n\nMit freundlichen Gruessen\n{firmenname}',
-                     '<p>Guten Tag {anrede} {kunde_name},</p><p>vielen Dank fuer Ihren Auftrag <strong>{auftragsnummer}</strong>.</p><p>Wir haben Ihren Auftrag erhalten und werden ihn schnellstmoeglich bearbeiten.</p><p>Mit freundlichen Gruessen<br>{firmenname}</p>',
-                     'order_status', 'accepted'),
-
-                    (EmailTemplateCategory.PRODUKTION_GEPLANT, 'Ware im Zulauf',
-                     'Material fuer Ihren Auftrag {auftragsnummer} ist bestellt',
-                     'Guten Tag {anrede} {kunde_name},\n\ndie Materialien fuer Ihren Auftrag {auftragsnummer} sind bestellt.\nSobald alles eingetroffen ist, starten wir mit der Produktion.\n\nMit freundlichen Gruessen\n{firmenname}',
-                     '<p>Guten Tag {anrede} {kunde_name},</p><p>die Materialien fuer Ihren Auftrag <strong>{auftragsnummer}</strong> sind bestellt.</p><p>Sobald alles eingetroffen ist, starten wir mit der Produktion.</p><p>Mit freundlichen Gruessen<br>{firmenname}</p>',
-                     'workflow_status', 'confirmed'),
-
-                    (EmailTemplateCategory.PRODUKTION_GEPLANT, 'Produktion gestartet',
-                     'Ihr Auftrag {auftragsnummer} ist in Produktion',
-                     'Guten Tag {anrede} {kunde_name},\n\nIhr Auftrag {auftragsnummer} befindet sich jetzt in der Produktion.\nWir informieren Sie, sobald Ihr Auftrag fertiggestellt ist.\n\nMit freundlichen Gruessen\n{firmenname}',
-                     '<p>Guten Tag {anrede} {kunde_name},</p><p>Ihr Auftrag <strong>{auftragsnummer}</strong> befindet sich jetzt in der Produktion.</p><p>Wir informieren Sie, sobald Ihr Auftrag fertiggestellt ist.</p><p>Mit freundlichen Gruessen<br>{firmenname}</p>',
-                     'order_status', 'in_progress'),
-
-                    (EmailTemplateCategory.QM_ABNAHME, 'Auftrag fertig',
-                     'Ihr Auftrag {auftragsnummer} ist fertig!',
-                     'Guten Tag {anrede} {kunde_name},\n\nIhr Auftrag {auftragsnummer} ist fertiggestellt und bereit zur Abholung bzw. zum Versand.\n\nMit freundlichen Gruessen\n{firmenname}',
-                     '<p>Guten Tag {anrede} {kunde_name},</p><p>Ihr Auftrag <strong>{auftragsnummer}</strong> ist fertiggestellt und bereit zur Abholung bzw. zum Versand.</p><p>Mit freundlichen Gruessen<br>{firmenname}</p>',
-                     'order_status', 'ready'),
-
-                    (EmailTemplateCategory.VERSAND_INFO, 'Versendet mit Tracking',
-                     'Ihr Auftrag {auftragsnummer} wurde versendet',
-                     'Guten Tag {anrede} {kunde_name},\n\nIhr Auftrag {auftragsnummer} wurde versendet.\nVersanddienstleister: {versanddienstleister}\nSendungsnummer: {sendungsnummer}\n\nMit freundlichen Gruessen\n{firmenname}',
-                     '<p>Guten Tag {anrede} {kunde_name},</p><p>Ihr Auftrag <strong>{auftragsnummer}</strong> wurde versendet.</p><table style="background:#f8f9fa;padding:15px;border-radius:8px;margin:15px 0;width:100%"><tr><td><strong>Versand:</strong></td><td>{versanddienstleister}</td></tr><tr><td><strong>Sendungsnr.:</strong></td><td>{sendungsnummer}</td></tr></table><p>Mit freundlichen Gruessen<br>{firmenname}</p>',
-                     'workflow_status', 'shipped'),
-                ]
-
-                for cat, name, subj, text, html, trigger_evt, trigger_val in _templates:
-                    tpl = EmailTemplate(
-                        name=name, category=cat, subject=subj,
-                        body_text=text, body_html=html, is_active=True,
-                        created_by='System'
-                    )
-                    _db.session.add(tpl)
-                    _db.session.flush()
-
-                    rule = EmailAutomationRule(
-                        name=f'Auto: {name}',
-                        description=f'Sendet "{name}" bei {trigger_evt}={trigger_val}',
-                        trigger_event=trigger_evt,
-                        trigger_value=trigger_val,
-                        template_id=tpl.id,
-                        is_enabled=True,
-                        created_by='System'
-                    )
-                    _db.session.add(rule)
-
-                _db.session.commit()
-                print('[OK] Standard E-Mail-Templates und Automation-Regeln erstellt')
+            from src.services.customer_kpi_service import init_customer_kpis
+            init_customer_kpis(app)
         except Exception as e:
-            _db.session.rollback()
-            print(f'[WARN] E-Mail-Templates Migration: {e}')
+            print(f"[WARN] Kunden-Kennzahlen nicht initialisiert: {e}")
 
-        # Migriere Modul-Icons von Emojis/Text auf Bootstrap Icons
+        # Shelly-Messwerte periodisch aufzeichnen (SHELLY_SAMPLE_SECONDS), alte Rohdaten loeschen
         try:
-            from src.models.user_permissions import Module
-            icon_mapping = {
-                'CRM': 'bi-people-fill', '👥': 'bi-people-fill',
-                'PROD': 'bi-gear-wide-connected', '🏭': 'bi-gear-wide-connected',
-                'POS': 'bi-cash-stack', '💰': 'bi-cash-stack',
-                'ACC': 'bi-calculator-fill', '📈': 'bi-calculator-fill',
-                'DOC': 'bi-folder2-open', '📁': 'bi-folder2-open',
-                'ADM': 'bi-sliders', '⚙️': 'bi-sliders',
-                'WH': 'bi-box-seam-fill', '📦': 'bi-box-seam-fill',
-                'DSN': 'bi-palette-fill', '🎨': 'bi-palette-fill',
-                'EK': 'bi-cart-plus-fill', '🛒': 'bi-cart-plus-fill',
-                'palette': 'bi-palette-fill',
-            }
-            modules = Module.query.all()
-            updated = False
-            for m in modules:
-                if m.icon in icon_mapping:
-                    m.icon = icon_mapping[m.icon]
-                    updated = True
-                elif m.icon and not m.icon.startswith('bi-'):
-                    m.icon = 'bi-grid-fill'
-                    updated = True
-            if updated:
-                _db.session.commit()
-        except Exception:
-            pass
-
-        # Online-Module (Website-CMS, Shop, Anfragen) anlegen
-        try:
-            from src.models.user_permissions import Module
-            online_modules = [
-                {
-                    'name': 'website_cms',
-                    'display_name': 'Website-CMS',
-                    'description': 'Website-Inhalte bearbeiten',
-                    'icon': 'bi-globe',
-                    'color': 'info',
-                    'route': 'website_admin.dashboard',
-                    'category': 'online',
-                    'requires_admin': True,
-                    'default_enabled': True,
-                    'sort_order': 10,
-                },
-                {
-                    'name': 'shop_admin',
-                    'display_name': 'Online-Shop',
-                    'description': 'Shop & Konfigurator verwalten',
-                    'icon': 'bi-shop',
-                    'color': 'success',
-                    'route': 'shop_admin.dashboard',
-                    'category': 'online',
-                    'requires_admin': True,
-                    'default_enabled': True,
-                    'sort_order': 11,
-                },
-                {
-                    'name': 'inquiry_admin',
-                    'display_name': 'Anfragen',
-                    'description': 'Website-Anfragen bearbeiten',
-                    'icon': 'bi-envelope-paper-fill',
-                    'color': 'warning',
-                    'route': 'inquiry_admin.list',
-                    'category': 'online',
-                    'requires_admin': True,
-                    'default_enabled': True,
-                    'sort_order': 12,
-                },
-            ]
-            for mod_data in online_modules:
-                if not Module.query.filter_by(name=mod_data['name']).first():
-                    _db.session.add(Module(**mod_data))
-            _db.session.commit()
-        except Exception:
-            _db.session.rollback()
+            from src.services.shelly_poller_service import init_shelly_sampling
+            from src.services.shelly_rollup_service import init_shelly_rollups
+            init_shelly_sampling(app)
+            init_shelly_rollups(app)
+        except Exception as e:
+            print(f"[WARN] Shelly-Aufzeichnung nicht initialisiert: {e}")
 
-        # CSV-Import Modul anlegen
+        # Buchhaltung: Monatssummen fuer BWA/USt-VA/Cashflow per Session-Events pflegen
         try:
-            from src.models.user_permissions import Module
-            if not Module.query.filter_by(name='csv_import').first():
-                _db.session.add(Module(
-                    name='csv_import',
-                    display_name='CSV-Import',
-                    description='Kunden, Artikel & Buchungen importieren',
-                    icon='bi-file-earmark-arrow-up',
-                    color='secondary',
-                    route='csv_import.index',
-                    category='admin',
-                    requires_admin=True,
-                    default_enabled=True,
-                    sort_order=15,
-                ))
-                _db.session.commit()
-        except Exception:
-            _db.session.rollback()
+            from src.services.buchhaltung_service import init_periodensummen
+            init_periodensummen(app)
+        except Exception as e:
+            print(f"[WARN] Buchhaltungs-Periodensummen nicht initialisiert: {e}")
 
-        # Vertraege-Modul anlegen
+        # Suchindex (Dokumente per Session-Events synchron halten)
         try:
-            from src.models.user_permissions import Module
-            if not Module.query.filter_by(name='contracts').first():
-                _db.session.add(Module(
-                    name='contracts',
-                    display_name='Vertraege & Policen',
-                    description='Vertraege, Versicherungen & Wartung verwalten',
-                    icon='bi-file-earmark-text',
-                    color='primary',
-                    route='contracts.index',
-                    category='admin',
-                    requires_admin=False,
-                    default_enabled=True,
-                    sort_order=14,
-                ))
-                _db.session.commit()
-        except Exception:
-            _db.session.rollback()
+            from src.services.search_service import init_search_index
+            init_search_index(app)
+        except Exception as e:
+            print(f"[WARN] Suchindex nicht initialisiert: {e}")
 
-        # Aufgaben-Board Modul anlegen
+        # Uebersichtslisten (Filterwerte-Cache bei Artikel-Aenderungen verwerfen)
         try:
-            from src.models.user_permissions import Module
-            if not Module.query.filter_by(name='taskboard').first():
-                _db.session.add(Module(
-                    name='taskboard',
-                    display_name='Aufgaben-Board',
-                    description='Zentrale Aufgabenverwaltung mit Kanban-Board',
-                    icon='bi-kanban',
-                    color='info',
-                    route='taskboard.index',
-                    category='core',
-                    requires_admin=False,
-                    default_enabled=True,
-                    sort_order=2,
-                ))
-                _db.session.commit()
-        except Exception:
-            _db.session.rollback()
+            from src.services.list_query_service import init_list_queries
+            init_list_queries(app)
+        except Exception as e:
+            print(f"[WARN] Listen-Abfragen nicht initialisiert: {e}")
 
-        # Website-CMS Standard-Inhalte setzen (nur bei leerer Tabelle)
+        # PDF-Store (Eintraege bei Aenderungen per Session-Events verwerfen)
         try:
-            from src.models.website_content import WebsiteContent
-            if WebsiteContent.query.count() == 0:
-                WebsiteContent.seed_defaults()
-                print("[OK] Website Standard-Inhalte erstellt")
-        except Exception:
-            _db.session.rollback()
+            from src.services.pdf_store_service import init_pdf_store
+            init_pdf_store(app)
+        except Exception as e:
+            print(f"[WARN] PDF-Store nicht initialisiert: {e}")
 
-        # Erstelle Admin-User falls nicht vorhanden
-        if not User.query.filter_by(username='admin').first():
-            import secrets
-            initial_pw = secrets.token_urlsafe(12)
-            admin = User(username='admin', email='admin@example.com', is_admin=True)
-            admin.set_password(initial_pw)
-            _db.session.add(admin)
-            _db.session.commit()
-            print(f"[WICHTIG] Admin-User erstellt. Passwort: {initial_pw}")
-            print("[WICHTIG] Bitte sofort aendern unter Einstellungen > Benutzer!")
-
-        # Default-Tenant erstellen falls nicht vorhanden
+        # Job-Queue (Worker-Threads fuer IMAP-, Bank- und Kalender-Sync)
         try:
-            if not Tenant.query.filter_by(slug='default').first():
-                default_tenant = Tenant(
-                    slug='default',
-                    name='StitchAdmin',
-                    subdomain='app',
-                    contact_email='admin@example.com',
-                    is_active=True,
-                    plan_tier='enterprise',
-                )
-                _db.session.add(default_tenant)
-                _db.session.flush()
-
-                # Alle bestehenden User dem Default-Tenant zuweisen
-                users = User.query.all()
-                for user in users:
-                    if not UserTenant.query.filter_by(user_id=user.id, tenant_id=default_tenant.id).first():
-                        ut = UserTenant(
-                            user_id=user.id,
-                            tenant_id=default_tenant.id,
-                            role='tenant_admin' if user.is_admin else 'user',
-                            is_active=True,
-                            is_primary=True,
-                        )
-                        _db.session.add(ut)
-
-                # Admin als System-Admin markieren
-                admin_user = User.query.filter_by(username='admin').first()
-                if admin_user and hasattr(admin_user, 'is_system_admin'):
-                    admin_user.is_system_admin = True
-
-                _db.session.commit()
-                print(f"[OK] Default-Tenant erstellt, {len(users)} User zugewiesen")
+            from src.services.job_queue_service import init_job_queue
+            init_job_queue(app)
         except Exception as e:
-            print(f"[INFO] Default-Tenant Setup: {e}")
-            _db.session.rollback()
+            print(f"[WARN] Job-Queue nicht initialisiert: {e}")
+
+    startup_phases['total'] = _elapsed_ms(startup_begin)
+    app.extensions['startup_phases'] = startup_phases
+    print("[OK] Startzeit: " + ', '.join(f"{name}={ms}ms" for name, ms in startup_phases.items()))
 
     return app
 
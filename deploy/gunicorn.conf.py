@@ -17,3 +17,10 @@ loglevel = "info"
 # Prozess
 pidfile = "/opt/stitchadmin/gunicorn.pid"
 daemon = False
+
+
+# Schema-Migrationen einmalig im Master vor dem Forken der Worker.
+# Die Worker pruefen beim Start dann nur noch die Schema-Version.
+def on_starting(server):
+    from app import run_schema_migrations
+    run_schema_migrations()
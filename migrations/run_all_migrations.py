@@ -587,5 +587,21 @@ def run_migration(db_path=None):
     return True
 
 
+def run_versioned_migrations():
+    """
+    Versionierte Migrations-Stufe (src/utils/schema_migrations.py):
+    create_all, Spalten-Migrationen und Standarddaten - einmalig vor dem
+    Start der Worker, damit diese nur noch die Schema-Version pruefen.
+    """
+    from app import run_schema_migrations
+    report = run_schema_migrations()
+    if report['migrated']:
+        print(f"✓ Versionen angewendet: {', '.join(str(v) for v in report['migrated'])}")
+    else:
+        print(f"✓ Schema-Version v{report['version']} ist aktuell.")
+    return report
+
+
 if __name__ == '__main__':
     run_migration()
+    run_versioned_migrations()
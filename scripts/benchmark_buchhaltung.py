@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: BWA/USt-VA (src/services/buchhaltung_service.py)
+Vergleicht die bisherige Berechnung (alle Buchungen des Zeitraums laden,
+in Python summieren, Konto-Abfrage je Konto) mit den Monatssummen
+(GROUP BY je Jahr, danach inkrementell gepflegt). Datenbank ist eine
+temporaere SQLite mit N Buchungen ueber zwei Jahre.
+
+Nutzung:
+    python scripts/benchmark_buchhaltung.py
+    python scripts/benchmark_buchhaltung.py --bookings 100000
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import sys
+import os
+import random
+import argparse
+import tempfile
+import time
+import calendar
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+# Projektpfad hinzufuegen
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+JAHR = 2026
+
+
+def legacy_bwa(jahr, monat=None):
+    """Bisherige BWAService.berechne_bwa (Kernteil: Laden + Summieren)"""
+    from src.models.buchhaltung import BuchhaltungBuchung as Buchung, Konto
+
+    if monat:
+        datum_von, datum_bis = date(jahr, monat, 1), date(jahr, monat, calendar.monthrange(jahr, monat)[1])
+    else:
+        datum_von, datum_bis = date(jahr, 1, 1), date(jahr, 12, 31)
+    buchungen = Buchung.query.filter(
+        Buchung.buchungsdatum >= datum_von,
+        Buchung.buchungsdatum <= datum_bis,
+        Buchung.ist_storniert == False
+    ).all()
+    konten_summen = defaultdict(Decimal)
+    for b in buchungen:
+        if b.konto:
+            konten_summen[b.konto.kontonummer] += Decimal(str(b.betrag_netto or 0))
+    erloese = aufwendungen = Decimal('0')
+    for konto_nr, summe in konten_summen.items():
+        if konto_nr.startswith('8'):
+            Konto.query.filter_by(kontonummer=konto_nr).first()
+            erloese += summe
+        if konto_nr.startswith(('3', '4', '7')):
+            Konto.query.filter_by(kontonummer=konto_nr).first()
+            aufwendungen += summe
+    return erloese - aufwendungen
+
+
+def legacy_vergleich(jahr):
+    """14 Berechnungen wie bisher berechne_bwa_vergleich()"""
+    monate = [legacy_bwa(jahr, monat) for monat in range(1, 13)]
+    return monate, legacy_bwa(jahr), legacy_bwa(jahr - 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark BWA: Buchungen laden gegen Monatssummen')
+    parser.add_argument('--bookings', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3, help='Wiederholungen je Messung')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='stitchadmin_bwa_'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['JOB_QUEUE_WORKERS'] = '0'  # keine Worker-Threads im Benchmark-Prozess
+
+    from app import create_app
+    from src.models.models import db
+    from src.models.buchhaltung import BuchhaltungBuchung as Buchung, init_kontenplan, Konto
+    from src.services.buchhaltung_service import BWAService, UStService
+
+    app = create_app()
+    with app.app_context():
+        init_kontenplan()
+        konten = [k for k in Konto.query.all() if k.kontonummer[0] in '3478']
+        rng = random.Random(7)
+        rows = []
+        for i in range(args.bookings):
+            konto = rng.choice(konten)
+            einnahme = konto.kontonummer.startswith('8')
+            netto = Decimal(rng.randint(500, 500000)) / 100
+            satz = rng.choice([Decimal('19'), Decimal('19'), Decimal('7')])
+            mwst = (netto * satz / 100).quantize(Decimal('0.01'))
+            tag = date(rng.choice([JAHR - 1, JAHR]), rng.randint(1, 12), rng.randint(1, 28))
+            rows.append({'buchungsdatum': tag, 'buchungstext': f'Buchung {i}', 'konto_id': konto.id,
+                         'betrag_netto': netto, 'betrag_brutto': netto + mwst, 'mwst_satz': satz,
+                         'mwst_betrag': mwst, 'buchungs_art': 'einnahme' if einnahme else 'ausgabe',
+                         'ist_storniert': rng.random() < 0.02})
+        db.session.execute(Buchung.__table__.insert(), rows)
+        db.session.commit()
+
+        def messen(func):
+            zeiten = []
+            for _ in range(args.repeat):
+                db.session.expire_all()
+                start = time.perf_counter()
+                ergebnis = func()
+                zeiten.append(time.perf_counter() - start)
+            return ergebnis, min(zeiten)
+
+        legacy, legacy_seconds = messen(lambda: legacy_vergleich(JAHR))
+
+        # Erstaufbau: alle Monate beider Jahre als veraltet markiert (Core-INSERT oben)
+        start = time.perf_counter()
+        neu = BWAService().berechne_bwa_vergleich(JAHR)
+        build_seconds = time.perf_counter() - start
+        neu, neu_seconds = messen(lambda: BWAService().berechne_bwa_vergleich(JAHR))
+
+        ust_legacy_start = time.perf_counter()
+        for monat in range(1, 13):
+            Buchung.query.filter(Buchung.buchungsdatum >= date(JAHR, monat, 1),
+                                 Buchung.buchungsdatum <= date(JAHR, monat, calendar.monthrange(JAHR, monat)[1]),
+                                 Buchung.ist_storniert == False).all()
+        ust_legacy_seconds = time.perf_counter() - ust_legacy_start
+        service = UStService()
+        _, ust_seconds = messen(lambda: [service.berechne_voranmeldung(JAHR, monat=m) for m in range(1, 13)])
+
+        print(f"\n{args.bookings} Buchungen ({JAHR - 1}-{JAHR}), {len(konten)} Erfolgskonten\n")
+        print(f"{'Auswertung':38} {'bisher (s)':>11} {'Summen (s)':>11} {'Faktor':>8}")
+        print(f"{'BWA-Vergleich (12 Monate + 2 Jahre)':38} {legacy_seconds:>11.3f} {neu_seconds:>11.3f} "
+              f"{legacy_seconds / neu_seconds:>7.0f}x")
+        print(f"{'USt-VA 12 Monate (nur Laden bisher)':38} {ust_legacy_seconds:>11.3f} {ust_seconds:>11.3f} "
+              f"{ust_legacy_seconds / ust_seconds:>7.0f}x")
+        print(f"\nErstaufbau der Monatssummen (beide Jahre, GROUP BY): {build_seconds:.3f} s")
+
+        monate_legacy, jahr_legacy, vorjahr_legacy = legacy
+        monate_neu = [m['betriebsergebnis'] for m in neu['monate']]
+        if (monate_neu != monate_legacy or neu['jahressumme']['betriebsergebnis'] != jahr_legacy
+                or neu['vorjahr_summe']['betriebsergebnis'] != vorjahr_legacy):
+            print("[FEHLER] Ergebnisse weichen ab")
+            return 1
+        print("[OK] Betriebsergebnisse aller Monate und beider Jahre identisch")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
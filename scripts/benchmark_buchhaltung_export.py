@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: GoBD-/DATEV-Export (src/services/buchhaltung_export_service.py)
+Vergleicht den bisherigen Ablauf (alle Buchungen mit .all() laden, Dateien
+als Strings aufbauen, ZIP im BytesIO) mit dem Strom (yield_per, CSV-Bloecke
+direkt in den ZIP-Strom). Gemessen werden Laufzeit und Spitzen-Speicher
+(tracemalloc) fuer ein Geschaeftsjahr mit N Buchungen in einer temporaeren
+SQLite.
+
+Nutzung:
+    python scripts/benchmark_buchhaltung_export.py
+    python scripts/benchmark_buchhaltung_export.py --bookings 200000
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import sys
+import os
+import io
+import random
+import argparse
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from datetime import date
+from decimal import Decimal
+
+# Projektpfad hinzufuegen
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+JAHR = 2026
+
+
+def messen(func):
+    """(Ergebnis, Sekunden, Spitzen-Speicher in MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    ergebnis = func()
+    sekunden = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ergebnis, sekunden, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark GoBD/DATEV-Export: im Speicher gegen Strom')
+    parser.add_argument('--bookings', type=int, default=50000)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='stitchadmin_export_'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['JOB_QUEUE_WORKERS'] = '0'  # keine Worker-Threads im Benchmark-Prozess
+
+    from app import create_app
+    from src.models.models import db
+    from src.models.buchhaltung import BuchhaltungBuchung as Buchung, init_kontenplan, Konto
+    from src.services.buchhaltung_export_service import DATEVExporter, GoBDExporter, datev_query, gobd_query
+
+    app = create_app()
+    with app.app_context():
+        init_kontenplan()
+        konten = [k.id for k in Konto.query.all()]
+        rng = random.Random(7)
+        rows = []
+        for i in range(args.bookings):
+            netto = Decimal(rng.randint(500, 500000)) / 100
+            rows.append({'buchungsdatum': date(JAHR, rng.randint(1, 12), rng.randint(1, 28)),
+                         'buchungstext': f'Buchung {i} Stickerei Auftrag', 'belegnummer': f'RE-{i:07d}',
+                         'konto_id': rng.choice(konten), 'gegenkonto_id': rng.choice(konten),
+                         'soll_konto_id': rng.choice(konten), 'haben_konto_id': rng.choice(konten),
+                         'betrag_netto': netto, 'betrag_brutto': netto * Decimal('1.19'),
+                         'mwst_satz': Decimal('19'), 'mwst_betrag': netto * Decimal('0.19'),
+                         'buchungs_art': rng.choice(['einnahme', 'ausgabe']), 'ist_storniert': False})
+        db.session.execute(Buchung.__table__.insert(), rows)
+        db.session.commit()
+        del rows
+
+        def gobd_bisher():
+            buchungen = gobd_query(JAHR).all()
+            paket = GoBDExporter().export_gobd_paket(JAHR, buchungen, [], [])
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w') as zf:
+                for filename, content in paket.items():
+                    zf.writestr(filename, content)
+            return len(buffer.getvalue())
+
+        def gobd_strom():
+            return sum(len(chunk) for chunk in GoBDExporter().stream_gobd_paket(JAHR, gobd_query(JAHR), [], []))
+
+        von, bis = date(JAHR, 1, 1), date(JAHR, 12, 31)
+
+        def datev_bisher():
+            stream = DATEVExporter().stream_with_receipts(datev_query(von, bis).all(), von, bis)
+            return len(b''.join(stream))
+
+        def datev_strom():
+            return sum(len(chunk) for chunk in DATEVExporter().stream_with_receipts(datev_query(von, bis), von, bis))
+
+        print(f"\n{args.bookings} Buchungen ({JAHR})\n")
+        print(f"{'Export':24} {'bisher (s)':>11} {'Strom (s)':>10} {'bisher (MB)':>12} {'Strom (MB)':>11}")
+        for name, bisher, strom in [('GoBD-Paket', gobd_bisher, gobd_strom),
+                                    ('DATEV mit Belegen', datev_bisher, datev_strom)]:
+            db.session.expire_all()
+            groesse_bisher, s_bisher, mb_bisher = messen(bisher)
+            db.session.expire_all()
+            db.session.expunge_all()
+            groesse_strom, s_strom, mb_strom = messen(strom)
+            print(f"{name:24} {s_bisher:>11.2f} {s_strom:>10.2f} {mb_bisher:>12.1f} {mb_strom:>11.1f}"
+                  f"   (ZIP {groesse_strom / 1024 / 1024:.1f} MB)")
+            db.session.expunge_all()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
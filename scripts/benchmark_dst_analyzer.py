@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: DST-Analyse (src/utils/dst_analyzer.py)
+Vergleicht den vektorisierten Decoder mit der frueheren Byte-Schleife
+(drei Durchlaeufe) und prueft, dass beide identische Ergebnisse liefern.
+
+Korpus: alle *.dst-Dateien der angegebenen Verzeichnisse (Standard:
+static/uploads/designs und uploads) plus synthetische Designs.
+
+Nutzung:
+    python scripts/benchmark_dst_analyzer.py
+    python scripts/benchmark_dst_analyzer.py /pfad/zu/dsts --synthetic 100000 --repeat 5
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import sys
+import os
+import random
+import argparse
+import time
+
+# Projektpfad hinzufuegen
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.utils.dst_analyzer import (
+    decode_movement,
+    decode_dst_stitches,
+    stitch_info_from_decoded,
+    color_info_from_decoded,
+    dimension_info_from_decoded,
+)
+
+
+# ==========================================
+# REFERENZ: fruehere Byte-Schleifen
+# ==========================================
+
+def legacy_analyze(data):
+    """Fruehere Implementierung: drei getrennte Durchlaeufe pro Byte"""
+    from src.utils.dst_analyzer import classify_command
+
+    stitch = {'total_stitches': 0, 'normal_stitches': 0, 'jump_stitches': 0,
+              'move_stitches': 0, 'trim_count': 0, 'color_changes': 0, 'sequins': 0,
+              'stops': 0, 'unknown_commands': 0, 'total_length_mm': 0, 'commands': []}
+    counters = {'color_change': 'color_changes', 'trim': 'trim_count',
+                'sequin': 'sequins', 'stop': 'stops', 'unknown': 'unknown_commands'}
+    x = y = i = 0
+    while i < len(data) - 2:
+        b0, b1, b2 = data[i], data[i + 1], data[i + 2]
+        if b2 == 0xF3:
+            break
+        if b2 & 0xF0 == 0xF0:
+            cmd_type = classify_command(b0, b1, b2)
+            stitch['commands'].append({'type': cmd_type, 'position': i,
+                                       'bytes': [b0, b1, b2], 'x': x, 'y': y})
+            if cmd_type in counters:
+                stitch[counters[cmd_type]] += 1
+            i += 3
+            continue
+        dx, dy = decode_movement(b0, b1, b2)
+        x += dx
+        y += dy
+        stitch['total_length_mm'] += (dx ** 2 + dy ** 2) ** 0.5 / 10
+        if abs(dx) <= 121 and abs(dy) <= 121:
+            stitch['normal_stitches'] += 1
+        else:
+            stitch['jump_stitches'] += 1
+        stitch['total_stitches'] += 1
+        i += 3
+    if stitch['normal_stitches'] > 0:
+        stitch['avg_stitch_length_mm'] = round(stitch['total_length_mm'] / stitch['normal_stitches'], 2)
+
+    colors = {'color_sequence': [], 'color_positions': []}
+    x = y = i = current = 0
+    while i < len(data) - 2:
+        b0, b1, b2 = data[i], data[i + 1], data[i + 2]
+        if b2 == 0xF3:
+            break
+        if b2 & 0xF0 == 0xF0:
+            if b2 == 0xFE and b1 == 0xB0:
+                current += 1
+                colors['color_sequence'].append(current)
+                colors['color_positions'].append({'x': x, 'y': y, 'color': current})
+            i += 3
+            continue
+        dx, dy = decode_movement(b0, b1, b2)
+        x += dx
+        y += dy
+        i += 3
+    colors['estimated_colors'] = current + 1
+    colors['total_color_changes'] = current
+
+    min_x = min_y = float('inf')
+    max_x = max_y = float('-inf')
+    x = y = i = 0
+    while i < len(data) - 2:
+        b0, b1, b2 = data[i], data[i + 1], data[i + 2]
+        if b2 == 0xF3:
+            break
+        if b2 & 0xF0 != 0xF0:
+            dx, dy = decode_movement(b0, b1, b2)
+            x += dx
+            y += dy
+            min_x, max_x = min(min_x, x), max(max_x, x)
+            min_y, max_y = min(min_y, y), max(max_y, y)
+        i += 3
+    bbox = tuple(round(v / 10, 2) for v in (min_x, max_x, min_y, max_y))
+
+    return stitch, colors, bbox
+
+
+def vectorized_analyze(data):
+    """Aktuelle Implementierung: ein Decoder, Auswertung auf Arrays"""
+    stitches = decode_dst_stitches(data)
+    dims = dimension_info_from_decoded(stitches)
+    box = dims['bounding_box']
+    bbox = (box['min_x_mm'], box['max_x_mm'], box['min_y_mm'], box['max_y_mm'])
+    return stitch_info_from_decoded(stitches), color_info_from_decoded(stitches), bbox
+
+
+# ==========================================
+# KORPUS
+# ==========================================
+
+def synthetic_design(stitches, colors=12, seed=42):
+    """Design mit `stitches` Stichen, Spruengen, Trims und Farbwechseln"""
+    rng = random.Random(seed)
+    data = bytearray()
+    per_color = max(1, stitches // colors)
+    for n in range(stitches):
+        if n and n % per_color == 0:
+            data += bytes([0x00, 0x00, 0xFD])   # Trim
+            data += bytes([0x00, 0xB0, 0xFE])   # Farbwechsel
+        flags = rng.choice((0x03, 0x02, 0x01, 0x00, 0x83, 0x43))
+        data += bytes([rng.randint(0, 60), rng.randint(0, 60), flags])
+    data += bytes([0x00, 0x00, 0xF3])
+    return bytes(data)
+
+
+def load_corpus(directories, synthetic_sizes):
+    corpus = []
+    for directory in directories:
+        for root, _dirs, files in os.walk(directory):
+            for name in sorted(files):
+                if name.lower().endswith('.dst'):
+                    with open(os.path.join(root, name), 'rb') as f:
+                        corpus.append((name, f.read()[512:]))
+    for size in synthetic_sizes:
+        corpus.append((f'synthetic_{size}', synthetic_design(size)))
+    return corpus
+
+
+def _time(func, data, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DST-Analyse')
+    parser.add_argument('directories', nargs='*', default=[
+        os.path.join(BASE_DIR, 'static', 'uploads', 'designs'),
+        os.path.join(BASE_DIR, 'uploads'),
+    ])
+    parser.add_argument('--synthetic', type=int, nargs='*', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = load_corpus([d for d in args.directories if os.path.isdir(d)], args.synthetic)
+    if not corpus:
+        print("[WARN] Keine DST-Dateien gefunden")
+        return 1
+
+    print(f"{'Datei':40} {'Stiche':>8} {'alt ms':>10} {'neu ms':>10} {'Faktor':>8}  Ergebnis")
+    total_old = total_new = 0
+    mismatches = 0
+    for name, data in corpus:
+        identical = repr(legacy_analyze(data)) == repr(vectorized_analyze(data))
+        mismatches += not identical
+        old_ms = _time(legacy_analyze, data, args.repeat)
+        new_ms = _time(vectorized_analyze, data, args.repeat)
+        total_old += old_ms
+        total_new += new_ms
+        stitches = vectorized_analyze(data)[0]['total_stitches']
+        print(f"{name[:40]:40} {stitches:>8} {old_ms:>10.1f} {new_ms:>10.1f} "
+              f"{old_ms / max(new_ms, 1e-6):>7.1f}x  {'identisch' if identical else 'ABWEICHUNG'}")
+
+    print(f"{'Summe':40} {'':>8} {total_old:>10.1f} {total_new:>10.1f} "
+          f"{total_old / max(total_new, 1e-6):>7.1f}x")
+    if mismatches:
+        print(f"[FEHLER] {mismatches} Datei(en) mit abweichendem Ergebnis")
+        return 1
+    print("[OK] Alle Ergebnisse identisch")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
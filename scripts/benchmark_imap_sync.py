@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: IMAP-Sync (src/services/imap_sync_service.py)
+Vergleicht den bisherigen Abruf (SEARCH SINCE, ein RFC822-FETCH, eine
+Duplikat- und eine Kundenabfrage je Nachricht) mit dem inkrementellen
+UID-Sync (Header/Bodies in Bloecken, Duplikate per Set, Kunden-Map).
+Ein IMAP-Ersatz im Speicher liefert N Nachrichten und simuliert pro
+Befehl eine Netzwerk-Latenz (--rtt); Datenbank ist eine temporaere SQLite.
+
+Nutzung:
+    python scripts/benchmark_imap_sync.py
+    python scripts/benchmark_imap_sync.py --messages 5000 --rtt 5
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import sys
+import os
+import re
+import random
+import argparse
+import tempfile
+import time
+import email
+
+# Projektpfad hinzufuegen
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+SUBJECTS = ['Anfrage Poloshirts', 'Logo-Datei', 'Rechnung', 'Liefertermin?', 'Freigabe Stickmuster',
+            'Nachbestellung Caps', 'Angebot Vereinskleidung', 'Re: Korrektur']
+
+
+class LocalIMAP:
+    """IMAP-Ersatz: alte (search/fetch) und UID-Befehle, zaehlt Roundtrips"""
+
+    def __init__(self, messages, rtt_ms, uidvalidity=4711):
+        self.messages = messages  # {uid: raw}
+        self.uidvalidity = uidvalidity
+        self.rtt = rtt_ms / 1000
+        self.roundtrips = 0
+
+    def _roundtrip(self):
+        self.roundtrips += 1
+        time.sleep(self.rtt)
+
+    def select(self, folder):
+        self._roundtrip()
+        return 'OK', [str(len(self.messages)).encode()]
+
+    def response(self, code):
+        if code == 'UIDVALIDITY':
+            return code, [str(self.uidvalidity).encode()]
+        if code == 'UIDNEXT':
+            return code, [str(max(self.messages) + 1).encode()]
+        return code, [None]
+
+    def search(self, charset, criteria):
+        self._roundtrip()
+        return 'OK', [' '.join(str(uid) for uid in sorted(self.messages)).encode()]
+
+    def fetch(self, msg_id, items):
+        self._roundtrip()
+        raw = self.messages[int(msg_id)]
+        return 'OK', [(f'{int(msg_id)} (RFC822 {{{len(raw)}}}'.encode(), raw), b')']
+
+    def uid(self, command, *args):
+        self._roundtrip()
+        if command == 'SEARCH':
+            uids = sorted(self.messages)
+            match = re.match(r'UID (\d+):\*', args[1])
+            if match:
+                uids = [uid for uid in uids if uid >= int(match.group(1))] or uids[-1:]
+            return 'OK', [' '.join(str(uid) for uid in uids).encode()]
+        data = []
+        for uid in (int(part) for part in args[0].split(',')):
+            raw = self.messages[uid]
+            if 'HEADER.FIELDS' in args[1]:
+                raw = raw.split(b'\r\n\r\n')[0].split(b'\r\n')[0] + b'\r\n\r\n'
+            data += [(f'{uid} (UID {uid} BODY[] {{{len(raw)}}}'.encode(), raw), b')']
+        return 'OK', data
+
+    def logout(self):
+        pass
+
+
+def generate(count, customer_emails, start_uid=1, seed=7):
+    """Nachrichten; ~40% von Kunden, ~3% doppelte Message-IDs (kopierte Mails)"""
+    rng = random.Random(seed + start_uid)
+    messages = {}
+    for uid in range(start_uid, start_uid + count):
+        if uid > start_uid and rng.random() < 0.03:
+            message_id = f'<m{rng.randint(start_uid, uid - 1)}@mail.example.de>'
+        else:
+            message_id = f'<m{uid}@mail.example.de>'
+        sender = rng.choice(customer_emails) if rng.random() < 0.4 else f'info{uid}@lieferant.de'
+        body = ' '.join(rng.choice(SUBJECTS) for _ in range(rng.randint(20, 200)))
+        messages[uid] = (f'Message-ID: {message_id}\r\nFrom: Absender <{sender}>\r\n'
+                         f'To: info@stickerei.de\r\nSubject: {rng.choice(SUBJECTS)} {uid}\r\n'
+                         f'Date: Mon, 05 Oct 2026 10:00:00 +0200\r\n\r\n{body}\r\n').encode()
+    return messages
+
+
+def legacy_sync(service, account, conn):
+    """Bisheriger Ablauf von fetch_new_emails (zum Vergleich, ohne Limit)"""
+    from src.models.models import db
+    from src.models.document import ArchivedEmail
+
+    status, data = conn.search(None, '(SINCE "01-Oct-2026")')
+    fetched = duplicates = 0
+    for msg_id in data[0].split():
+        status, data = conn.fetch(msg_id, '(RFC822)')
+        msg = email.message_from_bytes(data[0][1])
+        message_id = msg.get('Message-ID', '')
+        if ArchivedEmail.query.filter_by(email_account_id=account.id, message_id=message_id).first():
+            duplicates += 1
+            continue
+        parsed = service._parse_email(msg)
+        db.session.add(ArchivedEmail(
+            email_account_id=account.id, message_id=message_id, subject=parsed['subject'][:500],
+            from_address=parsed['from'][:255], to_address=parsed['to'][:500],
+            body_text=parsed['body_text'], received_date=parsed['date'],
+            customer_id=service._auto_assign_customer(parsed['from'])))
+        fetched += 1
+        if fetched % 20 == 0:
+            db.session.flush()
+    db.session.commit()
+    return {'fetched': fetched, 'duplicates': duplicates}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark IMAP-Sync: bisher gegen inkrementell')
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--new', type=int, default=50, help='neue Nachrichten fuer den Folgelauf')
+    parser.add_argument('--customers', type=int, default=2000)
+    parser.add_argument('--rtt', type=float, default=2.0, help='Latenz je IMAP-Befehl in ms')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='stitchadmin_imap_'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['JOB_QUEUE_WORKERS'] = '0'  # keine Worker-Threads im Benchmark-Prozess
+
+    from app import create_app
+    from src.models.models import db, Customer
+    from src.models.document import EmailAccount, ArchivedEmail
+    from src.services.imap_sync_service import IMAPSyncService
+
+    app = create_app()
+    with app.app_context():
+        emails = [f'kunde{i}@example.de' for i in range(args.customers)]
+        db.session.execute(Customer.__table__.insert(), [
+            {'id': f'KD{i:05d}', 'customer_type': 'private', 'first_name': 'Kunde', 'last_name': str(i),
+             'email': emails[i].upper() if i % 3 == 0 else emails[i]} for i in range(args.customers)])
+        legacy_account = EmailAccount(name='Bisher', email_address='bisher@stickerei.de')
+        new_account = EmailAccount(name='UID-Sync', email_address='uid@stickerei.de')
+        db.session.add_all([legacy_account, new_account])
+        db.session.commit()
+
+        messages = generate(args.messages, emails)
+        service = IMAPSyncService()
+        runs = []
+
+        def run(label, account, server, func):
+            server.roundtrips = 0
+            start = time.perf_counter()
+            result = func()
+            runs.append((label, server.roundtrips, time.perf_counter() - start, result))
+
+        legacy_server = LocalIMAP(dict(messages), args.rtt)
+        new_server = LocalIMAP(dict(messages), args.rtt)
+        service.connect = lambda account: new_server if account.id == new_account.id else legacy_server
+
+        run('Erstabruf bisher', legacy_account, legacy_server,
+            lambda: legacy_sync(service, legacy_account, legacy_server))
+        run('Erstabruf UID-Sync', new_account, new_server,
+            lambda: service.fetch_new_emails(new_account.id, max_emails=args.messages))
+        run('Folgelauf ohne Neues (UID)', new_account, new_server,
+            lambda: service.fetch_new_emails(new_account.id, max_emails=args.messages))
+
+        extra = generate(args.new, emails, start_uid=args.messages + 1)
+        legacy_server.messages.update(extra)
+        new_server.messages.update(extra)
+        run(f'+{args.new} neue bisher', legacy_account, legacy_server,
+            lambda: legacy_sync(service, legacy_account, legacy_server))
+        run(f'+{args.new} neue UID-Sync', new_account, new_server,
+            lambda: service.fetch_new_emails(new_account.id, max_emails=args.messages))
+
+        print(f"\n{args.messages} Nachrichten, {args.customers} Kunden, {args.rtt} ms je IMAP-Befehl\n")
+        print(f"{'Lauf':30} {'Roundtrips':>10} {'Sekunden':>9} {'neu':>6} {'Duplikate':>9}")
+        for label, roundtrips, seconds, result in runs:
+            print(f"{label:30} {roundtrips:>10} {seconds:>9.2f} {result.get('fetched', 0):>6} "
+                  f"{result.get('duplicates', 0):>9}")
+
+        def archived(account):
+            return {(e.message_id, e.customer_id) for e in
+                    ArchivedEmail.query.filter_by(email_account_id=account.id)}
+
+        if archived(legacy_account) != archived(new_account):
+            print("[FEHLER] Archivierte Nachrichten oder Kundenzuordnung weichen ab")
+            return 1
+        print(f"\n[OK] Beide Verfahren archivieren dieselben Nachrichten "
+              f"({ArchivedEmail.query.filter_by(email_account_id=new_account.id).count()}) "
+              f"mit identischer Kundenzuordnung")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: L-Shop-Artikelimport (src/services/lshop_import_service.py)
+Vergleicht den bisherigen Ablauf (je Zeile zwei Abfragen, ORM-Objekt,
+Marke/Kategorie einzeln, Commit alle 50 Zeilen) mit dem Bulk-Import
+(Spalten mit pandas, Schluessel vorab, INSERT ... ON CONFLICT in Bloecken).
+Gemessen werden Zeilen pro Sekunde fuer Neuanlage und erneuten Import
+derselben Datei (Aktualisierung) in einer temporaeren SQLite.
+
+Nutzung:
+    python scripts/benchmark_import.py
+    python scripts/benchmark_import.py --rows 30000
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import sys
+import os
+import random
+import argparse
+import tempfile
+import time
+from datetime import datetime
+
+# Projektpfad hinzufuegen
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+MAPPING = {'supplier_article_number': 'Artikelnummer', 'name': 'Bezeichnung', 'manufacturer': 'Hersteller',
+           'category': 'Kategorie', 'color': 'Farbe', 'size': 'Groesse', 'single_price': 'Einzelpreis'}
+
+
+def beispiel_datei(prefix, rows):
+    """L-Shop-Liste mit rows Zeilen (Preise als Text mit Komma wie im Export)"""
+    import pandas as pd
+    rng = random.Random(7)
+    return pd.DataFrame({
+        'Artikelnummer': [f'{prefix}{i:06d}' for i in range(rows)],
+        'Bezeichnung': [f'Artikel {i} Baumwolle' for i in range(rows)],
+        'Hersteller': [f'Marke {rng.randint(1, 40)}' for _ in range(rows)],
+        'Kategorie': [f'Kategorie {rng.randint(1, 12)}' for _ in range(rows)],
+        'Farbe': [rng.choice(['Schwarz', 'Weiss', 'Navy', 'Rot']) for _ in range(rows)],
+        'Groesse': [rng.choice(['S', 'M', 'L', 'XL']) for _ in range(rows)],
+        'Einzelpreis': [f'{rng.randint(150, 4000) / 100:.2f}'.replace('.', ',') for _ in range(rows)],
+    })
+
+
+def legacy_import(service, df):
+    """Bisheriger Einzelimport (Kernteil von _import_single_articles)"""
+    from src.models import db, Article
+    from src.services.id_generator_service import IdGenerator
+
+    reserved = []
+    for count, (_, row) in enumerate(df.iterrows(), start=1):
+        data = {field: str(row[column]).strip() for field, column in MAPPING.items()}
+        art_nr = f"SA-{data['supplier_article_number']}"
+        article = Article.query.filter_by(supplier_article_number=data['supplier_article_number']).first()
+        if not article:
+            article = Article.query.filter_by(article_number=art_nr).first()
+        if article:
+            article.name = data['name']
+            article.color = data['color']
+            article.size = data['size']
+            article.updated_at = datetime.utcnow()
+        else:
+            if not reserved:
+                reserved = IdGenerator.articles(100)
+            brand = service.create_or_get_brand(data['manufacturer'])
+            category = service.create_or_get_category(data['category'])
+            article = Article(id=reserved.pop(0), article_number=art_nr,
+                              supplier_article_number=data['supplier_article_number'], name=data['name'],
+                              brand=data['manufacturer'], brand_id=brand.id, category=data['category'],
+                              category_id=category.id, color=data['color'], size=data['size'],
+                              purchase_price_single=service._safe_float(data['single_price']), supplier='L-Shop',
+                              active=True, stock=0, price=0, weight=0, created_by='Benchmark')
+            article.calculate_prices()
+            db.session.add(article)
+        if count % 50 == 0:
+            db.session.commit()
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark L-Shop-Import: je Zeile gegen Bulk-Upsert')
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='stitchadmin_import_'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['JOB_QUEUE_WORKERS'] = '0'  # keine Worker-Threads im Benchmark-Prozess
+
+    from app import create_app
+    from src.models import db, Article
+    from src.services.lshop_import_service import LShopImportService
+
+    app = create_app()
+    with app.app_context():
+        service = LShopImportService()
+
+        def messen(func):
+            db.session.expunge_all()
+            start = time.perf_counter()
+            func()
+            return args.rows / (time.perf_counter() - start)
+
+        legacy_df, bulk_df = beispiel_datei('ALT', args.rows), beispiel_datei('NEU', args.rows)
+        legacy_neu = messen(lambda: legacy_import(service, legacy_df))
+        legacy_update = messen(lambda: legacy_import(service, legacy_df))
+
+        service.df = bulk_df
+        ergebnisse = []
+        bulk_neu = messen(lambda: ergebnisse.append(service.import_articles(MAPPING)))
+        bulk_update = messen(lambda: ergebnisse.append(service.import_articles(MAPPING)))
+
+        print(f"\n{args.rows} Zeilen je Lauf\n")
+        print(f"{'Lauf':16} {'bisher (Zeilen/s)':>18} {'Bulk (Zeilen/s)':>16} {'Faktor':>8}")
+        for name, alt, neu in [('Neuanlage', legacy_neu, bulk_neu), ('Aktualisierung', legacy_update, bulk_update)]:
+            print(f"{name:16} {alt:>18.0f} {neu:>16.0f} {neu / alt:>7.0f}x")
+
+        neu_anzahl = Article.query.filter(Article.supplier_article_number.like('NEU%')).count()
+        if ergebnisse[0]['imported_count'] != args.rows or ergebnisse[1]['updated_count'] != args.rows \
+                or neu_anzahl != args.rows:
+            print(f"[FEHLER] Ergebnisse unvollstaendig: {ergebnisse[0]}, {ergebnisse[1]}")
+            return 1
+        print(f"[OK] {neu_anzahl} Artikel angelegt und aktualisiert, "
+              f"Fehler: {ergebnisse[0]['error_count'] + ergebnisse[1]['error_count']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Artikel-Uebersicht (src/services/list_query_service.py)
+Vergleicht den bisherigen Ablauf (alle gefilterten Artikel laden, vier
+DISTINCT-Abfragen je Aufruf) mit einer Keyset-Seite, load_only,
+gedeckelter Trefferzahl und zwischengespeicherten Filterwerten.
+Erzeugt einen Katalog in einer temporaeren SQLite.
+
+Nutzung:
+    python scripts/benchmark_list_queries.py
+    python scripts/benchmark_list_queries.py --articles 40000
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import sys
+import os
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+# Projektpfad hinzufuegen
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Artikel-Uebersicht: komplett gegen Keyset-Seite')
+    parser.add_argument('--articles', type=int, default=40000)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='stitchadmin_lists_'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['JOB_QUEUE_WORKERS'] = '0'  # keine Worker-Threads im Benchmark-Prozess
+
+    from sqlalchemy import insert
+    from app import create_app
+    from src.models.models import db, Article
+    from src.services.list_query_service import count_estimate, fetch_page, get_facets
+
+    app = create_app()
+    with app.app_context():
+        rows = [{
+            'id': f'ART{i:06d}', 'article_number': f'LS-{i:06d}', 'name': f'Poloshirt {i % 997} Farbe {i % 31}',
+            'category': f'Kategorie {i % 40}', 'brand': f'Marke {i % 120}', 'supplier': 'L-Shop',
+            'material': f'Material {i % 12}', 'description': 'Baumwolle, 180 g/m2 ' * 20,
+            'price': 9.5, 'stock': i % 50, 'active': True,
+        } for i in range(args.articles)]
+        for start in range(0, len(rows), 5000):
+            db.session.execute(insert(Article), rows[start:start + 5000])
+        db.session.commit()
+
+        def bisher():
+            articles = {a.id: a for a in Article.query.order_by(Article.name).all()}
+            for column in (Article.category, Article.brand, Article.supplier, Article.material):
+                db.session.query(column).distinct().filter(column.isnot(None), column != '').order_by(column).all()
+            return len(articles)
+
+        def seite():
+            page = fetch_page(Article.query, 'articles')
+            count_estimate(Article.query)
+            get_facets('articles')
+            return len(page.items)
+
+        def messen(func):
+            db.session.expunge_all()
+            tracemalloc.start()
+            t = time.perf_counter()
+            func()
+            dauer = (time.perf_counter() - t) * 1000
+            spitze = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+            return dauer, spitze
+
+        seite()  # Filterwerte einmal laden (wie nach dem ersten Aufruf)
+        print(f"\n{args.articles} Artikel\n")
+        print(f"{'Ablauf':26} {'Zeit (ms)':>10} {'Speicher (MB)':>14}")
+        for name, func in [('bisher (alles + DISTINCT)', bisher), ('Keyset-Seite', seite)]:
+            dauer, spitze = messen(func)
+            print(f"{name:26} {dauer:>10.1f} {spitze:>14.1f}")
+
+        # Alle Seiten zusammen ergeben den kompletten Katalog
+        gesehen, cursor = 0, None
+        while True:
+            page = fetch_page(Article.query, 'articles', cursor, 500)
+            gesehen += len(page.items)
+            db.session.expunge_all()
+            if not page.has_more:
+                break
+            cursor = page.next_cursor
+        if gesehen != args.articles:
+            print(f"[FEHLER] {gesehen} statt {args.articles} Artikel ueber alle Seiten")
+            return 1
+        print(f"[OK] Alle {gesehen} Artikel ueber Keyset-Seiten erreichbar")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
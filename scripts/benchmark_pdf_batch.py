@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: PDF-Batch (src/services/pdf_batch_service.py)
+Rendert N Rechnungen (optional mit ZUGFeRD-XML) und Packlisten mit 1, 2, 4
+und 8 Prozessen und gibt den Durchsatz in Dokumenten pro Sekunde aus.
+Die Testdaten sind reine Dicts - es wird keine Datenbank gebraucht.
+
+Nutzung:
+    python scripts/benchmark_pdf_batch.py
+    python scripts/benchmark_pdf_batch.py --docs 400 --workers 1 2 4 8 --zugferd
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import sys
+import os
+import random
+import argparse
+import time
+from datetime import date, timedelta
+
+# Projektpfad hinzufuegen
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+ARTICLES = ['Poloshirt navy', 'T-Shirt schwarz', 'Hoodie grau meliert', 'Softshelljacke',
+            'Cap royal', 'Arbeitshose', 'Schuerze', 'Handtuch weiss', 'Rucksack', 'Weste']
+SELLER = {
+    'name': 'Stickerei Muster GmbH', 'owner_name': 'Max Muster', 'street': 'Hauptstrasse 1',
+    'postcode': '12345', 'city': 'Musterstadt', 'country': 'DE', 'vat_id': 'DE123456789',
+    'tax_number': '12/345/67890', 'email': 'info@stickerei-muster.de', 'phone': '01234 5678',
+}
+
+
+def invoice_data(i, rng):
+    """Rechnungsdaten wie ZugpferdService._convert_rechnung_to_invoice_data"""
+    items = []
+    net = 0.0
+    for pos in range(1, rng.randint(2, 25) + 1):
+        quantity = rng.randint(1, 200)
+        unit_price = round(rng.uniform(2, 60), 2)
+        total_net = round(quantity * unit_price, 2)
+        net += total_net
+        items.append({
+            'position': pos, 'description': rng.choice(ARTICLES) + ' mit Logo-Stick',
+            'quantity': float(quantity), 'unit': 'Stk.', 'unit_price': unit_price, 'tax_rate': 19.0,
+            'total_net': total_net, 'total': round(total_net * 1.19, 2),
+            'rabatt_prozent': 0.0, 'rabatt_betrag': 0.0,
+        })
+    net = round(net, 2)
+    tax = round(net * 0.19, 2)
+    invoice_date = date(2026, 9, 1) + timedelta(days=i % 28)
+    buyer = {'name': f'Kunde {i:05d} GmbH', 'street': f'Ringstrasse {i % 90 + 1}', 'postcode': '54321',
+             'city': 'Kundenstadt', 'country': 'DE', 'vat_id': '', 'email': f'kunde{i}@example.de'}
+    return {
+        'logo_path': None, 'invoice_number': f'RE-2026-{i:05d}', 'invoice_date': invoice_date,
+        'delivery_date': invoice_date, 'due_date': invoice_date + timedelta(days=14),
+        'customer_number': f'KD{i:05d}', 'payment_reference': f'RE-2026-{i:05d}',
+        'payment_terms': 'Zahlbar innerhalb 14 Tagen', 'currency': 'EUR', 'items': items,
+        'seller': SELLER, 'buyer': buyer, 'recipient': buyer, 'sender': SELLER,
+        'subtotal': net, 'total_net': net, 'total_tax': tax, 'total_gross': round(net + tax, 2),
+        'taxes': [{'rate': 19.0, 'amount': tax, 'basis': net}], 'discount_amount': 0.0,
+        'discount_percent': 0.0, 'subject': f'Rechnung RE-2026-{i:05d}',
+        'bank_details': {'bank_name': 'Musterbank', 'iban': 'DE02120300000000202051', 'bic': 'BYLADEM1001'},
+        'created_by': 'Max Muster', 'footer_text': 'Vielen Dank fuer Ihren Auftrag!',
+    }
+
+
+def packing_list_data(i, rng):
+    """Packlistendaten wie pdf_workflow_helpers.build_packing_list_pdf_data"""
+    return {
+        'company_name': SELLER['name'], 'company_street': SELLER['street'],
+        'company_postcode': SELLER['postcode'], 'company_city': SELLER['city'], 'logo_path': None,
+        'packing_list_number': f'PL-2026-{i:05d}', 'created_at': date(2026, 9, 1),
+        'customer_name': f'Kunde {i:05d} GmbH', 'order_number': f'A2026-{i:05d}', 'carton_label': None,
+        'items': [{'name': rng.choice(ARTICLES), 'quantity': rng.randint(1, 50), 'size': 'L', 'color': 'navy'}
+                  for _ in range(rng.randint(1, 12))],
+        'customer_notes': None, 'packing_notes': 'Sorgfaeltig verpacken', 'total_weight': 4.2,
+        'package_length': 40, 'package_width': 30, 'package_height': 20,
+        'qc_performed': True, 'qc_by': 'pruefer', 'qc_date': None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark PDF-Batch (Durchsatz je Prozessanzahl)')
+    parser.add_argument('--docs', type=int, default=200, help='Dokumente je Lauf')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--zugferd', action='store_true', help='Rechnungen mit ZUGFeRD-XML (pikepdf)')
+    args = parser.parse_args()
+
+    from src.services.pdf_batch_service import render_many, merge_pdfs, shutdown_pool
+    from src.services.zugpferd_service import ZugpferdService
+
+    rng = random.Random(7)
+    if args.zugferd:
+        profil = ZugpferdService.PROFILE_BASIC
+        invoices = [('invoice_zugferd', (invoice_data(i, rng), profil)) for i in range(args.docs)]
+    else:
+        invoices = [('invoice', invoice_data(i, rng)) for i in range(args.docs)]
+    packing_lists = [('packing_list', packing_list_data(i, rng)) for i in range(args.docs)]
+
+    print(f"\n{args.docs} Dokumente je Lauf, {os.cpu_count()} CPU-Kerne\n")
+    print(f"{'Dokumente':22} {'Prozesse':>8} {'Sekunden':>9} {'Dok/s':>8} {'Faktor':>7} {'Fehler':>7}")
+
+    failures = 0
+    for label, jobs in (('Rechnungen' + (' (ZUGFeRD)' if args.zugferd else ''), invoices),
+                        ('Packlisten', packing_lists)):
+        baseline = None
+        for workers in args.workers:
+            render_many(jobs[:workers * 2], workers)  # Pool starten, Import/Fonts aufwaermen
+            start = time.perf_counter()
+            results = render_many(jobs, workers)
+            seconds = time.perf_counter() - start
+            errors = sum(1 for r in results if isinstance(r, Exception))
+            failures += errors
+            rate = len(jobs) / seconds
+            baseline = baseline or rate
+            print(f"{label:22} {workers:>8} {seconds:>9.2f} {rate:>8.1f} {rate / baseline:>6.2f}x {errors:>7}")
+        print()
+
+    start = time.perf_counter()
+    merged = merge_pdfs([r[0] for r in render_many(invoices, max(args.workers))])
+    print(f"Zusammenfuegen von {len(invoices)} Rechnungen: {time.perf_counter() - start:.2f}s "
+          f"inkl. Rendern, {len(merged) / 1024 / 1024:.1f} MB")
+    shutdown_pool()
+
+    if failures:
+        print(f"[FEHLER] {failures} Dokument(e) nicht gerendert")
+        return 1
+    print("[OK] Alle Dokumente gerendert")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Zahlungsabgleich (src/services/reconciliation_service.py)
+Erzeugt N offene Rechnungen und M Zahlungseingaenge (Nummer im
+Verwendungszweck in verschiedenen Schreibweisen, nur Betrag + Name,
+Sammelzahlungen, Fremdbuchungen) und vergleicht den bisherigen Abgleich
+(jede Transaktion gegen jede Rechnung) mit dem indizierten Abgleich.
+Der bisherige Abgleich laeuft nur auf einer Stichprobe und wird
+hochgerechnet. Ohne Datenbank.
+
+Nutzung:
+    python scripts/benchmark_reconciliation.py
+    python scripts/benchmark_reconciliation.py --invoices 5000 --transactions 10000 --sample 200
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import sys
+import os
+import random
+import argparse
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+# Projektpfad hinzufuegen
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+LAST_NAMES = ['Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner', 'Becker',
+              'Schulz', 'Hoffmann', 'Koch', 'Richter', 'Klein', 'Wolf', 'Schröder', 'Neumann']
+BUSINESS = ['Textil', 'Sport', 'Handwerk', 'Druckerei', 'Autohaus', 'Bäckerei', 'Praxis', 'Logistik']
+FORMS = ['GmbH', 'KG', 'e.K.', 'GmbH & Co. KG', '']
+
+
+def generate(invoice_count, tx_count, seed=7):
+    """Rechnungen und Transaktionen; truth = erwartete Rechnungs-IDs je Transaktion"""
+    rng = random.Random(seed)
+    customers = [f'{rng.choice(BUSINESS)} {rng.choice(LAST_NAMES)} {i} {rng.choice(FORMS)}'.strip()
+                 for i in range(invoice_count // 3)]
+    invoices = []
+    for i in range(1, invoice_count + 1):
+        # ~10% Standardbetraege (gleiche Betraege bei vielen Rechnungen)
+        amount = rng.choice([119, 238, 59.5]) if rng.random() < 0.1 else rng.randint(2000, 300000) / 100
+        amount = Decimal(str(amount)).quantize(Decimal('0.01'))
+        invoices.append(SimpleNamespace(id=i, rechnungsnummer=f'RE-2026-{i:05d}', brutto_gesamt=amount,
+                                        bezahlt_betrag=Decimal('0'), kunde_name=rng.choice(customers)))
+
+    transactions, truth = [], []
+    pool = list(invoices)
+    rng.shuffle(pool)
+    for _ in range(tx_count):
+        kind = rng.random()
+        if kind < 0.15 or len(pool) < 3:
+            # Fremdbuchung ohne passende Rechnung
+            transactions.append(SimpleNamespace(amount=Decimal(rng.randint(1, 5000)), purpose='Gutschrift Erstattung',
+                                                applicant_name=f'Privat {rng.randint(1, 10 ** 6)}'))
+            truth.append(())
+            continue
+        if kind < 0.25:
+            # Sammelzahlung fuer zwei Rechnungen, beide Nummern im Verwendungszweck
+            first, second = pool.pop(), pool.pop()
+            transactions.append(SimpleNamespace(
+                amount=first.brutto_gesamt + second.brutto_gesamt,
+                purpose=f'Rechnungen {first.rechnungsnummer}, {second.rechnungsnummer}',
+                applicant_name=first.kunde_name.upper()))
+            truth.append((first.id, second.id))
+            continue
+        invoice = pool.pop()
+        number = invoice.rechnungsnummer
+        purpose = rng.choice([number, number.replace('-', ' '), number.replace('-', ''),
+                              f'RG {number[3:].replace("-", "/")}', 'Zahlung Auftrag'])
+        transactions.append(SimpleNamespace(amount=invoice.brutto_gesamt, purpose=f'{purpose} Kd-Nr. 4711',
+                                            applicant_name=invoice.kunde_name.upper()))
+        truth.append((invoice.id,))
+    return invoices, transactions, truth
+
+
+def legacy_confidence(tx, rechnung):
+    """Bisherige Bewertung aus BankSyncService._calc_match_confidence"""
+    confidence = 0
+    if rechnung.brutto_gesamt and abs(tx.amount - rechnung.brutto_gesamt) <= Decimal('0.01'):
+        confidence += 35
+    if rechnung.rechnungsnummer and rechnung.rechnungsnummer.upper() in (tx.purpose or '').upper():
+        confidence += 50
+    if tx.applicant_name and rechnung.kunde_name:
+        name_upper, app_upper = rechnung.kunde_name.upper(), tx.applicant_name.upper()
+        if name_upper in app_upper or app_upper in name_upper:
+            confidence += 15
+    return min(confidence, 100)
+
+
+def legacy_match(transactions, invoices):
+    results = []
+    for tx in transactions:
+        best, best_confidence = None, 0
+        for rechnung in invoices:
+            confidence = legacy_confidence(tx, rechnung)
+            if confidence > best_confidence:
+                best, best_confidence = rechnung, confidence
+        results.append((best.id,) if best and best_confidence >= 80 else ())
+    return results
+
+
+def quality(results, truth):
+    """Korrekte, falsche und verpasste automatische Zuordnungen"""
+    correct = sum(1 for got, want in zip(results, truth) if got and got == want)
+    wrong = sum(1 for got, want in zip(results, truth) if got and got != want)
+    missed = sum(1 for got, want in zip(results, truth) if want and not got)
+    return correct, wrong, missed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Zahlungsabgleich: bisher gegen indiziert')
+    parser.add_argument('--invoices', type=int, default=5000)
+    parser.add_argument('--transactions', type=int, default=10000)
+    parser.add_argument('--sample', type=int, default=200, help='Transaktionen fuer den bisherigen Abgleich')
+    args = parser.parse_args()
+
+    from src.services.reconciliation_service import AUTO_CONFIDENCE, ReconciliationEngine
+
+    invoices, transactions, truth = generate(args.invoices, args.transactions)
+    print(f"\n{args.invoices} offene Rechnungen, {args.transactions} Zahlungseingaenge\n")
+
+    sample = transactions[:args.sample]
+    start = time.perf_counter()
+    legacy_results = legacy_match(sample, invoices)
+    legacy_seconds = time.perf_counter() - start
+    legacy_rate = len(sample) / legacy_seconds
+
+    start = time.perf_counter()
+    engine = ReconciliationEngine(invoices)
+    index_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    results = []
+    for tx in transactions:
+        match = engine.match(tx.amount, tx.purpose, tx.applicant_name)
+        auto = match is not None and match.confidence >= AUTO_CONFIDENCE
+        results.append(tuple(r.id for r in match.invoices) if auto else ())
+    match_seconds = time.perf_counter() - start
+    rate = len(transactions) / match_seconds
+
+    print(f"{'Verfahren':28} {'Tx/s':>10} {'Sekunden (alle)':>16} {'Paare bewertet':>16}")
+    print(f"{'bisher (Stichprobe ' + str(len(sample)) + ')':28} {legacy_rate:>10.0f} "
+          f"{args.transactions / legacy_rate:>15.1f}* {args.transactions * args.invoices:>16}")
+    print(f"{'indiziert':28} {rate:>10.0f} {index_seconds + match_seconds:>16.2f} {engine.pairs_scored:>16}")
+    print(f"\n* hochgerechnet; Index aufgebaut in {index_seconds * 1000:.0f} ms, "
+          f"Faktor {legacy_rate and rate / legacy_rate:.0f}x\n")
+
+    print(f"{'Auto-Zuordnung':28} {'korrekt':>10} {'falsch':>10} {'verpasst':>10}")
+    print(f"{'bisher (Stichprobe)':28} {'%10d %10d %10d' % quality(legacy_results, truth[:len(sample)])}")
+    print(f"{'indiziert (Stichprobe)':28} {'%10d %10d %10d' % quality(results[:len(sample)], truth[:len(sample)])}")
+    correct, wrong, missed = quality(results, truth)
+    print(f"{'indiziert (alle)':28} {correct:>10} {wrong:>10} {missed:>10}")
+
+    if wrong:
+        print(f"[FEHLER] {wrong} falsche automatische Zuordnung(en)")
+        return 1
+    print("[OK] Keine falschen automatischen Zuordnungen")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
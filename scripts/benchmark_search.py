@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Suchindex (src/services/search_service.py) gegen ILIKE
+Legt eine temporaere SQLite-Datenbank mit je N Kunden, Artikeln, Lieferanten
+und Auftraegen an, baut den Suchindex auf und vergleicht die Suche beim
+Tippen (20 Treffer, Index nach Relevanz sortiert) und die Listenansichten
+(alle Treffer) mit der bisherigen ILIKE-Suche. Fuer Suchen mit einem Wort
+wird geprueft, dass beide dieselben Treffer liefern.
+
+Nutzung:
+    python scripts/benchmark_search.py
+    python scripts/benchmark_search.py --rows 50000 --repeat 5
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import sys
+import os
+import random
+import argparse
+import tempfile
+import time
+
+# Projektpfad hinzufuegen
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+FIRST_NAMES = ['Anna', 'Jürgen', 'Max', 'Sabine', 'Thomas', 'Petra', 'Michael', 'Claudia',
+               'Stefan', 'Monika', 'Andreas', 'Katrin', 'Frank', 'Julia', 'Markus', 'Özlem']
+LAST_NAMES = ['Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner', 'Becker',
+              'Schulz', 'Hoffmann', 'Koch', 'Richter', 'Klein', 'Wolf', 'Schröder', 'Neumann']
+COMPANY_WORDS = ['Stickerei', 'Textil', 'Sport', 'Verein', 'Handwerk', 'Druckerei', 'Autohaus',
+                 'Bäckerei', 'Praxis', 'Logistik', 'Werbetechnik', 'Feuerwehr']
+CITIES = ['Berlin', 'Hamburg', 'München', 'Köln', 'Frankfurt', 'Stuttgart', 'Düsseldorf',
+          'Leipzig', 'Dortmund', 'Essen', 'Bremen', 'Dresden', 'Hannover', 'Nürnberg']
+ARTICLE_WORDS = ['Poloshirt', 'T-Shirt', 'Hoodie', 'Softshelljacke', 'Cap', 'Fleecejacke',
+                 'Arbeitshose', 'Schürze', 'Handtuch', 'Rucksack', 'Sweatshirt', 'Weste']
+COLORS = ['schwarz', 'weiß', 'navy', 'rot', 'royal', 'grau meliert', 'flaschengrün', 'gelb']
+BRANDS = ['Stanley/Stella', 'Fruit of the Loom', 'Gildan', 'James & Nicholson', 'Russell']
+
+QUERIES = ['müller', 'stick', 'KD0123', 'poloshirt', 'navy', 'münchen', 'ART01',
+           'schmidt textil', 'hoodie schwarz', 'mu']
+
+
+def generate(rows, seed=7):
+    """Testdaten fuer alle vier Entities (Dicts fuer Core-Inserts)"""
+    rng = random.Random(seed)
+    customers, suppliers, articles, orders = [], [], [], []
+    for i in range(1, rows + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        business = rng.random() < 0.4
+        customers.append({
+            'id': f'KD{i:05d}', 'customer_number': f'KD{i:05d}',
+            'customer_type': 'business' if business else 'private',
+            'first_name': first, 'last_name': last,
+            'company_name': f'{rng.choice(COMPANY_WORDS)} {last} GmbH' if business else None,
+            'email': f'{first.lower()}.{last.lower()}{i}@example.de',
+            'phone': f'0{rng.randint(30, 999)} {rng.randint(100000, 9999999)}',
+            'city': rng.choice(CITIES), 'is_active': True,
+        })
+        suppliers.append({
+            'id': f'LF{i:05d}', 'name': f'{rng.choice(COMPANY_WORDS)} {last} {rng.choice(CITIES)}',
+            'contact_person': f'{first} {last}', 'email': f'einkauf{i}@lieferant.de', 'active': True,
+        })
+        word = rng.choice(ARTICLE_WORDS)
+        color = rng.choice(COLORS)
+        articles.append({
+            'id': f'ART{i:05d}', 'article_number': f'{rng.randint(10, 99)}-{i:05d}',
+            'supplier_article_number': f'S{rng.randint(10000, 999999)}',
+            'name': f'{word} {color}', 'description': f'{word} von {rng.choice(BRANDS)} in {color}',
+            'supplier': rng.choice(BRANDS), 'active': True,
+        })
+        orders.append({
+            'id': f'A2026-{i:05d}', 'order_number': f'A2026-{i:05d}',
+            'customer_id': f'KD{rng.randint(1, rows):05d}',
+            'description': f'{rng.randint(5, 200)}x {word} mit Logo',
+        })
+    return customers, suppliers, articles, orders
+
+
+def _best(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Suchindex gegen ILIKE')
+    parser.add_argument('--rows', type=int, default=50000, help='Datensaetze je Entity')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='stitchadmin_search_'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    from app import create_app
+    from src.models.models import db, Customer, Supplier, Article, Order
+    from src.services.search_service import apply_search, ilike_clause, rebuild_search_index
+
+    app = create_app()
+    entities = {'customers': Customer, 'articles': Article, 'orders': Order, 'suppliers': Supplier}
+
+    with app.app_context():
+        print(f"\nTestdaten: {args.rows} Datensaetze je Entity ({db_path})")
+        customers, suppliers, articles, orders = generate(args.rows)
+        for model, rows in ((Customer, customers), (Supplier, suppliers),
+                            (Article, articles), (Order, orders)):
+            db.session.execute(model.__table__.insert(), rows)
+        db.session.commit()
+
+        start = time.perf_counter()
+        counts = rebuild_search_index()
+        print(f"[OK] Suchindex aufgebaut in {(time.perf_counter() - start):.1f}s "
+              f"({', '.join(f'{k}={v}' for k, v in counts.items())})\n")
+
+        print(f"{'':38} {'-- Tippen (20) --':>19}  {'-- Liste (alle) --':>19}")
+        print(f"{'Entity':10} {'Suche':18} {'Treffer':>8} {'ILIKE':>9} {'Index':>9}  "
+              f"{'ILIKE':>9} {'Index':>9}  Ergebnis")
+        mismatches = 0
+        totals = {'typing': [0, 0], 'list': [0, 0]}  # ILIKE, Index
+        worst = {'typing': [0, 0], 'list': [0, 0]}
+        for key, model in entities.items():
+            for text in QUERIES:
+                timings = {
+                    'typing': (
+                        _best(lambda: model.query.filter(ilike_clause(key, text)).limit(20).all(),
+                              args.repeat)[0],
+                        _best(lambda: apply_search(model.query, key, text, ranked=True)
+                              .limit(20).all(), args.repeat)[0]),
+                    'list': (
+                        _best(lambda: model.query.filter(ilike_clause(key, text)).all(),
+                              args.repeat)[0],
+                        _best(lambda: apply_search(model.query, key, text).all(), args.repeat)[0]),
+                }
+                for mode, (old_ms, new_ms) in timings.items():
+                    totals[mode][0] += old_ms
+                    totals[mode][1] += new_ms
+                    worst[mode] = [max(worst[mode][0], old_ms), max(worst[mode][1], new_ms)]
+
+                old_ids = {r.id for r in model.query.filter(ilike_clause(key, text))}
+                new_ids = {r.id for r in apply_search(model.query, key, text)}
+                if len(text.split()) == 1:
+                    identical = old_ids == new_ids
+                    verdict = 'identisch' if identical else 'ABWEICHUNG'
+                    mismatches += not identical
+                else:
+                    verdict = 'mehrere Woerter'
+                print(f"{key:10} {text[:18]:18} {len(new_ids):>8} "
+                      f"{timings['typing'][0]:>9.2f} {timings['typing'][1]:>9.2f}  "
+                      f"{timings['list'][0]:>9.2f} {timings['list'][1]:>9.2f}  {verdict}")
+
+        print(f"{'Summe ms':10} {'':18} {'':>8} {totals['typing'][0]:>9.1f} {totals['typing'][1]:>9.1f}  "
+              f"{totals['list'][0]:>9.1f} {totals['list'][1]:>9.1f}")
+        print(f"{'Maximum ms':10} {'':18} {'':>8} {worst['typing'][0]:>9.1f} {worst['typing'][1]:>9.1f}  "
+              f"{worst['list'][0]:>9.1f} {worst['list'][1]:>9.1f}")
+
+    if mismatches:
+        print(f"[FEHLER] {mismatches} Suche(n) mit abweichenden Treffern")
+        return 1
+    print("[OK] Treffer bei Suchen mit einem Wort identisch")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Shelly-Energieabfragen (src/services/shelly_rollup_service.py)
+Vergleicht den bisherigen Ablauf (Dashboard laedt je Geraet alle heutigen
+Rohwerte, Energie eines Zeitraums aus den Rohwerten) mit den Stunden-/
+Tageswerten. Erzeugt Minutenwerte fuer mehrere Maschinen in einer
+temporaeren SQLite.
+
+Nutzung:
+    python scripts/benchmark_shelly_rollups.py
+    python scripts/benchmark_shelly_rollups.py --devices 15 --days 30
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import sys
+import os
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Projektpfad hinzufuegen
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Shelly: Rohwerte gegen Rollups')
+    parser.add_argument('--devices', type=int, default=15)
+    parser.add_argument('--days', type=int, default=7)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='stitchadmin_shelly_'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['JOB_QUEUE_WORKERS'] = '0'  # keine Worker-Threads im Benchmark-Prozess
+
+    from sqlalchemy import insert
+    from app import create_app
+    from src.models.models import db, ShellyDevice, ShellyEnergyReading
+    from src.services.shelly_rollup_service import apply_readings, energy_between, today_rollups
+
+    app = create_app()
+    with app.app_context():
+        devices = [ShellyDevice(name=f'Maschine {i}', ip_address=f'10.7.0.{i}') for i in range(1, args.devices + 1)]
+        db.session.add_all(devices)
+        db.session.commit()
+        ids = [d.id for d in devices]
+
+        # Minutenwerte, je Messrunde wie record_readings (Rollups + ein INSERT)
+        end = datetime.utcnow().replace(second=0, microsecond=0)
+        start = end - timedelta(days=args.days)
+        ticks = args.days * 24 * 60
+        t = time.perf_counter()
+        for block in range(0, ticks, 60):
+            rows = [{'device_id': device_id, 'timestamp': start + timedelta(minutes=m), 'power_w': 400.0 + m % 50,
+                     'energy_wh': m * 7.0, 'is_on': m % 90 < 60}
+                    for m in range(block, min(block + 60, ticks)) for device_id in ids]
+            apply_readings(rows)
+            db.session.execute(insert(ShellyEnergyReading), rows)
+            db.session.commit()
+        schreiben = time.perf_counter() - t
+        anzahl = ticks * args.devices
+
+        def bisher_dashboard():
+            today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            for device_id in ids:
+                readings = ShellyEnergyReading.query.filter(
+                    ShellyEnergyReading.device_id == device_id,
+                    ShellyEnergyReading.timestamp >= today_start).all()
+                if len(readings) > 1:
+                    max(r.energy_wh or 0 for r in readings) - min(r.energy_wh or 0 for r in readings)
+
+        def bisher_zeitraum():
+            for device_id in ids:
+                readings = ShellyEnergyReading.query.filter(
+                    ShellyEnergyReading.device_id == device_id,
+                    ShellyEnergyReading.timestamp >= start + timedelta(hours=5),
+                    ShellyEnergyReading.timestamp < end - timedelta(hours=3)).all()
+                sum(r.power_w or 0 for r in readings)
+
+        def rollup_zeitraum():
+            for device_id in ids:
+                energy_between(device_id, start + timedelta(hours=5), end - timedelta(hours=3))
+
+        def messen(func):
+            db.session.expunge_all()
+            t = time.perf_counter()
+            func()
+            return (time.perf_counter() - t) * 1000
+
+        print(f"\n{anzahl} Messwerte ({args.devices} Geraete, {args.days} Tage), "
+              f"geschrieben mit Rollups in {schreiben:.1f}s ({anzahl / schreiben:.0f}/s)\n")
+        print(f"{'Abfrage':22} {'bisher (ms)':>12} {'Rollups (ms)':>13}")
+        for name, alt, neu in [
+            ('Dashboard heute', bisher_dashboard, lambda: today_rollups(ids)),
+            (f'Zeitraum {args.days} Tage', bisher_zeitraum, rollup_zeitraum),
+        ]:
+            print(f"{name:22} {messen(alt):>12.1f} {messen(neu):>13.1f}")
+
+        summe = energy_between(ids[0], start, end + timedelta(minutes=1))
+        erwartet = round((ticks - 1) * 7 / 1000, 3)
+        if summe['energy_kwh'] != erwartet:
+            print(f"[FEHLER] Energie {summe['energy_kwh']} kWh statt {erwartet} kWh")
+            return 1
+        print(f"[OK] Energie je Geraet {summe['energy_kwh']} kWh, Laufzeit {summe['on_hours']} h")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Lieferanten-Preislisten lesen (src/services/table_reader_service.py)
+Vergleicht den bisherigen Ablauf mit dem gestreamten Leser:
+
+- Excel: bisher je Header-Kandidat die ganze Mappe in einen DataFrame
+  (wie pd.read_excel, hier nachgebildet - pandas verlangt eine neuere
+  openpyxl), danach Import aus dem vollen DataFrame; neu ein Durchlauf
+  mit openpyxl read_only und Bloecke zu READ_CHUNK_ROWS Zeilen
+- CSV: bisher Upload als Bytes, ganzer Text dekodiert, bis zu 100000
+  Zeilen als Dict-Liste; neu Kopie auf die Platte, Layout aus einem
+  Durchlauf, Bloecke
+
+Gemessen werden Laufzeit und Spitzen-Speicher (tracemalloc).
+
+Nutzung:
+    python scripts/benchmark_table_reader.py
+    python scripts/benchmark_table_reader.py --rows 200000
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import sys
+import os
+import io
+import csv
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+# Projektpfad hinzufuegen
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+HEADER = ['Art. Nr.', 'Bezeichnung', 'Marke', 'Kategorie', 'Farbe', 'Groesse', 'Einzelpreis', 'Kartonpreis',
+          'EAN', 'Beschreibung']
+
+
+def zeile(i):
+    return [f'LS{i:07d}', f'T-Shirt Baumwolle {i}', f'Marke {i % 40}', f'Kategorie {i % 12}',
+            ['Schwarz', 'Weiss', 'Navy'][i % 3], ['S', 'M', 'L', 'XL'][i % 4], 2.5 + i % 300 / 10,
+            2.1 + i % 300 / 10, f'42601{i:08d}', 'Klassisches Shirt, 150 g/m2, ringgesponnen']
+
+
+def messen(func):
+    """(Ergebnis, Sekunden, Spitzen-Speicher in MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    ergebnis = func()
+    sekunden = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ergebnis, sekunden, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Preislisten: ganz laden gegen Strom')
+    parser.add_argument('--rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    import pandas as pd
+    from openpyxl import Workbook, load_workbook
+    from src.services.table_reader_service import iter_chunks, sniff_layout
+
+    tmp = tempfile.mkdtemp(prefix='stitchadmin_reader_')
+    xlsx_path, csv_path = os.path.join(tmp, 'preisliste.xlsx'), os.path.join(tmp, 'preisliste.csv')
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(['L-Shop GmbH'])
+    sheet.append(['Stand 01/2026'])
+    sheet.append(HEADER)
+    for i in range(args.rows):
+        sheet.append(zeile(i))
+    workbook.save(xlsx_path)
+    with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(HEADER)
+        for i in range(args.rows):
+            writer.writerow(zeile(i))
+
+    def excel_bisher():
+        # Header-Suche: je Kandidat die ganze Mappe (hier Zeile 2 -> drei Durchlaeufe)
+        for header_row in range(3):
+            wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+            rows = list(wb.worksheets[0].iter_rows(values_only=True))
+            wb.close()
+            kopf = list(rows[header_row]) + [None] * (len(HEADER) - len(rows[header_row]))
+            df = pd.DataFrame(rows[header_row + 1:], columns=[str(c) for c in kopf])
+        return len(df)
+
+    def excel_strom():
+        layout = sniff_layout(xlsx_path)
+        return sum(len(chunk) for chunk in iter_chunks(xlsx_path, layout))
+
+    def csv_bisher():
+        with open(csv_path, 'rb') as f:
+            content = f.read()  # Upload als Bytes
+        text = content.decode('utf-8')
+        text.count('\n')
+        rows = list(csv.DictReader(io.StringIO(text), delimiter=';'))[:100000]
+        return len(rows)
+
+    def csv_strom():
+        layout = sniff_layout(csv_path)
+        return sum(len(chunk) for chunk in iter_chunks(csv_path, layout))
+
+    print(f"\n{args.rows} Zeilen (xlsx {os.path.getsize(xlsx_path) / 1024 / 1024:.1f} MB, "
+          f"csv {os.path.getsize(csv_path) / 1024 / 1024:.1f} MB)\n")
+    print(f"{'Datei':8} {'bisher (s)':>11} {'Strom (s)':>10} {'bisher (MB)':>12} {'Strom (MB)':>11}")
+    for name, bisher, strom in [('Excel', excel_bisher, excel_strom), ('CSV', csv_bisher, csv_strom)]:
+        n_bisher, s_bisher, mb_bisher = messen(bisher)
+        n_strom, s_strom, mb_strom = messen(strom)
+        print(f"{name:8} {s_bisher:>11.2f} {s_strom:>10.2f} {mb_bisher:>12.1f} {mb_strom:>11.1f}")
+        if n_strom != args.rows:
+            print(f"[FEHLER] {name}: {n_strom} statt {args.rows} Zeilen gelesen")
+            return 1
+    print(f"[OK] Alle {args.rows} Zeilen gelesen")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Vorwaermen: Analyse-Cache fuer das Design-Archiv
+Analysiert alle Stickdateien des Design-Archivs einmal und legt die
+Ergebnisse im Analyse-Cache ab (z.B. nach einem Update mit neuer
+Analyzer-Version oder nach einem Archiv-Import).
+
+Nutzung:
+    python scripts/prewarm_analysis_cache.py
+    python scripts/prewarm_analysis_cache.py --limit 500
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import sys
+import os
+import argparse
+import time
+
+# Projektpfad hinzufuegen
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from src.services.analysis_cache_service import (
+    prewarm_design_archive,
+    get_analysis_cache_stats,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyse-Cache vorwaermen')
+    parser.add_argument('--limit', type=int, default=None, help='maximale Anzahl Designs')
+    args = parser.parse_args()
+
+    print("\n" + "=" * 60)
+    print("Vorwaermen: Analyse-Cache fuer das Design-Archiv")
+    print("=" * 60)
+
+    app = create_app()
+
+    with app.app_context():
+        print(f"\nCache: {app.config.get('ANALYSIS_CACHE_DIR')}")
+
+        def _progress(done, total):
+            if done % 100 == 0 or done == total:
+                print(f"  {done}/{total} Designs")
+
+        start = time.perf_counter()
+        report = prewarm_design_archive(limit=args.limit, progress=_progress)
+        duration = time.perf_counter() - start
+
+        stats = get_analysis_cache_stats()
+        print(f"\n[OK] {report['designs']} Designs in {duration:.1f}s")
+        print(f"  Neu analysiert:  {report['analyzed']}")
+        print(f"  Bereits im Cache: {report['cached']}")
+        if report['missing']:
+            print(f"[WARN] Datei fehlt: {report['missing']}")
+        if report['failed']:
+            print(f"[WARN] Fehlgeschlagen: {report['failed']}")
+        print(f"[INFO] Treffer: {stats['hits']}, Fehlzugriffe: {stats['misses']}, "
+              f"gespeichert: {stats['stores']}")
+
+    return 0 if not report['failed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
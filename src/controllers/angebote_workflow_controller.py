@@ -21,6 +21,7 @@ import io
 
 from src.models import db
 from src.models.models import Customer, Article, Order
+from src.services.pdf_store_service import get_pdf, not_modified_response, pdf_response, send_pdf
 
 # Document-Workflow Models
 try:
@@ -552,30 +553,15 @@ def pdf_generieren(id):
     angebot = BusinessDocument.query.get_or_404(id)
     
     try:
-        pdf_bytes = generiere_angebot_pdf(angebot)
+        cached = not_modified_response(angebot, 'angebot')
+        if cached:
+            return cached
         
-        # PDF speichern
-        pdf_dir = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'pdfs', 'angebote')
-        os.makedirs(pdf_dir, exist_ok=True)
+        # Finalisiert: aus dem PDF-Store
+        pdf = get_pdf(angebot, 'angebot', lambda: generiere_angebot_pdf(angebot))
+        pdf_filename = os.path.basename(_pdf_ablegen(angebot, pdf))
         
-        pdf_filename = f"{angebot.dokument_nummer.replace('/', '-')}.pdf"
-        pdf_path = os.path.join(pdf_dir, pdf_filename)
-        
-        with open(pdf_path, 'wb') as f:
-            f.write(pdf_bytes)
-        
-        # Pfad im Dokument speichern
-        angebot.pdf_pfad = pdf_path
-        angebot.pdf_erstellt_am = datetime.utcnow()
-        db.session.commit()
-        
-        # Download
-        return send_file(
-            io.BytesIO(pdf_bytes),
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=pdf_filename
-        )
+        return send_pdf(pdf, download_name=pdf_filename, as_attachment=True)
         
     except Exception as e:
         logger.error(f"Fehler bei PDF-Generierung: {e}")
@@ -591,13 +577,8 @@ def pdf_vorschau(id):
     angebot = BusinessDocument.query.get_or_404(id)
     
     try:
-        pdf_bytes = generiere_angebot_pdf(angebot)
-        
-        return send_file(
-            io.BytesIO(pdf_bytes),
-            mimetype='application/pdf',
-            as_attachment=False
-        )
+        # Finalisiert: aus dem PDF-Store
+        return pdf_response(angebot, 'angebot', lambda: generiere_angebot_pdf(angebot))
         
     except Exception as e:
         logger.error(f"Fehler bei PDF-Vorschau: {e}")
@@ -605,6 +586,31 @@ def pdf_vorschau(id):
         return redirect(url_for('angebote_workflow.show', id=id))
 
 
+def _pdf_ablegen(angebot, pdf):
+    """
+    PDF unter uploads/pdfs/angebote speichern und im Dokument vermerken -
+    bei einem Treffer aus dem PDF-Store nur, wenn die Datei fehlt.
+    """
+    if pdf.from_store and angebot.pdf_pfad and os.path.exists(angebot.pdf_pfad):
+        return angebot.pdf_pfad
+    
+    pdf_dir = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'pdfs', 'angebote')
+    os.makedirs(pdf_dir, exist_ok=True)
+    
+    pdf_filename = f"{angebot.dokument_nummer.replace('/', '-')}.pdf"
+    pdf_path = os.path.join(pdf_dir, pdf_filename)
+    
+    with open(pdf_path, 'wb') as f:
+        f.write(pdf.data)
+    
+    # Pfad im Dokument speichern
+    angebot.pdf_pfad = pdf_path
+    angebot.pdf_erstellt_am = datetime.utcnow()
+    angebot.pdf_hash = pdf.etag
+    db.session.commit()
+    return pdf_path
+
+
 def generiere_angebot_pdf(angebot):
     """
     Generiert PDF für ein Angebot
@@ -834,21 +840,9 @@ def email_senden(id):
             betreff = request.form.get('betreff')
             nachricht = request.form.get('nachricht')
             
-            # PDF generieren falls nicht vorhanden
+            # PDF generieren falls nicht vorhanden (finalisiert: aus dem PDF-Store)
             if not angebot.pdf_pfad or not os.path.exists(angebot.pdf_pfad):
-                pdf_bytes = generiere_angebot_pdf(angebot)
-                
-                pdf_dir = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'pdfs', 'angebote')
-                os.makedirs(pdf_dir, exist_ok=True)
-                
-                pdf_filename = f"{angebot.dokument_nummer.replace('/', '-')}.pdf"
-                pdf_path = os.path.join(pdf_dir, pdf_filename)
-                
-                with open(pdf_path, 'wb') as f:
-                    f.write(pdf_bytes)
-                
-                angebot.pdf_pfad = pdf_path
-                angebot.pdf_erstellt_am = datetime.utcnow()
+                _pdf_ablegen(angebot, get_pdf(angebot, 'angebot', lambda: generiere_angebot_pdf(angebot)))
             
             # E-Mail senden
             email_gesendet = sende_angebot_email(
@@ -3,12 +3,16 @@ Article Controller - PostgreSQL-Version
 Artikel-Verwaltung mit Datenbank
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, abort
 from flask_login import login_required, current_user
 from datetime import datetime
 from src.models import db, Article, ArticleVariant, ActivityLog, Supplier, ProductCategory, Brand, PriceCalculationSettings
 from src.services import LShopImportService
 from src.utils.activity_logger import log_activity
+from src.services.search_service import apply_search
+from src.services.list_query_service import (
+    fetch_page, page_size, count_estimate, get_facets, wants_json, json_response, next_page_url,
+)
 from werkzeug.utils import secure_filename
 import os
 import tempfile
@@ -36,14 +40,7 @@ def index():
     query = Article.query
 
     if search_query:
-        query = query.filter(
-            db.or_(
-                Article.name.ilike(f'%{search_query}%'),
-                Article.article_number.ilike(f'%{search_query}%'),
-                Article.description.ilike(f'%{search_query}%'),
-                Article.supplier.ilike(f'%{search_query}%')
-            )
-        )
+        query = apply_search(query, 'articles', search_query)
 
     if category_filter:
         query = query.filter_by(category=category_filter)
@@ -60,28 +57,32 @@ def index():
     elif stock_filter == 'out':
         query = query.filter(db.or_(Article.stock == 0, Article.stock.is_(None)))
 
-    articles_list = query.order_by(Article.name).all()
+    # Seitenweise nach Name, nur angezeigte Spalten
+    try:
+        page = fetch_page(query, 'articles', request.args.get('cursor'), page_size(request.args.get('limit')))
+    except ValueError:
+        abort(400)
+
+    if wants_json():
+        return json_response(query, page, 'articles')
 
     articles = {}
-    for article in articles_list:
+    for article in page.items:
         articles[article.id] = article
+    total, total_exact = count_estimate(query)
 
-    # Filter-Optionen aus DB (distinct values)
-    categories = [c[0] for c in db.session.query(Article.category).distinct().filter(
-        Article.category.isnot(None), Article.category != '').order_by(Article.category).all()]
-    brands = [b[0] for b in db.session.query(Article.brand).distinct().filter(
-        Article.brand.isnot(None), Article.brand != '').order_by(Article.brand).all()]
-    suppliers = [s[0] for s in db.session.query(Article.supplier).distinct().filter(
-        Article.supplier.isnot(None), Article.supplier != '').order_by(Article.supplier).all()]
-    materials = [m[0] for m in db.session.query(Article.material).distinct().filter(
-        Article.material.isnot(None), Article.material != '').order_by(Article.material).all()]
+    # Filter-Optionen (DISTINCT-Werte, zwischengespeichert)
+    facets = get_facets('articles')
 
     return render_template('articles/index.html',
                          articles=articles,
-                         categories=categories,
-                         brands=brands,
-                         suppliers=suppliers,
-                         materials=materials,
+                         total=total,
+                         total_exact=total_exact,
+                         next_url=next_page_url(page),
+                         categories=facets['category'],
+                         brands=facets['brand'],
+                         suppliers=facets['supplier'],
+                         materials=facets['material'],
                          search_query=search_query,
                          category_filter=category_filter,
                          brand_filter=brand_filter,
@@ -511,6 +512,25 @@ def import_lshop():
                 'column_mapping': json.loads(request.form.get('column_mapping', '{}'))
             }
             
+            # Grosse Dateien: Import im Hintergrund, Datei gehoert dann dem Job
+            if request.form.get('hintergrund'):
+                import shutil
+                from flask import current_app
+                from src.services.job_queue_service import enqueue
+                from src.controllers.jobs_controller import job_started_response
+
+                import_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'lshop_imports')
+                os.makedirs(import_dir, exist_ok=True)
+                job_path = os.path.join(import_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{filename}")
+                shutil.move(filepath, job_path)
+                job_options = {k: v for k, v in options.items() if k != 'column_mapping'}
+                payload = {'file_path': job_path, 'column_mapping': options['column_mapping'],
+                           'options': {**job_options, 'created_by': current_user.username}}
+                job, created = enqueue('lshop_import', payload,
+                                       dedup_key=f'lshop_import:{os.path.basename(job_path)}'[:100],
+                                       created_by=current_user.username)
+                return job_started_response(job, created, url_for('articles.index'))
+
             # Führe Import durch
             result = service.import_articles(options['column_mapping'], options)
             
@@ -972,14 +992,9 @@ def api_search():
 
     q = Article.query.filter(Article.active == True)
 
-    # Textsuche
+    # Textsuche (Suchindex, beste Treffer zuerst)
     if query_text and len(query_text) >= 2:
-        q = q.filter(db.or_(
-            Article.name.ilike(f'%{query_text}%'),
-            Article.article_number.ilike(f'%{query_text}%'),
-            Article.description.ilike(f'%{query_text}%'),
-            Article.supplier_article_number.ilike(f'%{query_text}%')
-        ))
+        q = apply_search(q, 'articles', query_text, ranked=True)
 
     # Brand-Filter
     brand_id = request.args.get('brand_id', type=int)
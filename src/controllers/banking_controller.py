@@ -102,19 +102,14 @@ def test_connection(account_id):
 @login_required
 @admin_required
 def sync_account(account_id):
-    """Manueller Sync"""
-    from src.services.bank_sync_service import BankSyncService
-
-    service = BankSyncService()
-    result = service.sync_account(account_id)
-
-    if 'error' in result:
-        flash(f'Sync-Fehler: {result["error"]}', 'danger')
-    else:
-        flash(f'Sync erfolgreich: {result["new_transactions"]} neue Transaktionen, '
-              f'{result["duplicates"]} Duplikate uebersprungen.', 'success')
+    """Manueller Sync (laeuft als Hintergrund-Job)"""
+    from src.services.job_queue_service import enqueue
+    from src.controllers.jobs_controller import job_started_response
 
-    return redirect(url_for('banking.index'))
+    BankAccount.query.get_or_404(account_id)
+    job, created = enqueue('bank_sync', {'account_id': account_id},
+                           dedup_key=f'bank_sync:{account_id}', created_by=current_user.username)
+    return job_started_response(job, created, url_for('banking.index'))
 
 
 @banking_bp.route('/accounts/<int:account_id>/delete', methods=['POST'])
@@ -163,7 +158,8 @@ def transactions():
 @admin_required
 def reconciliation():
     """Abgleich-UI"""
-    from src.models.rechnungsmodul.models import Rechnung, RechnungsStatus
+    from src.models.rechnungsmodul.models import Rechnung
+    from src.services.reconciliation_service import open_statuses
 
     unmatched = BankTransaction.query.filter_by(
         match_status='unmatched'
@@ -172,7 +168,7 @@ def reconciliation():
     ).limit(50).all()
 
     offene_rechnungen = Rechnung.query.filter(
-        Rechnung.status.in_([RechnungsStatus.GESENDET, RechnungsStatus.FAELLIG, RechnungsStatus.UEBERFAELLIG])
+        Rechnung.status.in_(open_statuses())
     ).order_by(Rechnung.rechnungsdatum.desc()).all()
 
     return render_template('banking/reconciliation.html',
@@ -204,8 +204,34 @@ def ust_export(id):
 @login_required
 @admin_required
 def export_uebersicht():
-    """Export-Übersicht"""
-    return render_template('buchhaltung/export.html')
+    """Export-Übersicht (inkl. der letzten Exporte aus der Job-Queue)"""
+    from src.models.background_job import BackgroundJob
+
+    export_jobs = BackgroundJob.query.filter_by(job_type='buchhaltung_export').order_by(
+        BackgroundJob.created_at.desc()).limit(10).all()
+    return render_template('buchhaltung/export.html', export_jobs=export_jobs)
+
+
+def _export_antwort(art, datum_von=None, datum_bis=None, jahr=None):
+    """
+    Export direkt streamen oder (Formularfeld 'hintergrund') als Job
+    einreihen; die Datei liegt danach unter EXPORT_DIR zum Download bereit.
+    """
+    from flask import stream_with_context
+    from src.services.buchhaltung_export_service import export_stream
+
+    if request.form.get('hintergrund'):
+        from src.services.job_queue_service import enqueue
+        from src.controllers.jobs_controller import job_started_response
+
+        payload = {'art': art, 'datum_von': datum_von.isoformat() if datum_von else None,
+                   'datum_bis': datum_bis.isoformat() if datum_bis else None, 'jahr': jahr}
+        job, created = enqueue('buchhaltung_export', payload, created_by=current_user.username)
+        return job_started_response(job, created, url_for('buchhaltung.export_uebersicht'))
+
+    filename, mimetype, chunks = export_stream(art, datum_von, datum_bis, jahr)
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 
 @buchhaltung_bp.route('/export/datev', methods=['POST'])
@@ -213,23 +239,9 @@ def export_uebersicht():
 @admin_required
 def export_datev():
     """DATEV-Export"""
-    from src.models.buchhaltung import BuchhaltungBuchung as Buchung
-    from src.services.buchhaltung_export_service import DATEVExporter
-    
     datum_von = datetime.strptime(request.form['datum_von'], '%Y-%m-%d').date()
     datum_bis = datetime.strptime(request.form['datum_bis'], '%Y-%m-%d').date()
-    
-    buchungen = Buchung.query.filter(
-        Buchung.buchungsdatum >= datum_von,
-        Buchung.buchungsdatum <= datum_bis,
-        Buchung.ist_storniert == False
-    ).all()
-    
-    exporter = DATEVExporter()
-    csv_content = exporter.export_buchungen(buchungen, datum_von, datum_bis)
-    
-    return Response(csv_content, mimetype='text/csv',
-                   headers={'Content-Disposition': f'attachment; filename=DATEV_Export.csv'})
+    return _export_antwort('datev', datum_von, datum_bis)
 
 
 @buchhaltung_bp.route('/export/datev-belege', methods=['POST'])
@@ -237,27 +249,9 @@ def export_datev():
 @admin_required
 def export_datev_belege():
     """DATEV-Export mit Belegen als ZIP"""
-    from src.models.buchhaltung import BuchhaltungBuchung as Buchung
-    from src.services.buchhaltung_export_service import DATEVExporter
-
     datum_von = datetime.strptime(request.form['datum_von'], '%Y-%m-%d').date()
     datum_bis = datetime.strptime(request.form['datum_bis'], '%Y-%m-%d').date()
-
-    buchungen = Buchung.query.filter(
-        Buchung.buchungsdatum >= datum_von,
-        Buchung.buchungsdatum <= datum_bis,
-        Buchung.ist_storniert == False
-    ).all()
-
-    exporter = DATEVExporter()
-    zip_bytes = exporter.export_with_receipts(buchungen, datum_von, datum_bis)
-
-    return send_file(
-        io.BytesIO(zip_bytes),
-        mimetype='application/zip',
-        as_attachment=True,
-        download_name=f'DATEV_Belege_{datum_von.strftime("%Y%m%d")}_{datum_bis.strftime("%Y%m%d")}.zip'
-    )
+    return _export_antwort('datev_belege', datum_von, datum_bis)
 
 
 @buchhaltung_bp.route('/export/gobd', methods=['POST'])
@@ -265,28 +259,25 @@ def export_datev_belege():
 @admin_required
 def export_gobd():
     """GoBD-Export"""
-    from src.models.buchhaltung import BuchhaltungBuchung as Buchung
-    from src.models.models import Customer, Supplier
-    from src.services.buchhaltung_export_service import GoBDExporter
-    import zipfile
-    
     jahr = int(request.form.get('jahr', date.today().year))
-    
-    buchungen = Buchung.query.filter(db.extract('year', Buchung.buchungsdatum) == jahr).all()
-    kunden = Customer.query.all()
-    lieferanten = Supplier.query.all()
-    
-    exporter = GoBDExporter()
-    paket = exporter.export_gobd_paket(jahr, buchungen, kunden, lieferanten)
-    
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w') as zf:
-        for filename, content in paket.items():
-            zf.writestr(filename, content)
-    zip_buffer.seek(0)
-    
-    return send_file(zip_buffer, mimetype='application/zip',
-                    as_attachment=True, download_name=f'GoBD_{jahr}.zip')
+    return _export_antwort('gobd', jahr=jahr)
+
+
+@buchhaltung_bp.route('/export/datei/<int:job_id>')
+@login_required
+@admin_required
+def export_datei(job_id):
+    """Im Hintergrund erstellten Export herunterladen"""
+    import os
+    from flask import current_app, abort, send_from_directory
+    from src.models.background_job import BackgroundJob
+
+    job = BackgroundJob.query.get_or_404(job_id)
+    if job.job_type != 'buchhaltung_export' or job.status != 'succeeded' or not (job.result or {}).get('datei'):
+        abort(404)
+    directory = current_app.config.get('EXPORT_DIR') or os.path.join(current_app.instance_path, 'exports')
+    return send_from_directory(directory, job.result['datei'], as_attachment=True,
+                               mimetype=job.result.get('mimetype'))
 
 
 # ============================================================================
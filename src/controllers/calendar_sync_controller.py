@@ -116,18 +116,14 @@ def callback_microsoft():
 @login_required
 @admin_required
 def sync(conn_id):
-    """Manueller Sync"""
-    from src.services.calendar_sync_service import MicrosoftGraphCalendarService
-
-    service = MicrosoftGraphCalendarService()
-    result = service.sync_to_outlook(conn_id)
-
-    if 'error' in result:
-        flash(f'Sync-Fehler: {result["error"]}', 'danger')
-    else:
-        flash(f'Sync erfolgreich: {result["created"]} erstellt, {result["updated"]} aktualisiert.', 'success')
-
-    return redirect(url_for('calendar_sync.index'))
+    """Manueller Sync (laeuft als Hintergrund-Job)"""
+    from src.services.job_queue_service import enqueue
+    from src.controllers.jobs_controller import job_started_response
+
+    CalendarConnection.query.get_or_404(conn_id)
+    job, created = enqueue('calendar_sync', {'connection_id': conn_id},
+                           dedup_key=f'calendar_sync:{conn_id}', created_by=current_user.username)
+    return job_started_response(job, created, url_for('calendar_sync.index'))
 
 
 @calendar_sync_bp.route('/<int:conn_id>/disconnect', methods=['POST'])
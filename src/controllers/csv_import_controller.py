@@ -68,10 +68,10 @@ def upload():
         return redirect(url_for('csv_import.index'))
 
     service = CSVImportService()
-    file_content = file.read()
 
+    # Upload-Stream direkt auf die Platte (grosse Preislisten nicht im Speicher)
     job = service.create_import_job(
-        file_content=file_content,
+        file_content=file.stream,
         filename=file.filename,
         import_type=import_type,
         user=current_user.username if current_user else 'system',
@@ -141,6 +141,14 @@ def execute(job_id):
     job = CSVImportJob.query.get_or_404(job_id)
     service = CSVImportService()
 
+    if request.form.get('hintergrund'):
+        from src.services.job_queue_service import enqueue
+        from src.controllers.jobs_controller import job_started_response
+
+        background_job, created = enqueue('csv_import', {'import_job_id': job.id},
+                                          created_by=current_user.username)
+        return job_started_response(background_job, created, url_for('csv_import.result', job_id=job.id))
+
     result = service.execute_import(job)
 
     flash(f'Import abgeschlossen: {result["imported"]} importiert, '
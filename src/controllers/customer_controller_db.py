@@ -4,12 +4,14 @@ Vollständige Datenbank-Integration mit SQLAlchemy
 """
 
 import re
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
 from flask_login import login_required, current_user
 from datetime import datetime
 from src.models import db, Customer, Order, ActivityLog
 from src.utils.activity_logger import log_activity
 from src.utils.form_helpers import parse_date_from_form, safe_get_form_value
+from src.services.search_service import apply_search
+from src.services.list_query_service import fetch_page, page_size, wants_json, json_response, next_page_url
 
 # Blueprint erstellen
 customer_bp = Blueprint('customers', __name__, url_prefix='/customers')
@@ -31,31 +33,27 @@ def index():
     query = Customer.query
     
     if search_query:
-        # Suche in verschiedenen Feldern
-        query = query.filter(
-            db.or_(
-                Customer.email.ilike(f'%{search_query}%'),
-                Customer.phone.ilike(f'%{search_query}%'),
-                Customer.mobile.ilike(f'%{search_query}%'),
-                Customer.city.ilike(f'%{search_query}%'),
-                Customer.first_name.ilike(f'%{search_query}%'),
-                Customer.last_name.ilike(f'%{search_query}%'),
-                Customer.company_name.ilike(f'%{search_query}%'),
-                Customer.contact_person.ilike(f'%{search_query}%'),
-                Customer.vat_id.ilike(f'%{search_query}%')
-            )
-        )
-    
-    # Nach Name sortieren
-    customers_list = query.order_by(Customer.created_at.desc()).all()
+        # Suche in verschiedenen Feldern (Suchindex)
+        query = apply_search(query, 'customers', search_query)
     
+    # Seitenweise nach Anlagedatum (neueste zuerst), nur angezeigte Spalten
+    try:
+        page = fetch_page(query, 'customers', request.args.get('cursor'), page_size(request.args.get('limit')))
+    except ValueError:
+        abort(400)
+
+    if wants_json():
+        return json_response(query, page, 'customers',
+                             lambda customer: {'display_name': customer.display_name})
+
     # In Dictionary umwandeln für Template-Kompatibilität
     customers = {}
-    for customer in customers_list:
+    for customer in page.items:
         customers[customer.id] = customer
     
     return render_template('customers/index.html', 
                          customers=customers,
+                         next_url=next_page_url(page),
                          search_query=search_query)
 
 @customer_bp.route('/new', methods=['GET', 'POST'])
@@ -311,30 +309,13 @@ def api_search():
     if len(q) < 2:
         return jsonify({'customers': []})
 
-    search = f'%{q}%'
-
-    # Kunden durchsuchen
-    customers = Customer.query.filter(
-        db.or_(
-            Customer.first_name.ilike(search),
-            Customer.last_name.ilike(search),
-            Customer.company_name.ilike(search),
-            Customer.email.ilike(search),
-            Customer.phone.ilike(search),
-            Customer.mobile.ilike(search),
-            Customer.customer_number.ilike(search),
-        )
-    ).filter_by(is_active=True).limit(limit).all()
+    # Kunden durchsuchen (nach Relevanz)
+    customers = apply_search(Customer.query, 'customers', q, ranked=True) \
+        .filter(Customer.is_active == True).limit(limit).all()
 
     # Lieferanten durchsuchen
-    suppliers = Supplier.query.filter(
-        db.or_(
-            Supplier.name.ilike(search),
-            Supplier.contact_person.ilike(search),
-            Supplier.email.ilike(search),
-            Supplier.phone.ilike(search),
-        )
-    ).filter_by(active=True).limit(5).all()
+    suppliers = apply_search(Supplier.query, 'suppliers', q, ranked=True) \
+        .filter(Supplier.active == True).limit(5).all()
 
     results = []
     for c in customers:
@@ -389,21 +370,12 @@ def api_quick_create():
 
     # Kunden-ID generieren
     from datetime import datetime
+    from src.services.id_generator_service import IdGenerator
     prefix = 'TMP' if contact_type == 'temporary' else 'KD'
     year = datetime.now().year
-    id_prefix = f'{prefix}{year}-'
-
-    last = Customer.query.filter(Customer.id.like(f'{id_prefix}%')).order_by(Customer.id.desc()).first()
-    if last:
-        try:
-            num = int(last.id.split('-')[1]) + 1
-        except (ValueError, IndexError):
-            num = 1
-    else:
-        num = 1
 
     customer = Customer(
-        id=f'{id_prefix}{num:04d}',
+        id=IdGenerator.next_id(Customer, f'{prefix}{year}-', pad=4),
         first_name=first_name,
         last_name=last_name,
         email=email or None,
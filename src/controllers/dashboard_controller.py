@@ -10,10 +10,9 @@ Herausgeloest aus app.py beim Refactoring 2026-03-17.
 from datetime import datetime, date, timedelta
 from flask import render_template
 from flask_login import current_user
-from sqlalchemy import func
 
 from src.models import db
-from src.models.models import Order, Customer, Article, Thread
+from src.models.models import Order
 
 import logging
 logger = logging.getLogger(__name__)
@@ -44,135 +43,9 @@ def dashboard():
 
 
 def _build_stats():
-    """Sammelt alle Dashboard-Statistiken"""
-    stats = {
-        'open_orders': Order.query.filter(
-            Order.status.in_(['pending', 'approved', 'in_progress'])
-        ).count(),
-        'in_production': Order.query.filter_by(status='in_progress').count(),
-        'ready_pickup': Order.query.filter_by(status='ready_for_pickup').count(),
-        'today_revenue': 0,
-        'total_customers': Customer.query.count(),
-        'open_leads': 0,
-        'document_count': 0,
-        'open_post': 0,
-        'unread_emails': 0,
-        'open_invoices': 0,
-        'overdue_payments': 0,
-        'today_transactions': 0,
-        'user_count': 0,
-        'article_count': Article.query.count(),
-        'thread_count': Thread.query.count(),
-        'low_stock': 0,
-        'design_count': 0,
-        'dst_count': 0,
-        'pending_supplier_orders': 0,
-        'items_to_order': 0,
-    }
-
-    # Einkauf
-    try:
-        from src.models.models import SupplierOrder, OrderItem
-        stats['pending_supplier_orders'] = SupplierOrder.query.filter(
-            SupplierOrder.status.in_(['draft', 'ordered'])
-        ).count()
-        stats['items_to_order'] = OrderItem.query.filter(
-            OrderItem.supplier_order_status.in_(['none', 'to_order'])
-        ).join(Article).filter(OrderItem.quantity > Article.stock).count()
-    except Exception:
-        pass
-
-    # Tagesumsatz (Kasse)
-    try:
-        from src.models.rechnungsmodul.models import KassenBeleg
-        today = date.today()
-        today_start = datetime.combine(today, datetime.min.time())
-        today_end = datetime.combine(today, datetime.max.time())
-        today_sum = db.session.query(func.sum(KassenBeleg.brutto_gesamt)).filter(
-            KassenBeleg.erstellt_am.between(today_start, today_end),
-            KassenBeleg.storniert == False
-        ).scalar()
-        stats['today_revenue'] = round(float(today_sum or 0), 2)
-        stats['today_transactions'] = KassenBeleg.query.filter(
-            KassenBeleg.erstellt_am.between(today_start, today_end),
-            KassenBeleg.storniert == False
-        ).count()
-    except Exception:
-        pass
-
-    # Dokumente
-    try:
-        from src.models.document import Document, PostEntry, ArchivedEmail
-        stats['document_count'] = Document.query.filter_by(is_latest_version=True).count()
-        stats['open_post'] = PostEntry.query.filter_by(status='open').count()
-        stats['unread_emails'] = ArchivedEmail.query.filter_by(is_read=False).count()
-    except Exception:
-        pass
-
-    # Website / Anfragen
-    try:
-        from src.models.inquiry import Inquiry
-        stats['new_inquiries'] = Inquiry.query.filter_by(status='neu').count()
-        stats['total_inquiries_open'] = Inquiry.query.filter(
-            Inquiry.status.in_(['neu', 'in_bearbeitung'])
-        ).count()
-    except Exception:
-        pass
-
-    try:
-        stats['shop_orders'] = Order.query.filter_by(source='shop').count()
-    except Exception:
-        pass
-
-    # Versand
-    try:
-        from src.models.models import Shipment
-        stats['ready_to_ship'] = Order.query.filter_by(status='ready').count()
-        stats['shipped_today'] = Shipment.query.filter(
-            Shipment.created_at >= datetime.combine(date.today(), datetime.min.time())
-        ).count()
-    except Exception:
-        pass
-
-    # Rechnungen
-    try:
-        from src.models.rechnungsmodul.models import Rechnung, RechnungsStatus
-        stats['open_invoices'] = Rechnung.query.filter(
-            Rechnung.status.in_([RechnungsStatus.ENTWURF, RechnungsStatus.OFFEN, RechnungsStatus.UEBERFAELLIG])
-        ).count()
-    except Exception:
-        pass
-
-    # Angebote
-    try:
-        from src.models.angebot import Angebot, AngebotStatus
-        stats['open_angebote'] = Angebot.query.filter(
-            Angebot.status.in_([AngebotStatus.ENTWURF, AngebotStatus.VERSCHICKT])
-        ).count()
-    except Exception:
-        pass
-
-    # Aufgaben
-    try:
-        from src.models.todo import Todo
-        stats['open_tasks'] = Todo.query.filter(
-            Todo.status.notin_(['completed', 'cancelled'])
-        ).count()
-        stats['overdue_tasks'] = Todo.query.filter(
-            Todo.status.notin_(['completed', 'cancelled']),
-            Todo.due_date.isnot(None),
-            Todo.due_date < date.today()
-        ).count()
-        open_orders_count = Order.query.filter(
-            Order.workflow_status.notin_(['completed', 'cancelled', None]),
-            Order.archived_at.is_(None),
-            Order.status != 'cancelled'
-        ).count()
-        stats['open_tasks'] += open_orders_count + stats.get('new_inquiries', 0)
-    except Exception:
-        pass
-
-    return stats
+    """Sammelt alle Dashboard-Statistiken (materialisiert, siehe dashboard_stats_service)"""
+    from src.services.dashboard_stats_service import get_dashboard_stats
+    return get_dashboard_stats()
 
 
 def _build_recent_events():
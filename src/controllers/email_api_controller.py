@@ -288,10 +288,12 @@ def send_invoice_email(rechnung_id):
         from src.services.zugpferd_service import ZugpferdService as _ZS
         bearbeiter_name = _ZS()._get_creator_name(getattr(rechnung, 'erstellt_von', None))
 
-        # PDF generieren
+        # PDF generieren (finalisiert: aus dem PDF-Store)
         from src.services.zugpferd_service import ZugpferdService
+        from src.services.pdf_store_service import get_pdf
         zugpferd_service = ZugpferdService()
-        pdf_content = zugpferd_service.create_invoice_from_rechnung(rechnung)
+        pdf_content = get_pdf(rechnung, 'rechnungsmodul_zugferd',
+                              lambda: zugpferd_service.create_invoice_from_rechnung(rechnung)).data
 
         # PDF temporaer speichern
         temp_dir = tempfile.mkdtemp()
@@ -127,19 +127,14 @@ def test_account(account_id):
 @login_required
 @admin_required
 def sync_account(account_id):
-    """Manueller E-Mail-Sync"""
-    from src.services.imap_sync_service import IMAPSyncService
-
-    service = IMAPSyncService()
-    result = service.fetch_new_emails(account_id)
-
-    if 'error' in result:
-        flash(f'Sync-Fehler: {result["error"]}', 'danger')
-    else:
-        flash(f'Sync erfolgreich: {result["fetched"]} neue E-Mails, '
-              f'{result["duplicates"]} Duplikate.', 'success')
-
-    return redirect(url_for('email_sync.index'))
+    """Manueller E-Mail-Sync (laeuft als Hintergrund-Job)"""
+    from src.services.job_queue_service import enqueue
+    from src.controllers.jobs_controller import job_started_response
+
+    EmailAccount.query.get_or_404(account_id)
+    job, created = enqueue('email_sync', {'account_id': account_id},
+                           dedup_key=f'email_sync:{account_id}', created_by=current_user.username)
+    return job_started_response(job, created, url_for('email_sync.index'))
 
 
 @email_sync_bp.route('/email/<int:email_id>')
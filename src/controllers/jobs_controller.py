@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Hintergrund-Jobs Controller
+===========================
+Status der Jobs aus src/services/job_queue_service.py (IMAP-, Bank- und
+Kalender-Sync, Garn-Nachbestellsuche).
+
+    GET /jobs/api/<id>      Status eines Jobs (Ersteller oder Admin)
+    GET /jobs/api           Letzte Jobs, Filter ?type=&status= (Admin)
+    GET /jobs/api/stats     Laufzeit, Wartezeit, Fehler je Job-Typ (Admin)
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+from flask import Blueprint, jsonify, request, flash, redirect, url_for
+from flask_login import login_required, current_user
+
+from src.models.background_job import BackgroundJob
+from src.services.job_queue_service import JOB_TYPES, get_job, get_job_stats
+
+import logging
+logger = logging.getLogger(__name__)
+
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+
+def _wants_json():
+    return request.is_json or request.accept_mimetypes.best == 'application/json' \
+        or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+
+def job_started_response(job, created, redirect_to):
+    """
+    Antwort fuer Routen, die einen Job einreihen: 202 + Job-JSON fuer
+    AJAX-Aufrufe, sonst Flash-Meldung und Redirect.
+    """
+    if _wants_json():
+        return jsonify({
+            'success': True,
+            'created': created,
+            'job': job.to_dict(),
+            'status_url': url_for('jobs.status', job_id=job.id),
+        }), 202
+
+    label = JOB_TYPES[job.job_type].label if job.job_type in JOB_TYPES else job.job_type
+    if created:
+        flash(f'{label} gestartet (Job #{job.id}) - laeuft im Hintergrund.', 'info')
+    else:
+        flash(f'{label} laeuft bereits (Job #{job.id}).', 'info')
+    return redirect(redirect_to)
+
+
+def _admin_only():
+    if not getattr(current_user, 'is_admin', False):
+        return jsonify({'success': False, 'error': 'Keine Berechtigung'}), 403
+    return None
+
+
+@jobs_bp.route('/api/<int:job_id>')
+@login_required
+def status(job_id):
+    """Status eines Jobs"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job nicht gefunden'}), 404
+    if job.created_by != current_user.username and not getattr(current_user, 'is_admin', False):
+        return jsonify({'success': False, 'error': 'Keine Berechtigung'}), 403
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+
+@jobs_bp.route('/api')
+@login_required
+def list_jobs():
+    """Letzte Jobs (neueste zuerst)"""
+    error = _admin_only()
+    if error:
+        return error
+
+    query = BackgroundJob.query
+    if request.args.get('type'):
+        query = query.filter_by(job_type=request.args['type'])
+    if request.args.get('status'):
+        query = query.filter_by(status=request.args['status'])
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    jobs = query.order_by(BackgroundJob.id.desc()).limit(limit).all()
+    return jsonify({'success': True, 'jobs': [job.to_dict() for job in jobs]})
+
+
+@jobs_bp.route('/api/stats')
+@login_required
+def stats():
+    """Kennzahlen je Job-Typ"""
+    error = _admin_only()
+    if error:
+        return error
+    hours = request.args.get('hours', 24, type=int)
+    return jsonify({'success': True, **get_job_stats(hours)})
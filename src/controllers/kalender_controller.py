@@ -213,7 +213,12 @@ def api_termin_loeschen(id):
 @kalender_bp.route('/api/auslastung')
 @login_required
 def api_auslastung():
-    """API: Ressourcen-Auslastung"""
+    """
+    API: Ressourcen-Auslastung
+    
+    Mit ?wochen=N wird stattdessen die Maschinen-Kapazitaet fuer N Wochen
+    ab der Woche von start geliefert (ein Index fuer alle Wochen).
+    """
     from src.services.crm_finanz_service import KalenderService
     
     start = request.args.get('start')
@@ -224,6 +229,10 @@ def api_auslastung():
     else:
         start = date.today()
     
+    wochen = request.args.get('wochen', type=int)
+    if wochen:
+        return jsonify({'wochen': _maschinen_auslastung_wochen(start, min(wochen, 26))})
+    
     if ende:
         ende = datetime.fromisoformat(ende).date()
     else:
@@ -241,6 +250,42 @@ def api_auslastung():
     return jsonify(auslastungen)
 
 
+def _maschinen_auslastung_wochen(start, wochen):
+    """Maschinen-Kapazitaet mehrerer Wochen im Format der Kalender-API"""
+    from src.services.machine_analytics_service import MachineAnalyticsService
+    
+    ergebnis = []
+    for woche in MachineAnalyticsService().get_capacity_weeks(start, wochen):
+        maschinen = []
+        for machine_id, daten in woche['machines'].items():
+            verfuegbar = daten['week_available']
+            gebucht = daten['week_total']
+            maschinen.append({
+                'maschine_id': machine_id,
+                'maschine_name': daten['machine'].name,
+                'verfuegbar_stunden': verfuegbar,
+                'gebucht_stunden': gebucht,
+                'frei_stunden': round(max(0, verfuegbar - gebucht), 1),
+                'auslastung_prozent': daten['week_pct'],
+                'anzahl_auftraege': daten['week_jobs'],
+                'ueberbucht_tage': sum(1 for d in daten['days'].values() if d['overbooked']),
+                'tage': [{
+                    'datum': d['date'].isoformat(),
+                    'gebucht_stunden': d['scheduled_hours'],
+                    'verfuegbar_stunden': d['available_hours'],
+                    'auslastung_prozent': d['pct'],
+                    'ueberbucht': d['overbooked'],
+                } for d in daten['days'].values()],
+            })
+        ergebnis.append({
+            'woche_start': woche['week_start'].isoformat(),
+            'woche_ende': woche['week_end'].isoformat(),
+            'kalenderwoche': woche['week_start'].isocalendar()[1],
+            'maschinen': maschinen,
+        })
+    return ergebnis
+
+
 # ============================================================================
 # RATENZAHLUNGEN
 # ============================================================================
@@ -23,6 +23,7 @@ import io
 
 from src.models import db
 from src.models.models import Customer, Article
+from src.services.pdf_store_service import get_pdf, not_modified_response, pdf_response, send_pdf
 
 # Document-Workflow Models
 try:
@@ -607,28 +608,15 @@ def pdf_generieren(id):
     lieferschein = BusinessDocument.query.get_or_404(id)
     
     try:
-        pdf_bytes = generiere_lieferschein_pdf(lieferschein)
+        cached = not_modified_response(lieferschein, 'lieferschein')
+        if cached:
+            return cached
         
-        # PDF speichern
-        pdf_dir = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'pdfs', 'lieferscheine')
-        os.makedirs(pdf_dir, exist_ok=True)
+        # Finalisiert: aus dem PDF-Store
+        pdf = get_pdf(lieferschein, 'lieferschein', lambda: generiere_lieferschein_pdf(lieferschein))
+        pdf_filename = os.path.basename(_pdf_ablegen(lieferschein, pdf))
         
-        pdf_filename = f"{lieferschein.dokument_nummer.replace('/', '-')}.pdf"
-        pdf_path = os.path.join(pdf_dir, pdf_filename)
-        
-        with open(pdf_path, 'wb') as f:
-            f.write(pdf_bytes)
-        
-        lieferschein.pdf_pfad = pdf_path
-        lieferschein.pdf_erstellt_am = datetime.utcnow()
-        db.session.commit()
-        
-        return send_file(
-            io.BytesIO(pdf_bytes),
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=pdf_filename
-        )
+        return send_pdf(pdf, download_name=pdf_filename, as_attachment=True)
         
     except Exception as e:
         logger.error(f"Fehler bei PDF-Generierung: {e}")
@@ -644,13 +632,8 @@ def pdf_vorschau(id):
     lieferschein = BusinessDocument.query.get_or_404(id)
     
     try:
-        pdf_bytes = generiere_lieferschein_pdf(lieferschein)
-        
-        return send_file(
-            io.BytesIO(pdf_bytes),
-            mimetype='application/pdf',
-            as_attachment=False
-        )
+        # Finalisiert: aus dem PDF-Store
+        return pdf_response(lieferschein, 'lieferschein', lambda: generiere_lieferschein_pdf(lieferschein))
         
     except Exception as e:
         logger.error(f"Fehler bei PDF-Vorschau: {e}")
@@ -658,6 +641,31 @@ def pdf_vorschau(id):
         return redirect(url_for('lieferscheine.show', id=id))
 
 
+def _pdf_ablegen(lieferschein, pdf):
+    """
+    PDF unter uploads/pdfs/lieferscheine speichern und im Dokument vermerken -
+    bei einem Treffer aus dem PDF-Store nur, wenn die Datei fehlt.
+    """
+    if pdf.from_store and lieferschein.pdf_pfad and os.path.exists(lieferschein.pdf_pfad):
+        return lieferschein.pdf_pfad
+    
+    pdf_dir = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'pdfs', 'lieferscheine')
+    os.makedirs(pdf_dir, exist_ok=True)
+    
+    pdf_filename = f"{lieferschein.dokument_nummer.replace('/', '-')}.pdf"
+    pdf_path = os.path.join(pdf_dir, pdf_filename)
+    
+    with open(pdf_path, 'wb') as f:
+        f.write(pdf.data)
+    
+    # Pfad im Dokument speichern
+    lieferschein.pdf_pfad = pdf_path
+    lieferschein.pdf_erstellt_am = datetime.utcnow()
+    lieferschein.pdf_hash = pdf.etag
+    db.session.commit()
+    return pdf_path
+
+
 def generiere_lieferschein_pdf(lieferschein):
     """
     Generiert PDF für einen Lieferschein
@@ -470,26 +470,18 @@ def capacity():
     today = date.today()
     week_start = today - timedelta(days=today.weekday()) + timedelta(weeks=week_offset)
 
-    # Daten laden
-    stats = analytics.get_summary_stats()
-    capacity_data = analytics.get_weekly_capacity(week_start)
-    current_jobs = analytics.get_current_jobs()
-
-    # Auslastung diese Woche
-    week_end = week_start + timedelta(days=5)
-    utilization = analytics.get_all_machines_utilization(week_start, week_end)
-
-    # Warteschlange
-    queues = analytics.get_queue_by_machine()
+    # Daten laden (Kennzahlen, Heatmap, Auslastung, Jobs und Warteschlange)
+    overview = analytics.get_capacity_overview(week_start)
 
     return render_template('machines/capacity.html',
-                         stats=stats,
-                         capacity=capacity_data,
-                         current_jobs=current_jobs,
-                         utilization=utilization,
-                         queues=queues,
+                         stats=overview['stats'],
+                         capacity=overview['capacity'],
+                         current_jobs=overview['current_jobs'],
+                         utilization=overview['utilization'],
+                         queues=overview['queues'],
                          week_start=week_start,
                          week_offset=week_offset,
+                         timedelta=timedelta,
                          weekdays=['Mo', 'Di', 'Mi', 'Do', 'Fr'])
 
 
@@ -3,12 +3,16 @@ Order Controller - PostgreSQL-Version
 Auftrags-Verwaltung mit Datenbank
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, abort
 from flask_login import login_required, current_user
 from datetime import datetime
 from src.models import db, Order, Customer, Article, OrderItem, ActivityLog, Supplier, CompanySettings
 from sqlalchemy import text
 from src.utils.activity_logger import log_activity
+from src.services.search_service import apply_search
+from src.services.list_query_service import (
+    fetch_page, page_size, item_status_counts, wants_json, json_response, next_page_url,
+)
 from src.utils.dst_analyzer import analyze_dst_file_robust
 from werkzeug.utils import secure_filename
 import json
@@ -49,22 +53,27 @@ def index():
         query = query.filter_by(status=status_filter)
 
     if search_query:
-        query = query.join(Customer).filter(
-            db.or_(
-                Order.id.ilike(f'%{search_query}%'),
-                Order.order_number.ilike(f'%{search_query}%'),
-                Customer.company_name.ilike(f'%{search_query}%'),
-                Customer.first_name.ilike(f'%{search_query}%'),
-                Customer.last_name.ilike(f'%{search_query}%'),
-                Order.description.ilike(f'%{search_query}%')
-            )
-        )
+        # Auftragsnummer, Beschreibung und Kundenname (Suchindex)
+        query = apply_search(query, 'orders', search_query)
 
-    # Nach Datum sortieren (neueste zuerst)
-    orders = query.order_by(Order.created_at.desc()).all()
+    # Seitenweise nach Datum (neueste zuerst), nur angezeigte Spalten
+    try:
+        page = fetch_page(query, 'orders', request.args.get('cursor'), page_size(request.args.get('limit')))
+    except ValueError:
+        abort(400)
+    item_counts = item_status_counts([order.id for order in page.items])
+
+    if wants_json():
+        return json_response(query, page, 'orders', lambda order: {
+            'customer_name': order.customer.display_name if order.customer else None,
+            'items_to_order': item_counts[order.id].get('none', 0),
+            'items_ordered': item_counts[order.id].get('ordered', 0),
+        })
 
     return render_template('orders/index.html',
-                         orders=orders,
+                         orders=page.items,
+                         item_counts=item_counts,
+                         next_url=next_page_url(page),
                          status_filter=status_filter,
                          search_query=search_query,
                          show_archived=show_archived)
@@ -784,14 +793,10 @@ def api_article_search():
     if not search_term:
         return jsonify([])
 
-    # Suche nach Artikelnummer oder Name (Case-insensitive)
-    articles = Article.query.filter(
-        Article.active == True,
-        db.or_(
-            Article.article_number.ilike(f'%{search_term}%'),
-            Article.name.ilike(f'%{search_term}%')
-        )
-    ).order_by(Article.name).limit(20).all()
+    # Suche nach Artikelnummer oder Name (Suchindex, beste Treffer zuerst)
+    articles = apply_search(Article.query.filter(Article.active == True),
+                            'articles', search_term, ranked=True) \
+        .order_by(Article.name).limit(20).all()
 
     results = []
     for article in articles:
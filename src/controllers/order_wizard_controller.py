@@ -24,6 +24,7 @@ import uuid
 
 from src.models import db
 from src.models.models import Customer, Article, Order, OrderItem, Machine
+from src.services.search_service import apply_search
 
 # Prüfen ob Document-Workflow Models verfügbar
 try:
@@ -526,16 +527,8 @@ def api_kunden_suche():
     if len(query) < 2:
         return jsonify([])
     
-    # Suche in verschiedenen Feldern
-    kunden = Customer.query.filter(
-        db.or_(
-            Customer.company_name.ilike(f'%{query}%'),
-            Customer.first_name.ilike(f'%{query}%'),
-            Customer.last_name.ilike(f'%{query}%'),
-            Customer.email.ilike(f'%{query}%'),
-            Customer.customer_number.ilike(f'%{query}%')
-        )
-    ).limit(20).all()
+    # Suche in verschiedenen Feldern (Suchindex, beste Treffer zuerst)
+    kunden = apply_search(Customer.query, 'customers', query, ranked=True).limit(20).all()
     
     return jsonify([{
         'id': k.id,
@@ -556,21 +549,15 @@ def api_artikel_suche():
     
     articles_query = Article.query.filter_by(active=True)
     
-    if query:
-        articles_query = articles_query.filter(
-            db.or_(
-                Article.name.ilike(f'%{query}%'),
-                Article.article_number.ilike(f'%{query}%'),
-                Article.description.ilike(f'%{query}%')
-            )
-        )
-    
     if category:
         articles_query = articles_query.filter_by(category=category)
     
     if brand:
         articles_query = articles_query.filter_by(brand=brand)
     
+    if query:
+        articles_query = apply_search(articles_query, 'articles', query, ranked=True)
+    
     articles = articles_query.order_by(Article.name).limit(50).all()
     
     return jsonify([{
@@ -642,52 +629,50 @@ def api_design_analyse():
     
     # Temporär speichern und analysieren
     import tempfile
+    from src.services.analysis_cache_service import cached_analysis, analyze_pattern_file
     
+    tmp_path = None
     try:
         with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp:
-            file.save(tmp.name)
-            
-            # Mit pyembroidery laden
-            pattern = pyembroidery.read(tmp.name)
-            
-            if pattern is None:
-                return jsonify({'error': 'Datei konnte nicht gelesen werden'}), 400
-            
-            # Stiche zählen
-            stitch_count = 0
-            for stitch in pattern.stitches:
-                if stitch[2] == pyembroidery.STITCH:
-                    stitch_count += 1
-            
-            # Dimensionen berechnen (in mm)
-            bounds = pattern.bounds()
-            width_mm = (bounds[2] - bounds[0]) / 10  # 1/10mm zu mm
-            height_mm = (bounds[3] - bounds[1]) / 10
-            
-            # Farben extrahieren
-            colors = []
-            for thread in pattern.threadlist:
-                colors.append({
-                    'color': thread.hex_color() if hasattr(thread, 'hex_color') else '#000000',
-                    'name': thread.description if hasattr(thread, 'description') else '',
-                    'catalog_number': thread.catalog_number if hasattr(thread, 'catalog_number') else ''
-                })
-            
-            # Temporäre Datei löschen
-            os.unlink(tmp.name)
-            
-            return jsonify({
-                'filename': file.filename,
-                'stitch_count': stitch_count,
-                'width_mm': round(width_mm, 1),
-                'height_mm': round(height_mm, 1),
-                'color_count': len(colors),
-                'colors': colors
+            tmp_path = tmp.name
+            file.save(tmp_path)
+        
+        # Mit pyembroidery laden (bekannte Dateien kommen aus dem Analyse-Cache)
+        analysis = cached_analysis(tmp_path, 'pattern', analyze_pattern_file)
+        
+        if not analysis.get('success'):
+            return jsonify({'error': 'Datei konnte nicht gelesen werden'}), 400
+        
+        # Dimensionen berechnen (in mm)
+        bounds = analysis['bounds']
+        width_mm = (bounds[2] - bounds[0]) / 10  # 1/10mm zu mm
+        height_mm = (bounds[3] - bounds[1]) / 10
+        
+        # Farben extrahieren
+        colors = []
+        for thread in analysis['threads']:
+            colors.append({
+                'color': thread['hex_color'],
+                'name': thread['description'] or '',
+                'catalog_number': thread['catalog_number'] or ''
             })
+        
+        return jsonify({
+            'filename': file.filename,
+            'stitch_count': analysis['stitch_commands'],
+            'width_mm': round(width_mm, 1),
+            'height_mm': round(height_mm, 1),
+            'color_count': len(colors),
+            'colors': colors
+        })
             
     except Exception as e:
         logger.error(f"Fehler bei Design-Analyse: {e}")
         return jsonify({'error': str(e)}), 500
+    finally:
+        # Temporäre Datei löschen
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
 
 
 @wizard_bp.route('/api/kalkulation/berechnen', methods=['POST'])
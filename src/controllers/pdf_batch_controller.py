@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+PDF-Batch Controller
+====================
+Viele Rechnungen, Packlisten oder Lieferscheine in einem Schritt rendern
+(Sammelrechnungen, Monatsabschluss). Der Batch laeuft als Job 'pdf_batch'
+der Job-Queue; der Start kehrt sofort zurueck, der Fortschritt kommt per
+Polling des Status (z.B. jede Sekunde, bis finished=true).
+
+    POST /pdf-batch/start            {"kind": "rechnung", "ids": [1, 2], "output": "zip"}
+                                     {"kind": "rechnung", "monat": "2026-09"}
+    GET  /pdf-batch/<id>             Status (JSON)
+    GET  /pdf-batch/<id>/download    Ergebnis (PDF oder ZIP)
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+from flask import Blueprint, jsonify, request, send_file, url_for
+from flask_login import login_required, current_user
+
+from src.services.job_queue_service import enqueue, get_job
+from src.services.pdf_batch_service import (
+    KINDS, batch_dedup_key, batch_status, invoice_ids_for_month, result_path, validate_batch,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+pdf_batch_bp = Blueprint('pdf_batch', __name__, url_prefix='/pdf-batch')
+
+POLL_INTERVAL_MS = 1000  # Empfehlung fuer das Polling des Status
+
+
+def _batch_or_404(job_id):
+    """Batch-Job nur fuer den Ersteller oder Admins"""
+    job = get_job(job_id)
+    if job is None or job.job_type != 'pdf_batch':
+        return None, (jsonify({'success': False, 'error': 'Batch nicht gefunden'}), 404)
+    if job.created_by != current_user.username and not getattr(current_user, 'is_admin', False):
+        return None, (jsonify({'success': False, 'error': 'Keine Berechtigung'}), 403)
+    return job, None
+
+
+def _links(job):
+    return {
+        'status_url': url_for('pdf_batch.status', job_id=job.id),
+        'download_url': url_for('pdf_batch.download', job_id=job.id),
+        'poll_interval_ms': POLL_INTERVAL_MS,
+    }
+
+
+@pdf_batch_bp.route('/start', methods=['POST'])
+@login_required
+def start():
+    """Batch einreihen - Dokument-IDs oder Monat (nur Rechnungen)"""
+    data = request.get_json(silent=True) or request.form
+    kind = data.get('kind', 'rechnung')
+    output = data.get('output', 'pdf')
+    ids = data.getlist('ids') if hasattr(data, 'getlist') else data.get('ids') or []
+
+    try:
+        if data.get('monat'):
+            if not isinstance(kind, str) or not kind.startswith('rechnung'):
+                raise ValueError('Monatsauswahl nur fuer Rechnungen')
+            year, month = (int(part) for part in str(data['monat']).split('-'))
+            ids = invoice_ids_for_month(year, month)
+        if not isinstance(ids, list):
+            raise ValueError('ids muss eine Liste von Dokument-IDs sein')
+        ids = [int(doc_id) for doc_id in ids]
+        validate_batch(kind, ids, output)
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e), 'kinds': list(KINDS)}), 400
+
+    job, created = enqueue('pdf_batch', {'kind': kind, 'ids': ids, 'output': output},
+                           dedup_key=batch_dedup_key(kind, ids, output), created_by=current_user.username)
+    if created:
+        logger.info(f"PDF-Batch Job {job.id} eingereiht: {kind}, {len(ids)} Dokumente ({current_user.username})")
+    return jsonify({'success': True, 'created': created, 'batch': batch_status(job), **_links(job)}), 202
+
+
+@pdf_batch_bp.route('/<int:job_id>')
+@login_required
+def status(job_id):
+    """Fortschritt eines Batches (aus background_jobs)"""
+    job, error = _batch_or_404(job_id)
+    if error:
+        return error
+    return jsonify({'success': True, 'batch': batch_status(job), **_links(job)})
+
+
+@pdf_batch_bp.route('/<int:job_id>/download')
+@login_required
+def download(job_id):
+    """Ergebnis herunterladen (PDF zusammengefuegt oder ZIP)"""
+    job, error = _batch_or_404(job_id)
+    if error:
+        return error
+    path = result_path(job)
+    if path is None:
+        if job.status == 'succeeded':
+            return jsonify({'success': False, 'error': 'Ergebnisdatei nicht mehr vorhanden'}), 410
+        return jsonify({'success': False, 'error': 'Batch noch nicht fertig',
+                        'batch': batch_status(job)}), 409
+    return send_file(path, mimetype=job.result.get('mimetype'),
+                     as_attachment=True, download_name=job.result.get('filename'))
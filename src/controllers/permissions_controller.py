@@ -11,6 +11,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from src.models.models import db, User
 from src.models.user_permissions import Module, ModulePermission, DashboardLayout
+from src.utils.permissions import bump_permission_version
 from datetime import datetime
 
 # Blueprint erstellen
@@ -92,6 +93,7 @@ def update_user_permissions(user_id):
             db.session.add(permission)
     
     try:
+        bump_permission_version()
         db.session.commit()
         flash(f'Berechtigungen für {user.username} aktualisiert', 'success')
     except Exception as e:
@@ -126,6 +128,7 @@ def toggle_module(module_id):
     module.is_active = not module.is_active
     
     try:
+        bump_permission_version()
         db.session.commit()
         return jsonify({
             'success': True,
@@ -156,6 +159,7 @@ def edit_module(module_id):
         module.sort_order = int(request.form.get('sort_order', 0))
         
         try:
+            bump_permission_version()
             db.session.commit()
             flash('Modul aktualisiert', 'success')
             return redirect(url_for('permissions.modules'))
@@ -206,6 +210,7 @@ def quick_assign():
         db.session.add(permission)
     
     try:
+        bump_permission_version()
         db.session.commit()
         return jsonify({'success': True})
     except Exception as e:
@@ -198,3 +198,46 @@ def add_payment(tenant_id):
     logger.info(f"Zahlung erfasst: {amount}€ fuer Tenant {tenant.name} ({invoice_number})")
     flash(f'Zahlung von {amount}€ erfasst (Rechnung: {invoice_number}).', 'success')
     return redirect(url_for('platform_admin.tenant_detail', tenant_id=tenant_id))
+
+
+# ==========================================
+# PERFORMANCE-KENNZAHLEN
+# ==========================================
+
+@platform_admin_bp.route('/api/performance')
+@login_required
+@require_system_admin
+def api_performance():
+    """Laufzeit-Kennzahlen dieses Worker-Prozesses (Caches, Zaehler)"""
+    from flask import current_app
+    from src.utils.template_context import get_template_context_stats
+    from src.services.analysis_cache_service import get_analysis_cache_stats
+    from src.services.search_service import get_search_index_status
+    from src.services.pdf_store_service import get_pdf_store_stats
+    from src.services.job_queue_service import get_job_stats
+
+    return jsonify({
+        'success': True,
+        'template_context': get_template_context_stats(),
+        'analysis_cache': get_analysis_cache_stats(),
+        'search_index': get_search_index_status(),
+        'pdf_store': get_pdf_store_stats(),
+        'job_queue': get_job_stats(),
+        'startup_phases': current_app.extensions.get('startup_phases', {}),
+        'schema': current_app.extensions.get('schema_report', {}),
+    })
+
+
+@platform_admin_bp.route('/api/scheduler')
+@login_required
+@require_system_admin
+def api_scheduler():
+    """Scheduler-Leader, Alter der Lease und Verzoegerung der Jobs"""
+    try:
+        from src.services.scheduler_service import get_scheduler_status
+        status = get_scheduler_status()
+    except ImportError:
+        from src.services.scheduler_leader_service import get_lease, process_id
+        status = {'process': process_id(), 'state': 'not_installed', 'is_leader': False,
+                  'lease': get_lease()}
+    return jsonify({'success': True, **status})
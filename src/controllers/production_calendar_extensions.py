@@ -555,7 +555,13 @@ def register_calendar_routes(bp, load_production_settings, log_activity):
     @bp.route('/api/suggest-machine')
     @login_required
     def api_suggest_machine():
-        """Schlägt eine passende freie Maschine für einen Auftrag vor"""
+        """
+        Schlägt eine passende freie Maschine für einen Auftrag vor
+        
+        Ohne start_time wird der früheste freie Slot gesucht.
+        """
+        from src.services.production_slot_service import SlotFinder, machine_types_for_order
+        
         order_id = request.args.get('order_id')
         start_time_str = request.args.get('start_time')
         duration_hours = float(request.args.get('duration', 2))
@@ -564,85 +570,27 @@ def register_calendar_routes(bp, load_production_settings, log_activity):
         if not order:
             return jsonify({'error': 'Auftrag nicht gefunden'}), 404
         
-        try:
-            start_dt = datetime.strptime(start_time_str, '%Y-%m-%d %H:%M')
-            end_dt = start_dt + timedelta(hours=duration_hours)
-        except (ValueError, TypeError):
-            return jsonify({'error': 'Ungültiges Zeitformat'}), 400
-        
-        machine_types = []
-        if order.order_type in ['embroidery', 'combined']:
-            machine_types.append('embroidery')
-        if order.order_type in ['dtf', 'printing', 'combined']:
-            machine_types.extend(['dtf', 'printing'])
-        
-        if not machine_types:
-            machine_types = ['embroidery', 'dtf', 'printing']
-        
-        machines = Machine.query.filter(
-            Machine.status == 'active',
-            Machine.type.in_(machine_types)
-        ).all()
-        
-        best_machine = None
+        machine_types = machine_types_for_order(order.order_type)
+        settings = load_production_settings()
         
-        for machine in machines:
-            conflict = ProductionSchedule.query.filter(
-                and_(
-                    ProductionSchedule.machine_id == machine.id,
-                    ProductionSchedule.status != 'cancelled',
-                    or_(
-                        and_(
-                            ProductionSchedule.scheduled_start <= start_dt,
-                            ProductionSchedule.scheduled_end > start_dt
-                        ),
-                        and_(
-                            ProductionSchedule.scheduled_start < end_dt,
-                            ProductionSchedule.scheduled_end >= end_dt
-                        ),
-                        and_(
-                            ProductionSchedule.scheduled_start >= start_dt,
-                            ProductionSchedule.scheduled_end <= end_dt
-                        )
-                    )
-                )
-            ).first()
-            
-            if conflict:
-                continue
-            
+        if start_time_str:
             try:
-                from src.models import ProductionBlock
-                block_conflict = ProductionBlock.query.filter(
-                    and_(
-                        or_(
-                            ProductionBlock.machine_id == machine.id,
-                            ProductionBlock.machine_id.is_(None)
-                        ),
-                        ProductionBlock.start_date <= end_dt.date(),
-                        ProductionBlock.end_date >= start_dt.date(),
-                        ProductionBlock.is_active == True
-                    )
-                ).first()
-                
-                if block_conflict:
-                    block_start = datetime.combine(block_conflict.start_date, block_conflict.start_time)
-                    block_end = datetime.combine(block_conflict.end_date, block_conflict.end_time)
-                    if not (end_dt <= block_start or start_dt >= block_end):
-                        continue
+                start_dt = datetime.strptime(start_time_str, '%Y-%m-%d %H:%M')
+                end_dt = start_dt + timedelta(hours=duration_hours)
             except (ValueError, TypeError):
-                pass
-
-            current_order = Order.query.filter_by(
-                assigned_machine_id=machine.id,
-                status='in_progress'
-            ).first()
+                return jsonify({'error': 'Ungültiges Zeitformat'}), 400
             
-            if not current_order:
-                best_machine = machine
-                break
-            elif best_machine is None:
-                best_machine = machine
+            finder = SlotFinder.load(start_dt, horizon_days=(end_dt - start_dt).days + 1,
+                                     machine_types=machine_types)
+            best_machine = finder.suggest_machine(start_dt, end_dt)
+        else:
+            finder = SlotFinder.load(machine_types=machine_types,
+                                     work_start_hour=settings.get('work_start', 8),
+                                     work_end_hour=settings.get('work_end', 17))
+            slot = finder.find_slot(duration_hours)
+            best_machine = slot['machine'] if slot else None
+            if slot:
+                start_dt, end_dt = slot['start'], slot['end']
         
         if best_machine:
             return jsonify({
@@ -661,6 +609,71 @@ def register_calendar_routes(bp, load_production_settings, log_activity):
             })
     
     
+    @bp.route('/api/plan-slots', methods=['POST'])
+    @login_required
+    def api_plan_slots():
+        """
+        Plant mehrere Aufträge in einem Aufruf ein (früheste oder Best-Fit-Slots)
+        
+        JSON: {"jobs": [{"order_id": "...", "duration": 3}], "strategy": "earliest",
+               "not_before": "2025-01-06 08:00", "horizon_days": 14}
+        """
+        from src.services.production_slot_service import (
+            SlotFinder, machine_types_for_order, STRATEGIES, DEFAULT_HORIZON_DAYS
+        )
+        
+        data = request.get_json() or {}
+        jobs = data.get('jobs') or []
+        strategy = data.get('strategy', 'earliest')
+        if not jobs:
+            return jsonify({'error': 'Keine Aufträge angegeben'}), 400
+        if strategy not in STRATEGIES:
+            return jsonify({'error': f'Unbekannte Strategie: {strategy}'}), 400
+        
+        try:
+            not_before = data.get('not_before')
+            not_before = datetime.strptime(not_before, '%Y-%m-%d %H:%M') if not_before else None
+            horizon_days = min(int(data.get('horizon_days', DEFAULT_HORIZON_DAYS)), 90)
+            durations = [float(job.get('duration', 2)) for job in jobs]
+        except (ValueError, TypeError, AttributeError):
+            return jsonify({'error': 'Ungültige Eingabe'}), 400
+        
+        order_ids = [job.get('order_id') for job in jobs if job.get('order_id')]
+        orders = {o.id: o for o in Order.query.filter(Order.id.in_(order_ids))} if order_ids else {}
+        
+        planned_jobs = []
+        for job, duration in zip(jobs, durations):
+            order = orders.get(job.get('order_id'))
+            planned_jobs.append({
+                'order_id': job.get('order_id'),
+                'duration_hours': duration,
+                'machine_types': job.get('machine_types') or machine_types_for_order(
+                    order.order_type if order else None),
+            })
+        
+        settings = load_production_settings()
+        finder = SlotFinder.load(not_before, horizon_days=horizon_days,
+                                 work_start_hour=settings.get('work_start', 8),
+                                 work_end_hour=settings.get('work_end', 17))
+        
+        slots = []
+        for entry in finder.plan(planned_jobs, strategy):
+            slot = entry['slot']
+            slots.append({
+                'order_id': entry['job']['order_id'],
+                'duration': entry['job']['duration_hours'],
+                'machine': {
+                    'id': slot['machine'].id,
+                    'name': slot['machine'].name,
+                    'type': slot['machine'].type
+                } if slot else None,
+                'start_time': slot['start'].isoformat() if slot else None,
+                'end_time': slot['end'].isoformat() if slot else None,
+            })
+        
+        return jsonify({'strategy': strategy, 'slots': slots})
+    
+    
     @bp.route('/api/block/<block_id>')
     @login_required
     def api_block_details(block_id):
@@ -341,13 +341,24 @@ def suggestions():
         Order.status.notin_(['cancelled', 'delivered', 'completed'])
     ).all()
     
+    # Verfügbarkeit (frei, reserviert, unterwegs) aller Artikel gebündelt
+    from src.services.inventory_service import inventory_service
+    availability = inventory_service.get_availability_batch(
+        [article.id for article in low_stock_articles] + [article.id for _, article, _, _ in pending_items]
+    )
+    supplier_names = {article.supplier for article in low_stock_articles if article.supplier}
+    suppliers_by_name = {
+        supplier.name: supplier
+        for supplier in Supplier.query.filter(Supplier.name.in_(supplier_names))
+    } if supplier_names else {}
+    
     # Gruppiere nach Lieferant
     supplier_suggestions = {}
     
     # Niedrigen Lagerbestand hinzufügen
     for article in low_stock_articles:
         supplier_name = article.supplier or 'Kein Lieferant'
-        supplier = Supplier.query.filter_by(name=supplier_name).first()
+        supplier = suppliers_by_name.get(supplier_name)
         supplier_id = supplier.id if supplier else 'no_supplier'
         
         if supplier_id not in supplier_suggestions:
@@ -358,10 +369,14 @@ def suggestions():
                 'low_stock_items': []
             }
 
-        reorder_qty = (article.min_stock or 0) - (article.stock or 0)
+        info = availability.get(article.id, {})
+        available = info.get('available', article.stock or 0)
+        reorder_qty = (article.min_stock or 0) - available
         supplier_suggestions[supplier_id]['low_stock_items'].append({
             'article': article,
-            'current_stock': article.stock or 0,
+            'current_stock': available,
+            'reserved': info.get('reserved', 0),
+            'incoming': info.get('incoming', 0),
             'min_stock': article.min_stock,
             'reorder_quantity': max(reorder_qty, 1)
         })
@@ -380,7 +395,7 @@ def suggestions():
             }
 
         # Benötigte Menge berechnen
-        current_stock = article.stock or 0
+        current_stock = availability.get(article.id, {}).get('available', article.stock or 0)
         needed_quantity = max(0, item.quantity - current_stock)
 
         if needed_quantity > 0:
@@ -607,37 +607,22 @@ def pdf_generieren(id):
     try:
         # Neuen PDF-Service nutzen
         from src.services.document_pdf_service import get_pdf_service
+        from src.services.pdf_store_service import get_pdf, not_modified_response, send_pdf
         pdf_service = get_pdf_service()
         
-        # PDF mit ZugPferd generieren
-        pdf_bytes = pdf_service.generate_rechnung_pdf(rechnung, with_zugpferd=True)
+        cached = not_modified_response(rechnung, 'rechnung_zugferd')
+        if cached:
+            return cached
         
-        # Kundenname für Dateinamen
-        kunde_name = rechnung.kunde.display_name if rechnung.kunde else None
-        
-        # PDF speichern (mit konfigurierten Pfaden)
-        pdf_path = pdf_service.save_pdf(
-            pdf_bytes,
-            doc_type='rechnung',
-            doc_nummer=rechnung.dokument_nummer,
-            kunde_name=kunde_name,
-            datum=rechnung.dokument_datum
-        )
-        
-        # Pfad in DB speichern
-        rechnung.pdf_pfad = pdf_path
-        rechnung.pdf_erstellt_am = datetime.utcnow()
-        db.session.commit()
+        # PDF mit ZugPferd (finalisiert: aus dem PDF-Store)
+        pdf = get_pdf(rechnung, 'rechnung_zugferd',
+                      lambda: pdf_service.generate_rechnung_pdf(rechnung, with_zugpferd=True))
+        pdf_path = _pdf_ablegen(rechnung, pdf, pdf_service)
         
         # Dateiname aus Pfad extrahieren
         pdf_filename = os.path.basename(pdf_path)
         
-        return send_file(
-            io.BytesIO(pdf_bytes),
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=pdf_filename
-        )
+        return send_pdf(pdf, download_name=pdf_filename, as_attachment=True)
         
     except Exception as e:
         logger.error(f"Fehler bei PDF: {e}")
@@ -654,12 +639,12 @@ def pdf_vorschau(id):
     
     try:
         from src.services.document_pdf_service import get_pdf_service
+        from src.services.pdf_store_service import pdf_response
         pdf_service = get_pdf_service()
         
-        # PDF generieren (ohne ZugPferd für schnellere Vorschau)
-        pdf_bytes = pdf_service.generate_rechnung_pdf(rechnung, with_zugpferd=False)
-        
-        return send_file(io.BytesIO(pdf_bytes), mimetype='application/pdf', as_attachment=False)
+        # PDF ohne ZugPferd für schnellere Vorschau (finalisiert: aus dem PDF-Store)
+        return pdf_response(rechnung, 'rechnung_basis',
+                            lambda: pdf_service.generate_rechnung_pdf(rechnung, with_zugpferd=False))
     except Exception as e:
         flash(f'Fehler: {str(e)}', 'danger')
         return redirect(url_for('rechnungen.show', id=id))
@@ -674,36 +659,24 @@ def pdf_zugpferd(id):
     
     try:
         from src.services.document_pdf_service import get_pdf_service
+        from src.services.pdf_store_service import get_pdf, not_modified_response, send_pdf
         pdf_service = get_pdf_service()
         
-        # PDF MIT ZugPferd generieren
-        pdf_bytes = pdf_service.generate_rechnung_pdf(rechnung, with_zugpferd=True)
-        
-        # Kundenname für Dateinamen
-        kunde_name = rechnung.kunde.display_name if rechnung.kunde else None
+        # Profil vor der Store-Abfrage setzen - es geht in die Revision ein
+        rechnung.zugpferd_profil = 'BASIC'
         
-        # PDF speichern
-        pdf_path = pdf_service.save_pdf(
-            pdf_bytes,
-            doc_type='rechnung',
-            doc_nummer=rechnung.dokument_nummer,
-            kunde_name=kunde_name,
-            datum=rechnung.dokument_datum
-        )
+        cached = not_modified_response(rechnung, 'rechnung_zugferd')
+        if cached:
+            return cached
         
-        rechnung.pdf_pfad = pdf_path
-        rechnung.pdf_erstellt_am = datetime.utcnow()
-        rechnung.zugpferd_profil = 'BASIC'  # Profil speichern
-        db.session.commit()
+        # PDF MIT ZugPferd (finalisiert: aus dem PDF-Store)
+        pdf = get_pdf(rechnung, 'rechnung_zugferd',
+                      lambda: pdf_service.generate_rechnung_pdf(rechnung, with_zugpferd=True))
+        pdf_path = _pdf_ablegen(rechnung, pdf, pdf_service)
         
         pdf_filename = os.path.basename(pdf_path).replace('.pdf', '_ZugPferd.pdf')
         
-        return send_file(
-            io.BytesIO(pdf_bytes),
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=pdf_filename
-        )
+        return send_pdf(pdf, download_name=pdf_filename, as_attachment=True)
         
     except Exception as e:
         logger.error(f"Fehler bei ZugPferd-PDF: {e}")
@@ -711,6 +684,34 @@ def pdf_zugpferd(id):
         return redirect(url_for('rechnungen.show', id=id))
 
 
+def _pdf_ablegen(rechnung, pdf, pdf_service):
+    """
+    PDF unter den konfigurierten Pfaden speichern und in der Rechnung
+    vermerken - bei einem Treffer aus dem PDF-Store nur, wenn die Datei fehlt.
+    """
+    if pdf.from_store and rechnung.pdf_pfad and os.path.exists(rechnung.pdf_pfad):
+        return rechnung.pdf_pfad
+    
+    # Kundenname für Dateinamen
+    kunde_name = rechnung.kunde.display_name if rechnung.kunde else None
+    
+    # PDF speichern (mit konfigurierten Pfaden)
+    pdf_path = pdf_service.save_pdf(
+        pdf.data,
+        doc_type='rechnung',
+        doc_nummer=rechnung.dokument_nummer,
+        kunde_name=kunde_name,
+        datum=rechnung.dokument_datum
+    )
+    
+    # Pfad in DB speichern
+    rechnung.pdf_pfad = pdf_path
+    rechnung.pdf_erstellt_am = datetime.utcnow()
+    rechnung.pdf_hash = pdf.etag
+    db.session.commit()
+    return pdf_path
+
+
 def generiere_rechnung_pdf(rechnung):
     """Generiert PDF für eine Rechnung"""
     from reportlab.lib import colors
@@ -18,6 +18,7 @@ from src.models.rechnungsmodul import (
 )
 from src.utils.sumup_service import sumup_service
 from src.services.buchungs_service import BuchungsService
+from src.services.search_service import apply_search
 
 import logging
 logger = logging.getLogger(__name__)
@@ -603,13 +604,8 @@ def artikel_suchen():
         return jsonify({'success': False, 'error': 'Keine Suchanfrage'})
 
     try:
-        # Suche nach Name, Artikelnummer oder Barcode
-        artikel = Article.query.filter(
-            db.or_(
-                Article.name.ilike(f'%{query}%'),
-                Article.article_number.ilike(f'%{query}%')
-            )
-        ).limit(10).all()
+        # Suche nach Name, Artikelnummer oder Barcode (Suchindex)
+        artikel = apply_search(Article.query, 'articles', query, ranked=True).limit(10).all()
 
         result = [{
             'id': a.id,
@@ -769,15 +765,8 @@ def kunden_suchen():
 
     try:
         if query:
-            # Suche nach Name, Kundennummer oder Barcode
-            kunden = Customer.query.filter(
-                db.or_(
-                    Customer.first_name.ilike(f'%{query}%'),
-                    Customer.last_name.ilike(f'%{query}%'),
-                    Customer.customer_number.ilike(f'%{query}%'),
-                    Customer.barcode.ilike(f'%{query}%') if hasattr(Customer, 'barcode') else False
-                )
-            ).limit(20).all()
+            # Suche nach Name, Kundennummer oder Barcode (Suchindex)
+            kunden = apply_search(Customer.query, 'customers', query, ranked=True).limit(20).all()
         else:
             # Ohne Query: Zeige die letzten 20 Kunden
             kunden = Customer.query.order_by(Customer.created_at.desc()).limit(20).all()
@@ -1040,24 +1040,24 @@ def rechnung_pdf(rechnung_id):
     Rechnung als PDF anzeigen
     """
     try:
+        from src.services.pdf_store_service import pdf_response
+
         rechnung = Rechnung.query.get_or_404(rechnung_id)
 
         # PDF-Service nutzen (ohne ZUGFeRD-XML)
         pdf_service = PDFService()
         zugpferd_service = ZugpferdService()
 
-        # Daten aufbereiten
-        invoice_data = zugpferd_service._convert_rechnung_to_invoice_data(rechnung)
-
-        # PDF generieren
-        pdf_content = pdf_service.create_invoice_pdf(invoice_data)
+        def _render():
+            # Daten aufbereiten und PDF generieren
+            invoice_data = zugpferd_service._convert_rechnung_to_invoice_data(rechnung)
+            return pdf_service.create_invoice_pdf(invoice_data)
 
-        # Als Response zurückgeben
-        return send_file(
-            io.BytesIO(pdf_content),
-            mimetype='application/pdf',
-            as_attachment=False,  # Im Browser anzeigen
-            download_name=f'{rechnung.rechnungsnummer}.pdf'
+        # Als Response zurückgeben (finalisiert: aus dem PDF-Store)
+        return pdf_response(
+            rechnung, 'rechnungsmodul_pdf', _render,
+            download_name=f'{rechnung.rechnungsnummer}.pdf',
+            as_attachment=False  # Im Browser anzeigen
         )
 
     except Exception as e:
@@ -1071,20 +1071,20 @@ def rechnung_download(rechnung_id):
     Rechnung herunterladen (ZUGPFERD PDF/A-3 mit eingebettetem XML)
     """
     try:
+        from src.services.pdf_store_service import pdf_response
+
         rechnung = Rechnung.query.get_or_404(rechnung_id)
 
         # ZUGFeRD-Service nutzen
         zugpferd_service = ZugpferdService()
 
-        # Vollständiges ZUGFeRD-PDF erstellen (PDF/A-3 + XML)
-        zugferd_pdf = zugpferd_service.create_invoice_from_rechnung(rechnung)
-
-        # Als Download zurückgeben
-        return send_file(
-            io.BytesIO(zugferd_pdf),
-            mimetype='application/pdf',
-            as_attachment=True,  # Download erzwingen
-            download_name=f'{rechnung.rechnungsnummer}_ZUGFeRD.pdf'
+        # Vollständiges ZUGFeRD-PDF (PDF/A-3 + XML) als Download zurückgeben
+        # (finalisiert: aus dem PDF-Store)
+        return pdf_response(
+            rechnung, 'rechnungsmodul_zugferd',
+            lambda: zugpferd_service.create_invoice_from_rechnung(rechnung),
+            download_name=f'{rechnung.rechnungsnummer}_ZUGFeRD.pdf',
+            as_attachment=True  # Download erzwingen
         )
 
     except Exception as e:
@@ -1250,9 +1250,11 @@ def rechnung_archiv_speichern(rechnung_id):
 
         os.makedirs(monat_dir, exist_ok=True)
 
-        # PDF generieren
+        # PDF generieren (finalisiert: aus dem PDF-Store)
+        from src.services.pdf_store_service import get_pdf
         zugpferd_service = ZugpferdService()
-        pdf_content = zugpferd_service.create_invoice_from_rechnung(rechnung)
+        pdf_content = get_pdf(rechnung, 'rechnungsmodul_zugferd',
+                              lambda: zugpferd_service.create_invoice_from_rechnung(rechnung)).data
 
         # Dateiname: Rechnungsnummer_Kunde.pdf
         safe_kunde = "".join(c for c in (rechnung.kunde_name or 'Unbekannt') if c.isalnum() or c in ' _-')[:50]
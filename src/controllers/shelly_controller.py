@@ -5,8 +5,12 @@ Verwaltung und Steuerung von Shelly-Geräten
 
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from flask_login import login_required, current_user
-from src.models.models import db, ShellyDevice, ShellyEnergyReading, Machine, ShellyProductionEnergy
-from src.utils.shelly_integration import ShellyDevice as ShellyAPI, ShellyScanner, ShellyEnergyTracker
+from src.models.models import db, ShellyDevice, Machine, ShellyProductionEnergy
+from src.utils.shelly_integration import ShellyDevice as ShellyAPI
+from src.services.shelly_poller_service import (
+    apply_status, get_session, poll_power, poll_status, record_readings, scan_network,
+)
+from src.services.shelly_rollup_service import hourly_history, today_rollups, update_production_energy
 from src.utils.activity_logger import log_activity
 from datetime import datetime, timedelta
 from sqlalchemy import func
@@ -27,24 +31,8 @@ def index():
     """Shelly-Geräte Übersicht"""
     devices = ShellyDevice.query.all()
 
-    # Hole Live-Status für alle Geräte
-    for device in devices:
-        try:
-            shelly_api = ShellyAPI(device.ip_address)
-            power_data = shelly_api.get_power_data(device.channel)
-
-            if power_data:
-                device.is_online = True
-                device.is_on = power_data.get('is_on', False)
-                device.last_power_w = power_data.get('power', 0)
-                device.last_seen = datetime.now()
-            else:
-                device.is_online = False
-
-        except Exception as e:
-            logger.error(f"Fehler beim Abrufen des Status von {device.name}: {e}")
-            device.is_online = False
-
+    # Hole Live-Status für alle Geräte (parallel)
+    apply_status(devices, poll_power(devices))
     db.session.commit()
 
     # Statistiken
@@ -77,21 +65,22 @@ def device_detail(device_id):
     device = ShellyDevice.query.get_or_404(device_id)
 
     # Hole aktuelle Live-Daten
-    shelly_api = ShellyAPI(device.ip_address)
+    shelly_api = ShellyAPI(device.ip_address, session=get_session())
     live_data = shelly_api.get_power_data(device.channel)
     device_info = shelly_api.get_device_info()
 
-    # Energie-Historie (letzte 24h)
-    since = datetime.now() - timedelta(hours=24)
-    energy_history = ShellyEnergyReading.query.filter(
-        ShellyEnergyReading.device_id == device_id,
-        ShellyEnergyReading.timestamp >= since
-    ).order_by(ShellyEnergyReading.timestamp).all()
+    # Energie-Historie (letzte 24h, Stundenwerte)
+    energy_history = hourly_history(device_id, datetime.utcnow() - timedelta(hours=24))
 
-    # Produktions-Energie-Daten
+    # Produktions-Energie-Daten (laufende Aufträge aus den Stundenwerten nachrechnen)
     production_energy = ShellyProductionEnergy.query.filter_by(
         shelly_device_id=device_id
     ).order_by(ShellyProductionEnergy.start_time.desc()).limit(10).all()
+    running = [prod for prod in production_energy if not prod.end_time]
+    if running:
+        for prod in running:
+            update_production_energy(prod)
+        db.session.commit()
 
     return render_template('shelly/device_detail.html',
                          device=device,
@@ -115,21 +104,22 @@ def api_scan_network():
     try:
         logger.info(f"Starte Netzwerk-Scan für {network_prefix}.0/24")
 
-        # Führe Scan durch
-        scanner = ShellyScanner()
-        found_devices = scanner.scan_network(network_prefix)
+        # Führe Scan durch (Geräte-Info kommt direkt aus dem Scan)
+        found_devices = scan_network(network_prefix)
+        power = poll_status([(found['ip'], found['ip'], 0) for found in found_devices])
+
+        # Prüfe ob schon in DB
+        known = {d.ip_address: d for d in ShellyDevice.query.filter(
+            ShellyDevice.ip_address.in_([found['ip'] for found in found_devices]))}
 
         # Bereite Ergebnis auf
         results = []
-        for shelly_api in found_devices:
-            device_info = shelly_api.get_device_info()
-            power_data = shelly_api.get_power_data()
-
-            # Prüfe ob schon in DB
-            existing = ShellyDevice.query.filter_by(ip_address=shelly_api.ip).first()
+        for device_info in found_devices:
+            power_data = power.get(device_info['ip']) or {}
+            existing = known.get(device_info['ip'])
 
             results.append({
-                'ip': shelly_api.ip,
+                'ip': device_info['ip'],
                 'type': device_info.get('type', 'Unknown'),
                 'mac': device_info.get('mac', ''),
                 'fw': device_info.get('fw', ''),
@@ -169,7 +159,7 @@ def api_add_device():
             return jsonify({'success': False, 'error': 'IP-Adresse erforderlich'}), 400
 
         # Hole Geräte-Info
-        shelly_api = ShellyAPI(ip_address)
+        shelly_api = ShellyAPI(ip_address, session=get_session())
         device_info = shelly_api.get_device_info()
 
         if not device_info:
@@ -219,7 +209,7 @@ def api_control_device(device_id):
     action = data.get('action')  # 'on', 'off', 'toggle'
 
     try:
-        shelly_api = ShellyAPI(device.ip_address)
+        shelly_api = ShellyAPI(device.ip_address, session=get_session())
 
         if action == 'on':
             success = shelly_api.turn_on(device.channel)
@@ -296,7 +286,7 @@ def api_device_status(device_id):
     device = ShellyDevice.query.get_or_404(device_id)
 
     try:
-        shelly_api = ShellyAPI(device.ip_address)
+        shelly_api = ShellyAPI(device.ip_address, session=get_session())
         power_data = shelly_api.get_power_data(device.channel)
 
         if power_data:
@@ -361,37 +351,13 @@ def api_delete_device(device_id):
 def api_record_energy():
     """Zeichnet Energie-Messwerte auf (für Cronjob/Scheduler)"""
     try:
-        devices = ShellyDevice.query.filter_by(active=True, track_energy=True).all()
-        recorded = 0
-
-        for device in devices:
-            try:
-                shelly_api = ShellyAPI(device.ip_address)
-                power_data = shelly_api.get_power_data(device.channel)
-
-                if power_data:
-                    reading = ShellyEnergyReading(
-                        device_id=device.id,
-                        power_w=power_data.get('power'),
-                        voltage_v=power_data.get('voltage'),
-                        current_a=power_data.get('current'),
-                        power_factor=power_data.get('pf'),
-                        energy_wh=power_data.get('energy'),
-                        is_on=power_data.get('is_on'),
-                        temperature_c=power_data.get('temperature')
-                    )
-
-                    db.session.add(reading)
-                    recorded += 1
-
-            except Exception as e:
-                logger.error(f"Fehler beim Aufzeichnen für {device.name}: {e}")
-
-        db.session.commit()
+        # Parallel abfragen, Messwerte in einem INSERT
+        result = record_readings()
 
         return jsonify({
             'success': True,
-            'recorded': recorded
+            'recorded': result['recorded'],
+            'offline': result['offline']
         })
 
     except Exception as e:
@@ -406,23 +372,18 @@ def api_dashboard_data():
     try:
         devices = ShellyDevice.query.filter_by(active=True).all()
 
+        # Hole Live-Daten (parallel)
+        live = poll_power(devices)
+
+        # Heutige Energie: ein Tageswert je Gerät
+        today = today_rollups([d.id for d in devices])
+
         dashboard_data = []
         for device in devices:
-            # Hole Live-Daten
-            shelly_api = ShellyAPI(device.ip_address)
-            power_data = shelly_api.get_power_data(device.channel)
+            power_data = live.get(device.id)
 
-            # Heutige Energie
-            today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            today_readings = ShellyEnergyReading.query.filter(
-                ShellyEnergyReading.device_id == device.id,
-                ShellyEnergyReading.timestamp >= today_start
-            ).all()
-
-            if today_readings and len(today_readings) > 1:
-                today_energy_wh = max(r.energy_wh or 0 for r in today_readings) - min(r.energy_wh or 0 for r in today_readings)
-            else:
-                today_energy_wh = 0
+            rollup = today.get(device.id)
+            today_energy_wh = rollup.energy_wh if rollup else 0
 
             dashboard_data.append({
                 'id': device.id,
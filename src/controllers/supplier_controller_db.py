@@ -8,7 +8,7 @@ from datetime import datetime, date
 from src.models.models import db, Supplier, Article, SupplierOrder, OrderItem, Order, ActivityLog, SupplierRating
 from src.models.supplier_contact import SupplierContact
 from src.utils.activity_logger import log_activity
-from sqlalchemy import or_
+from src.services.search_service import apply_search
 import json
 from cryptography.fernet import Fernet
 import os
@@ -67,14 +67,7 @@ def index():
     
     # Suchfilter
     if search_query:
-        query = query.filter(
-            or_(
-                Supplier.name.ilike(f'%{search_query}%'),
-                Supplier.contact_person.ilike(f'%{search_query}%'),
-                Supplier.email.ilike(f'%{search_query}%'),
-                Supplier.id.ilike(f'%{search_query}%')
-            )
-        )
+        query = apply_search(query, 'suppliers', search_query)
     
     # Sortierung
     suppliers = query.order_by(Supplier.name).all()
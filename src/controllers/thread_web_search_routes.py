@@ -93,21 +93,27 @@ def search_existing_thread_web(thread_id):
 @thread_bp.route('/low-stock-search')
 @login_required
 def low_stock_search():
-    """Zeigt Nachbestellvorschläge für Garne mit niedrigem Lagerbestand"""
+    """
+    Zeigt Nachbestellvorschläge für Garne mit niedrigem Lagerbestand
+    (Ergebnis der letzten Hintergrund-Suche; ?refresh=1 startet eine neue)
+    """
     try:
-        from src.services.thread_web_search_service import search_low_stock_threads
-        
-        # Suche nach Garnen mit niedrigem Lagerbestand
-        suggestions = search_low_stock_threads()
-        
-        # Aktivität protokollieren
-        log_activity(
-            'thread_low_stock_search',
-            f'Nachbestellvorschläge generiert: {len(suggestions)} Garne'
-        )
+        from src.services.job_queue_service import enqueue, last_succeeded
+        from src.controllers.jobs_controller import job_started_response
+        
+        latest = last_succeeded('thread_low_stock_search')
+        if latest is None or request.args.get('refresh'):
+            # Web-Suche je Garn dauert - laeuft als Hintergrund-Job (job_queue_service)
+            job, created = enqueue('thread_low_stock_search', dedup_key='thread_low_stock_search',
+                                   created_by=current_user.username)
+            if created:
+                log_activity('thread_low_stock_search', f'Nachbestellvorschläge angefordert (Job #{job.id})')
+            target = url_for('thread.index') if latest is None else url_for('thread.low_stock_search')
+            return job_started_response(job, created, target)
         
         return render_template('threads/low_stock_search.html',
-                             suggestions=suggestions)
+                             suggestions=latest.result.get('suggestions', []),
+                             searched_at=latest.finished_at)
         
     except ImportError:
         flash('Garn-Web-Suchsystem nicht verfügbar. Führen Sie INSTALL_WEBSHOP_AUTOMATION.bat aus.', 'warning')
@@ -202,18 +208,14 @@ def search_suggestions():
 def auto_search_all_low_stock():
     """Startet automatische Suche für alle Garne mit niedrigem Lagerbestand"""
     try:
-        from src.services.thread_web_search_service import search_low_stock_threads
-        
-        # Starte Background-Task (vereinfacht)
-        suggestions = search_low_stock_threads()
+        from src.services.job_queue_service import enqueue
+        from src.controllers.jobs_controller import job_started_response
         
-        flash(f'Automatische Suche abgeschlossen. {len(suggestions)} Nachbestellvorschläge gefunden.', 'success')
+        # Suche laeuft als Hintergrund-Job (job_queue_service)
+        job, created = enqueue('thread_low_stock_search', dedup_key='thread_low_stock_search',
+                               created_by=current_user.username)
+        return job_started_response(job, created, url_for('thread.low_stock_search'))
         
-        return redirect(url_for('thread.low_stock_search'))
-        
-    except ImportError:
-        flash('Garn-Web-Suchsystem nicht verfügbar. Führen Sie INSTALL_WEBSHOP_AUTOMATION.bat aus.', 'warning')
-        return redirect(url_for('thread.index'))
     except Exception as e:
         flash(f'Fehler bei automatischer Suche: {str(e)}', 'error')
         return redirect(url_for('thread.index'))
@@ -199,8 +199,10 @@ def delete(user_id):
     except (ImportError, Exception):
         pass
 
-    # Benutzer löschen
+    # Benutzer löschen (Berechtigungs-Cache verwerfen, IDs koennen neu vergeben werden)
+    from src.utils.permissions import bump_permission_version
     db.session.delete(user)
+    bump_permission_version()
     db.session.commit()
     
     flash(f'Benutzer {username} wurde gelöscht!', 'success')
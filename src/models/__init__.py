@@ -171,6 +171,8 @@ try:
     from .buchhaltung import (
         Konto,
         BuchhaltungBuchung,
+        BuchhaltungPeriodensumme,
+        BuchhaltungPeriode,
         Kostenstelle,
         Geschaeftsjahr,
         UStVoranmeldung,
@@ -182,6 +184,8 @@ except ImportError:
     BUCHHALTUNG_AVAILABLE = False
     Konto = None
     BuchhaltungBuchung = None
+    BuchhaltungPeriodensumme = None
+    BuchhaltungPeriode = None
     Kostenstelle = None
     Geschaeftsjahr = None
     UStVoranmeldung = None
@@ -323,6 +327,8 @@ __all__ = [
     # Buchhaltung
     'Konto',
     'BuchhaltungBuchung',
+    'BuchhaltungPeriodensumme',
+    'BuchhaltungPeriode',
     'Kostenstelle',
     'Geschaeftsjahr',
     'UStVoranmeldung',
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+HINTERGRUND-JOB MODELL
+======================
+
+Erstellt von: Hans Hahn - Alle Rechte vorbehalten
+Zweck: Persistente Job-Queue fuer langsame Aufgaben (IMAP-, Bank- und
+       Kalender-Sync, Garn-Websuche). Die Abarbeitung steht in
+       src/services/job_queue_service.py.
+"""
+
+from datetime import datetime
+from src.models.models import db
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class BackgroundJob(db.Model):
+    """
+    Ein Job der Queue.
+    Status: queued -> running -> succeeded | failed (bei Fehler mit
+    Wiederholung zurueck auf queued, run_after = Zeitpunkt des naechsten Versuchs)
+    """
+    __tablename__ = 'background_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False, index=True)  # z.B. 'email_sync'
+    dedup_key = db.Column(db.String(100), nullable=False)  # z.B. 'email_sync:3'
+    payload = db.Column(db.JSON)
+
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime)  # Lease des Workers (abgelaufen = Worker weg)
+    worker = db.Column(db.String(100))  # host:pid:thread
+
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    progress = db.Column(db.JSON)  # {'done': 1500, 'total': 30000} waehrend der Laufzeit
+
+    created_by = db.Column(db.String(80))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    wait_ms = db.Column(db.Integer)  # Erstellt -> erster Start
+    duration_ms = db.Column(db.Integer)  # Laufzeit des letzten Versuchs
+
+    __table_args__ = (
+        # Pro Schluessel hoechstens ein offener Job (Doppelklicks, Wiederholungen)
+        db.Index('uq_background_job_active', 'dedup_key', unique=True,
+                 sqlite_where=db.text("status IN ('queued', 'running')"),
+                 postgresql_where=db.text("status IN ('queued', 'running')")),
+        db.Index('idx_background_job_due', 'status', 'run_after'),
+    )
+
+    @property
+    def is_active(self):
+        return self.status in ACTIVE_STATUSES
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_after': self.run_after.isoformat() if self.run_after else None,
+            'result': self.result,
+            'error': self.error,
+            'progress': self.progress,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'wait_ms': self.wait_ms,
+            'duration_ms': self.duration_ms,
+        }
+
+    def __repr__(self):
+        return f'<BackgroundJob {self.id} {self.job_type} {self.status}>'
+
+
+__all__ = ['BackgroundJob', 'ACTIVE_STATUSES']
@@ -2,7 +2,8 @@
 """
 Banking Models
 ==============
-BankAccount + BankTransaction fuer Bank-Synchronisation
+BankAccount + BankTransaction fuer Bank-Synchronisation,
+BankTransactionMatch fuer die Aufteilung einer Zahlung auf Rechnungen
 
 Erstellt von Hans Hahn - Alle Rechte vorbehalten
 """
@@ -84,3 +85,23 @@ class BankTransaction(db.Model):
 
     def __repr__(self):
         return f"<BankTransaction {self.transaction_date} {self.amount}€>"
+
+
+class BankTransactionMatch(db.Model):
+    """
+    Zuordnung einer Transaktion zu einer Rechnung mit Betrag - bei
+    Sammelzahlungen mehrere Zeilen je Transaktion. matched_invoice_id der
+    Transaktion zeigt weiterhin auf die erste Rechnung.
+    """
+    __tablename__ = 'bank_transaction_matches'
+
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('bank_transactions.id'), nullable=False, index=True)
+    rechnung_id = db.Column(db.Integer, db.ForeignKey('rechnungen.id'), nullable=False, index=True)
+    amount = db.Column(db.Numeric(12, 2), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    transaction = db.relationship('BankTransaction', backref=db.backref('matches', lazy='dynamic'))
+
+    def __repr__(self):
+        return f"<BankTransactionMatch {self.transaction_id} -> {self.rechnung_id} {self.amount}€>"
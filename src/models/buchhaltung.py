@@ -145,6 +145,45 @@ class BuchhaltungBuchung(db.Model):
         return f"<BuchhaltungBuchung {self.belegnummer} - {self.betrag_brutto}€>"
 
 
+class BuchhaltungPeriodensumme(db.Model):
+    """
+    Monatssumme der Buchungen je Konto, Buchungsart und MwSt-Satz
+    (ohne stornierte Buchungen). Grundlage für BWA, USt-VA und Cashflow;
+    gepflegt von src/services/buchhaltung_service.py.
+    """
+    __tablename__ = 'buchhaltung_periodensummen'
+    __table_args__ = (
+        db.UniqueConstraint('jahr', 'monat', 'konto_id', 'buchungs_art', 'mwst_satz',
+                            name='uq_buchhaltung_periodensumme'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    jahr = db.Column(db.Integer, nullable=False)
+    monat = db.Column(db.Integer, nullable=False)
+    konto_id = db.Column(db.Integer, nullable=False, default=0)  # 0 = ohne Konto
+    buchungs_art = db.Column(db.String(20), nullable=False, default='')
+    mwst_satz = db.Column(db.Numeric(5, 2), nullable=False, default=0)
+
+    summe_netto = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    summe_brutto = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    summe_mwst = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    anzahl = db.Column(db.Integer, nullable=False, default=0)
+
+
+class BuchhaltungPeriode(db.Model):
+    """
+    Stand der Monatssummen: `stale` erzwingt die Neuberechnung des Monats
+    beim nächsten Lesen.
+    """
+    __tablename__ = 'buchhaltung_perioden'
+
+    jahr = db.Column(db.Integer, primary_key=True)
+    monat = db.Column(db.Integer, primary_key=True)
+    stale = db.Column(db.Boolean, nullable=False, default=False)
+    berechnet_am = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class Kostenstelle(db.Model):
     """
     Kostenstellen für Kostenrechnung
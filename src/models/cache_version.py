@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+CACHE-VERSION MODELL
+====================
+
+Erstellt von: Hans Hahn - Alle Rechte vorbehalten
+Zweck: Versionsstempel fuer prozessweite Caches. Wer die zugrundeliegenden
+       Daten aendert, erhoeht die Version (bump); alle Gunicorn-Worker
+       erkennen so veraltete Cache-Eintraege mit einer einzigen Abfrage.
+"""
+
+from datetime import datetime
+from src.models.models import db
+
+
+class CacheVersion(db.Model):
+    """Ein Versionszaehler pro Cache (z.B. 'permissions')"""
+    __tablename__ = 'cache_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def get_version(cls, name):
+        """Aktuelle Version (0, wenn noch nie erhoeht)"""
+        table = cls.__table__
+        version = db.session.execute(
+            db.select(table.c.version).where(table.c.name == name)
+        ).scalar()
+        return version or 0
+
+    @classmethod
+    def bump(cls, name):
+        """
+        Version erhoehen. Laeuft in der aktuellen Transaktion, d.h. wird
+        zusammen mit der eigentlichen Aenderung committet.
+        """
+        table = cls.__table__
+        result = db.session.execute(
+            table.update().where(table.c.name == name)
+            .values(version=table.c.version + 1, updated_at=datetime.utcnow())
+        )
+        if result.rowcount == 0:
+            db.session.execute(table.insert().values(
+                name=name, version=1, updated_at=datetime.utcnow()))
+
+    def __repr__(self):
+        return f'<CacheVersion {self.name}={self.version}>'
+
+
+__all__ = ['CacheVersion']
@@ -32,6 +32,8 @@ class CSVImportJob(db.Model):
     # Spalten-Mapping (JSON: {"csv_header": "db_field"})
     column_mapping = db.Column(db.JSON)
     detected_headers = db.Column(db.JSON)
+    # Erste Datenzeilen (Listen wie detected_headers) fuer Vorschauen
+    sample_rows = db.Column(db.JSON)
 
     # Ergebnis
     total_rows = db.Column(db.Integer, default=0)
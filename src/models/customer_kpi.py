@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+KUNDEN-KENNZAHLEN MODELL
+========================
+
+Erstellt von: Hans Hahn - Alle Rechte vorbehalten
+Zweck: Vorberechnete Kennzahlen je Kunde (eine Zeile pro Kunde) fuer
+       CRM-Rankings und Kunden-Statistik, gepflegt von
+       src/services/customer_kpi_service.py.
+"""
+
+from src.models.models import db
+
+
+class CustomerKpi(db.Model):
+    """
+    Kennzahlen eines Kunden. Wird bei Auftrags-, Rechnungs-, Zahlungs- und
+    Kontakt-Aenderungen neu berechnet; `stale` erzwingt die Neuberechnung
+    beim naechsten Lesen. Zeitfenster (12/6 Monate) beziehen sich auf
+    `computed_on` und werden naechtlich neu aufgebaut.
+    """
+    __tablename__ = 'customer_kpis'
+
+    customer_id = db.Column(db.String(50), db.ForeignKey('customers.id', ondelete='CASCADE'), primary_key=True)
+
+    # Auftraege (ohne stornierte)
+    revenue_total = db.Column(db.Float, nullable=False, default=0, index=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0, index=True)
+    revenue_12m = db.Column(db.Float, nullable=False, default=0, index=True)
+    order_count_12m = db.Column(db.Integer, nullable=False, default=0)
+    revenue_6m = db.Column(db.Float, nullable=False, default=0)
+    avg_order_value = db.Column(db.Float, nullable=False, default=0)
+    max_order_value = db.Column(db.Float, nullable=False, default=0, index=True)
+    orders_completed = db.Column(db.Integer, nullable=False, default=0)
+    orders_cancelled = db.Column(db.Integer, nullable=False, default=0)
+    last_order_at = db.Column(db.DateTime)
+
+    # Rechnungen & Zahlungen
+    invoices_total = db.Column(db.Integer, nullable=False, default=0)
+    invoices_paid = db.Column(db.Integer, nullable=False, default=0)
+    invoices_overdue = db.Column(db.Integer, nullable=False, default=0)
+    overdue_amount = db.Column(db.Float, nullable=False, default=0, index=True)
+    avg_days_to_pay = db.Column(db.Float, index=True)  # Zahlung - Faelligkeit, None = keine Daten
+
+    # Kontakt
+    last_contact = db.Column(db.Date, index=True)
+
+    # Gesamtscore (0-100) fuer VIP-Ranking
+    vip_score = db.Column(db.Float, nullable=False, default=0, index=True)
+
+    stale = db.Column(db.Boolean, nullable=False, default=False, index=True)
+    computed_on = db.Column(db.Date, index=True)
+
+    def __repr__(self):
+        return f"<CustomerKpi {self.customer_id} revenue={self.revenue_total}>"
+
+
+__all__ = ['CustomerKpi']
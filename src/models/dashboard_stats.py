@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+DASHBOARD-STATISTIK MODELL
+==========================
+
+Erstellt von: Hans Hahn - Alle Rechte vorbehalten
+Zweck: Snapshot der Dashboard-Kennzahlen (eine Zeile pro Kennzahl),
+       gepflegt von src/services/dashboard_stats_service.py.
+"""
+
+from datetime import datetime
+from src.models.models import db
+
+
+class DashboardStat(db.Model):
+    """
+    Eine Dashboard-Kennzahl. Zaehler werden bei Aenderungen inkrementell
+    angepasst; `stale` erzwingt eine Neuberechnung beim naechsten Lesen.
+    """
+    __tablename__ = 'dashboard_stats'
+
+    stat_key = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0)
+    stale = db.Column(db.Boolean, nullable=False, default=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DashboardStat {self.stat_key}={self.value}>"
+
+
+__all__ = ['DashboardStat']
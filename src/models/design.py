@@ -217,49 +217,41 @@ class Design(db.Model):
             return False
 
         try:
-            import pyembroidery
             import os
+            from src.services.analysis_cache_service import cached_analysis, analyze_pattern_file
 
             if not os.path.exists(self.file_path):
                 return False
 
-            pattern = pyembroidery.read(self.file_path)
-            if not pattern:
+            # Analyse kommt bei bekanntem Dateiinhalt aus dem Analyse-Cache
+            read = {}
+            analysis = cached_analysis(self.file_path, 'pattern',
+                                       lambda path: analyze_pattern_file(path, keep_pattern=read))
+            if not analysis.get('success'):
                 return False
 
             # Bounds berechnen
-            bounds = pattern.bounds()
+            bounds = analysis['bounds']
             if bounds:
                 self.width_mm = round((bounds[2] - bounds[0]) / 10, 1)
                 self.height_mm = round((bounds[3] - bounds[1]) / 10, 1)
 
             # Stichzahl
-            self.stitch_count = len([s for s in pattern.stitches if s[2] in (0, 1)])  # Nur echte Stiche
+            self.stitch_count = analysis['stitch_count']  # Nur echte Stiche
 
             # Farben extrahieren
             colors = []
-            for i, thread in enumerate(pattern.threadlist):
-                color_data = {
+            for i, thread in enumerate(analysis['threads']):
+                colors.append({
                     'sequence': i + 1,
-                    'color_code': '',
-                    'color_name': '',
-                    'rgb': '#000000',
-                    'thread_brand': ''
-                }
-
-                if hasattr(thread, 'hex_color'):
-                    color_data['rgb'] = thread.hex_color()
-                if hasattr(thread, 'description'):
-                    color_data['color_name'] = thread.description or f'Farbe {i+1}'
-                if hasattr(thread, 'catalog_number'):
-                    color_data['color_code'] = thread.catalog_number or ''
-                if hasattr(thread, 'brand'):
-                    color_data['thread_brand'] = thread.brand or ''
-
-                colors.append(color_data)
+                    'color_code': thread['catalog_number'] or '',
+                    'color_name': thread['description'] or f'Farbe {i+1}',
+                    'rgb': thread['hex_color'] or '#000000',
+                    'thread_brand': thread['brand'] or ''
+                })
 
             # Farbwechsel zählen
-            self.color_changes = sum(1 for s in pattern.stitches if s[2] == pyembroidery.COLOR_CHANGE)
+            self.color_changes = analysis['color_changes']
 
             # Zeitschätzung (ca. 800 Stiche/Minute)
             if self.stitch_count:
@@ -282,8 +274,9 @@ class Design(db.Model):
 
             self.preview_generated_at = datetime.utcnow()
 
-            # Thumbnail generieren
-            self.generate_thumbnail(pattern=pattern)
+            # Thumbnail generieren (bei Cache-Treffer nur wenn es noch fehlt)
+            if read or not self.thumbnail_path:
+                self.generate_thumbnail(pattern=read.get('pattern'))
 
             return True
 
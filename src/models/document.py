@@ -471,6 +471,10 @@ class EmailAccount(db.Model):
     last_check = db.Column(db.DateTime)
     last_error = db.Column(db.Text)
     
+    # Inkrementeller IMAP-Sync (UIDs gelten nur solange UIDVALIDITY gleich bleibt)
+    imap_uidvalidity = db.Column(db.BigInteger)
+    imap_last_uid = db.Column(db.Integer)
+    
     # Zuordnung
     default_customer_id = db.Column(db.String(50), db.ForeignKey('customers.id'), nullable=True)
     
@@ -548,6 +552,11 @@ class ArchivedEmail(db.Model):
     archived_at = db.Column(db.DateTime, default=datetime.utcnow)
     archived_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     
+    __table_args__ = (
+        # Duplikatpruefung beim IMAP-Sync
+        db.Index('idx_archived_email_account_msgid', 'email_account_id', 'message_id'),
+    )
+    
     # Relationships
     customer = db.relationship('Customer', backref='archived_emails', foreign_keys=[customer_id])
     order = db.relationship('Order', backref='archived_emails', foreign_keys=[order_id])
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+ID-SEQUENZ MODELL
+=================
+
+Erstellt von: Hans Hahn - Alle Rechte vorbehalten
+Zweck: Zaehler pro ID-Praefix (z.B. 'articles.id:ART', 'orders.id:A2026-'),
+       atomar erhoeht von src/services/id_generator_service.py.
+"""
+
+from datetime import datetime
+from src.models.models import db
+
+
+class IdSequence(db.Model):
+    """
+    Letzte vergebene Nummer einer ID-Sequenz.
+    name = '<tabelle>.<spalte>:<praefix>'
+    """
+    __tablename__ = 'id_sequences'
+
+    name = db.Column(db.String(100), primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<IdSequence {self.name}={self.last_value}>'
+
+
+__all__ = ['IdSequence']
@@ -195,8 +195,9 @@ class Article(db.Model):
     price_recommended = db.Column(db.Float, default=0)  # VK empfohlen (EK x Faktor)
     
     # Lager
-    stock = db.Column(db.Integer, default=0)
+    stock = db.Column(db.Integer, default=0)  # freier Bestand (Reservierungen sind abgebucht)
     min_stock = db.Column(db.Integer, default=0)
+    stock_reserved = db.Column(db.Integer, default=0)  # laufender Saldo aktiver Reservierungen, NULL = nicht gefuehrt
     location = db.Column(db.String(100))
     
     # Lieferant
@@ -1360,6 +1361,7 @@ class ShellyDevice(db.Model):
     # Relationships
     machine = db.relationship('Machine', backref='shelly_devices')
     energy_readings = db.relationship('ShellyEnergyReading', backref='device', lazy='dynamic', cascade='all, delete-orphan')
+    energy_rollups = db.relationship('ShellyEnergyRollup', lazy='dynamic', cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<ShellyDevice {self.name} ({self.ip_address})>'
@@ -1396,6 +1398,44 @@ class ShellyEnergyReading(db.Model):
         return f'<EnergyReading {self.device_id} @ {self.timestamp}: {self.power_w}W>'
 
 
+class ShellyEnergyRollup(db.Model):
+    """
+    Verdichtete Messwerte je Gerät und Stunde bzw. Tag; bleiben erhalten,
+    wenn alte Rohdaten gelöscht werden. Gepflegt von
+    src/services/shelly_rollup_service.py.
+    """
+    __tablename__ = 'shelly_energy_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('device_id', 'period', 'bucket_start', name='uq_shelly_energy_rollup'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.Integer, db.ForeignKey('shelly_devices.id', ondelete='CASCADE'), nullable=False)
+    period = db.Column(db.String(10), nullable=False)  # 'hour' (UTC) oder 'day' (Ortszeit)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+
+    readings = db.Column(db.Integer, nullable=False, default=0)
+    energy_wh = db.Column(db.Float, nullable=False, default=0)  # Verbrauch (Summe der Zähler-Deltas)
+    energy_min_wh = db.Column(db.Float)  # Zählerstand min/max
+    energy_max_wh = db.Column(db.Float)
+    power_sum_w = db.Column(db.Float, nullable=False, default=0)  # für den Mittelwert
+    power_min_w = db.Column(db.Float)
+    power_max_w = db.Column(db.Float)
+    on_seconds = db.Column(db.Integer, nullable=False, default=0)
+
+    # Letzte Messung im Zeitraum (Delta/Laufzeit der nächsten Messung)
+    last_reading_at = db.Column(db.DateTime)
+    last_energy_wh = db.Column(db.Float)
+    last_is_on = db.Column(db.Boolean)
+
+    @property
+    def avg_power_w(self):
+        return self.power_sum_w / self.readings if self.readings else 0
+
+    def __repr__(self):
+        return f'<EnergyRollup {self.device_id} {self.period} {self.bucket_start}: {self.energy_wh}Wh>'
+
+
 class ShellyProductionEnergy(db.Model):
     """Energie-Verbrauch pro Produktionsauftrag"""
     __tablename__ = 'shelly_production_energy'
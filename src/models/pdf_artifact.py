@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+PDF-ARTEFAKT MODELL
+===================
+
+Erstellt von: Hans Hahn - Alle Rechte vorbehalten
+Zweck: Verzeichnis der gerenderten PDFs finalisierter Dokumente
+       (Rechnungen, Lieferscheine, Angebote). Die Bytes liegen
+       inhaltsadressiert (SHA-256) im PDF-Store auf der Platte, siehe
+       src/services/pdf_store_service.py.
+"""
+
+from datetime import datetime
+from src.models.models import db
+
+
+class PdfArtifact(db.Model):
+    """
+    Ein gerendertes PDF pro Dokument, Variante, Revision und Template-Version.
+    document_kind = Tabelle des Dokuments ('business_documents', 'rechnungen')
+    """
+    __tablename__ = 'pdf_artifacts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    document_kind = db.Column(db.String(50), nullable=False)
+    document_id = db.Column(db.String(50), nullable=False)
+    variant = db.Column(db.String(50), nullable=False)  # z.B. 'rechnung_zugferd', 'lieferschein'
+    revision = db.Column(db.String(64), nullable=False)  # Hash der Dokument-Spalten
+    template_version = db.Column(db.Integer, nullable=False)
+
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    size_bytes = db.Column(db.Integer)
+    render_ms = db.Column(db.Integer)  # Renderzeit beim Erstellen
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('document_kind', 'document_id', 'variant', 'revision', 'template_version',
+                            name='uq_pdf_artifact_key'),
+        db.Index('idx_pdf_artifact_document', 'document_kind', 'document_id'),
+    )
+
+    def __repr__(self):
+        return f'<PdfArtifact {self.document_kind}:{self.document_id} {self.variant} {self.sha256[:12]}>'
+
+
+__all__ = ['PdfArtifact']
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+SCHEDULER-LEASE MODELL
+======================
+
+Erstellt von: Hans Hahn - Alle Rechte vorbehalten
+Zweck: Wer fuehrt den APScheduler aus? Bei mehreren gunicorn-Workern
+       haelt genau ein Prozess die Lease und erneuert sie per Heartbeat
+       (siehe src/services/scheduler_leader_service.py).
+"""
+
+from datetime import datetime
+from src.models.models import db
+
+
+class SchedulerLease(db.Model):
+    """Eine Lease je Name (derzeit nur 'scheduler')"""
+    __tablename__ = 'scheduler_leases'
+
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(100), nullable=False)  # host:pid
+    acquired_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    heartbeat_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<SchedulerLease {self.name} {self.holder}>'
+
+
+__all__ = ['SchedulerLease']
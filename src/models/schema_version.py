@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+SCHEMA-VERSION MODELL
+=====================
+
+Erstellt von: Hans Hahn - Alle Rechte vorbehalten
+Zweck: Protokoll der angewendeten Schema-Migrationen
+       (siehe src/utils/schema_migrations.py).
+"""
+
+from datetime import datetime
+from src.models.models import db
+
+
+class SchemaVersion(db.Model):
+    """
+    Eine Zeile pro angewendeter Migration.
+    Version 0 ist reserviert fuer db.create_all() und speichert in `details`
+    die bekannten Tabellennamen (JSON-Liste).
+    """
+    __tablename__ = 'schema_versions'
+
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    details = db.Column(db.Text)
+    duration_ms = db.Column(db.Integer, default=0)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SchemaVersion {self.version}: {self.name}>'
+
+
+__all__ = ['SchemaVersion']
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+ANALYSE-CACHE FUER STICKDATEIEN
+===============================
+Ergebnisse von Datei-Analysen (DST/PES/...) werden nach Inhalts-Hash
+(SHA-256) und Analyzer-Version auf der Platte abgelegt. Jede Analyse laeuft
+so einmal pro eindeutiger Datei - egal ob Design-Archiv, Datei-Browser,
+Auftrag oder Auftrags-Wizard sie anfordert, und egal unter welchem Pfad
+die Datei liegt.
+
+Ablage: <ANALYSIS_CACHE_DIR>/<hash[:2]>/<hash>.<analyzer>.v<version>.json
+(Standard: instance/analysis_cache). Schreiben erfolgt atomar (os.replace),
+damit mehrere Gunicorn-Worker den Cache gefahrlos teilen.
+
+Aendert sich das Ergebnisformat eines Analyzers, die Version in
+ANALYZER_VERSIONS erhoehen - alte Eintraege werden dann nicht mehr gelesen.
+
+Nutzung:
+    from src.services.analysis_cache_service import cached_analysis
+    result = cached_analysis(path, 'dst_complete', analyze_dst_file_complete)
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+# Analyzer -> Version des Ergebnisformats
+ANALYZER_VERSIONS = {
+    'dst_complete': 1,     # dst_analyzer.analyze_dst_file_complete
+    'dst_basic': 1,        # file_analysis.analyze_dst_file
+    'embroidery': 1,       # file_analysis.analyze_embroidery_file
+    'pattern': 1,          # pyembroidery-Auswertung (Design, Auftrags-Wizard)
+    'table_layout': 1,     # table_reader_service.sniff_layout (Excel/CSV-Importe)
+}
+
+# Schluessel, die vom Dateipfad abhaengen und beim Lesen ersetzt werden
+_PATH_KEYS = ('filepath', 'filename')
+
+_HASH_CHUNK = 1024 * 1024
+_HASH_MEMO_SIZE = 2048
+
+_lock = threading.Lock()
+_hash_memo = {}  # (pfad, groesse, mtime_ns) -> sha256
+_stats = {
+    'hits': 0,
+    'misses': 0,
+    'stores': 0,
+    'errors': 0,
+    'bypassed': 0,   # kein Cache-Verzeichnis / kein App-Kontext
+}
+_per_analyzer = {}  # analyzer -> {'hits': n, 'misses': n}
+
+
+def get_cache_dir():
+    """Cache-Verzeichnis aus der App-Konfiguration (None = Cache aus)"""
+    if not has_app_context():
+        return None
+    return current_app.config.get('ANALYSIS_CACHE_DIR')
+
+
+def file_hash(filepath):
+    """
+    SHA-256 des Dateiinhalts. Innerhalb eines Prozesses wird der Hash pro
+    (Pfad, Groesse, Aenderungszeit) gemerkt, damit unveraenderte Dateien
+    nicht erneut gelesen werden.
+    """
+    st = os.stat(filepath)
+    memo_key = (os.path.abspath(filepath), st.st_size, st.st_mtime_ns)
+    with _lock:
+        digest = _hash_memo.get(memo_key)
+    if digest:
+        return digest
+
+    sha = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _lock:
+        if len(_hash_memo) >= _HASH_MEMO_SIZE:
+            _hash_memo.clear()
+        _hash_memo[memo_key] = digest
+    return digest
+
+
+def _entry_path(cache_dir, digest, analyzer):
+    version = ANALYZER_VERSIONS[analyzer]
+    return os.path.join(cache_dir, digest[:2], f"{digest}.{analyzer}.v{version}.json")
+
+
+def _count(key, analyzer=None):
+    with _lock:
+        _stats[key] += 1
+        if analyzer:
+            _per_analyzer.setdefault(analyzer, {'hits': 0, 'misses': 0})[key] += 1
+
+
+def _read_entry(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Analyse-Cache-Eintrag unlesbar ({path}): {e}")
+        return None
+
+
+def _write_entry(path, result):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _with_path(result, filepath):
+    """Pfadabhaengige Schluessel auf die angefragte Datei setzen"""
+    values = {'filepath': filepath, 'filename': os.path.basename(filepath)}
+    for key in _PATH_KEYS:
+        if key in result:
+            result[key] = values[key]
+    return result
+
+
+def cached_analysis(filepath, analyzer, func):
+    """
+    Liefert das Analyse-Ergebnis aus dem Cache oder fuehrt func(filepath)
+    aus und speichert es. Nur erfolgreiche Ergebnisse (Dict ohne
+    'success': False) werden gespeichert.
+
+    Args:
+        filepath: Pfad der Stickdatei
+        analyzer: Schluessel aus ANALYZER_VERSIONS
+        func: Analyse-Funktion, liefert ein JSON-serialisierbares Dict
+
+    Returns:
+        dict: Analyse-Ergebnis
+    """
+    cache_dir = get_cache_dir()
+    if not cache_dir or not filepath or not os.path.isfile(filepath):
+        _count('bypassed')
+        return func(filepath)
+
+    try:
+        path = _entry_path(cache_dir, file_hash(filepath), analyzer)
+    except OSError as e:
+        logger.warning(f"Analyse-Cache: Hash fuer {filepath} fehlgeschlagen: {e}")
+        _count('errors')
+        return func(filepath)
+
+    cached = _read_entry(path)
+    if cached is not None:
+        _count('hits', analyzer)
+        return _with_path(cached, filepath)
+
+    _count('misses', analyzer)
+    result = func(filepath)
+    if isinstance(result, dict) and result.get('success', True) is not False:
+        try:
+            _write_entry(path, result)
+            _count('stores')
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Analyse-Cache: Ergebnis nicht gespeichert: {e}")
+            _count('errors')
+    return result
+
+
+def get_analysis_cache_stats():
+    """Zaehler dieses Prozesses (Kopie)"""
+    with _lock:
+        stats = dict(_stats)
+        stats['by_analyzer'] = {k: dict(v) for k, v in _per_analyzer.items()}
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+    stats['cache_dir'] = get_cache_dir()
+    return stats
+
+
+def reset_analysis_cache_stats():
+    """Setzt alle Zaehler auf 0"""
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0
+        _per_analyzer.clear()
+
+
+# ==========================================
+# PYEMBROIDERY-AUSWERTUNG (gemeinsam fuer Design + Wizard)
+# ==========================================
+
+def analyze_pattern_file(filepath, keep_pattern=None):
+    """
+    Liest eine Stickdatei mit pyembroidery und liefert die Rohdaten fuer
+    Design.analyze_embroidery_file() und den Auftrags-Wizard.
+
+    Args:
+        keep_pattern: optionales Dict; bei einer echten Analyse wird das
+                      gelesene Pattern unter 'pattern' abgelegt (Thumbnail)
+    """
+    import pyembroidery
+
+    pattern = pyembroidery.read(filepath)
+    if not pattern:
+        return {'success': False, 'error': 'Datei konnte nicht gelesen werden'}
+    if keep_pattern is not None:
+        keep_pattern['pattern'] = pattern
+
+    bounds = pattern.bounds()
+    threads = []
+    for thread in pattern.threadlist:
+        threads.append({
+            'hex_color': thread.hex_color() if hasattr(thread, 'hex_color') else '#000000',
+            'description': getattr(thread, 'description', None),
+            'catalog_number': getattr(thread, 'catalog_number', None),
+            'brand': getattr(thread, 'brand', None),
+        })
+
+    return {
+        'success': True,
+        'bounds': list(bounds) if bounds else None,
+        # STITCH (0) + JUMP (1), wie bisher in Design gezaehlt
+        'stitch_count': sum(1 for s in pattern.stitches if s[2] in (0, 1)),
+        # Nur STITCH-Befehle (Auftrags-Wizard)
+        'stitch_commands': sum(1 for s in pattern.stitches if s[2] == pyembroidery.STITCH),
+        'color_changes': sum(1 for s in pattern.stitches if s[2] == pyembroidery.COLOR_CHANGE),
+        'threads': threads,
+    }
+
+
+# ==========================================
+# VORWAERMEN (Design-Archiv)
+# ==========================================
+
+_EMBROIDERY_EXTENSIONS = ('.dst', '.pes', '.jef', '.exp', '.vp3', '.hus', '.xxx', '.pec', '.emb', '.sew')
+
+
+def prewarm_design_archive(limit=None, progress=None):
+    """
+    Analysiert alle Stickdateien des Design-Archivs, die noch nicht im
+    Cache liegen. Gleiche Dateien (gleicher Hash) werden nur einmal gelesen.
+
+    Args:
+        limit: maximale Anzahl Designs (None = alle)
+        progress: optionaler Callback progress(done, total)
+
+    Returns:
+        dict mit Zaehlern (designs, analyzed, cached, missing, failed)
+    """
+    from src.models.models import db
+    from src.models.design import Design
+    from src.utils.dst_analyzer import analyze_dst_file_complete
+
+    query = db.session.query(Design.file_path).filter(
+        Design.file_path.isnot(None),
+        Design.design_type == 'embroidery'
+    ).order_by(Design.id)
+    if limit:
+        query = query.limit(limit)
+    paths = [p for (p,) in query if p and p.lower().endswith(_EMBROIDERY_EXTENSIONS)]
+
+    report = {'designs': len(paths), 'analyzed': 0, 'cached': 0, 'missing': 0, 'failed': 0}
+    for done, path in enumerate(paths, start=1):
+        if not os.path.isfile(path):
+            report['missing'] += 1
+            continue
+
+        before = _stats['misses']
+        try:
+            result = cached_analysis(path, 'pattern', analyze_pattern_file)
+            if path.lower().endswith('.dst'):
+                cached_analysis(path, 'dst_complete', analyze_dst_file_complete)
+        except Exception as e:
+            logger.warning(f"Vorwaermen fehlgeschlagen fuer {path}: {e}")
+            report['failed'] += 1
+            continue
+
+        if result.get('success') is False:
+            report['failed'] += 1
+        elif _stats['misses'] > before:
+            report['analyzed'] += 1
+        else:
+            report['cached'] += 1
+        if progress:
+            progress(done, len(paths))
+
+    return report
+
+
+__all__ = [
+    'ANALYZER_VERSIONS',
+    'cached_analysis',
+    'file_hash',
+    'analyze_pattern_file',
+    'prewarm_design_archive',
+    'get_analysis_cache_stats',
+    'reset_analysis_cache_stats',
+]
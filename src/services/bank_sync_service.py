@@ -15,7 +15,7 @@ from decimal import Decimal
 from typing import Dict, List, Optional
 
 from src.models import db
-from src.models.banking import BankAccount, BankTransaction
+from src.models.banking import BankAccount, BankTransaction, BankTransactionMatch
 
 logger = logging.getLogger(__name__)
 
@@ -101,45 +101,43 @@ class BankSyncService:
 
     def auto_match_transactions(self, account_id: int) -> Dict:
         """
-        Automatischer Abgleich ungematchter Transaktionen mit offenen Rechnungen.
+        Automatischer Abgleich ungematchter Transaktionen mit offenen Rechnungen
+        (indizierter Abgleich, siehe reconciliation_service).
 
         Returns:
             Dict mit matched, unmatched
         """
-        from src.models.rechnungsmodul.models import Rechnung, RechnungsStatus
+        from src.services.reconciliation_service import (
+            AUTO_CONFIDENCE, ReconciliationEngine, load_open_invoices,
+        )
 
         unmatched = BankTransaction.query.filter_by(
             bank_account_id=account_id,
             match_status='unmatched',
-        ).filter(BankTransaction.amount > 0).all()
+        ).filter(BankTransaction.amount > 0).order_by(BankTransaction.transaction_date).all()
 
         if not unmatched:
             return {'matched': 0, 'unmatched': 0}
 
-        # Offene Rechnungen laden
-        offene_rechnungen = Rechnung.query.filter(
-            Rechnung.status.in_([RechnungsStatus.GESENDET, RechnungsStatus.FAELLIG, RechnungsStatus.UEBERFAELLIG])
-        ).all()
+        engine = ReconciliationEngine(load_open_invoices())
 
         matched = 0
         for tx in unmatched:
-            best_match = None
-            best_confidence = 0
-
-            for rechnung in offene_rechnungen:
-                confidence = self._calc_match_confidence(tx, rechnung)
-                if confidence > best_confidence:
-                    best_confidence = confidence
-                    best_match = rechnung
-
-            if best_match and best_confidence >= 50:
-                tx.matched_invoice_id = best_match.id
-                tx.match_confidence = best_confidence
-                tx.match_status = 'auto' if best_confidence >= 80 else 'unmatched'
-                if best_confidence >= 80:
-                    matched += 1
+            match = engine.match(tx.amount, tx.purpose, tx.applicant_name)
+            if match is None:
+                continue
+            tx.matched_invoice_id = match.invoices[0].id
+            tx.match_confidence = match.confidence
+            if match.confidence >= AUTO_CONFIDENCE:
+                tx.match_status = 'auto'
+                for invoice, cents in zip(match.invoices, match.allocations):
+                    db.session.add(BankTransactionMatch(transaction_id=tx.id, rechnung_id=invoice.id,
+                                                        amount=Decimal(cents) / 100))
+                matched += 1
 
         db.session.commit()
+        logger.info(f"Auto-Abgleich Konto {account_id}: {matched}/{len(unmatched)} zugeordnet, "
+                    f"{engine.pairs_scored} Paare bewertet")
         return {'matched': matched, 'unmatched': len(unmatched) - matched}
 
     def manual_match(self, tx_id: int, invoice_id: int) -> bool:
@@ -151,6 +149,8 @@ class BankSyncService:
         tx.matched_invoice_id = invoice_id
         tx.match_status = 'manual'
         tx.match_confidence = 100
+        tx.matches.delete()
+        db.session.add(BankTransactionMatch(transaction_id=tx.id, rechnung_id=invoice_id, amount=tx.amount))
         db.session.commit()
         return True
 
@@ -185,27 +185,3 @@ class BankSyncService:
         """Erzeugt eindeutigen Hash fuer eine Transaktion"""
         data = f"{account_id}|{tx.get('date')}|{tx.get('amount')}|{tx.get('purpose', '')}|{tx.get('applicant_name', '')}"
         return hashlib.sha256(data.encode()).hexdigest()
-
-    def _calc_match_confidence(self, tx: BankTransaction, rechnung) -> int:
-        """Berechnet Uebereinstimmung zwischen Transaktion und Rechnung"""
-        confidence = 0
-
-        # Betrag-Match
-        if rechnung.brutto_gesamt:
-            diff = abs(tx.amount - rechnung.brutto_gesamt)
-            if diff <= Decimal('0.01'):
-                confidence += 35
-
-        # Rechnungsnummer im Verwendungszweck
-        purpose_upper = (tx.purpose or '').upper()
-        if rechnung.rechnungsnummer and rechnung.rechnungsnummer.upper() in purpose_upper:
-            confidence += 50
-
-        # Kundenname
-        if tx.applicant_name and rechnung.kunde_name:
-            name_upper = rechnung.kunde_name.upper()
-            app_upper = tx.applicant_name.upper()
-            if name_upper in app_upper or app_upper in name_upper:
-                confidence += 15
-
-        return min(confidence, 100)
@@ -237,15 +237,20 @@ class BankingService:
 
     def match_transactions_to_invoices(self, transactions, invoices):
         """
-        Ordnet Transaktionen automatisch Rechnungen zu
+        Ordnet Transaktionen automatisch Rechnungen zu (indizierter Abgleich,
+        siehe reconciliation_service). Bei Sammelzahlungen entsteht je
+        Rechnung ein Match mit dem zugeordneten Teilbetrag ('amount').
 
         Args:
             transactions: Liste von Transaktionen
             invoices: Liste von offenen Rechnungen
 
         Returns:
-            List[Dict]: Matches (transaction, invoice, confidence)
+            List[Dict]: Matches (transaction, invoice, amount, confidence)
         """
+        from src.services.reconciliation_service import AUTO_CONFIDENCE, ReconciliationEngine
+
+        engine = ReconciliationEngine(invoices)
         matches = []
 
         for transaction in transactions:
@@ -253,49 +258,20 @@ class BankingService:
             if transaction['amount'] <= 0:
                 continue
 
-            purpose = transaction['purpose'].upper()
-            amount = Decimal(str(transaction['amount']))
-
-            for invoice in invoices:
-                confidence = 0
-                reasons = []
-
-                # Match nach Rechnungsnummer im Verwendungszweck
-                if invoice.rechnungsnummer in purpose:
-                    confidence += 50
-                    reasons.append("Rechnungsnummer gefunden")
-
-                # Match nach Betrag (mit Toleranz von 0.01 EUR)
-                invoice_amount = Decimal(str(invoice.offener_betrag))
-                if abs(amount - invoice_amount) <= Decimal('0.01'):
-                    confidence += 30
-                    reasons.append("Betrag stimmt überein")
-
-                # Match nach Kundenname
-                kunde_name = invoice.kunde_name.upper()
-                applicant_name = transaction['applicant_name'].upper()
-
-                if kunde_name in applicant_name or applicant_name in kunde_name:
-                    confidence += 15
-                    reasons.append("Kundenname gefunden")
-
-                # Match nach Datum (innerhalb 7 Tage nach Fälligkeit)
-                trans_date = transaction['date']
-                days_diff = (trans_date - invoice.faelligkeitsdatum).days
-
-                if 0 <= days_diff <= 7:
-                    confidence += 5
-                    reasons.append("Zeitlich passend")
-
-                # Nur Matches mit ausreichender Confidence
-                if confidence >= 50:
-                    matches.append({
-                        'transaction': transaction,
-                        'invoice': invoice,
-                        'confidence': confidence,
-                        'reasons': reasons,
-                        'recommended_action': 'auto_match' if confidence >= 80 else 'manual_review'
-                    })
+            match = engine.match(transaction['amount'], transaction['purpose'],
+                                 transaction['applicant_name'])
+            if match is None:
+                continue
+
+            for record, cents in zip(match.invoices, match.allocations):
+                matches.append({
+                    'transaction': transaction,
+                    'invoice': record.ref,
+                    'amount': Decimal(cents) / 100,
+                    'confidence': match.confidence,
+                    'reasons': match.reasons,
+                    'recommended_action': 'auto_match' if match.confidence >= AUTO_CONFIDENCE else 'manual_review'
+                })
 
         # Nach Confidence sortieren
         matches.sort(key=lambda x: x['confidence'], reverse=True)
@@ -331,11 +307,12 @@ class BankingService:
             try:
                 transaction = match['transaction']
                 invoice = match['invoice']
+                amount = match.get('amount', transaction['amount'])
 
                 # Prüfe ob schon gebucht
                 existing = RechnungsZahlung.query.filter_by(
                     rechnung_id=invoice.id,
-                    zahlungsbetrag=transaction['amount']
+                    zahlungsbetrag=amount
                 ).filter(
                     RechnungsZahlung.zahlungsdatum == transaction['date']
                 ).first()
@@ -350,7 +327,7 @@ class BankingService:
                 zahlung = RechnungsZahlung(
                     rechnung_id=invoice.id,
                     zahlungsdatum=transaction['date'],
-                    zahlungsbetrag=transaction['amount'],
+                    zahlungsbetrag=amount,
                     zahlungsart='Überweisung',
                     referenz=f"Auto-Import: {transaction['purpose'][:100]}",
                     bemerkungen=f"Automatisch zugeordnet (Confidence: {match['confidence']}%)\n"
@@ -361,7 +338,7 @@ class BankingService:
                 db.session.add(zahlung)
 
                 # Rechnung aktualisieren
-                invoice.bezahlt_betrag = (invoice.bezahlt_betrag or 0) + transaction['amount']
+                invoice.bezahlt_betrag = (invoice.bezahlt_betrag or 0) + amount
 
                 if invoice.bezahlt_betrag >= invoice.brutto_gesamt:
                     invoice.status = 'bezahlt'
@@ -370,7 +347,7 @@ class BankingService:
                 db.session.commit()
 
                 stats['auto_booked'] += 1
-                logger.info(f"Zahlung für {invoice.rechnungsnummer} automatisch gebucht: {transaction['amount']} EUR")
+                logger.info(f"Zahlung für {invoice.rechnungsnummer} automatisch gebucht: {amount} EUR")
 
             except Exception as e:
                 logger.error(f"Fehler beim Auto-Buchen: {str(e)}")
@@ -8,21 +8,38 @@ Export-Funktionen für:
 - GoBD-konformer Export
 - Excel-Export für Steuerberater
 
+DATEV- und GoBD-Exporte werden als Folge von Byte-Blöcken erzeugt
+(stream_*/iter_*): Buchungen werden seitenweise gelesen (yield_per), CSV-
+Zeilen und Belege direkt in einen ZIP-Strom geschrieben und Prüfsummen
+beim Schreiben berechnet. Der Speicherbedarf hängt damit nicht von der
+Größe des Geschäftsjahres ab. Die Blöcke gehen entweder direkt in die
+HTTP-Antwort oder per write_export() in eine Datei (Job-Queue).
+
 Erstellt von Hans Hahn - Alle Rechte vorbehalten
 """
 
 import os
 import csv
 import json
+import time
+import hashlib
+import tempfile
 import zipfile
 from datetime import datetime, date
 from decimal import Decimal
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
 from io import StringIO, BytesIO
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Buchungen je Datenbank-Abruf beim Export
+EXPORT_YIELD_PER = 500
+# CSV-Daten in Blöcken dieser Größe weitergeben (Zeichen)
+EXPORT_CHUNK_SIZE = 64 * 1024
+# Rechnungen je Abfrage beim Sammeln der Belege
+BELEGE_BATCH = 100
+
 # Excel-Export
 try:
     from openpyxl import Workbook
@@ -32,6 +49,203 @@ except ImportError:
     OPENPYXL_AVAILABLE = False
 
 
+# ============================================================================
+# STREAMING-HILFEN
+# ============================================================================
+
+def iter_rows(buchungen: Iterable) -> Iterable:
+    """Query seitenweise lesen (yield_per), Listen unverändert durchreichen"""
+    if hasattr(buchungen, 'yield_per'):
+        return buchungen.yield_per(EXPORT_YIELD_PER)
+    return buchungen
+
+
+def csv_chunks(rows: Iterable[List], chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """CSV-Zeilen (Semikolon, UTF-8) als Byte-Blöcke"""
+    buffer = StringIO()
+    writer = csv.writer(buffer, delimiter=';', quoting=csv.QUOTE_MINIMAL)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _file_chunks(path: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class _StreamSink:
+    """Nicht-seekbares Schreibziel für zipfile; sammelt Bytes bis zum Abholen"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ZipStream:
+    """
+    ZIP-Archiv als Folge von Byte-Blöcken.
+
+    Einträge werden nacheinander geschrieben (Data Descriptors, kein Seek);
+    MD5/SHA256 jedes Eintrags werden beim Schreiben berechnet (checksums).
+
+        stream = ZipStream()
+        yield from stream.add('a.csv', csv_chunks(rows))
+        yield from stream.close()
+    """
+
+    def __init__(self):
+        self._sink = _StreamSink()
+        self._zip = zipfile.ZipFile(self._sink, 'w', zipfile.ZIP_DEFLATED)
+        self.checksums = {}  # Dateiname -> (md5, sha256) des unkomprimierten Inhalts
+
+    def add(self, name: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Eintrag aus Byte-Blöcken schreiben, komprimierte Blöcke liefern"""
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        md5, sha256 = hashlib.md5(), hashlib.sha256()
+        # Groesse steht beim Streamen noch nicht fest: ZIP64-Header immer
+        # schreiben, sonst bricht ein Eintrag ueber 2 GiB beim Schliessen ab
+        with self._zip.open(info, 'w', force_zip64=True) as entry:
+            for chunk in chunks:
+                md5.update(chunk)
+                sha256.update(chunk)
+                entry.write(chunk)
+                data = self._sink.drain()
+                if data:
+                    yield data
+        self.checksums[name] = (md5.hexdigest(), sha256.hexdigest())
+        data = self._sink.drain()
+        if data:
+            yield data
+
+    def add_text(self, name: str, text: str) -> Iterator[bytes]:
+        return self.add(name, [text.encode('utf-8')])
+
+    def close(self) -> Iterator[bytes]:
+        """Zentralverzeichnis schreiben"""
+        self._zip.close()
+        yield self._sink.drain()
+
+
+def write_export(chunks: Iterable[bytes], filename: str, directory: str = None) -> Dict[str, Any]:
+    """
+    Byte-Blöcke in eine Datei schreiben (temporäre Datei, dann umbenennen).
+    Standardverzeichnis: EXPORT_DIR der App (instance/exports).
+    """
+    if directory is None:
+        from flask import current_app
+        directory = current_app.config.get('EXPORT_DIR') or os.path.join(current_app.instance_path, 'exports')
+    os.makedirs(directory, exist_ok=True)
+
+    sha256 = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                sha256.update(chunk)
+                size += len(chunk)
+        path = os.path.join(directory, filename)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return {'datei': filename, 'pfad': path, 'groesse': size, 'sha256': sha256.hexdigest()}
+
+
+def _kontonummern() -> Dict[int, str]:
+    """Konto-ID -> Kontonummer (eine Abfrage statt Lazy-Load je Buchung)"""
+    from src.models import db
+    from src.models.buchhaltung import Konto
+    return dict(db.session.query(Konto.id, Konto.kontonummer))
+
+
+def datev_query(datum_von: date, datum_bis: date):
+    """Nicht stornierte Buchungen des Zeitraums (für DATEV), nach Datum sortiert"""
+    from src.models.buchhaltung import BuchhaltungBuchung as Buchung
+    return Buchung.query.filter(
+        Buchung.buchungsdatum >= datum_von,
+        Buchung.buchungsdatum <= datum_bis,
+        Buchung.ist_storniert == False
+    ).order_by(Buchung.buchungsdatum, Buchung.id)
+
+
+def gobd_query(jahr: int):
+    """Alle Buchungen des Geschäftsjahres (inkl. Stornos, für GoBD)"""
+    from src.models.buchhaltung import BuchhaltungBuchung as Buchung
+    return Buchung.query.filter(
+        Buchung.buchungsdatum >= date(jahr, 1, 1),
+        Buchung.buchungsdatum <= date(jahr, 12, 31)
+    ).order_by(Buchung.buchungsdatum, Buchung.id)
+
+
+def export_stream(art: str, datum_von: date = None, datum_bis: date = None,
+                  jahr: int = None) -> Tuple[str, str, Iterator[bytes]]:
+    """
+    (Dateiname, MIME-Typ, Byte-Blöcke) für einen Buchhaltungs-Export
+    
+    Args:
+        art: 'datev', 'datev_belege' oder 'gobd'
+    """
+    if art == 'datev':
+        chunks = DATEVExporter().iter_buchungen(datev_query(datum_von, datum_bis), datum_von, datum_bis)
+        return 'DATEV_Export.csv', 'text/csv', chunks
+    if art == 'datev_belege':
+        chunks = DATEVExporter().stream_with_receipts(datev_query(datum_von, datum_bis), datum_von, datum_bis)
+        filename = f'DATEV_Belege_{datum_von.strftime("%Y%m%d")}_{datum_bis.strftime("%Y%m%d")}.zip'
+        return filename, 'application/zip', chunks
+    if art == 'gobd':
+        from src.models.models import Customer, Supplier
+        chunks = GoBDExporter().stream_gobd_paket(jahr, gobd_query(jahr), Customer.query.order_by(Customer.id),
+                                                  Supplier.query.order_by(Supplier.id))
+        return f'GoBD_{jahr}.zip', 'application/zip', chunks
+    raise ValueError(f'Unbekannte Export-Art: {art}')
+
+
+def run_export_job(art: str, datum_von: str = None, datum_bis: str = None, jahr: int = None) -> Dict[str, Any]:
+    """
+    Job-Queue: Export in eine Datei unter EXPORT_DIR schreiben
+    (Datumswerte als ISO-String im Payload)
+    """
+    filename, mimetype, chunks = export_stream(
+        art,
+        date.fromisoformat(datum_von) if datum_von else None,
+        date.fromisoformat(datum_bis) if datum_bis else None,
+        int(jahr) if jahr else None,
+    )
+    result = write_export(chunks, f'{datetime.now().strftime("%Y%m%d%H%M%S")}_{filename}')
+    return {'datei': result['datei'], 'groesse': result['groesse'], 'sha256': result['sha256'],
+            'mimetype': mimetype}
+
+
 class DATEVExporter:
     """
     DATEV-kompatibler Export (ASCII-Format)
@@ -97,22 +311,28 @@ class DATEVExporter:
         Returns:
             CSV-String im DATEV-Format
         """
-        output = StringIO()
-        writer = csv.writer(output, delimiter=';', quoting=csv.QUOTE_MINIMAL)
-        
-        # Header-Zeile
-        header = self._create_header(datum_von, datum_bis)
-        writer.writerow(header)
+        return b''.join(self.iter_buchungen(buchungen, datum_von, datum_bis)).decode('utf-8')
+    
+    def iter_buchungen(self, buchungen: Iterable, datum_von: date, datum_bis: date,
+                       on_buchung=None) -> Iterator[bytes]:
+        """
+        DATEV-Buchungsstapel als Byte-Blöcke
         
-        # Spaltenüberschriften
-        writer.writerow(self.BUCHUNG_FIELDS[:20])  # Wichtigste Felder
+        Args:
+            buchungen: Query (wird seitenweise gelesen) oder Liste
+            on_buchung: Optional - Callback je exportierter Buchung
+        """
+        kontonummern = _kontonummern()
         
-        # Buchungen
-        for buchung in buchungen:
-            row = self._format_buchung(buchung)
-            writer.writerow(row)
+        def rows():
+            yield self._create_header(datum_von, datum_bis)
+            yield self.BUCHUNG_FIELDS[:20]  # Wichtigste Felder
+            for buchung in iter_rows(buchungen):
+                if on_buchung:
+                    on_buchung(buchung)
+                yield self._format_buchung(buchung, kontonummern)
         
-        return output.getvalue()
+        return csv_chunks(rows())
     
     def _create_header(self, datum_von: date, datum_bis: date) -> List[str]:
         """Erstellt DATEV-Header"""
@@ -145,8 +365,11 @@ class DATEVExporter:
             self.kontenrahmen
         ]
     
-    def _format_buchung(self, buchung) -> List[str]:
+    def _format_buchung(self, buchung, kontonummern: Dict[int, str] = None) -> List[str]:
         """Formatiert eine Buchung für DATEV"""
+        if kontonummern is None:
+            kontonummern = _kontonummern()
+        
         # Betrag formatieren (DATEV: Komma als Dezimaltrenner, kein Tausender)
         betrag = str(abs(buchung.betrag_brutto or buchung.betrag_netto)).replace('.', ',')
         
@@ -157,8 +380,8 @@ class DATEVExporter:
             soll_haben = 'S'  # Soll (Aufwand)
         
         # Konten
-        konto = buchung.konto.kontonummer if buchung.konto else ''
-        gegenkonto = buchung.gegenkonto.kontonummer if buchung.gegenkonto else ''
+        konto = kontonummern.get(buchung.konto_id, '')
+        gegenkonto = kontonummern.get(buchung.gegenkonto_id, '')
         
         # Datum (DDMM)
         belegdatum = buchung.buchungsdatum.strftime('%d%m') if buchung.buchungsdatum else ''
@@ -189,94 +412,105 @@ class DATEVExporter:
 
     def export_with_receipts(self, buchungen: List, datum_von: date, datum_bis: date) -> bytes:
         """
-        DATEV-Export mit zugehoerigen Belegen als ZIP.
+        DATEV-Export mit zugehoerigen Belegen als ZIP (im Speicher).
+        Für große Zeiträume stream_with_receipts() verwenden.
+        """
+        return b''.join(self.stream_with_receipts(buchungen, datum_von, datum_bis))
 
-        Erstellt ZIP mit:
+    def stream_with_receipts(self, buchungen: Iterable, datum_von: date, datum_bis: date) -> Iterator[bytes]:
+        """
+        DATEV-Export mit zugehoerigen Belegen als ZIP-Strom.
+
+        ZIP mit:
         - EXTF_Buchungsstapel.csv (DATEV-Format)
         - belege/RE-xxx.pdf (verknuepfte Rechnungs-PDFs)
+        - INFO.txt
 
         Args:
-            buchungen: Liste von BuchhaltungBuchung-Objekten
+            buchungen: Query (wird seitenweise gelesen) oder Liste
             datum_von: Startdatum
             datum_bis: Enddatum
 
         Returns:
-            ZIP-Datei als Bytes
+            Generator mit ZIP-Bytes; es liegt höchstens ein Beleg im Speicher
         """
-        # 1. DATEV-CSV generieren
-        csv_content = self.export_buchungen(buchungen, datum_von, datum_bis)
-
-        # 2. Verknuepfte Dokumente sammeln
+        stream = ZipStream()
         rechnung_ids = set()
-        for b in buchungen:
-            if b.rechnung_id:
-                rechnung_ids.add(b.rechnung_id)
-
-        # 3. PDFs sammeln/generieren
-        belege = {}  # filename -> pdf_bytes
-
-        if rechnung_ids:
-            try:
-                from src.models.business_documents import BusinessDocument
-                from src.services.document_pdf_service import DocumentPDFService
-
-                pdf_service = DocumentPDFService()
-                dokumente = BusinessDocument.query.filter(
-                    BusinessDocument.id.in_(rechnung_ids)
-                ).all()
-
-                for dok in dokumente:
-                    try:
-                        pdf_bytes = None
-
-                        # Existierende PDF laden
-                        if dok.pdf_pfad and os.path.exists(dok.pdf_pfad):
-                            with open(dok.pdf_pfad, 'rb') as f:
-                                pdf_bytes = f.read()
+        anzahl = 0
+
+        def merken(buchung):
+            nonlocal anzahl
+            anzahl += 1
+            if buchung.rechnung_id:
+                rechnung_ids.add(buchung.rechnung_id)
+
+        # 1. DATEV-CSV, dabei verknuepfte Dokumente sammeln
+        yield from stream.add('EXTF_Buchungsstapel.csv',
+                              self.iter_buchungen(buchungen, datum_von, datum_bis, on_buchung=merken))
+
+        # 2. Belege einzeln laden/generieren und direkt schreiben
+        belege = []
+        for dateiname, chunks in self._iter_belege(sorted(rechnung_ids)):
+            yield from stream.add(dateiname, chunks)
+            belege.append(dateiname)
+
+        # 3. Info-Datei
+        info = [
+            'DATEV Export mit Belegen',
+            f'Erstellt: {datetime.now().strftime("%d.%m.%Y %H:%M")}',
+            f'Zeitraum: {datum_von.strftime("%d.%m.%Y")} - {datum_bis.strftime("%d.%m.%Y")}',
+            f'Buchungen: {anzahl}',
+            f'Belege: {len(belege)}',
+            '',
+            'Dateien:',
+            '  EXTF_Buchungsstapel.csv - DATEV Buchungsstapel',
+        ]
+        for fname in sorted(belege):
+            info.append(f'  {fname}')
+        yield from stream.add_text('INFO.txt', '\n'.join(info))
+        yield from stream.close()
+
+    def _iter_belege(self, rechnung_ids: List[int]) -> Iterator[Tuple[str, Iterable[bytes]]]:
+        """(Dateiname, Byte-Blöcke) je Beleg; Dokumente in Blöcken von BELEGE_BATCH geladen"""
+        if not rechnung_ids:
+            return
+        try:
+            from src.models.business_documents import BusinessDocument
+            from src.services.document_pdf_service import DocumentPDFService
+            from src.services.pdf_store_service import get_pdf
+        except ImportError as e:
+            logger.warning(f"PDF-Service nicht verfuegbar: {e}")
+            return
+
+        pdf_service = DocumentPDFService()
+        for start in range(0, len(rechnung_ids), BELEGE_BATCH):
+            dokumente = BusinessDocument.query.filter(
+                BusinessDocument.id.in_(rechnung_ids[start:start + BELEGE_BATCH])
+            ).all()
+
+            for dok in dokumente:
+                try:
+                    # Existierende PDF direkt aus der Datei streamen
+                    if dok.pdf_pfad and os.path.exists(dok.pdf_pfad):
+                        chunks = _file_chunks(dok.pdf_pfad)
+                    else:
+                        # PDF generieren (finalisiert: aus dem PDF-Store)
+                        if dok.dokument_typ in ('rechnung', 'gutschrift'):
+                            pdf_bytes = get_pdf(dok, 'rechnung_basis', lambda: pdf_service.generate_rechnung_pdf(
+                                dok, with_zugpferd=False)).data
                         else:
-                            # PDF generieren
-                            if dok.dokument_typ in ('rechnung', 'gutschrift'):
-                                pdf_bytes = pdf_service.generate_rechnung_pdf(dok, with_zugpferd=False)
-                            else:
-                                pdf_bytes = pdf_service.generate_document_pdf(dok)
-
-                        if pdf_bytes:
-                            safe_name = dok.dokument_nummer.replace('/', '-').replace('\\', '-')
-                            belege[f'belege/{safe_name}.pdf'] = pdf_bytes
-                            logger.info(f"Beleg hinzugefuegt: {dok.dokument_nummer}")
-
-                    except Exception as e:
-                        logger.warning(f"PDF-Generierung fehlgeschlagen fuer {dok.dokument_nummer}: {e}")
-
-            except ImportError as e:
-                logger.warning(f"PDF-Service nicht verfuegbar: {e}")
-
-        # 4. ZIP erstellen
-        zip_buffer = BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-            zf.writestr('EXTF_Buchungsstapel.csv', csv_content)
-
-            for filename, pdf_bytes in belege.items():
-                zf.writestr(filename, pdf_bytes)
-
-            # Info-Datei
-            info = [
-                'DATEV Export mit Belegen',
-                f'Erstellt: {datetime.now().strftime("%d.%m.%Y %H:%M")}',
-                f'Zeitraum: {datum_von.strftime("%d.%m.%Y")} - {datum_bis.strftime("%d.%m.%Y")}',
-                f'Buchungen: {len(buchungen)}',
-                f'Belege: {len(belege)}',
-                '',
-                'Dateien:',
-                '  EXTF_Buchungsstapel.csv - DATEV Buchungsstapel',
-            ]
-            for fname in sorted(belege.keys()):
-                info.append(f'  {fname}')
+                            pdf_bytes = get_pdf(dok, 'dokument',
+                                                lambda: pdf_service.generate_document_pdf(dok)).data
+                        if not pdf_bytes:
+                            continue
+                        chunks = [pdf_bytes]
 
-            zf.writestr('INFO.txt', '\n'.join(info))
+                    safe_name = dok.dokument_nummer.replace('/', '-').replace('\\', '-')
+                    logger.info(f"Beleg hinzugefuegt: {dok.dokument_nummer}")
+                    yield f'belege/{safe_name}.pdf', chunks
 
-        zip_buffer.seek(0)
-        return zip_buffer.getvalue()
+                except Exception as e:
+                    logger.warning(f"PDF-Generierung fehlgeschlagen fuer {dok.dokument_nummer}: {e}")
 
 
 class ELSTERExporter:
@@ -371,7 +605,8 @@ class GoBDExporter:
     def export_gobd_paket(self, jahr: int, buchungen: List, 
                           kunden: List, lieferanten: List) -> Dict[str, Any]:
         """
-        Erstellt GoBD-konformes Exportpaket
+        Erstellt GoBD-konformes Exportpaket (im Speicher).
+        Für ganze Geschäftsjahre stream_gobd_paket() verwenden.
         
         Args:
             jahr: Geschäftsjahr
@@ -383,105 +618,129 @@ class GoBDExporter:
             Dict mit Dateiname -> Inhalt
         """
         paket = {}
+        checksums = {}
+        for filename, chunks in self._dateien(jahr, buchungen, kunden, lieferanten):
+            content = b''.join(chunks)
+            paket[filename] = content.decode('utf-8')
+            checksums[filename] = (hashlib.md5(content).hexdigest(), hashlib.sha256(content).hexdigest())
+        
+        # Prüfsummen
+        paket['checksums.txt'] = self._create_checksums(checksums)
         
+        return paket
+    
+    def stream_gobd_paket(self, jahr: int, buchungen: Iterable,
+                          kunden: Iterable, lieferanten: Iterable) -> Iterator[bytes]:
+        """
+        GoBD-Exportpaket als ZIP-Strom; Buchungen und Stammdaten werden
+        seitenweise gelesen, Prüfsummen beim Schreiben berechnet.
+        """
+        stream = ZipStream()
+        for filename, chunks in self._dateien(jahr, buchungen, kunden, lieferanten):
+            yield from stream.add(filename, chunks)
+        yield from stream.add_text('checksums.txt', self._create_checksums(stream.checksums))
+        yield from stream.close()
+    
+    def _dateien(self, jahr: int, buchungen: Iterable, kunden: Iterable,
+                 lieferanten: Iterable) -> Iterator[Tuple[str, Iterable[bytes]]]:
+        """Dateien des Pakets in fester Reihenfolge"""
         # 1. Buchungsjournal
-        paket['buchungen.csv'] = self._export_buchungen_csv(buchungen)
+        yield 'buchungen.csv', self._export_buchungen_csv(buchungen)
         
         # 2. Kundenstammdaten
-        paket['kunden.csv'] = self._export_kunden_csv(kunden)
+        yield 'kunden.csv', self._export_kunden_csv(kunden)
         
         # 3. Lieferantenstammdaten
-        paket['lieferanten.csv'] = self._export_lieferanten_csv(lieferanten)
+        yield 'lieferanten.csv', self._export_lieferanten_csv(lieferanten)
         
         # 4. Index-Datei (gdpdu-01-09-2004.xml kompatibel)
-        paket['index.xml'] = self._create_index_xml(jahr)
-        
-        # 5. Prüfsummen
-        paket['checksums.txt'] = self._create_checksums(paket)
-        
-        return paket
+        yield 'index.xml', [self._create_index_xml(jahr).encode('utf-8')]
     
-    def _export_buchungen_csv(self, buchungen: List) -> str:
-        """Exportiert Buchungen als CSV"""
-        output = StringIO()
-        writer = csv.writer(output, delimiter=';')
-        
-        # Header
-        writer.writerow([
-            'Buchungsnummer', 'Buchungsdatum', 'Erfassungsdatum', 
-            'Belegnummer', 'Buchungstext', 'Soll-Konto', 'Haben-Konto',
-            'Betrag Netto', 'MwSt-Satz', 'MwSt-Betrag', 'Betrag Brutto',
-            'Kunde/Lieferant', 'Kostenstelle'
-        ])
-        
-        for b in buchungen:
-            writer.writerow([
-                b.id,
-                b.buchungsdatum.strftime('%d.%m.%Y') if b.buchungsdatum else '',
-                b.erfassungsdatum.strftime('%d.%m.%Y %H:%M') if b.erfassungsdatum else '',
-                b.belegnummer or '',
-                b.buchungstext or '',
-                b.soll_konto.kontonummer if b.soll_konto else '',
-                b.haben_konto.kontonummer if b.haben_konto else '',
-                str(b.betrag_netto or 0).replace('.', ','),
-                str(b.mwst_satz or 0).replace('.', ','),
-                str(b.mwst_betrag or 0).replace('.', ','),
-                str(b.betrag_brutto or 0).replace('.', ','),
-                b.kunde.display_name if b.kunde else '',
-                b.kostenstelle.nummer if b.kostenstelle else ''
-            ])
-        
-        return output.getvalue()
+    def _export_buchungen_csv(self, buchungen: Iterable) -> Iterator[bytes]:
+        """Exportiert Buchungen als CSV (Byte-Blöcke)"""
+        from src.models import db
+        from src.models.buchhaltung import Kostenstelle
+        
+        kontonummern = _kontonummern()
+        kostenstellen = dict(db.session.query(Kostenstelle.id, Kostenstelle.nummer))
+        kunden_namen = {}  # Kunden-ID -> Anzeigename (je Kunde einmal geladen)
+        
+        def kunde_name(buchung):
+            if not buchung.kunde_id:
+                return ''
+            if buchung.kunde_id not in kunden_namen:
+                kunden_namen[buchung.kunde_id] = buchung.kunde.display_name if buchung.kunde else ''
+            return kunden_namen[buchung.kunde_id]
+        
+        def rows():
+            yield [
+                'Buchungsnummer', 'Buchungsdatum', 'Erfassungsdatum', 
+                'Belegnummer', 'Buchungstext', 'Soll-Konto', 'Haben-Konto',
+                'Betrag Netto', 'MwSt-Satz', 'MwSt-Betrag', 'Betrag Brutto',
+                'Kunde/Lieferant', 'Kostenstelle'
+            ]
+            for b in iter_rows(buchungen):
+                yield [
+                    b.id,
+                    b.buchungsdatum.strftime('%d.%m.%Y') if b.buchungsdatum else '',
+                    b.erfassungsdatum.strftime('%d.%m.%Y %H:%M') if b.erfassungsdatum else '',
+                    b.belegnummer or '',
+                    b.buchungstext or '',
+                    kontonummern.get(b.soll_konto_id, ''),
+                    kontonummern.get(b.haben_konto_id, ''),
+                    str(b.betrag_netto or 0).replace('.', ','),
+                    str(b.mwst_satz or 0).replace('.', ','),
+                    str(b.mwst_betrag or 0).replace('.', ','),
+                    str(b.betrag_brutto or 0).replace('.', ','),
+                    kunde_name(b),
+                    kostenstellen.get(b.kostenstelle_id, '')
+                ]
+        
+        return csv_chunks(rows())
     
-    def _export_kunden_csv(self, kunden: List) -> str:
+    def _export_kunden_csv(self, kunden: Iterable) -> Iterator[bytes]:
         """Exportiert Kundenstammdaten"""
-        output = StringIO()
-        writer = csv.writer(output, delimiter=';')
-        
-        writer.writerow([
-            'Kundennummer', 'Firma', 'Vorname', 'Nachname', 
-            'Straße', 'PLZ', 'Ort', 'Land', 'USt-IdNr', 'Angelegt am'
-        ])
-        
-        for k in kunden:
-            writer.writerow([
-                k.customer_number or k.id,
-                k.company_name or '',
-                k.first_name or '',
-                k.last_name or '',
-                k.street or '',
-                k.postal_code or '',
-                k.city or '',
-                k.country or 'DE',
-                k.vat_id or '',
-                k.created_at.strftime('%d.%m.%Y') if k.created_at else ''
-            ])
-        
-        return output.getvalue()
+        def rows():
+            yield [
+                'Kundennummer', 'Firma', 'Vorname', 'Nachname', 
+                'Straße', 'PLZ', 'Ort', 'Land', 'USt-IdNr', 'Angelegt am'
+            ]
+            for k in iter_rows(kunden):
+                yield [
+                    k.customer_number or k.id,
+                    k.company_name or '',
+                    k.first_name or '',
+                    k.last_name or '',
+                    k.street or '',
+                    k.postal_code or '',
+                    k.city or '',
+                    k.country or 'DE',
+                    k.vat_id or '',
+                    k.created_at.strftime('%d.%m.%Y') if k.created_at else ''
+                ]
+        
+        return csv_chunks(rows())
     
-    def _export_lieferanten_csv(self, lieferanten: List) -> str:
+    def _export_lieferanten_csv(self, lieferanten: Iterable) -> Iterator[bytes]:
         """Exportiert Lieferantenstammdaten"""
-        output = StringIO()
-        writer = csv.writer(output, delimiter=';')
-        
-        writer.writerow([
-            'Lieferantennummer', 'Firma', 'Straße', 'PLZ', 'Ort', 
-            'USt-IdNr', 'IBAN', 'BIC'
-        ])
-        
-        for l in lieferanten:
-            writer.writerow([
-                l.id,
-                l.name or '',
-                l.street or '',
-                l.postal_code or '',
-                l.city or '',
-                l.tax_id or '',
-                l.iban or '',
-                l.bic or ''
-            ])
-        
-        return output.getvalue()
+        def rows():
+            yield [
+                'Lieferantennummer', 'Firma', 'Straße', 'PLZ', 'Ort', 
+                'USt-IdNr', 'IBAN', 'BIC'
+            ]
+            for l in iter_rows(lieferanten):
+                yield [
+                    l.id,
+                    l.name or '',
+                    l.street or '',
+                    l.postal_code or '',
+                    l.city or '',
+                    l.tax_id or '',
+                    l.iban or '',
+                    l.bic or ''
+                ]
+        
+        return csv_chunks(rows())
     
     def _create_index_xml(self, jahr: int) -> str:
         """Erstellt GDPdU-Index (vereinfacht)"""
@@ -517,16 +776,12 @@ class GoBDExporter:
     </Media>
 </DataSet>'''
     
-    def _create_checksums(self, paket: Dict) -> str:
-        """Erstellt Prüfsummen für alle Dateien"""
-        import hashlib
-        
+    def _create_checksums(self, checksums: Dict[str, Tuple[str, str]]) -> str:
+        """Erstellt Prüfsummen-Datei aus Dateiname -> (MD5, SHA256)"""
         lines = ['GoBD Export Prüfsummen', f'Erstellt: {datetime.now().isoformat()}', '']
         
-        for filename, content in paket.items():
+        for filename, (md5, sha256) in checksums.items():
             if filename != 'checksums.txt':
-                md5 = hashlib.md5(content.encode('utf-8')).hexdigest()
-                sha256 = hashlib.sha256(content.encode('utf-8')).hexdigest()
                 lines.append(f'{filename}:')
                 lines.append(f'  MD5: {md5}')
                 lines.append(f'  SHA256: {sha256}')
@@ -10,22 +10,370 @@ Berechnungen für:
 - Kalkulationen (Stundensatz, Stickpreis)
 - Deckungsbeitragsrechnung
 
+BWA, USt-VA und Cashflow lesen Monatssummen je Konto, Buchungsart und
+MwSt-Satz (Tabelle buchhaltung_periodensummen) statt aller Buchungen:
+
+- Die Summen eines Jahres werden mit einer GROUP BY-Abfrage gebildet.
+- Neue, geaenderte, stornierte und geloeschte Buchungen passen die Summen
+  beim Flush an (gleiche Transaktion).
+- Neue Kombinationen, unbekannte alte Werte und Bulk-Statements markieren
+  den Monat als `stale`; er wird beim naechsten Lesen neu gebildet, ebenso
+  jeder Monat spaetestens nach PERIODEN_MAX_ALTER_SECONDS.
+
 Erstellt von Hans Hahn - Alle Rechte vorbehalten
 """
 
 from datetime import datetime, date, timedelta
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Dict, List, Optional, Tuple
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 import calendar
 import logging
 
+from sqlalchemy import event, func, select as sa_select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import instance_state
+
 from src.models import db
 
 logger = logging.getLogger(__name__)
 
+# Monatssummen spaetestens nach dieser Zeit neu aus den Buchungen bilden (Sekunden)
+PERIODEN_MAX_ALTER_SECONDS = 3600
+
+# Attribute einer Buchung, die in die Monatssummen eingehen
+_SUMMEN_ATTRS = ('buchungsdatum', 'konto_id', 'buchungs_art', 'mwst_satz',
+                 'betrag_netto', 'betrag_brutto', 'mwst_betrag', 'ist_storniert')
+
+_CENT = Decimal('0.01')
+_ALLE = None  # Markierung: alle Monate neu bilden
+
+Periodensumme = namedtuple('Periodensumme', [
+    'monat', 'konto_id', 'kontonummer', 'bezeichnung', 'buchungs_art', 'mwst_satz',
+    'netto', 'brutto', 'mwst', 'anzahl',
+])
+
+
+def _zeitraum(jahr: int, monat: int = None, quartal: int = None) -> Tuple[date, date, List[int], str]:
+    """(datum_von, datum_bis, Monate, Label) fuer Monat, Quartal oder Jahr"""
+    if monat:
+        monate = [monat]
+        label = f"{monat:02d}/{jahr}"
+    elif quartal:
+        monate = list(range((quartal - 1) * 3 + 1, quartal * 3 + 1))
+        label = f"Q{quartal}/{jahr}"
+    else:
+        monate = list(range(1, 13))
+        label = str(jahr)
+    letzter_tag = calendar.monthrange(jahr, monate[-1])[1]
+    return date(jahr, monate[0], 1), date(jahr, monate[-1], letzter_tag), monate, label
+
+
+# ============================================================================
+# PERIODENSUMMEN
+# ============================================================================
+
+class _UnbekannterWert(Exception):
+    """Alter Attributwert nicht verfuegbar -> Monat neu bilden"""
+
+
+def _betrag(value) -> Decimal:
+    return Decimal(str(value or 0)).quantize(_CENT)
+
+
+def _beitrag(get):
+    """(Summenschluessel, Betraege) einer Buchung; None, wenn sie nicht zaehlt"""
+    storniert = get('ist_storniert')
+    datum = get('buchungsdatum')
+    if storniert is None or storniert or datum is None:
+        return None
+    schluessel = (datum.year, datum.month, get('konto_id') or 0,
+                  get('buchungs_art') or '', _betrag(get('mwst_satz')))
+    return schluessel, (_betrag(get('betrag_netto')), _betrag(get('betrag_brutto')),
+                        _betrag(get('mwst_betrag')))
+
+
+def _old_value(state, attr):
+    """Wert eines Attributs vor dem Flush"""
+    hist = state.attrs[attr].history
+    if hist.deleted:
+        return hist.deleted[0]
+    if hist.unchanged:
+        return hist.unchanged[0]
+    if hist.added or attr in state.unloaded:
+        raise _UnbekannterWert(attr)
+    return state.dict.get(attr)
+
+
+def _new_value(state, attr):
+    """Wert eines Attributs nach dem Flush (ohne Nachladen aus der DB)"""
+    if attr in state.unloaded:
+        raise _UnbekannterWert(attr)
+    return state.dict.get(attr)
+
+
+def _on_before_flush(session, flush_context, instances):
+    """
+    Alte Werte geaenderter/geloeschter Buchungen, die nicht geladen sind
+    (z.B. nach commit() abgelaufen), vor dem UPDATE/DELETE aus der DB lesen.
+    """
+    from src.models.buchhaltung import BuchhaltungBuchung
+
+    unbekannt = {}
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, BuchhaltungBuchung):
+            continue
+        state = instance_state(obj)
+        if state.key is None:
+            continue
+        try:
+            _beitrag(lambda a: _old_value(state, a))
+        except _UnbekannterWert:
+            unbekannt[state.key[1][0]] = obj
+
+    session.info['periodensummen_vorher'] = vorher = {}
+    if not unbekannt:
+        return
+    table = BuchhaltungBuchung.__table__
+    rows = session.connection().execute(
+        sa_select(table.c.id, *[table.c[a] for a in _SUMMEN_ATTRS]).where(table.c.id.in_(list(unbekannt))))
+    for row in rows:
+        werte = row._mapping
+        vorher[unbekannt[row.id]] = _beitrag(lambda a: werte[a])
+
+
+def _collect_deltas(session):
+    """Summen-Deltas und unsichere Monate fuer den aktuellen Flush"""
+    from src.models.buchhaltung import BuchhaltungBuchung
+
+    vorher_db = session.info.pop('periodensummen_vorher', {})
+    deltas = defaultdict(lambda: [Decimal('0'), Decimal('0'), Decimal('0'), 0])
+    stale = set()
+
+    changes = [(obj, 'new') for obj in session.new]
+    changes += [(obj, 'dirty') for obj in session.dirty]
+    changes += [(obj, 'deleted') for obj in session.deleted]
+
+    for obj, mode in changes:
+        if not isinstance(obj, BuchhaltungBuchung):
+            continue
+        state = instance_state(obj)
+        if mode == 'dirty' and not any(state.attrs[a].history.has_changes() for a in _SUMMEN_ATTRS):
+            continue
+        try:
+            if obj in vorher_db:
+                vorher = vorher_db[obj]
+            else:
+                vorher = mode != 'new' and _beitrag(lambda a: _old_value(state, a))
+            nachher = mode != 'deleted' and _beitrag(lambda a: _new_value(state, a))
+        except _UnbekannterWert:
+            stale.add(_ALLE)
+            continue
+        for beitrag, faktor in ((vorher, -1), (nachher, 1)):
+            if beitrag:
+                schluessel, betraege = beitrag
+                delta = deltas[schluessel]
+                for i, wert in enumerate(betraege):
+                    delta[i] += faktor * wert
+                delta[3] += faktor
+
+    return {k: v for k, v in deltas.items() if any(v)}, stale
+
+
+def _mark_stale(connection, monate):
+    """Monate ((jahr, monat) oder _ALLE) beim naechsten Lesen neu bilden"""
+    from src.models.buchhaltung import BuchhaltungPeriode
+
+    perioden = BuchhaltungPeriode.__table__
+    if _ALLE in monate:
+        connection.execute(perioden.update().values(stale=True))
+        return
+    for jahr, monat in sorted(monate):
+        connection.execute(perioden.update().where(
+            perioden.c.jahr == jahr, perioden.c.monat == monat).values(stale=True))
+
+
+def _on_after_flush(session, flush_context):
+    """Monatssummen in der gleichen Transaktion anpassen"""
+    try:
+        deltas, stale = _collect_deltas(session)
+        if not deltas and not stale:
+            return
+        from src.models.buchhaltung import BuchhaltungPeriodensumme
+
+        summen = BuchhaltungPeriodensumme.__table__
+        connection = session.connection()
+        for (jahr, monat, konto_id, art, satz), (netto, brutto, mwst, anzahl) in deltas.items():
+            if _ALLE in stale or (jahr, monat) in stale:
+                continue
+            result = connection.execute(summen.update().where(
+                summen.c.jahr == jahr, summen.c.monat == monat, summen.c.konto_id == konto_id,
+                summen.c.buchungs_art == art, summen.c.mwst_satz == satz,
+            ).values(
+                summe_netto=summen.c.summe_netto + netto,
+                summe_brutto=summen.c.summe_brutto + brutto,
+                summe_mwst=summen.c.summe_mwst + mwst,
+                anzahl=summen.c.anzahl + anzahl,
+            ))
+            if result.rowcount == 0:
+                # Neue Kombination (oder Monat noch nie gebildet)
+                stale.add((jahr, monat))
+        if stale:
+            _mark_stale(connection, stale)
+    except Exception as e:
+        logger.warning(f"Periodensummen nicht aktualisiert: {e}")
+
+
+def _on_orm_execute(orm_execute_state):
+    """Bulk-INSERT/UPDATE/DELETE auf Buchungen: alle Monate neu bilden lassen"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    from src.models.buchhaltung import BuchhaltungBuchung
+
+    mapper = orm_execute_state.bind_mapper
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if (mapper is None or mapper.class_ is not BuchhaltungBuchung) \
+            and table is not BuchhaltungBuchung.__table__:
+        return
+    try:
+        _mark_stale(orm_execute_state.session.connection(), {_ALLE})
+    except Exception as e:
+        logger.warning(f"Periodensummen nicht als veraltet markiert: {e}")
+
+
+def _summen_aus_buchungen(jahr: int, monate: List[int], connection=None) -> Dict:
+    """
+    Monatssummen per GROUP BY: (monat, konto_id, art, satz) -> [netto, brutto, mwst, anzahl]
+    (ohne connection ueber die Session)
+    """
+    from src.models.buchhaltung import BuchhaltungBuchung as Buchung
+
+    monat_expr = db.extract('month', Buchung.buchungsdatum)
+    konto_expr = func.coalesce(Buchung.konto_id, 0)
+    art_expr = func.coalesce(Buchung.buchungs_art, '')
+    satz_expr = func.coalesce(Buchung.mwst_satz, 0)
+    datum_von = date(jahr, min(monate), 1)
+    datum_bis = date(jahr, max(monate), calendar.monthrange(jahr, max(monate))[1])
+
+    query = sa_select(
+        monat_expr, konto_expr, art_expr, satz_expr,
+        func.sum(Buchung.betrag_netto), func.sum(Buchung.betrag_brutto),
+        func.sum(Buchung.mwst_betrag), func.count(Buchung.id),
+    ).where(
+        Buchung.buchungsdatum >= datum_von,
+        Buchung.buchungsdatum <= datum_bis,
+        Buchung.ist_storniert == False
+    ).group_by(monat_expr, konto_expr, art_expr, satz_expr)
+    rows = (connection or db.session).execute(query).all()
+
+    summen = defaultdict(lambda: [Decimal('0'), Decimal('0'), Decimal('0'), 0])
+    for monat, konto_id, art, satz, netto, brutto, mwst, anzahl in rows:
+        if int(monat) not in monate:
+            continue
+        summe = summen[(int(monat), int(konto_id), art, _betrag(satz))]
+        summe[0] += _betrag(netto)
+        summe[1] += _betrag(brutto)
+        summe[2] += _betrag(mwst)
+        summe[3] += anzahl
+    return summen
+
+
+def _neu_bilden(connection, jahr: int, monate: List[int], now: datetime):
+    """Monatssummen der angegebenen Monate ersetzen (ohne Commit)"""
+    from src.models.buchhaltung import BuchhaltungPeriodensumme, BuchhaltungPeriode
+
+    werte = _summen_aus_buchungen(jahr, monate, connection)
+    summen = BuchhaltungPeriodensumme.__table__
+    perioden = BuchhaltungPeriode.__table__
+
+    connection.execute(summen.delete().where(summen.c.jahr == jahr, summen.c.monat.in_(monate)))
+    if werte:
+        connection.execute(summen.insert(), [
+            {'jahr': jahr, 'monat': monat, 'konto_id': konto_id, 'buchungs_art': art, 'mwst_satz': satz,
+             'summe_netto': netto, 'summe_brutto': brutto, 'summe_mwst': mwst, 'anzahl': anzahl}
+            for (monat, konto_id, art, satz), (netto, brutto, mwst, anzahl) in werte.items()
+        ])
+    connection.execute(perioden.delete().where(perioden.c.jahr == jahr, perioden.c.monat.in_(monate)))
+    connection.execute(perioden.insert(), [
+        {'jahr': jahr, 'monat': monat, 'stale': False, 'berechnet_am': now} for monat in monate
+    ])
+
+
+def _ist_veraltet(periode, now: datetime) -> bool:
+    if periode is None or periode.stale or periode.berechnet_am is None:
+        return True
+    return (now - periode.berechnet_am).total_seconds() > PERIODEN_MAX_ALTER_SECONDS
+
 
-class BWAService:
+def neu_bilden(jahr: int) -> None:
+    """Monatssummen eines Jahres komplett neu bilden (Reparatur, nach Importen)"""
+    with db.engine.begin() as connection:
+        _neu_bilden(connection, jahr, list(range(1, 13)), datetime.utcnow())
+
+
+def lade_periodensummen(jahr: int) -> List[Periodensumme]:
+    """
+    Monatssummen eines Jahres (stornierte Buchungen ausgenommen).
+    Fehlende, als veraltet markierte oder zu alte Monate werden vorher mit
+    einer GROUP BY-Abfrage neu gebildet - in einer eigenen Transaktion, die
+    Request-Session wird weder committet noch zurueckgerollt.
+    """
+    from src.models.buchhaltung import BuchhaltungPeriodensumme as Summe, BuchhaltungPeriode, Konto
+
+    try:
+        now = datetime.utcnow()
+        with db.engine.begin() as connection:
+            stand = {p.monat: p for p in connection.execute(
+                BuchhaltungPeriode.__table__.select().where(BuchhaltungPeriode.jahr == jahr))}
+            veraltet = [m for m in range(1, 13) if _ist_veraltet(stand.get(m), now)]
+            if veraltet:
+                _neu_bilden(connection, jahr, veraltet, now)
+            werte = {
+                (r.monat, r.konto_id, r.buchungs_art, _betrag(r.mwst_satz)):
+                    (_betrag(r.summe_netto), _betrag(r.summe_brutto), _betrag(r.summe_mwst), r.anzahl)
+                for r in connection.execute(Summe.__table__.select().where(Summe.jahr == jahr))
+            }
+    except Exception as e:
+        logger.warning(f"Periodensummen nicht verfuegbar, berechne direkt: {e}")
+        werte = _summen_aus_buchungen(jahr, list(range(1, 13)))
+
+    konten = {k.id: (k.kontonummer, k.bezeichnung)
+              for k in db.session.query(Konto.id, Konto.kontonummer, Konto.bezeichnung)}
+    return [
+        Periodensumme(monat, konto_id, *konten.get(konto_id, (None, None)), art, satz, *betraege)
+        for (monat, konto_id, art, satz), betraege in sorted(werte.items(), key=lambda item: item[0][:3])
+    ]
+
+
+def init_periodensummen(app):
+    """
+    Registriert die Session-Events fuer die Monatssummen.
+    In create_app() nach init_dashboard_stats() aufrufen.
+    """
+    if app.extensions.get('buchhaltung_periodensummen'):
+        return
+    if not event.contains(Session, 'before_flush', _on_before_flush):
+        event.listen(Session, 'before_flush', _on_before_flush)
+    if not event.contains(Session, 'after_flush', _on_after_flush):
+        event.listen(Session, 'after_flush', _on_after_flush)
+    if not event.contains(Session, 'do_orm_execute', _on_orm_execute):
+        event.listen(Session, 'do_orm_execute', _on_orm_execute)
+    app.extensions['buchhaltung_periodensummen'] = True
+
+
+class _PeriodenCache:
+    """Monatssummen je Jahr, einmal pro Service-Instanz geladen"""
+
+    def __init__(self):
+        self._jahre = {}
+
+    def _summen(self, jahr: int, monate: List[int]) -> List[Periodensumme]:
+        if jahr not in self._jahre:
+            self._jahre[jahr] = lade_periodensummen(jahr)
+        return [s for s in self._jahre[jahr] if s.monat in monate]
+
+
+class BWAService(_PeriodenCache):
     """
     Betriebswirtschaftliche Auswertung (BWA)
     
@@ -74,39 +422,16 @@ class BWAService:
         Returns:
             Dict mit BWA-Positionen und Werten
         """
-        from src.models.buchhaltung import BuchhaltungBuchung as Buchung, Konto
+        datum_von, datum_bis, monate, zeitraum_label = _zeitraum(jahr, monat, quartal)
         
-        # Zeitraum bestimmen
-        if monat:
-            datum_von = date(jahr, monat, 1)
-            letzter_tag = calendar.monthrange(jahr, monat)[1]
-            datum_bis = date(jahr, monat, letzter_tag)
-            zeitraum_label = f"{monat:02d}/{jahr}"
-        elif quartal:
-            start_monat = (quartal - 1) * 3 + 1
-            end_monat = quartal * 3
-            datum_von = date(jahr, start_monat, 1)
-            letzter_tag = calendar.monthrange(jahr, end_monat)[1]
-            datum_bis = date(jahr, end_monat, letzter_tag)
-            zeitraum_label = f"Q{quartal}/{jahr}"
-        else:
-            datum_von = date(jahr, 1, 1)
-            datum_bis = date(jahr, 12, 31)
-            zeitraum_label = str(jahr)
-        
-        # Buchungen laden
-        buchungen = Buchung.query.filter(
-            Buchung.buchungsdatum >= datum_von,
-            Buchung.buchungsdatum <= datum_bis,
-            Buchung.ist_storniert == False
-        ).all()
-        
-        # Nach Konten aggregieren
+        # Monatssummen nach Konten aggregieren
         konten_summen = defaultdict(Decimal)
+        bezeichnungen = {}
         
-        for b in buchungen:
-            if b.konto:
-                konten_summen[b.konto.kontonummer] += Decimal(str(b.betrag_netto or 0))
+        for summe in self._summen(jahr, monate):
+            if summe.kontonummer:
+                konten_summen[summe.kontonummer] += summe.netto
+                bezeichnungen[summe.kontonummer] = summe.bezeichnung
         
         # BWA berechnen
         bwa = {
@@ -122,8 +447,7 @@ class BWAService:
         erloese_gesamt = Decimal('0')
         for konto_nr, summe in konten_summen.items():
             if konto_nr.startswith('8'):
-                konto = Konto.query.filter_by(kontonummer=konto_nr).first()
-                bwa['erloese'][konto.bezeichnung if konto else konto_nr] = summe
+                bwa['erloese'][bezeichnungen.get(konto_nr) or konto_nr] = summe
                 erloese_gesamt += summe
         
         bwa['summe_erloese'] = erloese_gesamt
@@ -132,8 +456,7 @@ class BWAService:
         aufwendungen_gesamt = Decimal('0')
         for konto_nr, summe in konten_summen.items():
             if konto_nr.startswith(('3', '4', '7')):
-                konto = Konto.query.filter_by(kontonummer=konto_nr).first()
-                bwa['aufwendungen'][konto.bezeichnung if konto else konto_nr] = summe
+                bwa['aufwendungen'][bezeichnungen.get(konto_nr) or konto_nr] = summe
                 aufwendungen_gesamt += summe
         
         bwa['summe_aufwendungen'] = aufwendungen_gesamt
@@ -156,6 +479,7 @@ class BWAService:
     def berechne_bwa_vergleich(self, jahr: int) -> Dict:
         """
         Berechnet BWA mit Vorjahresvergleich und Monatsübersicht
+        (Monatssummen je Jahr nur einmal geladen)
         """
         ergebnis = {
             'aktuelles_jahr': jahr,
@@ -192,7 +516,7 @@ class BWAService:
         return ergebnis
 
 
-class UStService:
+class UStService(_PeriodenCache):
     """
     USt-Voranmeldung Berechnung
     """
@@ -200,30 +524,12 @@ class UStService:
     def berechne_voranmeldung(self, jahr: int, monat: int = None, 
                                quartal: int = None) -> Dict:
         """
-        Berechnet USt-Voranmeldung aus Buchungen
+        Berechnet USt-Voranmeldung aus den Monatssummen der Buchungen
         """
-        from src.models.buchhaltung import BuchhaltungBuchung as Buchung, UStVoranmeldung
-        
-        # Zeitraum
-        if monat:
-            datum_von = date(jahr, monat, 1)
-            letzter_tag = calendar.monthrange(jahr, monat)[1]
-            datum_bis = date(jahr, monat, letzter_tag)
-        elif quartal:
-            start_monat = (quartal - 1) * 3 + 1
-            end_monat = quartal * 3
-            datum_von = date(jahr, start_monat, 1)
-            letzter_tag = calendar.monthrange(jahr, end_monat)[1]
-            datum_bis = date(jahr, end_monat, letzter_tag)
-        else:
+        if not monat and not quartal:
             raise ValueError("Monat oder Quartal muss angegeben werden")
         
-        # Buchungen laden
-        buchungen = Buchung.query.filter(
-            Buchung.buchungsdatum >= datum_von,
-            Buchung.buchungsdatum <= datum_bis,
-            Buchung.ist_storniert == False
-        ).all()
+        datum_von, datum_bis, monate, _ = _zeitraum(jahr, monat, quartal)
         
         # Berechnung
         ergebnis = {
@@ -239,12 +545,12 @@ class UStService:
             'ust_zahllast': Decimal('0'),
         }
         
-        for b in buchungen:
-            mwst = Decimal(str(b.mwst_satz or 0))
-            netto = Decimal(str(b.betrag_netto or 0))
-            mwst_betrag = Decimal(str(b.mwst_betrag or 0))
+        for summe in self._summen(jahr, monate):
+            mwst = summe.mwst_satz
+            netto = summe.netto
+            mwst_betrag = summe.mwst
             
-            if b.buchungs_art == 'einnahme':
+            if summe.buchungs_art == 'einnahme':
                 # Umsatzsteuer
                 if mwst == Decimal('19'):
                     ergebnis['umsatz_19_netto'] += netto
@@ -253,7 +559,7 @@ class UStService:
                     ergebnis['umsatz_7_netto'] += netto
                     ergebnis['ust_7'] += mwst_betrag
             
-            elif b.buchungs_art == 'ausgabe':
+            elif summe.buchungs_art == 'ausgabe':
                 # Vorsteuer
                 if mwst == Decimal('19'):
                     ergebnis['vorsteuer_19'] += mwst_betrag
@@ -270,7 +576,7 @@ class UStService:
         return ergebnis
 
 
-class LiquiditaetsService:
+class LiquiditaetsService(_PeriodenCache):
     """
     Liquiditätsplanung und -prognose
     """
@@ -279,8 +585,7 @@ class LiquiditaetsService:
         """
         Berechnet aktuelle Liquidität
         """
-        from src.models.document_workflow import BusinessDocument, DokumentStatus
-        from src.models.models import Customer
+        from src.models.document_workflow import BusinessDocument, DocumentPayment, DokumentStatus
         
         if stichtag is None:
             stichtag = date.today()
@@ -294,69 +599,65 @@ class LiquiditaetsService:
             'liquiditaet_prognose': {},
         }
         
-        # Offene Forderungen aus Rechnungen
+        prognose_daten = {wochen: stichtag + timedelta(weeks=wochen) for wochen in [1, 2, 4, 8, 12]}
+        for wochen in prognose_daten:
+            ergebnis['liquiditaet_prognose'][f'{wochen}_wochen'] = Decimal('0')
+        
+        # Offene Forderungen aus Rechnungen: eine Abfrage, Zahlungen per GROUP BY
+        # (gleiche Rechnung wie BusinessDocument.offener_betrag())
         try:
-            offene_rechnungen = BusinessDocument.query.filter(
+            zahlungen = db.session.query(
+                DocumentPayment.dokument_id.label('dokument_id'),
+                func.count(DocumentPayment.id).label('anzahl'),
+                func.sum(db.case(
+                    (db.and_(DocumentPayment.bestaetigt == True,
+                             DocumentPayment.zahlungsart != 'anzahlung_verrechnung'), DocumentPayment.betrag),
+                    else_=0)).label('gezahlt'),
+            ).group_by(DocumentPayment.dokument_id).subquery()
+            
+            offene_rechnungen = db.session.query(
+                BusinessDocument.summe_brutto, BusinessDocument.restbetrag, BusinessDocument.bereits_gezahlt,
+                BusinessDocument.faelligkeitsdatum, zahlungen.c.anzahl, zahlungen.c.gezahlt,
+            ).outerjoin(zahlungen, zahlungen.c.dokument_id == BusinessDocument.id).filter(
                 BusinessDocument.dokument_typ.in_(['rechnung', 'anzahlung', 'teilrechnung']),
                 BusinessDocument.status.in_([DokumentStatus.OFFEN.value, DokumentStatus.TEILBEZAHLT.value])
             ).all()
-            
-            for r in offene_rechnungen:
-                offen = Decimal(str(r.offener_betrag or r.summe_brutto or 0))
-                ergebnis['forderungen_offen'] += offen
-                
-                if r.faelligkeitsdatum and r.faelligkeitsdatum < stichtag:
-                    ergebnis['forderungen_ueberfaellig'] += offen
         except Exception as e:
+            db.session.rollback()
             logger.warning(f"Fehler bei Forderungsberechnung: {e}")
+            offene_rechnungen = []
         
-        # Prognose für nächste Wochen
-        for wochen in [1, 2, 4, 8, 12]:
-            prognose_datum = stichtag + timedelta(weeks=wochen)
+        for brutto, restbetrag, bereits_gezahlt, faellig, anzahl_zahlungen, gezahlt in offene_rechnungen:
+            if anzahl_zahlungen:
+                offen = _betrag(brutto) - _betrag(gezahlt) - _betrag(bereits_gezahlt)
+            else:
+                offen = _betrag(restbetrag or brutto)
+            ergebnis['forderungen_offen'] += offen
             
-            # Fällige Forderungen bis dahin
-            try:
-                faellig_bis = BusinessDocument.query.filter(
-                    BusinessDocument.dokument_typ.in_(['rechnung', 'anzahlung', 'teilrechnung']),
-                    BusinessDocument.status.in_([DokumentStatus.OFFEN.value, DokumentStatus.TEILBEZAHLT.value]),
-                    BusinessDocument.faelligkeitsdatum <= prognose_datum
-                ).all()
-                
-                summe = sum(Decimal(str(r.offener_betrag or r.summe_brutto or 0)) for r in faellig_bis)
-                ergebnis['liquiditaet_prognose'][f'{wochen}_wochen'] = summe
-            except Exception:
-                ergebnis['liquiditaet_prognose'][f'{wochen}_wochen'] = Decimal('0')
+            if faellig and faellig < stichtag:
+                ergebnis['forderungen_ueberfaellig'] += offen
+            
+            # Prognose: bis dahin fällige Forderungen
+            for wochen, prognose_datum in prognose_daten.items():
+                if faellig and faellig <= prognose_datum:
+                    ergebnis['liquiditaet_prognose'][f'{wochen}_wochen'] += offen
         
         return ergebnis
     
     def berechne_cashflow(self, jahr: int, monat: int = None) -> Dict:
         """
-        Berechnet Cashflow (vereinfacht)
+        Berechnet Cashflow (vereinfacht) aus den Monatssummen
         """
-        from src.models.buchhaltung import BuchhaltungBuchung as Buchung
-        
-        if monat:
-            datum_von = date(jahr, monat, 1)
-            letzter_tag = calendar.monthrange(jahr, monat)[1]
-            datum_bis = date(jahr, monat, letzter_tag)
-        else:
-            datum_von = date(jahr, 1, 1)
-            datum_bis = date(jahr, 12, 31)
-        
-        buchungen = Buchung.query.filter(
-            Buchung.buchungsdatum >= datum_von,
-            Buchung.buchungsdatum <= datum_bis,
-            Buchung.ist_storniert == False
-        ).all()
+        datum_von, datum_bis, monate, _ = _zeitraum(jahr, monat)
         
         einnahmen = Decimal('0')
         ausgaben = Decimal('0')
         
-        for b in buchungen:
-            if b.buchungs_art == 'einnahme':
-                einnahmen += Decimal(str(b.betrag_brutto or 0))
-            elif b.buchungs_art == 'ausgabe':
-                ausgaben += Decimal(str(b.betrag_brutto or 0))
+        for summe in self._summen(jahr, monate):
+            if summe.buchungs_art == 'einnahme':
+                einnahmen += summe.brutto
+            elif summe.buchungs_art == 'ausgabe':
+                ausgaben += summe.brutto
         
         return {
             'zeitraum_von': datum_von,
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+BULK-UPSERT FUER IMPORTE
+========================
+Gemeinsame Bausteine fuer L-Shop- und CSV-Importe, die zehntausende
+Zeilen schreiben:
+
+- Spalten-Normalisierung mit pandas (Text/Zahl je Spalte, kein iterrows)
+- Schluessel-Abgleich gegen einmal vorab geladene Dicts
+  (load_keys, ensure_names fuer Marken/Kategorien)
+- bulk_upsert(): INSERT ... ON CONFLICT DO UPDATE/NOTHING in Bloecken,
+  passend zum Dialekt (SQLite, PostgreSQL, MySQL; sonst Vorab-Abfrage
+  der Schluessel und getrenntes INSERT/UPDATE)
+
+Die Statements laufen ORM-aktiviert (insert(Model)), damit Suchindex und
+Dashboard-Kennzahlen ueber do_orm_execute mitbekommen, welche Zeilen neu
+sind. Jeder Block wird vom Aufrufer committet - die Schreibsperre (SQLite)
+wird also nur kurz gehalten.
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import logging
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+from src.models import db
+
+logger = logging.getLogger(__name__)
+
+# Zeilen je Statement/Commit
+UPSERT_CHUNK_SIZE = 500
+
+
+# ==========================================
+# SPALTEN-NORMALISIERUNG (pandas)
+# ==========================================
+
+def text_column(series: pd.Series) -> pd.Series:
+    """str(Wert).strip(); leere Werte und NaN werden None"""
+    result = series.astype(str).str.strip()
+    return result.astype(object).where(series.notna() & (result != ''), None)
+
+
+def number_column(series: pd.Series) -> pd.Series:
+    """Zahl mit Komma oder Punkt als Dezimaltrenner, sonst NaN"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    return pd.to_numeric(series.astype(str).str.strip().str.replace(',', '.', regex=False), errors='coerce')
+
+
+def int_column(series: pd.Series) -> pd.Series:
+    """Ganzzahl (abgeschnitten wie int(float(x))), sonst None"""
+    return nullable(np.trunc(number_column(series)).astype('Int64'))
+
+
+def nullable(series: pd.Series) -> pd.Series:
+    """NaN/NA -> None, numpy-Skalare -> Python (fuer die DB-Parameter)"""
+    values = series.astype(object)
+    return values.where(series.notna(), None)
+
+
+def to_records(frame: pd.DataFrame) -> List[Dict]:
+    """DataFrame -> Liste von Dicts mit Python-Werten (None statt NaN)"""
+    columns = list(frame.columns)
+    converted = [nullable(frame[c]).tolist() for c in columns]
+    return [dict(zip(columns, values)) for values in zip(*converted)]
+
+
+def chunks(rows: Sequence, size: int = UPSERT_CHUNK_SIZE) -> Iterator[Sequence]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+# ==========================================
+# SCHLUESSEL VORAB LADEN
+# ==========================================
+
+def load_keys(key_column, value_column, values: Iterable = None) -> Dict:
+    """
+    {Schluessel: Wert} aus der DB, z.B. load_keys(Article.article_number, Article.id).
+    Mit values nur diese Schluessel (blockweise IN-Abfragen).
+    """
+    if values is None:
+        return dict(db.session.query(key_column, value_column).filter(key_column.isnot(None)))
+    result = {}
+    values = [v for v in set(values) if v is not None]
+    for block in chunks(values):
+        result.update(db.session.query(key_column, value_column).filter(key_column.in_(block)))
+    return result
+
+
+def ensure_names(model, names: Iterable[str], defaults: Dict = None) -> Dict[str, int]:
+    """
+    Stammdaten mit eindeutigem Namen (Marken, Kategorien): fehlende in
+    einem Statement anlegen (ON CONFLICT DO NOTHING), dann {Name: ID}.
+    """
+    wanted = {n for n in names if n}
+    if not wanted:
+        return {}
+    known = load_keys(model.name, model.id, wanted)
+    missing = sorted(wanted - set(known))
+    if missing:
+        bulk_upsert(model, [{'name': n, **(defaults or {})} for n in missing], ['name'], update_columns=[])
+        known.update(load_keys(model.name, model.id, missing))
+    return known
+
+
+# ==========================================
+# UPSERT
+# ==========================================
+
+def _dialect_insert(dialect_name):
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect_name in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+        return insert
+    return None
+
+
+def _upsert_statement(model, dialect_name, key_columns, update_columns, keep_existing_on_null):
+    """Dialekt-eigenes INSERT mit Konfliktbehandlung, None wenn nicht unterstuetzt"""
+    insert = _dialect_insert(dialect_name)
+    if insert is None:
+        return None
+    table = model.__table__
+    stmt = insert(model)
+
+    def value(new, column):
+        return sa.func.coalesce(new[column], table.c[column]) if keep_existing_on_null else new[column]
+
+    if dialect_name in ('mysql', 'mariadb'):
+        if not update_columns:
+            # MySQL kennt kein DO NOTHING: Schluessel auf sich selbst setzen
+            return stmt.on_duplicate_key_update({key_columns[0]: table.c[key_columns[0]]})
+        return stmt.on_duplicate_key_update({c: value(stmt.inserted, c) for c in update_columns})
+
+    if not update_columns:
+        return stmt.on_conflict_do_nothing(index_elements=key_columns)
+    return stmt.on_conflict_do_update(index_elements=key_columns,
+                                      set_={c: value(stmt.excluded, c) for c in update_columns})
+
+
+def _split_upsert(model, rows, key_columns, update_columns, keep_existing_on_null):
+    """Fallback ohne ON CONFLICT: vorhandene Schluessel abfragen, dann INSERT bzw. UPDATE"""
+    table = model.__table__
+    key = sa.tuple_(*[table.c[c] for c in key_columns]) if len(key_columns) > 1 else table.c[key_columns[0]]
+
+    def row_key(row):
+        return tuple(row[c] for c in key_columns) if len(key_columns) > 1 else row[key_columns[0]]
+
+    existing = {tuple(r) if len(key_columns) > 1 else r[0]
+                for r in db.session.execute(sa.select(*[table.c[c] for c in key_columns])
+                                            .where(key.in_([row_key(r) for r in rows])))}
+    new_rows = [r for r in rows if row_key(r) not in existing]
+    if new_rows:
+        db.session.execute(sa.insert(model), new_rows)
+    if update_columns:
+        updates = [r for r in rows if row_key(r) in existing]
+        if updates:
+            where = sa.and_(*[table.c[c] == sa.bindparam(f'_key_{c}') for c in key_columns])
+            values = {c: sa.func.coalesce(sa.bindparam(f'_val_{c}'), table.c[c]) if keep_existing_on_null
+                      else sa.bindparam(f'_val_{c}') for c in update_columns}
+            db.session.connection().execute(
+                table.update().where(where).values(values),
+                [{**{f'_key_{c}': r[c] for c in key_columns},
+                  **{f'_val_{c}': r.get(c) for c in update_columns}} for r in updates])
+
+
+def bulk_upsert(model, rows: List[Dict], key_columns: List[str], update_columns: List[str] = None,
+                keep_existing_on_null: bool = False, chunk_size: int = UPSERT_CHUNK_SIZE,
+                on_chunk: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Zeilen blockweise einfuegen oder aktualisieren.
+
+    Args:
+        model: ORM-Klasse (key_columns muessen eindeutig sein: PK oder UNIQUE)
+        rows: Dicts mit Attributnamen; alle Zeilen mit denselben Schluesseln
+        update_columns: Bei Konflikt zu ueberschreibende Spalten
+            (None = alle ausser den Schluesseln, [] = Zeile unveraendert lassen)
+        keep_existing_on_null: None im Import ueberschreibt keinen DB-Wert
+        on_chunk: Optional - nach jedem Block mit der Anzahl Zeilen aufgerufen
+            (z.B. Commit + Fortschritt)
+
+    Returns:
+        Anzahl verarbeiteter Zeilen
+    """
+    if not rows:
+        return 0
+    if update_columns is None:
+        update_columns = [c for c in rows[0] if c not in key_columns]
+
+    stmt = _upsert_statement(model, db.session.get_bind().dialect.name, key_columns, update_columns,
+                             keep_existing_on_null)
+
+    done = 0
+    for block in chunks(rows, chunk_size):
+        if stmt is not None:
+            db.session.execute(stmt, list(block))
+        else:
+            _split_upsert(model, block, key_columns, update_columns, keep_existing_on_null)
+        done += len(block)
+        if on_chunk:
+            on_chunk(len(block))
+    return done
+
+
+def bulk_insert(model, rows: List[Dict], chunk_size: int = UPSERT_CHUNK_SIZE,
+                on_chunk: Optional[Callable[[int], None]] = None) -> int:
+    """Zeilen blockweise einfuegen (executemany, ohne Konfliktbehandlung)"""
+    done = 0
+    for block in chunks(rows, chunk_size):
+        db.session.execute(sa.insert(model), list(block))
+        done += len(block)
+        if on_chunk:
+            on_chunk(len(block))
+    return done
+
+
+def bulk_update(model, rows: List[Dict], chunk_size: int = UPSERT_CHUNK_SIZE) -> int:
+    """Zeilen blockweise per Primaerschluessel aktualisieren (ORM-Bulk-UPDATE)"""
+    done = 0
+    for block in chunks(rows, chunk_size):
+        db.session.execute(sa.update(model), list(block))
+        done += len(block)
+    return done
+
+
+class ImportProgress:
+    """
+    Schreibt Zeilen blockweise, committet nach jedem Block und meldet den
+    Fortschritt (z.B. job_queue_service.report_progress). Ein fehlerhafter
+    Block wird zurueckgerollt und gezaehlt, der Import laeuft weiter.
+    """
+
+    def __init__(self, total: int, callback: Optional[Callable[[int, int], None]] = None,
+                 chunk_size: int = UPSERT_CHUNK_SIZE):
+        self.total = total
+        self.done = 0
+        self.callback = callback
+        self.chunk_size = chunk_size
+        self.error_count = 0
+        self.errors: List[str] = []
+        self.failed_rows: List[Dict] = []
+
+    def write(self, rows: List[Dict], write_block: Callable[[List[Dict]], None], label: str = 'Block') -> int:
+        """write_block(block) je Block ausfuehren; Anzahl erfolgreich geschriebener Zeilen"""
+        written = 0
+        for start in range(0, len(rows), self.chunk_size):
+            block = rows[start:start + self.chunk_size]
+            try:
+                write_block(block)
+                db.session.commit()
+                written += len(block)
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"[WARN] {label} Zeilen {start + 1}-{start + len(block)}: {e}")
+                self.error_count += len(block)
+                self.errors.append(f"{label} Zeilen {start + 1}-{start + len(block)}: {e}")
+                self.failed_rows.extend(block)
+            self.done += len(block)
+            if self.callback:
+                self.callback(min(self.done, self.total), self.total)
+                db.session.commit()
+        return written
+
+    def skip(self, count: int):
+        """Uebersprungene Zeilen als erledigt melden"""
+        if not count:
+            return
+        self.done += count
+        if self.callback:
+            self.callback(min(self.done, self.total), self.total)
+
+    def failed_keys(self, column: str) -> List:
+        return [row.get(column) for row in self.failed_rows]
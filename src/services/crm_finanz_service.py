@@ -12,7 +12,7 @@ Verknüpfung von CRM und Finanzdaten:
 Erstellt von Hans Hahn - Alle Rechte vorbehalten
 """
 
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, time, timedelta
 from decimal import Decimal
 from typing import Dict, List, Optional, Tuple
 from collections import defaultdict
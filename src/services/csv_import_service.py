@@ -10,18 +10,30 @@ Erstellt von Hans Hahn - Alle Rechte vorbehalten
 
 import os
 import csv
+import shutil
 import hashlib
 import logging
 from datetime import datetime, date
 from decimal import Decimal, InvalidOperation
 from io import StringIO
-from typing import Dict, List, Optional, Tuple
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
 
 from src.models import db
 from src.models.csv_import import CSVImportJob
+from src.services.table_reader_service import iter_chunks, iter_raw_rows, table_layout
+from src.services.bulk_upsert_service import (
+    ImportProgress, bulk_insert, bulk_upsert, ensure_names, load_keys, text_column, to_records,
+)
 
 logger = logging.getLogger(__name__)
 
+# Kopierpuffer fuer Uploads
+READ_BUFFER = 1024 * 1024
+
 # Bekannte Spalten-Zuordnungen pro Import-Typ
 FIELD_MAPPINGS = {
     'customer': {
@@ -198,11 +210,15 @@ class CSVImportService:
 
         return mapping
 
-    def create_import_job(self, file_content: bytes, filename: str,
+    def create_import_job(self, file_content, filename: str,
                           import_type: str, user: str) -> CSVImportJob:
-        """Erstellt einen neuen Import-Job und speichert die Datei"""
-        format_info = self.detect_csv_format(file_content)
+        """
+        Erstellt einen neuen Import-Job und speichert die Datei.
 
+        Args:
+            file_content: Bytes oder Datei-Objekt (Upload-Stream) - wird
+                blockweise auf die Platte kopiert, nie ganz im Speicher gehalten
+        """
         # Datei speichern
         upload_dir = os.path.join('instance', 'uploads', 'csv_imports')
         os.makedirs(upload_dir, exist_ok=True)
@@ -212,21 +228,28 @@ class CSVImportService:
         file_path = os.path.join(upload_dir, safe_name)
 
         with open(file_path, 'wb') as f:
-            f.write(file_content)
+            if isinstance(file_content, (bytes, bytearray)):
+                f.write(file_content)
+            else:
+                shutil.copyfileobj(file_content, f, READ_BUFFER)
+
+        # Format, Kopf und Stichprobe in einem Durchlauf (gecacht nach Inhalt)
+        layout = table_layout(file_path)
 
         # Mapping vorschlagen
-        suggested = self.suggest_column_mapping(format_info['headers'], import_type)
+        suggested = self.suggest_column_mapping(layout['columns'], import_type)
 
         job = CSVImportJob(
             import_type=import_type,
             filename=filename,
             file_path=file_path,
-            encoding=format_info['encoding'],
-            delimiter=format_info['delimiter'],
+            encoding=layout['encoding'],
+            delimiter=layout['delimiter'],
             status='uploaded',
-            detected_headers=format_info['headers'],
+            detected_headers=layout['columns'],
+            sample_rows=layout['sample'],
             column_mapping=suggested,
-            total_rows=format_info['total_rows'],
+            total_rows=layout['total_rows'],
             created_by=user,
         )
         db.session.add(job)
@@ -234,20 +257,32 @@ class CSVImportService:
 
         return job
 
-    def get_preview_data(self, job: CSVImportJob, max_rows: int = 20) -> List[Dict]:
-        """Liest Vorschau-Daten mit aktuellem Mapping"""
-        if not job.file_path or not os.path.exists(job.file_path):
-            return []
+    def _layout(self, job: CSVImportJob) -> Dict:
+        """Gespeichertes Layout des Jobs fuer table_reader_service"""
+        return {'format': 'csv', 'encoding': job.encoding, 'delimiter': job.delimiter, 'header_row': 0,
+                'columns': job.detected_headers or [], 'total_rows': None}
 
-        with open(job.file_path, 'r', encoding=job.encoding) as f:
-            reader = csv.DictReader(f, delimiter=job.delimiter)
-            rows = []
-            for i, row in enumerate(reader):
-                if i >= max_rows:
-                    break
-                rows.append(row)
+    def iter_rows(self, job: CSVImportJob) -> Iterator[Dict]:
+        """Alle Datenzeilen als Dict {Spalte: Text}, gestreamt"""
+        if not job.file_path or not os.path.exists(job.file_path):
+            return
+        headers = job.detected_headers or []
+        rows = iter_raw_rows(job.file_path, self._layout(job))
+        next(rows, None)  # Kopfzeile
+        for row in rows:
+            if not row:
+                continue  # Leerzeile (wie csv.DictReader)
+            values = list(row[:len(headers)]) + [''] * (len(headers) - len(row))
+            yield dict(zip(headers, values))
 
-        return rows
+    def get_preview_data(self, job: CSVImportJob, max_rows: int = 20) -> List[Dict]:
+        """Liest Vorschau-Daten mit aktuellem Mapping (aus der Stichprobe, wenn sie reicht)"""
+        headers = job.detected_headers or []
+        sample = job.sample_rows
+        if sample is not None and (max_rows <= len(sample) or len(sample) >= (job.total_rows or 0)):
+            return [dict(zip(headers, ['' if v is None else v for v in row]))
+                    for row in sample[:max_rows] if any(v not in (None, '') for v in row)]
+        return list(islice(self.iter_rows(job), max_rows))
 
     def validate_import(self, job: CSVImportJob) -> Dict:
         """
@@ -265,7 +300,7 @@ class CSVImportService:
         # Inverse Mapping: db_field -> csv_header
         inv_map = {v: k for k, v in mapping.items()}
 
-        rows = self.get_preview_data(job, max_rows=10000)
+        rows = self.iter_rows(job)
         errors = []
         valid = 0
 
@@ -312,17 +347,21 @@ class CSVImportService:
             'errors': errors[:50],
         }
 
-    def execute_import(self, job: CSVImportJob) -> Dict:
+    def execute_import(self, job: CSVImportJob, progress=None) -> Dict:
         """
         Fuehrt den Import aus.
 
+        Args:
+            progress: Optional - Callback (geschrieben, gesamt) nach jedem Block
+                (Kunden und Artikel)
+
         Returns:
             Dict mit imported, skipped, errors
         """
         if job.import_type == 'customer':
-            return self._import_customers(job)
+            return self._import_customers(job, progress)
         elif job.import_type == 'article':
-            return self._import_articles(job)
+            return self._import_articles(job, progress)
         elif job.import_type == 'booking':
             return self._import_bookings(job)
         elif job.import_type == 'bank_statement':
@@ -330,124 +369,91 @@ class CSVImportService:
         else:
             return {'imported': 0, 'skipped': 0, 'errors': ['Unbekannter Import-Typ']}
 
-    def _import_customers(self, job: CSVImportJob) -> Dict:
-        """Importiert Kunden"""
+    def _import_customers(self, job: CSVImportJob, progress=None) -> Dict:
+        """Importiert Kunden (Duplikate ueber Kundennummer/E-Mail, Bulk-INSERT in Bloecken)"""
         from src.models.models import Customer
-
-        mapping = job.column_mapping
-        inv_map = {v: k for k, v in mapping.items()}
-        rows = self.get_preview_data(job, max_rows=100000)
-
-        imported = 0
-        skipped = 0
-        errors = []
-
-        # Hoechste Kunden-ID ermitteln (Format: KD001, KD002, ...)
-        last_customer = Customer.query.filter(
-            Customer.id.like('KD%')
-        ).order_by(Customer.id.desc()).first()
-
-        if last_customer:
-            try:
-                next_num = int(last_customer.id[2:]) + 1
-            except (ValueError, IndexError):
-                next_num = 1
-        else:
-            next_num = 1
-
-        for i, row in enumerate(rows, start=2):
-            try:
-                # Duplikat-Check ueber Kundennummer
-                cust_nr = self._get_mapped_val(row, inv_map, 'customer_number')
-                if cust_nr:
-                    existing = Customer.query.filter_by(customer_number=cust_nr).first()
-                    if existing:
-                        skipped += 1
-                        continue
-
-                # Duplikat-Check ueber E-Mail
-                email = self._get_mapped_val(row, inv_map, 'email')
-                if email:
-                    existing = Customer.query.filter_by(email=email).first()
-                    if existing:
-                        skipped += 1
-                        continue
-
-                company = self._get_mapped_val(row, inv_map, 'company_name')
-                customer_type = 'business' if company else 'private'
-
-                customer = Customer(
-                    id=f'KD{next_num:03d}',
-                    customer_type=customer_type,
-                    customer_number=cust_nr or None,
-                    company_name=company,
-                    first_name=self._get_mapped_val(row, inv_map, 'first_name'),
-                    last_name=self._get_mapped_val(row, inv_map, 'last_name') or 'Unbekannt',
-                    email=email,
-                    phone=self._get_mapped_val(row, inv_map, 'phone'),
-                    street=self._get_mapped_val(row, inv_map, 'street'),
-                    postal_code=self._get_mapped_val(row, inv_map, 'postal_code'),
-                    city=self._get_mapped_val(row, inv_map, 'city'),
-                    country=self._get_mapped_val(row, inv_map, 'country') or 'DE',
-                    vat_id=self._get_mapped_val(row, inv_map, 'vat_id'),
-                )
-                db.session.add(customer)
-                next_num += 1
-                imported += 1
-
-                if imported % 100 == 0:
-                    db.session.flush()
-
-            except Exception as e:
-                errors.append({'row': i, 'error': str(e)})
-
-        db.session.commit()
+        from src.services.id_generator_service import IdGenerator
+
+        tracker = ImportProgress(job.total_rows or 0, progress)
+        imported = skipped = 0
+
+        for frame in self._mapped_frames(job, ['customer_number', 'company_name', 'first_name', 'last_name',
+                                               'email', 'phone', 'street', 'postal_code', 'city', 'country',
+                                               'vat_id']):
+            # Duplikat-Check gegen die DB (fruehere Bloecke sind schon committet) und im Block
+            known_numbers = load_keys(Customer.customer_number, Customer.id, frame['customer_number'].dropna())
+            known_emails = load_keys(Customer.email, Customer.id, frame['email'].dropna())
+            duplicate = (frame['customer_number'].isin(known_numbers.keys())
+                         | frame['email'].isin(known_emails.keys())
+                         | (frame['customer_number'].notna() & frame['customer_number'].duplicated())
+                         | (frame['email'].notna() & frame['email'].duplicated()))
+            new = frame[~duplicate]
+
+            customers = pd.DataFrame({
+                'id': IdGenerator.reserve(Customer, 'KD', len(new), pad=3),
+                'customer_type': np.where(new['company_name'].notna(), 'business', 'private'),
+                'last_name': new['last_name'].fillna('Unbekannt').values,
+                'country': new['country'].fillna('DE').values,
+            })
+            for field in ('customer_number', 'company_name', 'first_name', 'email', 'phone', 'street',
+                          'postal_code', 'city', 'vat_id'):
+                customers[field] = new[field].values
+
+            skipped += int(duplicate.sum())
+            tracker.skip(int(duplicate.sum()))
+            imported += tracker.write(to_records(customers), lambda block: bulk_insert(Customer, block), 'Kunden')
+            job.imported_rows = imported
+            db.session.commit()
+
+        errors = [{'row': None, 'error': e} for e in tracker.errors]
         self._finalize_job(job, imported, skipped, errors)
         return {'imported': imported, 'skipped': skipped, 'errors': errors}
 
-    def _import_articles(self, job: CSVImportJob) -> Dict:
-        """Importiert Artikel"""
-        from src.models.models import Article
-
-        mapping = job.column_mapping
-        inv_map = {v: k for k, v in mapping.items()}
-        rows = self.get_preview_data(job, max_rows=100000)
+    def _import_articles(self, job: CSVImportJob, progress=None) -> Dict:
+        """Importiert Artikel (vorhandene Artikelnummern werden uebersprungen)"""
+        from src.models.models import Article, Brand
+        from src.services.id_generator_service import IdGenerator
 
-        imported = 0
-        skipped = 0
+        tracker = ImportProgress(job.total_rows or 0, progress)
+        imported = skipped = 0
         errors = []
 
-        for i, row in enumerate(rows, start=2):
-            try:
-                art_nr = self._get_mapped_val(row, inv_map, 'article_number')
-                if art_nr:
-                    existing = Article.query.filter_by(article_number=art_nr).first()
-                    if existing:
-                        skipped += 1
-                        continue
-
-                price_str = self._get_mapped_val(row, inv_map, 'price')
-                price = self._parse_decimal(price_str) if price_str else Decimal('0')
-
-                article = Article(
-                    article_number=art_nr or None,
-                    name=self._get_mapped_val(row, inv_map, 'name') or 'Unbenannt',
-                    description=self._get_mapped_val(row, inv_map, 'description'),
-                    price=price,
-                    brand=self._get_mapped_val(row, inv_map, 'brand'),
-                    material=self._get_mapped_val(row, inv_map, 'material'),
-                    color=self._get_mapped_val(row, inv_map, 'color'),
-                )
-                db.session.add(article)
-                imported += 1
-
-                if imported % 100 == 0:
-                    db.session.flush()
-
-            except Exception as e:
-                errors.append({'row': i, 'error': str(e)})
-
-        db.session.commit()
+        for frame in self._mapped_frames(job, ['article_number', 'name', 'description', 'price', 'brand',
+                                               'material', 'color']):
+            price = self._decimal_column(frame['price'])
+            invalid = frame['price'].notna() & price.isna()
+            for row in frame.index[invalid]:
+                errors.append({'row': int(row) + 2, 'error': f"Ungueltiger Preis: {frame.at[row, 'price']}"})
+
+            known = load_keys(Article.article_number, Article.id, frame['article_number'].dropna())
+            duplicate = (frame['article_number'].isin(known.keys())
+                         | (frame['article_number'].notna() & frame['article_number'].duplicated()))
+            new = frame[~duplicate & ~invalid]
+
+            brands = ensure_names(Brand, new['brand'].dropna().unique(),
+                                  {'active': True, 'created_at': datetime.utcnow()})
+            articles = pd.DataFrame({
+                'id': IdGenerator.articles(len(new)),
+                'article_number': new['article_number'].values,
+                'name': new['name'].fillna('Unbenannt').values,
+                'description': new['description'].values,
+                'price': price[new.index].fillna(0).values,
+                'brand': new['brand'].values,
+                'brand_id': new['brand'].map(brands).astype('Int64').values,
+                'material': new['material'].values,
+                'color': new['color'].values,
+            })
+
+            skipped += int(duplicate.sum())
+            tracker.skip(int((duplicate | invalid).sum()))
+            # Artikelnummer eindeutig: parallel angelegte Nummern werden nicht ueberschrieben
+            imported += tracker.write(
+                to_records(articles),
+                lambda block: bulk_upsert(Article, block, ['article_number'], update_columns=[]), 'Artikel')
+            job.imported_rows = imported
+            db.session.commit()
+
+        errors.extend({'row': None, 'error': e} for e in tracker.errors)
         self._finalize_job(job, imported, skipped, errors)
         return {'imported': imported, 'skipped': skipped, 'errors': errors}
 
@@ -457,7 +463,7 @@ class CSVImportService:
 
         mapping = job.column_mapping
         inv_map = {v: k for k, v in mapping.items()}
-        rows = self.get_preview_data(job, max_rows=100000)
+        rows = self.iter_rows(job)
 
         imported = 0
         skipped = 0
@@ -521,7 +527,7 @@ class CSVImportService:
 
         mapping = job.column_mapping
         inv_map = {v: k for k, v in mapping.items()}
-        rows = self.get_preview_data(job, max_rows=100000)
+        rows = self.iter_rows(job)
 
         imported = 0
         skipped = 0
@@ -579,6 +585,27 @@ class CSVImportService:
 
     # === Hilfsfunktionen ===
 
+    def _mapped_frames(self, job: CSVImportJob, fields: List[str]) -> Iterator[pd.DataFrame]:
+        """Gemappte Spalten als Text (getrimmt, leer -> None), blockweise aus der Datei"""
+        inv_map = {v: k for k, v in job.column_mapping.items()}
+        for chunk in iter_chunks(job.file_path, self._layout(job)):
+            chunk = chunk[(chunk.notna() & (chunk != '')).any(axis=1)]  # Leerzeilen
+            frame = pd.DataFrame(index=chunk.index)
+            for field in fields:
+                csv_col = inv_map.get(field)
+                frame[field] = text_column(chunk[csv_col]) if csv_col in chunk.columns else None
+            yield frame
+
+    def _decimal_column(self, series: pd.Series) -> pd.Series:
+        """Wie _parse_decimal fuer eine ganze Spalte (ungueltig -> NaN)"""
+        values = series.fillna('').astype(str).str.strip()
+        has_dot, has_comma = values.str.contains('.', regex=False), values.str.contains(',', regex=False)
+        german = has_dot & has_comma & (values.str.find('.') < values.str.find(','))
+        values = values.where(~german, values.str.replace('.', '', regex=False))
+        values = values.where(~(has_dot & has_comma & ~german), values.str.replace(',', '', regex=False))
+        values = values.str.replace(',', '.', regex=False)
+        return pd.to_numeric(values, errors='coerce')
+
     def _get_mapped_val(self, row: Dict, inv_map: Dict, field: str) -> Optional[str]:
         """Holt gemappten Wert aus einer CSV-Zeile"""
         csv_col = inv_map.get(field)
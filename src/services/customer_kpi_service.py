@@ -0,0 +1,632 @@
+# -*- coding: utf-8 -*-
+"""
+KUNDEN-KENNZAHLEN SERVICE
+=========================
+Vorberechnete Kennzahlen je Kunde (Tabelle customer_kpis) fuer die
+CRM-Rankings und die Kunden-Statistik. Statt bei jedem CRM-Dashboard
+GROUP-BY-Joins ueber alle Kunden und Auftraege auszufuehren, sind alle
+Rankings indizierte ORDER BY ... LIMIT-Abfragen auf customer_kpis:
+
+- Umsatz gesamt / 12 Monate / 6 Monate, Anzahl Auftraege, groesster Auftrag
+- Rechnungen (bezahlt, ueberfaellig, offener Betrag), mittlere Zahlungsdauer
+  (letzte Zahlung - Faelligkeit, je bezahlter Rechnung)
+- letzter Kontakt (Kalender-Aktivitaeten und CRM-Kontakte)
+- VIP-Score (Umsatz, Auftragsfrequenz, Kundentreue; 0-100)
+
+Pflege:
+- Aenderungen an Auftraegen, Rechnungen, Zahlungen, Kontakten und Kunden
+  werden beim Flush erkannt; die betroffenen Kunden werden in derselben
+  Transaktion (SAVEPOINT, Upsert) neu berechnet (mehr als
+  INLINE_REFRESH_MAX oder bei Fehlern: als `stale` markiert).
+  Bulk-Statements markieren die betroffenen Kunden (ueber ihre
+  WHERE-Bedingung bestimmt, sonst alle) als `stale`.
+- Beim Lesen (ensure_fresh) werden bis zu ID_CHUNK veraltete und fehlende
+  Zeilen nachberechnet; mehr baut erst der naechtliche Job neu auf. Ist der
+  Stand aelter als heute, wird komplett neu aufgebaut (Zeitfenster,
+  Kundentreue) - auch ohne Scheduler.
+- Mit APScheduler naechtlich rebuild_kpis() um REBUILD_HOUR Uhr.
+
+Nutzung:
+    from src.services.customer_kpi_service import ensure_fresh
+    ensure_fresh()
+    CustomerKpi.query.order_by(CustomerKpi.revenue_total.desc()).limit(20)
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import importlib
+import logging
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import instance_state
+
+from src.models.models import db
+from src.models.customer_kpi import CustomerKpi
+
+logger = logging.getLogger(__name__)
+
+# Kalender-Aktivitaeten, die als Kundenkontakt zaehlen
+CONTACT_BLOCK_TYPES = ('call_in', 'call_out', 'customer_visit', 'site_visit', 'email')
+# Gewichte des VIP-Scores (wie CustomerAnalytics.WEIGHTS)
+VIP_WEIGHTS = {'revenue': 0.25, 'frequency': 0.10, 'loyalty': 0.15}
+# Mehr betroffene Kunden je Flush werden nur als veraltet markiert
+INLINE_REFRESH_MAX = 50
+# Kunden je Teilberechnung; mehr veraltete Zeilen -> kompletter Neuaufbau
+ID_CHUNK = 500
+# Naechtlicher Neuaufbau (Stunde, lokale Zeit)
+REBUILD_HOUR = 3
+
+
+class KpiSource(namedtuple('KpiSource', 'model key attrs via_invoice')):
+    """
+    Tabelle, deren Aenderungen Kennzahlen betreffen.
+
+    model:       'modul:Klasse', wird erst bei Bedarf importiert
+    key:         Spalte mit der Kunden-ID (bzw. Rechnungs-ID)
+    attrs:       Attribute, deren Aenderung eine Neuberechnung ausloest
+    via_invoice: key ist eine Rechnungs-ID (Kunde ueber rechnungen.kunde_id)
+    """
+
+
+SOURCES = (
+    KpiSource('src.models.models:Customer', 'id', ('created_at',), False),
+    KpiSource('src.models.models:Order', 'customer_id', ('customer_id', 'total_price', 'status', 'created_at'), False),
+    KpiSource('src.models.rechnungsmodul:Rechnung', 'kunde_id',
+              ('kunde_id', 'status', 'brutto_gesamt', 'faelligkeitsdatum'), False),
+    KpiSource('src.models.rechnungsmodul:RechnungsZahlung', 'rechnung_id', ('rechnung_id', 'zahlungsdatum'), True),
+    KpiSource('src.models.production_block:ProductionBlock', 'customer_id',
+              ('customer_id', 'start_date', 'block_type', 'is_active'), False),
+    KpiSource('src.models.crm_contact:CustomerContact', 'customer_id', ('customer_id', 'contact_date'), False),
+)
+
+_source_classes = None
+
+
+def _model(path):
+    module_name, class_name = path.split(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _get_sources():
+    """{Model-Klasse: KpiSource} fuer alle importierbaren Quellen"""
+    global _source_classes
+    if _source_classes is None:
+        classes = {}
+        for source in SOURCES:
+            try:
+                classes[_model(source.model)] = source
+            except (ImportError, AttributeError) as e:
+                logger.debug(f"Kennzahlen-Quelle {source.model} nicht verfuegbar: {e}")
+        _source_classes = classes
+    return _source_classes
+
+
+def _chunks(ids, size=ID_CHUNK):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+# ==========================================
+# BERECHNUNG
+# ==========================================
+
+def vip_components(revenue, order_count, created_at, max_revenue, max_orders, today=None):
+    """
+    VIP-Teilscores (je 0-100) und Gesamtscore.
+
+    Umsatz relativ zum groessten Einzelauftrag, Frequenz relativ zum
+    Kunden mit den meisten Auftraegen, Treue 20 Punkte je Kundenjahr.
+    """
+    today = today or date.today()
+    revenue_score = min(100.0, float(revenue or 0) / float(max_revenue or 1) * 100)
+    frequency_score = min(100.0, (order_count or 0) / float(max_orders or 1) * 100)
+    years_customer = (today - created_at.date()).days / 365 if created_at else 0
+    loyalty_score = min(100.0, years_customer * 20)
+    overall_score = (
+        revenue_score * VIP_WEIGHTS['revenue']
+        + frequency_score * VIP_WEIGHTS['frequency']
+        + loyalty_score * VIP_WEIGHTS['loyalty']
+    ) / sum(VIP_WEIGHTS.values())
+    return {
+        'years_customer': round(years_customer, 1),
+        'revenue_score': round(revenue_score, 1),
+        'frequency_score': round(frequency_score, 1),
+        'loyalty_score': round(loyalty_score, 1),
+        'overall_score': round(overall_score, 1),
+    }
+
+
+def _empty_row(customer_id, today):
+    return {
+        'customer_id': customer_id,
+        'revenue_total': 0.0, 'order_count': 0, 'revenue_12m': 0.0, 'order_count_12m': 0,
+        'revenue_6m': 0.0, 'avg_order_value': 0.0, 'max_order_value': 0.0,
+        'orders_completed': 0, 'orders_cancelled': 0, 'last_order_at': None,
+        'invoices_total': 0, 'invoices_paid': 0, 'invoices_overdue': 0, 'overdue_amount': 0.0,
+        'avg_days_to_pay': None, 'last_contact': None,
+        'vip_score': 0.0, 'stale': False, 'computed_on': today,
+    }
+
+
+def _where_in(column, ids):
+    return sa.true() if ids is None else column.in_(ids)
+
+
+def _add_order_kpis(connection, rows, ids, today):
+    from src.models.models import Order
+
+    o = Order.__table__
+    year_ago = datetime.combine(today - timedelta(days=365), time.min)
+    six_months_ago = datetime.combine(today - timedelta(days=180), time.min)
+    # Wie bisher: Auftraege ohne Status zaehlen nicht (NOT IN ist dort NULL)
+    active = o.c.status.notin_(['cancelled'])
+    price = sa.func.coalesce(o.c.total_price, 0)
+
+    def total(condition, value):
+        return sa.func.coalesce(sa.func.sum(sa.case((condition, value), else_=0)), 0)
+
+    query = sa.select(
+        o.c.customer_id,
+        total(active, price),
+        total(active, 1),
+        total(sa.and_(active, o.c.created_at >= year_ago), price),
+        total(sa.and_(active, o.c.created_at >= year_ago), 1),
+        total(sa.and_(active, o.c.created_at >= six_months_ago), price),
+        sa.func.max(sa.case((active, price))),
+        total(o.c.status == 'completed', 1),
+        total(o.c.status == 'cancelled', 1),
+        sa.func.max(sa.case((active, o.c.created_at))),
+    ).where(o.c.customer_id.isnot(None), _where_in(o.c.customer_id, ids)).group_by(o.c.customer_id)
+
+    for (customer_id, revenue, count, revenue_12m, count_12m, revenue_6m, max_value,
+         completed, cancelled, last_order) in connection.execute(query):
+        row = rows.get(customer_id)
+        if row is None:
+            continue
+        row.update({
+            'revenue_total': float(revenue), 'order_count': int(count),
+            'revenue_12m': float(revenue_12m), 'order_count_12m': int(count_12m),
+            'revenue_6m': float(revenue_6m), 'max_order_value': float(max_value or 0),
+            'avg_order_value': float(revenue) / count if count else 0.0,
+            'orders_completed': int(completed), 'orders_cancelled': int(cancelled),
+            'last_order_at': last_order,
+        })
+
+
+def _add_invoice_kpis(connection, rows, ids):
+    try:
+        from src.models.rechnungsmodul import Rechnung, RechnungsZahlung, RechnungsStatus
+    except ImportError:
+        return  # Rechnungsmodul nicht verfuegbar
+
+    r, z = Rechnung.__table__, RechnungsZahlung.__table__
+    paid = r.c.status == RechnungsStatus.BEZAHLT
+    overdue = r.c.status == RechnungsStatus.UEBERFAELLIG
+    query = sa.select(
+        r.c.kunde_id,
+        sa.func.count(r.c.id),
+        sa.func.coalesce(sa.func.sum(sa.case((paid, 1), else_=0)), 0),
+        sa.func.coalesce(sa.func.sum(sa.case((overdue, 1), else_=0)), 0),
+        sa.func.coalesce(sa.func.sum(sa.case((overdue, r.c.brutto_gesamt), else_=0)), 0),
+    ).where(r.c.kunde_id.isnot(None), _where_in(r.c.kunde_id, ids)).group_by(r.c.kunde_id)
+    for customer_id, total, paid_count, overdue_count, overdue_amount in connection.execute(query):
+        row = rows.get(customer_id)
+        if row is not None:
+            row.update({'invoices_total': int(total), 'invoices_paid': int(paid_count),
+                        'invoices_overdue': int(overdue_count), 'overdue_amount': float(overdue_amount)})
+
+    # Zahlungsdauer je bezahlter Rechnung: letzte Zahlung - Faelligkeit (in Python, portabel)
+    days = {}
+    query = sa.select(r.c.kunde_id, r.c.faelligkeitsdatum, sa.func.max(z.c.zahlungsdatum)) \
+        .join(z, z.c.rechnung_id == r.c.id) \
+        .where(paid, r.c.kunde_id.isnot(None), r.c.faelligkeitsdatum.isnot(None), _where_in(r.c.kunde_id, ids)) \
+        .group_by(r.c.id, r.c.kunde_id, r.c.faelligkeitsdatum)
+    for customer_id, due, paid_on in connection.execute(query):
+        if paid_on is not None:
+            days.setdefault(customer_id, []).append((paid_on - due).days)
+    for customer_id, values in days.items():
+        row = rows.get(customer_id)
+        if row is not None:
+            row['avg_days_to_pay'] = round(sum(values) / len(values), 1)
+
+
+def _add_contact_kpis(connection, rows, ids):
+    latest = {}
+    try:
+        from src.models.production_block import ProductionBlock
+        pb = ProductionBlock.__table__
+        query = sa.select(pb.c.customer_id, sa.func.max(pb.c.start_date)).where(
+            pb.c.customer_id.isnot(None), pb.c.is_active == sa.true(),
+            pb.c.block_type.in_(CONTACT_BLOCK_TYPES), _where_in(pb.c.customer_id, ids),
+        ).group_by(pb.c.customer_id)
+        latest.update({customer_id: day for customer_id, day in connection.execute(query) if day})
+    except ImportError:
+        pass
+
+    try:
+        from src.models.crm_contact import CustomerContact
+        cc = CustomerContact.__table__
+        query = sa.select(cc.c.customer_id, sa.func.max(cc.c.contact_date)).where(
+            _where_in(cc.c.customer_id, ids)).group_by(cc.c.customer_id)
+        for customer_id, contact_date in connection.execute(query):
+            if contact_date:
+                day = contact_date.date()
+                latest[customer_id] = max(day, latest.get(customer_id, day))
+    except ImportError:
+        pass
+
+    for customer_id, day in latest.items():
+        row = rows.get(customer_id)
+        if row is not None:
+            row['last_contact'] = day
+
+
+def compute_kpis(connection, customer_ids=None, today=None):
+    """
+    Kennzahlen fuer die angegebenen Kunden (None = alle) berechnen.
+
+    Returns:
+        (rows, created) - {customer_id: Zeile fuer customer_kpis} und
+        {customer_id: created_at}; vip_score ist noch nicht gesetzt
+    """
+    from src.models.models import Customer
+
+    today = today or date.today()
+    c = Customer.__table__
+    created = dict(connection.execute(sa.select(c.c.id, c.c.created_at).where(_where_in(c.c.id, customer_ids))).all())
+    rows = {customer_id: _empty_row(customer_id, today) for customer_id in created}
+    if rows:
+        _add_order_kpis(connection, rows, customer_ids, today)
+        _add_invoice_kpis(connection, rows, customer_ids)
+        _add_contact_kpis(connection, rows, customer_ids)
+    return rows, created
+
+
+def _set_vip_scores(rows, created, max_revenue, max_orders, today):
+    for customer_id, row in rows.items():
+        row['vip_score'] = vip_components(row['revenue_total'], row['order_count'], created.get(customer_id),
+                                          max_revenue, max_orders, today)['overall_score']
+
+
+def _maxima(connection, exclude=None):
+    t = CustomerKpi.__table__
+    query = sa.select(sa.func.max(t.c.max_order_value), sa.func.max(t.c.order_count))
+    if exclude:
+        query = query.where(t.c.customer_id.notin_(exclude))
+    max_value, max_orders = connection.execute(query).one()
+    return float(max_value or 0), int(max_orders or 0)
+
+
+def _upsert(connection):
+    """INSERT ... ON CONFLICT (customer_id) DO UPDATE, None ohne Dialekt-Unterstuetzung"""
+    t = CustomerKpi.__table__
+    dialect_name = connection.dialect.name
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    stmt = insert(t)
+    return stmt.on_conflict_do_update(
+        index_elements=[t.c.customer_id],
+        set_={c.name: stmt.excluded[c.name] for c in t.columns if c.name != 'customer_id'})
+
+
+def _write(connection, rows, ids=None):
+    """
+    Zeilen schreiben (Upsert - parallele Transaktionen fuer denselben Kunden
+    kollidieren nicht am Primaerschluessel) und Zeilen geloeschter Kunden
+    entfernen. ids=None: alle Kunden.
+    """
+    from src.models.models import Customer
+
+    t = CustomerKpi.__table__
+    if ids is None:
+        c = Customer.__table__
+        connection.execute(t.delete().where(~sa.exists().where(c.c.id == t.c.customer_id)))
+    else:
+        gone = sorted(set(ids) - set(rows))
+        if gone:
+            connection.execute(t.delete().where(t.c.customer_id.in_(gone)))
+
+    upsert = _upsert(connection)
+    for chunk in _chunks(rows.values()):
+        if upsert is None:
+            connection.execute(t.delete().where(t.c.customer_id.in_([row['customer_id'] for row in chunk])))
+            connection.execute(t.insert(), chunk)
+        else:
+            connection.execute(upsert, chunk)
+
+
+def refresh_customers(customer_ids, connection=None):
+    """
+    Kennzahlen einzelner Kunden neu berechnen (ohne Commit). Geloeschte
+    Kunden verlieren ihre Zeile. Aendert sich dadurch der groesste Auftrag
+    oder die hoechste Auftragszahl, werden alle anderen Zeilen als veraltet
+    markiert (VIP-Score ist relativ). Mehr als ID_CHUNK Kunden: rebuild.
+
+    Returns:
+        int: Anzahl neu berechneter Kunden
+    """
+    ids = sorted({customer_id for customer_id in customer_ids if customer_id})
+    if not ids:
+        return 0
+    connection = connection or db.session.connection()
+    if len(ids) > ID_CHUNK:
+        return rebuild_kpis(connection=connection)
+
+    today = date.today()
+    before = _maxima(connection)
+    others = _maxima(connection, exclude=ids)
+    rows, created = compute_kpis(connection, ids, today)
+    max_revenue = max([others[0]] + [r['max_order_value'] for r in rows.values()])
+    max_orders = max([others[1]] + [r['order_count'] for r in rows.values()])
+    _set_vip_scores(rows, created, max_revenue, max_orders, today)
+    _write(connection, rows, ids)
+
+    if (max_revenue, max_orders) != before:
+        t = CustomerKpi.__table__
+        connection.execute(t.update().where(t.c.customer_id.notin_(ids)).values(stale=True))
+    return len(rows)
+
+
+def rebuild_kpis(connection=None):
+    """
+    Alle Kennzahlen neu aufbauen (naechtlicher Job, Migration). Ohne
+    uebergebene Connection wird committet.
+
+    Returns:
+        int: Anzahl Kunden
+    """
+    own = connection is None
+    connection = connection or db.session.connection()
+    today = date.today()
+    rows, created = compute_kpis(connection, None, today)
+    max_revenue = max([r['max_order_value'] for r in rows.values()], default=0)
+    max_orders = max([r['order_count'] for r in rows.values()], default=0)
+    _set_vip_scores(rows, created, max_revenue, max_orders, today)
+    _write(connection, rows)
+    if own:
+        db.session.commit()
+    logger.info(f"Kunden-Kennzahlen fuer {len(rows)} Kunden neu aufgebaut")
+    return len(rows)
+
+
+def mark_stale(customer_ids=None, connection=None):
+    """Zeilen (None = alle) beim naechsten Lesen neu berechnen lassen"""
+    t = CustomerKpi.__table__
+    connection = connection or db.session.connection()
+    if customer_ids is None:
+        connection.execute(t.update().values(stale=True))
+        return
+    for chunk in _chunks(sorted(customer_ids)):
+        connection.execute(t.update().where(t.c.customer_id.in_(chunk)).values(stale=True))
+
+
+def ensure_fresh():
+    """
+    Vor dem Lesen: veraltete und fehlende Zeilen nachberechnen, bei einem
+    Stand von gestern (oder leerer Tabelle) komplett neu aufbauen. Laeuft in
+    einer eigenen Transaktion - offene Aenderungen der Request-Session
+    werden weder committet noch verworfen. Fehler werden protokolliert,
+    gelesen wird dann der vorhandene Stand.
+    """
+    from src.models.models import Customer
+
+    t, c = CustomerKpi.__table__, Customer.__table__
+    try:
+        with db.engine.begin() as connection:
+            oldest = connection.execute(sa.select(sa.func.min(t.c.computed_on))).scalar()
+            if oldest is None or oldest < date.today():
+                if oldest is None and not connection.execute(sa.select(c.c.id).limit(1)).first():
+                    return
+                rebuild_kpis(connection=connection)
+                return
+
+            # Zweiter Durchgang: geaenderte Maxima markieren die uebrigen Zeilen
+            for _ in range(2):
+                pending = connection.execute(
+                    sa.select(t.c.customer_id).where(t.c.stale == sa.true())
+                    .union(sa.select(c.c.id).where(~sa.exists().where(t.c.customer_id == c.c.id)))
+                    .limit(ID_CHUNK + 1)).scalars().all()
+                if not pending:
+                    return
+                if len(pending) > ID_CHUNK:
+                    # z.B. nach einem Bulk-Statement ohne bestimmbare Kunden: nicht
+                    # im Request neu aufbauen, das erledigt der naechtliche Job
+                    logger.info(f"Kunden-Kennzahlen: ueber {ID_CHUNK} veraltet, Neuaufbau naechtlich")
+                    return
+                refresh_customers(pending, connection)
+    except Exception as e:
+        logger.warning(f"Kunden-Kennzahlen nicht aktualisiert: {e}")
+
+
+# ==========================================
+# SESSION-EVENTS
+# ==========================================
+
+def _key_values(state, source):
+    """Alte und neue Kunden-/Rechnungs-ID eines Objekts (None = nicht geladen)"""
+    if source.key not in state.dict and not state.attrs[source.key].history.deleted:
+        return None
+    history = state.attrs[source.key].history
+    return {v for v in (*history.added, *history.deleted, *history.unchanged) if v is not None}
+
+
+def _collect_changes(session):
+    """Betroffene Kunden-IDs der Objekte im Flush"""
+    sources = _get_sources()
+    customer_ids, invoice_ids, unknown = set(), set(), {}
+
+    changes = [(obj, 'new') for obj in session.new]
+    changes += [(obj, 'dirty') for obj in session.dirty]
+    changes += [(obj, 'deleted') for obj in session.deleted]
+
+    for obj, mode in changes:
+        source = sources.get(type(obj))
+        if source is None:
+            continue
+        state = instance_state(obj)
+        if mode == 'dirty' and not any(state.attrs[a].history.has_changes() for a in source.attrs):
+            continue
+        values = _key_values(state, source)
+        if values is None:
+            if state.identity:
+                unknown.setdefault(type(obj), set()).add(state.identity[0])
+            continue
+        (invoice_ids if source.via_invoice else customer_ids).update(values)
+
+    connection = session.connection()
+    for model, pks in unknown.items():
+        source = sources[model]
+        table = model.__table__
+        found = connection.execute(sa.select(table.c[source.key]).where(table.c.id.in_(pks))).scalars()
+        (invoice_ids if source.via_invoice else customer_ids).update(v for v in found if v is not None)
+
+    if invoice_ids:
+        from src.models.rechnungsmodul import Rechnung
+        r = Rechnung.__table__
+        customer_ids.update(v for v in connection.execute(
+            sa.select(r.c.kunde_id).where(r.c.id.in_(invoice_ids))).scalars() if v is not None)
+    return customer_ids
+
+
+def _on_after_flush(session, flush_context):
+    """
+    Betroffene Kunden in der gleichen Transaktion neu berechnen. Die
+    Neuberechnung laeuft in einem SAVEPOINT: schlaegt sie fehl, bleibt die
+    Transaktion des Aufrufers benutzbar (PostgreSQL) und die Kunden werden
+    nur als veraltet markiert. Fehler beim Markieren werden weitergereicht.
+    """
+    customer_ids = _collect_changes(session)
+    if not customer_ids:
+        return
+    connection = session.connection()
+    if len(customer_ids) <= INLINE_REFRESH_MAX:
+        try:
+            with connection.begin_nested():
+                refresh_customers(customer_ids, connection)
+            return
+        except sa.exc.SQLAlchemyError as e:
+            logger.warning(f"Kunden-Kennzahlen nicht neu berechnet, als veraltet markiert: {e}")
+    mark_stale(customer_ids, connection)
+
+
+_UNKNOWN = object()
+
+
+def _assigned_value(statement, key):
+    """Wert, den ein Bulk-UPDATE der Spalte key zuweist (None: nicht gesetzt)"""
+    values = getattr(statement, '_values', None) or dict(getattr(statement, '_ordered_values', None) or ())
+    for column, value in values.items():
+        if getattr(column, 'key', column) != key:
+            continue
+        if isinstance(value, sa.sql.elements.BindParameter):
+            return {value.value}
+        return {value} if isinstance(value, (str, int)) else _UNKNOWN
+    return None
+
+
+def _bulk_customer_ids(orm_execute_state, table, source, connection):
+    """
+    Kunden-IDs, die ein Bulk-Statement betrifft - vor der Ausfuehrung per
+    SELECT mit derselben WHERE-Bedingung (bisherige Werte), dazu die neu
+    zugewiesenen Werte. None = nicht bestimmbar (alle Zeilen veraltet).
+    """
+    statement = orm_execute_state.statement
+    params = orm_execute_state.parameters
+    rows = params if isinstance(params, (list, tuple)) else [params] if params else []
+    key = table.c[source.key]
+
+    if orm_execute_state.is_insert:
+        if not rows or not all(isinstance(row, dict) and source.key in row for row in rows):
+            return None
+        values = {row[source.key] for row in rows}
+    elif statement.whereclause is None and rows and all(isinstance(row, dict) and 'id' in row for row in rows):
+        # UPDATE nach Primaerschluessel (Parameterliste)
+        values = set()
+        for chunk in _chunks(row['id'] for row in rows):
+            values.update(connection.execute(sa.select(key).distinct().where(table.c.id.in_(chunk))).scalars())
+        values.update(row[source.key] for row in rows if source.key in row)
+    else:
+        query = sa.select(key).distinct()
+        if statement.whereclause is not None:
+            query = query.where(statement.whereclause)
+        values = set(connection.execute(query).scalars())
+        if orm_execute_state.is_update:
+            assigned = _assigned_value(statement, source.key)
+            if assigned is _UNKNOWN:
+                return None
+            values.update(assigned or ())
+
+    values.discard(None)
+    if source.via_invoice and values:
+        from src.models.rechnungsmodul import Rechnung
+        r = Rechnung.__table__
+        invoice_ids, values = values, set()
+        for chunk in _chunks(invoice_ids):
+            values.update(v for v in connection.execute(
+                sa.select(r.c.kunde_id).where(r.c.id.in_(chunk))).scalars() if v is not None)
+    return values
+
+
+def _on_orm_execute(orm_execute_state):
+    """Bulk-INSERT/UPDATE/DELETE: betroffene Kunden als veraltet markieren"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    source = _get_sources().get(mapper.class_)
+    if source is None:
+        return
+
+    connection = orm_execute_state.session.connection()
+    customer_ids = _bulk_customer_ids(orm_execute_state, mapper.class_.__table__, source, connection)
+    # Neue Kunden ohne Zeile findet ensure_fresh() ohnehin; Fehler gehen an
+    # den Aufrufer (nicht verschlucken - die Transaktion waere sonst abgebrochen)
+    mark_stale(customer_ids, connection)
+
+
+def _register_events():
+    if not event.contains(Session, 'after_flush', _on_after_flush):
+        event.listen(Session, 'after_flush', _on_after_flush)
+    if not event.contains(Session, 'do_orm_execute', _on_orm_execute):
+        event.listen(Session, 'do_orm_execute', _on_orm_execute)
+
+
+def init_customer_kpis(app):
+    """
+    Registriert die Session-Events und den naechtlichen Neuaufbau.
+    In create_app() nach init_scheduler() aufrufen.
+    """
+    if app.extensions.get('customer_kpis'):
+        return
+
+    _register_events()
+
+    try:
+        from src.services.scheduler_service import add_system_job
+        add_system_job(rebuild_kpis, 'cron', 'customer_kpis_rebuild', hour=REBUILD_HOUR, minute=0)
+    except ImportError:
+        pass  # Ohne APScheduler: Neuaufbau beim ersten Lesen des Tages (ensure_fresh)
+
+    app.extensions['customer_kpis'] = True
+
+
+__all__ = [
+    'CONTACT_BLOCK_TYPES',
+    'compute_kpis',
+    'refresh_customers',
+    'rebuild_kpis',
+    'mark_stale',
+    'ensure_fresh',
+    'vip_components',
+    'init_customer_kpis',
+]
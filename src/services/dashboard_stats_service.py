@@ -0,0 +1,503 @@
+# -*- coding: utf-8 -*-
+"""
+DASHBOARD-STATISTIK SERVICE
+===========================
+Materialisierte Dashboard-Kennzahlen (Tabelle dashboard_stats).
+
+Statt bei jedem Dashboard-Aufruf ~30 COUNT/SUM-Abfragen auszufuehren, liest
+das Dashboard eine einzige Zeilenmenge aus dashboard_stats:
+
+- Zaehler (offene Auftraege, Kunden, Artikel, ...) werden beim Flush
+  inkrementell angepasst (value = value +/- 1, gleiche Transaktion).
+- Ist der alte Wert eines Objekts nicht bekannt (z.B. Bulk-UPDATE), wird
+  die Kennzahl als `stale` markiert und beim naechsten Lesen neu berechnet.
+- Tageswerte (Kasse, Versand heute, ueberfaellige Aufgaben, Bestellbedarf)
+  sind `volatile`: sie werden nach VOLATILE_TTL_SECONDS neu berechnet.
+- Alle Zeilen werden spaetestens nach FULL_RECOMPUTE_SECONDS neu berechnet
+  (Selbstheilung, auch ohne Scheduler); mit APScheduler zusaetzlich alle
+  15 Minuten per recompute_all().
+
+Bei aktivem Tenant-Kontext (MULTI_TENANT_ENABLED) wird direkt gezaehlt,
+da der Snapshot mandantenuebergreifend ist.
+
+Nutzung:
+    from src.services.dashboard_stats_service import get_dashboard_stats
+    stats = get_dashboard_stats()   # {'open_orders': 12, ...}
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import logging
+import importlib
+from collections import defaultdict
+from datetime import datetime, date
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, text, bindparam
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import instance_state
+
+from src.models.models import db
+from src.models.dashboard_stats import DashboardStat
+
+logger = logging.getLogger(__name__)
+
+# Tageswerte maximal so alt (Sekunden)
+VOLATILE_TTL_SECONDS = 60
+# Jede Kennzahl spaetestens nach dieser Zeit komplett neu zaehlen (Sekunden)
+FULL_RECOMPUTE_SECONDS = 3600
+# Intervall des Scheduler-Jobs (Minuten)
+RECOMPUTE_INTERVAL_MINUTES = 15
+
+# Kennzahlen ohne Datenquelle (Template erwartet die Schluessel)
+ZERO_DEFAULTS = (
+    'open_leads', 'overdue_payments', 'user_count', 'low_stock',
+    'design_count', 'dst_count',
+)
+
+OPEN_ORDER_STATUSES = ('pending', 'approved', 'in_progress')
+CLOSED_TODO_STATUSES = ('completed', 'cancelled')
+
+
+class _UnknownValue(Exception):
+    """Alter Attributwert nicht verfuegbar -> Kennzahl neu berechnen"""
+
+
+class StatDef:
+    """
+    Definition einer Kennzahl.
+
+    model:     'modul:Klasse', wird erst bei Bedarf importiert
+    count:     fn(Model) -> Zahl, volle Berechnung per SQL
+    predicate: fn(get) -> bool, zaehlt das Objekt mit? (fuer Inkremente)
+    attrs:     Attribute, von denen predicate abhaengt
+    volatile:  zeitabhaengig, wird nur per TTL/stale neu berechnet
+    """
+
+    def __init__(self, key, model, count, predicate=None, attrs=(), volatile=False):
+        self.key = key
+        self.model_path = model
+        self.count = count
+        self.predicate = predicate
+        self.attrs = tuple(attrs)
+        self.volatile = volatile or predicate is None
+
+    def resolve(self):
+        """Model-Klasse importieren (None, wenn das Modul fehlt)"""
+        module_name, class_name = self.model_path.split(':')
+        try:
+            return getattr(importlib.import_module(module_name), class_name)
+        except (ImportError, AttributeError):
+            return None
+
+    def compute(self):
+        """Volle Berechnung per SQL (0, wenn die Quelle nicht verfuegbar ist)"""
+        model = self.resolve()
+        if model is None:
+            return 0
+        try:
+            return float(self.count(model) or 0)
+        except Exception as e:
+            db.session.rollback()
+            logger.debug(f"Dashboard-Kennzahl {self.key} nicht berechenbar: {e}")
+            return 0
+
+
+# ==========================================
+# BERECHNUNGEN
+# ==========================================
+
+def _today_range():
+    today = date.today()
+    return datetime.combine(today, datetime.min.time()), datetime.combine(today, datetime.max.time())
+
+
+def _count_items_to_order(OrderItem):
+    from src.models.models import Article
+    return OrderItem.query.filter(
+        OrderItem.supplier_order_status.in_(['none', 'to_order'])
+    ).join(Article).filter(OrderItem.quantity > Article.stock).count()
+
+
+def _sum_today_revenue(KassenBeleg):
+    start, end = _today_range()
+    today_sum = db.session.query(func.sum(KassenBeleg.brutto_gesamt)).filter(
+        KassenBeleg.erstellt_am.between(start, end),
+        KassenBeleg.storniert == False
+    ).scalar()
+    return round(float(today_sum or 0), 2)
+
+
+def _count_today_transactions(KassenBeleg):
+    start, end = _today_range()
+    return KassenBeleg.query.filter(
+        KassenBeleg.erstellt_am.between(start, end),
+        KassenBeleg.storniert == False
+    ).count()
+
+
+def _count_shipped_today(Shipment):
+    return Shipment.query.filter(
+        Shipment.created_at >= datetime.combine(date.today(), datetime.min.time())
+    ).count()
+
+
+def _count_overdue_todos(Todo):
+    return Todo.query.filter(
+        Todo.status.notin_(CLOSED_TODO_STATUSES),
+        Todo.due_date.isnot(None),
+        Todo.due_date < date.today()
+    ).count()
+
+
+def _count_open_workflow_orders(Order):
+    return Order.query.filter(
+        db.or_(Order.workflow_status.is_(None),
+               Order.workflow_status.notin_(['completed', 'cancelled'])),
+        Order.archived_at.is_(None),
+        Order.status != 'cancelled'
+    ).count()
+
+
+def _open_invoice_statuses():
+    from src.models.rechnungsmodul.models import RechnungsStatus
+    return (RechnungsStatus.ENTWURF, RechnungsStatus.OFFEN, RechnungsStatus.UEBERFAELLIG)
+
+
+_ORDER = 'src.models.models:Order'
+
+STAT_DEFS = (
+    # Auftraege
+    StatDef('open_orders', _ORDER,
+            lambda M: M.query.filter(M.status.in_(OPEN_ORDER_STATUSES)).count(),
+            lambda get: get('status') in OPEN_ORDER_STATUSES, ['status']),
+    StatDef('in_production', _ORDER,
+            lambda M: M.query.filter_by(status='in_progress').count(),
+            lambda get: get('status') == 'in_progress', ['status']),
+    StatDef('ready_pickup', _ORDER,
+            lambda M: M.query.filter_by(status='ready_for_pickup').count(),
+            lambda get: get('status') == 'ready_for_pickup', ['status']),
+    StatDef('ready_to_ship', _ORDER,
+            lambda M: M.query.filter_by(status='ready').count(),
+            lambda get: get('status') == 'ready', ['status']),
+    StatDef('shop_orders', _ORDER,
+            lambda M: M.query.filter_by(source='shop').count(),
+            lambda get: get('source') == 'shop', ['source']),
+    StatDef('open_workflow_orders', _ORDER, _count_open_workflow_orders,
+            lambda get: (get('workflow_status') not in ('completed', 'cancelled')
+                         and get('archived_at') is None
+                         and get('status') != 'cancelled'),
+            ['workflow_status', 'archived_at', 'status']),
+
+    # Stammdaten
+    StatDef('total_customers', 'src.models.models:Customer',
+            lambda M: M.query.count(), lambda get: True),
+    StatDef('article_count', 'src.models.models:Article',
+            lambda M: M.query.count(), lambda get: True),
+    StatDef('thread_count', 'src.models.models:Thread',
+            lambda M: M.query.count(), lambda get: True),
+
+    # Einkauf
+    StatDef('pending_supplier_orders', 'src.models.models:SupplierOrder',
+            lambda M: M.query.filter(M.status.in_(['draft', 'ordered'])).count(),
+            lambda get: get('status') in ('draft', 'ordered'), ['status']),
+
+    # Dokumente
+    StatDef('document_count', 'src.models.document:Document',
+            lambda M: M.query.filter_by(is_latest_version=True).count(),
+            lambda get: bool(get('is_latest_version')), ['is_latest_version']),
+    StatDef('open_post', 'src.models.document:PostEntry',
+            lambda M: M.query.filter_by(status='open').count(),
+            lambda get: get('status') == 'open', ['status']),
+    StatDef('unread_emails', 'src.models.document:ArchivedEmail',
+            lambda M: M.query.filter_by(is_read=False).count(),
+            lambda get: get('is_read') is False, ['is_read']),
+
+    # Website / Anfragen
+    StatDef('new_inquiries', 'src.models.inquiry:Inquiry',
+            lambda M: M.query.filter_by(status='neu').count(),
+            lambda get: get('status') == 'neu', ['status']),
+    StatDef('total_inquiries_open', 'src.models.inquiry:Inquiry',
+            lambda M: M.query.filter(M.status.in_(['neu', 'in_bearbeitung'])).count(),
+            lambda get: get('status') in ('neu', 'in_bearbeitung'), ['status']),
+
+    # Rechnungen / Angebote
+    StatDef('open_invoices', 'src.models.rechnungsmodul.models:Rechnung',
+            lambda M: M.query.filter(M.status.in_(_open_invoice_statuses())).count(),
+            lambda get: get('status') in _open_invoice_statuses(), ['status']),
+    StatDef('open_angebote', 'src.models.angebot:Angebot',
+            lambda M: M.query.filter(M.status.in_(['entwurf', 'verschickt'])).count(),
+            lambda get: get('status') in ('entwurf', 'verschickt'), ['status']),
+
+    # Aufgaben
+    StatDef('open_todos', 'src.models.todo:Todo',
+            lambda M: M.query.filter(M.status.notin_(CLOSED_TODO_STATUSES)).count(),
+            lambda get: get('status') not in CLOSED_TODO_STATUSES, ['status']),
+
+    # Zeitabhaengige Werte (volatile)
+    StatDef('overdue_tasks', 'src.models.todo:Todo', _count_overdue_todos),
+    StatDef('today_revenue', 'src.models.rechnungsmodul.models:KassenBeleg', _sum_today_revenue),
+    StatDef('today_transactions', 'src.models.rechnungsmodul.models:KassenBeleg',
+            _count_today_transactions),
+    StatDef('shipped_today', 'src.models.models:Shipment', _count_shipped_today),
+    StatDef('items_to_order', 'src.models.models:OrderItem', _count_items_to_order),
+)
+
+STAT_KEYS = tuple(d.key for d in STAT_DEFS)
+
+# Ganzzahlige Kennzahlen (Rest sind Betraege)
+_FLOAT_KEYS = {'today_revenue'}
+
+_defs_by_class = None  # Model-Klasse -> [StatDef]
+
+
+def _get_defs_by_class():
+    """Zuordnung Model-Klasse -> Kennzahlen (einmalig aufgeloest)"""
+    global _defs_by_class
+    if _defs_by_class is None:
+        mapping = defaultdict(list)
+        for d in STAT_DEFS:
+            model = d.resolve()
+            if model is not None:
+                mapping[model].append(d)
+        _defs_by_class = dict(mapping)
+    return _defs_by_class
+
+
+# ==========================================
+# INKREMENTELLE PFLEGE (Session-Events)
+# ==========================================
+
+def _old_value(state, attr):
+    """Wert eines Attributs vor dem Flush"""
+    hist = state.attrs[attr].history
+    if hist.deleted:
+        return hist.deleted[0]
+    if hist.unchanged:
+        return hist.unchanged[0]
+    if hist.added or attr in state.unloaded:
+        # Vorher nicht geladen: alter Wert unbekannt
+        raise _UnknownValue(attr)
+    return state.dict.get(attr)
+
+
+def _new_value(state, attr):
+    """Wert eines Attributs nach dem Flush (ohne Nachladen aus der DB)"""
+    if attr in state.unloaded:
+        raise _UnknownValue(attr)
+    return state.dict.get(attr)
+
+
+def _attrs_changed(state, attrs):
+    return any(state.attrs[a].history.has_changes() for a in attrs)
+
+
+def _collect_changes(session):
+    """Ermittelt Deltas und unsichere Kennzahlen fuer den aktuellen Flush"""
+    defs_by_class = _get_defs_by_class()
+    deltas = defaultdict(int)
+    stale = set()
+
+    changes = [(obj, 'new') for obj in session.new]
+    changes += [(obj, 'dirty') for obj in session.dirty]
+    changes += [(obj, 'deleted') for obj in session.deleted]
+
+    for obj, mode in changes:
+        defs = defs_by_class.get(type(obj))
+        if not defs:
+            continue
+        state = instance_state(obj)
+        for d in defs:
+            if d.volatile:
+                stale.add(d.key)
+                continue
+            if mode == 'dirty' and not _attrs_changed(state, d.attrs):
+                continue
+            try:
+                before = mode != 'new' and d.predicate(lambda a: _old_value(state, a))
+                after = mode != 'deleted' and d.predicate(lambda a: _new_value(state, a))
+            except _UnknownValue:
+                stale.add(d.key)
+                continue
+            if before != after:
+                deltas[d.key] += 1 if after else -1
+
+    return deltas, stale
+
+
+def _mark_stale(connection, keys):
+    if not keys:
+        return
+    connection.execute(
+        text("UPDATE dashboard_stats SET stale = :stale WHERE stat_key IN :keys")
+        .bindparams(bindparam('keys', expanding=True)),
+        {'stale': True, 'keys': sorted(keys)}
+    )
+
+
+def _on_after_flush(session, flush_context):
+    """Zaehler in der gleichen Transaktion anpassen"""
+    try:
+        deltas, stale = _collect_changes(session)
+        if not deltas and not stale:
+            return
+        connection = session.connection()
+        for key, delta in deltas.items():
+            if delta:
+                connection.execute(
+                    text("UPDATE dashboard_stats SET value = value + :delta WHERE stat_key = :key"),
+                    {'delta': delta, 'key': key}
+                )
+        _mark_stale(connection, stale)
+    except Exception as e:
+        logger.warning(f"Dashboard-Statistik nicht aktualisiert: {e}")
+
+
+def _on_orm_execute(orm_execute_state):
+    """Bulk-INSERT/UPDATE/DELETE: betroffene Kennzahlen neu berechnen lassen"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    defs = _get_defs_by_class().get(mapper.class_)
+    if not defs:
+        return
+    try:
+        _mark_stale(orm_execute_state.session.connection(), {d.key for d in defs})
+    except Exception as e:
+        logger.warning(f"Dashboard-Statistik nicht als veraltet markiert: {e}")
+
+
+def _register_events():
+    if not event.contains(Session, 'after_flush', _on_after_flush):
+        event.listen(Session, 'after_flush', _on_after_flush)
+    if not event.contains(Session, 'do_orm_execute', _on_orm_execute):
+        event.listen(Session, 'do_orm_execute', _on_orm_execute)
+
+
+# ==========================================
+# LESEN / NEU BERECHNEN
+# ==========================================
+
+def _needs_refresh(row, stat, now):
+    if row is None or row.stale or row.computed_at is None:
+        return True
+    age = (now - row.computed_at).total_seconds()
+    if stat.volatile:
+        return age > VOLATILE_TTL_SECONDS or row.computed_at.date() != now.date()
+    return age > FULL_RECOMPUTE_SECONDS
+
+
+def _store(values, now):
+    """Berechnete Werte speichern (UPDATE, sonst INSERT)"""
+    table = DashboardStat.__table__
+    for key, value in values.items():
+        result = db.session.execute(
+            table.update().where(table.c.stat_key == key)
+            .values(value=value, stale=False, computed_at=now))
+        if result.rowcount == 0:
+            db.session.execute(table.insert().values(
+                stat_key=key, value=value, stale=False, computed_at=now))
+    db.session.commit()
+
+
+def _finalize(values):
+    """Abgeleitete Kennzahlen und Defaults fuer das Template ergaenzen"""
+    stats = {key: 0 for key in ZERO_DEFAULTS}
+    for key, value in values.items():
+        stats[key] = value if key in _FLOAT_KEYS else int(round(value))
+    stats['open_tasks'] = (stats.get('open_todos', 0)
+                           + stats.get('open_workflow_orders', 0)
+                           + stats.get('new_inquiries', 0))
+    return stats
+
+
+def _tenant_scoped():
+    """Snapshot ist mandantenuebergreifend -> bei Tenant-Kontext direkt zaehlen"""
+    if not has_app_context() or not current_app.config.get('MULTI_TENANT_ENABLED', False):
+        return False
+    from src.models.tenant_filter import get_current_tenant_id
+    return get_current_tenant_id() is not None
+
+
+def compute_stats():
+    """Alle Kennzahlen direkt per SQL berechnen (ohne Snapshot)"""
+    return _finalize({d.key: d.compute() for d in STAT_DEFS})
+
+
+def recompute_all():
+    """Snapshot komplett neu berechnen (Scheduler-Job, Reparatur)"""
+    now = datetime.utcnow()
+    values = {d.key: d.compute() for d in STAT_DEFS}
+    try:
+        _store(values, now)
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Dashboard-Statistik nicht gespeichert: {e}")
+    return _finalize(values)
+
+
+def get_dashboard_stats():
+    """
+    Dashboard-Kennzahlen aus dem Snapshot (eine SELECT-Abfrage).
+    Fehlende, veraltete oder abgelaufene Kennzahlen werden neu berechnet.
+    """
+    if _tenant_scoped():
+        return compute_stats()
+
+    try:
+        rows = {row.stat_key: row for row in db.session.execute(
+            DashboardStat.__table__.select())}
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Dashboard-Snapshot nicht lesbar, zaehle direkt: {e}")
+        return compute_stats()
+
+    now = datetime.utcnow()
+    values = {}
+    refreshed = {}
+    for d in STAT_DEFS:
+        row = rows.get(d.key)
+        if _needs_refresh(row, d, now):
+            refreshed[d.key] = values[d.key] = d.compute()
+        else:
+            values[d.key] = row.value
+
+    if refreshed:
+        try:
+            _store(refreshed, now)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Dashboard-Statistik nicht gespeichert: {e}")
+
+    return _finalize(values)
+
+
+def init_dashboard_stats(app):
+    """
+    Registriert die Session-Events und den Scheduler-Job.
+    In create_app() nach init_scheduler() aufrufen.
+    """
+    if app.extensions.get('dashboard_stats'):
+        return
+
+    _register_events()
+
+    try:
+        from src.services.scheduler_service import add_system_job
+        add_system_job(recompute_all, 'interval', 'dashboard_stats_recompute',
+                       minutes=RECOMPUTE_INTERVAL_MINUTES)
+    except ImportError:
+        pass  # Ohne APScheduler: Neuberechnung ueber FULL_RECOMPUTE_SECONDS
+
+    app.extensions['dashboard_stats'] = True
+
+
+__all__ = [
+    'STAT_KEYS',
+    'get_dashboard_stats',
+    'compute_stats',
+    'recompute_all',
+    'init_dashboard_stats',
+]
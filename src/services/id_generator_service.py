@@ -12,6 +12,16 @@ Ersetzt:
 - machine_controller_db.generate_machine_id()    -> IdGenerator.machine()
 - shipping_controller_db.generate_shipment_id()  -> IdGenerator.shipment()
 
+Nummern kommen aus der Tabelle id_sequences (ein Zaehler pro Tabelle,
+Spalte und Praefix). Der Zaehler wird mit einem einzigen UPDATE atomar
+erhoeht - kein Tabellen-Scan, keine doppelten IDs bei parallelen Anlagen.
+Der Zaehler laeuft in der Transaktion des Aufrufers (Rollback gibt die
+Nummern wieder frei). Fehlt ein Zaehler (neues Jahr/neuer Monat), wird er
+einmalig aus dem aktuellen Maximum der Tabelle gesaet.
+
+Bulk-Importe reservieren mehrere IDs auf einmal:
+    ids = IdGenerator.reserve(Article, 'ART', count=500)
+
 Erstellt von Hans Hahn - Alle Rechte vorbehalten
 """
 
@@ -23,8 +33,129 @@ from src.models import db
 class IdGenerator:
     """Zentrale ID-Generierung mit konfigurierbaren Formaten"""
 
+    # ==========================================
+    # SEQUENZ-TABELLE
+    # ==========================================
+
+    @staticmethod
+    def _sequence_name(model_class, prefix, column='id'):
+        return f"{model_class.__tablename__}.{column}:{prefix}"
+
     @staticmethod
-    def _next_sequence(model_class, prefix, separator='-', pad=3):
+    def _current_max(model_class, prefix, column='id'):
+        """
+        Hoechste vorhandene Nummer mit diesem Praefix (nur zum Saeen
+        eines neuen Zaehlers, danach nicht mehr benoetigt)
+        """
+        col = getattr(model_class, column)
+        pattern = re.compile(rf'^{re.escape(prefix)}(\d+)$')
+        max_num = 0
+        for (value,) in db.session.query(col).filter(col.like(f'{prefix}%')):
+            match = pattern.match(str(value or ''))
+            if match:
+                max_num = max(max_num, int(match.group(1)))
+        return max_num
+
+    @classmethod
+    def _ensure_sequence(cls, model_class, prefix, column='id'):
+        """Legt den Zaehler an (Startwert = aktuelles Maximum), falls noetig"""
+        from src.models.id_sequence import IdSequence
+
+        table = IdSequence.__table__
+        name = cls._sequence_name(model_class, prefix, column)
+        values = {
+            'name': name,
+            'last_value': cls._current_max(model_class, prefix, column),
+            'updated_at': datetime.utcnow(),
+        }
+
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            insert = None
+
+        if insert is not None:
+            # Parallel angelegter Zaehler gewinnt
+            db.session.execute(insert(table).values(**values).on_conflict_do_nothing())
+        else:
+            exists = db.session.execute(
+                db.select(table.c.name).where(table.c.name == name)).first()
+            if not exists:
+                db.session.execute(table.insert().values(**values))
+
+    @classmethod
+    def _allocate(cls, model_class, prefix, count=1, column='id'):
+        """
+        Erhoeht den Zaehler atomar um `count`.
+
+        Returns:
+            Erste reservierte Nummer
+        """
+        from src.models.id_sequence import IdSequence
+
+        table = IdSequence.__table__
+        name = cls._sequence_name(model_class, prefix, column)
+        stmt = table.update().where(table.c.name == name).values(
+            last_value=table.c.last_value + count,
+            updated_at=datetime.utcnow()
+        )
+
+        for _ in range(2):
+            bind = db.session.get_bind()
+            if bind.dialect.update_returning:
+                last = db.session.execute(stmt.returning(table.c.last_value)).scalar()
+            else:
+                result = db.session.execute(stmt)
+                last = None
+                if result.rowcount:
+                    last = db.session.execute(
+                        db.select(table.c.last_value).where(table.c.name == name)).scalar()
+            if last is not None:
+                return last - count + 1
+            cls._ensure_sequence(model_class, prefix, column)
+
+        raise RuntimeError(f"ID-Sequenz {name} konnte nicht angelegt werden")
+
+    @classmethod
+    def reserve(cls, model_class, prefix, count=1, pad=3, column='id'):
+        """
+        Reserviert `count` fortlaufende IDs auf einmal.
+
+        Args:
+            model_class: SQLAlchemy Model-Klasse
+            prefix: Vollstaendiger Praefix inkl. Trennzeichen (z.B. 'ART', 'A2026-')
+            count: Anzahl IDs
+            pad: Anzahl Stellen (z.B. 3 -> 001)
+            column: Spalte, in der die IDs stehen
+
+        Returns:
+            Liste neuer IDs (z.B. ['ART041', 'ART042'])
+        """
+        if count < 1:
+            return []
+
+        col = getattr(model_class, column)
+        ids = []
+        needed = count
+        while needed:
+            first = cls._allocate(model_class, prefix, needed, column)
+            block = [f"{prefix}{n:0{pad}d}" for n in range(first, first + needed)]
+            # Manuell vergebene IDs ueberspringen
+            taken = {value for (value,) in db.session.query(col).filter(col.in_(block))}
+            ids.extend(i for i in block if i not in taken)
+            needed = len(taken)
+        return ids
+
+    @classmethod
+    def next_id(cls, model_class, prefix, pad=3, column='id'):
+        """Naechste ID fuer einen Praefix (z.B. 'KD2026-' -> 'KD2026-0007')"""
+        return cls.reserve(model_class, prefix, 1, pad, column)[0]
+
+    @classmethod
+    def _next_sequence(cls, model_class, prefix, separator='-', pad=3):
         """
         Generiert die naechste fortlaufende ID.
 
@@ -37,23 +168,11 @@ class IdGenerator:
         Returns:
             Neue ID als String (z.B. 'A2026-042')
         """
-        full_prefix = f"{prefix}{separator}"
-        pattern = f"{full_prefix}%"
-
-        # Hoechste existierende Nummer finden
-        last = model_class.query.filter(
-            model_class.id.like(pattern)
-        ).order_by(model_class.id.desc()).first()
-
-        if last:
-            try:
-                num_str = last.id.split(separator)[-1]
-                last_num = int(num_str)
-                return f"{full_prefix}{last_num + 1:0{pad}d}"
-            except (ValueError, IndexError):
-                pass
+        return cls.next_id(model_class, f"{prefix}{separator}", pad)
 
-        return f"{full_prefix}{1:0{pad}d}"
+    # ==========================================
+    # ENTITIES
+    # ==========================================
 
     @classmethod
     def order(cls):
@@ -62,43 +181,30 @@ class IdGenerator:
         year = datetime.now().year
         return cls._next_sequence(Order, f"A{year}", pad=3)
 
+    @classmethod
+    def web_order_number(cls):
+        """Shop-Auftragsnummer: WEB-202603-0001, ..."""
+        from src.models.models import Order
+        prefix = f"WEB-{datetime.now().strftime('%Y%m')}-"
+        return cls.next_id(Order, prefix, pad=4, column='order_number')
+
     @classmethod
     def article(cls):
         """Artikel-ID: ART001, ART002, ..."""
         from src.models.models import Article
-        all_art = Article.query.filter(
-            Article.id.like('ART%')
-        ).with_entities(Article.id).all()
-
-        max_num = 0
-        for (aid,) in all_art:
-            match = re.match(r'^ART(\d+)$', aid)
-            if match:
-                num = int(match.group(1))
-                if num > max_num:
-                    max_num = num
+        return cls.next_id(Article, 'ART', pad=3)
 
-        return f"ART{max_num + 1:03d}"
+    @classmethod
+    def articles(cls, count):
+        """Block von Artikel-IDs fuer Bulk-Importe"""
+        from src.models.models import Article
+        return cls.reserve(Article, 'ART', count, pad=3)
 
     @classmethod
     def customer(cls):
         """Kunden-ID: KD001, KD002, ..."""
         from src.models.models import Customer
-        # Alle KD-IDs holen und numerisch die hoechste finden
-        # (alphabetische Sortierung versagt bei KD009 vs KD2026-0001)
-        all_kd = Customer.query.filter(
-            Customer.id.like('KD%')
-        ).with_entities(Customer.id).all()
-
-        max_num = 0
-        for (cid,) in all_kd:
-            match = re.match(r'^KD(\d+)$', cid)
-            if match:
-                num = int(match.group(1))
-                if num > max_num:
-                    max_num = num
-
-        return f"KD{max_num + 1:03d}"
+        return cls.next_id(Customer, 'KD', pad=3)
 
     @classmethod
     def temporary_customer(cls):
@@ -111,38 +217,17 @@ class IdGenerator:
     def supplier(cls):
         """Lieferanten-ID: LF001, LF002, ..."""
         from src.models.models import Supplier
-        last = Supplier.query.filter(
-            Supplier.id.like('LF%')
-        ).order_by(Supplier.id.desc()).first()
-
-        max_num = 0
-        if last:
-            match = re.match(r'^LF(\d+)$', last.id)
-            if match:
-                max_num = int(match.group(1))
-
-        return f"LF{max_num + 1:03d}"
+        return cls.next_id(Supplier, 'LF', pad=3)
 
     @classmethod
     def machine(cls):
         """Maschinen-ID: M001, M002, ..."""
         from src.models.models import Machine
-        last = Machine.query.filter(
-            Machine.id.like('M%')
-        ).order_by(Machine.id.desc()).first()
-
-        max_num = 0
-        if last:
-            match = re.match(r'^M(\d+)$', last.id)
-            if match:
-                max_num = int(match.group(1))
-
-        return f"M{max_num + 1:03d}"
+        return cls.next_id(Machine, 'M', pad=3)
 
     @classmethod
     def shipment(cls):
         """Versand-ID: SHP-2026-001, ..."""
-        from src.models.models import Order
         # Shipment nutzt eigenes Model
         try:
             from src.models.models import Shipment
@@ -175,3 +260,29 @@ class IdGenerator:
         now = datetime.now()
         prefix = f"ANF-{now.year:04d}{now.month:02d}"
         return cls._next_sequence(Inquiry, prefix, pad=4)
+
+
+def seed_id_sequences():
+    """
+    Legt die Zaehler der laufenden Periode an (Startwert = aktuelles
+    Maximum). Wird von der Schema-Migration aufgerufen; spaetere Perioden
+    werden bei der ersten Vergabe automatisch gesaet.
+    """
+    from src.models.models import Order, Article, Customer, Supplier, Machine, Shipment
+
+    now = datetime.now()
+    year = now.year
+    sequences = [
+        (Article, 'ART', 'id'),
+        (Customer, 'KD', 'id'),
+        (Customer, f'KD{year}-', 'id'),
+        (Customer, f'TMP{year}-', 'id'),
+        (Supplier, 'LF', 'id'),
+        (Machine, 'M', 'id'),
+        (Order, f'A{year}-', 'id'),
+        (Order, f"WEB-{now.strftime('%Y%m')}-", 'order_number'),
+        (Shipment, f'SHP-{year}-', 'id'),
+    ]
+    for model_class, prefix, column in sequences:
+        IdGenerator._ensure_sequence(model_class, prefix, column)
+    return len(sequences)
@@ -8,6 +8,7 @@ Nutzt bestehende EmailAccount + ArchivedEmail Models.
 Erstellt von Hans Hahn - Alle Rechte vorbehalten
 """
 
+import re
 import imaplib
 import email
 from email.header import decode_header
@@ -21,6 +22,10 @@ from src.models.document import EmailAccount, ArchivedEmail
 
 logger = logging.getLogger(__name__)
 
+# Nachrichten je UID FETCH (ein Roundtrip fuer Header, einer fuer Bodies)
+FETCH_BATCH = 100
+HEADER_ITEMS = '(UID BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)])'
+
 
 class IMAPSyncService:
     """Service fuer IMAP E-Mail-Synchronisation"""
@@ -61,12 +66,18 @@ class IMAPSyncService:
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
-    def fetch_new_emails(self, account_id: int, max_emails: int = 50) -> Dict:
+    def fetch_new_emails(self, account_id: int, max_emails: int = 500) -> Dict:
         """
-        Neue E-Mails abrufen und archivieren.
+        Neue E-Mails abrufen und archivieren (inkrementell per UID).
+
+        Solange UIDVALIDITY des Ordners gleich bleibt, werden nur UIDs hinter
+        imap_last_uid abgefragt; ist UIDNEXT unveraendert, entfaellt sogar die
+        Suche. Header und Bodies werden in Bloecken zu FETCH_BATCH Nachrichten
+        geholt, Bodies nur fuer noch nicht archivierte Nachrichten.
 
         Returns:
-            Dict mit fetched, duplicates, errors
+            Dict mit fetched, duplicates, errors (und remaining, falls
+            max_emails erreicht wurde - der Rest folgt beim naechsten Lauf)
         """
         account = EmailAccount.query.get(account_id)
         if not account:
@@ -76,90 +87,60 @@ class IMAPSyncService:
         if not conn:
             return {'error': f'IMAP-Verbindung fehlgeschlagen: {account.last_error}'}
 
+        result = {'fetched': 0, 'duplicates': 0, 'errors': 0}
         try:
-            conn.select(account.archive_folder or 'INBOX')
-
-            # Nur neuere E-Mails suchen
-            since = account.last_check or (datetime.utcnow() - timedelta(days=7))
-            since_str = since.strftime('%d-%b-%Y')
-            status, messages = conn.search(None, f'(SINCE "{since_str}")')
-
-            if status != 'OK' or not messages[0]:
-                conn.logout()
-                account.last_check = datetime.utcnow()
-                account.last_error = None
+            folder = account.archive_folder or 'INBOX'
+            conn.select(folder)
+            uidvalidity, uidnext = self._mailbox_uid_state(conn, folder)
+
+            incremental = (uidvalidity is not None and account.imap_last_uid is not None
+                           and account.imap_uidvalidity == uidvalidity)
+            if incremental and uidnext is not None and uidnext <= account.imap_last_uid + 1:
+                uids = []  # Nichts Neues - keine Suche noetig
+            elif incremental:
+                status, data = conn.uid('SEARCH', None, f'UID {account.imap_last_uid + 1}:*')
+                # "n:*" liefert immer mindestens die hoechste UID, auch wenn sie < n ist
+                uids = [uid for uid in self._parse_uids(data) if uid > account.imap_last_uid]
+            else:
+                # Erster Lauf oder Ordner neu angelegt: nach Datum wie bisher
+                since = account.last_check or (datetime.utcnow() - timedelta(days=7))
+                status, data = conn.uid('SEARCH', None, f'(SINCE "{since.strftime("%d-%b-%Y")}")')
+                uids = self._parse_uids(data)[-max_emails:] if status == 'OK' else []
+                account.imap_uidvalidity = uidvalidity
+                account.imap_last_uid = None
+
+            if len(uids) > max_emails:
+                result['remaining'] = len(uids) - max_emails
+                uids = uids[:max_emails]
+
+            customers = None
+            complete = True
+            for start in range(0, len(uids), FETCH_BATCH):
+                batch = uids[start:start + FETCH_BATCH]
+                if customers is None:
+                    customers = self._customer_email_map()
+                done_uid = self._sync_batch(conn, account, batch, customers, result)
+                # Fortschritt nach jedem Block sichern (Abbruch = kein Neu-Download),
+                # aber nie ueber eine nicht abgerufene Nachricht hinweg
+                if done_uid is not None:
+                    account.imap_last_uid = max(done_uid, account.imap_last_uid or 0)
                 db.session.commit()
-                return {'fetched': 0, 'duplicates': 0, 'errors': 0}
-
-            msg_ids = messages[0].split()[-max_emails:]  # Letzte N
-
-            fetched = 0
-            duplicates = 0
-            errors = 0
-
-            for msg_id in msg_ids:
-                try:
-                    status, data = conn.fetch(msg_id, '(RFC822)')
-                    if status != 'OK':
-                        errors += 1
-                        continue
-
-                    raw_email = data[0][1]
-                    msg = email.message_from_bytes(raw_email)
-
-                    # Message-ID pruefen (Duplikat?)
-                    message_id = msg.get('Message-ID', '')
-                    if message_id:
-                        existing = ArchivedEmail.query.filter_by(
-                            email_account_id=account.id,
-                            message_id=message_id
-                        ).first()
-                        if existing:
-                            duplicates += 1
-                            continue
-
-                    # E-Mail parsen
-                    parsed = self._parse_email(msg)
-
-                    archived = ArchivedEmail(
-                        email_account_id=account.id,
-                        message_id=message_id,
-                        subject=parsed['subject'][:500] if parsed['subject'] else '',
-                        from_address=parsed['from'][:255] if parsed['from'] else '',
-                        to_address=parsed['to'][:500] if parsed['to'] else '',
-                        cc_address=parsed.get('cc', '')[:500] if parsed.get('cc') else None,
-                        body_text=parsed['body_text'],
-                        body_html=parsed['body_html'],
-                        received_date=parsed['date'],
-                        has_attachments=parsed['has_attachments'],
-                        attachment_count=parsed['attachment_count'],
-                        is_read=False,
-                    )
-
-                    # Auto-Kunden-Zuordnung
-                    customer_id = self._auto_assign_customer(parsed['from'])
-                    if customer_id:
-                        archived.customer_id = customer_id
-
-                    db.session.add(archived)
-                    fetched += 1
-
-                    if fetched % 20 == 0:
-                        db.session.flush()
-
-                except Exception as e:
-                    logger.warning(f"Fehler beim Parsen von E-Mail {msg_id}: {e}")
-                    errors += 1
+                if done_uid != batch[-1]:
+                    # Abruf fehlgeschlagen: Rest beim naechsten Lauf ab dieser UID
+                    complete = False
+                    break
 
+            if complete and account.imap_last_uid is None and uidnext:
+                account.imap_last_uid = uidnext - 1
             account.last_check = datetime.utcnow()
             account.last_error = None
             db.session.commit()
             conn.logout()
-
-            return {'fetched': fetched, 'duplicates': duplicates, 'errors': errors}
+            return result
 
         except Exception as e:
             logger.error(f"IMAP-Sync fehlgeschlagen: {e}")
+            db.session.rollback()
             account.last_error = str(e)
             db.session.commit()
             try:
@@ -168,6 +149,153 @@ class IMAPSyncService:
                 pass
             return {'error': str(e)}
 
+    def _mailbox_uid_state(self, conn, folder):
+        """UIDVALIDITY und UIDNEXT aus der SELECT-Antwort (sonst per STATUS)"""
+        def first_int(data):
+            try:
+                return int(data[0]) if data and data[0] is not None else None
+            except (TypeError, ValueError):
+                return None
+
+        uidvalidity = first_int(conn.response('UIDVALIDITY')[1])
+        uidnext = first_int(conn.response('UIDNEXT')[1])
+        if uidvalidity is None or uidnext is None:
+            status, data = conn.status(folder, '(UIDVALIDITY UIDNEXT)')
+            if status == 'OK' and data and data[0]:
+                text = data[0].decode() if isinstance(data[0], bytes) else data[0]
+                match = re.search(r'UIDVALIDITY (\d+)', text)
+                uidvalidity = int(match.group(1)) if match else uidvalidity
+                match = re.search(r'UIDNEXT (\d+)', text)
+                uidnext = int(match.group(1)) if match else uidnext
+        return uidvalidity, uidnext
+
+    @staticmethod
+    def _parse_uids(data) -> List[int]:
+        if not data or not data[0]:
+            return []
+        return sorted(int(uid) for uid in data[0].split())
+
+    @staticmethod
+    def _fetch_parts(conn, uids, items) -> Dict[int, bytes]:
+        """Ein UID FETCH fuer mehrere Nachrichten -> {uid: Literal}"""
+        status, data = conn.uid('FETCH', ','.join(str(uid) for uid in uids), items)
+        parts = {}
+        if status != 'OK':
+            return parts
+        pending = None  # Literal, dessen UID erst hinter dem Literal steht
+        for item in data:
+            if isinstance(item, tuple) and len(item) == 2:
+                match = re.search(rb'UID (\d+)', item[0])
+                if match:
+                    parts[int(match.group(1))] = item[1]
+                    pending = None
+                else:
+                    pending = item[1]
+            elif isinstance(item, bytes) and pending is not None:
+                match = re.search(rb'UID (\d+)', item)
+                if match:
+                    parts[int(match.group(1))] = pending
+                pending = None
+        return parts
+
+    def _sync_batch(self, conn, account, uids, customers, result):
+        """
+        Header holen, Duplikate aussortieren, Bodies der neuen Nachrichten archivieren.
+
+        Returns:
+            Hoechste UID, bis zu der alle Nachrichten des Blocks archiviert
+            oder als Duplikat erkannt sind (None: schon die erste fehlt).
+            Nachrichten, deren FETCH fehlschlug, werden so erneut abgerufen.
+        """
+        headers = self._fetch_parts(conn, uids, HEADER_ITEMS)
+        result['errors'] += len(uids) - len(headers)
+
+        message_ids = {}
+        for uid, raw in headers.items():
+            message_ids[uid] = (email.message_from_bytes(raw).get('Message-ID') or '').strip()
+
+        wanted = [mid for mid in message_ids.values() if mid]
+        known = set()
+        if wanted:
+            known = {row[0] for row in db.session.query(ArchivedEmail.message_id).filter(
+                ArchivedEmail.email_account_id == account.id,
+                ArchivedEmail.message_id.in_(wanted),
+            )}
+
+        handled = set()
+        new_uids = []
+        for uid in sorted(message_ids):
+            message_id = message_ids[uid]
+            if message_id and message_id in known:
+                result['duplicates'] += 1
+                handled.add(uid)
+                continue
+            if message_id:
+                known.add(message_id)  # gleiche Nachricht mehrfach im Ordner
+            new_uids.append(uid)
+        if not new_uids:
+            return self._contiguous(uids, handled)
+
+        # BODY.PEEK statt RFC822: setzt das \Seen-Flag nicht
+        bodies = self._fetch_parts(conn, new_uids, '(UID BODY.PEEK[])')
+        archived = []
+        for uid in new_uids:
+            raw = bodies.get(uid)
+            if raw is None:
+                result['errors'] += 1
+                continue
+            # Ab hier erledigt - eine nicht lesbare Nachricht wird auch beim
+            # naechsten Lauf nicht lesbar sein
+            handled.add(uid)
+            try:
+                parsed = self._parse_email(email.message_from_bytes(raw))
+                archived.append(ArchivedEmail(
+                    email_account_id=account.id,
+                    message_id=message_ids[uid],
+                    subject=parsed['subject'][:500] if parsed['subject'] else '',
+                    from_address=parsed['from'][:255] if parsed['from'] else '',
+                    to_address=parsed['to'][:500] if parsed['to'] else '',
+                    cc_address=parsed.get('cc', '')[:500] if parsed.get('cc') else None,
+                    body_text=parsed['body_text'],
+                    body_html=parsed['body_html'],
+                    received_date=parsed['date'],
+                    size=len(raw),
+                    has_attachments=parsed['has_attachments'],
+                    attachment_count=parsed['attachment_count'],
+                    is_read=False,
+                    # Auto-Kunden-Zuordnung
+                    customer_id=self._auto_assign_customer(parsed['from'], customers),
+                ))
+            except Exception as e:
+                logger.warning(f"Fehler beim Parsen von E-Mail UID {uid}: {e}")
+                result['errors'] += 1
+
+        db.session.add_all(archived)
+        result['fetched'] += len(archived)
+        return self._contiguous(uids, handled)
+
+    @staticmethod
+    def _contiguous(uids, handled):
+        """Hoechste UID, bis zu der (aufsteigend) alle UIDs erledigt sind"""
+        done_uid = None
+        for uid in sorted(uids):
+            if uid not in handled:
+                break
+            done_uid = uid
+        return done_uid
+
+    @staticmethod
+    def _customer_email_map() -> Dict[str, str]:
+        """Absender-Adresse (klein) -> Kunden-ID, einmal je Sync"""
+        from src.models.models import Customer
+        rows = db.session.query(Customer.email, Customer.id).filter(
+            Customer.email.isnot(None), Customer.email != ''
+        )
+        mapping = {}
+        for customer_email, customer_id in rows:
+            mapping.setdefault(customer_email.strip().lower(), customer_id)
+        return mapping
+
     def auto_assign_customer(self, email_id: int) -> Optional[str]:
         """Ordnet eine archivierte E-Mail einem Kunden zu"""
         archived = ArchivedEmail.query.get(email_id)
@@ -254,18 +382,19 @@ class IMAPSyncService:
                 decoded.append(part)
         return ' '.join(decoded)
 
-    def _auto_assign_customer(self, from_address: str) -> Optional[str]:
-        """Findet Kunden anhand der Absender-Adresse"""
+    def _auto_assign_customer(self, from_address: str, customers: Dict[str, str] = None) -> Optional[str]:
+        """Findet Kunden anhand der Absender-Adresse (customers: Map aus _customer_email_map)"""
         if not from_address:
             return None
 
         # E-Mail-Adresse extrahieren
-        import re
         match = re.search(r'[\w.+-]+@[\w-]+\.[\w.]+', from_address)
         if not match:
             return None
 
         email_addr = match.group().lower()
+        if customers is not None:
+            return customers.get(email_addr)
 
         from src.models.models import Customer
         customer = Customer.query.filter(
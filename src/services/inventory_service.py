@@ -4,6 +4,11 @@ LAGER- UND BESTANDSMANAGEMENT SERVICE
 ======================================
 Bestandsreservierung, Verfügbarkeitsprüfung und Lageroptimierung
 
+Verfügbarkeit wird gebündelt berechnet (get_availability_batch): für
+beliebig viele Artikel eine feste Zahl gruppierter Abfragen statt drei
+Abfragen je Artikel. Reservierungen werden vom Lagerbestand abgebucht;
+Article.stock ist der freie, Article.stock_reserved der reservierte Teil.
+
 Erstellt von Hans Hahn - Alle Rechte vorbehalten
 """
 
@@ -13,10 +18,18 @@ from enum import Enum
 import json
 import logging
 
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import load_only
+
 from src.models.models import db, Article, Order, OrderItem
 
 logger = logging.getLogger(__name__)
 
+# Artikel je gebündelter Verfügbarkeitsabfrage (IN-Liste)
+AVAILABILITY_CHUNK = 500
+# Lieferantenbestellungen, deren Positionen als Zugang zählen
+INCOMING_ORDER_STATUSES = ('ordered', 'shipped')
+
 
 class ReservationStatus(Enum):
     """Status einer Bestandsreservierung"""
@@ -28,6 +41,11 @@ class ReservationStatus(Enum):
     EXPIRED = 'expired'           # Reservierung abgelaufen
 
 
+# Reservierungen, die Bestand binden bzw. noch Fehlmengen haben
+ACTIVE_RESERVATION_STATUSES = (ReservationStatus.PENDING, ReservationStatus.CONFIRMED, ReservationStatus.PARTIALLY)
+OPEN_RESERVATION_STATUSES = (ReservationStatus.PENDING, ReservationStatus.PARTIALLY)
+
+
 class StockReservation(db.Model):
     """
     Bestandsreservierung
@@ -35,11 +53,14 @@ class StockReservation(db.Model):
     Reserviert Artikel für einen Auftrag bis zur Produktion
     """
     __tablename__ = 'stock_reservations'
+    __table_args__ = (
+        db.Index('ix_stock_reservations_article_status', 'article_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
     # Verknüpfungen
-    article_id = db.Column(db.Integer, db.ForeignKey('articles.id'), nullable=False)
+    article_id = db.Column(db.String(50), db.ForeignKey('articles.id'), nullable=False)
     order_id = db.Column(db.String(50), db.ForeignKey('orders.id'))
     order_item_id = db.Column(db.Integer, db.ForeignKey('order_items.id'))
     
@@ -85,6 +106,11 @@ class StockReservation(db.Model):
             return datetime.utcnow() > self.valid_until
         return False
     
+    def _book_reserved(self, quantity: int):
+        """Schreibt den Reservierungs-Saldo des Artikels fort (falls geführt)"""
+        if self.article is not None and self.article.stock_reserved is not None:
+            self.article.stock_reserved += quantity
+    
     def confirm(self):
         """Bestätigt Reservierung"""
         if self.quantity_reserved >= self.quantity_requested:
@@ -110,6 +136,7 @@ class StockReservation(db.Model):
             # Bestand wieder erhöhen
             self.article.stock = (self.article.stock or 0) + quantity
             self.quantity_reserved -= quantity
+            self._book_reserved(-quantity)
         
         if self.quantity_reserved <= 0:
             self.status = ReservationStatus.RELEASED
@@ -128,6 +155,7 @@ class StockReservation(db.Model):
         
         self.quantity_consumed += quantity
         self.quantity_reserved -= quantity
+        self._book_reserved(-quantity)
         
         if self.quantity_reserved <= 0:
             self.status = ReservationStatus.CONSUMED
@@ -155,65 +183,124 @@ class InventoryService:
     # VERFÜGBARKEIT
     # ==========================================
     
+    def get_availability_batch(self, article_ids, use_balance: bool = True) -> Dict[str, Dict]:
+        """
+        Verfügbarkeit für beliebig viele Artikel in einer festen Zahl von
+        Abfragen: Artikel und gruppierte Reservierungen je
+        AVAILABILITY_CHUNK Artikel, offene Lieferantenbestellungen einmal.
+        
+        Args:
+            article_ids: Artikel-IDs
+            use_balance: Reserviert aus Article.stock_reserved lesen; nur
+                         Artikel ohne Saldo werden aus den Reservierungen
+                         summiert. False = immer summieren.
+        
+        Returns:
+            {article_id: Dict wie get_availability()} - unbekannte IDs fehlen
+        """
+        ids = list(dict.fromkeys(a for a in article_ids if a is not None))
+        result = {}
+        
+        for start in range(0, len(ids), AVAILABILITY_CHUNK):
+            chunk = ids[start:start + AVAILABILITY_CHUNK]
+            articles = Article.query.options(load_only(
+                Article.id, Article.article_number, Article.name, Article.supplier,
+                Article.stock, Article.min_stock, Article.stock_reserved,
+                Article.price, Article.purchase_price_single
+            )).filter(Article.id.in_(chunk)).all()
+            if not articles:
+                continue
+            
+            # Ohne fehlende Salden genügen die (wenigen) offenen Reservierungen
+            summed = [a.id for a in articles if not use_balance or a.stock_reserved is None]
+            statuses = ACTIVE_RESERVATION_STATUSES if summed else OPEN_RESERVATION_STATUSES
+            shortage = case(
+                (StockReservation.quantity_requested > func.coalesce(StockReservation.quantity_reserved, 0),
+                 StockReservation.quantity_requested - func.coalesce(StockReservation.quantity_reserved, 0)),
+                else_=0
+            )
+            reservations = {
+                article_id: (int(reserved or 0), int(pending or 0))
+                for article_id, reserved, pending in db.session.query(
+                    StockReservation.article_id,
+                    func.sum(StockReservation.quantity_reserved),
+                    func.sum(shortage)
+                ).filter(
+                    StockReservation.article_id.in_([a.id for a in articles]),
+                    StockReservation.status.in_(statuses)
+                ).group_by(StockReservation.article_id)
+            }
+            summed = set(summed)
+            
+            for article in articles:
+                aggregated, pending_requested = reservations.get(article.id, (0, 0))
+                reserved = aggregated if article.id in summed else article.stock_reserved
+                free_stock = article.stock or 0
+                min_stock = article.min_stock or 0
+                result[article.id] = {
+                    'article_id': article.id,
+                    'article_number': article.article_number,
+                    'article_name': article.name,
+                    'supplier_name': article.supplier,
+                    'physical_stock': free_stock + reserved,
+                    'reserved': reserved,
+                    'available': max(0, free_stock),
+                    'pending_requested': pending_requested,
+                    'incoming': 0,
+                    'min_stock': min_stock,
+                    'max_stock': getattr(article, 'max_stock', None) or 0,
+                    'needs_reorder': free_stock < min_stock,
+                    'reorder_quantity': self._calculate_reorder_quantity(article)
+                }
+        
+        if result:
+            for article_id, quantity in self._incoming_quantities(result.keys()).items():
+                result[article_id]['incoming'] = quantity
+        for availability in result.values():
+            availability['projected_stock'] = availability['physical_stock'] + availability['incoming']
+        
+        return result
+    
+    def _incoming_quantities(self, article_ids) -> Dict[str, int]:
+        """Bestellte Mengen aus offenen Lieferantenbestellungen (Positionen als JSON)"""
+        from src.models.models import SupplierOrder
+        
+        wanted = {str(a): a for a in article_ids}
+        incoming = {}
+        rows = db.session.query(SupplierOrder.items).filter(
+            SupplierOrder.status.in_(INCOMING_ORDER_STATUSES),
+            SupplierOrder.items.isnot(None)
+        )
+        for (items_json,) in rows:
+            try:
+                items = json.loads(items_json)
+            except (ValueError, TypeError):
+                continue
+            for item in items if isinstance(items, list) else []:
+                article_id = wanted.get(str(item.get('article_id')))
+                if article_id is None:
+                    continue
+                try:
+                    incoming[article_id] = incoming.get(article_id, 0) + int(float(item.get('quantity') or 0))
+                except (ValueError, TypeError):
+                    continue
+        return incoming
+    
     def get_availability(self, article_id: int) -> Dict:
         """
         Gibt vollständige Verfügbarkeitsinfo für Artikel
+        (direkt aus den Reservierungen summiert)
         
         Returns:
             Dict mit stock, reserved, available, pending_orders
         """
-        article = Article.query.get(article_id)
-        
-        if not article:
+        availability = self.get_availability_batch([article_id], use_balance=False).get(article_id)
+        if availability is None:
             return {
                 'article_id': article_id,
                 'error': 'Artikel nicht gefunden'
             }
-        
-        # Aktuelle Reservierungen
-        active_reservations = StockReservation.query.filter(
-            StockReservation.article_id == article_id,
-            StockReservation.status.in_([
-                ReservationStatus.PENDING,
-                ReservationStatus.CONFIRMED,
-                ReservationStatus.PARTIALLY
-            ])
-        ).all()
-        
-        reserved = sum(r.quantity_reserved for r in active_reservations)
-        pending_requested = sum(r.shortage for r in active_reservations)
-        
-        # Offene Bestellungen (Material unterwegs)
-        from src.models.models import SupplierOrder
-        pending_orders = SupplierOrder.query.filter(
-            SupplierOrder.status.in_(['ordered', 'shipped']),
-            SupplierOrder.items.any(article_id=article_id)
-        ).all() if hasattr(SupplierOrder, 'items') else []
-        
-        incoming = 0
-        for order in pending_orders:
-            for item in order.items:
-                if item.article_id == article_id:
-                    incoming += item.quantity
-        
-        physical_stock = article.stock or 0
-        available = physical_stock - reserved
-        
-        return {
-            'article_id': article_id,
-            'article_number': article.article_number,
-            'article_name': article.name,
-            'physical_stock': physical_stock,
-            'reserved': reserved,
-            'available': max(0, available),
-            'pending_requested': pending_requested,
-            'incoming': incoming,
-            'projected_stock': physical_stock + incoming,
-            'min_stock': article.min_stock or 0,
-            'max_stock': article.max_stock or 0,
-            'needs_reorder': physical_stock < (article.min_stock or 0),
-            'reorder_quantity': self._calculate_reorder_quantity(article)
-        }
+        return availability
     
     def check_availability_for_order(self, order_items: List[Dict]) -> Dict:
         """
@@ -231,11 +318,13 @@ class InventoryService:
             'items': []
         }
         
+        batch = self.get_availability_batch(item.get('article_id') for item in order_items)
+        
         for item in order_items:
             article_id = item.get('article_id')
             requested = item.get('quantity', 0)
             
-            availability = self.get_availability(article_id)
+            availability = batch.get(article_id, {})
             available = availability.get('available', 0)
             
             item_result = {
@@ -284,18 +373,25 @@ class InventoryService:
         else:
             valid_until = datetime.utcnow() + timedelta(days=7)
         
-        for item in order.items:
-            if not item.article_id:
-                continue
-            
+        # Verfügbarkeit aller Positionen auf einmal, danach im Speicher fortschreiben
+        items = [item for item in order.items if item.article_id]
+        free = {
+            article_id: availability['available']
+            for article_id, availability in self.get_availability_batch(item.article_id for item in items).items()
+        }
+        
+        for item in items:
             reservation_result = self.create_reservation(
                 article_id=item.article_id,
                 quantity=item.quantity,
                 order_id=order.id,
                 order_item_id=item.id,
                 valid_until=valid_until,
-                created_by=created_by
+                created_by=created_by,
+                available=free.get(item.article_id, 0)
             )
+            if item.article_id in free:
+                free[item.article_id] -= reservation_result['reserved']
             
             result['reservations'].append(reservation_result)
             
@@ -326,9 +422,14 @@ class InventoryService:
                            order_id: str = None,
                            order_item_id: int = None,
                            valid_until: datetime = None,
-                           created_by: str = 'system') -> Dict:
+                           created_by: str = 'system',
+                           available: int = None) -> Dict:
         """
         Erstellt einzelne Reservierung
+        
+        Args:
+            available: Bereits ermittelter freier Bestand (z.B. aus
+                       get_availability_batch); sonst wird er abgefragt
         """
         result = {
             'article_id': article_id,
@@ -340,13 +441,14 @@ class InventoryService:
         }
         
         try:
-            article = Article.query.get(article_id)
+            article = db.session.get(Article, article_id)
             if not article:
                 result['error'] = 'Artikel nicht gefunden'
                 return result
             
             # Verfügbaren Bestand ermitteln
-            available = self.get_availability(article_id)['available']
+            if available is None:
+                available = self.get_availability(article_id)['available']
             
             # Reservierbare Menge
             reservable = min(quantity, available)
@@ -358,7 +460,7 @@ class InventoryService:
                 order_item_id=order_item_id,
                 quantity_requested=quantity,
                 quantity_reserved=reservable,
-                unit_price=article.selling_price or article.purchase_price,
+                unit_price=article.price or article.purchase_price_single,
                 valid_until=valid_until,
                 created_by=created_by
             )
@@ -375,6 +477,8 @@ class InventoryService:
             # Bestand reduzieren
             if reservable > 0:
                 article.stock = (article.stock or 0) - reservable
+                if article.stock_reserved is not None:
+                    article.stock_reserved += reservable
             
             db.session.add(reservation)
             db.session.flush()
@@ -468,6 +572,31 @@ class InventoryService:
         logger.info(f"Cleaned up {count} expired reservations")
         return count
     
+    def recompute_reserved_balances(self) -> int:
+        """
+        Setzt Article.stock_reserved für alle Artikel neu aus den aktiven
+        Reservierungen (Migration, Korrektur nach Bulk-Änderungen).
+        Ohne Commit.
+        
+        Returns:
+            Anzahl aktualisierter Artikel
+        """
+        reserved = select(
+            func.coalesce(func.sum(StockReservation.quantity_reserved), 0)
+        ).where(
+            StockReservation.article_id == Article.id,
+            StockReservation.status.in_(ACTIVE_RESERVATION_STATUSES)
+        ).scalar_subquery()
+        
+        result = db.session.execute(
+            update(Article).values(stock_reserved=reserved),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.expire_all()
+        
+        logger.info(f"Reservation balances recomputed for {result.rowcount} articles")
+        return result.rowcount
+    
     # ==========================================
     # BESTANDSBEWEGUNGEN
     # ==========================================
@@ -549,29 +678,26 @@ class InventoryService:
         """
         suggestions = []
         
-        # Artikel unter Mindestbestand
-        articles = Article.query.filter(
+        # Artikel mit Mindestbestand
+        article_ids = [row[0] for row in db.session.query(Article.id).filter(
             Article.min_stock.isnot(None),
             Article.min_stock > 0
-        ).all()
+        )]
         
-        for article in articles:
-            availability = self.get_availability(article.id)
-            
-            if availability['available'] < article.min_stock:
+        for availability in self.get_availability_batch(article_ids).values():
+            if availability['available'] < availability['min_stock']:
                 suggestions.append({
-                    'article_id': article.id,
-                    'article_number': article.article_number,
-                    'article_name': article.name,
+                    'article_id': availability['article_id'],
+                    'article_number': availability['article_number'],
+                    'article_name': availability['article_name'],
                     'current_stock': availability['physical_stock'],
                     'available': availability['available'],
                     'reserved': availability['reserved'],
-                    'min_stock': article.min_stock,
-                    'max_stock': article.max_stock or 0,
+                    'min_stock': availability['min_stock'],
+                    'max_stock': availability['max_stock'],
                     'incoming': availability['incoming'],
-                    'suggested_quantity': self._calculate_reorder_quantity(article),
-                    'supplier_id': article.supplier_id,
-                    'supplier_name': article.supplier.name if article.supplier else None,
+                    'suggested_quantity': availability['reorder_quantity'],
+                    'supplier_name': availability['supplier_name'],
                     'priority': 'high' if availability['available'] <= 0 else 'normal'
                 })
         
@@ -587,7 +713,7 @@ class InventoryService:
         
         current_stock = article.stock or 0
         min_stock = article.min_stock or 0
-        max_stock = article.max_stock or (min_stock * 3)
+        max_stock = getattr(article, 'max_stock', None) or (min_stock * 3)
         
         if current_stock >= min_stock:
             return 0
@@ -0,0 +1,568 @@
+# -*- coding: utf-8 -*-
+"""
+JOB-QUEUE FUER LANGSAME HINTERGRUND-AUFGABEN
+============================================
+IMAP-Abruf, FinTS-Sync, Outlook-Kalender-Sync und die Garn-Websuche
+dauern oft zehn Sekunden und laenger. Statt im HTTP-Request zu laufen
+(Worker blockiert, Nutzer klicken erneut), werden sie als Job in der
+Tabelle background_jobs abgelegt; der Request bekommt sofort die Job-ID.
+
+- Worker-Threads in jedem App-Prozess (JOB_QUEUE_WORKERS, Standard 2)
+  holen faellige Jobs per Compare-and-Swap-UPDATE (SQLite und Postgres).
+- Pro dedup_key (z.B. 'email_sync:3') hoechstens ein offener Job -
+  ein zweiter Klick liefert den laufenden Job zurueck.
+- Fehler (Exception oder Ergebnis mit 'error') werden mit Backoff
+  wiederholt (30s, 60s, 120s ...) bis max_attempts.
+- Jeder Worker haelt eine Lease (locked_until), die waehrend des Laufs
+  regelmaessig verlaengert wird (Heartbeat, report_progress). Stirbt der
+  Prozess, uebernimmt nach Ablauf ein anderer Worker den Job - sind die
+  Versuche aufgebraucht, wird er stattdessen als fehlgeschlagen markiert.
+- Aufraeumen alter Jobs laeuft als System-Job im scheduler_service.
+
+Nutzung:
+    job, created = enqueue('email_sync', {'account_id': 3},
+                           dedup_key='email_sync:3', created_by='admin')
+    # Status: GET /jobs/api/<job.id>
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+from sqlalchemy.exc import IntegrityError
+
+from src.models.models import db
+from src.models.background_job import BackgroundJob, ACTIVE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_LEASE_SECONDS = 15 * 60
+BACKOFF_SECONDS = 30          # 30s, 60s, 120s, ... (verdoppelt je Versuch)
+MAX_BACKOFF_SECONDS = 60 * 60
+POLL_INTERVAL = 2.0           # Sekunden zwischen zwei Abfragen eines freien Workers
+KEEP_FINISHED_DAYS = 7
+
+JobType = namedtuple('JobType', ['func', 'label', 'max_attempts', 'lease_seconds'])
+
+JOB_TYPES = {}
+
+_wakeup = threading.Event()
+_workers = []
+_stop = threading.Event()
+_current = threading.local()  # ID des Jobs, den dieser Thread gerade ausfuehrt
+
+
+# ==========================================
+# JOB-TYPEN
+# ==========================================
+
+def register_job_type(job_type, func, label=None, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                      lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Job-Typ registrieren. func bekommt das Payload als Keyword-Argumente und
+    gibt ein JSON-faehiges Ergebnis zurueck; ein Dict mit 'error' gilt als
+    Fehlschlag (wie bei den Sync-Services ueblich).
+    """
+    JOB_TYPES[job_type] = JobType(func, label or job_type, max_attempts, lease_seconds)
+
+
+def _email_sync(account_id):
+    from src.services.imap_sync_service import IMAPSyncService
+    return IMAPSyncService().fetch_new_emails(account_id)
+
+
+def _bank_sync(account_id):
+    from src.services.bank_sync_service import BankSyncService
+    return BankSyncService().sync_account(account_id)
+
+
+def _calendar_sync(connection_id):
+    from src.services.calendar_sync_service import MicrosoftGraphCalendarService
+    return MicrosoftGraphCalendarService().sync_to_outlook(connection_id)
+
+
+def _thread_low_stock_search():
+    from src.services.thread_web_search_service import search_low_stock_threads, suggestions_as_dicts
+    suggestions = suggestions_as_dicts(search_low_stock_threads())
+    return {'count': len(suggestions), 'suggestions': suggestions}
+
+
+def _buchhaltung_export(**payload):
+    from src.services.buchhaltung_export_service import run_export_job
+    return run_export_job(**payload)
+
+
+def _lshop_import(file_path, column_mapping, options=None):
+    from src.services.lshop_import_service import LShopImportService
+    try:
+        service = LShopImportService()
+        analysis = service.analyze_excel(file_path)
+        if not analysis['success']:
+            raise RuntimeError(analysis['error'])
+        result = service.import_articles(column_mapping, options, progress=report_progress)
+        if not result['success']:
+            raise RuntimeError(result['error'])
+        return result
+    finally:
+        # Hochgeladene Datei gehoert dem Job (kein erneuter Versuch)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def _pdf_batch(kind, ids, output='pdf'):
+    from src.services.pdf_batch_service import run_batch_job
+    return run_batch_job(kind, ids, output)
+
+
+def _csv_import(import_job_id):
+    from src.models.csv_import import CSVImportJob
+    from src.services.csv_import_service import CSVImportService
+    job = db.session.get(CSVImportJob, import_job_id)
+    if job is None:
+        raise ValueError(f'CSV-Import {import_job_id} nicht gefunden')
+    result = CSVImportService().execute_import(job, progress=report_progress)
+    return {'imported': result['imported'], 'skipped': result['skipped'], 'errors': len(result['errors'])}
+
+
+def _register_builtin_types():
+    register_job_type('email_sync', _email_sync, 'E-Mail-Sync')
+    register_job_type('bank_sync', _bank_sync, 'Bank-Sync')
+    register_job_type('calendar_sync', _calendar_sync, 'Kalender-Sync')
+    register_job_type('thread_low_stock_search', _thread_low_stock_search,
+                      'Garn-Nachbestellsuche', max_attempts=2)
+    register_job_type('buchhaltung_export', _buchhaltung_export, 'Buchhaltungs-Export', max_attempts=2)
+    register_job_type('lshop_import', _lshop_import, 'L-Shop-Import', max_attempts=1)
+    register_job_type('csv_import', _csv_import, 'CSV-Import', max_attempts=1)
+    register_job_type('pdf_batch', _pdf_batch, 'PDF-Batch', max_attempts=1)
+
+
+_register_builtin_types()
+
+
+# ==========================================
+# EINREIHEN
+# ==========================================
+
+def _default_dedup_key(job_type, payload):
+    params = ','.join(f'{key}={payload[key]}' for key in sorted(payload or {}))
+    return f'{job_type}:{params}'[:100]
+
+
+def _active_job(dedup_key):
+    return BackgroundJob.query.filter(
+        BackgroundJob.dedup_key == dedup_key,
+        BackgroundJob.status.in_(ACTIVE_STATUSES),
+    ).order_by(BackgroundJob.id).first()
+
+
+def enqueue(job_type, payload=None, dedup_key=None, created_by=None, max_attempts=None, delay=None):
+    """
+    Job einreihen (committet sofort).
+
+    Returns:
+        (job, created) - created=False, wenn fuer dedup_key schon ein
+        offener Job existiert; dann wird dieser zurueckgegeben.
+    """
+    if job_type not in JOB_TYPES:
+        raise ValueError(f'Unbekannter Job-Typ: {job_type}')
+
+    payload = payload or {}
+    dedup_key = dedup_key or _default_dedup_key(job_type, payload)
+    existing = _active_job(dedup_key)
+    if existing is not None:
+        return existing, False
+
+    now = datetime.utcnow()
+    job = BackgroundJob(
+        job_type=job_type,
+        dedup_key=dedup_key,
+        payload=payload,
+        status='queued',
+        max_attempts=max_attempts or JOB_TYPES[job_type].max_attempts,
+        run_after=now + timedelta(seconds=delay or 0),
+        created_by=created_by,
+        created_at=now,
+    )
+    try:
+        db.session.add(job)
+        db.session.commit()
+    except IntegrityError:
+        # Parallel eingereiht: den anderen Job verwenden
+        db.session.rollback()
+        existing = _active_job(dedup_key)
+        if existing is None:
+            raise
+        return existing, False
+
+    logger.info(f"Job {job.id} eingereiht: {job_type} ({dedup_key}, {created_by or 'system'})")
+    _wakeup.set()
+    return job, True
+
+
+def get_job(job_id):
+    return db.session.get(BackgroundJob, job_id)
+
+
+def last_succeeded(job_type):
+    """Zuletzt erfolgreich beendeter Job eines Typs (fuer Ergebnis-Seiten), sonst None"""
+    return BackgroundJob.query.filter_by(job_type=job_type, status='succeeded').order_by(
+        BackgroundJob.finished_at.desc()).first()
+
+
+# ==========================================
+# ABARBEITEN
+# ==========================================
+
+def _worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}'[:100]
+
+
+def _lease_seconds(job_type):
+    return JOB_TYPES[job_type].lease_seconds if job_type in JOB_TYPES else DEFAULT_LEASE_SECONDS
+
+
+def _due_clause(now):
+    """
+    Faellig: wartend und run_after erreicht, oder laufend mit abgelaufener
+    Lease und noch freien Versuchen
+    """
+    return sa.or_(
+        sa.and_(BackgroundJob.status == 'queued', BackgroundJob.run_after <= now),
+        sa.and_(BackgroundJob.status == 'running', BackgroundJob.locked_until < now,
+                BackgroundJob.attempts < BackgroundJob.max_attempts),
+    )
+
+
+def _fail_expired(now):
+    """Laufende Jobs mit abgelaufener Lease und ohne freie Versuche: fehlgeschlagen"""
+    table = BackgroundJob.__table__
+    failed = db.session.execute(
+        table.update()
+        .where(table.c.status == 'running', table.c.locked_until < now,
+               table.c.attempts >= table.c.max_attempts)
+        .values(status='failed', finished_at=now, locked_until=None,
+                error='Lease abgelaufen - Worker ausgefallen, keine Versuche mehr')
+    ).rowcount
+    db.session.commit()
+    if failed:
+        logger.error(f"Job-Queue: {failed} Jobs mit abgelaufener Lease als fehlgeschlagen markiert")
+
+
+def claim_next(worker=None):
+    """
+    Naechsten faelligen Job uebernehmen. Das UPDATE greift nur, wenn der Job
+    noch faellig ist - bei parallelen Workern gewinnt genau einer.
+    """
+    worker = worker or _worker_name()
+    now = datetime.utcnow()
+    table = BackgroundJob.__table__
+    _fail_expired(now)
+
+    candidates = db.session.execute(
+        sa.select(table.c.id, table.c.job_type)
+        .where(_due_clause(now))
+        .order_by(table.c.run_after, table.c.id)
+        .limit(5)
+    ).all()
+    for job_id, job_type in candidates:
+        lease = _lease_seconds(job_type)
+        claimed = db.session.execute(
+            table.update()
+            .where(table.c.id == job_id, _due_clause(now))
+            .values(status='running', attempts=table.c.attempts + 1, worker=worker,
+                    started_at=now, locked_until=now + timedelta(seconds=lease))
+        ).rowcount
+        db.session.commit()
+        if claimed == 1:
+            job = db.session.get(BackgroundJob, job_id, populate_existing=True)
+            if job.wait_ms is None:
+                job.wait_ms = int((now - job.created_at).total_seconds() * 1000)
+                db.session.commit()
+            return job
+    return None
+
+
+def _json_safe(value):
+    """Ergebnis JSON-faehig machen (Decimal, datetime -> str)"""
+    return json.loads(json.dumps(value, default=str))
+
+
+def backoff_seconds(attempt):
+    """Wartezeit vor dem naechsten Versuch nach Versuch Nr. attempt (1-basiert)"""
+    return min(BACKOFF_SECONDS * 2 ** (attempt - 1), MAX_BACKOFF_SECONDS)
+
+
+def _start_heartbeat(job_id, worker, lease_seconds):
+    """
+    Lease des laufenden Jobs alle lease_seconds/3 Sekunden verlaengern
+    (eigene Connection, unabhaengig von der Transaktion des Jobs), damit
+    lange Jobs nicht von einem zweiten Worker erneut gestartet werden.
+
+    Returns:
+        threading.Event - setzen beendet den Heartbeat
+    """
+    engine = db.engine
+    table = BackgroundJob.__table__
+    stop = threading.Event()
+    interval = max(1.0, lease_seconds / 3)
+
+    def beat():
+        while not stop.wait(interval):
+            try:
+                with engine.begin() as connection:
+                    connection.execute(
+                        table.update()
+                        .where(table.c.id == job_id, table.c.status == 'running', table.c.worker == worker)
+                        .values(locked_until=datetime.utcnow() + timedelta(seconds=lease_seconds))
+                    )
+            except Exception as e:
+                logger.warning(f"Job {job_id}: Lease nicht verlaengert: {e}")
+
+    threading.Thread(target=beat, name=f'job-heartbeat-{job_id}', daemon=True).start()
+    return stop
+
+
+def run_job(job):
+    """Uebernommenen Job ausfuehren und Ergebnis/Fehler/Wiederholung speichern"""
+    job_type = JOB_TYPES.get(job.job_type)
+    start = time.perf_counter()
+    result, error = None, None
+
+    if job_type is None:
+        error = f'Unbekannter Job-Typ: {job.job_type}'
+        job.max_attempts = job.attempts  # nicht wiederholen
+    else:
+        _current.job_id = job.id
+        _current.lease_seconds = job_type.lease_seconds
+        heartbeat = _start_heartbeat(job.id, job.worker, job_type.lease_seconds)
+        try:
+            result = job_type.func(**(job.payload or {}))
+            if isinstance(result, dict) and result.get('error'):
+                error = str(result['error'])
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"Job {job.id} ({job.job_type}) fehlgeschlagen")
+            error = str(e) or e.__class__.__name__
+        finally:
+            heartbeat.set()
+            _current.job_id = None
+
+    job = db.session.get(BackgroundJob, job.id)
+    now = datetime.utcnow()
+    job.duration_ms = int((time.perf_counter() - start) * 1000)
+    job.locked_until = None
+    job.result = _json_safe(result) if result is not None else None
+    job.error = error
+
+    if error is None:
+        job.status = 'succeeded'
+        job.finished_at = now
+    elif job.attempts < job.max_attempts:
+        job.status = 'queued'
+        job.run_after = now + timedelta(seconds=backoff_seconds(job.attempts))
+        logger.warning(f"Job {job.id} ({job.job_type}) Versuch {job.attempts}/{job.max_attempts} "
+                       f"fehlgeschlagen, naechster Versuch {job.run_after:%H:%M:%S}: {error}")
+    else:
+        job.status = 'failed'
+        job.finished_at = now
+        logger.error(f"Job {job.id} ({job.job_type}) endgueltig fehlgeschlagen: {error}")
+    db.session.commit()
+    return job
+
+
+def current_job_id():
+    """ID des Jobs, der in diesem Thread laeuft (None ausserhalb eines Jobs)"""
+    return getattr(_current, 'job_id', None)
+
+
+def report_progress(done, total, own_transaction=False):
+    """
+    Fortschritt des laufenden Jobs speichern und dessen Lease verlaengern
+    (ausserhalb eines Jobs ohne Wirkung). Laeuft in der Transaktion des
+    Aufrufers - sichtbar mit dessen naechstem Commit, z.B. nach jedem
+    Import-Block. Mit own_transaction=True sofort in einer eigenen
+    Transaktion (Jobs, die zwischendurch nicht committen).
+    """
+    job_id = current_job_id()
+    if job_id is None:
+        return
+    lease_seconds = getattr(_current, 'lease_seconds', None) or DEFAULT_LEASE_SECONDS
+    statement = (BackgroundJob.__table__.update().where(BackgroundJob.__table__.c.id == job_id)
+                 .values(progress={'done': done, 'total': total},
+                         locked_until=datetime.utcnow() + timedelta(seconds=lease_seconds)))
+    if own_transaction:
+        with db.engine.begin() as connection:
+            connection.execute(statement)
+    else:
+        db.session.execute(statement)
+
+
+def process_next(worker=None):
+    """Einen faelligen Job uebernehmen und ausfuehren (None = nichts zu tun)"""
+    job = claim_next(worker)
+    if job is None:
+        return None
+    return run_job(job)
+
+
+def run_pending(limit=100):
+    """Faellige Jobs synchron abarbeiten (Tests, CLI). Gibt die Anzahl zurueck."""
+    count = 0
+    while count < limit and process_next() is not None:
+        count += 1
+    return count
+
+
+# ==========================================
+# WORKER-THREADS
+# ==========================================
+
+def _worker_loop(app):
+    while not _stop.is_set():
+        job = None
+        try:
+            with app.app_context():
+                try:
+                    job = process_next()
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            logger.error(f"Job-Worker Fehler: {e}")
+        if job is None:
+            _wakeup.wait(POLL_INTERVAL)
+            _wakeup.clear()
+
+
+def start_workers(app, count):
+    """count Worker-Threads in diesem Prozess starten"""
+    _stop.clear()
+    for i in range(count):
+        thread = threading.Thread(target=_worker_loop, args=(app,), name=f'job-worker-{i + 1}')
+        thread.daemon = True
+        thread.start()
+        _workers.append(thread)
+    logger.info(f"Job-Queue: {count} Worker gestartet")
+
+
+def stop_workers(timeout=5):
+    """Worker beenden (laufende Jobs werden zu Ende gefuehrt)"""
+    _stop.set()
+    _wakeup.set()
+    for thread in _workers:
+        thread.join(timeout)
+    _workers.clear()
+
+
+def purge_finished_jobs(days=KEEP_FINISHED_DAYS):
+    """Abgeschlossene Jobs aelter als days Tage loeschen"""
+    limit = datetime.utcnow() - timedelta(days=days)
+    deleted = BackgroundJob.query.filter(
+        BackgroundJob.status.in_(('succeeded', 'failed')),
+        BackgroundJob.finished_at < limit,
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    if deleted:
+        logger.info(f"Job-Queue: {deleted} alte Jobs geloescht")
+    return deleted
+
+
+def init_job_queue(app):
+    """
+    Worker-Threads starten (JOB_QUEUE_WORKERS, 0 = aus) und das Aufraeumen
+    im Scheduler registrieren. In create_app() nach init_scheduler() aufrufen.
+    """
+    if app.extensions.get('job_queue'):
+        return
+
+    workers = int(app.config.get('JOB_QUEUE_WORKERS', 0) or 0)
+    # Nicht im Reloader-Elternprozess starten (wie der Scheduler)
+    if workers and (os.environ.get('WERKZEUG_RUN_MAIN') == 'true' or not app.debug):
+        start_workers(app, workers)
+    else:
+        workers = 0
+
+    try:
+        from src.services.scheduler_service import add_system_job
+        add_system_job(purge_finished_jobs, 'interval', 'job_queue_purge', hours=6)
+    except ImportError:
+        pass
+
+    app.extensions['job_queue'] = {'workers': workers}
+
+
+# ==========================================
+# KENNZAHLEN
+# ==========================================
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def get_job_stats(hours=24):
+    """Anzahl je Status, Laufzeit und Wartezeit je Job-Typ (letzte hours Stunden)"""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    rows = db.session.query(
+        BackgroundJob.job_type, BackgroundJob.status, BackgroundJob.duration_ms, BackgroundJob.wait_ms
+    ).filter(BackgroundJob.created_at >= since).all()
+
+    types = {}
+    for job_type, status, duration_ms, wait_ms in rows:
+        entry = types.setdefault(job_type, {
+            'label': JOB_TYPES[job_type].label if job_type in JOB_TYPES else job_type,
+            'counts': {}, 'durations': [], 'waits': [],
+        })
+        entry['counts'][status] = entry['counts'].get(status, 0) + 1
+        if duration_ms is not None and status in ('succeeded', 'failed'):
+            entry['durations'].append(duration_ms)
+        if wait_ms is not None:
+            entry['waits'].append(wait_ms)
+
+    for entry in types.values():
+        durations, waits = entry.pop('durations'), entry.pop('waits')
+        entry['avg_duration_ms'] = round(sum(durations) / len(durations)) if durations else None
+        entry['p95_duration_ms'] = _percentile(durations, 95)
+        entry['max_duration_ms'] = max(durations) if durations else None
+        entry['avg_wait_ms'] = round(sum(waits) / len(waits)) if waits else None
+
+    now = datetime.utcnow()
+    oldest = db.session.query(sa.func.min(BackgroundJob.run_after)).filter(
+        BackgroundJob.status == 'queued', BackgroundJob.run_after <= now).scalar()
+    return {
+        'hours': hours,
+        'types': types,
+        'queued': BackgroundJob.query.filter_by(status='queued').count(),
+        'running': BackgroundJob.query.filter_by(status='running').count(),
+        'oldest_due_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0,
+        'workers_this_process': len([t for t in _workers if t.is_alive()]),
+    }
+
+
+__all__ = [
+    'JOB_TYPES',
+    'register_job_type',
+    'enqueue',
+    'get_job',
+    'last_succeeded',
+    'claim_next',
+    'run_job',
+    'process_next',
+    'run_pending',
+    'backoff_seconds',
+    'start_workers',
+    'stop_workers',
+    'purge_finished_jobs',
+    'init_job_queue',
+    'get_job_stats',
+]
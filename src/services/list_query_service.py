@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+"""
+LISTEN-ABFRAGEN (Auftraege, Kunden, Artikel)
+============================================
+Gemeinsame Abfrage-Schicht fuer die grossen Uebersichtsseiten. Statt die
+komplette gefilterte Tabelle zu laden, wird seitenweise gelesen:
+
+- Keyset-Paginierung auf (Sortierspalte, id): die naechste Seite beginnt
+  hinter dem letzten Datensatz (Cursor), unabhaengig davon, wie weit
+  geblaettert wurde - kein OFFSET, kein Verrutschen bei neuen Datensaetzen
+- load_only(): nur die Spalten, die die Tabelle anzeigt (Kunde des
+  Auftrags per selectinload, ebenfalls eingeschraenkt)
+- count_estimate(): Trefferzahl, gedeckelt bei COUNT_CAP ("10000+")
+- get_facets(): Filterwerte (DISTINCT) je Prozess zwischengespeichert; nach
+  einem Commit mit Aenderungen an Artikeln verworfen, spaetestens nach
+  FACET_TTL_SECONDS (Aenderungen aus anderen Worker-Prozessen)
+- page_json(): JSON-Seite (items, next_cursor, has_more) fuer Endlos-Scrollen
+
+Nutzung:
+    from src.services.list_query_service import fetch_page
+    page = fetch_page(query, 'orders', cursor=request.args.get('cursor'))
+    page.items, page.next_cursor, page.has_more
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import base64
+import importlib
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.orm import Session, load_only, selectinload
+from sqlalchemy.orm.attributes import instance_state
+
+from src.models.models import db
+
+logger = logging.getLogger(__name__)
+
+# Datensaetze je Seite (Standard bzw. maximal per ?limit=)
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# Trefferzahl hoechstens bis hier zaehlen
+COUNT_CAP = 10000
+# Filterwerte spaetestens nach dieser Zeit neu lesen (Sekunden)
+FACET_TTL_SECONDS = 300
+
+ListPage = namedtuple('ListPage', 'items next_cursor has_more')
+
+
+class ListView:
+    """
+    Definition einer Uebersichtsseite.
+
+    model:    'modul:Klasse', wird erst bei Bedarf importiert
+    sort:     Sortierspalte; zusammen mit id eindeutig (Keyset)
+    columns:  Spalten fuer load_only() und die JSON-Ausgabe
+    related:  {Beziehung: [Spalten]} - per selectinload nachgeladen
+    facets:   Spalten mit Filterwerten (get_facets)
+    """
+
+    def __init__(self, key, model, sort, columns, descending=False, related=None, facets=()):
+        self.key = key
+        self.model_path = model
+        self.sort = sort
+        self.columns = columns
+        self.descending = descending
+        self.related = related or {}
+        self.facets = facets
+
+    def model(self):
+        module_name, class_name = self.model_path.split(':')
+        return getattr(importlib.import_module(module_name), class_name)
+
+    def options(self):
+        model = self.model()
+        options = [load_only(*[getattr(model, c) for c in self.columns])]
+        for name, columns in self.related.items():
+            relationship = getattr(model, name)
+            target = relationship.property.mapper.class_
+            options.append(selectinload(relationship).load_only(*[getattr(target, c) for c in columns]))
+        return options
+
+
+LIST_VIEWS = {
+    'orders': ListView('orders', 'src.models.models:Order', 'created_at', [
+        'id', 'order_number', 'created_at', 'customer_id', 'description', 'design_status',
+        'design_file', 'design_file_path', 'order_type', 'rush_order', 'total_price', 'stitch_count',
+        'print_width_cm', 'print_height_cm', 'status', 'due_date',
+    ], descending=True, related={
+        'customer': ['id', 'customer_type', 'company_name', 'first_name', 'last_name'],
+    }),
+    'customers': ListView('customers', 'src.models.models:Customer', 'created_at', [
+        'id', 'customer_type', 'first_name', 'last_name', 'company_name', 'contact_person',
+        'email', 'phone', 'mobile', 'city', 'newsletter', 'created_at',
+    ], descending=True),
+    'articles': ListView('articles', 'src.models.models:Article', 'name', [
+        'id', 'article_number', 'name', 'category', 'price', 'price_calculated', 'price_recommended',
+        'stock', 'min_stock', 'active', 'image_thumbnail_path',
+    ], facets=('category', 'brand', 'supplier', 'material')),
+}
+
+
+# ==========================================
+# CURSOR
+# ==========================================
+
+def encode_cursor(sort_value, row_id):
+    """Cursor (URL-sicher) fuer den Datensatz, hinter dem die naechste Seite beginnt"""
+    if isinstance(sort_value, (datetime, date)):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, view):
+    """
+    Cursor lesen. Returns: (Sortwert, id)
+
+    Raises:
+        ValueError: Cursor ungueltig
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        sort_value, row_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Ungueltiger Cursor: {token!r}') from e
+
+    if sort_value is not None:
+        python_type = getattr(view.model(), view.sort).type.python_type
+        if python_type is datetime:
+            sort_value = datetime.fromisoformat(sort_value)
+        elif python_type is date:
+            sort_value = date.fromisoformat(sort_value)
+    return sort_value, row_id
+
+
+def _order_by(view):
+    model = view.model()
+    column, id_column = getattr(model, view.sort), model.id
+    # NULL-Werte immer am Ende (portabel, ohne NULLS LAST)
+    if view.descending:
+        return [column.is_(None), column.desc(), id_column.desc()]
+    return [column.is_(None), column.asc(), id_column.asc()]
+
+
+def _after(view, sort_value, row_id):
+    """WHERE-Bedingung: Datensaetze hinter (sort_value, row_id) in Sortierreihenfolge"""
+    model = view.model()
+    column, id_column = getattr(model, view.sort), model.id
+    id_after = id_column < row_id if view.descending else id_column > row_id
+    if sort_value is None:
+        return sa.and_(column.is_(None), id_after)
+    value_after = column < sort_value if view.descending else column > sort_value
+    return sa.or_(value_after, sa.and_(column == sort_value, id_after), column.is_(None))
+
+
+# ==========================================
+# SEITEN
+# ==========================================
+
+def page_size(value, default=PAGE_SIZE):
+    """?limit= auf 1..MAX_PAGE_SIZE begrenzen"""
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def fetch_page(query, view_key, cursor=None, limit=PAGE_SIZE):
+    """
+    Eine Seite der gefilterten Query laden.
+
+    Args:
+        query: Query auf das Model der Ansicht (Filter bleiben erhalten,
+               eine vorhandene Sortierung wird ersetzt)
+        view_key: 'orders', 'customers' oder 'articles'
+        cursor: next_cursor der vorherigen Seite (None = erste Seite)
+        limit: Datensaetze je Seite
+
+    Raises:
+        ValueError: Cursor ungueltig
+    """
+    view = LIST_VIEWS[view_key]
+    if cursor:
+        query = query.filter(_after(view, *decode_cursor(cursor, view)))
+    rows = (query.options(*view.options())
+            .order_by(None).order_by(*_order_by(view))
+            .limit(limit + 1).all())
+
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, view.sort), last.id)
+    return ListPage(items, next_cursor, has_more)
+
+
+def count_estimate(query, cap=COUNT_CAP):
+    """
+    Trefferzahl der gefilterten Query, hoechstens bis cap gezaehlt.
+
+    Returns:
+        (Anzahl, exakt) - exakt=False heisst "cap oder mehr"
+    """
+    model = query.column_descriptions[0]['entity']
+    limited = query.order_by(None).with_entities(model.id).limit(cap + 1).subquery()
+    count = db.session.execute(sa.select(sa.func.count()).select_from(limited)).scalar() or 0
+    return min(count, cap), count <= cap
+
+
+def item_status_counts(order_ids):
+    """Bestellstatus der Positionen je Auftrag in einer Abfrage: {order_id: {status: n}}"""
+    from src.models.models import OrderItem
+
+    counts = {order_id: {} for order_id in order_ids}
+    if not order_ids:
+        return counts
+    rows = db.session.execute(
+        sa.select(OrderItem.order_id, OrderItem.supplier_order_status, sa.func.count())
+        .where(OrderItem.order_id.in_(list(order_ids)))
+        .group_by(OrderItem.order_id, OrderItem.supplier_order_status))
+    for order_id, status, count in rows:
+        counts[order_id][status] = count
+    return counts
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def page_json(page, view_key, extra=None):
+    """
+    JSON-Daten (dict) einer Seite: die load_only-Spalten je Datensatz,
+    ergaenzt um extra(obj) -> dict.
+    """
+    view = LIST_VIEWS[view_key]
+    items = []
+    for obj in page.items:
+        item = {c: _json_value(getattr(obj, c)) for c in view.columns}
+        if extra:
+            item.update(extra(obj))
+        items.append(item)
+    return {'items': items, 'next_cursor': page.next_cursor, 'has_more': page.has_more}
+
+
+# ==========================================
+# REQUEST-HILFEN (Controller)
+# ==========================================
+
+def wants_json():
+    """JSON-Modus fuer Endlos-Scrollen: ?format=json oder Accept: application/json"""
+    from flask import request
+    return request.args.get('format') == 'json' or request.accept_mimetypes.best == 'application/json'
+
+
+def json_response(query, page, view_key, extra=None):
+    """Seite als JSON; mit ?count=1 zusaetzlich total/total_exact (count_estimate)"""
+    from flask import jsonify, request
+    data = page_json(page, view_key, extra)
+    if request.args.get('count') == '1':
+        data['total'], data['total_exact'] = count_estimate(query)
+    return jsonify(data)
+
+
+def next_page_url(page):
+    """URL der naechsten Seite (gleiche Filter, neuer Cursor) oder None"""
+    from flask import request, url_for
+    if not page.has_more:
+        return None
+    args = request.args.to_dict()
+    args['cursor'] = page.next_cursor
+    return url_for(request.endpoint, **args)
+
+
+# ==========================================
+# FILTERWERTE
+# ==========================================
+
+_lock = threading.Lock()
+# view_key -> (Zeitpunkt monotonic, {Spalte: [Werte]})
+_facet_cache = {}
+
+
+def get_facets(view_key):
+    """Sortierte, nicht-leere DISTINCT-Werte je Filterspalte: {Spalte: [Werte]}"""
+    view = LIST_VIEWS[view_key]
+    now = time.monotonic()
+    with _lock:
+        cached = _facet_cache.get(view_key)
+    if cached and now - cached[0] < FACET_TTL_SECONDS:
+        return cached[1]
+
+    model = view.model()
+    facets = {}
+    for name in view.facets:
+        column = getattr(model, name)
+        facets[name] = list(db.session.execute(
+            sa.select(column).distinct().where(column.isnot(None), column != '').order_by(column)).scalars())
+
+    with _lock:
+        _facet_cache[view_key] = (now, facets)
+    return facets
+
+
+def clear_facets(view_key=None):
+    with _lock:
+        if view_key is None:
+            _facet_cache.clear()
+        else:
+            _facet_cache.pop(view_key, None)
+
+
+def _facet_views_by_class():
+    result = {}
+    for view in LIST_VIEWS.values():
+        if view.facets:
+            result.setdefault(view.model(), []).append(view)
+    return result
+
+
+def _mark(session, views):
+    session.info.setdefault('list_facets_changed', set()).update(v.key for v in views)
+
+
+def _on_after_flush(session, flush_context):
+    """Geaenderte Filterwerte merken, verworfen wird erst nach dem Commit"""
+    by_class = _facet_views_by_class()
+    for obj in list(session.new) + list(session.deleted):
+        views = by_class.get(type(obj))
+        if views:
+            _mark(session, views)
+    for obj in session.dirty:
+        views = by_class.get(type(obj))
+        if not views:
+            continue
+        state = instance_state(obj)
+        changed = [v for v in views
+                   if any(state.attrs[a].history.has_changes() for a in v.facets)]
+        if changed:
+            _mark(session, changed)
+
+
+def _on_orm_execute(orm_execute_state):
+    """Bulk-INSERT/UPDATE/DELETE (z.B. L-Shop-Import) auf Artikel"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    views = _facet_views_by_class().get(mapper.class_)
+    if views:
+        _mark(orm_execute_state.session, views)
+
+
+def _on_after_commit(session):
+    for key in session.info.pop('list_facets_changed', ()):
+        clear_facets(key)
+
+
+def _on_after_rollback(session):
+    session.info.pop('list_facets_changed', None)
+
+
+def _register_events():
+    for name, listener in (('after_flush', _on_after_flush), ('do_orm_execute', _on_orm_execute),
+                           ('after_commit', _on_after_commit), ('after_rollback', _on_after_rollback)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+def init_list_queries(app):
+    """Registriert die Session-Events fuer den Filterwerte-Cache. In create_app() aufrufen."""
+    if app.extensions.get('list_queries'):
+        return
+    _register_events()
+    app.extensions['list_queries'] = True
+
+
+__all__ = [
+    'LIST_VIEWS',
+    'ListPage',
+    'fetch_page',
+    'count_estimate',
+    'page_size',
+    'page_json',
+    'wants_json',
+    'json_response',
+    'next_page_url',
+    'item_status_counts',
+    'get_facets',
+    'clear_facets',
+    'encode_cursor',
+    'decode_cursor',
+    'init_list_queries',
+]
@@ -26,6 +26,11 @@ import re
 from datetime import datetime
 from flask import current_app
 from src.models import db, Article, ArticleVariant, ArticleSupplier, Supplier, Brand, ProductCategory
+from src.services.table_reader_service import iter_chunks, sample_frame, table_layout
+from src.services.bulk_upsert_service import (
+    ImportProgress, bulk_update, bulk_upsert, chunks, ensure_names, int_column,
+    load_keys, nullable, number_column, text_column, to_records,
+)
 from flask_login import current_user
 
 class LShopImportService:
@@ -35,6 +40,8 @@ class LShopImportService:
         self.excel_path = None
         self.header_row = None
         self.df = None
+        self.layout = None
+        self._generated_numbers = 0
         
         # VOLLSTÄNDIGES StitchAdmin Spalten-Mapping
         self.stitchadmin_fields = {
@@ -181,7 +188,7 @@ class LShopImportService:
                 'suggested_mapping': None,
                 'data_type': str(self.df[source_col].dtype),
                 'non_null_count': int(self.df[source_col].count()),
-                'total_count': int(len(self.df))
+                'total_count': self.total_rows
             }
             
             # Finde vorgeschlagenes Mapping
@@ -278,34 +285,18 @@ class LShopImportService:
         return mapping
     
     def analyze_excel(self, file_path):
-        """Analysiert Excel-Datei und ermittelt Header-Zeile"""
+        """
+        Analysiert Excel-Datei und ermittelt Header-Zeile.
+        Die Datei wird einmal gestreamt (openpyxl read_only); self.df enthaelt
+        nur die Stichprobe fuer Vorschau/Mapping, der Import liest blockweise.
+        """
         try:
-            # Versuche verschiedene Header-Zeilen zu finden
-            df = None
-            header_row = None
-            
-            # Teste die ersten 10 Zeilen als mögliche Header
-            for row in range(10):
-                try:
-                    test_df = pd.read_excel(file_path, header=row, engine='openpyxl')
-                    if len(test_df.columns) > 3 and len(test_df) > 1:
-                        # Prüfe ob sinnvolle Spaltennamen vorhanden
-                        col_names = [str(col).lower() for col in test_df.columns]
-                        if any(keyword in ' '.join(col_names) for keyword in 
-                               ['art', 'artikel', 'bezeichnung', 'marke', 'preis']):
-                            header_row = row
-                            df = test_df
-                            break
-                except:
-                    continue
-            
-            if df is None:
-                # Fallback: Erste Zeile als Header
-                df = pd.read_excel(file_path, header=0, engine='openpyxl')
-                header_row = 0
-            
+            layout = table_layout(file_path)
+            df = sample_frame(layout)
+
             self.df = df
-            self.header_row = header_row
+            self.layout = layout
+            self.header_row = layout['header_row']
             self.excel_path = file_path
             
             # Automatisches Mapping generieren
@@ -313,8 +304,8 @@ class LShopImportService:
             
             return {
                 'success': True,
-                'header_row': header_row,
-                'total_rows': len(df),
+                'header_row': self.header_row,
+                'total_rows': layout['total_rows'],
                 'columns': list(df.columns),
                 'preview_data': df.head(5).to_dict('records'),
                 'auto_mapping': auto_mapping,
@@ -329,45 +320,58 @@ class LShopImportService:
                 'error': str(e),
                 'message': f'Fehler beim Analysieren der Excel-Datei: {e}'
             }
+
+    @property
+    def total_rows(self):
+        """Datenzeilen der ganzen Datei (self.df ist nach analyze_excel nur die Stichprobe)"""
+        if self.layout is not None:
+            return self.layout['total_rows']
+        return len(self.df) if self.df is not None else 0
     
     def validate_data(self):
-        """Validiert die Excel-Daten vor dem Import"""
+        """
+        Validiert die Excel-Daten vor dem Import.
+        Nach analyze_excel wird die ganze Datei blockweise gelesen (self.df ist
+        nur die Stichprobe), damit valid_rows zu total_rows passt.
+        """
         if self.df is None:
             return {'valid': False, 'errors': ['Keine Daten geladen']}
             
         errors = []
         warnings = []
+        warning_count = 0
         valid_rows = 0
         
-        for index, row in self.df.iterrows():
-            # Skip komplett leere Zeilen
-            if row.isna().all():
-                continue
-                
-            row_valid = True
-            
-            # Prüfe auf mindestens einen wichtigen Wert
-            important_cols = ['Artikel', 'Art. Nr.:', 'Name', 'Bezeichnung']
-            has_important_data = False
-            
-            for col in important_cols:
-                if col in row and pd.notna(row[col]) and str(row[col]).strip():
-                    has_important_data = True
-                    break
+        # Prüfe auf mindestens einen wichtigen Wert
+        important_cols = ['Artikel', 'Art. Nr.:', 'Name', 'Bezeichnung']
+        blocks = [self.df] if self.layout is None else iter_chunks(self.excel_path, self.layout)
+        
+        for chunk in blocks:
+            for index, row in chunk.iterrows():
+                # Skip komplett leere Zeilen
+                if row.isna().all():
+                    continue
                     
-            if not has_important_data:
-                warnings.append(f'Zeile {index+1}: Keine wichtigen Daten gefunden')
-                row_valid = False
-                
-            if row_valid:
-                valid_rows += 1
+                has_important_data = False
+                for col in important_cols:
+                    if col in row and pd.notna(row[col]) and str(row[col]).strip():
+                        has_important_data = True
+                        break
+                        
+                if has_important_data:
+                    valid_rows += 1
+                else:
+                    warning_count += 1
+                    if len(warnings) < 100:  # Max 100 Warnungen zurueckgeben
+                        warnings.append(f'Zeile {index+1}: Keine wichtigen Daten gefunden')
                 
         return {
             'valid': len(errors) == 0,
             'errors': errors,
             'warnings': warnings,
+            'warning_count': warning_count,
             'valid_rows': valid_rows,
-            'total_rows': len(self.df)
+            'total_rows': self.total_rows
         }
         
     def get_import_preview(self, limit=50):
@@ -414,401 +418,428 @@ class LShopImportService:
             
         return preview
     
-    def import_articles(self, column_mapping, options=None):
-        """Importiert Artikel mit dem gegebenen Spalten-Mapping"""
+    def import_articles(self, column_mapping, options=None, progress=None):
+        """
+        Importiert Artikel mit dem gegebenen Spalten-Mapping
+
+        Args:
+            column_mapping: {Zielfeld: Spaltenname oder Spaltenindex}
+            options: create_variants, created_by (Hintergrund-Job ohne Login)
+            progress: Optional - Callback (geschrieben, gesamt) nach jedem Block
+        """
         if self.df is None:
             return {'success': False, 'error': 'Keine Excel-Daten verfügbar'}
 
+        run = self._import_single_articles
         # Varianten-Import wenn aktiviert und Farbe/Groesse gemappt
         if options and options.get('create_variants'):
             has_color = bool(column_mapping.get('color'))
             has_size = bool(column_mapping.get('size'))
             has_sku = bool(column_mapping.get('supplier_article_number'))
             if has_sku and (has_color or has_size):
-                return self._import_with_variants(column_mapping, options)
-
-        return self._import_single_articles(column_mapping, options)
-
-    def _extract_row_data(self, row, column_mapping):
-        """Extrahiert Artikel-Daten aus einer Zeile basierend auf Mapping"""
-        article_data = {}
+                run = self._import_with_variants
+
+        self._generated_numbers = 0
+        if self.layout is None:
+            # DataFrame direkt gesetzt: in einem Stueck
+            return run(self.df, column_mapping, options, progress)
+
+        # Datei blockweise lesen; Artikel aus frueheren Bloecken gelten als vorhanden
+        blocks = iter_chunks(self.excel_path, self.layout)
+        if run == self._import_with_variants:
+            blocks = self._group_aligned(blocks, column_mapping)
+        result = None
+        done = 0
+        for chunk in blocks:
+            part = run(chunk, column_mapping, options)
+            if not part['success']:
+                return part
+            if result is None:
+                result = part
+            else:
+                for key in ('imported_count', 'variant_count', 'updated_count', 'skipped_count',
+                            'error_count', 'total_processed'):
+                    if key in part:
+                        result[key] += part[key]
+                result['errors'] = (result['errors'] + part['errors'])[:10]
+            done += len(chunk)
+            if progress:
+                progress(done, self.layout['total_rows'])
+                db.session.commit()
+        return result or {'success': True, 'imported_count': 0, 'updated_count': 0, 'skipped_count': 0,
+                          'error_count': 0, 'errors': [], 'total_processed': 0}
+
+    def _group_aligned(self, blocks, column_mapping):
+        """
+        Bloecke nur dort schneiden, wo die Lieferanten-Artikelnummer wechselt:
+        die offene Gruppe am Blockende wandert in den naechsten Block, damit
+        ihre Varianten gemeinsam gruppiert werden.
+        """
+        carry = None
+        for chunk in blocks:
+            if carry is not None:
+                chunk = pd.concat([carry, chunk])
+                carry = None
+            keys = self._mapped_frame(chunk, {'supplier_article_number': column_mapping['supplier_article_number']}
+                                      )['supplier_article_number']
+            last = keys.iloc[-1]
+            if pd.notna(last):
+                other = np.flatnonzero((keys != last).values)
+                cut = other[-1] + 1 if len(other) else 0
+                carry = chunk.iloc[cut:]
+                chunk = chunk.iloc[:cut]
+            if len(chunk):
+                yield chunk
+        if carry is not None and len(carry):
+            yield carry
+
+    # ------------------------------------------------------------------
+    # Bulk-Import: Spalten statt Zeilen, Schluessel vorab, Upsert in Bloecken
+    # ------------------------------------------------------------------
+
+    def _mapped_frame(self, df, column_mapping):
+        """
+        Gemappte Spalten als Text (getrimmt, leer -> None), ein DataFrame mit
+        allen Zielfeldern; Index wie df.
+        """
+        data = {}
         for target_field, source_column in column_mapping.items():
-            if source_column:
-                if source_column.isdigit():
-                    col_index = int(source_column)
-                    if col_index < len(self.df.columns):
-                        column_name = self.df.columns[col_index]
-                    else:
-                        continue
-                else:
-                    column_name = source_column
-
-                if column_name in self.df.columns:
-                    value = row[column_name]
-                    if pd.notna(value) and str(value).strip():
-                        article_data[target_field] = str(value).strip()
-        return article_data
-
-    def _import_with_variants(self, column_mapping, options=None):
+            if not source_column:
+                continue
+            column_name = source_column
+            if str(source_column).isdigit():
+                col_index = int(source_column)
+                if col_index >= len(df.columns):
+                    continue
+                column_name = df.columns[col_index]
+            if column_name in df.columns:
+                data[target_field] = text_column(df[column_name])
+        frame = pd.DataFrame(data, index=df.index)
+        for field in self.stitchadmin_fields:
+            if field not in frame.columns:
+                frame[field] = None
+        return frame
+
+    def _created_by(self, options):
+        if options and options.get('created_by'):
+            return options['created_by']
+        return current_user.username if current_user and current_user.is_authenticated else 'L-Shop Import'
+
+    def _reserve_article_ids(self, count):
+        """count Artikel-IDs als Block reservieren"""
+        from src.services.id_generator_service import IdGenerator
+        return IdGenerator.articles(count)
+
+    def _price_factors(self):
+        """
+        (Kategorie-ID, Kategorie) -> (Faktor kalkuliert, Faktor empfohlen, MwSt-Satz)
+        wie Article.calculate_prices(), Regeln aber nur einmal geladen
+        """
+        from src.models.models import PriceCalculationSettings
+        try:
+            from src.models.settings import PriceCalculationRule, TaxRate
+            rules = PriceCalculationRule.query.filter_by(active=True).order_by(PriceCalculationRule.priority).all()
+            default_tax = TaxRate.get_default_rate()
+        except Exception:
+            rules = []
+            default_tax = PriceCalculationSettings.get_setting('default_tax_rate', 19.0)
+
+        if not rules:
+            legacy = (PriceCalculationSettings.get_setting('price_factor_calculated', 1.5),
+                      PriceCalculationSettings.get_setting('price_factor_recommended', 2.0), default_tax)
+            return lambda category_id, category: legacy
+
+        def factors(category_id, category):
+            selected = rules[0]
+            for rule in rules:
+                categories = rule.get_categories() if rule.applies_to_categories else []
+                if (category_id and category_id in categories) or (category and category in categories):
+                    selected = rule
+                    break
+                if rule.applies_to_suppliers and 'L-Shop' in rule.get_suppliers():
+                    selected = rule
+                    break
+            return (selected.factor_calculated, selected.factor_recommended,
+                    selected.tax_rate.rate if selected.tax_rate else default_tax)
+        return factors
+
+    def _new_article_frame(self, frame, options, article_ids):
+        """Spalten neuer Artikel (Preise, Marke/Kategorie als FK) fuer bulk_upsert"""
+        now = datetime.utcnow()
+        created_by = self._created_by(options)
+
+        brands = ensure_names(Brand, frame['manufacturer'].dropna().unique(),
+                              {'active': True, 'created_by': created_by, 'created_at': now})
+        categories = ensure_names(ProductCategory, frame['category'].dropna().unique(),
+                                  {'active': True, 'sort_order': 999, 'created_by': created_by, 'created_at': now})
+
+        single = number_column(frame['single_price'])
+        articles = pd.DataFrame({
+            'id': article_ids,
+            'article_number': frame['article_number'].values,
+            'supplier_article_number': frame['supplier_article_number'].values,
+            'name': frame['name'].fillna('Unbenannter Artikel').values,
+            'product_type': frame['product_type'].values,
+            'brand': frame['manufacturer'].values,
+            'brand_id': frame['manufacturer'].map(brands).astype('Int64').values,
+            'category': frame['category'].values,
+            'category_id': frame['category'].map(categories).astype('Int64').values,
+            'manufacturer_number': frame['manufacturer_number'].values,
+            'color': frame['color'].values,
+            'size': frame['size'].values,
+            'material': frame['material'].values,
+            'units_per_carton': int_column(frame['units_per_carton']).values,
+            'purchase_price_single': single.values,
+            'purchase_price_carton': number_column(frame['carton_price']).values,
+            'purchase_price_10carton': number_column(frame['ten_carton_price']).values,
+            'description': frame['description'].values,
+        })
+
+        # VK-Preise (nur mit EK-Einzelpreis) je Kategorie-Kombination einmal bestimmt
+        factors = self._price_factors()
+        keys = list(zip(articles['category_id'].astype(object).where(articles['category_id'].notna(), None),
+                        articles['category']))
+        per_key = {key: factors(*key) for key in set(keys)}
+        calc = np.array([per_key[k][0] * (1 + per_key[k][2] / 100) for k in keys], dtype=float)
+        rec = np.array([per_key[k][1] * (1 + per_key[k][2] / 100) for k in keys], dtype=float)
+        has_price = (single > 0).fillna(False).values
+        base = single.fillna(0).values
+        articles['price_calculated'] = [round(v, 2) if ok else 0 for v, ok in zip(base * calc, has_price)]
+        articles['price_recommended'] = [round(v, 2) if ok else 0 for v, ok in zip(base * rec, has_price)]
+        articles['price'] = articles['price_calculated']
+
+        articles['supplier'] = 'L-Shop'
+        articles['active'] = True
+        articles['stock'] = 0
+        articles['min_stock'] = 0
+        articles['weight'] = 0
+        articles['has_variants'] = False
+        articles['created_by'] = created_by
+        articles['created_at'] = now
+        return articles
+
+    def _import_with_variants(self, df, column_mapping, options=None, progress=None):
         """Importiert Artikel mit Varianten-Gruppierung nach supplier_article_number"""
         import logging
         logger = logging.getLogger(__name__)
 
         try:
-            imported_count = 0
-            variant_count = 0
-            updated_count = 0
-            skipped_count = 0
-            error_count = 0
-            errors = []
-
             try:
                 db.session.rollback()
             except:
                 pass
 
-            # Spaltenname fuer supplier_article_number ermitteln
-            sku_col = column_mapping.get('supplier_article_number', '')
-            if sku_col.isdigit():
-                sku_col = self.df.columns[int(sku_col)] if int(sku_col) < len(self.df.columns) else None
-
-            has_color = bool(column_mapping.get('color'))
-            has_size = bool(column_mapping.get('size'))
-
-            # Zeilen nach supplier_article_number gruppieren
-            groups = {}
-            for index, row in self.df.iterrows():
-                if row.isna().all():
-                    continue
-                data = self._extract_row_data(row, column_mapping)
-                sku = data.get('supplier_article_number', '').strip()
-                if not sku and not data.get('name'):
-                    skipped_count += 1
-                    continue
-                key = sku if sku else f"_row_{index}"
-                if key not in groups:
-                    groups[key] = []
-                groups[key].append(data)
-
-            logger.info(f"Varianten-Import: {len(groups)} Artikelgruppen aus {len(self.df)} Zeilen")
-
-            for sku, rows in groups.items():
-                try:
-                    first_row = rows[0]
-                    has_multiple = len(rows) > 1
-                    row_has_color = any(r.get('color') for r in rows)
-                    row_has_size = any(r.get('size') for r in rows)
-                    create_variants = has_multiple or (row_has_color and row_has_size)
-
-                    # Pruefen ob Artikel schon existiert
-                    existing_article = None
-                    if first_row.get('supplier_article_number'):
-                        existing_article = Article.query.filter_by(
-                            supplier_article_number=first_row['supplier_article_number']
-                        ).first()
-
-                    if existing_article:
-                        # Bestehenden Artikel aktualisieren
-                        article = existing_article
-                        if create_variants and not article.has_variants:
-                            article.has_variants = True
-                            article.color = None
-                            article.size = None
-                        updated_count += 1
-                    else:
-                        # Neuen Artikel erstellen
-                        article_id = self.generate_article_id()
-                        art_nr = first_row.get('article_number') or f"SA-{first_row.get('supplier_article_number', article_id)}"
-
-                        brand_obj = self.create_or_get_brand(first_row.get('manufacturer'))
-                        category_obj = self.create_or_get_category(first_row.get('category'))
-
-                        article = Article(
-                            id=article_id,
-                            article_number=art_nr,
-                            supplier_article_number=first_row.get('supplier_article_number'),
-                            name=first_row.get('name', 'Unbenannter Artikel'),
-                            product_type=first_row.get('product_type'),
-                            brand=first_row.get('manufacturer'),
-                            brand_id=brand_obj.id if brand_obj else None,
-                            category=first_row.get('category'),
-                            category_id=category_obj.id if category_obj else None,
-                            manufacturer_number=first_row.get('manufacturer_number'),
-                            material=first_row.get('material'),
-                            units_per_carton=self._safe_int(first_row.get('units_per_carton')),
-                            purchase_price_single=self._safe_float(first_row.get('single_price')),
-                            purchase_price_carton=self._safe_float(first_row.get('carton_price')),
-                            purchase_price_10carton=self._safe_float(first_row.get('ten_carton_price')),
-                            description=first_row.get('description'),
-                            supplier='L-Shop',
-                            has_variants=create_variants,
-                            active=True,
-                            stock=0,
-                            min_stock=0,
-                            price=0,
-                            weight=0,
-                            created_by=current_user.username if current_user and current_user.is_authenticated else 'L-Shop Import',
-                            created_at=datetime.utcnow()
-                        )
-
-                        if not create_variants:
-                            article.color = first_row.get('color')
-                            article.size = first_row.get('size')
-
-                        if article.purchase_price_single and article.purchase_price_single > 0:
-                            try:
-                                article.calculate_prices()
-                            except:
-                                article.price = article.purchase_price_single * 2.0
-
-                        db.session.add(article)
-                        article.auto_assign_supplier()
-                        imported_count += 1
-
-                    # Varianten erstellen
-                    if create_variants:
-                        db.session.flush()  # Artikel-ID sicherstellen
-                        for row_data in rows:
-                            color = row_data.get('color', '').strip() or None
-                            size = row_data.get('size', '').strip() or None
-
-                            if not color and not size:
-                                continue
-
-                            # variant_type bestimmen
-                            if color and size:
-                                vtype = 'color_size'
-                            elif color:
-                                vtype = 'color'
-                            else:
-                                vtype = 'size'
-
-                            # Pruefen ob Variante schon existiert
-                            existing_var = ArticleVariant.query.filter_by(
-                                article_id=article.id, color=color, size=size
-                            ).first()
-
-                            if existing_var:
-                                # Update Preise
-                                existing_var.single_price = self._safe_float(row_data.get('single_price')) or existing_var.single_price
-                                existing_var.carton_price = self._safe_float(row_data.get('carton_price')) or existing_var.carton_price
-                                existing_var.ten_carton_price = self._safe_float(row_data.get('ten_carton_price')) or existing_var.ten_carton_price
-                            else:
-                                variant = ArticleVariant(
-                                    article_id=article.id,
-                                    variant_type=vtype,
-                                    color=color,
-                                    size=size,
-                                    ean=row_data.get('ean'),
-                                    single_price=self._safe_float(row_data.get('single_price')),
-                                    carton_price=self._safe_float(row_data.get('carton_price')),
-                                    ten_carton_price=self._safe_float(row_data.get('ten_carton_price')),
-                                    units_per_carton=self._safe_int(row_data.get('units_per_carton')),
-                                    active=True,
-                                    created_by=current_user.username if current_user and current_user.is_authenticated else 'L-Shop Import',
-                                )
-                                db.session.add(variant)
-                                variant_count += 1
-
-                    # Batch-Commit
-                    if (imported_count + updated_count) % 25 == 0:
-                        try:
-                            db.session.commit()
-                        except Exception as e:
-                            db.session.rollback()
-                            error_count += 1
-                            errors.append(f"Batch-Commit Fehler bei {sku}: {e}")
-
-                except Exception as e:
-                    error_count += 1
-                    errors.append(f"Artikel {sku}: {e}")
+            frame = self._mapped_frame(df, column_mapping)
+            relevant = ~df.isna().all(axis=1)
+            valid = relevant & (frame['supplier_article_number'].notna() | frame['name'].notna())
+            skipped_count = int((relevant & ~valid).sum())
+            frame = frame[valid].copy()
+
+            # Gruppen: Lieferanten-Artikelnummer, sonst jede Zeile fuer sich
+            frame['_key'] = frame['supplier_article_number'].where(
+                frame['supplier_article_number'].notna(), '_row_' + frame.index.astype(str))
+            grouped = frame.groupby('_key', sort=False)
+            groups = pd.DataFrame({
+                'rows': grouped.size(),
+                'colors': grouped['color'].count(),
+                'sizes': grouped['size'].count(),
+            })
+            groups['create_variants'] = (groups['rows'] > 1) | ((groups['colors'] > 0) & (groups['sizes'] > 0))
+            first = frame.drop_duplicates('_key', keep='first').set_index('_key')
+            first['create_variants'] = groups['create_variants']
+
+            logger.info(f"Varianten-Import: {len(first)} Artikelgruppen aus {len(df)} Zeilen")
+
+            # Vorhandene Artikel (eine Abfrage je Block statt je Gruppe)
+            existing = load_keys(Article.supplier_article_number, Article.id,
+                                 first['supplier_article_number'].dropna())
+            first['article_id'] = first['supplier_article_number'].map(existing).astype(object)
+            is_existing = first['article_id'].notna()
+            has_variants = load_keys(Article.id, Article.has_variants, first.loc[is_existing, 'article_id'])
+            # Zeilen zu einem vorhandenen Variantenartikel sind immer Varianten
+            # (z.B. Rest einer Gruppe aus einem frueheren Block oder Import)
+            first['create_variants'] = first['create_variants'] | (
+                first['article_id'].map(has_variants).fillna(False).astype(bool))
+
+            # Neue Artikel
+            new = first[~is_existing].copy()
+            new_ids = self._reserve_article_ids(len(new))
+            new['article_id'] = new_ids
+            fallback = 'SA-' + new['supplier_article_number'].where(new['supplier_article_number'].notna(),
+                                                                  new['article_id'])
+            new['article_number'] = new['article_number'].where(new['article_number'].notna(), fallback)
+            new.loc[new['create_variants'], ['color', 'size']] = None
+            new_articles = self._new_article_frame(new, options, new_ids)
+            new_articles['has_variants'] = new['create_variants'].values
+            first.loc[~is_existing, 'article_id'] = new_ids
+
+            # Vorhandene Artikel werden zu Variantenartikeln
+            switch = first[is_existing & first['create_variants']
+                           & ~first['article_id'].map(has_variants).fillna(False).astype(bool)]
+            switch_rows = [{'id': article_id, 'has_variants': True, 'color': None, 'size': None}
+                           for article_id in switch['article_id']]
+
+            # Varianten: Zeilen mit Farbe oder Groesse in Gruppen mit Varianten
+            frame['article_id'] = frame['_key'].map(first['article_id'])
+            rows = frame[frame['_key'].map(first['create_variants']).astype(bool)
+                         & (frame['color'].notna() | frame['size'].notna())].copy()
+            rows['single_price'] = number_column(rows['single_price'])
+            rows['carton_price'] = number_column(rows['carton_price'])
+            rows['ten_carton_price'] = number_column(rows['ten_carton_price'])
+            rows['units_per_carton'] = int_column(rows['units_per_carton'])
+            rows['variant_type'] = np.where(rows['color'].notna() & rows['size'].notna(), 'color_size',
+                                            np.where(rows['color'].notna(), 'color', 'size'))
+            variant_key = ['article_id', 'color', 'size']
+            rows = rows.groupby(variant_key, sort=False, dropna=False).last().reset_index()
+
+            existing_variants = self._load_variants(first.loc[is_existing, 'article_id'].unique())
+            rows['variant_id'] = [existing_variants.get(key, (None,))[0]
+                                  for key in zip(rows['article_id'], nullable(rows['color']), nullable(rows['size']))]
+            new_variants = rows[rows['variant_id'].isna()]
+            price_updates = []
+            for values in zip(rows['variant_id'], rows['article_id'], nullable(rows['color']), nullable(rows['size']),
+                              nullable(rows['single_price']), nullable(rows['carton_price']),
+                              nullable(rows['ten_carton_price'])):
+                variant_id, article_id, color, size, single, carton, ten = values
+                if variant_id is None or pd.isna(variant_id):
                     continue
-
-            db.session.commit()
+                _, old_single, old_carton, old_ten = existing_variants[(article_id, color, size)]
+                price_updates.append({'id': int(variant_id), 'single_price': single or old_single,
+                                      'carton_price': carton or old_carton, 'ten_carton_price': ten or old_ten})
+
+            created_by = self._created_by(options)
+            variant_records = to_records(pd.DataFrame({
+                'article_id': new_variants['article_id'].values,
+                'variant_type': new_variants['variant_type'].values,
+                'color': new_variants['color'].values,
+                'size': new_variants['size'].values,
+                'ean': new_variants['ean'].values,
+                'single_price': new_variants['single_price'].values,
+                'carton_price': new_variants['carton_price'].values,
+                'ten_carton_price': new_variants['ten_carton_price'].values,
+                'units_per_carton': new_variants['units_per_carton'].values,
+                'active': True,
+                'created_by': created_by,
+            }))
+
+            tracker = ImportProgress(len(new_articles) + len(switch_rows) + len(variant_records)
+                                     + len(price_updates), progress)
+            imported_count = tracker.write(
+                to_records(new_articles),
+                lambda block: bulk_upsert(Article, block, ['id'], update_columns=[]), 'Artikel')
+            tracker.write(switch_rows, lambda block: bulk_update(Article, block), 'Artikel-Update')
+            failed_ids = set(tracker.failed_keys('id'))
+            variant_records = [v for v in variant_records if v['article_id'] not in failed_ids]
+            variant_count = tracker.write(
+                variant_records,
+                lambda block: bulk_upsert(ArticleVariant, block, variant_key,
+                                          update_columns=['single_price', 'carton_price', 'ten_carton_price'],
+                                          keep_existing_on_null=True), 'Varianten')
+            tracker.write(price_updates, lambda block: bulk_update(ArticleVariant, block), 'Varianten-Preise')
 
             return {
                 'success': True,
                 'imported_count': imported_count,
                 'variant_count': variant_count,
-                'updated_count': updated_count,
+                'updated_count': int(is_existing.sum()),
                 'skipped_count': skipped_count,
-                'error_count': error_count,
-                'errors': errors[:10],
-                'total_processed': len(self.df)
+                'error_count': tracker.error_count,
+                'errors': tracker.errors[:10],
+                'total_processed': len(df)
             }
 
         except Exception as e:
             db.session.rollback()
             return {'success': False, 'error': str(e)}
 
-    def _import_single_articles(self, column_mapping, options=None):
+    def _load_variants(self, article_ids):
+        """{(article_id, color, size): (id, single, carton, ten_carton)} vorhandener Varianten"""
+        result = {}
+        for block in chunks([a for a in article_ids if a is not None]):
+            for v in db.session.query(ArticleVariant.id, ArticleVariant.article_id, ArticleVariant.color,
+                                      ArticleVariant.size, ArticleVariant.single_price,
+                                      ArticleVariant.carton_price, ArticleVariant.ten_carton_price
+                                      ).filter(ArticleVariant.article_id.in_(block)):
+                result[(v.article_id, v.color, v.size)] = (v.id, v.single_price, v.carton_price, v.ten_carton_price)
+        return result
+
+    def _import_single_articles(self, df, column_mapping, options=None, progress=None):
         """Importiert Artikel ohne Varianten-Gruppierung (Originalverhalten)"""
-        if self.df is None:
-            return {'success': False, 'error': 'Keine Excel-Daten verfügbar'}
-
         try:
-            imported_count = 0
-            updated_count = 0
-            skipped_count = 0
-            error_count = 0
-            errors = []
-
             try:
                 db.session.rollback()
             except:
                 pass
 
-            for index, row in self.df.iterrows():
-                try:
-                    # Skip leere Zeilen
-                    if row.isna().all():
-                        skipped_count += 1
-                        continue
-                    
-                    # Erstelle Artikel-Daten basierend auf Mapping
-                    article_data = {}
-                    
-                    for target_field, source_column in column_mapping.items():
-                        if source_column:
-                            # Konvertiere Index zu Spaltenname falls nötig
-                            if source_column.isdigit():
-                                col_index = int(source_column)
-                                if col_index < len(self.df.columns):
-                                    column_name = self.df.columns[col_index]
-                                else:
-                                    continue
-                            else:
-                                column_name = source_column
-                                
-                            if column_name in self.df.columns:
-                                value = row[column_name]
-                                if pd.notna(value) and str(value).strip():
-                                    article_data[target_field] = str(value).strip()
-                    
-                    # Verbesserte Validierung
-                    has_required_data = bool(
-                        article_data.get('supplier_article_number') or 
-                        article_data.get('name')
-                    )
-                    
-                    if not has_required_data:
-                        skipped_count += 1
-                        continue
-                    
-                    # *** REPARATUR: ID-Generierung ***
-                    # Generiere StitchAdmin-Artikelnummer falls nicht vorhanden
-                    if not article_data.get('article_number'):
-                        if article_data.get('supplier_article_number'):
-                            # Verwende Lieferanten-Artikelnummer als Basis
-                            base_number = article_data['supplier_article_number']
-                            article_data['article_number'] = f"SA-{base_number}"
-                        else:
-                            # Generiere neue Nummer
-                            date_str = datetime.now().strftime('%Y%m%d')
-                            article_data['article_number'] = f"SA-{date_str}-{imported_count+1:04d}"
-                    
-                    # *** NEUE EINFACHE ID-GENERIERUNG ***
-                    article_id = self.generate_article_id()
-                    
-                    # Prüfe ob Artikel bereits existiert
-                    existing_article = None
-                    if article_data.get('supplier_article_number'):
-                        existing_article = Article.query.filter_by(
-                            supplier_article_number=article_data['supplier_article_number']
-                        ).first()
-                    
-                    if not existing_article and article_data.get('article_number'):
-                        existing_article = Article.query.filter_by(
-                            article_number=article_data['article_number']
-                        ).first()
-                    
-                    if existing_article:
-                        # Update bestehenden Artikel
-                        for field, value in article_data.items():
-                            if hasattr(existing_article, field):
-                                setattr(existing_article, field, value)
-                        existing_article.updated_at = datetime.utcnow()
-
-                        # *** NEU: Automatische Lieferantenzuordnung auch bei Update ***
-                        matched_supplier = existing_article.auto_assign_supplier()
-                        updated_count += 1
-                    else:
-                        # *** NEUE REPARATUR: Erstelle Marken und Kategorien automatisch ***
-                        brand_obj = self.create_or_get_brand(article_data.get('manufacturer'))
-                        category_obj = self.create_or_get_category(article_data.get('category'))
-                            
-                        article = Article(
-                            id=article_id,  # *** REPARATUR: ID explizit setzen ***
-                            article_number=article_data.get('article_number'),
-                            supplier_article_number=article_data.get('supplier_article_number'),
-                            name=article_data.get('name', 'Unbenannter Artikel'),
-                            product_type=article_data.get('product_type'),
-                            brand=article_data.get('manufacturer'),  # *** REPARATUR: manufacturer → brand ***
-                            brand_id=brand_obj.id if brand_obj else None,  # *** NEU: Foreign Key ***
-                            category=article_data.get('category'),  # String (legacy)
-                            category_id=category_obj.id if category_obj else None,  # *** NEU: Foreign Key ***
-                            manufacturer_number=article_data.get('manufacturer_number'),
-                            color=article_data.get('color'),
-                            size=article_data.get('size'),
-                            material=article_data.get('material'),
-                            units_per_carton=self._safe_int(article_data.get('units_per_carton')),
-                            purchase_price_single=self._safe_float(article_data.get('single_price')),
-                            purchase_price_carton=self._safe_float(article_data.get('carton_price')),
-                            purchase_price_10carton=self._safe_float(article_data.get('ten_carton_price')),
-                            description=article_data.get('description'),
-                            supplier='L-Shop',
-                            active=True,
-                            stock=0,
-                            min_stock=0,
-                            price=0,  # Wird später kalkuliert
-                            weight=0,
-                            created_by=current_user.username if current_user and current_user.is_authenticated else 'L-Shop Import',
-                            created_at=datetime.utcnow()
-                        )
-                        
-                        # Kalkuliere Preise falls EK-Preise vorhanden
-                        if article.purchase_price_single > 0:
-                            try:
-                                article.calculate_prices()
-                            except:
-                                # Fallback: Einfache Kalkulation
-                                article.price = article.purchase_price_single * 2.0
-                        
-                        db.session.add(article)
+            frame = self._mapped_frame(df, column_mapping)
+            valid = ~df.isna().all(axis=1) & (frame['supplier_article_number'].notna()
+                                                  | frame['name'].notna())
+            skipped_count = int((~valid).sum())
+            frame = frame[valid].copy()
+
+            # StitchAdmin-Artikelnummer: SA-<Lieferanten-Nr.> bzw. SA-<Datum>-<laufende Nr.>
+            missing = frame['article_number'].isna()
+            from_supplier = missing & frame['supplier_article_number'].notna()
+            frame.loc[from_supplier, 'article_number'] = 'SA-' + frame.loc[from_supplier, 'supplier_article_number']
+            generated = missing & ~from_supplier
+            date_str = datetime.now().strftime('%Y%m%d')
+            first_number = self._generated_numbers + 1
+            self._generated_numbers += int(generated.sum())
+            frame.loc[generated, 'article_number'] = [f"SA-{date_str}-{n:04d}"
+                                                      for n in range(first_number, self._generated_numbers + 1)]
+
+            # Gleicher Artikel mehrfach in der Datei: spaetere Werte gewinnen
+            rows_in_file = len(frame)
+            frame['_key'] = frame['supplier_article_number'].where(frame['supplier_article_number'].notna(),
+                                                                    frame['article_number'])
+            frame = frame.groupby('_key', sort=False).last()
+            frame = frame.groupby('article_number', sort=False, as_index=False).last()
+            duplicate_count = rows_in_file - len(frame)
+
+            # Vorhandene Artikel: zuerst Lieferanten-, dann StitchAdmin-Nummer
+            by_supplier = load_keys(Article.supplier_article_number, Article.id,
+                                    frame['supplier_article_number'].dropna())
+            by_number = load_keys(Article.article_number, Article.id, frame['article_number'])
+            existing_id = frame['supplier_article_number'].map(by_supplier)
+            existing_id = existing_id.where(existing_id.notna(), frame['article_number'].map(by_number))
+            is_existing = existing_id.notna()
+
+            # Update: nur gemappte, befuellte Felder, die es am Artikel gibt
+            columns = Article.__table__.c
+            update_fields = [f for f in column_mapping if column_mapping[f] and f in columns and f != 'id']
+            updates = []
+            now = datetime.utcnow()
+            if is_existing.any():
+                changed = frame.loc[is_existing, update_fields].copy()
+                for field in update_fields:
+                    if isinstance(columns[field].type, db.Integer):
+                        changed[field] = int_column(changed[field])
+                    elif isinstance(columns[field].type, db.Float):
+                        changed[field] = number_column(changed[field])
+                for article_id, values in zip(existing_id[is_existing], to_records(changed)):
+                    row = {k: v for k, v in values.items() if v is not None}
+                    row.update(id=article_id, updated_at=now)
+                    updates.append(row)
+
+            new = frame[~is_existing]
+            new_articles = self._new_article_frame(new, options, self._reserve_article_ids(len(new)))
+
+            tracker = ImportProgress(len(new_articles) + len(updates), progress)
+            imported_count = tracker.write(
+                to_records(new_articles),
+                lambda block: bulk_upsert(Article, block, ['id'], update_columns=[]), 'Artikel')
+            updated_count = tracker.write(updates, lambda block: bulk_update(Article, block), 'Artikel-Update')
 
-                        # *** NEU: Automatische Lieferantenzuordnung ***
-                        matched_supplier = article.auto_assign_supplier()
-                        imported_count += 1
-                    
-                    # Commit in Batches mit Fehlerbehandlung
-                    if (imported_count + updated_count) % 50 == 0:
-                        try:
-                            db.session.commit()
-                        except Exception as commit_error:
-                            db.session.rollback()
-                            error_count += 1
-                            error_msg = f"Batch-Commit Fehler bei Zeile {index+1}: {str(commit_error)}"
-                            errors.append(error_msg)
-                
-                except Exception as e:
-                    error_count += 1
-                    error_msg = f"Zeile {index+1}: {str(e)}"
-                    errors.append(error_msg)
-                    continue
-            
-            # Final commit
-            db.session.commit()
-            
             return {
                 'success': True,
                 'imported_count': imported_count,
-                'updated_count': updated_count,
+                'updated_count': updated_count + duplicate_count,
                 'skipped_count': skipped_count,
-                'error_count': error_count,
-                'errors': errors[:10],  # Nur erste 10 Fehler zeigen
-                'total_processed': len(self.df)
+                'error_count': tracker.error_count,
+                'errors': tracker.errors[:10],  # Nur erste 10 Fehler zeigen
+                'total_processed': len(df)
             }
-            
+
         except Exception as e:
             db.session.rollback()
             error_msg = f'Fehler beim Import: {e}'
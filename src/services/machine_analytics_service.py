@@ -4,56 +4,233 @@ Maschinen-Analytics Service
 =============================
 Auslastung, Kapazitaet und Performance-Metriken fuer Maschinen.
 
+Alle Kennzahlen laufen ueber den MachineCapacityIndex: Er laedt die
+ProductionSchedules und ProductionBlocks eines Zeitraums mit je einer
+Abfrage, sortiert sie pro Maschine in einen Intervall-Index und verteilt
+die Stunden in einem Durchlauf auf Tages-Buckets. Heatmap, Auslastung,
+Ueberbuchungen und aktuelle Auftraege werden daraus gelesen.
+
 Erstellt von Hans Hahn - Alle Rechte vorbehalten
 """
 
 import logging
-from datetime import datetime, date, timedelta
+from bisect import bisect_left, bisect_right
+from datetime import datetime, date, time, timedelta
 from collections import defaultdict
 
-from src.models import db, Machine, ProductionSchedule
+from sqlalchemy.orm import selectinload
+
+from src.models import db, Machine, ProductionSchedule, ProductionBlock
 
 logger = logging.getLogger(__name__)
 
+# Schedules, die Maschinenzeit belegen bzw. gerade laufen koennen
+BOOKED_STATUSES = ('scheduled', 'in_progress', 'completed')
+ACTIVE_STATUSES = ('scheduled', 'in_progress')
+
+# Block-Typen mit Maschinenbezug: Produktion belegt, Wartung sperrt die Maschine
+BOOKING_BLOCK_TYPES = ('production',)
+BLOCKING_BLOCK_TYPES = ('maintenance',)
+
+WEEKDAYS = 5  # Mo-Fr
+
+
+def _day_start(day):
+    return datetime.combine(day, time.min)
+
+
+class MachineCapacityIndex:
+    """
+    Intervall-Index fuer die Maschinenbelegung eines Zeitraums.
+
+    Pro Maschine liegen die Intervalle (Start, Ende, Art, Objekt) nach
+    Startzeit sortiert vor; Punktabfragen (laeuft gerade?) gehen per
+    Bisect ueber die Startzeiten. Beim Aufbau werden die Stunden jedes
+    Intervalls einmal auf die Tage des Zeitraums verteilt.
+
+    Arten: 'job' (Schedule oder Produktionsblock, belegt Kapazitaet),
+    'blocked' (Wartung, reduziert die verfuegbaren Stunden).
+    """
+
+    def __init__(self, start_date, end_date, schedules=(), blocks=(),
+                 work_hours_per_day=8):
+        self.start_date = start_date
+        self.end_date = end_date  # inklusive
+        self.work_hours_per_day = work_hours_per_day
+        self._range_start = _day_start(start_date)
+        self._range_end = _day_start(end_date + timedelta(days=1))
+
+        self._intervals = defaultdict(list)
+        self._days = defaultdict(dict)
+
+        for s in schedules:
+            machine_id = str(s.machine_id)
+            self._add(machine_id, s.scheduled_start, s.scheduled_end, 'job', ('schedule', s.id), s)
+            if s.actual_start and s.actual_end:
+                self._distribute(machine_id, s.actual_start, s.actual_end, 'actual_hours')
+
+        for b in blocks:
+            if b.block_type in BOOKING_BLOCK_TYPES:
+                kind = 'job'
+            elif b.block_type in BLOCKING_BLOCK_TYPES:
+                kind = 'blocked'
+            else:
+                continue
+            if b.is_all_day:
+                start, end = _day_start(b.start_date), _day_start(b.end_date + timedelta(days=1))
+            else:
+                start = datetime.combine(b.start_date, b.start_time)
+                end = datetime.combine(b.end_date, b.end_time)
+            self._add(str(b.machine_id), start, end, kind, ('block', b.id), b, all_day=b.is_all_day)
+
+        self._starts = {}
+        self._max_length = {}
+        for machine_id, intervals in self._intervals.items():
+            intervals.sort(key=lambda iv: iv[0])
+            self._starts[machine_id] = [iv[0] for iv in intervals]
+            self._max_length[machine_id] = max(iv[1] - iv[0] for iv in intervals)
+
+    @classmethod
+    def load(cls, start_date, end_date, work_hours_per_day=8):
+        """Laedt Schedules und Maschinen-Bloecke des Zeitraums (je eine Abfrage)"""
+        range_start = _day_start(start_date)
+        range_end = _day_start(end_date + timedelta(days=1))
+
+        schedules = ProductionSchedule.query.filter(
+            ProductionSchedule.status.in_(BOOKED_STATUSES),
+            ProductionSchedule.scheduled_start < range_end,
+            ProductionSchedule.scheduled_end > range_start,
+        ).all()
+
+        blocks = ProductionBlock.query.filter(
+            ProductionBlock.is_active == True,
+            ProductionBlock.machine_id.isnot(None),
+            ProductionBlock.block_type.in_(BOOKING_BLOCK_TYPES + BLOCKING_BLOCK_TYPES),
+            ProductionBlock.start_date <= end_date,
+            ProductionBlock.end_date >= start_date,
+        ).all()
+
+        return cls(start_date, end_date, schedules, blocks, work_hours_per_day)
+
+    # ------------------------------------------------------------------
+    # Aufbau
+    # ------------------------------------------------------------------
+
+    def _add(self, machine_id, start, end, kind, key, obj, all_day=False):
+        if not start or not end or end <= start:
+            return
+        self._intervals[machine_id].append((start, end, kind, obj))
+        field = 'scheduled_hours' if kind == 'job' else 'blocked_hours'
+        for day, hours in self._distribute(machine_id, start, end, field, all_day):
+            if kind == 'job':
+                self._days[machine_id][day]['jobs'].add(key)
+
+    def _distribute(self, machine_id, start, end, field, all_day=False):
+        """Verteilt ein Intervall auf die Tage des Zeitraums"""
+        start = max(start, self._range_start)
+        end = min(end, self._range_end)
+        touched = []
+        day = start.date()
+        while _day_start(day) < end:
+            day_start = _day_start(day)
+            hours = (min(end, day_start + timedelta(days=1)) - max(start, day_start)).total_seconds() / 3600
+            if all_day:
+                hours = min(hours, self.work_hours_per_day)
+            if hours > 0:
+                self._bucket(machine_id, day)[field] += hours
+                touched.append((day, hours))
+            day += timedelta(days=1)
+        return touched
+
+    def _bucket(self, machine_id, day):
+        days = self._days[machine_id]
+        if day not in days:
+            days[day] = {'scheduled_hours': 0.0, 'actual_hours': 0.0,
+                         'blocked_hours': 0.0, 'jobs': set()}
+        return days[day]
+
+    # ------------------------------------------------------------------
+    # Abfragen
+    # ------------------------------------------------------------------
+
+    def available_hours(self, machine_id, day):
+        """Verfuegbare Stunden eines Tages (Mo-Fr, abzueglich Wartung)"""
+        if day.weekday() >= WEEKDAYS:
+            return 0
+        blocked = self._days[str(machine_id)].get(day, {}).get('blocked_hours', 0)
+        return max(0, self.work_hours_per_day - blocked)
+
+    def day(self, machine_id, day):
+        """Tages-Bucket einer Maschine (leer, wenn nichts geplant ist)"""
+        bucket = self._days[str(machine_id)].get(day)
+        if bucket is None:
+            return {'scheduled_hours': 0.0, 'actual_hours': 0.0, 'blocked_hours': 0.0, 'jobs': set()}
+        return bucket
+
+    def days(self, machine_id, start_date, end_date):
+        """Tages-Buckets von start_date bis end_date (inklusive)"""
+        current = start_date
+        while current <= end_date:
+            yield current, self.day(machine_id, current)
+            current += timedelta(days=1)
+
+    def active_at(self, moment, kinds=('job',)):
+        """Alle Intervalle, die zum Zeitpunkt laufen: [(machine_id, start, end, kind, obj)]"""
+        result = []
+        for machine_id, intervals in self._intervals.items():
+            starts = self._starts[machine_id]
+            lo = bisect_left(starts, moment - self._max_length[machine_id])
+            hi = bisect_right(starts, moment)
+            for start, end, kind, obj in intervals[lo:hi]:
+                if kind in kinds and end >= moment:
+                    result.append((machine_id, start, end, kind, obj))
+        return result
+
+    def covers(self, moment):
+        return self._range_start <= moment < self._range_end
+
 
 class MachineAnalyticsService:
     """Berechnet Auslastung und Kapazitaet"""
 
     WORK_HOURS_PER_DAY = 8  # Standard-Arbeitstag
 
-    def get_machine_utilization(self, machine_id, start_date, end_date):
+    def build_index(self, start_date, end_date):
+        """Intervall-Index fuer einen Zeitraum (end_date inklusive)"""
+        if isinstance(start_date, datetime):
+            start_date = start_date.date()
+        if isinstance(end_date, datetime):
+            end_date = end_date.date()
+        return MachineCapacityIndex.load(start_date, end_date, self.WORK_HOURS_PER_DAY)
+
+    def _active_machines(self):
+        return Machine.query.filter_by(status='active').order_by(Machine.name).all()
+
+    def get_machine_utilization(self, machine_id, start_date, end_date, index=None):
         """
         Berechnet Auslastung einer Maschine in einem Zeitraum.
 
         Returns:
             Dict mit scheduled_hours, available_hours, utilization_pct
         """
-        schedules = ProductionSchedule.query.filter(
-            ProductionSchedule.machine_id == machine_id,
-            ProductionSchedule.status.in_(['scheduled', 'in_progress', 'completed']),
-            ProductionSchedule.scheduled_start < end_date,
-            ProductionSchedule.scheduled_end > start_date,
-        ).all()
+        if index is None:
+            index = self.build_index(start_date, end_date)
+        if isinstance(start_date, datetime):
+            start_date = start_date.date()
+        if isinstance(end_date, datetime):
+            end_date = end_date.date()
 
         scheduled_hours = 0
         actual_hours = 0
-
-        for s in schedules:
-            # Clip auf Zeitraum
-            s_start = max(s.scheduled_start, datetime.combine(start_date, datetime.min.time()))
-            s_end = min(s.scheduled_end, datetime.combine(end_date, datetime.max.time()))
-            hours = max(0, (s_end - s_start).total_seconds() / 3600)
-            scheduled_hours += hours
-
-            # Actual (falls vorhanden)
-            if s.actual_start and s.actual_end:
-                a_start = max(s.actual_start, datetime.combine(start_date, datetime.min.time()))
-                a_end = min(s.actual_end, datetime.combine(end_date, datetime.max.time()))
-                actual_hours += max(0, (a_end - a_start).total_seconds() / 3600)
-
-        # Arbeitstage im Zeitraum (Mo-Fr)
-        work_days = self._count_workdays(start_date, end_date)
-        available_hours = work_days * self.WORK_HOURS_PER_DAY
+        available_hours = 0
+        work_days = 0
+        for day, bucket in index.days(machine_id, start_date, end_date):
+            scheduled_hours += bucket['scheduled_hours']
+            actual_hours += bucket['actual_hours']
+            # Arbeitstage im Zeitraum (Mo-Fr, end_date exklusiv)
+            if day < end_date and day.weekday() < WEEKDAYS:
+                work_days += 1
+                available_hours += index.available_hours(machine_id, day)
 
         utilization = (scheduled_hours / available_hours * 100) if available_hours > 0 else 0
 
@@ -66,13 +243,16 @@ class MachineAnalyticsService:
             'work_days': work_days,
         }
 
-    def get_all_machines_utilization(self, start_date, end_date):
+    def get_all_machines_utilization(self, start_date, end_date, index=None, machines=None):
         """Auslastung aller aktiven Maschinen"""
-        machines = Machine.query.filter_by(status='active').order_by(Machine.name).all()
+        if machines is None:
+            machines = self._active_machines()
+        if index is None:
+            index = self.build_index(start_date, end_date)
         result = []
 
         for machine in machines:
-            util = self.get_machine_utilization(machine.id, start_date, end_date)
+            util = self.get_machine_utilization(machine.id, start_date, end_date, index=index)
             util['machine'] = machine
             result.append(util)
 
@@ -80,75 +260,97 @@ class MachineAnalyticsService:
         result.sort(key=lambda x: x['utilization_pct'], reverse=True)
         return result
 
-    def get_weekly_capacity(self, start_of_week):
+    def get_weekly_capacity(self, start_of_week, index=None, machines=None):
         """
         Kapazitaets-Heatmap fuer eine Woche (Mo-Fr).
 
         Returns:
             Dict {machine_id: {day_index: {scheduled_hours, available_hours, pct}}}
         """
-        machines = Machine.query.filter_by(status='active').order_by(Machine.name).all()
-        end_of_week = start_of_week + timedelta(days=5)
+        if machines is None:
+            machines = self._active_machines()
+        if index is None:
+            index = self.build_index(start_of_week, start_of_week + timedelta(days=WEEKDAYS - 1))
 
-        # Alle Schedules der Woche laden
-        schedules = ProductionSchedule.query.filter(
-            ProductionSchedule.status.in_(['scheduled', 'in_progress', 'completed']),
-            ProductionSchedule.scheduled_start < datetime.combine(end_of_week, datetime.max.time()),
-            ProductionSchedule.scheduled_end > datetime.combine(start_of_week, datetime.min.time()),
-        ).all()
-
-        # Pro Maschine & Tag aggregieren
         capacity = {}
         for machine in machines:
             days = {}
-            for day_offset in range(5):  # Mo-Fr
+            week_jobs = set()
+            for day_offset in range(WEEKDAYS):
                 day = start_of_week + timedelta(days=day_offset)
-                day_start = datetime.combine(day, datetime.min.time())
-                day_end = datetime.combine(day, datetime.max.time())
-
-                hours = 0
-                jobs = 0
-                for s in schedules:
-                    if str(s.machine_id) != str(machine.id):
-                        continue
-                    s_start = max(s.scheduled_start, day_start)
-                    s_end = min(s.scheduled_end, day_end)
-                    h = max(0, (s_end - s_start).total_seconds() / 3600)
-                    if h > 0:
-                        hours += h
-                        jobs += 1
-
-                pct = (hours / self.WORK_HOURS_PER_DAY * 100) if self.WORK_HOURS_PER_DAY > 0 else 0
+                bucket = index.day(machine.id, day)
+                hours = bucket['scheduled_hours']
+                available = index.available_hours(machine.id, day)
+                week_jobs |= bucket['jobs']
+
+                if available > 0:
+                    pct = hours / available * 100
+                else:
+                    pct = 100 if hours > 0 else 0
 
                 days[day_offset] = {
                     'date': day,
                     'scheduled_hours': round(hours, 1),
-                    'available_hours': self.WORK_HOURS_PER_DAY,
+                    'available_hours': round(available, 1),
+                    'blocked_hours': round(bucket['blocked_hours'], 1),
                     'pct': round(min(pct, 100), 1),
-                    'jobs': jobs,
-                    'overbooked': pct > 100,
+                    'jobs': len(bucket['jobs']),
+                    'overbooked': hours > available,
                 }
 
+            week_total = sum(d['scheduled_hours'] for d in days.values())
+            week_available = sum(d['available_hours'] for d in days.values())
             capacity[machine.id] = {
                 'machine': machine,
                 'days': days,
-                'week_total': round(sum(d['scheduled_hours'] for d in days.values()), 1),
-                'week_available': self.WORK_HOURS_PER_DAY * 5,
-                'week_pct': round(
-                    sum(d['scheduled_hours'] for d in days.values()) / (self.WORK_HOURS_PER_DAY * 5) * 100, 1
-                ) if self.WORK_HOURS_PER_DAY > 0 else 0,
+                'week_total': round(week_total, 1),
+                'week_available': round(week_available, 1),
+                'week_pct': round(week_total / week_available * 100, 1) if week_available > 0 else 0,
+                'week_jobs': len(week_jobs),
             }
 
         return capacity
 
-    def get_current_jobs(self):
+    def get_capacity_weeks(self, first_week_start, weeks=4):
+        """
+        Kapazitaet mehrerer Wochen mit einem Index (Batch fuer den Kalender).
+
+        Returns:
+            Liste von Dicts {week_start, week_end, machines} mit machines im
+            Format von get_weekly_capacity
+        """
+        first_week_start = first_week_start - timedelta(days=first_week_start.weekday())
+        last_day = first_week_start + timedelta(weeks=weeks - 1, days=WEEKDAYS - 1)
+        machines = self._active_machines()
+        index = self.build_index(first_week_start, last_day)
+
+        result = []
+        for week in range(weeks):
+            week_start = first_week_start + timedelta(weeks=week)
+            result.append({
+                'week_start': week_start,
+                'week_end': week_start + timedelta(days=WEEKDAYS - 1),
+                'machines': self.get_weekly_capacity(week_start, index=index, machines=machines),
+            })
+        return result
+
+    def get_current_jobs(self, index=None):
         """Aktuelle Auftraege auf Maschinen"""
         now = datetime.utcnow()
-        active = ProductionSchedule.query.filter(
-            ProductionSchedule.status.in_(['scheduled', 'in_progress']),
-            ProductionSchedule.scheduled_start <= now,
-            ProductionSchedule.scheduled_end >= now,
-        ).all()
+        if index is not None and index.covers(now):
+            active = [obj for _, _, _, _, obj in index.active_at(now)
+                      if isinstance(obj, ProductionSchedule) and obj.status in ACTIVE_STATUSES]
+        else:
+            active = ProductionSchedule.query.filter(
+                ProductionSchedule.status.in_(ACTIVE_STATUSES),
+                ProductionSchedule.scheduled_start <= now,
+                ProductionSchedule.scheduled_end >= now,
+            ).all()
+        active.sort(key=lambda s: s.scheduled_start)
+
+        # Maschinen in einer Abfrage laden
+        machine_ids = {s.machine_id for s in active}
+        machines = {m.id: m for m in Machine.query.filter(Machine.id.in_(machine_ids))} if machine_ids else {}
 
         result = []
         for s in active:
@@ -158,7 +360,7 @@ class MachineAnalyticsService:
 
             result.append({
                 'schedule': s,
-                'machine': Machine.query.get(s.machine_id),
+                'machine': machines.get(s.machine_id),
                 'progress_pct': round(min(progress, 100), 1),
                 'elapsed_hours': round(elapsed, 1),
                 'total_hours': round(total, 1),
@@ -170,7 +372,10 @@ class MachineAnalyticsService:
     def get_queue_by_machine(self):
         """Warteschlange pro Maschine"""
         now = datetime.utcnow()
-        upcoming = ProductionSchedule.query.filter(
+        upcoming = ProductionSchedule.query.options(
+            selectinload(ProductionSchedule.machine),
+            selectinload(ProductionSchedule.order),
+        ).filter(
             ProductionSchedule.status == 'scheduled',
             ProductionSchedule.scheduled_start > now,
         ).order_by(ProductionSchedule.scheduled_start).all()
@@ -181,37 +386,29 @@ class MachineAnalyticsService:
 
         return dict(queues)
 
-    def get_summary_stats(self):
+    def get_summary_stats(self, index=None, machines=None, current_jobs=None, queues=None):
         """Gesamtstatistiken"""
         today = date.today()
         week_start = today - timedelta(days=today.weekday())
         week_end = week_start + timedelta(days=5)
-        month_start = today.replace(day=1)
 
-        machines = Machine.query.filter_by(status='active').all()
+        if machines is None:
+            machines = self._active_machines()
+        if index is None:
+            index = self.build_index(week_start, week_end)
+        if current_jobs is None:
+            current_jobs = self.get_current_jobs(index=index)
+        if queues is None:
+            queues = self.get_queue_by_machine()
 
         # Diese Woche
-        week_util = []
-        for m in machines:
-            u = self.get_machine_utilization(m.id, week_start, week_end)
-            week_util.append(u['utilization_pct'])
-
-        # Heute aktive Jobs
-        now = datetime.utcnow()
-        active_jobs = ProductionSchedule.query.filter(
-            ProductionSchedule.status.in_(['scheduled', 'in_progress']),
-            ProductionSchedule.scheduled_start <= now,
-            ProductionSchedule.scheduled_end >= now,
-        ).count()
-
-        # Anstehende Jobs
-        pending_jobs = ProductionSchedule.query.filter(
-            ProductionSchedule.status == 'scheduled',
-            ProductionSchedule.scheduled_start > now,
-        ).count()
+        week_util = [
+            self.get_machine_utilization(m.id, week_start, week_end, index=index)['utilization_pct']
+            for m in machines
+        ]
 
         # Ueberbuchungen diese Woche
-        capacity = self.get_weekly_capacity(week_start)
+        capacity = self.get_weekly_capacity(week_start, index=index, machines=machines)
         overbooked = sum(
             1 for mc in capacity.values()
             for d in mc['days'].values()
@@ -223,11 +420,41 @@ class MachineAnalyticsService:
             'avg_utilization': round(sum(week_util) / len(week_util), 1) if week_util else 0,
             'max_utilization': round(max(week_util), 1) if week_util else 0,
             'min_utilization': round(min(week_util), 1) if week_util else 0,
-            'active_jobs': active_jobs,
-            'pending_jobs': pending_jobs,
+            'active_jobs': len(current_jobs),
+            'pending_jobs': sum(len(jobs) for jobs in queues.values()),
             'overbooked_slots': overbooked,
         }
 
+    def get_capacity_overview(self, week_start):
+        """
+        Alle Daten des Kapazitaets-Dashboards: ein Index fuer die angezeigte
+        Woche (Mo-Sa), ein zweiter nur, wenn die Kennzahlen eine andere
+        Woche betreffen.
+        """
+        today = date.today()
+        current_week = today - timedelta(days=today.weekday())
+        week_end = week_start + timedelta(days=5)
+
+        machines = self._active_machines()
+        index = self.build_index(week_start, week_end)
+        if week_start == current_week:
+            current_index = index
+        else:
+            current_index = self.build_index(current_week, current_week + timedelta(days=5))
+
+        current_jobs = self.get_current_jobs(index=current_index)
+        queues = self.get_queue_by_machine()
+
+        return {
+            'stats': self.get_summary_stats(index=current_index, machines=machines,
+                                            current_jobs=current_jobs, queues=queues),
+            'capacity': self.get_weekly_capacity(week_start, index=index, machines=machines),
+            'current_jobs': current_jobs,
+            'utilization': self.get_all_machines_utilization(week_start, week_end,
+                                                             index=index, machines=machines),
+            'queues': queues,
+        }
+
     def _count_workdays(self, start_date, end_date):
         """Zaehlt Arbeitstage (Mo-Fr) im Zeitraum"""
         if isinstance(start_date, datetime):
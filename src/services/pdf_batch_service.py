@@ -0,0 +1,512 @@
+# -*- coding: utf-8 -*-
+"""
+PDF-BATCH - PARALLELES RENDERN VIELER DOKUMENTE
+===============================================
+Sammelrechnungen, Packlisten, Lieferscheine und der Monatsabschluss
+brauchen oft Hunderte PDFs. Statt jedes Dokument in einem eigenen
+HTTP-Request zu rendern (und dabei einen Gunicorn-Worker zu blockieren),
+nimmt ein Batch eine Liste von IDs, rendert in einem Prozess-Pool und
+liefert ein zusammengefuegtes PDF (Druck) oder ein ZIP (Versand, ZUGFeRD
+bleibt je Datei erhalten).
+
+Ablauf:
+1. Hauptprozess (App-Kontext): Dokumente laden und Daten aufbereiten
+   (Datenbank, CompanySettings, Logo-Pfad). Rechnungen, die schon im
+   PDF-Store liegen, werden nicht neu gerendert.
+2. Worker-Prozesse: nur ReportLab/pikepdf auf reinen Daten-Dicts. Das ist
+   CPU-Arbeit unter dem GIL - deshalb Prozesse statt Threads.
+3. Hauptprozess: finalisierte Rechnungen im PDF-Store ablegen, Ergebnis
+   zusammenfuegen bzw. zippen.
+
+Die Worker werden per forkserver gestartet (PDF_BATCH_WORKERS, Standard:
+bis zu 4) - nicht per fork, weil der Batch in einem Thread der Job-Queue
+laeuft. Ohne forkserver (Windows-Installer) oder mit workers=1 wird im
+Prozess gerendert.
+
+Im Web laeuft ein Batch als Job 'pdf_batch' der Job-Queue: Fortschritt
+und Ergebnis stehen in background_jobs, die Datei unter PDF_BATCH_DIR
+(Standard instance/pdf_batches) als <job-id>.pdf/.zip - damit sieht jeder
+Gunicorn-Worker denselben Stand.
+
+Nutzung:
+    job, created = enqueue('pdf_batch', {'kind': 'rechnung', 'ids': [1, 2, 3], 'output': 'zip'})
+    batch_status(get_job(job.id))
+
+    result = render_batch('packliste', ids, output='pdf')       # synchron
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import io
+import os
+import time
+import atexit
+import hashlib
+import logging
+import zipfile
+import tempfile
+import threading
+import multiprocessing
+from datetime import datetime, date, timedelta
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+OUTPUTS = ('pdf', 'zip')
+MAX_DOCUMENTS = 2000
+BATCH_TTL = timedelta(hours=24)  # Ergebnisdateien so lange abrufbar
+PROGRESS_INTERVAL = 0.5  # Sekunden zwischen Fortschritts-Updates in background_jobs
+
+BatchKind = namedtuple('BatchKind', ['label', 'load', 'payload', 'renderer', 'variant', 'filename'])
+BatchResult = namedtuple('BatchResult', ['data', 'filename', 'mimetype', 'count', 'rendered',
+                                         'from_store', 'failed', 'seconds'])
+
+
+# ==========================================
+# WORKER (ohne Datenbank, ohne App-Kontext)
+# ==========================================
+
+_worker_pdf_service = None
+
+
+def _pdf_service():
+    """Eine PDFService-Instanz pro Prozess (Styles nur einmal aufbauen)"""
+    global _worker_pdf_service
+    if _worker_pdf_service is None:
+        from src.services.pdf_service import PDFService
+        _worker_pdf_service = PDFService()
+    return _worker_pdf_service
+
+
+def _render_invoice(payload):
+    return _pdf_service().create_invoice_pdf(payload)
+
+
+def _render_invoice_zugferd(payload):
+    from src.services.zugpferd_service import ZugpferdService
+    invoice_data, profil_urn = payload
+    return ZugpferdService().render_invoice(invoice_data, profil_urn, _pdf_service())
+
+
+def _render_packing_list(payload):
+    return _pdf_service().create_packing_list_pdf(payload)
+
+
+def _render_delivery_note(payload):
+    return _pdf_service().create_delivery_note_pdf(payload)
+
+
+RENDERERS = {
+    'invoice': _render_invoice,
+    'invoice_zugferd': _render_invoice_zugferd,
+    'packing_list': _render_packing_list,
+    'delivery_note': _render_delivery_note,
+}
+
+
+def _render_job(renderer, payload):
+    """Ein Dokument rendern: (PDF-Bytes, Renderzeit in ms)"""
+    start = time.perf_counter()
+    data = RENDERERS[renderer](payload)
+    return data, (time.perf_counter() - start) * 1000
+
+
+# ==========================================
+# PROZESS-POOL
+# ==========================================
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def default_workers():
+    """Worker-Anzahl aus PDF_BATCH_WORKERS, sonst bis zu 4 (CPU-Kerne)"""
+    if has_app_context() and current_app.config.get('PDF_BATCH_WORKERS'):
+        return int(current_app.config['PDF_BATCH_WORKERS'])
+    return min(4, os.cpu_count() or 1)
+
+
+def _get_pool(workers):
+    """Gemeinsamer Pool pro Prozess (None = im Prozess rendern)"""
+    global _pool, _pool_workers
+    if workers <= 1 or 'forkserver' not in multiprocessing.get_all_start_methods():
+        return None
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers,
+                                        mp_context=multiprocessing.get_context('forkserver'))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    """Worker-Prozesse beenden (beim Prozessende automatisch)"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _pool_workers = None, 0
+
+
+atexit.register(shutdown_pool)
+
+
+def render_many(jobs, workers=None, progress=None):
+    """
+    Rendert viele Dokumente, bei workers > 1 parallel.
+
+    Args:
+        jobs: Liste von (renderer, payload), renderer aus RENDERERS
+        workers: Anzahl Prozesse (Standard: default_workers())
+        progress: optional callback(erledigt, gesamt)
+
+    Returns:
+        Liste in Reihenfolge der Jobs: (PDF-Bytes, ms) oder die Exception
+    """
+    workers = workers or default_workers()
+    total = len(jobs)
+    results = [None] * total
+    pool = _get_pool(workers) if total > 1 else None
+
+    if pool is not None:
+        try:
+            futures = {pool.submit(_render_job, renderer, payload): index
+                       for index, (renderer, payload) in enumerate(jobs)}
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    results[futures[future]] = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    results[futures[future]] = e
+                if progress:
+                    progress(done, total)
+            return results
+        except BrokenProcessPool as e:
+            # Worker abgestuerzt: Pool verwerfen, Rest im Prozess rendern
+            logger.error(f"PDF-Batch: Prozess-Pool ausgefallen, rendere im Prozess weiter: {e}")
+            shutdown_pool()
+
+    done = sum(1 for r in results if r is not None)
+    for index, (renderer, payload) in enumerate(jobs):
+        if results[index] is not None:
+            continue
+        try:
+            results[index] = _render_job(renderer, payload)
+        except Exception as e:
+            results[index] = e
+        done += 1
+        if progress:
+            progress(done, total)
+    return results
+
+
+# ==========================================
+# DOKUMENTARTEN (Hauptprozess, App-Kontext)
+# ==========================================
+
+def _load_rechnungen(ids):
+    from sqlalchemy.orm import joinedload
+    from src.models.rechnungsmodul.models import Rechnung
+    return Rechnung.query.options(joinedload(Rechnung.kunde)).filter(Rechnung.id.in_(ids)).all()
+
+
+def _load_packlisten(ids):
+    from src.models.packing_list import PackingList
+    return PackingList.query.filter(PackingList.id.in_(ids)).all()
+
+
+def _load_lieferscheine(ids):
+    from src.models.delivery_note import DeliveryNote
+    return DeliveryNote.query.filter(DeliveryNote.id.in_(ids)).all()
+
+
+def _invoice_data(rechnung):
+    from src.services.pdf_service import PDFService
+    from src.services.zugpferd_service import ZugpferdService
+    invoice_data = ZugpferdService()._convert_rechnung_to_invoice_data(rechnung)
+    # Logo hier aufloesen - der Worker hat keine CompanySettings
+    invoice_data['logo_path'] = PDFService.resolve_logo_path(invoice_data)
+    return invoice_data
+
+
+def _invoice_zugferd_payload(rechnung):
+    from src.services.zugpferd_service import ZugpferdService
+    return _invoice_data(rechnung), ZugpferdService().profile_urn_for(rechnung)
+
+
+def _packing_list_payload(packing_list):
+    from src.utils.pdf_workflow_helpers import build_packing_list_pdf_data
+    return build_packing_list_pdf_data(packing_list)
+
+
+def _delivery_note_payload(delivery_note):
+    from src.utils.pdf_workflow_helpers import build_delivery_note_pdf_data
+    return build_delivery_note_pdf_data(delivery_note)
+
+
+KINDS = {
+    'rechnung': BatchKind('Rechnungen', _load_rechnungen, _invoice_data, 'invoice',
+                          'rechnungsmodul_pdf', lambda r: f'{r.rechnungsnummer}.pdf'),
+    'rechnung_zugferd': BatchKind('Rechnungen (ZUGFeRD)', _load_rechnungen, _invoice_zugferd_payload,
+                                  'invoice_zugferd', 'rechnungsmodul_zugferd',
+                                  lambda r: f'{r.rechnungsnummer}_ZUGFeRD.pdf'),
+    'packliste': BatchKind('Packlisten', _load_packlisten, _packing_list_payload, 'packing_list',
+                           None, lambda p: f'packliste_{p.packing_list_number}.pdf'),
+    'lieferschein': BatchKind('Lieferscheine', _load_lieferscheine, _delivery_note_payload,
+                              'delivery_note', None, lambda d: f'lieferschein_{d.delivery_note_number}.pdf'),
+}
+
+
+def invoice_ids_for_month(year, month):
+    """IDs aller finalisierten Ausgangsrechnungen eines Monats (Monatsabschluss)"""
+    from src.models.rechnungsmodul.models import Rechnung, RechnungsStatus, RechnungsRichtung
+    first = date(year, month, 1)
+    last = date(year + (month == 12), month % 12 + 1, 1)
+    rows = Rechnung.query.with_entities(Rechnung.id).filter(
+        Rechnung.rechnungsdatum >= first,
+        Rechnung.rechnungsdatum < last,
+        Rechnung.richtung == RechnungsRichtung.AUSGANG,
+        Rechnung.status != RechnungsStatus.ENTWURF,
+    ).order_by(Rechnung.rechnungsnummer).all()
+    return [row.id for row in rows]
+
+
+# ==========================================
+# ZUSAMMENFUEHREN
+# ==========================================
+
+def merge_pdfs(pdfs):
+    """Mehrere PDFs zu einem Dokument (fuer den Druck)"""
+    from PyPDF2 import PdfWriter
+    writer = PdfWriter()
+    for data in pdfs:
+        writer.append(io.BytesIO(data))
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def zip_pdfs(files):
+    """(Dateiname, PDF-Bytes) als ZIP - PDFs sind schon komprimiert, daher ZIP_STORED"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zf:
+        for filename, data in files:
+            zf.writestr(filename, data)
+    return buffer.getvalue()
+
+
+# ==========================================
+# BATCH (synchron)
+# ==========================================
+
+def render_batch(kind, ids, output='pdf', workers=None, progress=None):
+    """
+    Rendert alle Dokumente einer Art und fuegt sie zusammen.
+
+    Args:
+        kind: Schluessel aus KINDS
+        ids: Dokument-IDs (Reihenfolge bleibt erhalten)
+        output: 'pdf' (zusammengefuegt) oder 'zip' (eine Datei je Dokument)
+        workers: Anzahl Prozesse (Standard: PDF_BATCH_WORKERS)
+        progress: optional callback(erledigt, gesamt)
+
+    Returns:
+        BatchResult; failed = Liste von (id, Fehlertext)
+    """
+    from src.services.pdf_store_service import lookup_pdf, remember_pdf
+
+    if kind not in KINDS:
+        raise ValueError(f'Unbekannte Dokumentart: {kind}')
+    if output not in OUTPUTS:
+        raise ValueError(f'Unbekanntes Ausgabeformat: {output}')
+
+    spec = KINDS[kind]
+    started = time.perf_counter()
+    ids = list(OrderedDict.fromkeys(ids))
+    documents = {doc.id: doc for doc in spec.load(ids)} if ids else {}
+
+    failed = []
+    entries = []   # [dokument, dateiname, bytes oder None]
+    jobs = []      # (index in entries, renderer, payload)
+    for doc_id in ids:
+        document = documents.get(doc_id)
+        if document is None:
+            failed.append((doc_id, 'nicht gefunden'))
+            continue
+        stored = lookup_pdf(document, spec.variant) if spec.variant else None
+        if stored is None:
+            try:
+                jobs.append((len(entries), spec.renderer, spec.payload(document)))
+            except Exception as e:
+                logger.warning(f"PDF-Batch: Daten fuer {kind} {doc_id} nicht aufbereitet: {e}")
+                failed.append((doc_id, str(e)))
+                continue
+        entries.append([document, spec.filename(document), stored.data if stored else None])
+
+    from_store = len(entries) - len(jobs)
+    offset = from_store
+
+    def _progress(done, total):
+        if progress:
+            progress(offset + done, offset + total)
+
+    if progress:
+        progress(from_store, len(entries))
+
+    results = render_many([(renderer, payload) for _, renderer, payload in jobs], workers, _progress)
+    rendered = 0
+    for (index, _, _), result in zip(jobs, results):
+        document = entries[index][0]
+        if isinstance(result, Exception):
+            logger.warning(f"PDF-Batch: {kind} {document.id} nicht gerendert: {result}")
+            failed.append((document.id, str(result)))
+            continue
+        data, render_ms = result
+        if spec.variant:
+            remember_pdf(document, spec.variant, data, render_ms)
+        entries[index][2] = data
+        rendered += 1
+
+    files = [(filename, data) for _, filename, data in entries if data is not None]
+    stamp = datetime.now().strftime('%Y%m%d_%H%M')
+    if not files:
+        data, filename, mimetype = None, None, None
+    elif output == 'zip':
+        data, filename, mimetype = zip_pdfs(files), f'{kind}_{stamp}.zip', 'application/zip'
+    else:
+        data = files[0][1] if len(files) == 1 else merge_pdfs([pdf for _, pdf in files])
+        filename, mimetype = f'{kind}_{stamp}.pdf', 'application/pdf'
+
+    seconds = time.perf_counter() - started
+    logger.info(f"PDF-Batch {kind}: {len(files)} Dokumente in {seconds:.1f}s "
+                f"({rendered} gerendert, {from_store} aus dem Store, {len(failed)} Fehler)")
+    return BatchResult(data, filename, mimetype, len(files), rendered, from_store, failed, seconds)
+
+
+# ==========================================
+# BATCH ALS JOB DER JOB-QUEUE
+# ==========================================
+
+def validate_batch(kind, ids, output):
+    """Parameter vor dem Einreihen pruefen (ValueError mit Meldung fuer den Nutzer)"""
+    if kind not in KINDS:
+        raise ValueError(f'Unbekannte Dokumentart: {kind}')
+    if output not in OUTPUTS:
+        raise ValueError(f'Unbekanntes Ausgabeformat: {output}')
+    if not ids:
+        raise ValueError('Keine Dokumente ausgewaehlt')
+    if len(ids) > MAX_DOCUMENTS:
+        raise ValueError(f'Maximal {MAX_DOCUMENTS} Dokumente pro Batch')
+
+
+def batch_dedup_key(kind, ids, output):
+    """Gleicher Batch (Doppelklick) -> derselbe offene Job"""
+    digest = hashlib.sha1(','.join(str(doc_id) for doc_id in ids).encode()).hexdigest()[:16]
+    return f'pdf_batch:{kind}:{output}:{digest}'
+
+
+def batch_dir():
+    """Gemeinsames Verzeichnis der Ergebnisdateien (alle Gunicorn-Worker)"""
+    path = current_app.config.get('PDF_BATCH_DIR') or os.path.join(current_app.instance_path, 'pdf_batches')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def result_path(job):
+    """Ergebnisdatei eines Batch-Jobs (None, solange keine existiert)"""
+    filename = (job.result or {}).get('datei')
+    if job.status != 'succeeded' or not filename:
+        return None
+    path = os.path.join(batch_dir(), filename)
+    return path if os.path.exists(path) else None
+
+
+def _cleanup(directory):
+    """Ergebnisdateien aelter als BATCH_TTL entfernen"""
+    limit = time.time() - BATCH_TTL.total_seconds()
+    for entry in os.scandir(directory):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < limit:
+                os.unlink(entry.path)
+        except OSError as e:
+            logger.warning(f"PDF-Batch-Datei nicht geloescht ({entry.path}): {e}")
+
+
+def run_batch_job(kind, ids, output='pdf'):
+    """
+    Job-Queue: Batch rendern und als <job-id>.<output> unter batch_dir()
+    ablegen. Der Fortschritt landet per report_progress in background_jobs.
+    """
+    from src.services.job_queue_service import current_job_id, report_progress
+
+    directory = batch_dir()
+    _cleanup(directory)
+    last_report = [0.0]
+
+    def _progress(done, total):
+        now = time.monotonic()
+        if done >= total or now - last_report[0] >= PROGRESS_INTERVAL:
+            report_progress(done, total, own_transaction=True)
+            last_report[0] = now
+
+    result = render_batch(kind, ids, output, progress=_progress)
+    failed = [{'id': doc_id, 'error': error} for doc_id, error in result.failed]
+    if result.data is None:
+        raise RuntimeError(f'Kein Dokument gerendert ({len(failed)} Fehler)')
+
+    filename = f'{current_job_id() or datetime.now().strftime("%Y%m%d%H%M%S")}.{output}'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(result.data)
+        os.replace(tmp_path, os.path.join(directory, filename))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    return {
+        'datei': filename,
+        'filename': result.filename,
+        'mimetype': result.mimetype,
+        'count': result.count,
+        'rendered': result.rendered,
+        'from_store': result.from_store,
+        'failed': failed,
+        'seconds': round(result.seconds, 2),
+    }
+
+
+def batch_status(job):
+    """Status eines Batch-Jobs als Dict (JSON fuer das Polling)"""
+    payload = job.payload or {}
+    result = job.result or {}
+    progress = job.progress or {}
+    total = progress.get('total', len(payload.get('ids') or []))
+    done = total if job.status == 'succeeded' else progress.get('done', 0)
+    seconds = result.get('seconds')
+    return {
+        'id': job.id,
+        'kind': payload.get('kind'),
+        'output': payload.get('output'),
+        'status': job.status,
+        'finished': not job.is_active,
+        'done': done,
+        'total': total,
+        'percent': round(done / total * 100, 1) if total else 100.0,
+        'rendered': result.get('rendered'),
+        'from_store': result.get('from_store'),
+        'failed': result.get('failed', []),
+        'error': job.error,
+        'seconds': seconds,
+        'docs_per_second': round(result['count'] / seconds, 1) if seconds else None,
+        'filename': result.get('filename'),
+    }
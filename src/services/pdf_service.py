@@ -153,6 +153,39 @@ class PDFService:
             logger.error(f"Fehler bei PDF-Erstellung: {str(e)}")
             return self._create_fallback_pdf()
             
+    @staticmethod
+    def resolve_logo_path(invoice_data: Dict) -> Optional[str]:
+        """
+        Logo-Datei für den Rechnungskopf. Mit App-Kontext aus den
+        CompanySettings, sonst (Worker-Prozess) nur invoice_data['logo_path'].
+        """
+        from flask import has_app_context
+
+        if has_app_context():
+            from flask import current_app
+            from src.models.company_settings import CompanySettings
+            settings = CompanySettings.get_settings()
+            if not settings or not settings.logo_path:
+                return None
+            candidates = [
+                # 1. UPLOAD_FOLDER (data/uploads) - wo Dateien tatsächlich gespeichert sind
+                os.path.join(current_app.config.get('UPLOAD_FOLDER', ''), settings.logo_path),
+                # 2. UPLOAD_FOLDER ohne Prefix "uploads/"
+                os.path.join(current_app.config.get('UPLOAD_FOLDER', ''),
+                             settings.logo_path.replace('uploads/', '', 1)),
+                # 3. static_folder (alter Pfad)
+                os.path.join(current_app.static_folder, settings.logo_path),
+                # 4. Absoluter Pfad aus invoice_data
+                str(invoice_data.get('logo_path', '') or ''),
+            ]
+        else:
+            candidates = [str(invoice_data.get('logo_path', '') or '')]
+
+        for candidate in candidates:
+            if candidate and os.path.exists(candidate):
+                return candidate
+        return None
+
     def _create_header(self, invoice_data: Dict) -> List:
         """Erstelle Kopfbereich - DIN 5008: Logo links, Firmendaten rechts (wie Angebot)"""
         elements = []
@@ -162,31 +195,15 @@ class PDFService:
         # Logo laden: prüfe mehrere mögliche Pfade
         logo_img = None
         try:
-            from flask import current_app
-            from src.models.company_settings import CompanySettings
-            settings = CompanySettings.get_settings()
-            if settings and settings.logo_path:
-                candidates = [
-                    # 1. UPLOAD_FOLDER (data/uploads) - wo Dateien tatsächlich gespeichert sind
-                    os.path.join(current_app.config.get('UPLOAD_FOLDER', ''), settings.logo_path),
-                    # 2. UPLOAD_FOLDER ohne Prefix "uploads/"
-                    os.path.join(current_app.config.get('UPLOAD_FOLDER', ''),
-                                 settings.logo_path.replace('uploads/', '', 1)),
-                    # 3. static_folder (alter Pfad)
-                    os.path.join(current_app.static_folder, settings.logo_path),
-                    # 4. Absoluter Pfad aus invoice_data
-                    str(invoice_data.get('logo_path', '') or ''),
-                ]
-                for candidate in candidates:
-                    if candidate and os.path.exists(candidate):
-                        # Proportional skalieren (max 55mm breit, max 25mm hoch)
-                        from reportlab.lib.utils import ImageReader
-                        ir = ImageReader(candidate)
-                        img_w, img_h = ir.getSize()
-                        max_w, max_h = 55*mm, 25*mm
-                        scale = min(max_w / img_w, max_h / img_h)
-                        logo_img = Image(candidate, width=img_w * scale, height=img_h * scale)
-                        break
+            candidate = self.resolve_logo_path(invoice_data)
+            if candidate:
+                # Proportional skalieren (max 55mm breit, max 25mm hoch)
+                from reportlab.lib.utils import ImageReader
+                ir = ImageReader(candidate)
+                img_w, img_h = ir.getSize()
+                max_w, max_h = 55*mm, 25*mm
+                scale = min(max_w / img_w, max_h / img_h)
+                logo_img = Image(candidate, width=img_w * scale, height=img_h * scale)
         except Exception as e:
             logger.debug(f"Logo-Laden fehlgeschlagen: {e}")
 
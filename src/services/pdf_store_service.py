@@ -0,0 +1,471 @@
+# -*- coding: utf-8 -*-
+"""
+PDF-STORE FUER FINALISIERTE DOKUMENTE
+=====================================
+Rechnungen, Lieferscheine und Angebote aendern sich nach der
+Finalisierung nicht mehr (GoBD). Ihr PDF wird deshalb einmal gerendert
+(ReportLab, Girocode, ZUGFeRD-XML, PDF/A-3) und danach aus dem Store
+ausgeliefert - mit ETag, sodass der Browser bei erneutem Oeffnen nur
+noch ein 304 bekommt.
+
+Schluessel: Dokument (Tabelle + ID) + Variante + Revision (Hash der
+Dokument-Spalten) + Template-Version. Die Bytes liegen inhaltsadressiert unter
+<PDF_STORE_DIR>/<sha[:2]>/<sha>.pdf (Standard: instance/pdf_store), die
+Zuordnung in der Tabelle pdf_artifacts.
+
+- Entwuerfe werden nie gespeichert, sondern immer neu gerendert.
+- Aendert sich ein Entwurf oder eine Position eines Dokuments, werden
+  seine Eintraege beim Flush entfernt (Session-Events).
+- Aendert sich die Darstellung einer Variante, die Version in
+  TEMPLATE_VERSIONS erhoehen - alte Eintraege werden nicht mehr gelesen.
+
+Nutzung:
+    from src.services.pdf_store_service import pdf_response
+    return pdf_response(rechnung, 'rechnung_zugferd',
+                        lambda: pdf_service.generate_rechnung_pdf(rechnung),
+                        download_name='RE-2025-0001.pdf', as_attachment=True)
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import io
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import namedtuple
+
+import sqlalchemy as sa
+from flask import current_app, has_app_context, request, send_file
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.models.models import db
+from src.models.pdf_artifact import PdfArtifact
+
+logger = logging.getLogger(__name__)
+
+# Variante -> Version der Darstellung
+TEMPLATE_VERSIONS = {
+    'rechnung_zugferd': 1,         # DocumentPDFService.generate_rechnung_pdf(with_zugpferd=True)
+    'rechnung_basis': 1,           # DocumentPDFService.generate_rechnung_pdf(with_zugpferd=False)
+    'dokument': 1,                 # DocumentPDFService.generate_document_pdf
+    'lieferschein': 1,             # lieferscheine_controller.generiere_lieferschein_pdf
+    'angebot': 1,                  # angebote_workflow_controller.generiere_angebot_pdf
+    'rechnungsmodul_pdf': 1,       # PDFService.create_invoice_pdf (Rechnungsmodul)
+    'rechnungsmodul_zugferd': 1,   # ZugpferdService.create_invoice_from_rechnung
+}
+
+# Dokument-Tabelle -> Spalten, die nicht in die Revision eingehen
+# (PDF-Ablage, Versand, Bearbeitungsvermerke, interne Notizen)
+_REVISION_EXCLUDE = {
+    'business_documents': {
+        'pdf_pfad', 'pdf_erstellt_am', 'pdf_hash', 'geaendert_am', 'geaendert_von',
+        'versendet_am', 'versendet_per', 'versendet_an', 'interne_notiz',
+    },
+    'rechnungen': {
+        'pdf_datei', 'xml_datei', 'zugpferd_xml', 'bearbeitet_am', 'bearbeitet_von',
+        'versendet_am', 'versendet_von', 'versand_email', 'interne_notizen',
+    },
+}
+
+# Positions-Tabelle -> Fremdschluessel auf das Dokument
+_POSITION_PARENTS = {
+    'document_positions': ('business_documents', 'dokument_id'),
+    'rechnungs_positionen': ('rechnungen', 'rechnung_id'),
+}
+
+StoredPdf = namedtuple('StoredPdf', ['data', 'etag', 'from_store', 'finalized'])
+
+_lock = threading.Lock()
+_stats = {
+    'hits': 0,
+    'not_modified': 0,    # Treffer, beantwortet mit 304
+    'misses': 0,
+    'stores': 0,
+    'drafts': 0,          # Entwurf, nicht gespeichert
+    'bypassed': 0,        # kein Store-Verzeichnis / kein App-Kontext
+    'errors': 0,
+    'render_ms': 0.0,     # Renderzeit bei Fehlzugriffen/Entwuerfen
+    'saved_ms': 0.0,      # eingesparte Renderzeit (Treffer x gespeicherte Renderzeit)
+    'invalidated': 0,
+}
+
+
+def _count(key, amount=1):
+    with _lock:
+        _stats[key] += amount
+
+
+def get_store_dir():
+    """Store-Verzeichnis aus der App-Konfiguration (None = Store aus)"""
+    if not has_app_context():
+        return None
+    return current_app.config.get('PDF_STORE_DIR')
+
+
+def _blob_path(store_dir, digest):
+    return os.path.join(store_dir, digest[:2], f'{digest}.pdf')
+
+
+def _write_blob(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _read_blob(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+# ==========================================
+# DOKUMENTE
+# ==========================================
+
+def document_key(document):
+    """(Tabelle, ID) eines Dokuments"""
+    return document.__tablename__, str(document.id)
+
+
+def is_finalized(document):
+    """Finalisiert = kein Entwurf mehr (Status-Wert 'entwurf', egal ob Enum oder String)"""
+    status = getattr(document, 'status', None)
+    status = getattr(status, 'value', status)
+    return bool(status) and str(status).lower() != 'entwurf'
+
+
+def document_revision(document):
+    """
+    Revision = SHA-256 ueber alle Spalten des Dokuments ausser Ablage- und
+    Versandvermerken. Das Speichern von pdf_pfad o.ae. erzeugt so keine neue
+    Revision; jede inhaltliche Aenderung (Betraege, Status, Adresse) schon.
+    """
+    exclude = _REVISION_EXCLUDE.get(document.__tablename__, set())
+    sha = hashlib.sha256()
+    for attr in sa.inspect(type(document)).column_attrs:
+        if attr.key in exclude:
+            continue
+        value = getattr(document, attr.key, None)
+        value = getattr(value, 'value', value)
+        sha.update(f'{attr.key}={value!r}\x1f'.encode('utf-8'))
+    return sha.hexdigest()
+
+
+def _lookup(document, variant):
+    kind, document_id = document_key(document)
+    with db.session.no_autoflush:
+        return PdfArtifact.query.filter_by(
+            document_kind=kind,
+            document_id=document_id,
+            variant=variant,
+            revision=document_revision(document),
+            template_version=TEMPLATE_VERSIONS[variant],
+        ).first()
+
+
+def _artifact_transaction():
+    """
+    Eigene Connection/Transaktion fuer pdf_artifacts. Die Session des
+    Aufrufers wird weder geflusht noch committet - offene Aenderungen eines
+    Requests bleiben dessen Sache.
+    """
+    return db.engine.begin()
+
+
+def _render(render):
+    start = time.perf_counter()
+    data = render()
+    duration = (time.perf_counter() - start) * 1000
+    _count('render_ms', duration)
+    return data, duration
+
+
+def _store(document, variant, data, render_ms, store_dir):
+    """Bytes ablegen und Eintrag anlegen (parallel gerendert: vorhandenen behalten)"""
+    digest = hashlib.sha256(data).hexdigest()
+    path = _blob_path(store_dir, digest)
+    if not os.path.exists(path):
+        _write_blob(path, data)
+
+    kind, document_id = document_key(document)
+    values = dict(
+        document_kind=kind,
+        document_id=document_id,
+        variant=variant,
+        revision=document_revision(document),
+        template_version=TEMPLATE_VERSIONS[variant],
+        sha256=digest,
+        size_bytes=len(data),
+        render_ms=int(render_ms),
+    )
+    try:
+        with _artifact_transaction() as connection:
+            connection.execute(PdfArtifact.__table__.insert().values(**values))
+        _count('stores')
+    except IntegrityError:
+        pass
+    return digest
+
+
+def lookup_pdf(document, variant):
+    """
+    Gespeichertes PDF eines finalisierten Dokuments oder None (Entwurf,
+    Store aus, noch nicht gerendert). Fuer Aufrufer, die selbst rendern
+    (z.B. pdf_batch_service); danach remember_pdf() aufrufen.
+    """
+    if variant not in TEMPLATE_VERSIONS:
+        raise ValueError(f'Unbekannte PDF-Variante: {variant}')
+
+    store_dir = get_store_dir()
+    if not store_dir or not is_finalized(document):
+        return None
+
+    artifact = _lookup(document, variant)
+    if artifact is None:
+        _count('misses')
+        return None
+    data = _read_blob(_blob_path(store_dir, artifact.sha256))
+    if data is None:
+        # Datei fehlt: Eintrag verwerfen, Aufrufer rendert neu
+        table = PdfArtifact.__table__
+        try:
+            with _artifact_transaction() as connection:
+                connection.execute(table.delete().where(table.c.id == artifact.id))
+        except Exception as e:
+            logger.warning(f"PDF-Store-Eintrag nicht verworfen ({artifact.sha256}): {e}")
+        _count('misses')
+        return None
+
+    _count('hits')
+    _count('saved_ms', artifact.render_ms or 0)
+    return StoredPdf(data, artifact.sha256, True, True)
+
+
+def remember_pdf(document, variant, data, render_ms=0):
+    """Frisch gerendertes PDF ablegen (nur finalisiert) und als StoredPdf zurueckgeben"""
+    store_dir = get_store_dir()
+    finalized = is_finalized(document)
+    if not finalized or not store_dir:
+        _count('bypassed' if finalized else 'drafts')
+        return StoredPdf(data, hashlib.sha256(data).hexdigest(), False, finalized)
+
+    try:
+        digest = _store(document, variant, data, render_ms, store_dir)
+    except Exception as e:
+        _count('errors')
+        logger.warning(f"PDF nicht im Store abgelegt ({document_key(document)}): {e}")
+        digest = hashlib.sha256(data).hexdigest()
+    return StoredPdf(data, digest, False, True)
+
+
+def get_pdf(document, variant, render):
+    """
+    PDF eines Dokuments: finalisiert aus dem Store (beim ersten Mal rendern
+    und ablegen), Entwurf immer frisch gerendert.
+
+    Returns:
+        StoredPdf(data, etag, from_store, finalized)
+    """
+    pdf = lookup_pdf(document, variant)
+    if pdf is not None:
+        return pdf
+
+    data, render_ms = _render(render)
+    return remember_pdf(document, variant, data, render_ms)
+
+
+def not_modified_response(document, variant):
+    """
+    304-Response, wenn der Browser das gespeicherte PDF bereits hat
+    (If-None-Match = SHA-256), sonst None. Liest dafuer keine Datei.
+    """
+    if not request.if_none_match or not get_store_dir() or not is_finalized(document):
+        return None
+    artifact = _lookup(document, variant)
+    if artifact is None or not request.if_none_match.contains(artifact.sha256):
+        return None
+
+    _count('not_modified')
+    _count('saved_ms', artifact.render_ms or 0)
+    response = current_app.response_class(status=304)
+    response.set_etag(artifact.sha256)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def send_pdf(pdf, download_name=None, as_attachment=False):
+    """
+    StoredPdf als Response. Finalisiert: ETag + Revalidierung (304 bei
+    unveraendertem PDF); Entwurf: no-store.
+    """
+    if not pdf.finalized:
+        response = send_file(io.BytesIO(pdf.data), mimetype='application/pdf',
+                             as_attachment=as_attachment, download_name=download_name)
+        response.cache_control.no_store = True
+        return response
+
+    response = send_file(io.BytesIO(pdf.data), mimetype='application/pdf',
+                         as_attachment=as_attachment, download_name=download_name,
+                         etag=pdf.etag, conditional=True, max_age=0)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def pdf_response(document, variant, render, download_name=None, as_attachment=False):
+    """Flask-Response fuer das PDF eines Dokuments (304, Store oder frisch gerendert)"""
+    return (not_modified_response(document, variant)
+            or send_pdf(get_pdf(document, variant, render), download_name, as_attachment))
+
+
+# ==========================================
+# INVALIDIERUNG
+# ==========================================
+
+def invalidate_document(kind, document_id, connection=None):
+    """
+    Eintraege eines Dokuments entfernen. Gibt die SHA-256-Werte zurueck,
+    die danach von keinem Eintrag mehr benutzt werden.
+    """
+    connection = connection or db.session.connection()
+    table = PdfArtifact.__table__
+    where = sa.and_(table.c.document_kind == kind, table.c.document_id == str(document_id))
+
+    digests = {row[0] for row in connection.execute(sa.select(table.c.sha256).where(where))}
+    if not digests:
+        return set()
+    connection.execute(table.delete().where(where))
+    _count('invalidated')
+
+    still_used = {row[0] for row in connection.execute(
+        sa.select(table.c.sha256).where(table.c.sha256.in_(digests)))}
+    return digests - still_used
+
+
+def _changed_documents(session):
+    """Dokumente, deren Eintraege verworfen werden muessen: {(tabelle, id)}"""
+    documents = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table_name = getattr(obj, '__tablename__', None)
+        if table_name in _POSITION_PARENTS:
+            parent_kind, column = _POSITION_PARENTS[table_name]
+            parent_id = getattr(obj, column, None)
+            if parent_id is not None:
+                documents.add((parent_kind, str(parent_id)))
+        elif table_name in _REVISION_EXCLUDE and obj.id is not None:
+            # Entwurf bearbeitet (oder zurueck auf Entwurf) bzw. geloescht
+            if obj in session.deleted or not is_finalized(obj):
+                documents.add((table_name, str(obj.id)))
+    return documents
+
+
+_table_checked = set()
+
+
+def _table_exists(connection):
+    """pdf_artifacts vorhanden? (pro Datenbank einmal geprueft, sobald ja)"""
+    url = str(connection.engine.url)
+    if url not in _table_checked and sa.inspect(connection).has_table(PdfArtifact.__tablename__):
+        _table_checked.add(url)
+    return url in _table_checked
+
+
+def _on_after_flush(session, flush_context):
+    try:
+        documents = _changed_documents(session)
+        if not documents:
+            return
+        connection = session.connection()
+        if not _table_exists(connection):
+            return
+        orphans = session.info.setdefault('pdf_store_orphans', set())
+        for kind, document_id in documents:
+            orphans |= invalidate_document(kind, document_id, connection)
+    except Exception as e:
+        logger.warning(f"PDF-Store nicht invalidiert: {e}")
+
+
+def _on_after_commit(session):
+    """Nicht mehr referenzierte Dateien nach dem Commit loeschen"""
+    orphans = session.info.pop('pdf_store_orphans', None)
+    store_dir = get_store_dir()
+    if not orphans or not store_dir:
+        return
+    for digest in orphans:
+        try:
+            os.unlink(_blob_path(store_dir, digest))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"PDF-Store-Datei nicht geloescht ({digest}): {e}")
+
+
+def _on_after_rollback(session, previous_transaction):
+    session.info.pop('pdf_store_orphans', None)
+
+
+def _register_events():
+    if not event.contains(Session, 'after_flush', _on_after_flush):
+        event.listen(Session, 'after_flush', _on_after_flush)
+    if not event.contains(Session, 'after_commit', _on_after_commit):
+        event.listen(Session, 'after_commit', _on_after_commit)
+    if not event.contains(Session, 'after_soft_rollback', _on_after_rollback):
+        event.listen(Session, 'after_soft_rollback', _on_after_rollback)
+
+
+def init_pdf_store(app):
+    """Registriert die Session-Events. In create_app() aufrufen."""
+    if app.extensions.get('pdf_store'):
+        return
+    _register_events()
+    app.extensions['pdf_store'] = True
+
+
+# ==========================================
+# KENNZAHLEN
+# ==========================================
+
+def get_pdf_store_stats():
+    """Trefferquote und eingesparte Renderzeit (dieser Prozess) plus Store-Groesse"""
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['not_modified'] + stats['misses']
+    stats['hit_rate'] = round((stats['hits'] + stats['not_modified']) / lookups * 100, 1) if lookups else 0.0
+    stats['render_ms'] = round(stats['render_ms'], 1)
+    stats['saved_ms'] = round(stats['saved_ms'], 1)
+    stats['store_dir'] = get_store_dir()
+
+    if has_app_context():
+        try:
+            table = PdfArtifact.__table__
+            row = db.session.execute(sa.select(
+                sa.func.count(), sa.func.coalesce(sa.func.sum(table.c.size_bytes), 0)
+            )).one()
+            stats['artifacts'] = row[0]
+            stats['stored_bytes'] = int(row[1])
+        except Exception as e:
+            logger.debug(f"PDF-Store-Groesse nicht ermittelt: {e}")
+    return stats
+
+
+def reset_pdf_store_stats():
+    """Zaehler zuruecksetzen (Tests)"""
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0.0 if key.endswith('_ms') else 0
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Produktions-Slot-Finder
+=======================
+Frei/Belegt-Zeitleisten pro Maschine fuer die Produktionsplanung.
+
+Schedules, Kalender-Bloecke und laufende Auftraege werden fuer einen
+Planungszeitraum mit je einer Abfrage geladen. Daraus entsteht pro
+Maschine eine sortierte Liste belegter Intervalle, auf der Abfragen wie
+"ist die Maschine frei?", "fruehester freier Slot von N Stunden" oder
+"Slot mit dem kleinsten Rest (Best-Fit)" im Speicher laufen. Mehrere
+Auftraege koennen in einem Aufruf eingeplant werden; jeder gefundene
+Slot wird sofort reserviert, damit sich die Vorschlaege nicht
+ueberschneiden.
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time, timedelta
+
+from src.models import db, Order, Machine, ProductionSchedule, ProductionBlock
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HORIZON_DAYS = 14
+WORKDAYS = 5  # Mo-Fr
+
+STRATEGIES = ('earliest', 'best_fit')
+
+# Bloecke ohne Maschine (z.B. Pause) sperren alle Maschinen, aber nur
+# Produktions-Typen - Telefonate oder Urlaub belegen keine Maschine.
+GLOBAL_BLOCK_TYPES = tuple(ProductionBlock.TYPE_CATEGORIES['production'])
+
+
+def machine_types_for_order(order_type):
+    """Maschinentypen, die einen Auftragstyp fertigen koennen"""
+    machine_types = []
+    if order_type in ['embroidery', 'combined']:
+        machine_types.append('embroidery')
+    if order_type in ['dtf', 'printing', 'combined']:
+        machine_types.extend(['dtf', 'printing'])
+
+    if not machine_types:
+        machine_types = ['embroidery', 'dtf', 'printing']
+    return machine_types
+
+
+def _block_interval(block):
+    if block.is_all_day:
+        return (datetime.combine(block.start_date, time.min),
+                datetime.combine(block.end_date + timedelta(days=1), time.min))
+    return (datetime.combine(block.start_date, block.start_time),
+            datetime.combine(block.end_date, block.end_time))
+
+
+class MachineTimeline:
+    """Belegte Intervalle einer Maschine, nach Start sortiert und zusammengefasst"""
+
+    def __init__(self, machine, intervals=()):
+        self.machine = machine
+        self._starts = []
+        self._ends = []
+        for start, end in sorted(intervals):
+            self.reserve(start, end)
+
+    def reserve(self, start, end):
+        """Intervall als belegt eintragen (ueberlappende werden verschmolzen)"""
+        if end <= start:
+            return
+        lo = bisect_left(self._ends, start)
+        hi = bisect_right(self._starts, end)
+        if lo < hi:
+            start = min(start, self._starts[lo])
+            end = max(end, self._ends[hi - 1])
+        self._starts[lo:hi] = [start]
+        self._ends[lo:hi] = [end]
+
+    def is_free(self, start, end):
+        """True, wenn [start, end) mit keinem belegten Intervall ueberlappt"""
+        i = bisect_right(self._starts, start) - 1
+        if i >= 0 and self._ends[i] > start:
+            return False
+        j = bisect_left(self._starts, end)
+        return j == i + 1
+
+    def next_busy(self, moment):
+        """(Start, Ende) des ersten belegten Intervalls, das nach moment endet"""
+        i = bisect_right(self._ends, moment)
+        if i < len(self._starts):
+            return self._starts[i], self._ends[i]
+        return None
+
+    def busy(self):
+        return list(zip(self._starts, self._ends))
+
+
+class SlotFinder:
+    """
+    Slot-Suche ueber alle Maschinen eines Planungszeitraums.
+
+    Arbeitszeit: Mo-Fr von work_start bis work_end. Auftraege, die laenger
+    als ein Arbeitstag sind, laufen am naechsten Arbeitstag weiter; der
+    Slot reicht dann vom Start bis zum Ende am Folgetag und muss komplett
+    frei sein (wie mehrtaegige Schedules im Kalender).
+    """
+
+    def __init__(self, machines, window_start, window_end, schedules=(), blocks=(),
+                 busy_machine_ids=(), work_start_hour=8, work_end_hour=17):
+        self.machines = list(machines)
+        self.window_start = window_start
+        self.window_end = window_end
+        self.work_start = time(work_start_hour, 0)
+        self.work_end = time(work_end_hour, 0)
+        self.busy_machine_ids = set(busy_machine_ids)
+
+        intervals = {m.id: [] for m in self.machines}
+        for s in schedules:
+            if s.machine_id in intervals:
+                intervals[s.machine_id].append((s.scheduled_start, s.scheduled_end))
+        for b in blocks:
+            targets = [b.machine_id] if b.machine_id else list(intervals)
+            for machine_id in targets:
+                if machine_id in intervals:
+                    intervals[machine_id].append(_block_interval(b))
+
+        self.timelines = {m.id: MachineTimeline(m, intervals[m.id]) for m in self.machines}
+
+    @classmethod
+    def load(cls, window_start=None, horizon_days=DEFAULT_HORIZON_DAYS, machine_types=None,
+             work_start_hour=8, work_end_hour=17):
+        """
+        Laedt Maschinen, Schedules, Bloecke und laufende Auftraege fuer den
+        Planungszeitraum (je eine Abfrage).
+        """
+        window_start = (window_start or datetime.now()).replace(second=0, microsecond=0)
+        window_end = window_start + timedelta(days=horizon_days)
+
+        query = Machine.query.filter(Machine.status == 'active')
+        if machine_types:
+            query = query.filter(Machine.type.in_(machine_types))
+        machines = query.order_by(Machine.name).all()
+        machine_ids = [m.id for m in machines]
+        if not machine_ids:
+            return cls([], window_start, window_end,
+                       work_start_hour=work_start_hour, work_end_hour=work_end_hour)
+
+        schedules = ProductionSchedule.query.filter(
+            ProductionSchedule.machine_id.in_(machine_ids),
+            ProductionSchedule.status != 'cancelled',
+            ProductionSchedule.scheduled_start < window_end,
+            ProductionSchedule.scheduled_end > window_start,
+        ).all()
+
+        blocks = ProductionBlock.query.filter(
+            ProductionBlock.is_active == True,
+            ProductionBlock.start_date <= window_end.date(),
+            ProductionBlock.end_date >= window_start.date(),
+            db.or_(
+                ProductionBlock.machine_id.in_(machine_ids),
+                db.and_(ProductionBlock.machine_id.is_(None),
+                        ProductionBlock.block_type.in_(GLOBAL_BLOCK_TYPES)),
+            ),
+        ).all()
+
+        busy_machine_ids = [row.assigned_machine_id for row in db.session.query(
+            Order.assigned_machine_id
+        ).filter(
+            Order.assigned_machine_id.in_(machine_ids),
+            Order.status == 'in_progress',
+        ).distinct()]
+
+        return cls(machines, window_start, window_end, schedules, blocks, busy_machine_ids,
+                   work_start_hour, work_end_hour)
+
+    # ------------------------------------------------------------------
+    # Arbeitszeit
+    # ------------------------------------------------------------------
+
+    def _working_windows(self, moment):
+        """Arbeitszeitfenster ab moment bis Ende des Planungszeitraums"""
+        day = moment.date()
+        while datetime.combine(day, time.min) < self.window_end:
+            if day.weekday() < WORKDAYS:
+                start = max(datetime.combine(day, self.work_start), moment)
+                end = min(datetime.combine(day, self.work_end), self.window_end)
+                if start < end:
+                    yield start, end
+            day += timedelta(days=1)
+
+    def _add_working_hours(self, start, hours):
+        """Ende eines Slots, der bei start beginnt und hours Arbeitsstunden dauert"""
+        remaining = timedelta(hours=hours)
+        for window_start, window_end in self._working_windows(start):
+            if window_end - window_start >= remaining:
+                return window_start + remaining
+            remaining -= window_end - window_start
+        return None
+
+    def _free_hours_after(self, timeline, moment):
+        """Freie Arbeitszeit nach moment bis zum naechsten Belegt-Intervall oder Feierabend"""
+        day_end = datetime.combine(moment.date(), self.work_end)
+        busy = timeline.next_busy(moment)
+        limit = min(day_end, busy[0]) if busy else day_end
+        return max(0.0, (limit - moment).total_seconds() / 3600)
+
+    # ------------------------------------------------------------------
+    # Abfragen
+    # ------------------------------------------------------------------
+
+    def _candidates(self, machine_types=None):
+        """Maschinen fuer die Suche: freie zuerst, dann nach Name"""
+        machines = [m for m in self.machines if not machine_types or m.type in machine_types]
+        return sorted(machines, key=lambda m: m.id in self.busy_machine_ids)
+
+    def is_free(self, machine_id, start, end):
+        timeline = self.timelines.get(machine_id)
+        return timeline is not None and timeline.is_free(start, end)
+
+    def suggest_machine(self, start, end, machine_types=None):
+        """Maschine, die im festen Zeitraum frei ist (ohne laufenden Auftrag bevorzugt)"""
+        for machine in self._candidates(machine_types):
+            if self.timelines[machine.id].is_free(start, end):
+                return machine
+        return None
+
+    def earliest_slot_on(self, machine_id, duration_hours, not_before=None):
+        """Fruehester freier Slot auf einer Maschine: (start, end) oder None"""
+        timeline = self.timelines[machine_id]
+        moment = max(not_before or self.window_start, self.window_start)
+
+        for window_start, window_end in self._working_windows(moment):
+            start = window_start
+            while start < window_end:
+                end = self._add_working_hours(start, duration_hours)
+                if end is None:
+                    return None
+                busy = timeline.next_busy(start)
+                if busy is None or busy[0] >= end:
+                    return start, end
+                # Belegung im Weg: hinter dem Intervall weitersuchen
+                start = max(start, busy[1])
+        return None
+
+    def find_slot(self, duration_hours, machine_types=None, not_before=None, strategy='earliest'):
+        """
+        Slot ueber alle passenden Maschinen.
+
+        strategy='earliest': fruehester Start (freie Maschinen bei Gleichstand zuerst)
+        strategy='best_fit': fruehester Slot je Maschine, davon der mit dem
+        kleinsten freien Rest danach - Luecken werden aufgefuellt, lange
+        freie Bloecke bleiben fuer grosse Auftraege.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f'Unbekannte Strategie: {strategy}')
+
+        best = None
+        best_key = None
+        for rank, machine in enumerate(self._candidates(machine_types)):
+            slot = self.earliest_slot_on(machine.id, duration_hours, not_before)
+            if slot is None:
+                continue
+            start, end = slot
+            if strategy == 'best_fit':
+                key = (self._free_hours_after(self.timelines[machine.id], end), start, rank)
+            else:
+                key = (start, rank)
+            if best_key is None or key < best_key:
+                best, best_key = (machine, start, end), key
+
+        if best is None:
+            return None
+        machine, start, end = best
+        return {'machine': machine, 'start': start, 'end': end}
+
+    def plan(self, jobs, strategy='earliest'):
+        """
+        Mehrere Auftraege nacheinander einplanen.
+
+        Args:
+            jobs: Liste von Dicts mit duration_hours, optional machine_types,
+                  not_before und beliebigen weiteren Schluesseln (z.B. order_id)
+
+        Returns:
+            Liste in Reihenfolge der Jobs: {'job': job, 'slot': {...} oder None}
+        """
+        result = []
+        for job in jobs:
+            slot = self.find_slot(job['duration_hours'], job.get('machine_types'),
+                                  job.get('not_before'), strategy)
+            if slot:
+                self.timelines[slot['machine'].id].reserve(slot['start'], slot['end'])
+            result.append({'job': job, 'slot': slot})
+        return result
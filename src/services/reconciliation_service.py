@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+ZAHLUNGSABGLEICH (Bank-Transaktionen <-> offene Rechnungen)
+==========================================================
+Statt jede Transaktion mit jeder offenen Rechnung zu vergleichen, werden
+die Rechnungen einmal indiziert:
+
+- Rechnungsnummer normalisiert (nur A-Z/0-9, "RE-2026-0012" -> "RE20260012",
+  zusaetzlich ohne Praefix "20260012"); im Verwendungszweck werden
+  aufeinanderfolgende Tokens zusammengesetzt und nachgeschlagen
+  ("RE 2026/0012" und "Rg. 2026-0012" treffen ebenfalls).
+- Betrag in Cent (offener Betrag und Bruttobetrag, +/- 1 Cent).
+- Kundenname normalisiert (Umlaute, Rechtsformen wie GmbH entfernt).
+
+Bewertet werden nur Kandidaten aus Nummern- und Betragsindex. Punkte wie
+bisher im Bank-Sync: Nummer 50, Betrag 35, Name 15; ab 50 Vorschlag, ab 80
+automatische Zuordnung. Eine Zahlung kann mehrere Rechnungen begleichen
+(mehrere Nummern im Verwendungszweck oder alle offenen Rechnungen eines
+Kunden, deren Summe dem Betrag entspricht). Automatisch zugeordnete
+Rechnungen stehen fuer weitere Transaktionen desselben Laufs nicht mehr
+zur Verfuegung; bei gleich guten Kandidaten gibt es nur einen Vorschlag.
+
+Nutzung:
+    engine = ReconciliationEngine(load_open_invoices())
+    match = engine.match(amount=Decimal('119.00'), purpose='RE-2026-0012',
+                         name='Muster GmbH')
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import re
+import logging
+from collections import namedtuple, defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+logger = logging.getLogger(__name__)
+
+SCORE_NUMBER = 50
+SCORE_AMOUNT = 35
+SCORE_NAME = 15
+MIN_CONFIDENCE = 50
+AUTO_CONFIDENCE = 80
+MAX_CUSTOMER_INVOICES = 20  # Sammelzahlung: hoechstens so viele offene Rechnungen je Kunde
+
+# Rechtsformen und Fuellwoerter, die beim Namensvergleich stoeren
+_NAME_NOISE = {'GMBH', 'MBH', 'UG', 'AG', 'KG', 'OHG', 'GBR', 'EK', 'EV', 'CO', 'UND', 'HAFTUNGSBESCHRAENKT'}
+_UMLAUTS = str.maketrans({'Ä': 'AE', 'Ö': 'OE', 'Ü': 'UE', 'ß': 'SS'})
+
+InvoiceRecord = namedtuple('InvoiceRecord', ['id', 'number', 'open_cents', 'gross_cents', 'name', 'ref'])
+ReconciliationMatch = namedtuple('ReconciliationMatch', ['invoices', 'allocations', 'confidence', 'reasons'])
+
+
+def to_cents(value):
+    """Betrag (Decimal/float/str) -> ganze Cent"""
+    if value is None:
+        return 0
+    return int((Decimal(str(value)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def normalize_number(value):
+    return re.sub(r'[^A-Z0-9]', '', (value or '').upper())
+
+
+def normalize_name(value):
+    """'Müller & Co. GmbH' -> 'MUELLER'"""
+    tokens = re.findall(r'[A-Z0-9]+', (value or '').upper().translate(_UMLAUTS))
+    return ' '.join(token for token in tokens if token not in _NAME_NOISE)
+
+
+def names_match(invoice_name, applicant_name):
+    """Enthaltensein in beide Richtungen (wie bisher), aber auf normalisierten Namen"""
+    return bool(invoice_name and applicant_name and
+                (invoice_name in applicant_name or applicant_name in invoice_name))
+
+
+def invoice_record(rechnung):
+    """Rechnung (Model oder Zeile mit gleichen Attributen) -> InvoiceRecord"""
+    gross = to_cents(rechnung.brutto_gesamt)
+    open_cents = gross - to_cents(getattr(rechnung, 'bezahlt_betrag', None))
+    return InvoiceRecord(rechnung.id, rechnung.rechnungsnummer, open_cents, gross,
+                         normalize_name(rechnung.kunde_name), rechnung)
+
+
+class ReconciliationEngine:
+    """Indizierte offene Rechnungen; match() bewertet nur Kandidaten"""
+
+    def __init__(self, invoices):
+        self.invoices = {}
+        self.by_number = {}
+        self.by_short = {}  # Nummer ohne Praefix -> ID (None = mehrdeutig)
+        self.by_cents = defaultdict(list)
+        self.by_name = defaultdict(list)
+        self.max_number_parts = 1
+        self.consumed = set()
+        self.pairs_scored = 0
+
+        for invoice in invoices:
+            record = invoice if isinstance(invoice, InvoiceRecord) else invoice_record(invoice)
+            if record.open_cents <= 0:
+                continue
+            self.invoices[record.id] = record
+            key = normalize_number(record.number)
+            if key:
+                self.by_number[key] = record.id
+                # Ohne Buchstaben-Praefix ("RG 2026/0012" fuer RE-2026-0012), nur wenn eindeutig
+                short = key.lstrip('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+                if short and short != key and len(short) >= 4:
+                    self.by_short[short] = None if short in self.by_short else record.id
+                parts = len(re.findall(r'[A-Z0-9]+', record.number.upper()))
+                self.max_number_parts = max(self.max_number_parts, parts)
+            self.by_cents[record.open_cents].append(record.id)
+            if record.gross_cents != record.open_cents:
+                self.by_cents[record.gross_cents].append(record.id)
+            if record.name:
+                self.by_name[record.name].append(record.id)
+
+    def _available(self, ids):
+        return [i for i in ids if i not in self.consumed]
+
+    def numbers_in(self, purpose):
+        """IDs der Rechnungen, deren Nummer im Verwendungszweck steht (in Reihenfolge)"""
+        tokens = re.findall(r'[A-Z0-9]+', (purpose or '').upper())
+        found = []
+        for start in range(len(tokens)):
+            joined = ''
+            for token in tokens[start:start + self.max_number_parts]:
+                joined += token
+                invoice_id = self.by_number.get(joined, self.by_short.get(joined))
+                if invoice_id is not None and invoice_id not in found:
+                    found.append(invoice_id)
+        return self._available(found)
+
+    def _score(self, record, cents, name, number_hit):
+        self.pairs_scored += 1
+        confidence, reasons = 0, []
+        if number_hit:
+            confidence += SCORE_NUMBER
+            reasons.append('Rechnungsnummer gefunden')
+        if abs(cents - record.open_cents) <= 1 or abs(cents - record.gross_cents) <= 1:
+            confidence += SCORE_AMOUNT
+            reasons.append('Betrag stimmt ueberein')
+        if names_match(record.name, name):
+            confidence += SCORE_NAME
+            reasons.append('Kundenname gefunden')
+        return min(confidence, 100), reasons
+
+    def _group(self, ids, cents, name, number_hit):
+        """Sammelzahlung: Summe der offenen Betraege == Zahlbetrag"""
+        records = [self.invoices[i] for i in ids]
+        if len(records) < 2 or abs(sum(r.open_cents for r in records) - cents) > 1:
+            return None
+        self.pairs_scored += len(records)
+        confidence, reasons = SCORE_AMOUNT, ['Betrag stimmt ueberein']
+        if number_hit:
+            confidence += SCORE_NUMBER
+            reasons.insert(0, 'Rechnungsnummern gefunden')
+        if all(names_match(r.name, name) for r in records):
+            confidence += SCORE_NAME
+            reasons = reasons + ['Kundenname gefunden']
+        return ReconciliationMatch(records, [r.open_cents for r in records], min(confidence, 100),
+                                   reasons + [f'Sammelzahlung fuer {len(records)} Rechnungen'])
+
+    def match(self, amount, purpose='', name=''):
+        """
+        Beste Zuordnung fuer eine Zahlung (None, wenn unter MIN_CONFIDENCE).
+        Automatisch zugeordnete Rechnungen (confidence >= AUTO_CONFIDENCE)
+        werden fuer weitere Aufrufe gesperrt.
+        """
+        cents = to_cents(amount)
+        if cents <= 0:
+            return None
+        name = normalize_name(name)
+
+        number_ids = self.numbers_in(purpose)
+        candidates = dict.fromkeys(number_ids)
+        for key in (cents - 1, cents, cents + 1):
+            candidates.update(dict.fromkeys(self._available(self.by_cents.get(key, ()))))
+
+        scored = []
+        for invoice_id in candidates:
+            record = self.invoices[invoice_id]
+            confidence, reasons = self._score(record, cents, name, invoice_id in number_ids)
+            scored.append(ReconciliationMatch([record], [min(cents, record.open_cents)], confidence, reasons))
+
+        # Mehrere Rechnungsnummern im Verwendungszweck
+        group = self._group(number_ids, cents, name, True)
+        if group is None and name in self.by_name:
+            # Alle offenen Rechnungen des Kunden
+            customer_ids = self._available(self.by_name[name])
+            if len(customer_ids) <= MAX_CUSTOMER_INVOICES:
+                group = self._group(customer_ids, cents, name, False)
+        if group is not None:
+            scored.append(group)
+
+        if not scored:
+            return None
+        scored.sort(key=lambda m: (m.confidence, len(m.invoices)), reverse=True)
+        best = scored[0]
+        if best.confidence < MIN_CONFIDENCE:
+            return None
+        if len(scored) > 1 and scored[1].confidence == best.confidence and len(scored[1].invoices) == len(best.invoices):
+            # Nicht eindeutig - nur Vorschlag
+            best = best._replace(confidence=min(best.confidence, AUTO_CONFIDENCE - 1),
+                                 reasons=best.reasons + ['mehrdeutig'])
+        if best.confidence >= AUTO_CONFIDENCE:
+            self.consumed.update(r.id for r in best.invoices)
+        return best
+
+
+def load_open_invoices():
+    """Offene Ausgangsrechnungen als InvoiceRecords (nur benoetigte Spalten)"""
+    from src.models import db
+    from src.models.rechnungsmodul.models import Rechnung, RechnungsRichtung
+
+    rows = db.session.query(
+        Rechnung.id, Rechnung.rechnungsnummer, Rechnung.brutto_gesamt,
+        Rechnung.bezahlt_betrag, Rechnung.kunde_name,
+    ).filter(
+        Rechnung.richtung == RechnungsRichtung.AUSGANG,
+        Rechnung.status.in_(open_statuses())
+    )
+    return [invoice_record(row) for row in rows]
+
+
+def open_statuses():
+    """Status, in denen eine Rechnung noch Zahlungen erwartet"""
+    from src.models.rechnungsmodul.models import RechnungsStatus
+    return [RechnungsStatus.OFFEN, RechnungsStatus.TEILBEZAHLT, RechnungsStatus.UEBERFAELLIG]
+
+
+__all__ = [
+    'ReconciliationEngine',
+    'ReconciliationMatch',
+    'InvoiceRecord',
+    'invoice_record',
+    'load_open_invoices',
+    'open_statuses',
+    'normalize_number',
+    'normalize_name',
+    'to_cents',
+    'AUTO_CONFIDENCE',
+    'MIN_CONFIDENCE',
+]
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+LEADER-WAHL FUER DEN SCHEDULER
+==============================
+Mit mehreren gunicorn-Workern startet jeder Prozess einen APScheduler.
+Damit Jobs nicht mehrfach laufen, fuehrt nur der Prozess mit der Lease
+in der Tabelle scheduler_leases die Jobs aus; alle anderen tragen Jobs
+nur in den gemeinsamen Jobstore ein (Scheduler pausiert).
+
+- Lease mit Ablaufzeit (LEASE_SECONDS), Erneuerung per Heartbeat alle
+  HEARTBEAT_SECONDS durch einen Thread je Prozess.
+- Uebernahme per bedingtem UPDATE (nur wenn abgelaufen) - funktioniert
+  mit SQLite und Postgres, auch ueber mehrere Server.
+- Stirbt der Leader, uebernimmt ein anderer Prozess spaetestens nach
+  LEASE_SECONDS + HEARTBEAT_SECONDS; beim sauberen Beenden wird die
+  Lease sofort freigegeben.
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import os
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from src.models.models import db
+from src.models.scheduler_lease import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = 'scheduler'
+LEASE_SECONDS = 30
+HEARTBEAT_SECONDS = 10
+
+
+def process_id():
+    """Kennung dieses Prozesses (host:pid)"""
+    return f'{socket.gethostname()}:{os.getpid()}'[:100]
+
+
+def try_acquire(holder, name=LEASE_NAME, ttl=LEASE_SECONDS):
+    """
+    Lease uebernehmen oder erneuern. True, wenn holder danach Leader ist.
+    Eine fremde Lease wird nur uebernommen, wenn sie abgelaufen ist.
+    """
+    now = datetime.utcnow()
+    table = SchedulerLease.__table__
+    expires = now + timedelta(seconds=ttl)
+
+    renewed = db.session.execute(
+        table.update()
+        .where(table.c.name == name, table.c.holder == holder)
+        .values(heartbeat_at=now, expires_at=expires)
+    ).rowcount
+    if not renewed:
+        taken = db.session.execute(
+            table.update()
+            .where(table.c.name == name, table.c.expires_at < now)
+            .values(holder=holder, acquired_at=now, heartbeat_at=now, expires_at=expires)
+        ).rowcount
+        if not taken:
+            if db.session.get(SchedulerLease, name) is not None:
+                db.session.commit()
+                return False
+            try:
+                db.session.add(SchedulerLease(name=name, holder=holder, acquired_at=now,
+                                              heartbeat_at=now, expires_at=expires))
+                db.session.flush()
+            except IntegrityError:
+                # Anderer Prozess war schneller
+                db.session.rollback()
+                return False
+    db.session.commit()
+    return True
+
+
+def release(holder, name=LEASE_NAME):
+    """Eigene Lease freigeben (beim Beenden), damit ein anderer sofort uebernimmt"""
+    table = SchedulerLease.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.name == name, table.c.holder == holder)
+        .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    db.session.commit()
+
+
+def get_lease(name=LEASE_NAME):
+    """Aktuelle Lease als Dict (None, wenn es noch keine gab)"""
+    lease = db.session.get(SchedulerLease, name, populate_existing=True)
+    if lease is None:
+        return None
+    now = datetime.utcnow()
+    return {
+        'leader': lease.holder,
+        'acquired_at': lease.acquired_at.isoformat(),
+        'lease_age_seconds': round((now - lease.acquired_at).total_seconds(), 1),
+        'heartbeat_age_seconds': round((now - lease.heartbeat_at).total_seconds(), 1),
+        'expires_in_seconds': round((lease.expires_at - now).total_seconds(), 1),
+        'expired': lease.expires_at < now,
+    }
+
+
+class LeaderElector:
+    """
+    Heartbeat-Thread eines Prozesses. Ruft on_promote() auf, sobald der
+    Prozess Leader wird, und on_demote(), wenn er die Lease verliert.
+    on_tick() laeuft beim Leader bei jedem Heartbeat.
+    """
+
+    def __init__(self, app, on_promote, on_demote, on_tick=None,
+                 ttl=LEASE_SECONDS, interval=HEARTBEAT_SECONDS):
+        self.app = app
+        self.holder = process_id()
+        self.on_promote = on_promote
+        self.on_demote = on_demote
+        self.on_tick = on_tick
+        self.ttl = ttl
+        self.interval = interval
+        self.is_leader = False
+        self._valid_until = datetime.utcnow()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def beat(self):
+        """Ein Heartbeat: Lease holen/erneuern und Rolle anpassen"""
+        try:
+            with self.app.app_context():
+                try:
+                    leader = try_acquire(self.holder, ttl=self.ttl)
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            logger.error(f"Scheduler-Lease nicht erneuert: {e}")
+            # Ohne Datenbank bis zum Ablauf der eigenen Lease Leader bleiben
+            leader = self.is_leader and datetime.utcnow() < self._valid_until
+
+        if leader:
+            self._valid_until = datetime.utcnow() + timedelta(seconds=self.ttl)
+        if leader and not self.is_leader:
+            self.is_leader = True
+            logger.info(f"Scheduler-Leader: {self.holder}")
+            self.on_promote()
+        elif not leader and self.is_leader:
+            self.is_leader = False
+            logger.warning(f"Scheduler-Lease verloren: {self.holder}")
+            self.on_demote()
+        elif leader and self.on_tick:
+            self.on_tick()
+        return leader
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.beat()
+
+    def start(self):
+        """Ersten Heartbeat sofort, danach im Hintergrund-Thread"""
+        self.beat()
+        self._thread = threading.Thread(target=self._run, name='scheduler-leader')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Thread beenden und eigene Lease freigeben"""
+        self._stop.set()
+        if self.is_leader:
+            self.is_leader = False
+            try:
+                with self.app.app_context():
+                    release(self.holder)
+                    db.session.remove()
+            except Exception as e:
+                logger.warning(f"Scheduler-Lease nicht freigegeben: {e}")
+
+
+__all__ = [
+    'LEASE_SECONDS',
+    'HEARTBEAT_SECONDS',
+    'process_id',
+    'try_acquire',
+    'release',
+    'get_lease',
+    'LeaderElector',
+]
@@ -3,24 +3,65 @@
 Scheduler Service - APScheduler Integration fuer StitchAdmin
 Hintergrund-Jobs: Social Media Posts, E-Mail-Polling, Bank-Sync
 
+Mit mehreren gunicorn-Workern fuehrt nur der Leader (Lease in der
+Datenbank, siehe scheduler_leader_service) die Jobs aus. Die anderen
+Prozesse starten den Scheduler pausiert: add_job() schreibt weiter in
+den gemeinsamen Jobstore, ausgefuehrt wird beim Leader (der liest den
+Jobstore bei jedem Heartbeat neu, also spaetestens nach HEARTBEAT_SECONDS).
+
 Erstellt von Hans Hahn - Alle Rechte vorbehalten
 """
 
 import os
+import atexit
 import logging
+from datetime import datetime, timezone
+from apscheduler.events import EVENT_JOB_SUBMITTED
+from apscheduler.schedulers.base import STATE_PAUSED, STATE_RUNNING
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.util import obj_to_ref, ref_to_obj
 
 logger = logging.getLogger(__name__)
 
 _scheduler = None
 _app = None
+_elector = None
+_lag = {'last_ms': None, 'max_ms': 0, 'submitted': 0}
+
+
+def _on_job_submitted(event):
+    """Verzoegerung zwischen geplanter und tatsaechlicher Ausfuehrung"""
+    if event.scheduled_run_times:
+        lag_ms = int((datetime.now(timezone.utc) - event.scheduled_run_times[0]).total_seconds() * 1000)
+        _lag['last_ms'] = lag_ms
+        _lag['max_ms'] = max(_lag['max_ms'], lag_ms)
+        _lag['submitted'] += 1
+
+
+def _promote():
+    if _scheduler and _scheduler.state == STATE_PAUSED:
+        _scheduler.resume()
+        logger.info("APScheduler: Leader - Jobs werden ausgefuehrt")
+
+
+def _demote():
+    if _scheduler and _scheduler.state == STATE_RUNNING:
+        _scheduler.pause()
+        logger.info("APScheduler: pausiert (anderer Prozess ist Leader)")
+
+
+def _leader_tick():
+    # Von anderen Prozessen eingetragene Jobs einlesen
+    if _scheduler:
+        _scheduler.wakeup()
 
 
 def init_scheduler(app):
     """APScheduler mit Flask-App initialisieren"""
-    global _scheduler, _app
+    global _scheduler, _app, _elector
 
     # Nicht im Reloader-Child-Prozess starten
     if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' or not app.debug:
@@ -28,7 +69,9 @@ def init_scheduler(app):
         db_url = app.config.get('SQLALCHEMY_DATABASE_URI', 'sqlite:///instance/stitchadmin.db')
 
         jobstores = {
-            'default': SQLAlchemyJobStore(url=db_url, tablename='apscheduler_jobs')
+            'default': SQLAlchemyJobStore(url=db_url, tablename='apscheduler_jobs'),
+            # Wiederkehrende System-Jobs (werden bei jedem Start neu registriert)
+            'system': MemoryJobStore(),
         }
         executors = {
             'default': ThreadPoolExecutor(max_workers=4)
@@ -44,8 +87,19 @@ def init_scheduler(app):
             executors=executors,
             job_defaults=job_defaults,
         )
-        _scheduler.start()
-        logger.info("APScheduler gestartet")
+        _scheduler.add_listener(_on_job_submitted, EVENT_JOB_SUBMITTED)
+
+        if app.config.get('SCHEDULER_LEADER_ELECTION', True):
+            # Pausiert starten, der Leader-Thread setzt ihn fort
+            from src.services.scheduler_leader_service import LeaderElector
+            _scheduler.start(paused=True)
+            _elector = LeaderElector(app, on_promote=_promote, on_demote=_demote, on_tick=_leader_tick)
+            _elector.start()
+            atexit.register(shutdown_scheduler)
+            logger.info(f"APScheduler gestartet ({'Leader' if _elector.is_leader else 'wartet auf Lease'})")
+        else:
+            _scheduler.start()
+            logger.info("APScheduler gestartet")
     else:
         logger.info("APScheduler uebersprungen (Reloader-Prozess)")
 
@@ -55,12 +109,42 @@ def get_scheduler():
     return _scheduler
 
 
-def add_job(func, trigger, job_id=None, **kwargs):
-    """Job zum Scheduler hinzufuegen (mit Flask app_context)"""
+def _run_in_app_context(func_ref, *args, **kwargs):
+    """Ausfuehrung eines persistenten Jobs (beim Leader) im Flask app_context"""
+    with _app.app_context():
+        return ref_to_obj(func_ref)(*args, **kwargs)
+
+
+def add_job(func, trigger, job_id=None, args=None, **kwargs):
+    """
+    Job zum Scheduler hinzufuegen (mit Flask app_context). Der Job landet im
+    gemeinsamen Jobstore, func muss daher eine Funktion auf Modulebene sein
+    (oder 'modul:funktion'); Parameter ueber args.
+    """
     if not _scheduler:
         logger.warning("Scheduler nicht initialisiert - Job wird nicht geplant")
         return None
 
+    func_ref = func if isinstance(func, str) else obj_to_ref(func)
+    return _scheduler.add_job(
+        _run_in_app_context,
+        trigger=trigger,
+        id=job_id,
+        args=[func_ref, *(args or [])],
+        replace_existing=True,
+        **kwargs
+    )
+
+
+def add_system_job(func, trigger, job_id, **kwargs):
+    """
+    Wiederkehrenden System-Job registrieren (Statistiken, Aufraeumen, ...).
+    Liegt im Memory-Jobstore, damit auch nicht serialisierbare Funktionen
+    moeglich sind; wird bei jedem Start neu angelegt.
+    """
+    if not _scheduler:
+        return None
+
     def wrapped_func(*args, **kw):
         with _app.app_context():
             return func(*args, **kw)
@@ -69,6 +153,7 @@ def add_job(func, trigger, job_id=None, **kwargs):
         wrapped_func,
         trigger=trigger,
         id=job_id,
+        jobstore='system',
         replace_existing=True,
         **kwargs
     )
@@ -92,9 +177,44 @@ def list_jobs():
     return []
 
 
+def is_leader():
+    """Fuehrt dieser Prozess die Jobs aus?"""
+    if not _scheduler:
+        return False
+    return _elector.is_leader if _elector else _scheduler.state == STATE_RUNNING
+
+
+def get_scheduler_status():
+    """Leader, Alter der Lease und Verzoegerung der Jobs (fuer den Status-Endpunkt)"""
+    from src.services.scheduler_leader_service import get_lease, process_id
+
+    now = datetime.now(timezone.utc)
+    jobs = _scheduler.get_jobs() if _scheduler else []
+    # Nur gemeinsame Jobs - System-Jobs der pausierten Prozesse laufen nie
+    shared = _scheduler.get_jobs(jobstore='default') if _scheduler else []
+    overdue = [(now - job.next_run_time).total_seconds()
+               for job in shared if job.next_run_time and job.next_run_time < now]
+    state = {STATE_RUNNING: 'running', STATE_PAUSED: 'paused'}.get(
+        _scheduler.state, 'stopped') if _scheduler else 'stopped'
+    return {
+        'process': process_id(),
+        'leader_election': _elector is not None,
+        'is_leader': is_leader(),
+        'state': state,
+        'lease': get_lease(),
+        'jobs': len(jobs),
+        'overdue_jobs': len(overdue),
+        'max_overdue_seconds': round(max(overdue), 1) if overdue else 0,
+        'lag_ms': dict(_lag),
+    }
+
+
 def shutdown_scheduler():
-    """Scheduler sauber beenden"""
-    global _scheduler
+    """Scheduler sauber beenden (Lease freigeben)"""
+    global _scheduler, _elector
+    if _elector:
+        _elector.stop()
+        _elector = None
     if _scheduler:
         _scheduler.shutdown(wait=False)
         _scheduler = None
@@ -0,0 +1,689 @@
+# -*- coding: utf-8 -*-
+"""
+VOLLTEXTSUCHE
+=============
+Ein Suchindex fuer Kunden, Artikel, Auftraege und Lieferanten.
+
+Pro Entity gibt es eine Dokument-Tabelle search_<entity> mit drei Feldern:
+
+- number: IDs und Nummern (Kundennummer, Artikelnummer, ...)
+- name:   Namen (Firma, Vor-/Nachname, Artikelname, ...)
+- body:   Sonstiges (E-Mail, Telefon, Ort, Beschreibung, ...)
+
+Darauf sitzt je nach Datenbank ein Index:
+
+- SQLite:     FTS5-Tabelle search_<entity>_fts (Trigram-Tokenizer, per
+              Trigger synchron), Ranking per bm25()
+- PostgreSQL: GIN-Trigram-Index (pg_trgm) auf dem Dokument
+- sonst:      ILIKE auf der (schmalen) Dokument-Tabelle
+
+Der Trigram-Index findet - wie das bisherige ILIKE '%suchwort%' - beliebige
+Teilstrings (also auch Praefixe), nutzt dabei aber den Index. Mehrere
+Suchwoerter muessen alle vorkommen, egal in welchem Feld. Suchwoerter mit
+weniger als 3 Zeichen werden per LIKE auf der Dokument-Tabelle geprueft.
+
+Die Dokumente werden beim Flush in der Transaktion des Aufrufers
+aktualisiert (Session-Events); bei Bulk-UPDATE/DELETE per ORM werden die
+betroffenen IDs vorab ueber die WHERE-Bedingung ermittelt. Laesst sich das
+nicht eingrenzen (UPDATE/DELETE ohne WHERE, INSERT ohne IDs), wird die
+Entity als veraltet markiert und vom System-Job
+rebuild_stale_search_index() im Hintergrund neu aufgebaut. Nach
+Aenderungen per Roh-SQL:
+    rebuild_search_index()
+
+Nutzung:
+    from src.services.search_service import apply_search
+    query = apply_search(Customer.query, 'customers', 'muster gmbh', ranked=True)
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import logging
+import importlib
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import instance_state
+
+from src.models.models import db
+
+logger = logging.getLogger(__name__)
+
+# Mindestlaenge fuer den Trigram-Index
+TRIGRAM_MIN_LENGTH = 3
+
+# Veraltete Entities (nach Bulk-Aenderungen) alle n Minuten neu aufbauen
+STALE_REBUILD_MINUTES = 5
+
+# Dokument-Felder in Index-Reihenfolge und ihre bm25-Gewichte
+FIELDS = ('name', 'number', 'body')
+BM25_WEIGHTS = (5.0, 10.0, 1.0)
+
+META_TABLE = 'search_index_meta'
+
+_metadata = sa.MetaData()
+
+meta_table = sa.Table(
+    META_TABLE, _metadata,
+    sa.Column('entity', sa.String(30), primary_key=True),
+    sa.Column('backend', sa.String(20), nullable=False),
+    sa.Column('rows', sa.Integer, default=0),
+    sa.Column('rebuilt_at', sa.DateTime),
+    sa.Column('stale', sa.Boolean, nullable=False, default=False),
+)
+
+
+class SearchEntity:
+    """
+    Definition einer durchsuchbaren Entity.
+
+    model:  'modul:Klasse', wird erst bei Bedarf importiert
+    fields: {'number': [...], 'name': [...], 'body': [...]} - Spaltennamen;
+            'kunde.<spalte>' liest die Spalte des verknuepften Kunden
+    parent: (entity, fremdschluessel) - Aenderungen am Eltern-Datensatz
+            aktualisieren auch diese Dokumente
+    """
+
+    def __init__(self, key, model, fields, parent=None):
+        self.key = key
+        self.model_path = model
+        self.fields = fields
+        self.parent = parent
+        self.table = sa.Table(
+            f'search_{key}', _metadata,
+            sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column('entity_id', sa.String(50), nullable=False, unique=True),
+            *[sa.Column(name, sa.Text, nullable=False, server_default='') for name in FIELDS],
+        )
+
+    @property
+    def fts_name(self):
+        return f'{self.table.name}_fts'
+
+    def model(self):
+        module_name, class_name = self.model_path.split(':')
+        return getattr(importlib.import_module(module_name), class_name)
+
+    def own_attrs(self):
+        """ORM-Attribute, deren Aenderung das Dokument betrifft"""
+        attrs = {'id'}
+        for columns in self.fields.values():
+            attrs.update(c for c in columns if '.' not in c)
+        if self.parent:
+            attrs.add(self.parent[1])
+        return attrs
+
+    def source(self):
+        """(FROM-Klausel, ID-Spalte, {Feld: [Spalten]})"""
+        model_table = self.model().__table__
+        from_clause = model_table
+        parent_table = None
+        if self.parent:
+            parent_table = SEARCH_ENTITIES[self.parent[0]].model().__table__
+            from_clause = model_table.outerjoin(
+                parent_table, parent_table.c.id == model_table.c[self.parent[1]])
+
+        groups = {}
+        for name in FIELDS:
+            groups[name] = [
+                parent_table.c[c.split('.', 1)[1]] if '.' in c else model_table.c[c]
+                for c in self.fields.get(name, ())
+            ]
+        return from_clause, model_table.c.id, groups
+
+
+SEARCH_ENTITIES = {
+    'customers': SearchEntity('customers', 'src.models.models:Customer', {
+        'number': ['id', 'customer_number', 'vat_id', 'barcode'],
+        'name': ['company_name', 'first_name', 'last_name', 'contact_person'],
+        'body': ['email', 'phone', 'mobile', 'city'],
+    }),
+    'articles': SearchEntity('articles', 'src.models.models:Article', {
+        'number': ['id', 'article_number', 'supplier_article_number'],
+        'name': ['name'],
+        'body': ['description', 'supplier'],
+    }),
+    'orders': SearchEntity('orders', 'src.models.models:Order', {
+        'number': ['id', 'order_number'],
+        'name': ['kunde.company_name', 'kunde.first_name', 'kunde.last_name'],
+        'body': ['description'],
+    }, parent=('customers', 'customer_id')),
+    'suppliers': SearchEntity('suppliers', 'src.models.models:Supplier', {
+        'number': ['id'],
+        'name': ['name', 'contact_person'],
+        'body': ['email', 'phone', 'city'],
+    }),
+}
+
+# Engine-URL -> {entity: backend}, nur wenn der Index existiert
+_ready = {}
+
+
+# ==========================================
+# DOKUMENTE
+# ==========================================
+
+def _concat(columns):
+    """Spalten mit Leerzeichen verbinden (NULL -> '')"""
+    if not columns:
+        return sa.literal('')
+    expr = sa.func.coalesce(columns[0], '')
+    for column in columns[1:]:
+        expr = expr.concat(' ').concat(sa.func.coalesce(column, ''))
+    return sa.func.trim(expr)
+
+
+def _document_select(entity, where=None):
+    from_clause, id_column, groups = entity.source()
+    stmt = sa.select(
+        id_column.label('entity_id'),
+        *[_concat(groups[name]).label(name) for name in FIELDS]
+    ).select_from(from_clause)
+    if where is not None:
+        stmt = stmt.where(where)
+    return stmt
+
+
+def _write_documents(connection, entity, ids=None, parent_ids=None):
+    """Dokumente (neu) schreiben: alle, nach ID oder nach Eltern-ID"""
+    table = entity.table
+    model_table = entity.model().__table__
+
+    if ids is None and parent_ids is None:
+        where = None
+        connection.execute(table.delete())
+    elif ids is not None:
+        where = model_table.c.id.in_(ids)
+        connection.execute(table.delete().where(table.c.entity_id.in_(ids)))
+    else:
+        fk = model_table.c[entity.parent[1]]
+        where = fk.in_(parent_ids)
+        connection.execute(table.delete().where(
+            table.c.entity_id.in_(sa.select(model_table.c.id).where(where))))
+
+    return connection.execute(table.insert().from_select(
+        ['entity_id', *FIELDS], _document_select(entity, where))).rowcount
+
+
+def _delete_documents(connection, entity, ids):
+    table = entity.table
+    connection.execute(table.delete().where(table.c.entity_id.in_(ids)))
+
+
+# ==========================================
+# INDEX ANLEGEN / NEU AUFBAUEN
+# ==========================================
+
+def _create_sqlite_fts(connection, entity):
+    fts, docs = entity.fts_name, entity.table.name
+    cols = ', '.join(FIELDS)
+    new_cols = ', '.join(f'new.{c}' for c in FIELDS)
+    old_cols = ', '.join(f'old.{c}' for c in FIELDS)
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, "
+        f"content='{docs}', content_rowid='id', tokenize='trigram')"))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {docs}_ai AFTER INSERT ON {docs} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {docs}_ad AFTER DELETE ON {docs} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END"))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {docs}_au AFTER UPDATE ON {docs} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"))
+
+
+def _create_pg_trgm(connection, entity):
+    docs = entity.table.name
+    with connection.begin_nested():
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    connection.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_{docs}_trgm ON {docs} "
+        f"USING gin ((name || ' ' || number || ' ' || body) gin_trgm_ops)"))
+
+
+def _create_structures(connection, entity):
+    """Dokument-Tabelle + Index anlegen; liefert das Backend"""
+    _metadata.create_all(connection, tables=[meta_table, entity.table])
+    dialect = connection.dialect.name
+    try:
+        if dialect == 'sqlite':
+            _create_sqlite_fts(connection, entity)
+            return 'fts5'
+        if dialect == 'postgresql':
+            _create_pg_trgm(connection, entity)
+            return 'pg_trgm'
+    except Exception as e:
+        logger.warning(f"Suchindex {entity.key}: kein Volltext-Index ({e}), nutze LIKE")
+    return 'like'
+
+
+def rebuild_search_index(entities=None, connection=None):
+    """
+    Legt den Suchindex an bzw. baut ihn komplett neu auf.
+
+    Args:
+        entities: Liste von Entity-Schluesseln (None = alle)
+        connection: Verbindung (None = db.session, wird committet)
+
+    Returns:
+        dict {entity: Anzahl Dokumente}
+    """
+    own_session = connection is None
+    if own_session:
+        connection = db.session.connection()
+
+    counts = {}
+    for key in entities or SEARCH_ENTITIES:
+        entity = SEARCH_ENTITIES[key]
+        backend = _create_structures(connection, entity)
+        counts[key] = _write_documents(connection, entity)
+        connection.execute(meta_table.delete().where(meta_table.c.entity == key))
+        connection.execute(meta_table.insert().values(
+            entity=key, backend=backend, rows=counts[key], rebuilt_at=datetime.utcnow(), stale=False))
+
+    if own_session:
+        db.session.commit()
+    _ready.pop(str(connection.engine.url), None)
+    return counts
+
+
+def mark_search_index_stale(entities, connection=None):
+    """Entities fuer den Neuaufbau im Hintergrund vormerken (Transaktion des Aufrufers)"""
+    connection = connection or db.session.connection()
+    connection.execute(meta_table.update().where(meta_table.c.entity.in_(list(entities))).values(stale=True))
+
+
+def rebuild_stale_search_index():
+    """
+    System-Job: als veraltet markierte Entities in einer eigenen Transaktion
+    neu aufbauen.
+
+    Returns:
+        dict {entity: Anzahl Dokumente}
+    """
+    with db.engine.begin() as connection:
+        if not inspect(connection).has_table(META_TABLE):
+            return {}
+        keys = [row.entity for row in connection.execute(
+            sa.select(meta_table.c.entity).where(meta_table.c.stale == True))]
+        counts = rebuild_search_index(keys, connection) if keys else {}
+    if counts:
+        logger.info(f"Suchindex neu aufgebaut: {', '.join(f'{k}={v}' for k, v in counts.items())}")
+    return counts
+
+
+def _backends(connection):
+    """{entity: backend} des Index (leer, wenn nicht angelegt)"""
+    url = str(connection.engine.url)
+    backends = _ready.get(url)
+    if backends is None:
+        if not inspect(connection).has_table(META_TABLE):
+            return {}
+        backends = {row.entity: row.backend
+                    for row in connection.execute(sa.select(meta_table.c.entity, meta_table.c.backend))}
+        if backends:
+            _ready[url] = backends
+    return backends
+
+
+def get_search_index_status():
+    """Backend, Dokumente beim letzten Neuaufbau und Zeitpunkt je Entity"""
+    connection = db.session.connection()
+    if not inspect(connection).has_table(META_TABLE):
+        return {}
+    return {
+        row.entity: {
+            'backend': row.backend,
+            'rows': row.rows,
+            'rebuilt_at': row.rebuilt_at.isoformat() if row.rebuilt_at else None,
+            'stale': bool(row.stale),
+        }
+        for row in connection.execute(meta_table.select())
+    }
+
+
+# ==========================================
+# SYNCHRONISATION (Session-Events)
+# ==========================================
+
+def _entity_by_class():
+    result = {}
+    for entity in SEARCH_ENTITIES.values():
+        try:
+            result[entity.model()] = entity
+        except (ImportError, AttributeError):
+            continue
+    return result
+
+
+def _changed(state, attrs):
+    for attr in attrs:
+        if attr in state.attrs and state.attrs[attr].history.has_changes():
+            return True
+    return False
+
+
+def _collect_changes(session):
+    """{entity: {'ids': set, 'deleted': set, 'parents': set}}"""
+    by_class = _entity_by_class()
+    changes = {}
+
+    def _entry(key):
+        return changes.setdefault(key, {'ids': set(), 'deleted': set(), 'parents': set()})
+
+    children = {e.parent[0]: e for e in SEARCH_ENTITIES.values() if e.parent}
+
+    for mode, objects in (('new', session.new), ('dirty', session.dirty), ('deleted', session.deleted)):
+        for obj in objects:
+            entity = by_class.get(type(obj))
+            if entity is None:
+                continue
+            state = instance_state(obj)
+            if mode == 'dirty' and not _changed(state, entity.own_attrs()):
+                continue
+            if mode == 'deleted':
+                _entry(entity.key)['deleted'].add(obj.id)
+            else:
+                _entry(entity.key)['ids'].add(obj.id)
+
+            # Abhaengige Dokumente (z.B. Auftraege bei Kundenname)
+            child = children.get(entity.key)
+            if child and mode != 'new':
+                parent_attrs = {c.split('.', 1)[1] for cols in child.fields.values()
+                                for c in cols if '.' in c}
+                if mode == 'deleted' or _changed(state, parent_attrs):
+                    _entry(child.key)['parents'].add(obj.id)
+
+    return changes
+
+
+def _on_after_flush(session, flush_context):
+    """Dokumente in der gleichen Transaktion aktualisieren"""
+    try:
+        changes = _collect_changes(session)
+        if not changes:
+            return
+        connection = session.connection()
+        backends = _backends(connection)
+        for key, change in changes.items():
+            if key not in backends:
+                continue
+            entity = SEARCH_ENTITIES[key]
+            if change['deleted']:
+                _delete_documents(connection, entity, change['deleted'])
+            if change['ids']:
+                _write_documents(connection, entity, ids=change['ids'])
+            if change['parents']:
+                _write_documents(connection, entity, parent_ids=change['parents'])
+    except Exception as e:
+        logger.warning(f"Suchindex nicht aktualisiert: {e}")
+
+
+def _bulk_row_ids(orm_execute_state):
+    """
+    IDs aus den Parametern eines ORM-Bulk-INSERT/Upsert oder eines Bulk-UPDATE
+    nach Primaerschluessel (Parameterliste); None = unbekannt
+    """
+    params = orm_execute_state.parameters
+    if orm_execute_state.is_update and not isinstance(params, (list, tuple)):
+        return None
+    rows = params if isinstance(params, (list, tuple)) else [params or {}]
+    ids = {row.get('id') for row in rows}
+    return None if not ids or None in ids else ids
+
+
+def _where_ids(entity, orm_execute_state):
+    """
+    IDs der Zeilen, die ein Bulk-UPDATE/DELETE trifft (vor dem Statement per
+    WHERE-Bedingung abgefragt); None = nicht eingrenzbar
+    """
+    whereclause = getattr(orm_execute_state.statement, 'whereclause', None)
+    if whereclause is None:
+        return None
+    model_table = entity.model().__table__
+    try:
+        with orm_execute_state.session.connection().begin_nested() as savepoint:
+            ids = set(savepoint.connection.execute(
+                sa.select(model_table.c.id).where(whereclause)).scalars())
+    except Exception as e:
+        logger.debug(f"Suchindex {entity.key}: betroffene IDs nicht ermittelbar ({e})")
+        return None
+    return ids
+
+
+def _updated_columns(orm_execute_state):
+    """
+    Spaltennamen, die ein Bulk-UPDATE setzt (VALUES bzw. Parameterliste
+    beim UPDATE nach Primaerschluessel); None = unbekannt
+    """
+    statement = orm_execute_state.statement
+    values = getattr(statement, '_values', None) or dict(getattr(statement, '_ordered_values', None) or ())
+    if values:
+        return {getattr(key, 'key', key) for key in values}
+    params = orm_execute_state.parameters
+    if isinstance(params, (list, tuple)) and params and all(isinstance(row, dict) for row in params):
+        return {key for row in params for key in row} - {'id'}
+    return None
+
+
+def _affected_entities(entity, orm_execute_state):
+    """Entities, deren Dokumente das Statement betrifft (eigene + Kinder)"""
+    children = [e for e in SEARCH_ENTITIES.values() if e.parent and e.parent[0] == entity.key]
+    columns = _updated_columns(orm_execute_state) if orm_execute_state.is_update else None
+    if columns is None:
+        return [entity.key] + [child.key for child in children]
+
+    keys = [entity.key] if columns & entity.own_attrs() else []
+    for child in children:
+        parent_attrs = {c.split('.', 1)[1] for cols in child.fields.values() for c in cols if '.' in c}
+        if columns & parent_attrs:
+            keys.append(child.key)
+    return keys
+
+
+def _on_orm_execute(orm_execute_state):
+    """
+    Bulk-INSERT/Upsert und UPDATE nach Primaerschluessel (Importe): nur die
+    Dokumente der uebergebenen IDs (und ihrer Kind-Entities). Bulk-UPDATE/
+    DELETE mit WHERE: die vorab abgefragten IDs. Sonst wird die Entity als
+    veraltet markiert (Neuaufbau im Hintergrund, rebuild_stale_search_index).
+    UPDATEs ohne indizierte Spalte (z.B. Bestands-Salden) lassen den Index
+    unberuehrt.
+    """
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    entity = _entity_by_class().get(mapper.class_) if mapper is not None else None
+    if entity is None:
+        return None
+    keys = _affected_entities(entity, orm_execute_state)
+    if not keys:
+        return None
+
+    ids = None if orm_execute_state.is_delete else _bulk_row_ids(orm_execute_state)
+    if ids is None and not orm_execute_state.is_insert:
+        ids = _where_ids(entity, orm_execute_state)
+
+    result = orm_execute_state.invoke_statement()
+    try:
+        connection = orm_execute_state.session.connection()
+        backends = _backends(connection)
+        keys = [key for key in keys if key in backends]
+        if ids is None:
+            if keys:
+                mark_search_index_stale(keys, connection)
+        elif ids:
+            for key in keys:
+                if key != entity.key:
+                    _write_documents(connection, SEARCH_ENTITIES[key], parent_ids=ids)
+                elif orm_execute_state.is_delete:
+                    _delete_documents(connection, entity, ids)
+                else:
+                    _write_documents(connection, entity, ids=ids)
+    except Exception as e:
+        logger.warning(f"Suchindex nach Bulk-Aenderung nicht aktualisiert: {e}")
+    return result
+
+
+def _register_events():
+    if not event.contains(Session, 'after_flush', _on_after_flush):
+        event.listen(Session, 'after_flush', _on_after_flush)
+    if not event.contains(Session, 'do_orm_execute', _on_orm_execute):
+        event.listen(Session, 'do_orm_execute', _on_orm_execute)
+
+
+def init_search_index(app):
+    """
+    Registriert die Session-Events und den Neuaufbau veralteter Entities.
+    In create_app() nach init_scheduler() aufrufen.
+    """
+    if app.extensions.get('search_index'):
+        return
+    _register_events()
+
+    try:
+        from src.services.scheduler_service import add_system_job
+        add_system_job(rebuild_stale_search_index, 'interval', 'search_index_rebuild',
+                       minutes=STALE_REBUILD_MINUTES)
+    except ImportError:
+        pass  # Ohne APScheduler: Neuaufbau per rebuild_search_index() (CLI/Admin)
+
+    app.extensions['search_index'] = True
+
+
+# ==========================================
+# SUCHEN
+# ==========================================
+
+def split_terms(query_text):
+    """Suchwoerter (Leerzeichen-getrennt, ohne Duplikate)"""
+    terms = []
+    for term in (query_text or '').lower().split():
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def _like_pattern(term, prefix_only=False):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"{escaped}%" if prefix_only else f"%{escaped}%"
+
+
+def _like_conditions(alias, terms, params, operator='LIKE'):
+    """Jedes Suchwort muss in einem der Felder vorkommen"""
+    conditions = []
+    for i, term in enumerate(terms):
+        params[f't{i}'] = _like_pattern(term)
+        fields = ' OR '.join(f"{alias}.{f} {operator} :t{i} ESCAPE '\\'" for f in FIELDS)
+        conditions.append(f"({fields})")
+    return conditions
+
+
+def _prefix_rank(operator='LIKE'):
+    """Treffer am Anfang von Nummer/Name zuerst"""
+    return (f"(CASE WHEN d.number {operator} :prefix ESCAPE '\\' THEN 0 "
+            f"WHEN d.name {operator} :prefix ESCAPE '\\' THEN 1 ELSE 2 END)")
+
+
+def _match_select(entity, terms, backend):
+    """SELECT entity_id, rank (kleiner = besser) fuer die Suchwoerter"""
+    docs = entity.table.name
+    params = {'prefix': _like_pattern(terms[0], prefix_only=True)}
+
+    if backend == 'fts5' and any(len(t) >= TRIGRAM_MIN_LENGTH for t in terms):
+        fts = entity.fts_name
+        long_terms = [t for t in terms if len(t) >= TRIGRAM_MIN_LENGTH]
+        short_terms = [t for t in terms if len(t) < TRIGRAM_MIN_LENGTH]
+        params['match'] = ' AND '.join('"' + t.replace('"', '""') + '"' for t in long_terms)
+        weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+        where = [f"{fts} MATCH :match"] + _like_conditions('d', short_terms, params)
+        sql = (f"SELECT d.entity_id AS entity_id, "
+               f"{_prefix_rank()} * 1000 + bm25({fts}, {weights}) AS rank "
+               f"FROM {fts} JOIN {docs} d ON d.id = {fts}.rowid "
+               f"WHERE {' AND '.join(where)}")
+    else:
+        operator = 'ILIKE' if backend == 'pg_trgm' else 'LIKE'
+        if backend == 'pg_trgm':
+            # Gleicher Ausdruck wie im GIN-Index
+            where = []
+            for i, term in enumerate(terms):
+                params[f't{i}'] = _like_pattern(term)
+                where.append(f"(d.name || ' ' || d.number || ' ' || d.body) ILIKE :t{i} ESCAPE '\\'")
+        else:
+            where = _like_conditions('d', terms, params, operator)
+        sql = (f"SELECT d.entity_id AS entity_id, {_prefix_rank(operator)} AS rank "
+               f"FROM {docs} d WHERE {' AND '.join(where)}")
+
+    return text(sql).bindparams(**params).columns(
+        sa.column('entity_id', sa.String), sa.column('rank', sa.Float))
+
+
+def ilike_clause(entity_key, query_text):
+    """
+    Bisherige Suche ohne Index: jedes Suchwort per ILIKE in einer der
+    Spalten (Fallback und Vergleichsbasis fuer den Benchmark).
+    """
+    entity = SEARCH_ENTITIES[entity_key]
+    model_table = entity.model().__table__
+    _, _, groups = entity.source()
+    own = [c for name in FIELDS for c in groups[name] if c.table is model_table]
+    parent = [c for name in FIELDS for c in groups[name] if c.table is not model_table]
+
+    conditions = []
+    for term in split_terms(query_text):
+        pattern = _like_pattern(term)
+        matches = [c.ilike(pattern, escape='\\') for c in own]
+        if parent:
+            # Spalten des Eltern-Datensatzes (z.B. Kundenname beim Auftrag)
+            parent_table = parent[0].table
+            matches.append(model_table.c[entity.parent[1]].in_(
+                sa.select(parent_table.c.id).where(
+                    sa.or_(*[c.ilike(pattern, escape='\\') for c in parent]))))
+        conditions.append(sa.or_(*matches))
+    return sa.and_(*conditions)
+
+
+def apply_search(query, entity_key, query_text, ranked=False):
+    """
+    Filtert eine Model-Query auf die Suchtreffer.
+
+    Args:
+        query: Query auf das Model der Entity (weitere Filter bleiben erhalten)
+        entity_key: 'customers', 'articles', 'orders' oder 'suppliers'
+        query_text: Suchtext des Benutzers
+        ranked: True = nach Relevanz sortieren (Suche beim Tippen)
+
+    Returns:
+        Gefilterte Query (ohne Suchwoerter unveraendert)
+    """
+    terms = split_terms(query_text)
+    if not terms:
+        return query
+
+    entity = SEARCH_ENTITIES[entity_key]
+    backend = _backends(db.session.connection()).get(entity_key)
+    if backend is None:
+        return query.filter(ilike_clause(entity_key, query_text))
+
+    matches = _match_select(entity, terms, backend).subquery()
+    model = entity.model()
+    if ranked:
+        return query.join(matches, matches.c.entity_id == model.id).order_by(matches.c.rank)
+    return query.filter(model.id.in_(sa.select(matches.c.entity_id)))
+
+
+__all__ = [
+    'SEARCH_ENTITIES',
+    'apply_search',
+    'ilike_clause',
+    'split_terms',
+    'rebuild_search_index',
+    'rebuild_stale_search_index',
+    'mark_search_index_stale',
+    'get_search_index_status',
+    'init_search_index',
+]
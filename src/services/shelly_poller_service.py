@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+SHELLY-POLLER
+=============
+Fragt viele Shelly-Geraete gleichzeitig ab statt nacheinander:
+
+- eine gemeinsame requests-Session (Keep-Alive je Geraet) fuer Scan,
+  Live-Dashboard und Energie-Aufzeichnung
+- begrenzter Thread-Pool, Timeout je Geraet (Verbindung/Antwort)
+- Circuit-Breaker: nach CIRCUIT_FAILURES Fehlversuchen wird ein Geraet
+  CIRCUIT_OPEN_SECONDS lang nicht mehr angefragt (offline Steckdosen
+  bremsen den Abruf sonst jedes Mal um den vollen Timeout)
+- record_readings(): eine Messrunde, alle Messwerte in einem INSERT,
+  Stunden-/Tageswerte gleich mit (shelly_rollup_service); per
+  SHELLY_SAMPLE_SECONDS als Scheduler-Job im Hintergrund
+
+Nutzung:
+    results = poll_power(devices)          # {device.id: power_data | None}
+    apply_status(devices, results)
+    found = scan_network('192.168.1')      # [{'ip', 'type', 'mac', ...}]
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import insert
+
+from src.utils.shelly_integration import device_info_from, parse_power_data
+
+logger = logging.getLogger(__name__)
+
+# Gleichzeitige Abfragen (Dashboard/Aufzeichnung bzw. Netzwerk-Scan)
+POLL_WORKERS = 16
+SCAN_WORKERS = 64
+# Timeout je Geraet: (Verbindungsaufbau, Antwort) in Sekunden
+DEVICE_TIMEOUT = (1.0, 2.0)
+SCAN_TIMEOUT = 0.5
+# Verbindungs-Pools (je Geraet einer) in der gemeinsamen Session
+POOL_HOSTS = 64
+
+CIRCUIT_FAILURES = 3
+CIRCUIT_OPEN_SECONDS = 60
+
+_lock = threading.Lock()
+_session = None
+# ip -> {'failures': n, 'open_until': monotonic}
+_circuits = {}
+
+
+def get_session():
+    """Gemeinsame Keep-Alive-Session (thread-sicher fuer parallele GETs)"""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=2)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+# ==========================================
+# CIRCUIT-BREAKER
+# ==========================================
+
+def _circuit_open(ip, now):
+    state = _circuits.get(ip)
+    return state is not None and state['open_until'] > now
+
+
+def _record_result(ip, reachable):
+    with _lock:
+        if reachable:
+            _circuits.pop(ip, None)
+            return
+        state = _circuits.setdefault(ip, {'failures': 0, 'open_until': 0})
+        state['failures'] += 1
+        # Auch nach Ablauf: ein weiterer Fehlversuch oeffnet sofort wieder
+        if state['failures'] >= CIRCUIT_FAILURES:
+            state['open_until'] = time.monotonic() + CIRCUIT_OPEN_SECONDS
+            logger.info(f"Shelly {ip}: {state['failures']} Fehlversuche, "
+                        f"Pause fuer {CIRCUIT_OPEN_SECONDS}s")
+
+
+def circuit_state():
+    """Geraete mit Fehlversuchen: {ip: {'failures', 'open'}}"""
+    now = time.monotonic()
+    with _lock:
+        return {ip: {'failures': s['failures'], 'open': s['open_until'] > now} for ip, s in _circuits.items()}
+
+
+def reset_circuits():
+    with _lock:
+        _circuits.clear()
+
+
+# ==========================================
+# ABFRAGEN
+# ==========================================
+
+def _parallel(func, items, workers):
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(workers, len(items)), thread_name_prefix='shelly') as pool:
+        return list(pool.map(func, items))
+
+
+def poll_status(targets, timeout=DEVICE_TIMEOUT):
+    """
+    Energie-Daten fuer (key, ip, channel)-Tupel parallel abfragen.
+
+    Returns:
+        dict: key -> power_data (siehe parse_power_data) oder None, wenn
+              das Geraet nicht antwortet oder pausiert ist
+    """
+    now = time.monotonic()
+    results = {key: None for key, ip, _ in targets if _circuit_open(ip, now)}
+
+    def fetch(target):
+        key, ip, channel = target
+        try:
+            response = get_session().get(f'http://{ip}/status', timeout=timeout)
+            response.raise_for_status()
+            status = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.debug(f"Shelly {ip} nicht erreichbar: {e}")
+            _record_result(ip, False)
+            return key, None
+        _record_result(ip, True)
+        try:
+            return key, parse_power_data(status, channel) or None
+        except (IndexError, AttributeError, TypeError) as e:
+            logger.warning(f"Shelly {ip}: unerwartete Status-Antwort ({e})")
+            return key, None
+
+    pending = [target for target in targets if target[0] not in results]
+    results.update(_parallel(fetch, pending, POLL_WORKERS))
+    return results
+
+
+def poll_power(devices, timeout=DEVICE_TIMEOUT):
+    """Live-Daten fuer ShellyDevice-Datensaetze: {device.id: power_data | None}"""
+    # ORM-Attribute vorab lesen, die Threads fassen die Session nicht an
+    return poll_status([(d.id, d.ip_address, d.channel or 0) for d in devices], timeout)
+
+
+def apply_status(devices, results):
+    """Letzten Status aus poll_power() in die Datensaetze uebernehmen (ohne Commit)"""
+    now = datetime.now()
+    for device in devices:
+        power_data = results.get(device.id)
+        if power_data:
+            device.is_online = True
+            device.is_on = power_data.get('is_on', False)
+            device.last_power_w = power_data.get('power', 0)
+            device.last_seen = now
+        else:
+            device.is_online = False
+
+
+def scan_network(network_prefix='192.168.1', timeout=SCAN_TIMEOUT):
+    """
+    /24-Netz parallel nach Shelly-Geraeten absuchen (Endpunkt /shelly).
+
+    Returns:
+        list: Geraete-Info (device_info_from) mit 'ip', sortiert nach Adresse
+    """
+    logger.info(f"Starte Netzwerk-Scan für Shelly-Geräte im Netzwerk {network_prefix}.0/24")
+
+    def probe(ip):
+        try:
+            response = get_session().get(f'http://{ip}/shelly', timeout=timeout)
+            if response.status_code == 200:
+                data = response.json()
+                if isinstance(data, dict):
+                    return {'ip': ip, **device_info_from(data)}
+        except (requests.exceptions.RequestException, ValueError):
+            pass  # Keine Antwort, kein Shelly-Gerät
+        return None
+
+    found = [info for info in _parallel(probe, [f'{network_prefix}.{i}' for i in range(1, 255)], SCAN_WORKERS)
+             if info]
+    for info in found:
+        logger.info(f"Shelly-Gerät gefunden: {info['ip']} - {info['type']}")
+    logger.info(f"Scan abgeschlossen. {len(found)} Shelly-Geräte gefunden.")
+    return found
+
+
+# ==========================================
+# ENERGIE-AUFZEICHNUNG
+# ==========================================
+
+def record_readings(devices=None):
+    """
+    Eine Messrunde: alle aktiven Geraete mit Energie-Tracking abfragen,
+    Messwerte in einem INSERT schreiben, Stunden-/Tageswerte fortschreiben,
+    Geraete-Status aktualisieren.
+
+    Returns:
+        dict: devices, recorded, offline
+    """
+    from src.models.models import db, ShellyDevice, ShellyEnergyReading
+    from src.services.shelly_rollup_service import apply_readings
+
+    if devices is None:
+        devices = ShellyDevice.query.filter_by(active=True, track_energy=True).all()
+    results = poll_power(devices)
+
+    timestamp = datetime.utcnow()
+    rows = [{
+        'device_id': device.id,
+        'timestamp': timestamp,
+        'power_w': power_data.get('power'),
+        'voltage_v': power_data.get('voltage'),
+        'current_a': power_data.get('current'),
+        'power_factor': power_data.get('pf'),
+        'energy_wh': power_data.get('energy'),
+        'is_on': power_data.get('is_on'),
+        'temperature_c': power_data.get('temperature'),
+    } for device in devices if (power_data := results.get(device.id))]
+
+    try:
+        if rows:
+            apply_readings(rows)  # setzt energy_delta_wh
+            db.session.execute(insert(ShellyEnergyReading), rows)
+        apply_status(devices, results)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Shelly-Messwerte nicht gespeichert: {e}")
+        raise
+
+    return {'devices': len(devices), 'recorded': len(rows), 'offline': len(devices) - len(rows)}
+
+
+def init_shelly_sampling(app):
+    """
+    Hintergrund-Aufzeichnung alle SHELLY_SAMPLE_SECONDS (0 = aus, dann nur
+    ueber POST /shelly/api/energy/record). In create_app() nach
+    init_scheduler() aufrufen; laeuft wie alle System-Jobs nur beim Leader.
+    """
+    seconds = app.config.get('SHELLY_SAMPLE_SECONDS', 0)
+    if not seconds or app.extensions.get('shelly_sampling'):
+        return
+
+    try:
+        from src.services.scheduler_service import add_system_job
+        # Messrunden nie parallel: eine zweite Runde wuerde den Zaehlerstand vor
+        # dem Commit der ersten lesen und den Verbrauch doppelt zaehlen
+        add_system_job(record_readings, 'interval', 'shelly_energy_sample', seconds=seconds,
+                       max_instances=1, coalesce=True)
+    except ImportError:
+        pass  # Ohne APScheduler: Aufzeichnung nur per Cronjob
+
+    app.extensions['shelly_sampling'] = True
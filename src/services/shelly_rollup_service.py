@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+SHELLY-ENERGIE: STUNDEN-/TAGESWERTE UND AUFBEWAHRUNG
+===================================================
+Rohmesswerte (ShellyEnergyReading, bei Minutentakt ~500.000 Zeilen je
+Maschine und Jahr) werden beim Schreiben zu Stunden- und Tageswerten
+(ShellyEnergyRollup) verdichtet:
+
+- apply_readings(): inkrementell je Messrunde (shelly_poller_service),
+  Verbrauch aus Zaehler-Deltas, Leistung min/max/Summe, Einschaltzeit;
+  geschrieben per INSERT ... ON CONFLICT DO UPDATE (addiert auf den
+  Bestand), damit sich ueberlappende Messrunden nicht an
+  uq_shelly_energy_rollup stossen
+- Dashboard, Verlauf und Produktions-Energie lesen nur noch Rollups
+  (eine Zeile je Geraet und Tag bzw. Stunde)
+- prune_readings(): Rohdaten nach SHELLY_RAW_RETENTION_DAYS Tagen loeschen,
+  Stundenwerte nach HOUR_RETENTION_DAYS; Tageswerte bleiben
+- rebuild_rollups(): Neuaufbau aus den vorhandenen Rohdaten (Migration,
+  Reparatur)
+
+Stunden laufen in UTC (wie die Zeitstempel der Messwerte), Tage in
+Ortszeit - ein Tag besteht damit immer aus ganzen UTC-Stunden.
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import logging
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, case, func, or_
+
+from src.models.models import db, ShellyDevice, ShellyEnergyReading, ShellyEnergyRollup
+
+logger = logging.getLogger(__name__)
+
+HOUR = 'hour'
+DAY = 'day'
+
+# Einschaltzeit hoechstens so lange ueber eine Messluecke fortschreiben
+MAX_GAP_SECONDS = 15 * 60
+# Rohdaten-Aufbewahrung (Standard, app.config['SHELLY_RAW_RETENTION_DAYS'])
+RAW_RETENTION_DAYS = 30
+HOUR_RETENTION_DAYS = 400
+PRUNE_INTERVAL_HOURS = 6
+# Messwerte je Schritt beim Neuaufbau
+REBUILD_BATCH = 5000
+
+# Verlaufspunkt fuer das Diagramm (Felder wie ShellyEnergyReading)
+HistoryPoint = namedtuple('HistoryPoint', ['timestamp', 'power_w', 'energy_wh'])
+
+
+# ==========================================
+# ZEITRAEUME
+# ==========================================
+
+def hour_bucket(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(ts):
+    """Ortszeit-Mitternacht des Tages eines UTC-Zeitstempels (naiv)"""
+    local = ts.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    return local.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def day_start_utc(day):
+    """UTC-Zeitpunkt (naiv) einer Ortszeit-Mitternacht"""
+    return day.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# ==========================================
+# INKREMENTELLE PFLEGE
+# ==========================================
+
+def _new_rollup(device_id, period, start):
+    return ShellyEnergyRollup(device_id=device_id, period=period, bucket_start=start, readings=0,
+                              energy_wh=0, power_sum_w=0, on_seconds=0)
+
+
+def _load_rollups(device_ids, keys):
+    starts = {start for _, _, start in keys}
+    found = ShellyEnergyRollup.query.filter(
+        ShellyEnergyRollup.device_id.in_(device_ids),
+        ShellyEnergyRollup.bucket_start.in_(starts)
+    ).all()
+    return {(r.device_id, r.period, r.bucket_start): r for r in found}
+
+
+def _upsert_insert():
+    """(insert, least, greatest) des Dialekts mit ON CONFLICT DO UPDATE, sonst None"""
+    dialect_name = db.session.get_bind().dialect.name
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert, func.min, func.max
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert, func.least, func.greatest
+    return None
+
+
+def _upsert_rollups(upsert, rollups):
+    """
+    Aufgelaufene Werte je Zeitraum in einem Statement einrechnen: neue
+    Zeitraeume anlegen, vorhandene (auch von einer parallelen Messrunde
+    angelegte) um Summen, min/max und letzte Messung ergaenzen.
+    """
+    insert, least, greatest = upsert
+    table = ShellyEnergyRollup.__table__
+    columns = [c.name for c in table.columns if c.name != 'id']
+    stmt = insert(table)
+    old, new = table.c, stmt.excluded
+
+    def both(column):
+        return func.coalesce(old[column], new[column]), func.coalesce(new[column], old[column])
+
+    newer = or_(old.last_reading_at.is_(None), new.last_reading_at >= old.last_reading_at)
+    values = {column: old[column] + new[column]
+              for column in ('readings', 'energy_wh', 'power_sum_w', 'on_seconds')}
+    values.update({column: least(*both(column)) for column in ('power_min_w', 'energy_min_wh')})
+    values.update({column: greatest(*both(column)) for column in ('power_max_w', 'energy_max_wh')})
+    values.update({
+        'last_reading_at': case((newer, new.last_reading_at), else_=old.last_reading_at),
+        'last_is_on': case((newer, new.last_is_on), else_=old.last_is_on),
+        'last_energy_wh': case((newer, func.coalesce(new.last_energy_wh, old.last_energy_wh)),
+                               else_=old.last_energy_wh),
+    })
+    stmt = stmt.on_conflict_do_update(index_elements=['device_id', 'period', 'bucket_start'], set_=values)
+    db.session.execute(stmt, [{column: getattr(rollup, column) for column in columns}
+                              for rollup in rollups])
+
+
+def _last_state(device_ids):
+    """Letzte verdichtete Messung je Geraet (juengster Stundenwert)"""
+    latest = db.session.query(
+        ShellyEnergyRollup.device_id,
+        func.max(ShellyEnergyRollup.bucket_start).label('start')
+    ).filter(
+        ShellyEnergyRollup.period == HOUR,
+        ShellyEnergyRollup.device_id.in_(device_ids)
+    ).group_by(ShellyEnergyRollup.device_id).subquery()
+    rows = db.session.query(ShellyEnergyRollup).join(latest, and_(
+        ShellyEnergyRollup.device_id == latest.c.device_id,
+        ShellyEnergyRollup.bucket_start == latest.c.start,
+        ShellyEnergyRollup.period == HOUR))
+    return {r.device_id: [r.last_reading_at, r.last_energy_wh, r.last_is_on] for r in rows}
+
+
+def _add(rollup, row, delta_wh, on_seconds):
+    ts, power, energy = row['timestamp'], row.get('power_w'), row.get('energy_wh')
+    rollup.readings += 1
+    rollup.energy_wh += delta_wh
+    rollup.on_seconds += on_seconds
+    if power is not None:
+        rollup.power_sum_w += power
+        rollup.power_min_w = power if rollup.power_min_w is None else min(rollup.power_min_w, power)
+        rollup.power_max_w = power if rollup.power_max_w is None else max(rollup.power_max_w, power)
+    if energy is not None:
+        rollup.energy_min_wh = energy if rollup.energy_min_wh is None else min(rollup.energy_min_wh, energy)
+        rollup.energy_max_wh = energy if rollup.energy_max_wh is None else max(rollup.energy_max_wh, energy)
+    if rollup.last_reading_at is None or ts >= rollup.last_reading_at:
+        rollup.last_reading_at = ts
+        rollup.last_is_on = row.get('is_on')
+        if energy is not None:
+            rollup.last_energy_wh = energy
+
+
+def apply_readings(rows):
+    """
+    Messwerte in die Stunden-/Tageswerte einrechnen (ohne Commit).
+
+    Args:
+        rows: dicts mit device_id, timestamp (UTC), power_w, energy_wh, is_on;
+              energy_delta_wh wird gesetzt (Verbrauch seit der Vormessung)
+
+    Verbrauch und Einschaltzeit seit der Vormessung zaehlen zum Zeitraum
+    der neuen Messung. Zaehlt der Zaehler rueckwaerts (Neustart des
+    Geraets), gilt der neue Stand als Verbrauch seit dem Neustart.
+    """
+    if not rows:
+        return
+    ordered = sorted(rows, key=lambda r: (r['device_id'], r['timestamp']))
+    device_ids = sorted({r['device_id'] for r in ordered})
+    upsert = _upsert_insert()
+    if upsert:
+        # Nur die Zuwaechse dieser Runde sammeln, die DB rechnet sie ein
+        rollups = {}
+    else:
+        keys = {(r['device_id'], period, start) for r in ordered
+                for period, start in ((HOUR, hour_bucket(r['timestamp'])), (DAY, day_bucket(r['timestamp'])))}
+        rollups = _load_rollups(device_ids, keys)
+    state = _last_state(device_ids)
+
+    for row in ordered:
+        device_id, ts, energy = row['device_id'], row['timestamp'], row.get('energy_wh')
+        last_at, last_energy, last_on = state.get(device_id, [None, None, None])
+
+        delta_wh = on_seconds = 0
+        if last_at is None or ts > last_at:
+            if energy is not None and last_energy is not None:
+                delta_wh = energy - last_energy if energy >= last_energy else energy
+            if last_on and last_at is not None:
+                on_seconds = int(min((ts - last_at).total_seconds(), MAX_GAP_SECONDS))
+            state[device_id] = [ts, energy if energy is not None else last_energy, row.get('is_on')]
+        row['energy_delta_wh'] = delta_wh
+
+        for period, start in ((HOUR, hour_bucket(ts)), (DAY, day_bucket(ts))):
+            key = (device_id, period, start)
+            if key not in rollups:
+                rollups[key] = _new_rollup(device_id, period, start)
+                if not upsert:
+                    db.session.add(rollups[key])
+            _add(rollups[key], row, delta_wh, on_seconds)
+
+    if upsert:
+        _upsert_rollups(upsert, rollups.values())
+
+
+def rebuild_rollups(device_ids=None):
+    """
+    Stunden-/Tageswerte ab dem ersten vorhandenen Rohwert neu aufbauen.
+    Aeltere Rollups (Rohdaten bereits geloescht) bleiben unveraendert.
+
+    Returns:
+        int: verarbeitete Messwerte
+    """
+    if device_ids is None:
+        device_ids = [row[0] for row in db.session.query(ShellyEnergyReading.device_id).distinct()]
+
+    processed = 0
+    for device_id in device_ids:
+        first = db.session.query(func.min(ShellyEnergyReading.timestamp)).filter(
+            ShellyEnergyReading.device_id == device_id).scalar()
+        if first is None:
+            continue
+        start_day = day_bucket(first)
+        ShellyEnergyRollup.query.filter(
+            ShellyEnergyRollup.device_id == device_id,
+            or_(and_(ShellyEnergyRollup.period == DAY, ShellyEnergyRollup.bucket_start >= start_day),
+                and_(ShellyEnergyRollup.period == HOUR,
+                     ShellyEnergyRollup.bucket_start >= day_start_utc(start_day)))
+        ).delete(synchronize_session=False)
+        db.session.expire_all()
+
+        query = db.session.query(
+            ShellyEnergyReading.timestamp, ShellyEnergyReading.power_w,
+            ShellyEnergyReading.energy_wh, ShellyEnergyReading.is_on
+        ).filter(
+            ShellyEnergyReading.device_id == device_id
+        ).order_by(ShellyEnergyReading.timestamp).execution_options(yield_per=REBUILD_BATCH)
+
+        batch = []
+        for reading in query:
+            batch.append({'device_id': device_id, 'timestamp': reading.timestamp, 'power_w': reading.power_w,
+                          'energy_wh': reading.energy_wh, 'is_on': reading.is_on})
+            if len(batch) == REBUILD_BATCH:
+                apply_readings(batch)
+                db.session.flush()
+                processed += len(batch)
+                batch = []
+        apply_readings(batch)
+        processed += len(batch)
+        db.session.commit()
+
+    return processed
+
+
+def prune_readings(keep_days=None, keep_hour_days=HOUR_RETENTION_DAYS):
+    """
+    Rohdaten vor keep_days Tagen (ab Ortszeit-Mitternacht) und Stundenwerte
+    vor keep_hour_days Tagen loeschen; Tageswerte bleiben erhalten.
+
+    Returns:
+        dict: readings, hours (geloeschte Zeilen)
+    """
+    if keep_days is None:
+        from flask import current_app
+        keep_days = current_app.config.get('SHELLY_RAW_RETENTION_DAYS', RAW_RETENTION_DAYS)
+    today = day_bucket(datetime.utcnow())
+    deleted = {'readings': 0, 'hours': 0}
+
+    if keep_days:
+        cutoff = day_start_utc(today - timedelta(days=keep_days))
+        deleted['readings'] = ShellyEnergyReading.query.filter(
+            ShellyEnergyReading.timestamp < cutoff).delete(synchronize_session=False)
+    if keep_hour_days:
+        cutoff = day_start_utc(today - timedelta(days=keep_hour_days))
+        deleted['hours'] = ShellyEnergyRollup.query.filter(
+            ShellyEnergyRollup.period == HOUR,
+            ShellyEnergyRollup.bucket_start < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+
+    if deleted['readings'] or deleted['hours']:
+        logger.info(f"Shelly-Aufbewahrung: {deleted['readings']} Rohwerte, "
+                    f"{deleted['hours']} Stundenwerte geloescht")
+    return deleted
+
+
+# ==========================================
+# ABFRAGEN
+# ==========================================
+
+def today_rollups(device_ids):
+    """Tageswert (heute, Ortszeit) je Geraet: {device_id: ShellyEnergyRollup}"""
+    if not device_ids:
+        return {}
+    today = day_bucket(datetime.utcnow())
+    return {r.device_id: r for r in ShellyEnergyRollup.query.filter(
+        ShellyEnergyRollup.device_id.in_(device_ids),
+        ShellyEnergyRollup.period == DAY,
+        ShellyEnergyRollup.bucket_start == today)}
+
+
+def hourly_history(device_id, since):
+    """Stundenverlauf ab since (UTC): Zaehlerstand und mittlere Leistung je Stunde"""
+    rollups = ShellyEnergyRollup.query.filter(
+        ShellyEnergyRollup.device_id == device_id,
+        ShellyEnergyRollup.period == HOUR,
+        ShellyEnergyRollup.bucket_start >= hour_bucket(since)
+    ).order_by(ShellyEnergyRollup.bucket_start).all()
+    return [HistoryPoint(r.bucket_start, round(r.avg_power_w, 1), r.energy_max_wh) for r in rollups]
+
+
+def energy_between(device_id, start, end):
+    """
+    Energie eines Geraets im Zeitraum [start, end) (UTC) aus den Rollups:
+    volle Ortszeit-Tage aus Tageswerten, der Rest stundengenau.
+
+    Returns:
+        dict: energy_kwh, avg_power_w, max_power_w, min_power_w, on_hours, readings
+    """
+    first_day = day_bucket(start)
+    if day_start_utc(first_day) < start:
+        first_day += timedelta(days=1)
+    # Tage rechnen ueber die Uhrzeit, nicht 24 h (Sommer-/Winterzeit)
+    end_day = day_bucket(end)
+    full_days = (first_day, end_day) if first_day < end_day else None
+
+    rollups = []
+    if full_days:
+        rollups += ShellyEnergyRollup.query.filter(
+            ShellyEnergyRollup.device_id == device_id,
+            ShellyEnergyRollup.period == DAY,
+            ShellyEnergyRollup.bucket_start >= full_days[0],
+            ShellyEnergyRollup.bucket_start < full_days[1]).all()
+    hours = ShellyEnergyRollup.query.filter(
+        ShellyEnergyRollup.device_id == device_id,
+        ShellyEnergyRollup.period == HOUR,
+        ShellyEnergyRollup.bucket_start >= hour_bucket(start),
+        ShellyEnergyRollup.bucket_start < end)
+    if full_days:
+        hours = hours.filter(or_(ShellyEnergyRollup.bucket_start < day_start_utc(full_days[0]),
+                                 ShellyEnergyRollup.bucket_start >= day_start_utc(full_days[1])))
+    rollups += hours.all()
+
+    readings = sum(r.readings for r in rollups)
+    powers_max = [r.power_max_w for r in rollups if r.power_max_w is not None]
+    powers_min = [r.power_min_w for r in rollups if r.power_min_w is not None]
+    return {
+        'energy_kwh': round(sum(r.energy_wh for r in rollups) / 1000, 3),
+        'avg_power_w': round(sum(r.power_sum_w for r in rollups) / readings, 1) if readings else 0,
+        'max_power_w': max(powers_max) if powers_max else None,
+        'min_power_w': min(powers_min) if powers_min else None,
+        'on_hours': round(sum(r.on_seconds for r in rollups) / 3600, 2),
+        'readings': readings,
+    }
+
+
+def update_production_energy(record, now=None):
+    """ShellyProductionEnergy aus den Rollups berechnen (laufend: bis jetzt); ohne Commit"""
+    summary = energy_between(record.shelly_device_id, record.start_time, record.end_time or now or datetime.utcnow())
+    price = record.electricity_price_per_kwh
+    if price is None:
+        device = db.session.get(ShellyDevice, record.shelly_device_id)
+        price = device.electricity_price_per_kwh if device else None
+    record.total_energy_kwh = summary['energy_kwh']
+    record.avg_power_w = summary['avg_power_w']
+    record.max_power_w = summary['max_power_w']
+    record.min_power_w = summary['min_power_w']
+    record.electricity_price_per_kwh = price
+    record.total_cost_eur = round(summary['energy_kwh'] * (price or 0), 2)
+    return record
+
+
+def init_shelly_rollups(app):
+    """Aufraeum-Job fuer alte Rohdaten registrieren (nach init_scheduler())"""
+    if app.extensions.get('shelly_rollups'):
+        return
+
+    try:
+        from src.services.scheduler_service import add_system_job
+        add_system_job(prune_readings, 'interval', 'shelly_energy_prune', hours=PRUNE_INTERVAL_HOURS)
+    except ImportError:
+        pass  # Ohne APScheduler: prune_readings() manuell
+
+    app.extensions['shelly_rollups'] = True
@@ -326,26 +326,9 @@ def _find_or_create_customer(data):
 
 
 def _generate_order_number():
-    """Generiert eine neue Auftragsnummer"""
-    from src.models.models import Order
-    from datetime import date
-
-    today = date.today()
-    prefix = f"WEB-{today.strftime('%Y%m')}-"
-
-    # Höchste Nummer dieses Monats finden
-    last_order = Order.query.filter(
-        Order.order_number.like(f'{prefix}%')
-    ).order_by(Order.order_number.desc()).first()
-
-    if last_order:
-        try:
-            last_num = int(last_order.order_number.replace(prefix, ''))
-            return f"{prefix}{last_num + 1:04d}"
-        except ValueError:
-            pass
-
-    return f"{prefix}0001"
+    """Generiert eine neue Auftragsnummer (WEB-YYYYMM-NNNN)"""
+    from src.services.id_generator_service import IdGenerator
+    return IdGenerator.web_order_number()
 
 
 def get_order_by_tracking_token(token):
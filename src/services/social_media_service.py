@@ -216,22 +216,27 @@ class MetaGraphService:
             if not post or not post.scheduled_at:
                 return
 
-            def publish_task():
-                p = SocialMediaPost.query.get(post_id)
-                if p and p.status == 'scheduled':
-                    self.publish_post(p)
-
+            # Textuelle Referenz: der Job liegt im gemeinsamen Jobstore und
+            # wird ggf. von einem anderen Prozess (Scheduler-Leader) ausgefuehrt
             add_job(
-                func=publish_task,
+                func=publish_scheduled_post,
                 trigger='date',
                 job_id=f'social_post_{post_id}',
                 run_date=post.scheduled_at,
+                args=[post_id],
             )
             logger.info(f"Social Media Post {post_id} geplant fuer {post.scheduled_at}")
         except Exception as e:
             logger.warning(f"Scheduling fehlgeschlagen: {e}")
 
 
+def publish_scheduled_post(post_id):
+    """Geplanten Post veroeffentlichen (Scheduler-Job)"""
+    post = SocialMediaPost.query.get(post_id)
+    if post and post.status == 'scheduled':
+        MetaGraphService().publish_post(post)
+
+
 class AutoPostService:
     """Erstellt automatische Posts aus Artikeln/Galerie"""
 
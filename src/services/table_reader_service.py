@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+TABELLEN-LESER FUER GROSSE LIEFERANTEN-LISTEN
+=============================================
+Excel (openpyxl read_only) und CSV werden zeilenweise gestreamt statt als
+Ganzes geladen:
+
+- sniff_layout(): ein Durchlauf - Header-Zeile aus den ersten Zeilen,
+  Spalten, Zeilenzahl, kleine Stichprobe fuer Vorschauen
+- table_layout(): dasselbe ueber den Analyse-Cache (nach Inhalts-Hash),
+  jede Datei wird also nur einmal vermessen
+- iter_chunks(): Datenzeilen als DataFrames mit fester Zeilenzahl fuer den
+  Import; der Speicherbedarf haengt von der Blockgroesse ab, nicht von
+  der Dateigroesse
+
+Nutzung:
+    layout = table_layout(path)
+    for chunk in iter_chunks(path, layout):
+        ...
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import csv
+import logging
+from datetime import date, datetime, time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Datenzeilen je Import-Block
+READ_CHUNK_ROWS = 5000
+# Zeilen in der gespeicherten Stichprobe (Vorschau, Mapping)
+SAMPLE_ROWS = 50
+# Kandidaten fuer die Header-Zeile (Logo/Titel ueber der Tabelle)
+HEADER_SCAN_ROWS = 10
+HEADER_KEYWORDS = ('art', 'artikel', 'bezeichnung', 'marke', 'preis')
+
+# CSV: Encoding/Trennzeichen aus dem Dateianfang
+SNIFF_BYTES = 64 * 1024
+CSV_ENCODINGS = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252', 'iso-8859-1']
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+
+
+def is_excel(path):
+    return path.lower().endswith(EXCEL_EXTENSIONS)
+
+
+# ==========================================
+# ZEILEN-QUELLEN
+# ==========================================
+
+def _xlsx_rows(path):
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        # Erstes Blatt wie pd.read_excel(sheet_name=0)
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def _csv_rows(path, encoding, delimiter):
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        yield from csv.reader(f, delimiter=delimiter)
+
+
+def iter_raw_rows(path, layout):
+    """Alle Zeilen der Datei (inkl. Kopf) als Tupel/Listen"""
+    if layout['format'] == 'xlsx':
+        return _xlsx_rows(path)
+    return _csv_rows(path, layout['encoding'], layout['delimiter'])
+
+
+def sniff_csv_format(path):
+    """(encoding, delimiter) aus dem Dateianfang"""
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    if len(head) == SNIFF_BYTES and b'\n' in head:
+        head = head[:head.rindex(b'\n')]
+
+    encoding = 'utf-8'
+    for enc in CSV_ENCODINGS:
+        try:
+            text = head.decode(enc)
+            encoding = enc
+            break
+        except (UnicodeDecodeError, ValueError):
+            continue
+    else:
+        text = head.decode(encoding, errors='replace')
+
+    try:
+        delimiter = csv.Sniffer().sniff(text[:4096], delimiters=';,\t|').delimiter
+    except csv.Error:
+        delimiter = ';'
+    return encoding, delimiter
+
+
+# ==========================================
+# LAYOUT
+# ==========================================
+
+def _is_empty(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _filled_width(row):
+    for index in range(len(row) - 1, -1, -1):
+        if not _is_empty(row[index]):
+            return index + 1
+    return 0
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _fit(row, width):
+    """Zeile auf Spaltenzahl kuerzen/auffuellen"""
+    row = list(row[:width])
+    return row + [None] * (width - len(row))
+
+
+def column_names(cells, width):
+    """Spaltennamen wie pandas: leere Zellen 'Unnamed: i', doppelte 'name.1'"""
+    names, seen = [], {}
+    for index, value in enumerate(_fit(cells, width)):
+        name = f'Unnamed: {index}' if _is_empty(value) else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def detect_header_row(rows, width):
+    """
+    Erste Zeile unter den ersten HEADER_SCAN_ROWS mit mehr als drei Spalten,
+    mindestens zwei Datenzeilen darunter und einem typischen Spaltennamen;
+    sonst Zeile 0
+    """
+    for index in range(min(HEADER_SCAN_ROWS, len(rows))):
+        names = ' '.join(column_names(rows[index], width)).lower()
+        if width > 3 and len(rows) - index - 1 > 1 and any(k in names for k in HEADER_KEYWORDS):
+            return index
+    return 0
+
+
+def sniff_layout(path):
+    """
+    Vermisst die Datei in einem Durchlauf.
+
+    Returns:
+        dict: format, encoding, delimiter, header_row, columns,
+              total_rows (Datenzeilen), sample (erste SAMPLE_ROWS Datenzeilen)
+    """
+    if is_excel(path):
+        layout = {'format': 'xlsx', 'encoding': None, 'delimiter': None}
+    else:
+        encoding, delimiter = sniff_csv_format(path)
+        layout = {'format': 'csv', 'encoding': encoding, 'delimiter': delimiter}
+
+    head = []
+    count = last_filled = width = 0
+    for row in iter_raw_rows(path, layout):
+        if len(head) < HEADER_SCAN_ROWS + SAMPLE_ROWS + 1:
+            head.append(list(row))
+        count += 1
+        filled = _filled_width(row)
+        if filled:
+            last_filled = count
+            width = max(width, filled)
+
+    # Leere Zeilen am Ende zaehlen nicht (wie pd.read_excel)
+    head = head[:last_filled]
+    # CSV: Kopf steht immer in der ersten Zeile
+    header_row = detect_header_row(head, width) if layout['format'] == 'xlsx' else 0
+    sample = head[header_row + 1:header_row + 1 + SAMPLE_ROWS]
+
+    layout.update({
+        'header_row': header_row,
+        'columns': column_names(head[header_row] if head else [], width),
+        'total_rows': max(last_filled - header_row - 1, 0),
+        'sample': [[_json_value(v) for v in _fit(row, width)] for row in sample],
+    })
+    return layout
+
+
+def table_layout(path):
+    """Layout aus dem Analyse-Cache (einmal je Dateiinhalt vermessen)"""
+    from src.services.analysis_cache_service import cached_analysis
+    return cached_analysis(path, 'table_layout', sniff_layout)
+
+
+def sample_frame(layout):
+    """Stichprobe als DataFrame (Spalten wie iter_chunks)"""
+    return pd.DataFrame(layout['sample'], columns=layout['columns'], dtype=object)
+
+
+def iter_chunks(path, layout, chunk_rows=READ_CHUNK_ROWS):
+    """
+    Datenzeilen in Bloecken von chunk_rows als DataFrame (Index = laufende
+    Datenzeile ab 0, wie beim Einlesen mit pandas)
+    """
+    columns = layout['columns']
+    first = layout['header_row'] + 1
+    # total_rows None: bis Dateiende
+    end = first + layout['total_rows'] if layout.get('total_rows') is not None else None
+    block, start = [], 0
+    for number, row in enumerate(iter_raw_rows(path, layout)):
+        if number < first:
+            continue
+        if end is not None and number >= end:
+            break
+        block.append(_fit(row, len(columns)))
+        if len(block) == chunk_rows:
+            yield pd.DataFrame(block, columns=columns, index=range(start, start + len(block)), dtype=object)
+            start += len(block)
+            block = []
+    if block:
+        yield pd.DataFrame(block, columns=columns, index=range(start, start + len(block)), dtype=object)
@@ -743,6 +743,29 @@ def search_thread_web(manufacturer: str, color_number: str, color_name: str = No
         }
 
 
+def suggestions_as_dicts(suggestions: List[Dict]) -> List[Dict]:
+    """
+    Vorschlaege von search_low_stock_threads als JSON-faehige Dicts
+    (Job-Ergebnis); 'thread' enthaelt die Felder, die die Vorschlagsseite zeigt
+    """
+    result = []
+    for suggestion in suggestions:
+        thread = suggestion['thread']
+        result.append({
+            **suggestion,
+            'thread': {
+                'id': thread.id,
+                'manufacturer': thread.manufacturer,
+                'color_number': thread.color_number,
+                'color_name_de': thread.color_name_de,
+                'material': thread.material,
+                'weight': thread.weight,
+                'stock': {'quantity': suggestion['current_stock']},
+            },
+        })
+    return result
+
+
 def search_low_stock_threads() -> List[Dict]:
     """
     Sucht automatisch nach Garnen mit niedrigem Lagerbestand
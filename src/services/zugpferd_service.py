@@ -653,30 +653,11 @@ class ZugpferdService:
         Returns:
             PDF/A-3 mit eingebettetem XML
         """
-        from src.services.pdf_service import PDFService
-
         try:
             # Rechnungsdaten aufbereiten
             invoice_data = self._convert_rechnung_to_invoice_data(rechnung)
 
-            # 1. XML generieren - Profil aus String- oder Enum-Feld auflösen
-            profil_raw = rechnung.zugpferd_profil or 'BASIC'
-            profil_name = profil_raw.value if hasattr(profil_raw, 'value') else str(profil_raw)
-            profil_urn = self.PROFILE_MAP.get(profil_name.upper(), self.PROFILE_BASIC)
-            xml_string = self.create_invoice_xml(invoice_data, profil_urn)
-
-            # 2. XML validieren
-            validation_result = self.validate_xml(xml_string)
-            if not validation_result['valid']:
-                logger.error(f"XML-Validierung fehlgeschlagen: {validation_result['errors']}")
-                # Bei Validierungsfehlern trotzdem weitermachen, aber warnen
-
-            # 3. PDF generieren
-            pdf_service = PDFService()
-            pdf_content = pdf_service.create_invoice_pdf(invoice_data)
-
-            # 4. XML in PDF einbetten (PDF/A-3)
-            zugferd_pdf = self.create_pdf_with_xml(pdf_content, xml_string)
+            zugferd_pdf = self.render_invoice(invoice_data, self.profile_urn_for(rechnung))
 
             logger.info(f"ZUGFeRD-Rechnung {rechnung.rechnungsnummer} erfolgreich erstellt")
             return zugferd_pdf
@@ -685,6 +666,42 @@ class ZugpferdService:
             logger.error(f"Fehler bei ZUGFeRD-Erstellung: {str(e)}")
             raise
 
+    def profile_urn_for(self, rechnung) -> str:
+        """Profil-URN aus String- oder Enum-Feld der Rechnung auflösen"""
+        profil_raw = rechnung.zugpferd_profil or 'BASIC'
+        profil_name = profil_raw.value if hasattr(profil_raw, 'value') else str(profil_raw)
+        return self.PROFILE_MAP.get(profil_name.upper(), self.PROFILE_BASIC)
+
+    def render_invoice(self, invoice_data: Dict[str, Any], profil_urn: str, pdf_service=None) -> bytes:
+        """
+        ZUGFeRD-PDF aus aufbereiteten Rechnungsdaten (ohne Datenbankzugriff,
+        daher auch in Worker-Prozessen nutzbar - siehe pdf_batch_service)
+
+        Args:
+            invoice_data: Ergebnis von _convert_rechnung_to_invoice_data
+            profil_urn: ZUGFeRD-Profil (PROFILE_MAP)
+            pdf_service: vorhandene PDFService-Instanz (optional)
+
+        Returns:
+            PDF/A-3 mit eingebettetem XML
+        """
+        from src.services.pdf_service import PDFService
+
+        # 1. XML generieren
+        xml_string = self.create_invoice_xml(invoice_data, profil_urn)
+
+        # 2. XML validieren
+        validation_result = self.validate_xml(xml_string)
+        if not validation_result['valid']:
+            logger.error(f"XML-Validierung fehlgeschlagen: {validation_result['errors']}")
+            # Bei Validierungsfehlern trotzdem weitermachen, aber warnen
+
+        # 3. PDF generieren
+        pdf_content = (pdf_service or PDFService()).create_invoice_pdf(invoice_data)
+
+        # 4. XML in PDF einbetten (PDF/A-3)
+        return self.create_pdf_with_xml(pdf_content, xml_string)
+
     def _convert_rechnung_to_invoice_data(self, rechnung) -> Dict[str, Any]:
         """
         Konvertiert Rechnung-Model zu invoice_data Dictionary
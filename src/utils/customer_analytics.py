@@ -9,7 +9,7 @@ Erstellt von Hans Hahn - Alle Rechte vorbehalten
 
 from datetime import datetime, date, timedelta
 from decimal import Decimal
-from sqlalchemy import func, and_, or_, desc
+from sqlalchemy import func, or_
 from src.models import db
 
 
@@ -42,14 +42,19 @@ class CustomerAnalytics:
     def get_all_rankings(cls, limit=50):
         """
         Holt Ranking aller Kunden nach verschiedenen Kriterien
-        
+
+        Liest die vorberechneten Kennzahlen (customer_kpis, siehe
+        customer_kpi_service) - je Ranking eine ORDER BY ... LIMIT-Abfrage.
+
         Returns: Dict mit verschiedenen Rankings
         """
-        from src.models import Customer, Order
-        
+        from src.models import Customer
+        from src.models.customer_kpi import CustomerKpi
+        from src.services.customer_kpi_service import ensure_fresh
+
+        ensure_fresh()
+
         today = date.today()
-        year_ago = today - timedelta(days=365)
-        six_months_ago = today - timedelta(days=180)
         thirty_days_ago = today - timedelta(days=30)
         
         rankings = {
@@ -64,205 +69,124 @@ class CustomerAnalytics:
             'vip_customers': []
         }
         
-        # Helper: display_name aus DB-Feldern berechnen
-        def _display_name(row):
-            if row.customer_type == 'business':
-                return row.company_name or 'Unbekannte Firma'
-            return f"{row.first_name or ''} {row.last_name or ''}".strip() or 'Unbekannt'
-
         # === TOP UMSATZ (Gesamt) ===
-        revenue_query = db.session.query(
-            Customer.id,
-            Customer.first_name,
-            Customer.last_name,
-            Customer.company_name,
-            Customer.customer_type,
-            func.sum(Order.total_price).label('total_revenue'),
-            func.count(Order.id).label('order_count')
-        ).outerjoin(Order, and_(
-            Order.customer_id == Customer.id,
-            Order.status.notin_(['cancelled'])
-        )).filter(
-            Customer.is_active == True
-        ).group_by(Customer.id).order_by(
-            desc('total_revenue')
+        revenue_query = cls._kpi_query(
+            CustomerKpi.revenue_total, CustomerKpi.order_count
+        ).order_by(
+            CustomerKpi.revenue_total.desc(), Customer.id
         ).limit(limit)
 
         for row in revenue_query:
             rankings['top_revenue'].append({
                 'customer_id': row.id,
-                'name': _display_name(row),
+                'name': cls._display_name(row),
                 'type': row.customer_type,
-                'total_revenue': float(row.total_revenue or 0),
+                'total_revenue': float(row.revenue_total or 0),
                 'order_count': row.order_count
             })
         
         # === TOP UMSATZ (letztes Jahr) ===
-        revenue_year_query = db.session.query(
-            Customer.id,
-            Customer.first_name,
-            Customer.last_name,
-            Customer.company_name,
-            Customer.customer_type,
-            func.sum(Order.total_price).label('revenue_year'),
-            func.count(Order.id).label('orders_year')
-        ).outerjoin(Order, and_(
-            Order.customer_id == Customer.id,
-            Order.status.notin_(['cancelled']),
-            Order.created_at >= year_ago
-        )).filter(
-            Customer.is_active == True
-        ).group_by(Customer.id).having(
-            func.sum(Order.total_price) > 0
+        revenue_year_query = cls._kpi_query(
+            CustomerKpi.revenue_12m, CustomerKpi.order_count_12m
+        ).filter(
+            CustomerKpi.revenue_12m > 0
         ).order_by(
-            desc('revenue_year')
+            CustomerKpi.revenue_12m.desc(), Customer.id
         ).limit(limit)
 
         for row in revenue_year_query:
             rankings['top_revenue_year'].append({
                 'customer_id': row.id,
-                'name': _display_name(row),
-                'revenue_year': float(row.revenue_year or 0),
-                'orders_year': row.orders_year
+                'name': cls._display_name(row),
+                'revenue_year': float(row.revenue_12m or 0),
+                'orders_year': row.order_count_12m
             })
         
         # === MEISTE AUFTRÄGE ===
-        orders_query = db.session.query(
-            Customer.id,
-            Customer.first_name,
-            Customer.last_name,
-            Customer.company_name,
-            Customer.customer_type,
-            func.count(Order.id).label('order_count'),
-            func.avg(Order.total_price).label('avg_order_value')
-        ).outerjoin(Order, and_(
-            Order.customer_id == Customer.id,
-            Order.status.notin_(['cancelled'])
-        )).filter(
-            Customer.is_active == True
-        ).group_by(Customer.id).having(
-            func.count(Order.id) > 0
+        orders_query = cls._kpi_query(
+            CustomerKpi.order_count, CustomerKpi.avg_order_value
+        ).filter(
+            CustomerKpi.order_count > 0
         ).order_by(
-            desc('order_count')
+            CustomerKpi.order_count.desc(), Customer.id
         ).limit(limit)
 
         for row in orders_query:
             rankings['most_orders'].append({
                 'customer_id': row.id,
-                'name': _display_name(row),
+                'name': cls._display_name(row),
                 'order_count': row.order_count,
                 'avg_order_value': float(row.avg_order_value or 0)
             })
         
         # === ZAHLUNGSMORAL ===
-        try:
-            from src.models.rechnungsmodul import Rechnung, RechnungsZahlung, RechnungsStatus
-            
-            # Beste Zahler (schnellste Zahlung nach Fälligkeit)
-            payment_query = db.session.query(
-                Customer.id,
-                Customer.first_name,
-                Customer.last_name,
-                Customer.company_name,
-                Customer.customer_type,
-                func.count(Rechnung.id).label('invoice_count'),
-                func.avg(
-                    RechnungsZahlung.zahlungsdatum - Rechnung.faelligkeitsdatum
-                ).label('avg_payment_days')
-            ).join(Rechnung, Rechnung.kunde_id == Customer.id
-            ).join(RechnungsZahlung, RechnungsZahlung.rechnung_id == Rechnung.id
-            ).filter(
-                Customer.is_active == True,
-                Rechnung.status == RechnungsStatus.BEZAHLT
-            ).group_by(Customer.id).having(
-                func.count(Rechnung.id) >= 2
-            ).order_by('avg_payment_days').limit(limit)
+        # Beste Zahler (schnellste Zahlung nach Fälligkeit, mind. 2 bezahlte Rechnungen)
+        payment_query = cls._kpi_query(
+            CustomerKpi.invoices_paid, CustomerKpi.avg_days_to_pay
+        ).filter(
+            CustomerKpi.invoices_paid >= 2,
+            CustomerKpi.avg_days_to_pay.isnot(None)
+        ).order_by(
+            CustomerKpi.avg_days_to_pay, Customer.id
+        ).limit(limit)
 
-            for row in payment_query:
-                avg_days = row.avg_payment_days or 0
-                rankings['best_payers'].append({
-                    'customer_id': row.id,
-                    'name': _display_name(row),
-                    'invoice_count': row.invoice_count,
-                    'avg_payment_days': round(avg_days, 1),
-                    'rating': cls._payment_rating(avg_days)
-                })
+        for row in payment_query:
+            rankings['best_payers'].append({
+                'customer_id': row.id,
+                'name': cls._display_name(row),
+                'invoice_count': row.invoices_paid,
+                'avg_payment_days': row.avg_days_to_pay,
+                'rating': cls._payment_rating(row.avg_days_to_pay)
+            })
 
-            # Schlechteste Zahler
-            worst_query = db.session.query(
-                Customer.id,
-                Customer.first_name,
-                Customer.last_name,
-                Customer.company_name,
-                Customer.customer_type,
-                func.count(Rechnung.id).label('overdue_count'),
-                func.sum(Rechnung.brutto_gesamt).label('overdue_amount')
-            ).join(Rechnung, Rechnung.kunde_id == Customer.id
-            ).filter(
-                Customer.is_active == True,
-                Rechnung.status == RechnungsStatus.UEBERFAELLIG
-            ).group_by(Customer.id).order_by(
-                desc('overdue_amount')
-            ).limit(limit)
+        # Schlechteste Zahler
+        worst_query = cls._kpi_query(
+            CustomerKpi.invoices_overdue, CustomerKpi.overdue_amount
+        ).filter(
+            CustomerKpi.invoices_overdue > 0
+        ).order_by(
+            CustomerKpi.overdue_amount.desc(), Customer.id
+        ).limit(limit)
 
-            for row in worst_query:
-                rankings['worst_payers'].append({
-                    'customer_id': row.id,
-                    'name': _display_name(row),
-                    'overdue_count': row.overdue_count,
-                    'overdue_amount': float(row.overdue_amount or 0)
-                })
-                
-        except ImportError:
-            pass  # Rechnungsmodul nicht verfügbar
+        for row in worst_query:
+            rankings['worst_payers'].append({
+                'customer_id': row.id,
+                'name': cls._display_name(row),
+                'overdue_count': row.invoices_overdue,
+                'overdue_amount': float(row.overdue_amount or 0)
+            })
         
         # === KEIN KONTAKT SEIT 30+ TAGEN ===
+        no_contact_query = cls._kpi_query(
+            Customer.phone, Customer.email, CustomerKpi.last_contact
+        ).filter(
+            or_(
+                CustomerKpi.last_contact == None,
+                CustomerKpi.last_contact < thirty_days_ago
+            )
+        ).order_by(
+            # Nie kontaktiert zuerst (portabel statt NULLS FIRST)
+            CustomerKpi.last_contact.isnot(None), CustomerKpi.last_contact, Customer.id
+        ).limit(limit)
+
+        for row in no_contact_query:
+            days_since = None
+            if row.last_contact:
+                days_since = (today - row.last_contact).days
+
+            rankings['no_contact'].append({
+                'customer_id': row.id,
+                'name': cls._display_name(row),
+                'phone': row.phone,
+                'email': row.email,
+                'last_contact': row.last_contact.strftime('%d.%m.%Y') if row.last_contact else 'Nie',
+                'days_since': days_since
+            })
+
+        # === FÄLLIGE WIEDERVORLAGEN ===
         try:
             from src.models import ProductionBlock
             
-            # Subquery: Letzter Kontakt pro Kunde
-            last_contact_subq = db.session.query(
-                ProductionBlock.customer_id,
-                func.max(ProductionBlock.start_date).label('last_contact')
-            ).filter(
-                ProductionBlock.is_active == True,
-                ProductionBlock.block_type.in_(['call_in', 'call_out', 'customer_visit', 'site_visit', 'email'])
-            ).group_by(ProductionBlock.customer_id).subquery()
-            
-            no_contact_query = db.session.query(
-                Customer.id,
-                Customer.first_name,
-                Customer.last_name,
-                Customer.company_name,
-                Customer.customer_type,
-                Customer.phone,
-                Customer.email,
-                last_contact_subq.c.last_contact
-            ).outerjoin(
-                last_contact_subq, last_contact_subq.c.customer_id == Customer.id
-            ).filter(
-                Customer.is_active == True,
-                or_(
-                    last_contact_subq.c.last_contact == None,
-                    last_contact_subq.c.last_contact < thirty_days_ago
-                )
-            ).order_by(last_contact_subq.c.last_contact.asc().nullsfirst()).limit(limit)
-            
-            for row in no_contact_query:
-                days_since = None
-                if row.last_contact:
-                    days_since = (today - row.last_contact).days
-                
-                rankings['no_contact'].append({
-                    'customer_id': row.id,
-                    'name': _display_name(row),
-                    'phone': row.phone,
-                    'email': row.email,
-                    'last_contact': row.last_contact.strftime('%d.%m.%Y') if row.last_contact else 'Nie',
-                    'days_since': days_since
-                })
-            
-            # === FÄLLIGE WIEDERVORLAGEN ===
             follow_ups_query = db.session.query(
                 ProductionBlock
             ).join(Customer, Customer.id == ProductionBlock.customer_id
@@ -307,88 +231,74 @@ class CustomerAnalytics:
         rankings['vip_customers'] = cls.calculate_vip_customers(limit=20)
         
         return rankings
-    
-    @classmethod
-    def calculate_vip_customers(cls, limit=20):
-        """
-        Berechnet VIP-Kunden basierend auf gewichtetem Score
-        """
-        from src.models import Customer, Order
-        
-        today = date.today()
-        year_ago = today - timedelta(days=365)
-        
-        vip_list = []
-        
-        def _display_name(row):
-            if row.customer_type == 'business':
-                return row.company_name or 'Unbekannte Firma'
-            return f"{row.first_name or ''} {row.last_name or ''}".strip() or 'Unbekannt'
 
-        # Alle aktiven Kunden mit Aufträgen
-        customers_query = db.session.query(
+    @staticmethod
+    def _display_name(row):
+        """display_name aus DB-Feldern berechnen"""
+        if row.customer_type == 'business':
+            return row.company_name or 'Unbekannte Firma'
+        return f"{row.first_name or ''} {row.last_name or ''}".strip() or 'Unbekannt'
+
+    @staticmethod
+    def _kpi_query(*columns):
+        """Aktive Kunden mit Namensfeldern und den angegebenen Kennzahlen"""
+        from src.models import Customer
+        from src.models.customer_kpi import CustomerKpi
+
+        return db.session.query(
             Customer.id,
             Customer.first_name,
             Customer.last_name,
             Customer.company_name,
             Customer.customer_type,
-            Customer.created_at,
-            func.sum(Order.total_price).label('total_revenue'),
-            func.count(Order.id).label('order_count')
-        ).outerjoin(Order, and_(
-            Order.customer_id == Customer.id,
-            Order.status.notin_(['cancelled'])
-        )).filter(
+            *columns
+        ).join(
+            CustomerKpi, CustomerKpi.customer_id == Customer.id
+        ).filter(
             Customer.is_active == True
-        ).group_by(Customer.id).having(
-            func.count(Order.id) > 0
         )
-        
-        # Maximale Werte für Normalisierung ermitteln
-        max_revenue = db.session.query(func.max(Order.total_price)).scalar() or 1
-        max_orders = db.session.query(
-            func.count(Order.id)
-        ).group_by(Order.customer_id).order_by(
-            desc(func.count(Order.id))
-        ).first()
-        max_orders = max_orders[0] if max_orders else 1
-        
-        for row in customers_query:
-            # Scores berechnen (0-100)
-            revenue_score = min(100, (float(row.total_revenue or 0) / float(max_revenue)) * 100)
-            frequency_score = min(100, (row.order_count / max_orders) * 100)
-            
-            # Treue-Score (Jahre als Kunde)
-            if row.created_at:
-                years_customer = (today - row.created_at.date()).days / 365
-                loyalty_score = min(100, years_customer * 20)  # 5 Jahre = 100
-            else:
-                loyalty_score = 0
-            
-            # Gesamtscore
-            overall_score = (
-                revenue_score * cls.WEIGHTS['revenue'] +
-                frequency_score * cls.WEIGHTS['frequency'] +
-                loyalty_score * cls.WEIGHTS['loyalty']
-            ) / (cls.WEIGHTS['revenue'] + cls.WEIGHTS['frequency'] + cls.WEIGHTS['loyalty']) * 100
-            
+    
+    @classmethod
+    def calculate_vip_customers(cls, limit=20):
+        """
+        VIP-Kunden nach gewichtetem Score (vorberechnet in customer_kpis)
+        """
+        from src.models import Customer
+        from src.models.customer_kpi import CustomerKpi
+        from src.services.customer_kpi_service import ensure_fresh, vip_components
+
+        ensure_fresh()
+        today = date.today()
+
+        # Maximalwerte fuer die Teilscores (indizierte MAX-Abfragen)
+        max_revenue, max_orders = db.session.query(
+            func.max(CustomerKpi.max_order_value),
+            func.max(CustomerKpi.order_count)
+        ).one()
+
+        vip_query = cls._kpi_query(
+            Customer.created_at, CustomerKpi.revenue_total, CustomerKpi.order_count, CustomerKpi.vip_score
+        ).filter(
+            CustomerKpi.order_count > 0
+        ).order_by(
+            CustomerKpi.vip_score.desc(), Customer.id
+        ).limit(limit)
+
+        vip_list = []
+        for row in vip_query:
+            scores = vip_components(row.revenue_total, row.order_count, row.created_at,
+                                    max_revenue, max_orders, today)
             vip_list.append({
                 'customer_id': row.id,
-                'name': _display_name(row),
+                'name': cls._display_name(row),
                 'type': row.customer_type,
-                'total_revenue': float(row.total_revenue or 0),
+                'total_revenue': float(row.revenue_total or 0),
                 'order_count': row.order_count,
-                'years_customer': round((today - row.created_at.date()).days / 365, 1) if row.created_at else 0,
-                'revenue_score': round(revenue_score, 1),
-                'frequency_score': round(frequency_score, 1),
-                'loyalty_score': round(loyalty_score, 1),
-                'overall_score': round(overall_score, 1)
+                **scores,
+                'overall_score': row.vip_score
             })
         
-        # Nach Gesamtscore sortieren
-        vip_list.sort(key=lambda x: x['overall_score'], reverse=True)
-        
-        return vip_list[:limit]
+        return vip_list
     
     @classmethod
     def _payment_rating(cls, avg_days):
@@ -417,15 +327,13 @@ class CustomerAnalytics:
         """
         Detaillierte Statistiken für einen einzelnen Kunden
         """
-        from src.models import Customer, Order
+        from src.models import Customer
         
         customer = Customer.query.get(customer_id)
         if not customer:
             return None
         
         today = date.today()
-        year_ago = today - timedelta(days=365)
-        six_months_ago = today - timedelta(days=180)
         
         stats = {
             'customer_id': customer_id,
@@ -474,111 +382,57 @@ class CustomerAnalytics:
         if customer.created_at:
             stats['years_customer'] = round((today - customer.created_at.date()).days / 365, 1)
         
-        # === AUFTRÄGE & UMSATZ ===
-        orders = Order.query.filter_by(customer_id=customer_id).all()
-        
-        for order in orders:
-            if order.status == 'cancelled':
-                stats['orders']['cancelled'] += 1
-                continue
-            
-            stats['orders']['total'] += 1
-            stats['revenue']['total'] += float(order.total_price or 0)
-            
-            if order.status == 'completed':
-                stats['orders']['completed'] += 1
-            
-            if order.created_at:
-                if order.created_at.date() >= year_ago:
-                    stats['orders']['last_year'] += 1
-                    stats['revenue']['last_year'] += float(order.total_price or 0)
-                
-                if order.created_at.date() >= six_months_ago:
-                    stats['revenue']['last_6_months'] += float(order.total_price or 0)
-        
-        if stats['orders']['total'] > 0:
-            stats['revenue']['avg_order_value'] = stats['revenue']['total'] / stats['orders']['total']
-        
-        # === ZAHLUNGEN ===
-        try:
-            from src.models.rechnungsmodul import Rechnung, RechnungsZahlung, RechnungsStatus
-            
-            invoices = Rechnung.query.filter_by(kunde_id=customer_id).all()
-            payment_days_list = []
-            
-            for invoice in invoices:
-                stats['payment']['invoices_total'] += 1
-                
-                if invoice.status == RechnungsStatus.BEZAHLT:
-                    stats['payment']['invoices_paid'] += 1
-                    
-                    # Zahlungsdauer berechnen
-                    for payment in invoice.zahlungen:
-                        if payment.bestaetigt and payment.zahlung_datum:
-                            days = (payment.zahlung_datum - invoice.faelligkeitsdatum).days
-                            payment_days_list.append(days)
-                            
-                elif invoice.status == RechnungsStatus.UEBERFAELLIG:
-                    stats['payment']['invoices_overdue'] += 1
-            
-            if payment_days_list:
-                stats['payment']['avg_payment_days'] = round(sum(payment_days_list) / len(payment_days_list), 1)
-                stats['payment']['rating'] = cls._payment_rating(stats['payment']['avg_payment_days'])
-                
-        except ImportError:
-            pass
+        # === AUFTRÄGE, UMSATZ & ZAHLUNGEN (vorberechnet) ===
+        from src.models.customer_kpi import CustomerKpi
+        from src.services.customer_kpi_service import ensure_fresh
+
+        ensure_fresh()
+        kpi = db.session.get(CustomerKpi, customer_id)
+        if kpi:
+            stats['orders'].update({
+                'total': kpi.order_count,
+                'last_year': kpi.order_count_12m,
+                'completed': kpi.orders_completed,
+                'cancelled': kpi.orders_cancelled
+            })
+            stats['revenue'].update({
+                'total': kpi.revenue_total,
+                'last_year': kpi.revenue_12m,
+                'last_6_months': kpi.revenue_6m,
+                'avg_order_value': kpi.avg_order_value
+            })
+            stats['payment'].update({
+                'invoices_total': kpi.invoices_total,
+                'invoices_paid': kpi.invoices_paid,
+                'invoices_overdue': kpi.invoices_overdue,
+                'avg_payment_days': kpi.avg_days_to_pay,
+                'rating': cls._payment_rating(kpi.avg_days_to_pay) if kpi.avg_days_to_pay is not None else None
+            })
+            if kpi.last_contact:
+                stats['engagement']['last_contact'] = kpi.last_contact
+                stats['engagement']['days_since_contact'] = (today - kpi.last_contact).days
         
-        # === CRM AKTIVITÄTEN ===
+        # === CRM AKTIVITÄTEN (gezaehlt je Typ) ===
         try:
             from src.models import ProductionBlock
-            
-            activities = ProductionBlock.query.filter(
+
+            activity_filter = (
                 ProductionBlock.customer_id == customer_id,
                 ProductionBlock.is_active == True
-            ).all()
-            
-            for activity in activities:
-                stats['engagement']['total_activities'] += 1
-                
-                if activity.block_type in ['call_in', 'call_out']:
-                    stats['engagement']['calls'] += 1
-                elif activity.block_type in ['customer_visit', 'site_visit']:
-                    stats['engagement']['visits'] += 1
-                elif activity.block_type == 'email':
-                    stats['engagement']['emails'] += 1
-                elif activity.block_type == 'complaint':
-                    stats['engagement']['complaints'] += 1
-                
-                if activity.follow_up_date and activity.follow_up_date <= today:
-                    stats['engagement']['pending_follow_ups'] += 1
-            
-            # Letzter Kontakt (ProductionBlock CRM-Aktivitaeten)
-            last_pb = ProductionBlock.query.filter(
-                ProductionBlock.customer_id == customer_id,
-                ProductionBlock.is_active == True,
-                ProductionBlock.block_type.in_(['call_in', 'call_out', 'customer_visit', 'site_visit', 'email'])
-            ).order_by(ProductionBlock.start_date.desc()).first()
-
-            # Letzter Kontakt auch aus CustomerContact (Design-Freigaben, E-Mails)
-            last_cc_date = None
-            try:
-                from src.models.crm_contact import CustomerContact
-                last_cc = CustomerContact.query.filter_by(customer_id=customer_id).order_by(
-                    CustomerContact.contact_date.desc()
-                ).first()
-                if last_cc:
-                    last_cc_date = last_cc.contact_date.date() if last_cc.contact_date else None
-            except Exception:
-                pass
+            )
+            counts = dict(db.session.query(
+                ProductionBlock.block_type, func.count(ProductionBlock.id)
+            ).filter(*activity_filter).group_by(ProductionBlock.block_type).all())
 
-            # Neuesten Kontakt verwenden
-            pb_date = last_pb.start_date if last_pb else None
-            candidates = [d for d in [pb_date, last_cc_date] if d is not None]
-            last_contact_date = max(candidates) if candidates else None
-
-            if last_contact_date:
-                stats['engagement']['last_contact'] = last_contact_date
-                stats['engagement']['days_since_contact'] = (today - last_contact_date).days
+            stats['engagement']['total_activities'] = sum(counts.values())
+            stats['engagement']['calls'] = counts.get('call_in', 0) + counts.get('call_out', 0)
+            stats['engagement']['visits'] = counts.get('customer_visit', 0) + counts.get('site_visit', 0)
+            stats['engagement']['emails'] = counts.get('email', 0)
+            stats['engagement']['complaints'] = counts.get('complaint', 0)
+            stats['engagement']['pending_follow_ups'] = ProductionBlock.query.filter(
+                *activity_filter,
+                ProductionBlock.follow_up_date <= today
+            ).count()
                 
         except ImportError:
             pass
@@ -655,14 +509,17 @@ class CustomerAnalytics:
             'customers_no_contact': 0
         }
         
-        # Umsatz & Aufträge letzter Monat
-        orders_month = Order.query.filter(
+        # Umsatz & Aufträge letzter Monat (eine Aggregat-Abfrage)
+        orders_month, revenue_month = db.session.query(
+            func.count(Order.id),
+            func.coalesce(func.sum(Order.total_price), 0)
+        ).filter(
             Order.created_at >= month_ago,
             Order.status.notin_(['cancelled'])
-        ).all()
+        ).one()
         
-        summary['total_orders_month'] = len(orders_month)
-        summary['total_revenue_month'] = sum(float(o.total_price or 0) for o in orders_month)
+        summary['total_orders_month'] = orders_month
+        summary['total_revenue_month'] = float(revenue_month)
         
         # Fällige Wiedervorlagen
         try:
@@ -7,6 +7,8 @@ Erstellt von Hans Hahn - Alle Rechte vorbehalten
 import struct
 import os
 
+import numpy as np
+
 def analyze_dst_file_complete(filepath: str) -> dict:
     """
     Extrahiert ALLE verfügbaren Informationen aus DST-Datei
@@ -32,16 +34,19 @@ def analyze_dst_file_complete(filepath: str) -> dict:
         header_info = extract_all_header_info(header)
         result.update(header_info)
         
+        # Stich-Daten EINMAL dekodieren, alles weitere aus den Arrays
+        stitches = decode_dst_stitches(stitch_data)
+        
         # ALLE Stich-Informationen extrahieren
-        stitch_info = extract_all_stitch_info(stitch_data)
+        stitch_info = stitch_info_from_decoded(stitches)
         result.update(stitch_info)
         
         # ALLE Farb-Informationen extrahieren
-        color_info = extract_all_color_info(stitch_data)
+        color_info = color_info_from_decoded(stitches)
         result.update(color_info)
         
         # ALLE Dimensions-Informationen extrahieren
-        dimension_info = extract_all_dimension_info(stitch_data)
+        dimension_info = dimension_info_from_decoded(stitches)
         result.update(dimension_info)
         
         # ALLE Qualitäts-Informationen extrahieren
@@ -92,8 +97,60 @@ def extract_all_header_info(header: bytes) -> dict:
     
     return info
 
-def extract_all_stitch_info(data: bytes) -> dict:
-    """Extrahiert ALLE Stich-Informationen"""
+class DecodedStitches:
+    """
+    Stich-Datensaetze einer DST-Datei als NumPy-Arrays (ein Eintrag pro
+    3-Byte-Datensatz bis zum Ende-Marker).
+
+    b0, b1, b2: Rohbytes
+    special:    Spezial-Befehl (b2 & 0xF0 == 0xF0)
+    dx, dy:     Bewegung (0 bei Spezial-Befehlen)
+    x, y:       Position NACH dem Datensatz (kumuliert)
+    """
+
+    def __init__(self, b0, b1, b2):
+        self.b0 = b0
+        self.b1 = b1
+        self.b2 = b2
+        self.special = (b2 & 0xF0) == 0xF0
+        self.moves = ~self.special
+
+        dx = b0.astype(np.int64)
+        dx = np.where(b2 & 0x01, -dx, dx)
+        dx = np.where(b2 & 0x80, dx * 81, dx)
+        dy = b1.astype(np.int64)
+        dy = np.where(b2 & 0x02, -dy, dy)
+        dy = np.where(b2 & 0x40, dy * 81, dy)
+        dx[self.special] = 0
+        dy[self.special] = 0
+
+        self.dx = dx
+        self.dy = dy
+        self.x = np.cumsum(dx)
+        self.y = np.cumsum(dy)
+
+    def __len__(self):
+        return len(self.b2)
+
+
+def decode_dst_stitches(data: bytes) -> DecodedStitches:
+    """
+    Dekodiert alle 3-Byte-Datensaetze in einem vektorisierten Schritt.
+    Unvollstaendige Datensaetze am Ende werden ignoriert, ab dem ersten
+    Ende-Marker (b2 == 0xF3) wird nichts mehr gelesen.
+    """
+    count = len(data) // 3
+    records = np.frombuffer(data, dtype=np.uint8, count=count * 3).reshape(count, 3)
+
+    end = np.flatnonzero(records[:, 2] == 0xF3)
+    if end.size:
+        records = records[:end[0]]
+
+    return DecodedStitches(records[:, 0], records[:, 1], records[:, 2])
+
+
+def stitch_info_from_decoded(stitches: DecodedStitches) -> dict:
+    """Stich-Informationen aus dekodierten Datensaetzen"""
     info = {
         'total_stitches': 0,
         'normal_stitches': 0,
@@ -108,66 +165,40 @@ def extract_all_stitch_info(data: bytes) -> dict:
         'commands': []
     }
     
-    x, y = 0, 0
-    i = 0
-    
-    while i < len(data) - 2:
-        try:
-            b0, b1, b2 = data[i], data[i+1], data[i+2]
-            
-            # Ende-Marker
-            if b2 == 0xF3:
-                break
-            
-            # Spezial-Befehle
-            if b2 & 0xF0 == 0xF0:
-                cmd_type = classify_command(b0, b1, b2)
-                info['commands'].append({
-                    'type': cmd_type,
-                    'position': i,
-                    'bytes': [b0, b1, b2],
-                    'x': x,
-                    'y': y
-                })
-                
-                # Zähler erhöhen
-                if cmd_type == 'color_change':
-                    info['color_changes'] += 1
-                elif cmd_type == 'trim':
-                    info['trim_count'] += 1
-                elif cmd_type == 'sequin':
-                    info['sequins'] += 1
-                elif cmd_type == 'stop':
-                    info['stops'] += 1
-                elif cmd_type == 'unknown':
-                    info['unknown_commands'] += 1
-                
-                i += 3
-                continue
-            
-            # Normale Bewegung
-            dx, dy = decode_movement(b0, b1, b2)
-            old_x, old_y = x, y
-            x += dx
-            y += dy
-            
-            # Stich-Länge
-            length = (dx**2 + dy**2)**0.5
-            info['total_length_mm'] += length / 10
-            
-            # Stich-Typ klassifizieren
-            if abs(dx) <= 121 and abs(dy) <= 121:
-                info['normal_stitches'] += 1
-            elif abs(dx) > 121 or abs(dy) > 121:
-                info['jump_stitches'] += 1
-            else:
-                info['move_stitches'] += 1
-            
-            info['total_stitches'] += 1
-            i += 3
-            
-        except:
-            i += 1
+    # Spezial-Befehle (wenige) einzeln klassifizieren
+    counters = {
+        'color_change': 'color_changes',
+        'trim': 'trim_count',
+        'sequin': 'sequins',
+        'stop': 'stops',
+        'unknown': 'unknown_commands',
+    }
+    for idx in np.flatnonzero(stitches.special).tolist():
+        b0, b1, b2 = int(stitches.b0[idx]), int(stitches.b1[idx]), int(stitches.b2[idx])
+        cmd_type = classify_command(b0, b1, b2)
+        info['commands'].append({
+            'type': cmd_type,
+            'position': idx * 3,
+            'bytes': [b0, b1, b2],
+            'x': int(stitches.x[idx]),
+            'y': int(stitches.y[idx])
+        })
+        if cmd_type in counters:
+            info[counters[cmd_type]] += 1
+    
+    dx = stitches.dx[stitches.moves]
+    dy = stitches.dy[stitches.moves]
+    if dx.size:
+        # Stich-Laenge; cumsum addiert streng von links nach rechts und
+        # liefert damit exakt die gleiche Summe wie die fruehere Schleife
+        lengths = np.sqrt((dx * dx + dy * dy).astype(np.float64)) / 10
+        info['total_length_mm'] = float(np.cumsum(lengths)[-1])
+    
+    # Stich-Typ klassifizieren
+    normal = int(np.count_nonzero((np.abs(dx) <= 121) & (np.abs(dy) <= 121)))
+    info['normal_stitches'] = normal
+    info['jump_stitches'] = int(dx.size) - normal
+    info['total_stitches'] = int(dx.size)
     
     # Durchschnittliche Stich-Länge
     if info['normal_stitches'] > 0:
@@ -175,78 +206,32 @@ def extract_all_stitch_info(data: bytes) -> dict:
     
     return info
 
-def extract_all_color_info(data: bytes) -> dict:
-    """Extrahiert ALLE Farb-Informationen"""
+def color_info_from_decoded(stitches: DecodedStitches) -> dict:
+    """Farb-Informationen aus dekodierten Datensaetzen"""
+    changes = np.flatnonzero((stitches.b2 == 0xFE) & (stitches.b1 == 0xB0)).tolist()
+    
     info = {
-        'color_sequence': [],
-        'color_positions': [],
-        'estimated_colors': 1
+        'color_sequence': list(range(1, len(changes) + 1)),
+        'color_positions': [
+            {'x': int(stitches.x[idx]), 'y': int(stitches.y[idx]), 'color': color}
+            for color, idx in enumerate(changes, start=1)
+        ],
+        'estimated_colors': len(changes) + 1
     }
-    
-    x, y = 0, 0
-    current_color = 0
-    i = 0
-    
-    while i < len(data) - 2:
-        try:
-            b0, b1, b2 = data[i], data[i+1], data[i+2]
-            
-            if b2 == 0xF3:
-                break
-            
-            if b2 & 0xF0 == 0xF0:
-                if b2 == 0xFE and b1 == 0xB0:  # Farbwechsel
-                    current_color += 1
-                    info['color_sequence'].append(current_color)
-                    info['color_positions'].append({'x': x, 'y': y, 'color': current_color})
-                i += 3
-                continue
-            
-            # Position tracken
-            dx, dy = decode_movement(b0, b1, b2)
-            x += dx
-            y += dy
-            i += 3
-            
-        except:
-            i += 1
-    
-    info['estimated_colors'] = current_color + 1
     info['total_color_changes'] = len(info['color_sequence'])
     
     return info
 
-def extract_all_dimension_info(data: bytes) -> dict:
-    """Extrahiert ALLE Dimensions-Informationen"""
-    min_x = min_y = float('inf')
-    max_x = max_y = float('-inf')
-    x = y = 0
-    i = 0
-    
-    while i < len(data) - 2:
-        try:
-            b0, b1, b2 = data[i], data[i+1], data[i+2]
-            
-            if b2 == 0xF3:
-                break
-            
-            if b2 & 0xF0 == 0xF0:
-                i += 3
-                continue
-            
-            dx, dy = decode_movement(b0, b1, b2)
-            x += dx
-            y += dy
-            
-            min_x = min(min_x, x)
-            max_x = max(max_x, x)
-            min_y = min(min_y, y)
-            max_y = max(max_y, y)
-            
-            i += 3
-            
-        except:
-            i += 1
+def dimension_info_from_decoded(stitches: DecodedStitches) -> dict:
+    """Dimensions-Informationen aus dekodierten Datensaetzen"""
+    xs = stitches.x[stitches.moves]
+    ys = stitches.y[stitches.moves]
+    if xs.size:
+        min_x, max_x = int(xs.min()), int(xs.max())
+        min_y, max_y = int(ys.min()), int(ys.max())
+    else:
+        min_x = min_y = float('inf')
+        max_x = max_y = float('-inf')
     
     # Alle Dimensionen in verschiedenen Einheiten
     width_mm = abs(max_x - min_x) / 10
@@ -269,6 +254,18 @@ def extract_all_dimension_info(data: bytes) -> dict:
         }
     }
 
+def extract_all_stitch_info(data: bytes) -> dict:
+    """Extrahiert ALLE Stich-Informationen"""
+    return stitch_info_from_decoded(decode_dst_stitches(data))
+
+def extract_all_color_info(data: bytes) -> dict:
+    """Extrahiert ALLE Farb-Informationen"""
+    return color_info_from_decoded(decode_dst_stitches(data))
+
+def extract_all_dimension_info(data: bytes) -> dict:
+    """Extrahiert ALLE Dimensions-Informationen"""
+    return dimension_info_from_decoded(decode_dst_stitches(data))
+
 def extract_all_quality_info(stitch_info: dict, dimension_info: dict) -> dict:
     """Extrahiert ALLE Qualitäts-Informationen"""
     area_cm2 = dimension_info.get('area_cm2', 0)
@@ -444,8 +441,11 @@ def analyze_dst_file_robust(filepath: str) -> dict:
     """
     Hauptfunktion: Analysiert DST-Datei komplett
     WICHTIG: Speichert nur Pfad, Größe ist egal
+    Ergebnis kommt bei bekanntem Dateiinhalt aus dem Analyse-Cache.
     """
-    result = analyze_dst_file_complete(filepath)
+    from src.services.analysis_cache_service import cached_analysis
+
+    result = cached_analysis(filepath, 'dst_complete', analyze_dst_file_complete)
     
     # Kompatibilität: stitch_count aus total_stitches
     if result.get('success') and 'total_stitches' in result:
@@ -309,12 +309,13 @@ def analyze_design_file(filepath):
     # Stickerei-Formate
     embroidery_formats = ['.dst', '.pes', '.jef', '.exp', '.vp3', '.hus', '.xxx', '.pec']
     if ext in embroidery_formats:
+        from src.services.analysis_cache_service import cached_analysis
         if ext == '.dst':
             # DST hat sowohl pyembroidery als auch manuelle Fallback-Analyse
-            return analyze_dst_file(filepath)
+            return cached_analysis(filepath, 'dst_basic', analyze_dst_file)
         else:
             # Andere Formate nur mit pyembroidery
-            return analyze_embroidery_file(filepath)
+            return cached_analysis(filepath, 'embroidery', analyze_embroidery_file)
     
     # Bild-Formate
     elif ext in ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff']:
@@ -15,17 +15,15 @@ from src.models.company_settings import CompanySettings
 from src.models.branding_settings import BrandingSettings
 
 
-def generate_packing_list_pdf(packing_list, save_to_disk=True):
+def build_packing_list_pdf_data(packing_list):
     """
-    Generiert PDF für eine Packliste
+    Sammelt die Daten für das Packlisten-PDF (PDFService.create_packing_list_pdf)
 
     Args:
         packing_list: PackingList Model-Instanz
-        save_to_disk: Ob PDF auf Festplatte gespeichert werden soll
 
     Returns:
-        str: Pfad zur generierten PDF-Datei (falls save_to_disk=True)
-        bytes: PDF als Bytes (falls save_to_disk=False)
+        dict: Daten ohne Model-Bezug (auch an Worker-Prozesse übergebbar)
     """
     # Firmen & Branding-Daten holen
     company_settings = CompanySettings.get_settings()
@@ -43,7 +41,7 @@ def generate_packing_list_pdf(packing_list, save_to_disk=True):
         # Firmendaten
         'company_name': company_settings.company_name if company_settings else 'StitchAdmin',
         'company_street': company_settings.street if company_settings else '',
-        'company_postcode': company_settings.postcode if company_settings else '',
+        'company_postcode': company_settings.postal_code if company_settings else '',
         'company_city': company_settings.city if company_settings else '',
         'logo_path': logo_path,
 
@@ -76,6 +74,22 @@ def generate_packing_list_pdf(packing_list, save_to_disk=True):
         'qc_by': packing_list.qc_user.username if packing_list.qc_user else None,
         'qc_date': packing_list.qc_date,
     }
+    return pdf_data
+
+
+def generate_packing_list_pdf(packing_list, save_to_disk=True):
+    """
+    Generiert PDF für eine Packliste
+
+    Args:
+        packing_list: PackingList Model-Instanz
+        save_to_disk: Ob PDF auf Festplatte gespeichert werden soll
+
+    Returns:
+        str: Pfad zur generierten PDF-Datei (falls save_to_disk=True)
+        bytes: PDF als Bytes (falls save_to_disk=False)
+    """
+    pdf_data = build_packing_list_pdf_data(packing_list)
 
     # PDF generieren
     pdf_service = PDFService()
@@ -96,17 +110,15 @@ def generate_packing_list_pdf(packing_list, save_to_disk=True):
         return pdf_service.create_packing_list_pdf(pdf_data)
 
 
-def generate_delivery_note_pdf(delivery_note, save_to_disk=True):
+def build_delivery_note_pdf_data(delivery_note):
     """
-    Generiert PDF für einen Lieferschein
+    Sammelt die Daten für das Lieferschein-PDF (PDFService.create_delivery_note_pdf)
 
     Args:
         delivery_note: DeliveryNote Model-Instanz
-        save_to_disk: Ob PDF auf Festplatte gespeichert werden soll
 
     Returns:
-        str: Pfad zur generierten PDF-Datei (falls save_to_disk=True)
-        bytes: PDF als Bytes (falls save_to_disk=False)
+        dict: Daten ohne Model-Bezug (auch an Worker-Prozesse übergebbar)
     """
     # Firmen & Branding-Daten holen
     company_settings = CompanySettings.get_settings()
@@ -128,7 +140,7 @@ def generate_delivery_note_pdf(delivery_note, save_to_disk=True):
         # Firmendaten
         'company_name': company_settings.company_name if company_settings else 'StitchAdmin',
         'company_street': company_settings.street if company_settings else '',
-        'company_postcode': company_settings.postcode if company_settings else '',
+        'company_postcode': company_settings.postal_code if company_settings else '',
         'company_city': company_settings.city if company_settings else '',
         'logo_path': logo_path,
 
@@ -162,6 +174,22 @@ def generate_delivery_note_pdf(delivery_note, save_to_disk=True):
         'signature_name': delivery_note.signature_name,
         'signature_date': delivery_note.signature_date,
     }
+    return pdf_data
+
+
+def generate_delivery_note_pdf(delivery_note, save_to_disk=True):
+    """
+    Generiert PDF für einen Lieferschein
+
+    Args:
+        delivery_note: DeliveryNote Model-Instanz
+        save_to_disk: Ob PDF auf Festplatte gespeichert werden soll
+
+    Returns:
+        str: Pfad zur generierten PDF-Datei (falls save_to_disk=True)
+        bytes: PDF als Bytes (falls save_to_disk=False)
+    """
+    pdf_data = build_delivery_note_pdf_data(delivery_note)
 
     # PDF generieren
     pdf_service = PDFService()
@@ -200,12 +228,14 @@ def _format_customer_address(customer):
 
     return {
         'street': customer.street or '',
-        'postcode': customer.postcode or '',
+        'postcode': customer.postal_code or '',
         'city': customer.city or ''
     }
 
 
 __all__ = [
+    'build_packing_list_pdf_data',
+    'build_delivery_note_pdf_data',
     'generate_packing_list_pdf',
     'generate_delivery_note_pdf'
 ]
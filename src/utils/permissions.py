@@ -8,11 +8,147 @@ Hilfsfunktionen für:
 - Template-Helper
 """
 
+import threading
 from functools import wraps
-from flask import flash, redirect, url_for, abort
+from flask import flash, redirect, url_for, abort, request, has_request_context
 from flask_login import current_user
 
 
+# ==========================================
+# BERECHTIGUNGS-MATRIX (Cache)
+# ==========================================
+# Pro User wird die komplette Matrix (alle aktiven Module + eigene
+# Berechtigungen) mit EINER Abfrage geladen und prozessweit gecacht.
+# Gueltigkeit: Versionsstempel 'permissions' in cache_versions, den
+# permissions_controller bei jeder Aenderung erhoeht (bump_permission_version).
+# Die Version wird hoechstens einmal pro Request gelesen.
+
+PERMISSION_CACHE_NAME = 'permissions'
+ACTIONS = ('view', 'create', 'edit', 'delete')
+
+_matrix_lock = threading.Lock()
+_matrix_cache = {}  # user_id -> (version, PermissionMatrix)
+
+
+class PermissionMatrix:
+    """
+    Berechtigungen eines Users fuer alle aktiven Module (ohne ORM-Objekte,
+    daher ueber Requests hinweg cachebar).
+    """
+
+    def __init__(self, user_id, rows):
+        """
+        rows: (module_id, name, requires_admin, default_enabled,
+               can_view, can_create, can_edit, can_delete, has_permission)
+              fuer alle aktiven Module, sortiert nach sort_order
+        """
+        self.user_id = user_id
+        self.module_ids = {}    # name -> id
+        self.module_order = []  # ids in Dashboard-Reihenfolge
+        self._rights = {}       # name -> {'view': bool, ...}
+        for (module_id, name, requires_admin, default_enabled,
+             can_view, can_create, can_edit, can_delete, has_permission) in rows:
+            self.module_ids[name] = module_id
+            self.module_order.append(module_id)
+            if requires_admin:
+                rights = dict.fromkeys(ACTIONS, False)
+            elif has_permission:
+                rights = {'view': bool(can_view), 'create': bool(can_create),
+                          'edit': bool(can_edit), 'delete': bool(can_delete)}
+            else:
+                # Keine explizite Berechtigung: Default des Moduls (nur Ansicht)
+                rights = dict.fromkeys(ACTIONS, False)
+                rights['view'] = bool(default_enabled)
+            self._rights[name] = rights
+
+    def allows(self, module_name, action='view'):
+        rights = self._rights.get(module_name)
+        return bool(rights and rights.get(action, False))
+
+    def visible_module_ids(self):
+        """IDs der Module mit View-Recht (sortiert)"""
+        id_to_name = {v: k for k, v in self.module_ids.items()}
+        return [mid for mid in self.module_order if self.allows(id_to_name[mid], 'view')]
+
+
+def _request_cache():
+    """Dict am aktuellen Request (None ausserhalb eines Requests)"""
+    if not has_request_context():
+        return None
+    cache = getattr(request, '_permission_cache', None)
+    if cache is None:
+        cache = {}
+        request._permission_cache = cache
+    return cache
+
+
+def get_permission_version():
+    """Aktueller Versionsstempel (einmal pro Request gelesen)"""
+    from src.models.cache_version import CacheVersion
+
+    cache = _request_cache()
+    if cache is not None and 'version' in cache:
+        return cache['version']
+    version = CacheVersion.get_version(PERMISSION_CACHE_NAME)
+    if cache is not None:
+        cache['version'] = version
+    return version
+
+
+def bump_permission_version():
+    """
+    Invalidiert alle Berechtigungs-Caches (alle Worker). Vor dem Commit der
+    Aenderung aufrufen, damit Stempel und Daten gemeinsam gespeichert werden.
+    """
+    from src.models.cache_version import CacheVersion
+
+    CacheVersion.bump(PERMISSION_CACHE_NAME)
+    cache = _request_cache()
+    if cache is not None:
+        cache.clear()
+    with _matrix_lock:
+        _matrix_cache.clear()
+
+
+def _load_permission_matrix(user_id):
+    """Laedt Module + Berechtigungen des Users in einer Abfrage"""
+    from src.models.models import db
+    from src.models.user_permissions import Module, ModulePermission
+
+    rows = db.session.query(
+        Module.id, Module.name, Module.requires_admin, Module.default_enabled,
+        ModulePermission.can_view, ModulePermission.can_create,
+        ModulePermission.can_edit, ModulePermission.can_delete,
+        ModulePermission.id.isnot(None),
+    ).outerjoin(
+        ModulePermission,
+        db.and_(ModulePermission.module_id == Module.id, ModulePermission.user_id == user_id)
+    ).filter(
+        Module.is_active == True
+    ).order_by(Module.sort_order, Module.id).all()
+    return PermissionMatrix(user_id, rows)
+
+
+def get_permission_matrix(user):
+    """
+    Berechtigungs-Matrix des Users (gecacht, siehe oben)
+
+    Beispiel:
+        matrix = get_permission_matrix(current_user)
+        matrix.allows('crm', 'edit')
+    """
+    version = get_permission_version()
+    with _matrix_lock:
+        entry = _matrix_cache.get(user.id)
+        if entry and entry[0] == version:
+            return entry[1]
+
+    matrix = _load_permission_matrix(user.id)
+    with _matrix_lock:
+        _matrix_cache[user.id] = (version, matrix)
+    return matrix
+
+
 def has_module_permission(user, module_name, action='view'):
     """
     Prüft ob User Berechtigung für ein Modul hat
@@ -29,46 +165,13 @@ def has_module_permission(user, module_name, action='view'):
         if has_module_permission(current_user, 'crm', 'edit'):
             # User darf Kunden bearbeiten
     """
-    from src.models.user_permissions import Module, ModulePermission
-    
     # Admin hat immer alle Rechte
     if user.is_admin:
         return True
-    
-    # Modul laden
-    module = Module.query.filter_by(name=module_name, is_active=True).first()
-    if not module:
-        return False
-    
-    # Wenn Modul nur für Admins → Zugriff verweigern
-    if module.requires_admin and not user.is_admin:
-        return False
-    
-    # Berechtigung prüfen
-    permission = ModulePermission.query.filter_by(
-        user_id=user.id,
-        module_id=module.id
-    ).first()
-    
-    # Wenn keine explizite Berechtigung vorhanden
-    if not permission:
-        # Nutze Default-Einstellung des Moduls
-        if action == 'view':
-            return module.default_enabled
-        else:
-            return False  # Create/Edit/Delete standardmäßig nicht erlaubt
-    
-    # Prüfe je nach Action
-    if action == 'view':
-        return permission.can_view
-    elif action == 'create':
-        return permission.can_create
-    elif action == 'edit':
-        return permission.can_edit
-    elif action == 'delete':
-        return permission.can_delete
-    
-    return False
+
+    # Inaktive/Admin-Module und fehlende Rechte liefern False,
+    # ohne explizite Berechtigung gilt default_enabled (nur 'view')
+    return get_permission_matrix(user).allows(module_name, action)
 
 
 def get_user_modules(user):
@@ -86,38 +189,25 @@ def get_user_modules(user):
         for module in modules:
             print(f"User kann {module.display_name} nutzen")
     """
-    from src.models.user_permissions import Module, ModulePermission
-    
+    from src.models.user_permissions import Module
+
+    cache = _request_cache()
+    cache_key = ('modules', user.id)
+    if cache is not None and cache_key in cache:
+        return cache[cache_key]
+
+    all_modules = Module.query.filter_by(is_active=True).order_by(Module.sort_order, Module.id).all()
+
     # Admin sieht alle aktiven Module
     if user.is_admin:
-        return Module.query.filter_by(is_active=True).order_by(Module.sort_order).all()
-    
-    # Normale User: Nur Module mit View-Berechtigung
-    modules = []
-    
-    # Hole alle Berechtigungen des Users
-    permissions = ModulePermission.query.filter_by(
-        user_id=user.id,
-        can_view=True
-    ).all()
-    
-    permission_module_ids = [p.module_id for p in permissions]
-    
-    # Hole auch Module mit default_enabled=True (wenn keine explizite Berechtigung)
-    all_modules = Module.query.filter_by(is_active=True).order_by(Module.sort_order).all()
-    
-    for module in all_modules:
-        # Skip Admin-Only Module
-        if module.requires_admin and not user.is_admin:
-            continue
-        
-        # Modul hat explizite Berechtigung
-        if module.id in permission_module_ids:
-            modules.append(module)
-        # Oder Modul ist default enabled und keine explizite Berechtigung vorhanden
-        elif module.default_enabled and module.id not in [p.module_id for p in ModulePermission.query.filter_by(user_id=user.id).all()]:
-            modules.append(module)
-    
+        modules = all_modules
+    else:
+        # Normale User: Nur Module mit View-Berechtigung
+        visible = set(get_permission_matrix(user).visible_module_ids())
+        modules = [m for m in all_modules if m.id in visible]
+
+    if cache is not None:
+        cache[cache_key] = modules
     return modules
 
 
@@ -0,0 +1,780 @@
+# -*- coding: utf-8 -*-
+"""
+SCHEMA-MIGRATIONEN (versioniert)
+================================
+Ersetzt das ALTER-TABLE-Probing beim Start von create_app().
+
+Jede Migration hat eine feste Versionsnummer und wird genau einmal angewendet;
+angewendete Versionen stehen in der Tabelle `schema_versions`. Beim Worker-Start
+genuegt damit eine einzige Abfrage (ensure_schema). Nur wenn Versionen fehlen
+oder neue Model-Tabellen hinzugekommen sind, wird unter einer Sperre
+(SQLite: Lock-Datei, PostgreSQL: Advisory-Lock) migriert - parallel startende
+Gunicorn-Worker warten und finden danach ein aktuelles Schema vor.
+
+Neue Migration hinzufuegen:
+    1. Funktion _mXXX_beschreibung() schreiben (idempotent!)
+    2. In MIGRATIONS mit der naechsten freien Versionsnummer eintragen
+
+Einmalige Migrations-Stufe (z.B. vor dem Start der Gunicorn-Worker):
+    python migrations/run_all_migrations.py
+    # oder automatisch via on_starting-Hook in deploy/gunicorn.conf.py
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import json
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+logger = logging.getLogger(__name__)
+
+# Fester Schluessel fuer pg_advisory_lock
+_PG_LOCK_KEY = 742001
+
+
+# ==========================================
+# HILFSFUNKTIONEN
+# ==========================================
+
+# Aeltere Parallel-Definitionen (gleiche Klassen-/Tabellennamen wie
+# document_workflow.py) - ein Import macht die Mapper-Konfiguration ungueltig
+_LEGACY_MODEL_MODULES = {
+    'src.models.business_documents',
+    'src.models.nummernkreise',
+}
+
+
+def _import_models():
+    """
+    Alle Model-Module importieren, damit create_all() alle Tabellen kennt -
+    unabhaengig davon, welche Blueprints bereits geladen sind.
+    """
+    import importlib
+    import pkgutil
+    import src.models
+
+    for module_info in pkgutil.walk_packages(src.models.__path__, 'src.models.'):
+        if module_info.name in _LEGACY_MODEL_MODULES:
+            continue
+        try:
+            importlib.import_module(module_info.name)
+        except Exception as e:
+            logger.debug(f"Model-Modul {module_info.name} nicht importierbar: {e}")
+
+
+def _sql_type(db, col_type):
+    """Passt SQLite-Typnamen an den Dialekt an"""
+    if db.engine.dialect.name == 'postgresql':
+        return col_type.replace('DATETIME', 'TIMESTAMP')
+    return col_type
+
+
+def _add_columns(db, columns):
+    """
+    Fuegt fehlende Spalten hinzu. Prueft vorher per Inspector statt
+    Exceptions abzufangen; Tabellen, die es nicht gibt, werden uebersprungen.
+    Fehlgeschlagene ALTERs werden gesammelt und danach als Fehler gemeldet,
+    damit die Migration nicht als angewendet protokolliert wird.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    known = {}
+    failed = []
+    for table, col, col_type in columns:
+        if table not in existing_tables:
+            continue
+        if table not in known:
+            known[table] = {c['name'] for c in inspector.get_columns(table)}
+        if col in known[table]:
+            continue
+        try:
+            db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {col} {_sql_type(db, col_type)}"))
+            db.session.commit()
+            known[table].add(col)
+            print(f"  + Spalte {table}.{col}")
+        except Exception as e:
+            db.session.rollback()
+            failed.append(f"{table}.{col}: {e}")
+    if failed:
+        raise RuntimeError("Spalten konnten nicht angelegt werden: " + "; ".join(failed))
+
+
+def _execute_all(db, statements):
+    """Fuehrt idempotente Statements (IF NOT EXISTS) einzeln aus"""
+    for sql in statements:
+        try:
+            db.session.execute(text(sql))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"  [WARN] {sql[:60]}: {e}")
+
+
+def _ensure_module(db, **mod_data):
+    """Legt ein Modul fuer das Berechtigungssystem an, falls es fehlt"""
+    from src.models.user_permissions import Module
+    if not Module.query.filter_by(name=mod_data['name']).first():
+        db.session.add(Module(**mod_data))
+
+
+# ==========================================
+# MIGRATIONEN
+# ==========================================
+
+def _m001_defaults_veredelung(db):
+    """Standard-Veredelungsarten und Positionstypen"""
+    from src.models.order_workflow import VeredelungsArt, PositionTyp
+    VeredelungsArt.ensure_defaults()
+    PositionTyp.ensure_defaults()
+
+
+def _m002_customer_user_flags(db):
+    _add_columns(db, [
+        ("customers", "is_active", "BOOLEAN DEFAULT TRUE"),
+        ("users", "is_system_admin", "BOOLEAN DEFAULT FALSE"),
+    ])
+
+
+def _m003_tenant_billing(db):
+    _add_columns(db, [
+        ("tenants", "billing_status", "VARCHAR(30) DEFAULT 'active'"),
+        ("tenants", "billing_cycle", "VARCHAR(20) DEFAULT 'monthly'"),
+        ("tenants", "next_billing_date", "DATE"),
+        ("tenants", "last_payment_date", "DATE"),
+        ("tenants", "last_payment_amount", "NUMERIC(10,2)"),
+        ("tenants", "stripe_customer_id", "VARCHAR(100)"),
+        ("tenants", "stripe_subscription_id", "VARCHAR(100)"),
+        ("tenants", "tax_id", "VARCHAR(50)"),
+    ])
+
+
+def _m004_order_features(db):
+    """Rechnungsempfaenger, Sublimation, Non-Textil"""
+    _add_columns(db, [
+        ("orders", "billing_customer_id", "VARCHAR(50)"),
+        ("order_items", "sublimation_position", "VARCHAR(50)"),
+        ("order_items", "is_non_textile", "BOOLEAN DEFAULT FALSE"),
+        ("order_items", "non_textile_type", "VARCHAR(100)"),
+    ])
+
+
+def _m005_shop_columns(db):
+    """Shop + Anfragen"""
+    _add_columns(db, [
+        ("orders", "source", "VARCHAR(20)"),
+        ("orders", "tracking_token", "VARCHAR(64)"),
+        ("orders", "customer_email_for_tracking", "VARCHAR(200)"),
+        ("orders", "archived_at", "DATETIME"),
+        ("orders", "archived_by", "VARCHAR(80)"),
+        ("orders", "archive_reason", "VARCHAR(200)"),
+        ("articles", "show_in_shop", "BOOLEAN DEFAULT FALSE"),
+        ("articles", "shop_description", "TEXT"),
+        ("articles", "shop_image_path", "VARCHAR(255)"),
+        ("articles", "shop_category_id", "INTEGER"),
+        ("articles", "shop_sort_order", "INTEGER DEFAULT 0"),
+        ("articles", "shop_min_quantity", "INTEGER DEFAULT 1"),
+    ])
+
+
+def _m006_order_design_supplier(db):
+    """OrderDesign: Notizen + Externe Bestellung + Druckdatei"""
+    _add_columns(db, [
+        ("order_designs", "notes", "TEXT"),
+        ("order_designs", "supplier_id", "VARCHAR(50)"),
+        ("order_designs", "supplier_order_status", "VARCHAR(50) DEFAULT 'none'"),
+        ("order_designs", "supplier_order_date", "DATE"),
+        ("order_designs", "supplier_expected_date", "DATE"),
+        ("order_designs", "supplier_delivered_date", "DATE"),
+        ("order_designs", "supplier_order_notes", "TEXT"),
+        ("order_designs", "supplier_cost", "FLOAT"),
+        ("order_designs", "supplier_order_id", "VARCHAR(50)"),
+        ("order_designs", "supplier_reference", "VARCHAR(100)"),
+        ("order_designs", "print_file_path", "VARCHAR(255)"),
+        ("order_designs", "print_file_name", "VARCHAR(255)"),
+    ])
+
+
+def _m007_company_sumup(db):
+    _add_columns(db, [
+        ("company_settings", "sumup_api_key", "VARCHAR(500)"),
+        ("company_settings", "sumup_merchant_code", "VARCHAR(100)"),
+    ])
+
+
+def _m008_article_images(db):
+    """Artikelbild-Felder + Google API Keys"""
+    _add_columns(db, [
+        ("articles", "image_url", "VARCHAR(500)"),
+        ("articles", "image_path", "VARCHAR(255)"),
+        ("articles", "image_thumbnail_path", "VARCHAR(255)"),
+        ("company_settings", "google_api_key", "VARCHAR(200)"),
+        ("company_settings", "google_search_cx", "VARCHAR(100)"),
+    ])
+
+
+def _m009_supplier_order_receiving(db):
+    """Lieferantenbestellungen: Wareneingang-Felder"""
+    _add_columns(db, [
+        ("supplier_orders", "delivery_note_photo", "VARCHAR(500)"),
+        ("supplier_orders", "actual_delivery_date", "DATE"),
+        ("supplier_orders", "receiving_notes", "TEXT"),
+    ])
+
+
+def _m010_performance_indexes(db):
+    """Indexe fuer haeufig gefilterte Spalten"""
+    _execute_all(db, [
+        "CREATE INDEX IF NOT EXISTS idx_order_workflow_status ON orders (workflow_status)",
+        "CREATE INDEX IF NOT EXISTS idx_order_design_approval_status ON orders (design_approval_status)",
+        "CREATE INDEX IF NOT EXISTS idx_order_payment_status ON orders (payment_status)",
+        "CREATE INDEX IF NOT EXISTS idx_order_archived_at ON orders (archived_at)",
+        "CREATE INDEX IF NOT EXISTS idx_order_active ON orders (archived_at, workflow_status)",
+        "CREATE INDEX IF NOT EXISTS idx_order_customer_created ON orders (customer_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_inquiry_status ON inquiries (status)",
+        "CREATE INDEX IF NOT EXISTS idx_inquiry_created ON inquiries (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_supplier_order_status ON supplier_orders (status)",
+        "CREATE INDEX IF NOT EXISTS idx_supplier_order_delivery ON supplier_orders (delivery_date)",
+    ])
+
+
+def _m011_misc_columns(db):
+    """Rechnungs-Scanner, DPD-Kundennummer, Angebots-Verknuepfung, private Aufgaben"""
+    _add_columns(db, [
+        ("rechnungen", "scan_foto", "VARCHAR(500)"),
+        ("company_settings", "dpd_customer_number", "VARCHAR(20)"),
+        ("inquiries", "angebot_id", "INTEGER REFERENCES angebote(id)"),
+        ("todos", "is_private", "BOOLEAN DEFAULT TRUE"),
+    ])
+
+
+def _m012_angebote_tracking(db):
+    """Tracking-Token fuer Angebote (einheitliches Tracking) inkl. Nachbefuellung"""
+    _add_columns(db, [("angebote", "tracking_token", "VARCHAR(64) UNIQUE")])
+    _execute_all(db, [
+        "CREATE INDEX IF NOT EXISTS idx_angebote_tracking_token ON angebote(tracking_token)",
+    ])
+
+    import uuid
+    try:
+        rows = db.session.execute(text("SELECT id FROM angebote WHERE tracking_token IS NULL")).fetchall()
+        for row in rows:
+            db.session.execute(text("UPDATE angebote SET tracking_token = :token WHERE id = :id"),
+                               {'token': uuid.uuid4().hex, 'id': row[0]})
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+
+
+def _m013_kundenware_rechtstexte(db):
+    """Kundenware, Auftragstyp im Angebot, rechtliche Texte"""
+    _add_columns(db, [
+        ("orders", "is_kundenware", "BOOLEAN DEFAULT FALSE"),
+        ("angebote", "is_kundenware", "BOOLEAN DEFAULT FALSE"),
+        ("angebote", "auftragstyp", "VARCHAR(20) DEFAULT 'embroidery'"),
+        ("company_settings", "haftungsausschluss_kundenware", "TEXT DEFAULT ''"),
+        ("company_settings", "agb_text", "TEXT DEFAULT ''"),
+    ])
+
+
+def _m014_textbausteine(db):
+    """Textbausteine fuer Angebote (Tabelle kommt aus create_all)"""
+    _add_columns(db, [
+        ("angebote", "textbausteine_ids", "TEXT DEFAULT ''"),
+        ("angebote", "textbausteine_text", "TEXT DEFAULT ''"),
+    ])
+    from src.models.textbaustein import Textbaustein
+    Textbaustein.ensure_defaults()
+
+
+def _m015_angebote_freigabe(db):
+    """Angebots-Freigabe Felder"""
+    _add_columns(db, [
+        ("angebote", "approval_token", "VARCHAR(100) UNIQUE"),
+        ("angebote", "approval_status", "VARCHAR(50)"),
+        ("angebote", "approval_sent_at", "TIMESTAMP"),
+        ("angebote", "approval_date", "TIMESTAMP"),
+        ("angebote", "approval_signature", "TEXT"),
+        ("angebote", "approval_ip", "VARCHAR(50)"),
+        ("angebote", "approval_user_agent", "VARCHAR(500)"),
+        ("angebote", "approval_notes", "TEXT"),
+        ("angebote", "approved_by_name", "VARCHAR(200)"),
+    ])
+
+
+def _m016_email_templates(db):
+    """Standard E-Mail-Templates fuer Kunden-Benachrichtigungen"""
+    from src.models.crm_contact import EmailTemplate, EmailTemplateCategory
+    from src.models.email_automation import EmailAutomationRule
+
+    if EmailTemplate.query.filter_by(category=EmailTemplateCategory.AUFTRAG_BESTAETIGUNG).count() > 0:
+        return
+
+    templates = [
+        (EmailTemplateCategory.AUFTRAG_BESTAETIGUNG, 'Auftragsbestaetigung',
+         'Ihr Auftrag {auftragsnummer} wurde angenommen',
+         'Guten Tag {anrede} {kunde_name},\n\nvielen Dank fuer Ihren Auftrag {auftragsnummer}.\nWir haben Ihren Auftrag erhalten und werden ihn schnellstmoeglich bearbeiten.\n\nMit freundlichen Gruessen\n{firmenname}',
+         '<p>Guten Tag {anrede} {kunde_name},</p><p>vielen Dank fuer Ihren Auftrag <strong>{auftragsnummer}</strong>.</p><p>Wir haben Ihren Auftrag erhalten und werden ihn schnellstmoeglich bearbeiten.</p><p>Mit freundlichen Gruessen<br>{firmenname}</p>',
+         'order_status', 'accepted'),
+
+        (EmailTemplateCategory.PRODUKTION_GEPLANT, 'Ware im Zulauf',
+         'Material fuer Ihren Auftrag {auftragsnummer} ist bestellt',
+         'Guten Tag {anrede} {kunde_name},\n\ndie Materialien fuer Ihren Auftrag {auftragsnummer} sind bestellt.\nSobald alles eingetroffen ist, starten wir mit der Produktion.\n\nMit freundlichen Gruessen\n{firmenname}',
+         '<p>Guten Tag {anrede} {kunde_name},</p><p>die Materialien fuer Ihren Auftrag <strong>{auftragsnummer}</strong> sind bestellt.</p><p>Sobald alles eingetroffen ist, starten wir mit der Produktion.</p><p>Mit freundlichen Gruessen<br>{firmenname}</p>',
+         'workflow_status', 'confirmed'),
+
+        (EmailTemplateCategory.PRODUKTION_GEPLANT, 'Produktion gestartet',
+         'Ihr Auftrag {auftragsnummer} ist in Produktion',
+         'Guten Tag {anrede} {kunde_name},\n\nIhr Auftrag {auftragsnummer} befindet sich jetzt in der Produktion.\nWir informieren Sie, sobald Ihr Auftrag fertiggestellt ist.\n\nMit freundlichen Gruessen\n{firmenname}',
+         '<p>Guten Tag {anrede} {kunde_name},</p><p>Ihr Auftrag <strong>{auftragsnummer}</strong> befindet sich jetzt in der Produktion.</p><p>Wir informieren Sie, sobald Ihr Auftrag fertiggestellt ist.</p><p>Mit freundlichen Gruessen<br>{firmenname}</p>',
+         'order_status', 'in_progress'),
+
+        (EmailTemplateCategory.QM_ABNAHME, 'Auftrag fertig',
+         'Ihr Auftrag {auftragsnummer} ist fertig!',
+         'Guten Tag {anrede} {kunde_name},\n\nIhr Auftrag {auftragsnummer} ist fertiggestellt und bereit zur Abholung bzw. zum Versand.\n\nMit freundlichen Gruessen\n{firmenname}',
+         '<p>Guten Tag {anrede} {kunde_name},</p><p>Ihr Auftrag <strong>{auftragsnummer}</strong> ist fertiggestellt und bereit zur Abholung bzw. zum Versand.</p><p>Mit freundlichen Gruessen<br>{firmenname}</p>',
+         'order_status', 'ready'),
+
+        (EmailTemplateCategory.VERSAND_INFO, 'Versendet mit Tracking',
+         'Ihr Auftrag {auftragsnummer} wurde versendet',
+         'Guten Tag {anrede} {kunde_name},\n\nIhr Auftrag {auftragsnummer} wurde versendet.\nVersanddienstleister: {versanddienstleister}\nSendungsnummer: {sendungsnummer}\n\nMit freundlichen Gruessen\n{firmenname}',
+         '<p>Guten Tag {anrede} {kunde_name},</p><p>Ihr Auftrag <strong>{auftragsnummer}</strong> wurde versendet.</p><table style="background:#f8f9fa;padding:15px;border-radius:8px;margin:15px 0;width:100%"><tr><td><strong>Versand:</strong></td><td>{versanddienstleister}</td></tr><tr><td><strong>Sendungsnr.:</strong></td><td>{sendungsnummer}</td></tr></table><p>Mit freundlichen Gruessen<br>{firmenname}</p>',
+         'workflow_status', 'shipped'),
+    ]
+
+    for cat, name, subj, body_text, body_html, trigger_evt, trigger_val in templates:
+        tpl = EmailTemplate(
+            name=name, category=cat, subject=subj,
+            body_text=body_text, body_html=body_html, is_active=True,
+            created_by='System'
+        )
+        db.session.add(tpl)
+        db.session.flush()
+
+        db.session.add(EmailAutomationRule(
+            name=f'Auto: {name}',
+            description=f'Sendet "{name}" bei {trigger_evt}={trigger_val}',
+            trigger_event=trigger_evt,
+            trigger_value=trigger_val,
+            template_id=tpl.id,
+            is_enabled=True,
+            created_by='System'
+        ))
+
+    db.session.commit()
+    print('[OK] Standard E-Mail-Templates und Automation-Regeln erstellt')
+
+
+def _m017_module_icons(db):
+    """Modul-Icons von Emojis/Text auf Bootstrap Icons"""
+    from src.models.user_permissions import Module
+    icon_mapping = {
+        'CRM': 'bi-people-fill', '👥': 'bi-people-fill',
+        'PROD': 'bi-gear-wide-connected', '🏭': 'bi-gear-wide-connected',
+        'POS': 'bi-cash-stack', '💰': 'bi-cash-stack',
+        'ACC': 'bi-calculator-fill', '📈': 'bi-calculator-fill',
+        'DOC': 'bi-folder2-open', '📁': 'bi-folder2-open',
+        'ADM': 'bi-sliders', '⚙️': 'bi-sliders',
+        'WH': 'bi-box-seam-fill', '📦': 'bi-box-seam-fill',
+        'DSN': 'bi-palette-fill', '🎨': 'bi-palette-fill',
+        'EK': 'bi-cart-plus-fill', '🛒': 'bi-cart-plus-fill',
+        'palette': 'bi-palette-fill',
+    }
+    updated = False
+    for m in Module.query.all():
+        if m.icon in icon_mapping:
+            m.icon = icon_mapping[m.icon]
+            updated = True
+        elif m.icon and not m.icon.startswith('bi-'):
+            m.icon = 'bi-grid-fill'
+            updated = True
+    if updated:
+        db.session.commit()
+
+
+def _m018_modules(db):
+    """Online-Module, CSV-Import, Vertraege, Aufgaben-Board"""
+    _ensure_module(db, name='website_cms', display_name='Website-CMS',
+                   description='Website-Inhalte bearbeiten', icon='bi-globe', color='info',
+                   route='website_admin.dashboard', category='online',
+                   requires_admin=True, default_enabled=True, sort_order=10)
+    _ensure_module(db, name='shop_admin', display_name='Online-Shop',
+                   description='Shop & Konfigurator verwalten', icon='bi-shop', color='success',
+                   route='shop_admin.dashboard', category='online',
+                   requires_admin=True, default_enabled=True, sort_order=11)
+    _ensure_module(db, name='inquiry_admin', display_name='Anfragen',
+                   description='Website-Anfragen bearbeiten', icon='bi-envelope-paper-fill', color='warning',
+                   route='inquiry_admin.list', category='online',
+                   requires_admin=True, default_enabled=True, sort_order=12)
+    _ensure_module(db, name='csv_import', display_name='CSV-Import',
+                   description='Kunden, Artikel & Buchungen importieren', icon='bi-file-earmark-arrow-up',
+                   color='secondary', route='csv_import.index', category='admin',
+                   requires_admin=True, default_enabled=True, sort_order=15)
+    _ensure_module(db, name='contracts', display_name='Vertraege & Policen',
+                   description='Vertraege, Versicherungen & Wartung verwalten', icon='bi-file-earmark-text',
+                   color='primary', route='contracts.index', category='admin',
+                   requires_admin=False, default_enabled=True, sort_order=14)
+    _ensure_module(db, name='taskboard', display_name='Aufgaben-Board',
+                   description='Zentrale Aufgabenverwaltung mit Kanban-Board', icon='bi-kanban',
+                   color='info', route='taskboard.index', category='core',
+                   requires_admin=False, default_enabled=True, sort_order=2)
+    db.session.commit()
+
+
+def _m019_website_content(db):
+    """Website-CMS Standard-Inhalte (nur bei leerer Tabelle)"""
+    from src.models.website_content import WebsiteContent
+    if WebsiteContent.query.count() == 0:
+        WebsiteContent.seed_defaults()
+        print("[OK] Website Standard-Inhalte erstellt")
+
+
+def _m020_admin_and_tenant(db):
+    """Admin-User und Default-Tenant"""
+    from src.models.models import User
+    from src.models.tenant import Tenant, UserTenant
+
+    if not User.query.filter_by(username='admin').first():
+        import secrets
+        initial_pw = secrets.token_urlsafe(12)
+        admin = User(username='admin', email='admin@example.com', is_admin=True)
+        admin.set_password(initial_pw)
+        db.session.add(admin)
+        db.session.commit()
+        print(f"[WICHTIG] Admin-User erstellt. Passwort: {initial_pw}")
+        print("[WICHTIG] Bitte sofort aendern unter Einstellungen > Benutzer!")
+
+    if Tenant.query.filter_by(slug='default').first():
+        return
+
+    default_tenant = Tenant(
+        slug='default',
+        name='StitchAdmin',
+        subdomain='app',
+        contact_email='admin@example.com',
+        is_active=True,
+        plan_tier='enterprise',
+    )
+    db.session.add(default_tenant)
+    db.session.flush()
+
+    # Alle bestehenden User dem Default-Tenant zuweisen
+    users = User.query.all()
+    for user in users:
+        if not UserTenant.query.filter_by(user_id=user.id, tenant_id=default_tenant.id).first():
+            db.session.add(UserTenant(
+                user_id=user.id,
+                tenant_id=default_tenant.id,
+                role='tenant_admin' if user.is_admin else 'user',
+                is_active=True,
+                is_primary=True,
+            ))
+
+    # Admin als System-Admin markieren
+    admin_user = User.query.filter_by(username='admin').first()
+    if admin_user and hasattr(admin_user, 'is_system_admin'):
+        admin_user.is_system_admin = True
+
+    db.session.commit()
+    print(f"[OK] Default-Tenant erstellt, {len(users)} User zugewiesen")
+
+
+def _m021_id_sequences(db):
+    """ID-Zaehler aus den aktuellen Maxima saeen (IdGenerator)"""
+    from src.services.id_generator_service import seed_id_sequences
+
+    count = seed_id_sequences()
+    db.session.commit()
+    print(f"[OK] {count} ID-Sequenzen initialisiert")
+
+
+def _m022_search_index(db):
+    """Suchindex (FTS5 / pg_trgm) anlegen und fuellen"""
+    from src.services.search_service import rebuild_search_index
+
+    counts = rebuild_search_index()
+    print(f"[OK] Suchindex aufgebaut ({', '.join(f'{k}={v}' for k, v in counts.items())})")
+
+
+def _m023_imap_uid_sync(db):
+    """UID-Stand fuer den inkrementellen IMAP-Sync, Index fuer die Duplikatpruefung"""
+    _add_columns(db, [
+        ("email_accounts", "imap_uidvalidity", "BIGINT"),
+        ("email_accounts", "imap_last_uid", "INTEGER"),
+    ])
+    _execute_all(db, [
+        "CREATE INDEX IF NOT EXISTS idx_archived_email_account_msgid "
+        "ON archived_emails (email_account_id, message_id)",
+    ])
+
+
+def _m024_job_progress(db):
+    """Fortschritt laufender Hintergrund-Jobs (Importe)"""
+    _add_columns(db, [
+        ("background_jobs", "progress", "JSON"),
+    ])
+
+
+def _m025_csv_import_sample(db):
+    """Stichprobe der CSV-Datei fuer Vorschauen ohne erneutes Lesen"""
+    _add_columns(db, [
+        ("csv_import_jobs", "sample_rows", "JSON"),
+    ])
+
+
+def _m026_shelly_energy_rollups(db):
+    """Stunden-/Tageswerte der Shelly-Messungen aus den vorhandenen Rohdaten"""
+    from src.services.shelly_rollup_service import rebuild_rollups
+
+    count = rebuild_rollups()
+    print(f"[OK] Shelly-Rollups aus {count} Messwerten aufgebaut")
+
+
+def _m027_customer_kpis(db):
+    """Kunden-Kennzahlen fuer CRM-Rankings erstmalig berechnen"""
+    from src.services.customer_kpi_service import rebuild_kpis
+
+    count = rebuild_kpis()
+    print(f"[OK] Kunden-Kennzahlen fuer {count} Kunden aufgebaut")
+
+
+def _m028_stock_reservation_balance(db):
+    """Reservierungstabelle + laufender Reservierungs-Saldo je Artikel"""
+    from src.services.inventory_service import StockReservation, inventory_service
+
+    StockReservation.__table__.create(db.engine, checkfirst=True)
+    _execute_all(db, [
+        "CREATE INDEX IF NOT EXISTS ix_stock_reservations_article_status ON stock_reservations (article_id, status)",
+    ])
+    _add_columns(db, [("articles", "stock_reserved", "INTEGER DEFAULT 0")])
+    count = inventory_service.recompute_reserved_balances()
+    db.session.commit()
+    print(f"[OK] Reservierungs-Saldo fuer {count} Artikel gesetzt")
+
+
+def _m029_search_index_stale(db):
+    """Veraltet-Markierung des Suchindex (Neuaufbau nach Bulk-Aenderungen im Hintergrund)"""
+    _add_columns(db, [
+        ("search_index_meta", "stale", "BOOLEAN NOT NULL DEFAULT FALSE"),
+    ])
+
+
+# (Version, Name, Funktion) - Versionen nie umnummerieren oder entfernen!
+MIGRATIONS = [
+    (1, 'defaults_veredelung', _m001_defaults_veredelung),
+    (2, 'customer_user_flags', _m002_customer_user_flags),
+    (3, 'tenant_billing', _m003_tenant_billing),
+    (4, 'order_features', _m004_order_features),
+    (5, 'shop_columns', _m005_shop_columns),
+    (6, 'order_design_supplier', _m006_order_design_supplier),
+    (7, 'company_sumup', _m007_company_sumup),
+    (8, 'article_images', _m008_article_images),
+    (9, 'supplier_order_receiving', _m009_supplier_order_receiving),
+    (10, 'performance_indexes', _m010_performance_indexes),
+    (11, 'misc_columns', _m011_misc_columns),
+    (12, 'angebote_tracking', _m012_angebote_tracking),
+    (13, 'kundenware_rechtstexte', _m013_kundenware_rechtstexte),
+    (14, 'textbausteine', _m014_textbausteine),
+    (15, 'angebote_freigabe', _m015_angebote_freigabe),
+    (16, 'email_templates', _m016_email_templates),
+    (17, 'module_icons', _m017_module_icons),
+    (18, 'modules', _m018_modules),
+    (19, 'website_content', _m019_website_content),
+    (20, 'admin_and_tenant', _m020_admin_and_tenant),
+    (21, 'id_sequences', _m021_id_sequences),
+    (22, 'search_index', _m022_search_index),
+    (23, 'imap_uid_sync', _m023_imap_uid_sync),
+    (24, 'job_progress', _m024_job_progress),
+    (25, 'csv_import_sample', _m025_csv_import_sample),
+    (26, 'shelly_energy_rollups', _m026_shelly_energy_rollups),
+    (27, 'customer_kpis', _m027_customer_kpis),
+    (28, 'stock_reservation_balance', _m028_stock_reservation_balance),
+    (29, 'search_index_stale', _m029_search_index_stale),
+]
+
+LATEST_VERSION = max(v for v, _, _ in MIGRATIONS)
+
+
+# ==========================================
+# RUNNER
+# ==========================================
+
+@contextmanager
+def _migration_lock(engine):
+    """
+    Prozessuebergreifende Sperre fuer die Migrations-Stufe.
+    PostgreSQL: Advisory-Lock, SQLite: Lock-Datei neben der DB.
+    """
+    dialect = engine.dialect.name
+
+    if dialect == 'postgresql':
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {'key': _PG_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': _PG_LOCK_KEY})
+        return
+
+    db_file = engine.url.database
+    if dialect != 'sqlite' or not db_file or db_file == ':memory:':
+        yield
+        return
+
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None  # Windows (EXE) laeuft als Einzelprozess
+
+    with open(f"{db_file}.migrate.lock", 'a+') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _read_state(db):
+    """
+    Liest angewendete Versionen und bekannte Tabellen in EINER Abfrage.
+    Returns: (set(versionen), set(tabellen)) oder (None, None) ohne Versionstabelle
+    """
+    try:
+        rows = db.session.execute(text("SELECT version, details FROM schema_versions")).fetchall()
+    except Exception:
+        db.session.rollback()
+        return None, None
+
+    versions = set()
+    tables = set()
+    for version, details in rows:
+        if version == 0:
+            try:
+                tables = set(json.loads(details or '[]'))
+            except ValueError:
+                tables = set()
+        else:
+            versions.add(version)
+    return versions, tables
+
+
+def _record(db, version, name, duration_ms, details=None):
+    from src.models.schema_version import SchemaVersion
+    entry = db.session.get(SchemaVersion, version) or SchemaVersion(version=version)
+    entry.name = name
+    entry.details = details
+    entry.duration_ms = duration_ms
+    entry.applied_at = datetime.utcnow()
+    db.session.add(entry)
+    db.session.commit()
+
+
+def _pending(applied_versions, known_tables, model_tables):
+    """Was ist zu tun? (create_all noetig, fehlende Migrationen)"""
+    if applied_versions is None:
+        return True, list(MIGRATIONS)
+    needs_create = not model_tables <= known_tables
+    missing = [m for m in MIGRATIONS if m[0] not in applied_versions]
+    return needs_create, missing
+
+
+def _current_version(applied_versions):
+    """Hoechste Version, bis zu der alle Migrationen angewendet sind"""
+    current = 0
+    for version, _, _ in MIGRATIONS:
+        if version not in applied_versions:
+            break
+        current = version
+    return current
+
+
+def ensure_schema(db):
+    """
+    Prueft die Schema-Version (eine Abfrage) und migriert nur bei Bedarf.
+    Muss im App-Kontext aufgerufen werden.
+
+    Returns:
+        dict mit 'version' (tatsaechlich erreichte Version), 'migrated',
+        'failed' (fehlgeschlagene Version oder None) und Zeiten pro Phase in 'phases' (ms)
+    """
+    _import_models()
+    phases = {}
+    t0 = time.perf_counter()
+
+    model_tables = set(db.metadata.tables)
+    applied, known_tables = _read_state(db)
+    needs_create, missing = _pending(applied, known_tables, model_tables)
+    phases['version_check'] = round((time.perf_counter() - t0) * 1000, 1)
+
+    report = {'version': LATEST_VERSION, 'migrated': [], 'failed': None, 'phases': phases}
+    if not needs_create and not missing:
+        return report
+
+    t_lock = time.perf_counter()
+    with _migration_lock(db.engine):
+        phases['lock_wait'] = round((time.perf_counter() - t_lock) * 1000, 1)
+
+        # Ein anderer Prozess kann inzwischen migriert haben
+        applied, known_tables = _read_state(db)
+        needs_create, missing = _pending(applied, known_tables, model_tables)
+
+        if needs_create:
+            t = time.perf_counter()
+            db.create_all()
+            duration = round((time.perf_counter() - t) * 1000, 1)
+            phases['create_all'] = duration
+            existing = set(inspect(db.engine).get_table_names())
+            _record(db, 0, 'create_all', int(duration),
+                    json.dumps(sorted(existing | (known_tables or set()))))
+
+        t_all = time.perf_counter()
+        for version, name, func in missing:
+            t = time.perf_counter()
+            try:
+                func(db)
+            except Exception as e:
+                db.session.rollback()
+                print(f"[FEHLER] Schema-Migration {version:03d} {name}: {e}")
+                logger.exception(f"Schema-Migration {version} fehlgeschlagen")
+                report['failed'] = version
+                break
+            duration = round((time.perf_counter() - t) * 1000, 1)
+            _record(db, version, name, int(duration))
+            report['migrated'].append(version)
+            phases[f'm{version:03d}_{name}'] = duration
+        phases['migrations'] = round((time.perf_counter() - t_all) * 1000, 1)
+
+    report['version'] = _current_version((applied or set()) | set(report['migrated']))
+    if report['failed'] is not None:
+        print(f"[WARN] {len(report['migrated'])} Schema-Migration(en) angewendet, "
+              f"v{report['failed']:03d} fehlgeschlagen (jetzt v{report['version']})")
+    elif report['migrated']:
+        print(f"[OK] {len(report['migrated'])} Schema-Migration(en) angewendet "
+              f"(jetzt v{report['version']})")
+    return report
+
+
+def get_schema_status(db):
+    """Angewendete und ausstehende Migrationen (fuer CLI/Admin)"""
+    _import_models()
+    applied, known_tables = _read_state(db)
+    applied = applied or set()
+    return {
+        'latest': LATEST_VERSION,
+        'applied': sorted(applied),
+        'pending': [f"{v:03d}_{n}" for v, n, _ in MIGRATIONS if v not in applied],
+        'missing_tables': sorted(set(db.metadata.tables) - (known_tables or set())),
+    }
+
+
+def format_phases(phases):
+    """Kurzform fuer Log-Ausgabe: 'version_check=1.2ms, create_all=830.0ms'"""
+    return ', '.join(f"{k}={v}ms" for k, v in phases.items() if not k[1:4].isdigit())
+
+
+__all__ = ['MIGRATIONS', 'LATEST_VERSION', 'ensure_schema', 'get_schema_status', 'format_phases']
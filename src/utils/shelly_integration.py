@@ -12,18 +12,77 @@ from datetime import datetime
 logger = logging.getLogger(__name__)
 
 
+def parse_power_data(status: Dict, channel: int = 0) -> Dict:
+    """Energie-Daten aus der /status-Antwort (Gen 1, Gen 2, EM); {} wenn unbekannt"""
+    # Shelly Plus/Pro Geräte (Gen 2)
+    if 'switch:0' in status:
+        switch_data = status.get(f'switch:{channel}', {})
+        return {
+            'power': switch_data.get('apower', 0),  # Aktive Leistung
+            'voltage': switch_data.get('voltage', 0),
+            'current': switch_data.get('current', 0),
+            'pf': switch_data.get('pf', 0),
+            'energy': switch_data.get('aenergy', {}).get('total', 0) / 1000,  # Wh
+            'is_on': switch_data.get('output', False),
+            'temperature': switch_data.get('temperature', {}).get('tC', 0)
+        }
+
+    # Shelly Gen 1 Geräte (z.B. Shelly Plug, 1PM)
+    elif 'meters' in status:
+        meter_data = status.get('meters', [{}])[channel]
+        relay_data = status.get('relays', [{}])[channel]
+        return {
+            'power': meter_data.get('power', 0),
+            'voltage': meter_data.get('voltage', 0),
+            'current': meter_data.get('current', 0),
+            'pf': meter_data.get('pf', 0),
+            'energy': meter_data.get('total', 0) / 60,  # Watt-Minuten zu Wh
+            'is_on': relay_data.get('ison', False),
+            'temperature': status.get('temperature', 0)
+        }
+
+    # Shelly EM (Energie-Monitor ohne Schaltfunktion)
+    elif 'emeters' in status:
+        emeter_data = status.get('emeters', [{}])[channel]
+        return {
+            'power': emeter_data.get('power', 0),
+            'voltage': emeter_data.get('voltage', 0),
+            'current': emeter_data.get('current', 0),
+            'pf': emeter_data.get('pf', 0),
+            'energy': emeter_data.get('total', 0) / 60,
+            'is_on': None,  # Kein Relay
+            'temperature': 0
+        }
+
+    return {}
+
+
+def device_info_from(data: Dict) -> Dict:
+    """Geräte-Info aus der /shelly-Antwort (Gen 2 meldet model/ver statt type/fw)"""
+    return {
+        'type': data.get('type') or data.get('model', 'Unknown'),
+        'mac': data.get('mac', ''),
+        'auth': data.get('auth', data.get('auth_en', False)),
+        'fw': data.get('fw') or data.get('ver', ''),
+        'name': data.get('name') or '',
+        'discoverable': data.get('discoverable', True)
+    }
+
+
 class ShellyDevice:
     """Repräsentiert ein Shelly-Gerät"""
 
-    def __init__(self, ip: str, device_type: str = None):
+    def __init__(self, ip: str, device_type: str = None, session=None):
         self.ip = ip
         self.device_type = device_type
         self.base_url = f"http://{ip}"
+        # Gemeinsame Keep-Alive-Session (shelly_poller_service), sonst je Aufruf neu
+        self.http = session or requests
 
     def get_status(self) -> Dict:
         """Holt aktuellen Status des Geräts"""
         try:
-            response = requests.get(f"{self.base_url}/status", timeout=2)
+            response = self.http.get(f"{self.base_url}/status", timeout=2)
             if response.status_code == 200:
                 return response.json()
         except Exception as e:
@@ -33,7 +92,7 @@ class ShellyDevice:
     def get_settings(self) -> Dict:
         """Holt Geräte-Einstellungen"""
         try:
-            response = requests.get(f"{self.base_url}/settings", timeout=2)
+            response = self.http.get(f"{self.base_url}/settings", timeout=2)
             if response.status_code == 200:
                 return response.json()
         except Exception as e:
@@ -43,7 +102,7 @@ class ShellyDevice:
     def turn_on(self, channel: int = 0) -> bool:
         """Schaltet Gerät ein"""
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/relay/{channel}",
                 params={'turn': 'on'},
                 timeout=2
@@ -56,7 +115,7 @@ class ShellyDevice:
     def turn_off(self, channel: int = 0) -> bool:
         """Schaltet Gerät aus"""
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/relay/{channel}",
                 params={'turn': 'off'},
                 timeout=2
@@ -69,7 +128,7 @@ class ShellyDevice:
     def toggle(self, channel: int = 0) -> bool:
         """Schaltet Gerät um (Toggle)"""
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/relay/{channel}",
                 params={'turn': 'toggle'},
                 timeout=2
@@ -93,50 +152,7 @@ class ShellyDevice:
             - is_on: Schaltzustand
         """
         try:
-            status = self.get_status()
-
-            # Shelly Plus/Pro Geräte (Gen 2)
-            if 'switch:0' in status:
-                switch_data = status.get(f'switch:{channel}', {})
-                return {
-                    'power': switch_data.get('apower', 0),  # Aktive Leistung
-                    'voltage': switch_data.get('voltage', 0),
-                    'current': switch_data.get('current', 0),
-                    'pf': switch_data.get('pf', 0),
-                    'energy': switch_data.get('aenergy', {}).get('total', 0) / 1000,  # Wh
-                    'is_on': switch_data.get('output', False),
-                    'temperature': switch_data.get('temperature', {}).get('tC', 0)
-                }
-
-            # Shelly Gen 1 Geräte (z.B. Shelly Plug, 1PM)
-            elif 'meters' in status:
-                meter_data = status.get('meters', [{}])[channel]
-                relay_data = status.get('relays', [{}])[channel]
-                return {
-                    'power': meter_data.get('power', 0),
-                    'voltage': meter_data.get('voltage', 0),
-                    'current': meter_data.get('current', 0),
-                    'pf': meter_data.get('pf', 0),
-                    'energy': meter_data.get('total', 0) / 60,  # Watt-Minuten zu Wh
-                    'is_on': relay_data.get('ison', False),
-                    'temperature': status.get('temperature', 0)
-                }
-
-            # Shelly EM (Energie-Monitor ohne Schaltfunktion)
-            elif 'emeters' in status:
-                emeter_data = status.get('emeters', [{}])[channel]
-                return {
-                    'power': emeter_data.get('power', 0),
-                    'voltage': emeter_data.get('voltage', 0),
-                    'current': emeter_data.get('current', 0),
-                    'pf': emeter_data.get('pf', 0),
-                    'energy': emeter_data.get('total', 0) / 60,
-                    'is_on': None,  # Kein Relay
-                    'temperature': 0
-                }
-
-            return {}
-
+            return parse_power_data(self.get_status(), channel)
         except Exception as e:
             logger.error(f"Fehler beim Abrufen der Energie-Daten von {self.ip}: {e}")
             return {}
@@ -145,17 +161,9 @@ class ShellyDevice:
         """Holt Geräte-Informationen"""
         try:
             # Shelly API - /shelly Endpoint
-            response = requests.get(f"{self.base_url}/shelly", timeout=2)
+            response = self.http.get(f"{self.base_url}/shelly", timeout=2)
             if response.status_code == 200:
-                data = response.json()
-                return {
-                    'type': data.get('type', 'Unknown'),
-                    'mac': data.get('mac', ''),
-                    'auth': data.get('auth', False),
-                    'fw': data.get('fw', ''),
-                    'name': data.get('name', ''),
-                    'discoverable': data.get('discoverable', True)
-                }
+                return device_info_from(response.json())
         except Exception as e:
             logger.error(f"Fehler beim Abrufen der Geräte-Info von {self.ip}: {e}")
         return {}
@@ -175,35 +183,9 @@ class ShellyScanner:
         Returns:
             Liste gefundener ShellyDevice-Objekte
         """
-        found_devices = []
-        logger.info(f"Starte Netzwerk-Scan für Shelly-Geräte im Netzwerk {network_prefix}.0/24")
-
-        # Scanne IP-Bereich
-        for i in range(1, 255):
-            ip = f"{network_prefix}.{i}"
-
-            try:
-                # Versuche HTTP-Verbindung zum Shelly API
-                response = requests.get(f"http://{ip}/shelly", timeout=0.5)
-
-                if response.status_code == 200:
-                    data = response.json()
-                    device_type = data.get('type', 'Unknown')
-
-                    # Prüfe ob es ein Shelly-Gerät ist
-                    if 'shelly' in device_type.lower() or data.get('mac', '').startswith(''):
-                        device = ShellyDevice(ip, device_type)
-                        found_devices.append(device)
-                        logger.info(f"Shelly-Gerät gefunden: {ip} - {device_type}")
-
-            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
-                # Keine Antwort, kein Shelly-Gerät
-                pass
-            except Exception as e:
-                logger.debug(f"Fehler beim Scannen von {ip}: {e}")
-
-        logger.info(f"Scan abgeschlossen. {len(found_devices)} Shelly-Geräte gefunden.")
-        return found_devices
+        # Parallel über den Poller (gemeinsame Session, begrenzter Thread-Pool)
+        from src.services.shelly_poller_service import scan_network
+        return [ShellyDevice(found['ip'], found['type']) for found in scan_network(network_prefix)]
 
     @staticmethod
     def scan_mdns() -> List[Dict]:
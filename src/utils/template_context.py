@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+TEMPLATE CONTEXT PROVIDER
+=========================
+Zentraler Context-Processor fuer alle Templates (Branding, Tenant-Plan,
+Positions-/Veredelungs-Auswahl, Permission-Helper).
+
+Wird EINMAL beim Start registriert (init_template_context). Werte werden
+- pro Request am Request-Objekt gehalten (mehrere render_template-Aufrufe),
+- pro Tenant prozessweit gecacht (Branding, Positionstypen, Veredelungsarten).
+
+Der Tenant-Cache wird ungueltig, sobald BrandingSettings, VeredelungsArt oder
+PositionTyp gespeichert werden (SQLAlchemy Mapper-Events). Zusaetzlich laeuft
+er nach CONTEXT_TTL_SECONDS ab, damit andere Gunicorn-Worker Aenderungen
+ebenfalls uebernehmen.
+
+Nutzung:
+    from src.utils.template_context import init_template_context
+    init_template_context(app)
+
+    # Kennzahlen (z.B. fuer Lasttests)
+    from src.utils.template_context import get_template_context_stats
+    get_template_context_stats()  # {'invocations': 120, 'tenant_misses': 1, ...}
+
+Erstellt von Hans Hahn - Alle Rechte vorbehalten
+"""
+
+import threading
+import time
+import logging
+from datetime import date
+
+from flask import request, has_request_context
+from flask_login import current_user
+
+logger = logging.getLogger(__name__)
+
+# Maximales Alter eines Tenant-Cache-Eintrags (Sekunden)
+CONTEXT_TTL_SECONDS = 300
+
+_lock = threading.Lock()
+_tenant_cache = {}  # tenant_id -> (version, geladen_um, werte)
+_cache_version = 0
+_stats = {
+    'invocations': 0,      # Aufrufe des Context-Processors
+    'request_hits': 0,     # Werte aus dem gleichen Request
+    'tenant_hits': 0,      # Werte aus dem Tenant-Cache
+    'tenant_misses': 0,    # Werte neu aus der DB geladen
+    'invalidations': 0,
+}
+
+
+class BrandingSnapshot:
+    """
+    Losgeloeste Kopie der BrandingSettings.
+    ORM-Objekte koennen nicht ueber Requests hinweg gecacht werden
+    (DetachedInstanceError nach session.remove()).
+    """
+
+    def __init__(self, logo_path=None, primary_color=None, secondary_color=None, company_name=None):
+        self.logo_path = logo_path
+        self.primary_color = primary_color
+        self.secondary_color = secondary_color
+        self.company_name = company_name
+
+    @classmethod
+    def from_settings(cls, settings):
+        if settings is None:
+            return None
+        return cls(
+            logo_path=settings.logo_path,
+            primary_color=settings.primary_color,
+            secondary_color=settings.secondary_color,
+            company_name=getattr(settings, 'company_name', None),
+        )
+
+
+class DemoBranding:
+    """Branding fuer Demo-User (ueberschreibt Firmen-Branding)"""
+    company_name = 'Muster Stickerei GmbH'
+    logo_path = None
+    primary_color = '#1a6b5a'
+    secondary_color = '#6c757d'
+
+
+def invalidate_template_context(*_args, **_kwargs):
+    """
+    Verwirft den Tenant-Cache. Signatur kompatibel mit SQLAlchemy
+    Mapper-Events (mapper, connection, target).
+    """
+    global _cache_version
+    with _lock:
+        _cache_version += 1
+        _tenant_cache.clear()
+        _stats['invalidations'] += 1
+
+
+def get_template_context_stats():
+    """Gibt Zaehler des Context-Providers zurueck (Kopie)"""
+    with _lock:
+        stats = dict(_stats)
+        stats['cached_tenants'] = len(_tenant_cache)
+        stats['cache_version'] = _cache_version
+    return stats
+
+
+def reset_template_context_stats():
+    """Setzt alle Zaehler auf 0 (z.B. vor einem Lasttest)"""
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def _load_tenant_values():
+    """Laedt die tenant-weiten Werte aus der Datenbank (Cache-Miss)"""
+    branding = None
+    try:
+        from src.models.branding_settings import BrandingSettings
+        branding = BrandingSnapshot.from_settings(BrandingSettings.get_settings())
+    except Exception:
+        branding = None
+
+    position_choices = []
+    design_type_choices = []
+    try:
+        from src.models.order_workflow import OrderDesign
+        position_choices = OrderDesign.get_position_choices_dynamic()
+        design_type_choices = OrderDesign.get_design_type_choices_dynamic()
+    except Exception:
+        pass
+
+    return {
+        'branding': branding,
+        'position_choices': position_choices,
+        'design_type_choices': design_type_choices,
+    }
+
+
+def _get_tenant_values(tenant_id):
+    """Tenant-weite Werte aus dem Cache oder frisch aus der DB"""
+    now = time.monotonic()
+    with _lock:
+        version = _cache_version
+        entry = _tenant_cache.get(tenant_id)
+        if entry and entry[0] == version and now - entry[1] < CONTEXT_TTL_SECONDS:
+            _stats['tenant_hits'] += 1
+            return entry[2]
+        _stats['tenant_misses'] += 1
+
+    values = _load_tenant_values()
+
+    with _lock:
+        # Nur speichern, wenn zwischenzeitlich nicht invalidiert wurde
+        if version == _cache_version:
+            _tenant_cache[tenant_id] = (version, now, values)
+    return values
+
+
+def _get_tenant_plan():
+    """Plan-Info des aktuellen Tenants (haengt am Request, nicht cachebar)"""
+    try:
+        from src.utils.plan_gate import get_tenant_plan_info
+        return get_tenant_plan_info()
+    except Exception:
+        return None
+
+
+def build_template_context():
+    """
+    Baut die globalen Template-Variablen fuer den aktuellen Request.
+    Mehrfache Aufrufe im selben Request liefern das gleiche Dict.
+    """
+    with _lock:
+        _stats['invocations'] += 1
+
+    # Am Request (nicht an g) ablegen: g lebt im App-Kontext und kann
+    # mehrere Requests ueberdauern (z.B. in Tests / CLI)
+    in_request = has_request_context()
+    cached = getattr(request, '_template_context', None) if in_request else None
+    if cached is not None:
+        with _lock:
+            _stats['request_hits'] += 1
+        return cached
+
+    # Wie die Abfragen: bei bypass_tenant_filter (System-Admin) der tenant-freie Eintrag
+    from src.models.tenant_filter import get_current_tenant_id
+    tenant_values = _get_tenant_values(get_current_tenant_id())
+
+    branding = tenant_values['branding']
+    # Demo-Modus: Branding ueberschreiben
+    if in_request and current_user.is_authenticated and getattr(current_user, 'is_demo', False):
+        branding = DemoBranding()
+
+    context = {
+        'app_name': 'StitchAdmin 2.0',
+        'app_version': '2.0.2',
+        'branding': branding,
+        'today': date.today(),
+        'tenant_plan': _get_tenant_plan(),
+        'position_choices': tenant_values['position_choices'],
+        'design_type_choices': tenant_values['design_type_choices'],
+    }
+    if in_request:
+        request._template_context = context
+    return context
+
+
+def _register_invalidation_events():
+    """Cache bei Aenderungen an Branding/Positionen/Veredelungsarten verwerfen"""
+    from sqlalchemy import event
+    from src.models.branding_settings import BrandingSettings
+    from src.models.order_workflow import VeredelungsArt, PositionTyp
+
+    for model in (BrandingSettings, VeredelungsArt, PositionTyp):
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            if not event.contains(model, event_name, invalidate_template_context):
+                event.listen(model, event_name, invalidate_template_context)
+
+
+def init_template_context(app):
+    """
+    Registriert den Context-Processor und die Permission-Helper genau einmal.
+    In create_app() aufrufen.
+    """
+    if app.extensions.get('template_context'):
+        return
+
+    @app.context_processor
+    def inject_globals():
+        """Globale Template-Variablen, inkl. Branding."""
+        return build_template_context()
+
+    try:
+        from src.utils.permissions import register_permission_helpers
+        register_permission_helpers(app)
+    except Exception as e:
+        logger.warning(f"Permission-Helper nicht registriert: {e}")
+
+    try:
+        _register_invalidation_events()
+    except Exception as e:
+        logger.warning(f"Template-Context Invalidierung nicht aktiv: {e}")
+
+    app.extensions['template_context'] = True
@@ -12,6 +12,7 @@ Zentrale Test-Konfiguration mit Fixtures für:
 import os
 import sys
 import pytest
+import tempfile
 from datetime import datetime
 
 # Füge das Projektverzeichnis zum Python Path hinzu
@@ -43,6 +44,8 @@ def app():
         'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
         'SQLALCHEMY_TRACK_MODIFICATIONS': False,
         'WTF_CSRF_ENABLED': False,  # Disable CSRF for testing
+        'ANALYSIS_CACHE_DIR': tempfile.mkdtemp(prefix='stitchadmin_analysis_'),
+        'PDF_STORE_DIR': tempfile.mkdtemp(prefix='stitchadmin_pdf_store_'),
     })
 
     # Application context für die gesamte Test-Session
@@ -0,0 +1,92 @@
+"""
+Unit Tests für den Analyse-Cache (Inhalts-Hash + Analyzer-Version)
+"""
+
+import pytest
+
+from src.services import analysis_cache_service as cache
+from src.services.analysis_cache_service import (
+    cached_analysis,
+    get_analysis_cache_stats,
+    reset_analysis_cache_stats,
+)
+
+
+@pytest.fixture
+def cache_dir(app, tmp_path, monkeypatch):
+    """Eigenes Cache-Verzeichnis, Zaehler zuruecksetzen"""
+    directory = tmp_path / 'analysis_cache'
+    monkeypatch.setitem(app.config, 'ANALYSIS_CACHE_DIR', str(directory))
+    reset_analysis_cache_stats()
+    yield directory
+    reset_analysis_cache_stats()
+
+
+def _counting_analyzer(calls, success=True):
+    def _analyze(path):
+        calls.append(path)
+        with open(path, 'rb') as f:
+            size = len(f.read())
+        return {'success': success, 'filepath': path, 'size': size}
+    return _analyze
+
+
+class TestAnalysisCache:
+    """Tests für cached_analysis"""
+
+    def test_same_content_analyzed_once(self, app, cache_dir, tmp_path):
+        """Gleicher Inhalt unter anderem Pfad: Treffer mit aktuellem Pfad"""
+        first = tmp_path / 'a.dst'
+        second = tmp_path / 'kopie.dst'
+        first.write_bytes(b'\x00\x01\x02' * 50)
+        second.write_bytes(b'\x00\x01\x02' * 50)
+        calls = []
+
+        result_a = cached_analysis(str(first), 'dst_basic', _counting_analyzer(calls))
+        result_b = cached_analysis(str(second), 'dst_basic', _counting_analyzer(calls))
+
+        assert calls == [str(first)]
+        assert result_b == {'success': True, 'filepath': str(second), 'size': 150}
+        assert result_a['filepath'] == str(first)
+        stats = get_analysis_cache_stats()
+        assert (stats['hits'], stats['misses'], stats['stores']) == (1, 1, 1)
+        assert stats['by_analyzer']['dst_basic'] == {'hits': 1, 'misses': 1}
+
+    def test_changed_content_and_version_miss(self, app, cache_dir, tmp_path, monkeypatch):
+        """Geaenderter Inhalt oder neue Analyzer-Version: neu analysieren"""
+        path = tmp_path / 'design.pes'
+        path.write_bytes(b'alt')
+        calls = []
+        analyzer = _counting_analyzer(calls)
+
+        cached_analysis(str(path), 'embroidery', analyzer)
+        path.write_bytes(b'neuer Inhalt')
+        assert cached_analysis(str(path), 'embroidery', analyzer)['size'] == 12
+
+        monkeypatch.setitem(cache.ANALYZER_VERSIONS, 'embroidery', 99)
+        cached_analysis(str(path), 'embroidery', analyzer)
+        assert len(calls) == 3
+
+    def test_failed_result_not_stored(self, app, cache_dir, tmp_path):
+        """Fehlgeschlagene Analysen werden nicht gespeichert"""
+        path = tmp_path / 'kaputt.dst'
+        path.write_bytes(b'\xff')
+        calls = []
+
+        for _ in range(2):
+            cached_analysis(str(path), 'dst_complete', _counting_analyzer(calls, success=False))
+
+        assert len(calls) == 2
+        assert get_analysis_cache_stats()['stores'] == 0
+
+    def test_disabled_without_cache_dir(self, app, tmp_path, monkeypatch):
+        """Ohne Cache-Verzeichnis wird direkt analysiert"""
+        monkeypatch.setitem(app.config, 'ANALYSIS_CACHE_DIR', None)
+        path = tmp_path / 'x.dst'
+        path.write_bytes(b'123')
+        calls = []
+
+        cached_analysis(str(path), 'dst_basic', _counting_analyzer(calls))
+        cached_analysis(str(path), 'dst_basic', _counting_analyzer(calls))
+
+        assert len(calls) == 2
@@ -0,0 +1,126 @@
+"""
+Unit Tests für den gestreamten DATEV-/GoBD-Export
+"""
+
+import csv
+import hashlib
+import io
+import os
+import struct
+import zipfile
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from src.models.models import db
+from src.models.buchhaltung import (
+    BuchhaltungBuchung as Buchung, BuchhaltungPeriode, BuchhaltungPeriodensumme, Konto,
+)
+from src.services.buchhaltung_export_service import (
+    DATEVExporter, GoBDExporter, ZipStream, csv_chunks, datev_query, gobd_query,
+    run_export_job, write_export,
+)
+
+JAHR = 2032
+
+
+@pytest.fixture
+def buchungen(app):
+    """Erlöskonto, Bankkonto und drei Buchungen (eine storniert) im Testjahr"""
+    erloese = Konto(kontonummer='8992', bezeichnung='Export-Erlöse', kontenklasse=8)
+    bank = Konto(kontonummer='1892', bezeichnung='Export-Bank', kontenklasse=1)
+    db.session.add_all([erloese, bank])
+    db.session.flush()
+    for tag, netto, storniert in [(date(JAHR, 3, 2), '100.00', False),
+                                  (date(JAHR, 1, 9), '250.50', False),
+                                  (date(JAHR, 2, 1), '75.00', True)]:
+        netto = Decimal(netto)
+        db.session.add(Buchung(buchungsdatum=tag, buchungstext=f'Export {netto}', belegnummer=f'RE-{netto}',
+                               konto_id=erloese.id, gegenkonto_id=bank.id, soll_konto_id=bank.id,
+                               haben_konto_id=erloese.id, betrag_netto=netto, betrag_brutto=netto * Decimal('1.19'),
+                               mwst_satz=Decimal('19'), mwst_betrag=netto * Decimal('0.19'),
+                               buchungs_art='einnahme', ist_storniert=storniert))
+    db.session.commit()
+    yield erloese, bank
+    Buchung.query.filter(Buchung.konto_id == erloese.id).delete()
+    BuchhaltungPeriodensumme.query.filter_by(jahr=JAHR).delete()
+    BuchhaltungPeriode.query.filter_by(jahr=JAHR).delete()
+    db.session.delete(erloese)
+    db.session.delete(bank)
+    db.session.commit()
+
+
+def _zip(chunks):
+    return zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+
+
+class TestStreamingExport:
+    """Tests für ZIP-/CSV-Strom, DATEV- und GoBD-Export"""
+
+    def test_csv_chunks_split_and_join(self):
+        rows = [[i, f'Text {i}', 'a;b'] for i in range(200)]
+        chunks = list(csv_chunks(rows, chunk_size=256))
+        assert len(chunks) > 1
+
+        gelesen = list(csv.reader(io.StringIO(b''.join(chunks).decode('utf-8')), delimiter=';'))
+        assert gelesen == [[str(i), f'Text {i}', 'a;b'] for i in range(200)]
+
+    def test_datev_stream_uses_account_numbers(self, buchungen):
+        chunks = DATEVExporter().iter_buchungen(datev_query(date(JAHR, 1, 1), date(JAHR, 12, 31)),
+                                                date(JAHR, 1, 1), date(JAHR, 12, 31))
+        zeilen = list(csv.reader(io.StringIO(b''.join(chunks).decode('utf-8')), delimiter=';'))
+
+        daten = zeilen[2:]
+        assert [z[9] for z in daten] == ['0901', '0203']  # nach Datum sortiert, Storno fehlt
+        assert all(z[6] == '8992' and z[7] == '1892' and z[1] == 'H' for z in daten)
+        assert daten[0][10] == 'RE-250.50'
+
+    def test_gobd_stream_matches_paket_and_checksums(self, buchungen):
+        archiv = _zip(GoBDExporter().stream_gobd_paket(JAHR, gobd_query(JAHR), [], []))
+        assert archiv.testzip() is None
+        assert archiv.namelist() == ['buchungen.csv', 'kunden.csv', 'lieferanten.csv', 'index.xml', 'checksums.txt']
+
+        paket = GoBDExporter().export_gobd_paket(JAHR, gobd_query(JAHR).all(), [], [])
+        buchungen_csv = archiv.read('buchungen.csv')
+        assert buchungen_csv.decode('utf-8') == paket['buchungen.csv']
+        assert buchungen_csv.count(b'\n') == 4  # Kopf + drei Buchungen inkl. Storno
+
+        pruefsummen = archiv.read('checksums.txt').decode('utf-8')
+        for name in ('buchungen.csv', 'kunden.csv', 'lieferanten.csv', 'index.xml'):
+            assert f'SHA256: {hashlib.sha256(archiv.read(name)).hexdigest()}' in pruefsummen
+
+    def test_write_export_replaces_atomically(self, tmp_path):
+        stream = ZipStream()
+
+        def chunks():
+            yield from stream.add('a.txt', [b'x' * 100000, b'y'])
+            yield from stream.close()
+
+        result = write_export(chunks(), 'export.zip', directory=str(tmp_path))
+        pfad = tmp_path / 'export.zip'
+        assert result['groesse'] == pfad.stat().st_size
+        assert result['sha256'] == hashlib.sha256(pfad.read_bytes()).hexdigest()
+        assert os.listdir(tmp_path) == ['export.zip']  # keine .tmp-Reste
+        assert zipfile.ZipFile(pfad).read('a.txt') == b'x' * 100000 + b'y'
+        # ZIP64-Extra im lokalen Header (Groesse beim Streamen unbekannt)
+        kopf = pfad.read_bytes()[:64]
+        name_len = struct.unpack('<H', kopf[26:28])[0]
+        assert kopf[30 + name_len:32 + name_len] == b'\x01\x00'
+
+        def kaputt():
+            yield b'abc'
+            raise RuntimeError('Abbruch')
+
+        with pytest.raises(RuntimeError):
+            write_export(kaputt(), 'kaputt.zip', directory=str(tmp_path))
+        assert os.listdir(tmp_path) == ['export.zip']
+
+    def test_export_job_writes_datev_zip(self, buchungen, app, tmp_path, monkeypatch):
+        monkeypatch.setitem(app.config, 'EXPORT_DIR', str(tmp_path))
+        result = run_export_job('datev_belege', f'{JAHR}-01-01', f'{JAHR}-12-31')
+
+        assert result['datei'].endswith(f'DATEV_Belege_{JAHR}0101_{JAHR}1231.zip')
+        archiv = zipfile.ZipFile(tmp_path / result['datei'])
+        assert archiv.namelist() == ['EXTF_Buchungsstapel.csv', 'INFO.txt']
+        assert 'Buchungen: 2' in archiv.read('INFO.txt').decode('utf-8')
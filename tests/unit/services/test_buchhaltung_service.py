@@ -0,0 +1,144 @@
+"""
+Unit Tests für die Monatssummen der Buchhaltung (BWA, USt-VA, Cashflow)
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from src.models.models import db
+from src.models.buchhaltung import (
+    BuchhaltungBuchung as Buchung, BuchhaltungPeriode, BuchhaltungPeriodensumme, Konto,
+)
+from src.services import buchhaltung_service
+from src.services.buchhaltung_service import (
+    BWAService, LiquiditaetsService, UStService, lade_periodensummen,
+)
+
+JAHR = 2031
+
+
+def _buchung(konto, tag, netto, art='einnahme', satz='19', **kwargs):
+    netto = Decimal(netto)
+    mwst = (netto * Decimal(satz) / 100).quantize(Decimal('0.01'))
+    return Buchung(buchungsdatum=tag, buchungstext='Test', konto_id=konto.id, betrag_netto=netto,
+                   betrag_brutto=netto + mwst, mwst_satz=Decimal(satz), mwst_betrag=mwst,
+                   buchungs_art=art, **kwargs)
+
+
+def _periode(monat):
+    return db.session.get(BuchhaltungPeriode, (JAHR, monat))
+
+
+@pytest.fixture
+def konten(app):
+    """Erloes-, Aufwands- und Wareneinkaufskonto mit Buchungen im Testjahr"""
+    erloese = Konto(kontonummer='8991', bezeichnung='Test-Erlöse', kontenklasse=8)
+    aufwand = Konto(kontonummer='4991', bezeichnung='Test-Miete', kontenklasse=4)
+    ware = Konto(kontonummer='3991', bezeichnung='Test-Ware', kontenklasse=3)
+    db.session.add_all([erloese, aufwand, ware])
+    db.session.flush()
+    db.session.add_all([
+        _buchung(erloese, date(JAHR, 1, 15), '1000.00'),
+        _buchung(erloese, date(JAHR, 1, 20), '200.00', satz='7'),
+        _buchung(erloese, date(JAHR, 2, 3), '500.00'),
+        _buchung(aufwand, date(JAHR, 1, 31), '300.00', art='ausgabe'),
+        _buchung(ware, date(JAHR, 3, 10), '400.00', art='ausgabe'),
+        _buchung(erloese, date(JAHR, 1, 5), '999.00', ist_storniert=True),
+    ])
+    db.session.commit()
+    yield erloese, aufwand, ware
+    Buchung.query.filter(Buchung.konto_id.in_([erloese.id, aufwand.id, ware.id])).delete()
+    BuchhaltungPeriodensumme.query.filter(BuchhaltungPeriodensumme.jahr.in_([JAHR - 1, JAHR])).delete()
+    BuchhaltungPeriode.query.filter(BuchhaltungPeriode.jahr.in_([JAHR - 1, JAHR])).delete()
+    for konto in (erloese, aufwand, ware):
+        db.session.delete(konto)
+    db.session.commit()
+
+
+class TestPeriodensummen:
+    """Tests für BWA/USt-VA/Cashflow aus buchhaltung_periodensummen"""
+
+    def test_reports_match_bookings(self, konten):
+        bwa = BWAService().berechne_bwa(JAHR, monat=1)
+        assert bwa['zeitraum'] == f'01/{JAHR}'
+        assert bwa['erloese'] == {'Test-Erlöse': Decimal('1200.00')}
+        assert bwa['aufwendungen'] == {'Test-Miete': Decimal('300.00')}
+        assert bwa['betriebsergebnis'] == Decimal('900.00')
+
+        quartal = BWAService().berechne_bwa(JAHR, quartal=1)
+        assert quartal['summe_erloese'] == Decimal('1700.00') and quartal['rohertrag'] == Decimal('1300.00')
+
+        ust = UStService().berechne_voranmeldung(JAHR, monat=1)
+        assert ust['umsatz_19_netto'] == Decimal('1000.00') and ust['ust_19'] == Decimal('190.00')
+        assert ust['umsatz_7_netto'] == Decimal('200.00') and ust['ust_7'] == Decimal('14.00')
+        assert ust['vorsteuer_19'] == Decimal('57.00')
+        assert ust['ust_zahllast'] == Decimal('147.00')
+
+        cashflow = LiquiditaetsService().berechne_cashflow(JAHR)
+        assert cashflow['einnahmen'] == Decimal('1999.00') and cashflow['ausgaben'] == Decimal('833.00')
+
+    def test_bookings_update_summaries_incrementally(self, konten):
+        erloese = konten[0]
+        lade_periodensummen(JAHR)
+        buchung = _buchung(erloese, date(JAHR, 2, 10), '100.00')
+        db.session.add(buchung)
+        db.session.commit()
+
+        assert _periode(2).stale is False
+        assert BWAService().berechne_bwa(JAHR, monat=2)['summe_erloese'] == Decimal('600.00')
+
+        buchung.ist_storniert = True
+        db.session.commit()
+        assert _periode(2).stale is False
+        assert BWAService().berechne_bwa(JAHR, monat=2)['summe_erloese'] == Decimal('500.00')
+
+        db.session.delete(buchung)
+        db.session.commit()
+        assert BWAService().berechne_bwa(JAHR, monat=2)['summe_erloese'] == Decimal('500.00')
+
+    def test_new_combination_rebuilds_month(self, konten):
+        """Neue Konto/MwSt-Kombination: Monat stale, beim Lesen neu gebildet"""
+        erloese, aufwand, _ = konten
+        lade_periodensummen(JAHR)
+        db.session.add(_buchung(aufwand, date(JAHR, 2, 28), '50.00', art='ausgabe', satz='7'))
+        db.session.commit()
+        assert _periode(2).stale is True and _periode(1).stale is False
+
+        ust = UStService().berechne_voranmeldung(JAHR, monat=2)
+        assert ust['vorsteuer_7'] == Decimal('3.50')
+        assert _periode(2).stale is False
+
+    def test_bulk_update_marks_all_months_stale(self, konten):
+        erloese = konten[0]
+        lade_periodensummen(JAHR)
+        Buchung.query.filter(Buchung.konto_id == erloese.id,
+                             Buchung.buchungsdatum == date(JAHR, 2, 3)).update({'betrag_netto': Decimal('700.00')})
+        db.session.commit()
+        assert _periode(1).stale is True
+
+        assert BWAService().berechne_bwa(JAHR, monat=2)['summe_erloese'] == Decimal('700.00')
+
+    def test_comparison_loads_each_year_once(self, konten, monkeypatch):
+        calls = []
+        original = buchhaltung_service.lade_periodensummen
+        monkeypatch.setattr(buchhaltung_service, 'lade_periodensummen',
+                            lambda jahr: calls.append(jahr) or original(jahr))
+
+        vergleich = BWAService().berechne_bwa_vergleich(JAHR)
+        assert sorted(calls) == [JAHR - 1, JAHR]
+        assert [m['summe_erloese'] for m in vergleich['monate'][:3]] == \
+            [Decimal('1200.00'), Decimal('500.00'), Decimal('0')]
+        assert vergleich['jahressumme']['betriebsergebnis'] == Decimal('1000.00')
+
+    def test_rebuild_leaves_request_session_alone(self, konten):
+        """Neubildung beim Lesen committet oder verwirft keine offenen Aenderungen"""
+        erloese = konten[0]
+        erloese.bezeichnung = 'Ungespeichert'
+        assert BWAService().berechne_bwa(JAHR, monat=1)['summe_erloese'] == Decimal('1200.00')
+        assert _periode(1).stale is False
+        assert erloese.bezeichnung == 'Ungespeichert'
+
+        db.session.rollback()
+        assert db.session.get(Konto, erloese.id).bezeichnung == 'Test-Erlöse'
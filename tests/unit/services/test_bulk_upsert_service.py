@@ -0,0 +1,126 @@
+"""
+Unit Tests für den Bulk-Upsert-Import (L-Shop und Bausteine)
+"""
+
+import pandas as pd
+import pytest
+
+from src.models import db, Article, ArticleVariant, Brand, ProductCategory
+from src.services.bulk_upsert_service import (
+    ImportProgress, bulk_upsert, ensure_names, int_column, number_column, text_column,
+)
+from src.services.lshop_import_service import LShopImportService
+
+PREFIX = 'BULK-'
+
+
+@pytest.fixture
+def cleanup(app):
+    """Entfernt Testartikel, -varianten, -marken und -kategorien"""
+    yield
+    db.session.rollback()
+    ids = [a.id for a in Article.query.filter(Article.supplier_article_number.like(f'{PREFIX}%'))]
+    ArticleVariant.query.filter(ArticleVariant.article_id.in_(ids)).delete(synchronize_session=False)
+    Article.query.filter(Article.id.in_(ids)).delete(synchronize_session=False)
+    Brand.query.filter(Brand.name.like(f'{PREFIX}%')).delete(synchronize_session=False)
+    ProductCategory.query.filter(ProductCategory.name.like(f'{PREFIX}%')).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def _service(rows):
+    service = LShopImportService()
+    service.df = pd.DataFrame(rows, columns=['SKU', 'Name', 'Marke', 'Kategorie', 'Farbe', 'Groesse', 'Preis'])
+    return service
+
+
+MAPPING = {'supplier_article_number': 'SKU', 'name': 'Name', 'manufacturer': 'Marke',
+           'category': 'Kategorie', 'color': 'Farbe', 'size': 'Groesse', 'single_price': 'Preis'}
+
+
+class TestBulkUpsert:
+    """Tests für Normalisierung, Upsert und den L-Shop-Bulk-Import"""
+
+    def test_column_normalization(self):
+        werte = pd.Series([' 8,50 ', '12.3', '', None, 'abc'])
+        assert text_column(werte).tolist() == ['8,50', '12.3', None, None, 'abc']
+        assert number_column(werte).tolist()[:2] == [8.5, 12.3]
+        assert number_column(werte).isna().tolist()[2:] == [True, True, True]
+        assert int_column(pd.Series(['12,9', '7', None])).tolist() == [12, 7, None]
+
+    def test_upsert_inserts_then_updates_and_keeps_on_null(self, app, cleanup):
+        marken = ensure_names(Brand, [f'{PREFIX}Marke A', f'{PREFIX}Marke B', f'{PREFIX}Marke A', None],
+                              {'active': True})
+        assert set(marken) == {f'{PREFIX}Marke A', f'{PREFIX}Marke B'}
+        assert ensure_names(Brand, [f'{PREFIX}Marke A'])[f'{PREFIX}Marke A'] == marken[f'{PREFIX}Marke A']
+
+        rows = [{'id': f'{PREFIX}{i}', 'article_number': f'{PREFIX}{i}', 'supplier_article_number': f'{PREFIX}{i}',
+                 'name': f'Artikel {i}', 'material': 'Baumwolle'} for i in range(3)]
+        assert bulk_upsert(Article, rows, ['id'], chunk_size=2) == 3
+        db.session.commit()
+
+        bulk_upsert(Article, [{'id': f'{PREFIX}1', 'article_number': f'{PREFIX}1', 'name': 'Neu', 'material': None}],
+                    ['id'], update_columns=['name', 'material'], keep_existing_on_null=True)
+        db.session.commit()
+        artikel = db.session.get(Article, f'{PREFIX}1')
+        db.session.refresh(artikel)
+        assert (artikel.name, artikel.material) == ('Neu', 'Baumwolle')
+
+    def test_progress_rolls_back_failed_block(self, app, cleanup):
+        meldungen = []
+        rows = [{'id': f'{PREFIX}P{i}', 'article_number': f'{PREFIX}P{i}', 'supplier_article_number': f'{PREFIX}P{i}',
+                 'name': f'Artikel {i}' if i != 3 else None} for i in range(5)]
+        progress = ImportProgress(len(rows), lambda done, total: meldungen.append((done, total)), chunk_size=2)
+        geschrieben = progress.write(rows, lambda block: bulk_upsert(Article, block, ['id']), 'Artikel')
+
+        assert geschrieben == 3  # Block 3-4 scheitert an name NOT NULL
+        assert meldungen == [(2, 5), (4, 5), (5, 5)]
+        assert progress.error_count == 2 and progress.failed_keys('id') == [f'{PREFIX}P2', f'{PREFIX}P3']
+        assert Article.query.filter(Article.id.like(f'{PREFIX}P%')).count() == 3
+
+    def test_lshop_single_import_creates_and_updates(self, app, cleanup):
+        service = _service([
+            [f'{PREFIX}100', 'Shirt', f'{PREFIX}Marke', f'{PREFIX}Kat', 'Rot', 'M', '8,50'],
+            [f'{PREFIX}101', 'Polo', f'{PREFIX}Marke', None, None, None, None],
+            [None, None, None, None, None, None, None],
+            [f'{PREFIX}100', 'Shirt neu', None, None, None, None, None],
+        ])
+        result = service.import_articles(MAPPING)
+        assert result['success'] is True
+        assert (result['imported_count'], result['updated_count'], result['skipped_count']) == (2, 1, 1)
+
+        shirt = Article.query.filter_by(supplier_article_number=f'{PREFIX}100').one()
+        assert shirt.article_number == f'SA-{PREFIX}100'
+        assert shirt.name == 'Shirt neu' and shirt.color == 'Rot'
+        assert shirt.brand_id == Brand.query.filter_by(name=f'{PREFIX}Marke').one().id
+        assert shirt.purchase_price_single == 8.5 and shirt.price > 8.5
+        assert Article.query.filter_by(supplier_article_number=f'{PREFIX}101').one().price == 0
+
+        service.df = pd.DataFrame([[f'{PREFIX}101', 'Polo XL', None, None, 'Blau', None, None]],
+                                  columns=service.df.columns)
+        result = service.import_articles(MAPPING)
+        assert (result['imported_count'], result['updated_count']) == (0, 1)
+        polo = Article.query.filter_by(supplier_article_number=f'{PREFIX}101').one()
+        db.session.refresh(polo)
+        assert (polo.name, polo.color, polo.brand) == ('Polo XL', 'Blau', f'{PREFIX}Marke')  # leere Felder bleiben
+
+    def test_lshop_variant_import_groups_by_sku(self, app, cleanup):
+        rows = [[f'{PREFIX}200', 'Hoodie', None, None, 'Schwarz', size, '20'] for size in ('S', 'M', 'L')]
+        service = _service(rows + [[f'{PREFIX}201', 'Cap', None, None, None, None, '5']])
+        result = service.import_articles(MAPPING, {'create_variants': True})
+        assert result['success'] is True
+        assert (result['imported_count'], result['variant_count']) == (2, 3)
+
+        hoodie = Article.query.filter_by(supplier_article_number=f'{PREFIX}200').one()
+        assert hoodie.has_variants is True and hoodie.color is None
+        varianten = ArticleVariant.query.filter_by(article_id=hoodie.id).order_by(ArticleVariant.size).all()
+        assert [(v.size, v.variant_type, v.single_price) for v in varianten] == [
+            ('L', 'color_size', 20.0), ('M', 'color_size', 20.0), ('S', 'color_size', 20.0)]
+
+        service.df = pd.DataFrame([[f'{PREFIX}200', 'Hoodie', None, None, 'Schwarz', 'M', '22'],
+                                   [f'{PREFIX}200', 'Hoodie', None, None, 'Schwarz', 'XL', None]],
+                                  columns=service.df.columns)
+        result = service.import_articles(MAPPING, {'create_variants': True})
+        assert (result['imported_count'], result['updated_count'], result['variant_count']) == (0, 1, 1)
+        db.session.expire_all()
+        preise = {v.size: v.single_price for v in ArticleVariant.query.filter_by(article_id=hoodie.id)}
+        assert preise == {'S': 20.0, 'M': 22.0, 'L': 20.0, 'XL': None}
@@ -0,0 +1,239 @@
+"""
+Unit Tests für die vorberechneten Kunden-Kennzahlen (customer_kpis)
+"""
+
+from datetime import date, datetime, time, timedelta
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy import event
+
+from src.models.models import db, Customer, Order
+from src.models.customer_kpi import CustomerKpi
+from src.models.crm_contact import CustomerContact, ContactType
+from src.models.production_block import ProductionBlock
+from src.models.rechnungsmodul import Rechnung, RechnungsZahlung, RechnungsStatus, ZahlungsArt
+from src.services import customer_kpi_service
+from src.services.customer_kpi_service import compute_kpis, ensure_fresh, rebuild_kpis, vip_components
+from src.utils.customer_analytics import CustomerAnalytics
+
+HEUTE = date.today()
+JETZT = datetime.now()
+
+
+@pytest.fixture
+def kpi_kunden(app):
+    """Drei Kunden, KP01 mit zwei Auftraegen, KP02 mit einem"""
+    db.session.add_all([
+        Customer(id='KP01', first_name='Karl', last_name='Viel', created_at=JETZT - timedelta(days=3 * 365)),
+        Customer(id='KP02', first_name='Paula', last_name='Mittel', created_at=JETZT - timedelta(days=400)),
+        Customer(id='KP03', customer_type='business', company_name='Neu GmbH', created_at=JETZT),
+    ])
+    db.session.add_all([
+        Order(id='KP-A1', customer_id='KP01', total_price=500.0, status='completed', created_at=JETZT - timedelta(days=30)),
+        Order(id='KP-A2', customer_id='KP01', total_price=300.0, status='new', created_at=JETZT - timedelta(days=500)),
+        Order(id='KP-A3', customer_id='KP02', total_price=200.0, status='new', created_at=JETZT - timedelta(days=10)),
+    ])
+    db.session.commit()
+    yield
+    db.session.rollback()
+    RechnungsZahlung.query.filter(RechnungsZahlung.referenz.like('KP%')).delete(synchronize_session=False)
+    Rechnung.query.filter(Rechnung.rechnungsnummer.like('RE-KP%')).delete(synchronize_session=False)
+    ProductionBlock.query.filter(ProductionBlock.customer_id.like('KP%')).delete(synchronize_session=False)
+    CustomerContact.query.filter(CustomerContact.customer_id.like('KP%')).delete(synchronize_session=False)
+    Order.query.filter(Order.id.like('KP-%')).delete(synchronize_session=False)
+    CustomerKpi.query.filter(CustomerKpi.customer_id.like('KP%')).delete(synchronize_session=False)
+    Customer.query.filter(Customer.id.like('KP%')).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def _kpi(customer_id):
+    db.session.expire_all()
+    return db.session.get(CustomerKpi, customer_id)
+
+
+def _kpi_stale(customer_id):
+    table = CustomerKpi.__table__
+    with db.engine.connect() as connection:
+        return connection.execute(sa.select(table.c.stale).where(table.c.customer_id == customer_id)).scalar()
+
+
+def _rechnung(nummer, kunde_id, status, brutto, faellig):
+    return Rechnung(rechnungsnummer=nummer, kunde_id=kunde_id, kunde_name=kunde_id, status=status,
+                    brutto_gesamt=brutto, faelligkeitsdatum=faellig)
+
+
+class TestCustomerKpis:
+    """Tests für die Pflege und Nutzung von customer_kpis"""
+
+    def test_order_changes_update_kpis_in_same_flush(self, kpi_kunden):
+        """Neue, stornierte und umgehaengte Auftraege aendern die Zeilen sofort"""
+        kp01 = _kpi('KP01')
+        assert (kp01.revenue_total, kp01.order_count, kp01.revenue_12m) == (800.0, 2, 500.0)
+        assert (kp01.max_order_value, kp01.orders_completed, kp01.avg_order_value) == (500.0, 1, 400.0)
+        assert _kpi('KP03').order_count == 0 and not _kpi('KP03').stale
+
+        order = db.session.get(Order, 'KP-A2')
+        order.status = 'cancelled'
+        db.session.flush()
+        kp01 = _kpi('KP01')
+        assert (kp01.revenue_total, kp01.order_count, kp01.orders_cancelled) == (500.0, 1, 1)
+
+        order = db.session.get(Order, 'KP-A3')
+        order.customer_id = 'KP03'
+        db.session.commit()
+        assert (_kpi('KP02').revenue_total, _kpi('KP02').order_count) == (0.0, 0)
+        assert (_kpi('KP03').revenue_6m, _kpi('KP03').order_count) == (200.0, 1)
+
+    def test_invoices_and_payments(self, kpi_kunden):
+        """Zahlungsdauer = letzte Zahlung - Faelligkeit, offener Betrag aus ueberfaelligen Rechnungen"""
+        faellig = HEUTE - timedelta(days=40)
+        r1 = _rechnung('RE-KP1', 'KP02', RechnungsStatus.BEZAHLT, 119.0, faellig)
+        r2 = _rechnung('RE-KP2', 'KP02', RechnungsStatus.BEZAHLT, 238.0, faellig)
+        r3 = _rechnung('RE-KP3', 'KP02', RechnungsStatus.UEBERFAELLIG, 59.5, faellig)
+        db.session.add_all([r1, r2, r3])
+        db.session.flush()
+        db.session.add_all([
+            RechnungsZahlung(rechnung_id=r1.id, betrag=100, zahlungsart=ZahlungsArt.BAR,
+                             zahlungsdatum=faellig - timedelta(days=2), referenz='KP1'),
+            RechnungsZahlung(rechnung_id=r2.id, betrag=138, zahlungsart=ZahlungsArt.BAR,
+                             zahlungsdatum=faellig + timedelta(days=10), referenz='KP2'),
+        ])
+        db.session.commit()
+
+        kp02 = _kpi('KP02')
+        assert (kp02.invoices_total, kp02.invoices_paid, kp02.invoices_overdue) == (3, 2, 1)
+        assert kp02.overdue_amount == 59.5
+        assert kp02.avg_days_to_pay == 4.0  # (-2 + 10) / 2
+
+        # Nachzahlung auf r1 verschiebt deren letzte Zahlung
+        db.session.add(RechnungsZahlung(rechnung_id=r1.id, betrag=19, zahlungsart=ZahlungsArt.BAR,
+                                        zahlungsdatum=faellig + timedelta(days=6), referenz='KP3'))
+        db.session.commit()
+        assert _kpi('KP02').avg_days_to_pay == 8.0
+
+        rankings = CustomerAnalytics.get_all_rankings(limit=500)
+        worst = [r for r in rankings['worst_payers'] if r['customer_id'].startswith('KP')]
+        best = [r for r in rankings['best_payers'] if r['customer_id'].startswith('KP')]
+        assert worst[0]['customer_id'] == 'KP02' and worst[0]['overdue_amount'] == 59.5
+        assert best[0]['avg_payment_days'] == 8.0
+
+    def test_last_contact_from_calendar_and_crm(self, kpi_kunden):
+        vor_zehn = HEUTE - timedelta(days=10)
+        db.session.add_all([
+            ProductionBlock(block_type='call_out', customer_id='KP01', start_date=vor_zehn, start_time=time(9, 0),
+                            end_date=vor_zehn, end_time=time(9, 15)),
+            ProductionBlock(block_type='maintenance', customer_id='KP01', start_date=HEUTE, start_time=time(9, 0),
+                            end_date=HEUTE, end_time=time(10, 0)),
+        ])
+        db.session.commit()
+        assert _kpi('KP01').last_contact == vor_zehn
+
+        db.session.add(CustomerContact(customer_id='KP01', contact_type=ContactType.TELEFON_EINGANG,
+                                       contact_date=JETZT - timedelta(days=2)))
+        db.session.commit()
+        assert _kpi('KP01').last_contact == HEUTE - timedelta(days=2)
+
+        rankings = CustomerAnalytics.get_all_rankings(limit=500)
+        no_contact = [r['customer_id'] for r in rankings['no_contact'] if r['customer_id'].startswith('KP')]
+        assert 'KP01' not in no_contact and {'KP02', 'KP03'} <= set(no_contact)
+
+    def test_bulk_statements_mark_stale_and_rebuild_matches(self, kpi_kunden):
+        """Bulk-Updates markieren veraltet; ensure_fresh und rebuild liefern dasselbe"""
+        Order.query.filter_by(id='KP-A1').update({'total_price': 900.0}, synchronize_session=False)
+        db.session.commit()
+        assert _kpi('KP01').stale and _kpi('KP01').revenue_total == 800.0
+
+        ensure_fresh()
+        kp01 = _kpi('KP01')
+        assert not kp01.stale and kp01.revenue_total == 1200.0
+
+        incremental = {c: _kpi(c).vip_score for c in ('KP01', 'KP02', 'KP03')}
+        rebuild_kpis()
+        assert {c: _kpi(c).vip_score for c in incremental} == incremental
+        rows, _ = compute_kpis(db.session.connection(), ['KP01'])
+        assert rows['KP01']['revenue_12m'] == 900.0
+
+    def test_rankings_and_detail_stats(self, kpi_kunden):
+        rankings = CustomerAnalytics.get_all_rankings(limit=500)
+        top = [r['customer_id'] for r in rankings['top_revenue'] if r['customer_id'].startswith('KP')]
+        assert top == ['KP01', 'KP02', 'KP03']
+        vip = {r['customer_id']: r for r in rankings['vip_customers'] if r['customer_id'].startswith('KP')}
+        assert all(0 <= r['overall_score'] <= 100 for r in vip.values())
+
+        stats = CustomerAnalytics.get_customer_detail_stats('KP01')
+        assert stats['revenue']['total'] == 800.0 and stats['orders']['last_year'] == 1
+        assert stats['payment']['avg_payment_days'] is None
+
+        scores = vip_components(800.0, 2, JETZT - timedelta(days=730), 800.0, 2, HEUTE)
+        assert (scores['revenue_score'], scores['frequency_score'], scores['loyalty_score']) == (100.0, 100.0, 40.0)
+        assert scores['overall_score'] == 82.0  # (25 + 10 + 6) / 0.5
+
+    def test_flush_upserts_and_failed_refresh_only_marks_stale(self, kpi_kunden, monkeypatch):
+        """Upsert statt DELETE+INSERT; Fehler der Neuberechnung brechen die Transaktion nicht ab"""
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            db.session.get(Order, 'KP-A3').total_price = 250.0
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        assert not any(s.startswith('DELETE FROM customer_kpis') for s in statements)
+        assert any('ON CONFLICT (customer_id) DO UPDATE' in s for s in statements)
+        assert _kpi('KP02').revenue_total == 250.0
+
+        def kaputt(connection, rows, ids):
+            connection.execute(sa.text('SELECT * FROM gibt_es_nicht'))
+
+        monkeypatch.setattr(customer_kpi_service, '_add_contact_kpis', kaputt)
+        db.session.get(Order, 'KP-A3').total_price = 300.0
+        db.session.commit()
+        db.session.expire_all()
+        assert db.session.get(Order, 'KP-A3').total_price == 300.0
+        kp02 = _kpi('KP02')
+        assert kp02.stale and kp02.revenue_total == 250.0
+
+    def test_ensure_fresh_leaves_request_session_alone(self, kpi_kunden, monkeypatch):
+        """Nachberechnen beim Lesen committet oder verwirft keine offenen Aenderungen"""
+        customer_kpi_service.mark_stale(['KP02'])
+        db.session.commit()
+        kunde = db.session.get(Customer, 'KP03')
+        kunde.company_name = 'Offen GmbH'
+
+        ensure_fresh()
+        assert kunde in db.session.dirty and not _kpi_stale('KP02')
+
+        def kaputt(*args, **kwargs):
+            raise sa.exc.OperationalError('SELECT', {}, Exception('gesperrt'))
+
+        with db.engine.begin() as connection:
+            customer_kpi_service.mark_stale(['KP02'], connection)
+        monkeypatch.setattr(customer_kpi_service, 'compute_kpis', kaputt)
+        ensure_fresh()
+        assert kunde.company_name == 'Offen GmbH' and kunde in db.session.dirty
+
+        db.session.rollback()
+        assert db.session.get(Customer, 'KP03').company_name == 'Neu GmbH'
+
+    def test_bulk_update_marks_only_affected_customers(self, kpi_kunden, monkeypatch):
+        """Kunden aus WHERE und neuem Wert; unbestimmbar -> alle, aber kein Neuaufbau im Request"""
+        Order.query.filter(Order.total_price > 400).update({'status': 'completed'}, synchronize_session=False)
+        Order.query.filter_by(id='KP-A3').update({'customer_id': 'KP03'}, synchronize_session=False)
+        db.session.commit()
+        assert [_kpi_stale(c) for c in ('KP01', 'KP02', 'KP03')] == [True, True, True]
+        ensure_fresh()
+        assert [_kpi_stale(c) for c in ('KP01', 'KP02', 'KP03')] == [False, False, False]
+
+        Order.query.filter_by(id='KP-A2').update({'total_price': 100.0}, synchronize_session=False)
+        db.session.commit()
+        assert [_kpi_stale(c) for c in ('KP01', 'KP02', 'KP03')] == [True, False, False]
+
+        monkeypatch.setattr(customer_kpi_service, 'ID_CHUNK', 1)
+        Order.query.filter_by(id='KP-A2').update({'customer_id': sa.func.upper('kp02')}, synchronize_session=False)
+        db.session.commit()
+        ensure_fresh()
+        assert [_kpi_stale(c) for c in ('KP01', 'KP02', 'KP03')] == [True, True, True]
@@ -0,0 +1,73 @@
+"""
+Unit Tests für die materialisierten Dashboard-Kennzahlen
+"""
+
+from src.models.models import db, Customer, Order
+from src.models.dashboard_stats import DashboardStat
+from src.services.dashboard_stats_service import (
+    STAT_KEYS,
+    get_dashboard_stats,
+    compute_stats,
+    recompute_all,
+)
+
+
+def _cleanup(*objects):
+    for obj in objects:
+        db.session.delete(obj)
+    db.session.commit()
+
+
+class TestDashboardStats:
+    """Tests für get_dashboard_stats"""
+
+    def test_snapshot_matches_direct_count(self, app):
+        """Snapshot liefert die gleichen Werte wie die direkte Zaehlung"""
+        stats = get_dashboard_stats()
+        assert stats == compute_stats()
+        assert set(STAT_KEYS) <= set(stats)
+        assert 'open_tasks' in stats and 'low_stock' in stats
+
+    def test_counters_follow_inserts_and_updates(self, app):
+        """Insert/Update/Delete passen die Zaehler ohne Neuberechnung an"""
+        recompute_all()
+        before = get_dashboard_stats()
+
+        customer = Customer(id='DASH001', customer_type='private',
+                            first_name='Dash', last_name='Board')
+        order = Order(id='DASH-ORD-1', customer_id='DASH001', order_type='embroidery',
+                      status='pending', source='shop')
+        db.session.add_all([customer, order])
+        db.session.commit()
+
+        assert db.session.get(DashboardStat, 'open_orders').stale is False
+        stats = get_dashboard_stats()
+        assert stats['total_customers'] == before['total_customers'] + 1
+        assert stats['open_orders'] == before['open_orders'] + 1
+        assert stats['shop_orders'] == before['shop_orders'] + 1
+
+        order.status = 'in_progress'
+        db.session.commit()
+        stats = get_dashboard_stats()
+        assert stats['open_orders'] == before['open_orders'] + 1
+        assert stats['in_production'] == before['in_production'] + 1
+
+        order.status = 'cancelled'
+        db.session.commit()
+        stats = get_dashboard_stats()
+        assert stats['open_orders'] == before['open_orders']
+        assert stats['open_workflow_orders'] == before['open_workflow_orders']
+
+        _cleanup(order, customer)
+        assert get_dashboard_stats() == before
+
+    def test_bulk_update_marks_stale(self, app):
+        """Bulk-UPDATE markiert die Kennzahlen des Models als veraltet"""
+        recompute_all()
+        Order.query.filter(Order.id == 'NICHT-VORHANDEN').update({'status': 'ready'})
+        db.session.commit()
+
+        assert db.session.get(DashboardStat, 'ready_to_ship').stale is True
+        assert get_dashboard_stats() == compute_stats()
+        db.session.expire_all()
+        assert db.session.get(DashboardStat, 'ready_to_ship').stale is False
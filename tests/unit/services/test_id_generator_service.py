@@ -0,0 +1,60 @@
+"""
+Unit Tests für den ID-Generator (Sequenz-Tabelle)
+"""
+
+import pytest
+
+from src.models.models import db, Supplier
+from src.models.id_sequence import IdSequence
+from src.services.id_generator_service import IdGenerator
+
+
+@pytest.fixture
+def clean_suppliers(app):
+    """Lieferanten-Zaehler zuruecksetzen, Test-Lieferanten entfernen"""
+    def _cleanup():
+        Supplier.query.filter(Supplier.id.like('LF%')).delete(synchronize_session=False)
+        IdSequence.query.filter(IdSequence.name.like('suppliers.id:%')).delete(synchronize_session=False)
+        db.session.commit()
+
+    _cleanup()
+    yield
+    _cleanup()
+
+
+class TestIdGenerator:
+    """Tests für IdGenerator"""
+
+    def test_seeded_from_current_maximum(self, app, clean_suppliers):
+        """Neuer Zaehler startet beim hoechsten vorhandenen Wert"""
+        db.session.add_all([Supplier(id='LF007', name='A'), Supplier(id='LF041', name='B'),
+                            Supplier(id='LFX99', name='C')])
+        db.session.commit()
+
+        assert IdGenerator.supplier() == 'LF042'
+        assert db.session.get(IdSequence, 'suppliers.id:LF').last_value == 42
+
+    def test_consecutive_without_commit(self, app, clean_suppliers):
+        """Aufeinanderfolgende Aufrufe liefern verschiedene IDs"""
+        first = IdGenerator.supplier()
+        second = IdGenerator.supplier()
+        assert (first, second) == ('LF001', 'LF002')
+
+    def test_rollback_releases_numbers(self, app, clean_suppliers):
+        """Zaehler laeuft in der Transaktion des Aufrufers"""
+        IdGenerator.supplier()
+        db.session.commit()
+        IdGenerator.supplier()
+        db.session.rollback()
+        assert IdGenerator.supplier() == 'LF002'
+
+    def test_reserve_block_skips_taken_ids(self, app, clean_suppliers):
+        """Block-Reservierung ueberspringt manuell vergebene IDs"""
+        IdGenerator.supplier()
+        db.session.add(Supplier(id='LF003', name='Manuell'))
+        db.session.commit()
+
+        ids = IdGenerator.reserve(Supplier, 'LF', count=4)
+
+        assert ids == ['LF002', 'LF004', 'LF005', 'LF006']
+        assert db.session.get(IdSequence, 'suppliers.id:LF').last_value == 6
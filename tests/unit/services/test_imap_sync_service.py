@@ -0,0 +1,160 @@
+"""
+Unit Tests für den inkrementellen IMAP-Sync
+"""
+
+import re
+
+import pytest
+
+from src.models.models import db, Customer
+from src.models.document import EmailAccount, ArchivedEmail
+from src.services.imap_sync_service import IMAPSyncService
+
+
+def _message(uid, sender='someone@example.org', message_id=None):
+    message_id = message_id or f'<msg-{uid}@example.org>'
+    return (f'Message-ID: {message_id}\r\nFrom: {sender}\r\nTo: info@stickerei.de\r\n'
+            f'Subject: Anfrage {uid}\r\nDate: Mon, 05 Oct 2026 10:00:00 +0200\r\n\r\n'
+            f'Hallo {uid}\r\n').encode()
+
+
+class FakeIMAP:
+    """Minimaler IMAP-Server im Speicher (UID SEARCH/FETCH)"""
+
+    def __init__(self, messages, uidvalidity=100):
+        self.messages = dict(messages)
+        self.uidvalidity = uidvalidity
+        self.commands = []
+
+    def select(self, folder):
+        return 'OK', [str(len(self.messages)).encode()]
+
+    def response(self, code):
+        if code == 'UIDVALIDITY':
+            return code, [str(self.uidvalidity).encode()]
+        if code == 'UIDNEXT':
+            return code, [str(max(self.messages, default=0) + 1).encode()]
+        return code, [None]
+
+    def uid(self, command, *args):
+        self.commands.append(command)
+        if command == 'SEARCH':
+            match = re.match(r'UID (\d+):\*', args[1])
+            uids = sorted(self.messages)
+            if match:
+                uids = [u for u in uids if u >= int(match.group(1))] or uids[-1:]
+            return 'OK', [' '.join(str(u) for u in uids).encode()]
+        data = []
+        for uid in (int(u) for u in args[0].split(',')):
+            raw = self.messages[uid]
+            if 'HEADER.FIELDS' in args[1]:
+                raw = raw.split(b'\r\n')[0] + b'\r\n\r\n'
+            data += [(f'{uid} (UID {uid} BODY[] {{{len(raw)}}}'.encode(), raw), b')']
+        return 'OK', data
+
+    def logout(self):
+        pass
+
+
+@pytest.fixture
+def mailbox(app, monkeypatch):
+    """E-Mail-Konto, ein Kunde und ein Fake-Postfach mit drei Nachrichten"""
+    account = EmailAccount(name='Test', email_address='imap-test@stickerei.de')
+    db.session.add(account)
+    db.session.add(Customer(id='KDIMAP', customer_type='private', first_name='Ina',
+                            last_name='Imap', email='Ina.Imap@Example.org'))
+    db.session.commit()
+
+    server = FakeIMAP({1: _message(1), 2: _message(2, sender='Ina <ina.imap@example.org>'),
+                       3: _message(3)})
+    monkeypatch.setattr(IMAPSyncService, 'connect', lambda self, acc: server)
+    yield account, server
+    ArchivedEmail.query.filter_by(email_account_id=account.id).delete()
+    db.session.delete(account)
+    Customer.query.filter_by(id='KDIMAP').delete()
+    db.session.commit()
+
+
+class TestIncrementalSync:
+    """Tests für fetch_new_emails"""
+
+    def test_initial_sync_stores_uid_state(self, mailbox):
+        account, server = mailbox
+        result = IMAPSyncService().fetch_new_emails(account.id)
+
+        assert result == {'fetched': 3, 'duplicates': 0, 'errors': 0}
+        assert account.imap_uidvalidity == 100 and account.imap_last_uid == 3
+        by_subject = {e.subject: e for e in ArchivedEmail.query.filter_by(email_account_id=account.id)}
+        assert by_subject['Anfrage 2'].customer_id == 'KDIMAP'
+        assert by_subject['Anfrage 1'].customer_id is None
+        assert server.commands == ['SEARCH', 'FETCH', 'FETCH']
+
+    def test_unchanged_mailbox_skips_search(self, mailbox):
+        """UIDNEXT unveraendert - kein SEARCH, kein FETCH"""
+        account, server = mailbox
+        IMAPSyncService().fetch_new_emails(account.id)
+        server.commands.clear()
+
+        result = IMAPSyncService().fetch_new_emails(account.id)
+        assert result == {'fetched': 0, 'duplicates': 0, 'errors': 0}
+        assert server.commands == []
+
+    def test_new_messages_and_duplicates(self, mailbox):
+        """Nur neue UIDs; bekannte Message-IDs werden ohne Body-Abruf uebersprungen"""
+        account, server = mailbox
+        IMAPSyncService().fetch_new_emails(account.id)
+        server.messages[4] = _message(4, message_id='<msg-1@example.org>')  # kopiert
+        server.messages[5] = _message(5)
+        server.commands.clear()
+
+        result = IMAPSyncService().fetch_new_emails(account.id)
+        assert result == {'fetched': 1, 'duplicates': 1, 'errors': 0}
+        assert account.imap_last_uid == 5
+        assert server.commands == ['SEARCH', 'FETCH', 'FETCH']
+
+    def test_uidvalidity_change_resyncs_without_duplicates(self, mailbox):
+        account, server = mailbox
+        IMAPSyncService().fetch_new_emails(account.id)
+        server.uidvalidity = 200
+        server.messages = {10: _message(1), 11: _message(6)}
+
+        result = IMAPSyncService().fetch_new_emails(account.id)
+        assert result == {'fetched': 1, 'duplicates': 1, 'errors': 0}
+        assert account.imap_uidvalidity == 200 and account.imap_last_uid == 11
+
+    def test_max_emails_continues_next_run(self, mailbox):
+        account, server = mailbox
+        IMAPSyncService().fetch_new_emails(account.id)
+        for uid in range(4, 10):
+            server.messages[uid] = _message(uid)
+
+        first = IMAPSyncService().fetch_new_emails(account.id, max_emails=4)
+        second = IMAPSyncService().fetch_new_emails(account.id, max_emails=4)
+        assert first == {'fetched': 4, 'duplicates': 0, 'errors': 0, 'remaining': 2}
+        assert second == {'fetched': 2, 'duplicates': 0, 'errors': 0}
+        assert ArchivedEmail.query.filter_by(email_account_id=account.id).count() == 9
+
+    def test_failed_fetch_is_retried(self, mailbox, monkeypatch):
+        """Fehlt der Body einer Nachricht, bleibt imap_last_uid davor stehen"""
+        account, server = mailbox
+        IMAPSyncService().fetch_new_emails(account.id)
+        for uid in (4, 5, 6):
+            server.messages[uid] = _message(uid)
+        fetch = server.uid
+
+        def body_without_5(command, *args):
+            status, data = fetch(command, *args)
+            if command == 'FETCH' and 'HEADER.FIELDS' not in args[1]:
+                data = [item for item in data if not (isinstance(item, tuple) and b'UID 5 ' in item[0])]
+            return status, data
+
+        monkeypatch.setattr(server, 'uid', body_without_5)
+        first = IMAPSyncService().fetch_new_emails(account.id)
+        assert first == {'fetched': 2, 'duplicates': 0, 'errors': 1}
+        assert account.imap_last_uid == 4
+
+        monkeypatch.setattr(server, 'uid', fetch)
+        second = IMAPSyncService().fetch_new_emails(account.id)
+        assert second == {'fetched': 1, 'duplicates': 1, 'errors': 0}
+        assert account.imap_last_uid == 6
+        assert ArchivedEmail.query.filter_by(email_account_id=account.id).count() == 6
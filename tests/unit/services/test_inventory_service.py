@@ -0,0 +1,143 @@
+"""
+Unit Tests für die gebündelte Verfügbarkeit und Reservierung im InventoryService
+"""
+
+import json
+
+import pytest
+from sqlalchemy import event
+
+from src.models.models import db, Article, Customer, Order, OrderItem, Supplier, SupplierOrder
+from src.services.inventory_service import (
+    InventoryService, ReservationStatus, StockReservation,
+)
+
+
+@pytest.fixture
+def lager(app):
+    """30 Artikel, offene Lieferantenbestellungen, ein Auftrag mit zwei Positionen"""
+    db.session.add(Supplier(id='INVSUP', name='INV Lieferant', active=True))
+    db.session.add(Customer(id='INVK1', first_name='Lager', last_name='Kunde'))
+    db.session.add_all([
+        Article(id=f'INV{i:02d}', article_number=f'INV-{i:02d}', name=f'INV Artikel {i}',
+                supplier='INV Lieferant', stock=10, min_stock=5 if i < 3 else 0, active=True)
+        for i in range(30)
+    ])
+    db.session.add_all([
+        SupplierOrder(id='INVSO1', supplier_id='INVSUP', status='ordered', items=json.dumps([
+            {'article_id': 'INV00', 'quantity': 20}, {'article_id': 'INV01', 'quantity': 3},
+        ])),
+        SupplierOrder(id='INVSO2', supplier_id='INVSUP', status='shipped', items=json.dumps([
+            {'article_id': 'INV00', 'quantity': 5},
+        ])),
+        SupplierOrder(id='INVSO3', supplier_id='INVSUP', status='delivered', items=json.dumps([
+            {'article_id': 'INV00', 'quantity': 99},
+        ])),
+    ])
+    db.session.add(Order(id='INV-A1', customer_id='INVK1', status='new'))
+    db.session.add_all([
+        OrderItem(order_id='INV-A1', article_id='INV00', quantity=6, supplier_order_status='none'),
+        OrderItem(order_id='INV-A1', article_id='INV00', quantity=6, supplier_order_status='none'),
+        OrderItem(order_id='INV-A1', article_id='INV01', quantity=2, supplier_order_status='none'),
+    ])
+    db.session.commit()
+    yield InventoryService()
+    db.session.rollback()
+    StockReservation.query.filter(StockReservation.article_id.like('INV%')).delete(synchronize_session=False)
+    OrderItem.query.filter_by(order_id='INV-A1').delete()
+    Order.query.filter_by(id='INV-A1').delete()
+    SupplierOrder.query.filter(SupplierOrder.id.like('INVSO%')).delete(synchronize_session=False)
+    Article.query.filter(Article.id.like('INV%')).delete(synchronize_session=False)
+    Customer.query.filter_by(id='INVK1').delete()
+    Supplier.query.filter_by(id='INVSUP').delete()
+    db.session.commit()
+
+
+def _count_queries(func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return result, statements
+
+
+class TestInventoryAvailability:
+    """Tests für get_availability_batch, reserve_for_order und den Reservierungs-Saldo"""
+
+    def test_batch_uses_constant_number_of_queries(self, lager):
+        """Artikel, Reservierungen und Zugänge für 30 Artikel in drei Abfragen"""
+        ids = [f'INV{i:02d}' for i in range(30)]
+        db.session.expunge_all()
+        batch, statements = _count_queries(lambda: lager.get_availability_batch(ids + ['INV-XX']))
+
+        assert len(statements) == 3
+        assert set(batch) == set(ids)
+        assert batch['INV00']['incoming'] == 25 and batch['INV01']['incoming'] == 3
+        assert batch['INV00']['projected_stock'] == 35
+        assert batch['INV05'] == lager.get_availability('INV05')
+        assert lager.get_availability('INV-XX')['error'] == 'Artikel nicht gefunden'
+
+    def test_reserve_for_order_draws_down_shared_stock(self, lager):
+        """Zwei Positionen desselben Artikels teilen sich den freien Bestand"""
+        order = db.session.get(Order, 'INV-A1')
+        result = lager.reserve_for_order(order)
+
+        assert not result['success'] and not result['fully_reserved']
+        assert [r['reserved'] for r in result['reservations']] == [6, 4, 2]
+        assert result['shortages'] == [{'article_id': 'INV00', 'article_name': 'INV Artikel 0', 'shortage': 2}]
+
+        availability = lager.get_availability('INV00')
+        assert (availability['physical_stock'], availability['reserved'], availability['available']) == (10, 10, 0)
+        assert availability['pending_requested'] == 2
+        assert db.session.get(Article, 'INV00').stock_reserved == 10
+
+    def test_release_and_consume_keep_balance(self, lager):
+        lager.reserve_for_order(db.session.get(Order, 'INV-A1'))
+
+        reservation = StockReservation.query.filter_by(article_id='INV01').one()
+        lager.release_reservation(reservation.id, 1)
+        assert db.session.get(Article, 'INV01').stock_reserved == 1
+
+        lager.consume_order_reservations('INV-A1')
+        article = db.session.get(Article, 'INV00')
+        assert (article.stock, article.stock_reserved) == (0, 0)
+        availability = lager.get_availability_batch(['INV00', 'INV01'])
+        assert availability['INV00']['physical_stock'] == 0
+        assert (availability['INV01']['physical_stock'], availability['INV01']['available']) == (9, 9)
+        assert StockReservation.query.filter_by(article_id='INV00', status=ReservationStatus.CONSUMED).count() == 2
+
+    def test_balance_optional_and_recomputable(self, lager):
+        """Ohne Saldo wird summiert; recompute_reserved_balances korrigiert Abweichungen"""
+        lager.reserve_for_order(db.session.get(Order, 'INV-A1'))
+        Article.query.filter_by(id='INV00').update({'stock_reserved': None}, synchronize_session=False)
+        Article.query.filter_by(id='INV01').update({'stock_reserved': 7}, synchronize_session=False)
+        db.session.commit()
+
+        batch = lager.get_availability_batch(['INV00', 'INV01'])
+        assert batch['INV00']['reserved'] == 10  # aus den Reservierungen summiert
+        assert batch['INV01']['reserved'] == 7  # Saldo wird vertraut
+        assert lager.get_availability('INV01')['reserved'] == 2
+
+        lager.recompute_reserved_balances()
+        db.session.commit()
+        assert db.session.get(Article, 'INV00').stock_reserved == 10
+        assert lager.get_availability_batch(['INV01'])['INV01']['reserved'] == 2
+
+    def test_reorder_suggestions_and_purchasing_page(self, lager, authenticated_client):
+        lager.reserve_for_order(db.session.get(Order, 'INV-A1'))
+
+        suggestions = {s['article_id']: s for s in lager.get_reorder_suggestions() if s['article_id'].startswith('INV')}
+        assert set(suggestions) == {'INV00'}
+        assert suggestions['INV00']['priority'] == 'high' and suggestions['INV00']['incoming'] == 25
+        assert suggestions['INV00']['supplier_name'] == 'INV Lieferant'
+
+        response = authenticated_client.get('/purchasing/suggestions')
+        assert response.status_code == 200
+        assert b'INV-A1' in response.data
@@ -0,0 +1,149 @@
+"""
+Unit Tests für die Job-Queue (Hintergrund-Sync)
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+
+from src.models.models import db
+from src.models.background_job import BackgroundJob
+from src.services import job_queue_service
+from src.services.job_queue_service import (
+    JOB_TYPES, backoff_seconds, claim_next, enqueue, get_job_stats, last_succeeded, process_next,
+    register_job_type, report_progress,
+)
+
+
+@pytest.fixture
+def queue(app):
+    """Test-Job-Typen registrieren, Queue danach leeren"""
+    calls = []
+
+    def ok(value=None):
+        calls.append(value)
+        return {'value': value}
+
+    def broken(**kwargs):
+        calls.append('broken')
+        return {'error': 'Server nicht erreichbar'}
+
+    register_job_type('test_ok', ok)
+    register_job_type('test_broken', broken, max_attempts=2)
+    yield calls
+    JOB_TYPES.pop('test_ok', None)
+    JOB_TYPES.pop('test_broken', None)
+    JOB_TYPES.pop('test_slow', None)
+    BackgroundJob.query.delete()
+    db.session.commit()
+
+
+class TestEnqueue:
+    """Tests für das Einreihen"""
+
+    def test_dedup_returns_open_job(self, queue):
+        """Zweiter Klick liefert den offenen Job, nach Abschluss entsteht ein neuer"""
+        first, created = enqueue('test_ok', {'value': 1}, dedup_key='test:1', created_by='admin')
+        second, created_again = enqueue('test_ok', {'value': 1}, dedup_key='test:1')
+
+        assert created and not created_again
+        assert second.id == first.id
+
+        process_next()
+        third, created = enqueue('test_ok', {'value': 1}, dedup_key='test:1')
+        assert created and third.id != first.id
+
+    def test_unknown_type(self, queue):
+        with pytest.raises(ValueError):
+            enqueue('gibt_es_nicht')
+
+
+class TestProcessing:
+    """Tests für Abarbeitung, Wiederholung und Lease"""
+
+    def test_success_records_result_and_timings(self, queue):
+        job, _ = enqueue('test_ok', {'value': 42})
+        assert last_succeeded('test_ok') is None
+        done = process_next('test-worker')
+
+        assert done.id == job.id and done.status == 'succeeded'
+        assert done.result == {'value': 42} and done.attempts == 1
+        assert done.worker == 'test-worker' and done.locked_until is None
+        assert done.wait_ms is not None and done.duration_ms is not None
+        assert queue == [42]
+        assert process_next() is None
+        assert last_succeeded('test_ok').id == job.id
+
+    def test_error_result_is_retried_with_backoff(self, queue):
+        """Ergebnis mit 'error' wird wiederholt, nach max_attempts endgueltig fehlgeschlagen"""
+        job, _ = enqueue('test_broken')
+        retry = process_next()
+
+        assert retry.status == 'queued' and retry.attempts == 1
+        assert retry.error == 'Server nicht erreichbar'
+        assert retry.run_after >= datetime.utcnow() + timedelta(seconds=backoff_seconds(1) - 5)
+        assert process_next() is None  # Backoff noch nicht abgelaufen
+
+        retry.run_after = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        failed = process_next()
+        assert failed.status == 'failed' and failed.attempts == 2 and failed.finished_at
+        assert backoff_seconds(2) == 2 * backoff_seconds(1)
+
+        stats = get_job_stats()['types']['test_broken']
+        assert stats['counts'] == {'failed': 1}
+
+    def test_expired_lease_is_reclaimed(self, queue, monkeypatch):
+        """Job eines abgestuerzten Workers wird nach Ablauf der Lease uebernommen"""
+        job, _ = enqueue('test_ok', {'value': 7})
+        claimed = claim_next('dead-worker')
+        assert claimed.status == 'running'
+        assert claim_next('other-worker') is None  # Lease laeuft noch
+
+        claimed.locked_until = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        monkeypatch.setattr(job_queue_service, '_worker_name', lambda: 'other-worker')
+        done = process_next()
+
+        assert done.id == job.id and done.status == 'succeeded'
+        assert done.attempts == 2 and done.worker == 'other-worker'
+
+    def test_expired_lease_without_attempts_left_fails(self, queue):
+        """Ist der letzte Versuch abgestuerzt, wird der Job nicht ein weiteres Mal gestartet"""
+        job, _ = enqueue('test_broken')
+        claimed = claim_next('dead-worker')
+        claimed.attempts = claimed.max_attempts
+        claimed.locked_until = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+        assert process_next('other-worker') is None
+        db.session.expire_all()
+        failed = db.session.get(BackgroundJob, job.id)
+        assert failed.status == 'failed' and failed.locked_until is None
+        assert failed.worker == 'dead-worker' and 'Lease' in failed.error
+        assert queue == []
+
+    def test_running_job_renews_lease(self, queue):
+        """Heartbeat und report_progress verlaengern die Lease waehrend des Laufs"""
+        seen = {}
+
+        def slow():
+            job_id = job_queue_service._current.job_id
+            time.sleep(1.5)
+            seen['heartbeat'] = db.session.execute(
+                sa.select(BackgroundJob.locked_until).where(BackgroundJob.id == job_id)).scalar()
+            report_progress(1, 2)
+            seen['progress'] = db.session.execute(
+                sa.select(BackgroundJob.locked_until).where(BackgroundJob.id == job_id)).scalar()
+            return {}
+
+        register_job_type('test_slow', slow, lease_seconds=3)
+        enqueue('test_slow')
+        claimed_at = datetime.utcnow()
+        done = process_next()
+
+        assert done.status == 'succeeded' and done.progress == {'done': 1, 'total': 2}
+        assert seen['heartbeat'] > claimed_at + timedelta(seconds=3.5)
+        assert seen['progress'] >= seen['heartbeat']
@@ -0,0 +1,158 @@
+"""
+Unit Tests für die Listen-Abfragen (Keyset-Paginierung, Projektion, Filterwerte)
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, inspect
+
+from src.models.models import db, Article, Customer, Order, OrderItem
+from src.services.list_query_service import (
+    LIST_VIEWS, count_estimate, decode_cursor, fetch_page, get_facets, item_status_counts,
+)
+
+
+@pytest.fixture
+def listen_daten(app):
+    """Kunden mit gleichen/fehlenden Anlagedaten, Auftrag mit Positionen, Artikel"""
+    t1, t2 = datetime(2026, 5, 1, 10, 0), datetime(2026, 5, 2, 9, 30)
+    customers = [
+        Customer(id='LQ01', first_name='Anna', last_name='Alt', created_at=t1),
+        Customer(id='LQ02', first_name='Bernd', last_name='Gleich', created_at=t2),
+        Customer(id='LQ03', customer_type='business', company_name='Gleich GmbH', created_at=t2),
+        Customer(id='LQ04', first_name='Clara', last_name='Neu', created_at=datetime(2026, 5, 3)),
+        Customer(id='LQ05', first_name='Dora', last_name='Gleich', created_at=t2),
+        Customer(id='LQ06', first_name='Ohne', last_name='Datum'),
+        Customer(id='LQ07', first_name='Auch', last_name='Ohne'),
+    ]
+    db.session.add_all(customers)
+    db.session.flush()
+    Customer.query.filter(Customer.id.in_(['LQ06', 'LQ07'])).update(
+        {'created_at': None}, synchronize_session=False)
+    db.session.add(Order(id='LQ-A1', customer_id='LQ03', description='Poloshirts'))
+    db.session.add_all([
+        OrderItem(order_id='LQ-A1', quantity=1, supplier_order_status='none'),
+        OrderItem(order_id='LQ-A1', quantity=2, supplier_order_status='none'),
+        OrderItem(order_id='LQ-A1', quantity=3, supplier_order_status='ordered'),
+    ])
+    db.session.add_all([
+        Article(id=f'LQART{i}', name=f'LQ Artikel {i % 3}', category='LQ-Kategorie', brand='LQ-Marke')
+        for i in range(5)
+    ])
+    db.session.commit()
+    yield customers
+    db.session.rollback()
+    OrderItem.query.filter_by(order_id='LQ-A1').delete()
+    Order.query.filter_by(id='LQ-A1').delete()
+    Customer.query.filter(Customer.id.like('LQ%')).delete(synchronize_session=False)
+    Article.query.filter(Article.id.like('LQART%')).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def _statements(func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        func()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def _alle_seiten(query, view_key, limit):
+    ids, cursor = [], None
+    while True:
+        page = fetch_page(query, view_key, cursor, limit)
+        ids += [obj.id for obj in page.items]
+        if not page.has_more:
+            return ids
+        cursor = page.next_cursor
+
+
+class TestListQueries:
+    """Tests für fetch_page, count_estimate und get_facets"""
+
+    def test_keyset_pages_cover_all_rows_once(self, listen_daten):
+        """Gleiche Sortwerte und NULL werden ueber Seitengrenzen hinweg korrekt fortgesetzt"""
+        query = Customer.query.filter(Customer.id.like('LQ%'))
+        # neueste zuerst, bei gleichem Datum nach id absteigend, ohne Datum am Ende
+        expected = ['LQ04', 'LQ05', 'LQ03', 'LQ02', 'LQ01', 'LQ07', 'LQ06']
+        for limit in (1, 2, 3, 10):
+            assert _alle_seiten(query, 'customers', limit) == expected
+
+        page = fetch_page(query, 'customers', limit=3)
+        assert decode_cursor(page.next_cursor, LIST_VIEWS['customers']) == (datetime(2026, 5, 2, 9, 30), 'LQ03')
+        with pytest.raises(ValueError):
+            fetch_page(query, 'customers', 'kein-cursor')
+
+    def test_projection_and_item_counts(self, listen_daten):
+        """Nur angezeigte Spalten laden, Kunde per selectinload, Positionen gruppiert zaehlen"""
+        db.session.expunge_all()
+        order = fetch_page(Order.query.filter_by(id='LQ-A1'), 'orders').items[0]
+
+        state = inspect(order)
+        assert 'adaptation_details' in state.unloaded and 'description' not in state.unloaded
+        assert 'customer' in order.__dict__
+        assert 'email' in inspect(order.customer).unloaded
+        assert order.customer.display_name == 'Gleich GmbH'
+        assert item_status_counts(['LQ-A1', 'LQ-XX']) == {'LQ-A1': {'none': 2, 'ordered': 1}, 'LQ-XX': {}}
+
+    def test_count_estimate_is_capped(self, listen_daten):
+        query = Customer.query.filter(Customer.id.like('LQ%'))
+        assert count_estimate(query) == (7, True)
+        assert count_estimate(query, cap=5) == (5, False)
+
+    def test_facets_cached_until_article_commit(self, listen_daten):
+        """Filterwerte bleiben gemerkt, bis eine Artikel-Aenderung committet wird"""
+        before = get_facets('articles')
+        assert 'LQ-Kategorie' in before['category']
+
+        article = db.session.get(Article, 'LQART0')
+        article.category = 'LQ-Neu'
+        db.session.flush()
+        assert get_facets('articles') is before
+        db.session.rollback()
+        assert get_facets('articles') is before
+
+        Article.query.filter_by(id='LQART1').update({'brand': 'LQ-Bulk'}, synchronize_session=False)
+        db.session.commit()
+        after = get_facets('articles')
+        assert after is not before and 'LQ-Bulk' in after['brand']
+
+    def test_json_mode_for_infinite_scroll(self, authenticated_client, listen_daten):
+        url = '/articles/?category=LQ-Kategorie&format=json&limit=2&count=1'
+        data = authenticated_client.get(url).get_json()
+        assert [item['id'] for item in data['items']] == ['LQART0', 'LQART3']
+        assert data['has_more'] and (data['total'], data['total_exact']) == (5, True)
+
+        rest = authenticated_client.get(f"{url}&cursor={data['next_cursor']}").get_json()
+        assert [item['id'] for item in rest['items']] == ['LQART1', 'LQART4']
+        assert authenticated_client.get(f'{url}&cursor=%%%').status_code == 400
+        assert b'LQ-A1' in authenticated_client.get('/orders/?show_archived=1').data
+        html = authenticated_client.get('/articles/?category=LQ-Kategorie&limit=2').get_data(as_text=True)
+        assert '5 Artikel gefunden' in html and 'Weitere Artikel anzeigen' in html
+
+    def test_orders_index_queries_do_not_grow_with_rows(self, authenticated_client, listen_daten):
+        """Das Template liest nur projizierte Spalten - keine Abfrage je Auftrag"""
+        url = '/orders/?show_archived=1&search=lq-rendern'
+        db.session.add(Order(id='LQ-R00', customer_id='LQ01', description='LQ-Rendern'))
+        db.session.commit()
+        try:
+            authenticated_client.get(url)  # Benutzer und Einstellungen einmal laden
+            einer = _statements(lambda: authenticated_client.get(url))
+            db.session.add_all([Order(id=f'LQ-R{i:02d}', customer_id=f'LQ0{i % 5 + 1}', description='LQ-Rendern',
+                                      order_type='embroidery', rush_order=bool(i % 2))
+                                for i in range(1, 25)])
+            db.session.commit()
+            html = authenticated_client.get(url).get_data(as_text=True)
+            assert 'LQ-R24' in html and 'LQ-R00' in html
+            viele = _statements(lambda: authenticated_client.get(url))
+            assert len(viele) == len(einer)
+        finally:
+            Order.query.filter(Order.id.like('LQ-R%')).delete(synchronize_session=False)
+            db.session.commit()
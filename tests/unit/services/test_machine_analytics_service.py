@@ -0,0 +1,106 @@
+"""
+Unit Tests für den Maschinen-Kapazitaets-Index
+"""
+
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from src.models import db, Machine, ProductionSchedule, ProductionBlock
+from src.services.machine_analytics_service import MachineAnalyticsService
+
+WEEK = date(2025, 1, 6)  # Montag
+
+
+def _at(day_offset, hour):
+    return datetime.combine(WEEK + timedelta(days=day_offset), time(hour, 0))
+
+
+@pytest.fixture
+def capacity_data(app):
+    """Zwei Maschinen mit Schedules und Wartung, danach aufraeumen"""
+    machines = [Machine(id='MCAP1', name='Kapazitaet 1', type='embroidery', status='active'),
+                Machine(id='MCAP2', name='Kapazitaet 2', type='embroidery', status='active')]
+    db.session.add_all(machines)
+    db.session.add_all([
+        # Montag ueberbucht: 4h + 6h
+        ProductionSchedule(machine_id='MCAP1', scheduled_start=_at(0, 8), scheduled_end=_at(0, 12)),
+        ProductionSchedule(machine_id='MCAP1', scheduled_start=_at(0, 10), scheduled_end=_at(0, 16),
+                           status='in_progress'),
+        # Ueber Mitternacht: Di 4h, Mi 4h
+        ProductionSchedule(machine_id='MCAP1', scheduled_start=_at(1, 20), scheduled_end=_at(2, 4)),
+        # Storniert: zaehlt nicht
+        ProductionSchedule(machine_id='MCAP1', scheduled_start=_at(3, 8), scheduled_end=_at(3, 12),
+                           status='cancelled'),
+        # Folgewoche
+        ProductionSchedule(machine_id='MCAP2', scheduled_start=_at(7, 8), scheduled_end=_at(7, 14)),
+    ])
+    db.session.add_all([
+        ProductionBlock(block_type='maintenance', machine_id='MCAP1',
+                        start_date=WEEK + timedelta(days=3), start_time=time(8, 0),
+                        end_date=WEEK + timedelta(days=3), end_time=time(14, 0)),
+        ProductionBlock(block_type='production', machine_id='MCAP2',
+                        start_date=WEEK + timedelta(days=4), start_time=time(8, 0),
+                        end_date=WEEK + timedelta(days=4), end_time=time(11, 0)),
+        # Ohne Maschine (Pause): ignoriert
+        ProductionBlock(block_type='pause', start_date=WEEK, start_time=time(12, 0),
+                        end_date=WEEK, end_time=time(13, 0)),
+    ])
+    db.session.commit()
+    yield machines
+    ProductionSchedule.query.filter(ProductionSchedule.machine_id.in_(['MCAP1', 'MCAP2'])).delete()
+    ProductionBlock.query.filter(ProductionBlock.start_date.between(WEEK, WEEK + timedelta(days=14))).delete()
+    Machine.query.filter(Machine.id.in_(['MCAP1', 'MCAP2'])).delete()
+    db.session.commit()
+
+
+class TestMachineCapacity:
+    """Tests für Heatmap, Auslastung und Batch-API"""
+
+    def test_weekly_heatmap(self, app, capacity_data):
+        """Tages-Buckets mit Ueberbuchung, Mitternacht und Wartung"""
+        days = MachineAnalyticsService().get_weekly_capacity(WEEK)['MCAP1']['days']
+
+        assert (days[0]['scheduled_hours'], days[0]['jobs'], days[0]['overbooked']) == (10, 2, True)
+        assert days[0]['pct'] == 100
+        assert (days[1]['scheduled_hours'], days[2]['scheduled_hours']) == (4, 4)
+        assert not days[1]['overbooked']
+        assert (days[3]['scheduled_hours'], days[3]['available_hours']) == (0, 2)
+
+    def test_utilization_uses_blocked_hours(self, app, capacity_data):
+        """Wartung reduziert die verfuegbaren Stunden"""
+        service = MachineAnalyticsService()
+        util = service.get_machine_utilization('MCAP1', WEEK, WEEK + timedelta(days=5))
+
+        assert util['scheduled_hours'] == 18
+        assert util['available_hours'] == 34
+        assert util['work_days'] == 5
+
+    def test_capacity_weeks_batch(self, app, capacity_data):
+        """Mehrere Wochen aus einem Index = Einzelabfragen je Woche"""
+        service = MachineAnalyticsService()
+        weeks = service.get_capacity_weeks(WEEK + timedelta(days=2), weeks=2)
+
+        assert [w['week_start'] for w in weeks] == [WEEK, WEEK + timedelta(days=7)]
+        for week in weeks:
+            single = service.get_weekly_capacity(week['week_start'])
+            for machine_id in ('MCAP1', 'MCAP2'):
+                assert week['machines'][machine_id]['days'] == single[machine_id]['days']
+        assert weeks[0]['machines']['MCAP2']['week_total'] == 3
+        assert weeks[1]['machines']['MCAP2']['week_jobs'] == 1
+
+    def test_current_jobs_from_index(self, app, capacity_data):
+        """Laufende Auftraege per Index, Maschine ohne Einzelabfrage"""
+        now = datetime.utcnow()
+        schedule = ProductionSchedule(machine_id='MCAP2', scheduled_start=now - timedelta(hours=1),
+                                      scheduled_end=now + timedelta(hours=3))
+        db.session.add(schedule)
+        db.session.commit()
+
+        service = MachineAnalyticsService()
+        index = service.build_index(now.date(), now.date())
+        jobs = [j for j in service.get_current_jobs(index=index) if j['schedule'].id == schedule.id]
+
+        assert len(jobs) == 1
+        assert jobs[0]['machine'].name == 'Kapazitaet 2'
+        assert jobs[0]['progress_pct'] == 25
@@ -0,0 +1,150 @@
+"""
+Unit Tests für das parallele Rendern von PDF-Batches
+"""
+
+import io
+import zipfile
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from PyPDF2 import PdfReader
+
+from src.models.models import db, Customer
+from src.models.background_job import BackgroundJob
+from src.models.pdf_artifact import PdfArtifact
+from src.models.rechnungsmodul.models import Rechnung, RechnungsPosition, RechnungsStatus
+from src.services.job_queue_service import process_next
+from src.services.pdf_batch_service import render_batch, render_many, shutdown_pool
+
+
+def _packing_list(number):
+    return {'company_name': 'Stickerei Test', 'packing_list_number': number,
+            'created_at': date(2026, 9, 1), 'customer_name': 'Kunde',
+            'items': [{'name': 'Poloshirt', 'quantity': 10}]}
+
+
+@pytest.fixture
+def batch_invoices(app):
+    """Drei offene Rechnungen mit je einer Position, danach aufraeumen"""
+    db.session.add(Customer(id='KDBATCH', customer_type='private', first_name='Bea', last_name='Batch'))
+    rechnungen = []
+    for i in range(3):
+        rechnung = Rechnung(rechnungsnummer=f'RE-BATCH-{i}', kunde_id='KDBATCH',
+                            rechnungsdatum=date(2026, 9, i + 1), status=RechnungsStatus.OFFEN,
+                            netto_gesamt=Decimal('100'), mwst_gesamt=Decimal('19'),
+                            brutto_gesamt=Decimal('119'))
+        db.session.add(rechnung)
+        db.session.flush()
+        db.session.add(RechnungsPosition(rechnung_id=rechnung.id, position=1, artikel_name='Poloshirt',
+                                         menge=Decimal('10'), einzelpreis=Decimal('10'),
+                                         mwst_betrag=Decimal('19'), netto_betrag=Decimal('100'),
+                                         brutto_betrag=Decimal('119')))
+        rechnungen.append(rechnung)
+    db.session.commit()
+    yield rechnungen
+    ids = [r.id for r in rechnungen]
+    PdfArtifact.query.filter(PdfArtifact.document_kind == 'rechnungen',
+                             PdfArtifact.document_id.in_([str(i) for i in ids])).delete()
+    RechnungsPosition.query.filter(RechnungsPosition.rechnung_id.in_(ids)).delete()
+    Rechnung.query.filter(Rechnung.id.in_(ids)).delete()
+    Customer.query.filter_by(id='KDBATCH').delete()
+    db.session.commit()
+
+
+class TestRenderMany:
+    """Tests für render_many (ohne Datenbank)"""
+
+    def test_inline_keeps_order_and_collects_errors(self):
+        """Reihenfolge bleibt erhalten, Fehler eines Dokuments stoppen den Rest nicht"""
+        calls = []
+        jobs = [('packing_list', _packing_list('PL-1')), ('unbekannt', {}),
+                ('packing_list', _packing_list('PL-3'))]
+        results = render_many(jobs, workers=1, progress=lambda done, total: calls.append((done, total)))
+
+        assert results[0][0].startswith(b'%PDF') and results[2][0].startswith(b'%PDF')
+        assert isinstance(results[1], KeyError)
+        assert calls[-1] == (3, 3)
+
+    def test_process_pool(self):
+        """Mit mehreren Prozessen entstehen dieselben Dokumente in Auftragsreihenfolge"""
+        jobs = [('packing_list', _packing_list(f'PL-{i}')) for i in range(6)]
+        try:
+            results = render_many(jobs, workers=2)
+        finally:
+            shutdown_pool()
+
+        assert len(results) == 6
+        for data, render_ms in results:
+            assert len(PdfReader(io.BytesIO(data)).pages) >= 1
+            assert render_ms > 0
+
+
+class TestRenderBatch:
+    """Tests für render_batch mit Rechnungen aus der Datenbank"""
+
+    def test_merged_pdf_and_missing_ids(self, app, batch_invoices):
+        """Zusammengefuegtes PDF, unbekannte IDs landen in failed"""
+        ids = [r.id for r in batch_invoices]
+        result = render_batch('rechnung', ids + [999999], output='pdf', workers=1)
+
+        assert result.count == 3 and result.rendered == 3
+        assert result.failed == [(999999, 'nicht gefunden')]
+        assert result.mimetype == 'application/pdf'
+        assert len(PdfReader(io.BytesIO(result.data)).pages) >= 3
+
+    def test_zip_uses_pdf_store(self, app, batch_invoices):
+        """Zweiter Lauf kommt aus dem PDF-Store, ZIP in Reihenfolge der IDs"""
+        ids = [r.id for r in reversed(batch_invoices)]
+        render_batch('rechnung', ids, output='zip', workers=1)
+        result = render_batch('rechnung', ids, output='zip', workers=1)
+
+        assert result.from_store == 3 and result.rendered == 0
+        names = zipfile.ZipFile(io.BytesIO(result.data)).namelist()
+        assert names == ['RE-BATCH-2.pdf', 'RE-BATCH-1.pdf', 'RE-BATCH-0.pdf']
+
+    def test_unknown_kind(self, app):
+        with pytest.raises(ValueError):
+            render_batch('mahnung', [1])
+
+
+class TestBatchJob:
+    """Tests für den Batch als Job der Job-Queue (Status und Download ueber die Datenbank)"""
+
+    def test_status_and_download_from_job_row(self, app, batch_invoices, authenticated_client,
+                                              monkeypatch, tmp_path):
+        """Status kommt aus background_jobs, das ZIP aus PDF_BATCH_DIR unter der Job-ID"""
+        monkeypatch.setitem(app.config, 'PDF_BATCH_DIR', str(tmp_path))
+        monkeypatch.setitem(app.config, 'PDF_BATCH_WORKERS', 1)
+        ids = [r.id for r in batch_invoices]
+        invalid = authenticated_client.post('/pdf-batch/start', json={'kind': 'mahnung', 'ids': ids})
+        assert invalid.status_code == 400
+        for bad_ids in ([None], [[1]], '12'):
+            invalid = authenticated_client.post('/pdf-batch/start', json={'kind': 'rechnung', 'ids': bad_ids})
+            assert invalid.status_code == 400
+        assert BackgroundJob.query.filter_by(job_type='pdf_batch').count() == 0
+        try:
+            response = authenticated_client.post('/pdf-batch/start', json={
+                'kind': 'rechnung', 'ids': ids + [999999], 'output': 'zip'})
+            assert response.status_code == 202
+            started = response.get_json()
+            job_id = started['batch']['id']
+            again = authenticated_client.post('/pdf-batch/start', json={
+                'kind': 'rechnung', 'ids': ids + [999999], 'output': 'zip'}).get_json()
+            assert again['batch']['id'] == job_id and not again['created']
+            assert authenticated_client.get(started['download_url']).status_code == 409
+
+            assert process_next().status == 'succeeded'
+            batch = authenticated_client.get(started['status_url']).get_json()['batch']
+            assert batch['finished'] and (batch['done'], batch['total']) == (3, 3)
+            assert batch['failed'] == [{'id': 999999, 'error': 'nicht gefunden'}]
+            assert (tmp_path / f'{job_id}.zip').exists()
+
+            download = authenticated_client.get(started['download_url'])
+            assert download.status_code == 200 and download.mimetype == 'application/zip'
+            names = zipfile.ZipFile(io.BytesIO(download.data)).namelist()
+            assert names == ['RE-BATCH-0.pdf', 'RE-BATCH-1.pdf', 'RE-BATCH-2.pdf']
+            assert authenticated_client.get('/pdf-batch/999999').status_code == 404
+        finally:
+            BackgroundJob.query.filter_by(job_type='pdf_batch').delete()
+            db.session.commit()
@@ -0,0 +1,125 @@
+"""
+Unit Tests für den PDF-Store finalisierter Dokumente
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from src.models.models import db, Customer
+from src.models.document_workflow import BusinessDocument, DocumentPosition
+from src.models.pdf_artifact import PdfArtifact
+from src.services.pdf_store_service import (
+    get_pdf,
+    get_pdf_store_stats,
+    not_modified_response,
+    reset_pdf_store_stats,
+)
+
+
+class _Renderer:
+    """Zaehlt die Render-Aufrufe"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return b'%PDF-1.4 test ' + str(self.calls).encode()
+
+
+@pytest.fixture
+def store_document(app):
+    """Rechnung mit einer Position (finalisiert), danach aufraeumen"""
+    kunde = Customer(id='KDPDF1', customer_type='private', first_name='Paula', last_name='Druck')
+    db.session.add(kunde)
+    dokument = BusinessDocument(dokument_nummer='RE-PDF-0001', dokument_typ='rechnung',
+                                kunde_id='KDPDF1', status='offen')
+    db.session.add(dokument)
+    db.session.flush()
+    db.session.add(DocumentPosition(dokument_id=dokument.id, position=1, bezeichnung='Poloshirt',
+                                    menge=Decimal('1'), einzelpreis_netto=Decimal('10'),
+                                    mwst_satz=Decimal('19'), rabatt_prozent=Decimal('0')))
+    db.session.commit()
+    reset_pdf_store_stats()
+    yield dokument
+    PdfArtifact.query.filter_by(document_id=str(dokument.id)).delete()
+    DocumentPosition.query.filter_by(dokument_id=dokument.id).delete()
+    BusinessDocument.query.filter_by(id=dokument.id).delete()
+    Customer.query.filter_by(id='KDPDF1').delete()
+    db.session.commit()
+
+
+def _artifacts(dokument):
+    return PdfArtifact.query.filter_by(document_id=str(dokument.id)).count()
+
+
+class TestPdfStore:
+    """Tests für get_pdf, Invalidierung und 304"""
+
+    def test_finalized_rendered_once(self, app, store_document):
+        """Finalisiertes Dokument wird einmal gerendert, danach aus dem Store"""
+        render = _Renderer()
+        first = get_pdf(store_document, 'dokument', render)
+        second = get_pdf(store_document, 'dokument', render)
+
+        assert render.calls == 1
+        assert first.from_store is False and second.from_store is True
+        assert second.data == first.data and second.etag == first.etag
+        # Speichern des Ablagepfads erzeugt keine neue Revision
+        store_document.pdf_pfad = '/tmp/RE-PDF-0001.pdf'
+        db.session.commit()
+        assert get_pdf(store_document, 'dokument', render).from_store is True
+
+        stats = get_pdf_store_stats()
+        assert stats['hits'] == 2 and stats['misses'] == 1
+
+    def test_draft_never_stored(self, app, store_document):
+        """Entwuerfe werden immer neu gerendert und nicht abgelegt"""
+        store_document.status = 'entwurf'
+        db.session.commit()
+        render = _Renderer()
+        get_pdf(store_document, 'dokument', render)
+        pdf = get_pdf(store_document, 'dokument', render)
+
+        assert render.calls == 2
+        assert pdf.finalized is False and pdf.from_store is False
+        assert _artifacts(store_document) == 0
+
+    def test_position_change_invalidates(self, app, store_document):
+        """Geaenderte Position verwirft die Eintraege des Dokuments"""
+        render = _Renderer()
+        get_pdf(store_document, 'dokument', render)
+        assert _artifacts(store_document) == 1
+
+        position = DocumentPosition.query.filter_by(dokument_id=store_document.id).one()
+        position.bezeichnung = 'Hoodie'
+        db.session.commit()
+
+        assert _artifacts(store_document) == 0
+        assert get_pdf(store_document, 'dokument', render).from_store is False
+        assert render.calls == 2
+
+    def test_not_modified_with_matching_etag(self, app, store_document):
+        """If-None-Match mit dem SHA-256 des gespeicherten PDFs ergibt 304"""
+        pdf = get_pdf(store_document, 'dokument', _Renderer())
+
+        with app.test_request_context(headers={'If-None-Match': f'"{pdf.etag}"'}):
+            response = not_modified_response(store_document, 'dokument')
+            assert response is not None and response.status_code == 304
+        with app.test_request_context(headers={'If-None-Match': '"anderer-hash"'}):
+            assert not_modified_response(store_document, 'dokument') is None
+
+    def test_bookkeeping_leaves_caller_session_alone(self, app, store_document):
+        """Ablegen und Nachschlagen committen keine offenen Aenderungen des Aufrufers"""
+        kunde = db.session.get(Customer, 'KDPDF1')
+        render = _Renderer()
+        with db.session.no_autoflush:
+            kunde.city = 'Ungespeichert'
+            get_pdf(store_document, 'dokument', render)
+            assert get_pdf(store_document, 'dokument', render).from_store is True
+            assert kunde in db.session.dirty
+
+        db.session.rollback()
+        assert db.session.get(Customer, 'KDPDF1').city is None
+        assert _artifacts(store_document) == 1
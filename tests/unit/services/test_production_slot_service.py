@@ -0,0 +1,124 @@
+"""
+Unit Tests für den Produktions-Slot-Finder (Frei/Belegt-Zeitleisten)
+"""
+
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from src.models import db, Machine, ProductionSchedule, ProductionBlock
+from src.services.production_slot_service import MachineTimeline, SlotFinder
+
+MONDAY = datetime(2025, 1, 6, 8, 0)
+
+
+def _at(day_offset, hour, minute=0):
+    return MONDAY.replace(hour=hour, minute=minute) + timedelta(days=day_offset)
+
+
+def _machine(machine_id, machine_type='embroidery'):
+    return SimpleNamespace(id=machine_id, name=machine_id, type=machine_type)
+
+
+def _schedule(machine_id, start, end):
+    return SimpleNamespace(machine_id=machine_id, scheduled_start=start, scheduled_end=end)
+
+
+class TestMachineTimeline:
+    """Tests für die Intervall-Liste einer Maschine"""
+
+    def test_merge_and_overlap(self):
+        timeline = MachineTimeline(None, [(_at(0, 10), _at(0, 12)), (_at(0, 8), _at(0, 9))])
+        timeline.reserve(_at(0, 11), _at(0, 14))
+
+        assert timeline.busy() == [(_at(0, 8), _at(0, 9)), (_at(0, 10), _at(0, 14))]
+        assert timeline.is_free(_at(0, 9), _at(0, 10))
+        assert not timeline.is_free(_at(0, 9), _at(0, 10, 30))
+        assert not timeline.is_free(_at(0, 7), _at(0, 16))
+
+
+class TestSlotFinder:
+    """Tests für früheste Slots, Best-Fit und Mehrfachplanung"""
+
+    def _finder(self, schedules=(), blocks=(), busy=()):
+        machines = [_machine('A'), _machine('B'), _machine('D', 'dtf')]
+        return SlotFinder(machines, _at(0, 8), _at(14, 8), schedules, blocks, busy)
+
+    def test_earliest_slot_skips_conflicts_and_nights(self):
+        """Luecke zu klein -> hinter der Belegung; ueber Feierabend -> Folgetag"""
+        finder = self._finder([_schedule('A', _at(0, 10), _at(0, 12)),
+                               _schedule('A', _at(0, 13), _at(0, 17))])
+
+        assert finder.earliest_slot_on('A', 2) == (_at(0, 8), _at(0, 10))
+        assert finder.earliest_slot_on('A', 3) == (_at(1, 8), _at(1, 11))
+        # Laenger als ein Arbeitstag: laeuft am naechsten Tag weiter
+        assert finder.earliest_slot_on('B', 12) == (_at(0, 8), _at(1, 11))
+        # Freitag 16 Uhr + 3h -> Montag 10 Uhr
+        assert finder.earliest_slot_on('B', 3, _at(4, 16)) == (_at(4, 16), _at(7, 10))
+
+    def test_global_pause_blocks_all_machines(self):
+        pause = SimpleNamespace(machine_id=None, is_all_day=False, start_date=MONDAY.date(),
+                                start_time=time(8, 0), end_date=MONDAY.date(), end_time=time(9, 0))
+        finder = self._finder(blocks=[pause])
+
+        assert finder.find_slot(1)['start'] == _at(0, 9)
+
+    def test_best_fit_fills_gaps(self):
+        """Best-Fit nimmt die Luecke mit dem kleinsten Rest"""
+        finder = self._finder([_schedule('A', _at(0, 10), _at(0, 17)),
+                               _schedule('B', _at(0, 8), _at(0, 9))])
+
+        earliest = finder.find_slot(2, ['embroidery'])
+        best_fit = finder.find_slot(2, ['embroidery'], strategy='best_fit')
+
+        assert (earliest['machine'].id, earliest['start']) == ('A', _at(0, 8))
+        assert (best_fit['machine'].id, best_fit['start']) == ('A', _at(0, 8))
+        best_fit = finder.find_slot(1, ['embroidery'], strategy='best_fit')
+        assert best_fit['machine'].id == 'A'
+        assert finder.find_slot(3, ['embroidery'], strategy='best_fit')['machine'].id == 'B'
+
+    def test_plan_reserves_slots(self):
+        """Mehrere Jobs ueberschneiden sich nicht; Maschinentyp wird beachtet"""
+        finder = self._finder(busy=['A'])
+        jobs = [{'order_id': 1, 'duration_hours': 4, 'machine_types': ['embroidery']},
+                {'order_id': 2, 'duration_hours': 4, 'machine_types': ['embroidery']},
+                {'order_id': 3, 'duration_hours': 4, 'machine_types': ['embroidery']},
+                {'order_id': 4, 'duration_hours': 2, 'machine_types': ['dtf']}]
+
+        planned = [(p['slot']['machine'].id, p['slot']['start']) for p in finder.plan(jobs)]
+
+        # B zuerst (A hat laufenden Auftrag)
+        assert planned == [('B', _at(0, 8)), ('A', _at(0, 8)), ('B', _at(0, 12)), ('D', _at(0, 8))]
+
+
+@pytest.fixture
+def slot_machines(app):
+    machines = [Machine(id='MSL1', name='Slot 1', type='embroidery', status='active'),
+                Machine(id='MSL2', name='Slot 2', type='embroidery', status='active')]
+    db.session.add_all(machines)
+    db.session.add(ProductionSchedule(machine_id='MSL1', scheduled_start=_at(0, 8),
+                                      scheduled_end=_at(0, 12)))
+    # Zweiter Block derselben Maschine: frueher wurde nur .first() geprueft
+    db.session.add_all([
+        ProductionBlock(block_type='office', machine_id='MSL2', start_date=MONDAY.date(),
+                        start_time=time(7, 0), end_date=MONDAY.date(), end_time=time(7, 30)),
+        ProductionBlock(block_type='maintenance', machine_id='MSL2', start_date=MONDAY.date(),
+                        start_time=time(9, 0), end_date=MONDAY.date(), end_time=time(11, 0)),
+    ])
+    db.session.commit()
+    yield machines
+    ProductionSchedule.query.filter(ProductionSchedule.machine_id.in_(['MSL1', 'MSL2'])).delete()
+    ProductionBlock.query.filter(ProductionBlock.machine_id.in_(['MSL1', 'MSL2'])).delete()
+    Machine.query.filter(Machine.id.in_(['MSL1', 'MSL2'])).delete()
+    db.session.commit()
+
+
+def test_load_from_database(app, slot_machines):
+    """Bulk-Laden: alle Bloecke einer Maschine werden beruecksichtigt"""
+    finder = SlotFinder.load(_at(0, 8), horizon_days=7, machine_types=['embroidery'])
+    finder.machines = [m for m in finder.machines if m.id in ('MSL1', 'MSL2')]
+
+    assert finder.suggest_machine(_at(0, 9), _at(0, 10)) is None
+    assert finder.suggest_machine(_at(0, 11), _at(0, 12)).id == 'MSL2'
+    assert finder.find_slot(2) == {'machine': slot_machines[1], 'start': _at(0, 11), 'end': _at(0, 13)}
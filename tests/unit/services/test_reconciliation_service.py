@@ -0,0 +1,110 @@
+"""
+Unit Tests für den indizierten Zahlungsabgleich
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from src.models.models import db
+from src.models.banking import BankAccount, BankTransaction, BankTransactionMatch
+from src.models.rechnungsmodul.models import Rechnung, RechnungsRichtung, RechnungsStatus
+from src.services.bank_sync_service import BankSyncService
+from src.services.reconciliation_service import (
+    InvoiceRecord, ReconciliationEngine, load_open_invoices, normalize_name, to_cents,
+)
+
+
+def _invoice(invoice_id, number, amount, name, paid='0'):
+    gross = to_cents(amount)
+    return InvoiceRecord(invoice_id, number, gross - to_cents(paid), gross, normalize_name(name), None)
+
+
+@pytest.fixture
+def engine():
+    return ReconciliationEngine([
+        _invoice(1, 'RE-2026-0001', '119.00', 'Müller Textil GmbH'),
+        _invoice(2, 'RE-2026-0002', '238.00', 'Schmidt & Co. KG'),
+        _invoice(3, 'RE-2026-0003', '59.50', 'Schmidt & Co. KG'),
+        _invoice(4, 'RE-2026-0004', '119.00', 'Weber'),
+        _invoice(5, 'RE-2026-0005', '500.00', 'Fischer', paid='200.00'),
+    ])
+
+
+class TestEngine:
+    """Tests für ReconciliationEngine.match"""
+
+    def test_number_with_other_separators(self, engine):
+        """Nummer, Betrag und Name -> automatische Zuordnung, Rechnung danach gesperrt"""
+        match = engine.match(Decimal('119.00'), 'Rg. RE 2026/0001 vielen Dank', 'MUELLER TEXTIL')
+        assert [r.id for r in match.invoices] == [1] and match.confidence == 100
+
+        again = engine.match(Decimal('119.00'), 'RE-2026-0001', 'Mueller Textil')
+        assert again is None or 1 not in [r.id for r in again.invoices]
+
+    def test_amount_only_is_ambiguous(self, engine):
+        """Zwei Rechnungen ueber 119,00 ohne Nummer/Name: kein Auto-Match"""
+        assert engine.match(Decimal('119.00'), 'Zahlung', 'Unbekannt') is None
+        match = engine.match(Decimal('119.00'), 'Zahlung', 'Weber')
+        assert [r.id for r in match.invoices] == [4] and match.confidence == 50
+
+    def test_one_payment_for_many_invoices(self, engine):
+        match = engine.match(Decimal('297.50'), 'RE-2026-0002 und RE-2026-0003', 'Schmidt und Co')
+        assert [r.id for r in match.invoices] == [2, 3]
+        assert match.allocations == [23800, 5950] and match.confidence == 100
+
+    def test_open_amount_after_partial_payment(self, engine):
+        match = engine.match(Decimal('300.00'), 'Restzahlung RE20260005', 'Fischer')
+        assert [r.id for r in match.invoices] == [5] and match.allocations == [30000]
+        assert engine.pairs_scored < 10  # nur Kandidaten bewertet
+
+
+class TestAutoMatchTransactions:
+    """BankSyncService.auto_match_transactions mit Datenbank"""
+
+    def test_auto_match_writes_allocations(self, app):
+        account = BankAccount(name='Testkonto Abgleich')
+        db.session.add(account)
+        rechnungen = [Rechnung(rechnungsnummer=f'RE-ABGL-{i}', kunde_name='Abgleich GmbH',
+                               rechnungsdatum=date(2026, 9, 1), status=RechnungsStatus.OFFEN,
+                               netto_gesamt=Decimal('100'), mwst_gesamt=Decimal('19'),
+                               brutto_gesamt=Decimal('119')) for i in range(2)]
+        db.session.add_all(rechnungen)
+        db.session.flush()
+        tx = BankTransaction(bank_account_id=account.id, transaction_date=date(2026, 9, 10),
+                             amount=Decimal('238.00'), purpose='RE-ABGL-0 RE-ABGL-1',
+                             applicant_name='Abgleich GmbH', import_hash='abgleich-test')
+        db.session.add(tx)
+        db.session.commit()
+
+        try:
+            assert BankSyncService().auto_match_transactions(account.id) == {'matched': 1, 'unmatched': 0}
+            assert tx.match_status == 'auto' and tx.matched_invoice_id == rechnungen[0].id
+            allocations = {(m.rechnung_id, m.amount) for m in tx.matches}
+            assert allocations == {(r.id, Decimal('119.00')) for r in rechnungen}
+        finally:
+            BankTransactionMatch.query.filter_by(transaction_id=tx.id).delete()
+            db.session.delete(tx)
+            for rechnung in rechnungen:
+                db.session.delete(rechnung)
+            db.session.delete(account)
+            db.session.commit()
+
+    def test_incoming_invoices_are_not_candidates(self, app):
+        """Offene Eingangsrechnungen (Lieferanten) erwarten keine Zahlungseingaenge"""
+        ausgang, eingang = [Rechnung(rechnungsnummer=f'RE-RICHTUNG-{richtung.value}', kunde_name='Richtung GmbH',
+                                     rechnungsdatum=date(2026, 9, 1), status=RechnungsStatus.OFFEN,
+                                     richtung=richtung, netto_gesamt=Decimal('100'),
+                                     mwst_gesamt=Decimal('19'), brutto_gesamt=Decimal('119'))
+                            for richtung in (RechnungsRichtung.AUSGANG, RechnungsRichtung.EINGANG)]
+        db.session.add_all([ausgang, eingang])
+        db.session.commit()
+
+        try:
+            ids = {record.id for record in load_open_invoices()}
+            assert ausgang.id in ids and eingang.id not in ids
+        finally:
+            db.session.delete(ausgang)
+            db.session.delete(eingang)
+            db.session.commit()
@@ -0,0 +1,71 @@
+"""
+Unit Tests für die Leader-Wahl des Schedulers
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.models import db
+from src.models.scheduler_lease import SchedulerLease
+from src.services.scheduler_leader_service import LeaderElector, get_lease, release, try_acquire
+
+
+@pytest.fixture
+def lease(app):
+    yield
+    SchedulerLease.query.delete()
+    db.session.commit()
+
+
+def _expire():
+    row = db.session.get(SchedulerLease, 'scheduler')
+    row.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+
+class TestLease:
+    """Tests für Übernahme und Erneuerung der Lease"""
+
+    def test_only_one_holder(self, lease):
+        assert try_acquire('host:1') is True
+        assert try_acquire('host:2') is False
+        assert try_acquire('host:1') is True  # Heartbeat
+        assert get_lease()['leader'] == 'host:1'
+
+    def test_expired_lease_is_taken_over(self, lease):
+        """Stirbt der Leader, uebernimmt ein anderer nach Ablauf der Lease"""
+        try_acquire('host:1')
+        _expire()
+
+        assert try_acquire('host:2') is True
+        assert try_acquire('host:1') is False
+        status = get_lease()
+        assert status['leader'] == 'host:2' and not status['expired']
+        assert status['lease_age_seconds'] < 5
+
+    def test_release_allows_immediate_failover(self, lease):
+        try_acquire('host:1')
+        release('host:1')
+        assert get_lease()['expired'] is True
+        assert try_acquire('host:2') is True
+
+
+class TestLeaderElector:
+    """Tests für die Rollenwechsel eines Prozesses"""
+
+    def test_promote_and_demote(self, app, lease):
+        events = []
+        elector = LeaderElector(app, on_promote=lambda: events.append('promote'),
+                                on_demote=lambda: events.append('demote'),
+                                on_tick=lambda: events.append('tick'))
+        elector.holder = 'host:1'
+
+        assert elector.beat() is True
+        assert elector.beat() is True
+        _expire()
+        try_acquire('host:2')
+        assert elector.beat() is False
+
+        assert events == ['promote', 'tick', 'demote']
+        assert elector.is_leader is False
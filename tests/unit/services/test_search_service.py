@@ -0,0 +1,162 @@
+"""
+Unit Tests für den Suchindex (FTS5 / Dokument-Tabellen)
+"""
+
+import pytest
+
+from src.models.models import db, Customer, Order
+from src.services.search_service import (
+    SEARCH_ENTITIES,
+    apply_search,
+    get_search_index_status,
+    ilike_clause,
+    rebuild_stale_search_index,
+)
+
+
+@pytest.fixture
+def search_customers(app):
+    """Zwei Kunden mit Auftrag, danach aufraeumen"""
+    customers = [
+        Customer(id='KDS01', customer_type='business', company_name='Stickerei Müller GmbH',
+                 first_name='Jürgen', last_name='Müller', email='info@mueller-stick.de'),
+        Customer(id='KDS02', customer_type='private', first_name='Anna',
+                 last_name='Stickler', city='Musterstadt'),
+    ]
+    db.session.add_all(customers)
+    db.session.add(Order(id='AS-001', customer_id='KDS01', description='Poloshirts mit Logo'))
+    db.session.commit()
+    yield customers
+    Order.query.filter_by(id='AS-001').delete()
+    Customer.query.filter(Customer.id.in_(['KDS01', 'KDS02'])).delete()
+    db.session.commit()
+
+
+def _ids(query):
+    return [row.id for row in query.all()]
+
+
+def _customers():
+    """Nur die Test-Kunden (andere Tests hinterlassen eigene Daten)"""
+    return Customer.query.filter(Customer.id.like('KDS%'))
+
+
+def _orders():
+    return Order.query.filter(Order.id.like('AS-%'))
+
+
+class TestSearchIndex:
+    """Tests für apply_search und die Synchronisation"""
+
+    def test_index_created_by_migration(self, app):
+        """Schema-Migration legt den Index fuer alle Entities an"""
+        status = get_search_index_status()
+        assert set(status) == set(SEARCH_ENTITIES)
+        assert status['customers']['backend'] == 'fts5'
+
+    def test_same_hits_as_ilike(self, app, search_customers):
+        """Teilstring-Suche liefert dieselben Treffer wie ILIKE"""
+        for text in ('müller', 'stick', 'KDS0', 'mueller-stick.de', 'xyz123', 'mu'):
+            indexed = set(_ids(apply_search(_customers(), 'customers', text)))
+            expected = set(_ids(_customers().filter(ilike_clause('customers', text))))
+            assert indexed == expected, text
+
+    def test_all_terms_across_fields_ranked(self, app, search_customers):
+        """Mehrere Suchwoerter in verschiedenen Feldern, Namenstreffer zuerst"""
+        assert _ids(apply_search(_customers(), 'customers', 'jürgen gmbh')) == ['KDS01']
+        # Name beginnt mit dem Suchwort -> vor Treffern mitten im Namen
+        ranked = _ids(apply_search(_customers(), 'customers', 'stick', ranked=True))
+        assert ranked == ['KDS01', 'KDS02']
+        ranked = _ids(apply_search(_customers(), 'customers', 'anna', ranked=True))
+        assert ranked == ['KDS02']
+
+    def test_sync_on_update_and_parent_change(self, app, search_customers):
+        """Aenderungen am Kunden aktualisieren Kunden- und Auftragsdokumente"""
+        customer = search_customers[0]
+        customer.company_name = 'Textildruck Schmidt'
+        customer.last_name = 'Schmidt'
+        db.session.commit()
+
+        assert _ids(apply_search(_customers(), 'customers', 'schmidt')) == ['KDS01']
+        assert _ids(apply_search(_orders(), 'orders', 'schmidt polo')) == ['AS-001']
+        assert _ids(apply_search(_orders(), 'orders', 'müller')) == []
+
+    def test_bulk_update_rebuilds_entity(self, app, search_customers):
+        """Bulk-UPDATE per ORM schreibt die Dokumente der per WHERE getroffenen Zeilen"""
+        Customer.query.filter_by(id='KDS02').update({'last_name': 'Neumann'})
+        db.session.commit()
+
+        assert _ids(apply_search(_customers(), 'customers', 'neumann')) == ['KDS02']
+
+    def test_bulk_insert_and_pk_update_index_rows(self, app, search_customers):
+        """Bulk-INSERT und UPDATE nach Primaerschluessel schreiben nur die betroffenen Dokumente"""
+        from src.services.bulk_upsert_service import bulk_insert, bulk_update
+
+        bulk_insert(Customer, [{'id': 'KDS03', 'customer_type': 'private', 'last_name': 'Importiert'}])
+        bulk_update(Customer, [{'id': 'KDS01', 'last_name': 'Hofmann'}])
+        db.session.commit()
+        try:
+            assert _ids(apply_search(_customers(), 'customers', 'importiert')) == ['KDS03']
+            assert _ids(apply_search(_customers(), 'customers', 'hofmann')) == ['KDS01']
+            assert _ids(apply_search(_orders(), 'orders', 'hofmann')) == ['AS-001']
+        finally:
+            Customer.query.filter_by(id='KDS03').delete()
+            db.session.commit()
+
+    def test_bulk_update_without_indexed_columns_skips_index(self, app, search_customers):
+        """UPDATE ohne indizierte Spalte schreibt keine Dokumente"""
+        from sqlalchemy import event, update
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            Customer.query.filter_by(id='KDS02').update({'is_active': False})
+            db.session.execute(update(Customer).values(notes='intern'))
+            db.session.flush()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        db.session.rollback()
+
+        assert any(statement.startswith('UPDATE customers SET notes') for statement in statements)
+        assert not any('search_' in statement for statement in statements)
+
+    def test_bulk_delete_removes_documents_without_rebuild(self, app, search_customers):
+        """Bulk-DELETE mit WHERE loescht nur die Dokumente der getroffenen Zeilen"""
+        docs = SEARCH_ENTITIES['customers'].table
+        db.session.add(Customer(id='KDS04', customer_type='private', last_name='Geloescht'))
+        db.session.commit()
+
+        Customer.query.filter(Customer.id == 'KDS04').delete()
+        db.session.commit()
+
+        assert db.session.execute(docs.select().where(docs.c.entity_id == 'KDS04')).first() is None
+        assert not get_search_index_status()['customers']['stale']
+
+    def test_unbounded_bulk_update_marks_stale_for_background_rebuild(self, app, search_customers):
+        """UPDATE ohne WHERE: kein Neuaufbau im Statement, sondern Markierung fuer den System-Job"""
+        from sqlalchemy import event, update
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            db.session.execute(update(Customer).values(last_name=Customer.last_name))
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+        assert not any(statement.startswith('INSERT INTO search_customers') for statement in statements)
+        status = get_search_index_status()
+        assert status['customers']['stale'] and status['orders']['stale']
+
+        assert set(rebuild_stale_search_index()) == {'customers', 'orders'}
+        status = get_search_index_status()
+        assert not status['customers']['stale'] and not status['orders']['stale']
+        assert _ids(apply_search(_customers(), 'customers', 'stickler')) == ['KDS02']
@@ -0,0 +1,153 @@
+"""
+Unit Tests für den parallelen Shelly-Poller
+"""
+
+import threading
+import time
+
+import pytest
+import requests
+
+from src.models.models import db, ShellyDevice, ShellyEnergyReading, ShellyEnergyRollup
+from src.services import shelly_poller_service
+from src.services.shelly_poller_service import (
+    CIRCUIT_FAILURES, circuit_state, poll_status, record_readings, scan_network,
+)
+from src.utils.shelly_integration import ShellyScanner
+
+PREFIX = 'POLL-'
+
+
+class FakeResponse:
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(self.status_code)
+
+
+class FakeSession:
+    """Antworten je IP; fehlende IPs laufen in einen Timeout"""
+
+    def __init__(self, answers, delay=0.0):
+        self.answers = answers
+        self.delay = delay
+        self.calls = []
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        ip, path = url[len('http://'):].split('/', 1)
+        with self._lock:
+            self.calls.append(ip)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if ip not in self.answers:
+                raise requests.exceptions.ConnectTimeout(ip)
+            return FakeResponse(self.answers[ip][path])
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def gen1(power, total=600):
+    return {'status': {'meters': [{'power': power, 'total': total}], 'relays': [{'ison': True}]},
+            'shelly': {'type': 'SHPLG-S', 'mac': 'AA'}}
+
+
+def gen2(power):
+    return {'status': {'switch:0': {'apower': power, 'output': False, 'aenergy': {'total': 5000}}},
+            'shelly': {'model': 'SNSW-001P16EU', 'ver': '1.2.0', 'mac': 'BB'}}
+
+
+@pytest.fixture
+def session(monkeypatch):
+    shelly_poller_service.reset_circuits()
+    fake = FakeSession({})
+    monkeypatch.setattr(shelly_poller_service, 'get_session', lambda: fake)
+    yield fake
+    shelly_poller_service.reset_circuits()
+
+
+@pytest.fixture
+def geraete(app):
+    devices = [ShellyDevice(name=f'{PREFIX}{i}', ip_address=f'10.9.0.{i}', active=True, track_energy=True)
+               for i in range(1, 4)]
+    db.session.add_all(devices)
+    db.session.commit()
+    yield devices
+    db.session.rollback()
+    ids = [d.id for d in devices]
+    ShellyEnergyReading.query.filter(ShellyEnergyReading.device_id.in_(ids)).delete(synchronize_session=False)
+    ShellyEnergyRollup.query.filter(ShellyEnergyRollup.device_id.in_(ids)).delete(synchronize_session=False)
+    ShellyDevice.query.filter(ShellyDevice.id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+class TestShellyPoller:
+    """Tests für parallele Abfrage, Circuit-Breaker, Scan und Aufzeichnung"""
+
+    def test_poll_runs_concurrently_and_parses_generations(self, session):
+        session.delay = 0.2
+        session.answers = {f'10.0.0.{i}': (gen1(i) if i % 2 else gen2(i)) for i in range(1, 11)}
+
+        start = time.perf_counter()
+        results = poll_status([(i, f'10.0.0.{i}', 0) for i in range(1, 12)])
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 1.0 and session.peak > 1  # nacheinander waeren es 2,2 s
+        assert results[1]['power'] == 1 and results[1]['energy'] == 10 and results[1]['is_on'] is True
+        assert results[2]['power'] == 2 and results[2]['is_on'] is False
+        assert results[11] is None
+
+    def test_circuit_opens_after_failures_and_recovers(self, session, monkeypatch):
+        for _ in range(CIRCUIT_FAILURES):
+            assert poll_status([('a', '10.0.0.99', 0)]) == {'a': None}
+        assert circuit_state()['10.0.0.99'] == {'failures': CIRCUIT_FAILURES, 'open': True}
+
+        # Offen: keine Anfrage mehr
+        calls = len(session.calls)
+        assert poll_status([('a', '10.0.0.99', 0)]) == {'a': None}
+        assert len(session.calls) == calls
+
+        # Nach der Pause: ein Versuch, Erfolg schliesst den Breaker
+        session.answers['10.0.0.99'] = gen1(40)
+        later = time.monotonic() + shelly_poller_service.CIRCUIT_OPEN_SECONDS + 1
+        monkeypatch.setattr(shelly_poller_service.time, 'monotonic', lambda: later)
+        assert poll_status([('a', '10.0.0.99', 0)])['a']['power'] == 40
+        assert circuit_state() == {}
+
+    def test_scan_returns_device_info(self, session):
+        session.answers = {'192.168.5.20': gen2(0), '192.168.5.7': gen1(0)}
+        found = scan_network('192.168.5')
+
+        assert [f['ip'] for f in found] == ['192.168.5.7', '192.168.5.20']
+        assert found[1]['type'] == 'SNSW-001P16EU' and found[1]['fw'] == '1.2.0'
+        assert len(session.calls) == 254
+        assert circuit_state() == {}  # Scan zaehlt nicht fuer den Breaker
+
+    def test_record_readings_bulk_insert_and_status(self, session, geraete):
+        session.answers = {'10.9.0.1': gen1(120, total=1200), '10.9.0.3': gen2(60)}
+        result = record_readings(geraete)
+
+        assert result == {'devices': 3, 'recorded': 2, 'offline': 1}
+        readings = ShellyEnergyReading.query.filter(
+            ShellyEnergyReading.device_id.in_([d.id for d in geraete])).order_by(ShellyEnergyReading.device_id).all()
+        assert [(r.device_id, r.power_w, r.energy_wh) for r in readings] == [
+            (geraete[0].id, 120, 20), (geraete[2].id, 60, 5)]
+        assert readings[0].timestamp == readings[1].timestamp  # eine Messrunde
+        db.session.refresh(geraete[1])
+        assert geraete[1].is_online is False and geraete[0].last_power_w == 120
+
+    def test_scanner_class_delegates_to_parallel_scan(self, session):
+        session.answers = {'192.168.5.7': gen1(0)}
+        devices = ShellyScanner.scan_network('192.168.5')
+
+        assert [(d.ip, d.device_type) for d in devices] == [('192.168.5.7', 'SHPLG-S')]
@@ -0,0 +1,119 @@
+"""
+Unit Tests für Stunden-/Tageswerte und Aufbewahrung der Shelly-Messungen
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from src.models.models import db, ShellyDevice, ShellyEnergyReading, ShellyEnergyRollup
+from src.services import shelly_rollup_service
+from src.services.shelly_rollup_service import (
+    DAY, HOUR, MAX_GAP_SECONDS, apply_readings, day_bucket, day_start_utc, energy_between, hourly_history,
+    prune_readings, rebuild_rollups, today_rollups,
+)
+
+PREFIX = 'ROLLUP-'
+
+
+@pytest.fixture
+def geraet(app):
+    device = ShellyDevice(name=f'{PREFIX}Stickmaschine', ip_address='10.8.0.1', active=True, track_energy=True)
+    db.session.add(device)
+    db.session.commit()
+    yield device
+    db.session.rollback()
+    ShellyEnergyRollup.query.filter_by(device_id=device.id).delete(synchronize_session=False)
+    ShellyEnergyReading.query.filter_by(device_id=device.id).delete(synchronize_session=False)
+    ShellyDevice.query.filter_by(id=device.id).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def messen(device, start, werte, step=timedelta(minutes=1)):
+    """Messwerte (power, energy, is_on) ab start wie record_readings schreiben"""
+    rows = [{'device_id': device.id, 'timestamp': start + i * step, 'power_w': power, 'energy_wh': energy,
+             'is_on': is_on} for i, (power, energy, is_on) in enumerate(werte)]
+    apply_readings(rows)
+    db.session.execute(insert(ShellyEnergyReading), rows)
+    db.session.commit()
+    return rows
+
+
+def rollup(device, period, start):
+    return ShellyEnergyRollup.query.filter_by(device_id=device.id, period=period, bucket_start=start).one()
+
+
+class TestShellyRollups:
+    """Tests für inkrementelle Pflege, Abfragen, Neuaufbau und Aufbewahrung"""
+
+    def test_incremental_hour_and_day_rollups(self, geraet):
+        start = datetime(2026, 3, 10, 9, 58)
+        rows = messen(geraet, start, [(100, 1000, True), (200, 1004, True), (0, 1007, False)])
+        messen(geraet, start + timedelta(minutes=3), [(50, 1010, True)])  # naechste Messrunde
+
+        assert [r['energy_delta_wh'] for r in rows] == [0, 4, 3]
+        alt, neu = rollup(geraet, HOUR, datetime(2026, 3, 10, 9)), rollup(geraet, HOUR, datetime(2026, 3, 10, 10))
+        assert (alt.readings, alt.energy_wh, alt.on_seconds, alt.power_max_w) == (2, 4, 60, 200)
+        # 9:59 an -> 10:00 zaehlt 60 s; 10:00 aus -> 10:01 ohne Laufzeit
+        assert (neu.readings, neu.energy_wh, neu.on_seconds, neu.energy_min_wh, neu.energy_max_wh) == \
+            (2, 6, 60, 1007, 1010)
+        tag = rollup(geraet, DAY, day_bucket(start))
+        assert (tag.readings, tag.energy_wh, tag.on_seconds, tag.avg_power_w) == (4, 10, 120, 87.5)
+
+    def test_counter_reset_and_gap_cap(self, geraet):
+        start = datetime(2026, 3, 11, 8, 0)
+        messen(geraet, start, [(100, 500, True)])
+        rows = messen(geraet, start + timedelta(hours=2), [(100, 20, True)])  # Neustart, 2 h Luecke
+
+        assert rows[0]['energy_delta_wh'] == 20
+        assert rollup(geraet, HOUR, datetime(2026, 3, 11, 10)).on_seconds == MAX_GAP_SECONDS
+
+    def test_overlapping_rounds_merge_into_one_rollup(self, geraet, monkeypatch):
+        start = datetime(2026, 3, 12, 9, 0)
+        messen(geraet, start, [(100, 1000, True)])
+        # Parallele Runde, die den Stundenwert der ersten noch nicht geladen hat
+        monkeypatch.setattr(shelly_rollup_service, '_load_rollups', lambda device_ids, keys: {})
+        messen(geraet, start + timedelta(minutes=1), [(300, 1005, False)])
+
+        stunde = rollup(geraet, HOUR, start)
+        assert (stunde.readings, stunde.energy_wh, stunde.on_seconds) == (2, 5, 60)
+        assert (stunde.power_min_w, stunde.power_max_w, stunde.energy_min_wh) == (100, 300, 1000)
+        assert (stunde.last_reading_at, stunde.last_energy_wh, stunde.last_is_on) == \
+            (start + timedelta(minutes=1), 1005, False)
+
+    def test_queries_read_rollups(self, geraet):
+        now = datetime.utcnow().replace(second=0, microsecond=0)
+        messen(geraet, now - timedelta(minutes=2), [(100, 10, True), (300, 15, True), (200, 18, True)])
+
+        assert today_rollups([geraet.id])[geraet.id].energy_wh == 8
+        verlauf = hourly_history(geraet.id, now - timedelta(hours=24))
+        assert verlauf[-1].energy_wh == 18 and len(verlauf) <= 2
+
+    def test_energy_between_combines_days_and_hours(self, geraet):
+        tag = day_bucket(datetime(2026, 4, 1, 12))
+        start = day_start_utc(tag) + timedelta(hours=22)
+        # Stundenweise Messungen ueber knapp drei Tage, je Stunde 10 Wh
+        messen(geraet, start, [(500, 10 * i, True) for i in range(60)], step=timedelta(hours=1))
+
+        result = energy_between(geraet.id, start, start + timedelta(hours=50))
+        assert result['energy_kwh'] == 0.49  # 50 Stunden, erste ohne Vormessung
+        assert result['readings'] == 50 and result['avg_power_w'] == 500
+        # Zwei Randstunden am ersten Tag, ein voller Tag, Rest stundenweise
+        assert result['on_hours'] == round(49 * MAX_GAP_SECONDS / 3600, 2)
+
+    def test_rebuild_matches_incremental_and_prune_keeps_rollups(self, geraet):
+        now = datetime.utcnow().replace(second=0, microsecond=0)
+        start = day_start_utc(day_bucket(now) - timedelta(days=40)) + timedelta(hours=6)
+        messen(geraet, start, [(100 + i, 2 * i, i % 3 != 0) for i in range(30)], step=timedelta(minutes=7))
+        vorher = {(r.period, r.bucket_start): (r.readings, r.energy_wh, r.on_seconds)
+                  for r in ShellyEnergyRollup.query.filter_by(device_id=geraet.id)}
+
+        assert rebuild_rollups([geraet.id]) == 30
+        nachher = {(r.period, r.bucket_start): (r.readings, r.energy_wh, r.on_seconds)
+                   for r in ShellyEnergyRollup.query.filter_by(device_id=geraet.id)}
+        assert nachher == vorher
+
+        assert prune_readings(keep_days=30)['readings'] >= 30
+        assert ShellyEnergyReading.query.filter_by(device_id=geraet.id).count() == 0
+        assert rollup(geraet, DAY, day_bucket(start)).energy_wh == 58
@@ -0,0 +1,161 @@
+"""
+Unit Tests für den gestreamten Excel-/CSV-Leser
+"""
+
+import io
+import os
+
+import pytest
+from openpyxl import Workbook
+
+from src.models import db, Article, ArticleVariant, Customer
+from src.services import analysis_cache_service, lshop_import_service, table_reader_service
+from src.services.csv_import_service import CSVImportService
+from src.services.lshop_import_service import LShopImportService
+from src.services.table_reader_service import iter_chunks, sniff_layout, table_layout
+
+PREFIX = 'STREAM-'
+
+
+def _excel(path, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def preisliste(tmp_path):
+    """L-Shop-Liste mit Titelzeilen über der Tabelle und Leerzeilen am Ende"""
+    rows = [['L-Shop GmbH'], ['Stand 01/2026'], [],
+            ['Art. Nr.', 'Bezeichnung', 'Marke', 'Preis', None, 'Preis']]
+    rows += [[f'{PREFIX}{i:03d}', f'Shirt {i}', 'Gildan', 2.5 + i, None, i] for i in range(7)]
+    rows += [[], []]
+    return _excel(tmp_path / 'preisliste.xlsx', rows)
+
+
+@pytest.fixture
+def cleanup(app):
+    yield
+    db.session.rollback()
+    ArticleVariant.query.filter(ArticleVariant.article_id.in_(
+        db.session.query(Article.id).filter(Article.supplier_article_number.like(f'{PREFIX}%'))
+    )).delete(synchronize_session=False)
+    Article.query.filter(Article.supplier_article_number.like(f'{PREFIX}%')).delete(synchronize_session=False)
+    Customer.query.filter(Customer.customer_number.like(f'{PREFIX}%')).delete(synchronize_session=False)
+    db.session.commit()
+
+
+class TestTableReader:
+    """Tests für Layout, Blöcke, Cache und die Importe darüber"""
+
+    def test_excel_layout_detects_header(self, preisliste):
+        layout = sniff_layout(preisliste)
+
+        assert layout['format'] == 'xlsx'
+        assert layout['header_row'] == 3
+        assert layout['columns'] == ['Art. Nr.', 'Bezeichnung', 'Marke', 'Preis', 'Unnamed: 4', 'Preis.1']
+        assert layout['total_rows'] == 7
+        assert layout['sample'][0] == [f'{PREFIX}000', 'Shirt 0', 'Gildan', 2.5, None, 0]
+
+    def test_chunks_keep_row_index(self, preisliste):
+        chunks = list(iter_chunks(preisliste, sniff_layout(preisliste), chunk_rows=3))
+
+        assert [len(c) for c in chunks] == [3, 3, 1]
+        assert list(chunks[1].index) == [3, 4, 5]
+        assert chunks[2].iloc[0]['Art. Nr.'] == f'{PREFIX}006'
+
+    def test_csv_layout_from_file_head(self, tmp_path):
+        path = tmp_path / 'kunden.csv'
+        path.write_bytes('Name,Ort\nMüller,Köln\n"Schmidt, A.",Bonn\n\n'.encode('latin-1'))
+        layout = sniff_layout(str(path))
+
+        assert (layout['encoding'], layout['delimiter'], layout['header_row']) == ('latin-1', ',', 0)
+        assert layout['total_rows'] == 2
+        assert layout['sample'] == [['Müller', 'Köln'], ['Schmidt, A.', 'Bonn']]
+
+    def test_layout_cached_by_content(self, app, preisliste):
+        analysis_cache_service.reset_analysis_cache_stats()
+        first = table_layout(preisliste)
+        assert table_layout(preisliste) == first
+
+        stats = analysis_cache_service.get_analysis_cache_stats()
+        assert stats['by_analyzer']['table_layout'] == {'hits': 1, 'misses': 1}
+
+    def test_lshop_import_reads_in_chunks(self, app, preisliste, cleanup, monkeypatch):
+        monkeypatch.setattr(lshop_import_service, 'iter_chunks',
+                            lambda path, layout: table_reader_service.iter_chunks(path, layout, chunk_rows=3))
+        service = LShopImportService()
+        analysis = service.analyze_excel(preisliste)
+        assert analysis['success'] is True and analysis['total_rows'] == 7
+
+        meldungen = []
+        result = service.import_articles({'supplier_article_number': 'Art. Nr.', 'name': 'Bezeichnung',
+                                          'single_price': 'Preis'},
+                                         progress=lambda done, total: meldungen.append((done, total)))
+        assert (result['imported_count'], result['total_processed']) == (7, 7)
+        assert meldungen == [(3, 7), (6, 7), (7, 7)]
+        assert Article.query.filter(Article.supplier_article_number.like(f'{PREFIX}%')).count() == 7
+
+    def test_lshop_variant_groups_span_chunks(self, app, tmp_path, cleanup, monkeypatch):
+        """Varianten einer Artikelnummer ueber eine Blockgrenze bleiben eine Gruppe"""
+        monkeypatch.setattr(lshop_import_service, 'iter_chunks',
+                            lambda path, layout: table_reader_service.iter_chunks(path, layout, chunk_rows=3))
+        header = ['Art. Nr.', 'Bezeichnung', 'Farbe']
+        rows = [[f'{PREFIX}A', 'Tasche', None], [f'{PREFIX}B', 'Cap', None], [f'{PREFIX}X1', 'Shirt', 'rot'],
+                [f'{PREFIX}X1', 'Shirt', 'blau'], [f'{PREFIX}X1', 'Shirt', 'gruen'], [f'{PREFIX}X2', 'Polo', 'rot'],
+                [f'{PREFIX}X2', 'Polo', 'blau']]
+        mapping = {'supplier_article_number': 'Art. Nr.', 'name': 'Bezeichnung', 'color': 'Farbe'}
+
+        def import_file(name, data):
+            service = LShopImportService()
+            service.analyze_excel(_excel(tmp_path / name, [header] + data))
+            return service.import_articles(mapping, {'create_variants': True, 'created_by': 'test'})
+
+        def colors(sku):
+            article = Article.query.filter_by(supplier_article_number=f'{PREFIX}{sku}').one()
+            return article.has_variants, sorted(v.color for v in article.variants)
+
+        result = import_file('varianten.xlsx', rows)
+        assert (result['imported_count'], result['variant_count'], result['total_processed']) == (4, 5, 7)
+        assert colors('X1') == (True, ['blau', 'gruen', 'rot'])
+        assert colors('X2') == (True, ['blau', 'rot'])
+
+        # Einzelne Zeile zu einem vorhandenen Variantenartikel wird Variante
+        import_file('nachtrag.xlsx', [[f'{PREFIX}X1', 'Shirt', 'schwarz']])
+        assert colors('X1') == (True, ['blau', 'gruen', 'rot', 'schwarz'])
+
+    def test_lshop_validation_covers_whole_file(self, app, tmp_path, monkeypatch):
+        """Validierung liest alle Zeilen, nicht nur die gespeicherte Stichprobe"""
+        monkeypatch.setattr(table_reader_service, 'SAMPLE_ROWS', 2)
+        monkeypatch.setattr(lshop_import_service, 'iter_chunks',
+                            lambda path, layout: table_reader_service.iter_chunks(path, layout, chunk_rows=3))
+        rows = [[f'{PREFIX}{i}', f'Artikel {i}'] for i in range(6)] + [[None, 'ohne Nummer']]
+        service = LShopImportService()
+        service.analyze_excel(_excel(tmp_path / 'validierung.xlsx', [['Art. Nr.:', 'Farbe']] + rows))
+        assert len(service.df) == 2
+
+        result = service.validate_data()
+        assert (result['valid_rows'], result['total_rows'], result['warning_count']) == (6, 7, 1)
+        assert result['warnings'] == ['Zeile 7: Keine wichtigen Daten gefunden']
+
+    def test_csv_job_preview_from_sample_and_chunked_import(self, app, cleanup, monkeypatch):
+        monkeypatch.setattr('src.services.csv_import_service.iter_chunks',
+                            lambda path, layout: table_reader_service.iter_chunks(path, layout, chunk_rows=2))
+        service = CSVImportService()
+        content = 'Kundennummer;Nachname\n' + ''.join(f'{PREFIX}{i % 4};Kunde {i}\n' for i in range(6))
+        job = service.create_import_job(io.BytesIO(content.encode('utf-8')), 'kunden.csv', 'customer', 'test')
+        try:
+            assert job.sample_rows[0] == [f'{PREFIX}0', 'Kunde 0'] and job.total_rows == 6
+            os.rename(job.file_path, job.file_path + '.weg')  # Vorschau ohne Datei
+            assert service.get_preview_data(job, max_rows=2)[1] == {'Kundennummer': f'{PREFIX}1',
+                                                                     'Nachname': 'Kunde 1'}
+            os.rename(job.file_path + '.weg', job.file_path)
+
+            job.column_mapping = {'Kundennummer': 'customer_number', 'Nachname': 'last_name'}
+            result = service.execute_import(job)
+            assert (result['imported'], result['skipped']) == (4, 2)  # Duplikate über Blockgrenzen
+        finally:
+            os.remove(job.file_path)
@@ -19,7 +19,8 @@ from src.utils.dst_analyzer import (
     classify_command,
     decode_movement,
     calculate_efficiency_rating,
-    calculate_production_difficulty
+    calculate_production_difficulty,
+    decode_dst_stitches,
 )
 
 
@@ -542,3 +543,52 @@ class TestIntegration:
         assert result1['success'] is True
         assert result2['success'] is True
         assert result1['filename'] != result2['filename']
+
+
+class TestDecodeDstStitches:
+    """Tests für den vektorisierten Decoder"""
+
+    def test_positions_and_commands(self):
+        """Positionen werden kumuliert, Befehle an aktueller Position erfasst"""
+        data = bytes([
+            10, 20, 0x00,    # +10, +20
+            3, 4, 0x03,      # -3, -4
+            0, 0xB0, 0xFE,   # Farbwechsel bei (7, 16)
+            2, 1, 0x80,      # +162, +1 (Sprung)
+            0, 0, 0xF3,      # Ende
+            9, 9, 0x00,      # nach Ende: ignoriert
+        ])
+
+        stitches = decode_dst_stitches(data)
+        info = extract_all_stitch_info(data)
+        colors = extract_all_color_info(data)
+
+        assert len(stitches) == 4
+        assert stitches.x.tolist() == [10, 7, 7, 169]
+        assert stitches.y.tolist() == [20, 16, 16, 17]
+        assert info['total_stitches'] == 3
+        assert info['normal_stitches'] == 2
+        assert info['jump_stitches'] == 1
+        assert info['commands'] == [{'type': 'color_change', 'position': 6,
+                                     'bytes': [0, 0xB0, 0xFE], 'x': 7, 'y': 16}]
+        assert colors['color_positions'] == [{'x': 7, 'y': 16, 'color': 1}]
+        assert colors['estimated_colors'] == 2
+
+    def test_length_matches_sequential_sum(self):
+        """Gesamtlaenge entspricht exakt der fortlaufenden Summe"""
+        data = bytes([7, 3, 0x00, 11, 5, 0x01, 1, 1, 0x02] * 50)
+        expected = 0
+        for dx, dy in [(7, 3), (-11, 5), (1, -1)] * 50:
+            expected += (dx ** 2 + dy ** 2) ** 0.5 / 10
+
+        info = extract_all_stitch_info(data)
+
+        assert info['total_length_mm'] == expected
+        assert isinstance(info['total_stitches'], int)
+
+    def test_incomplete_trailing_record(self):
+        """Unvollstaendiger Datensatz am Ende wird ignoriert"""
+        dims = extract_all_dimension_info(bytes([10, 0, 0x00, 5, 5]))
+
+        assert dims['width_mm'] == 0.0
+        assert dims['bounding_box']['max_x_mm'] == 1.0
@@ -0,0 +1,82 @@
+"""
+Unit Tests für die Berechtigungs-Matrix
+Testet Defaults, Cache und Invalidierung per Versionsstempel
+"""
+
+import pytest
+from sqlalchemy import event
+
+from src.models.models import db, User
+from src.models.user_permissions import Module, ModulePermission
+from src.utils.permissions import (
+    bump_permission_version,
+    get_user_modules,
+    has_module_permission,
+)
+
+
+@pytest.fixture
+def staff_user(app):
+    """Normaler Benutzer ohne explizite Berechtigungen"""
+    user = User(username='perm_staff', email='perm_staff@example.com',
+                is_active=True, is_admin=False)
+    user.set_password('staff123')
+    db.session.add(user)
+    db.session.commit()
+    yield user
+    ModulePermission.query.filter_by(user_id=user.id).delete()
+    db.session.delete(user)
+    bump_permission_version()
+    db.session.commit()
+
+
+def _count_queries(app):
+    statements = []
+
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _before_execute)
+    return statements, lambda: event.remove(db.engine, 'before_cursor_execute', _before_execute)
+
+
+class TestPermissionMatrix:
+    """Tests für has_module_permission / get_user_modules"""
+
+    def test_defaults_without_explicit_permission(self, app, staff_user):
+        """Ohne Berechtigung gilt default_enabled, nur für 'view'"""
+        for module in Module.query.filter_by(is_active=True).all():
+            expected = module.default_enabled and not module.requires_admin
+            assert has_module_permission(staff_user, module.name, 'view') == expected
+            assert has_module_permission(staff_user, module.name, 'edit') is False
+        assert has_module_permission(staff_user, 'gibt_es_nicht') is False
+
+    def test_single_query_per_request(self, app, staff_user):
+        """Viele Prüfungen im selben Request: Version + Matrix einmal laden"""
+        names = [m.name for m in Module.query.all()]
+        assert staff_user.is_admin is False  # User vorab laden
+        with app.test_request_context('/'):
+            statements, stop = _count_queries(app)
+            try:
+                for _ in range(3):
+                    for name in names:
+                        has_module_permission(staff_user, name, 'view')
+            finally:
+                stop()
+        assert len(statements) <= 2
+
+    def test_bump_invalidates_cache(self, app, staff_user):
+        """Neue Berechtigung wirkt nach bump_permission_version()"""
+        module = Module.query.filter_by(is_active=True, requires_admin=False).order_by(Module.id).first()
+        assert has_module_permission(staff_user, module.name, 'delete') is False
+
+        db.session.add(ModulePermission(user_id=staff_user.id, module_id=module.id,
+                                        can_view=True, can_delete=True))
+        db.session.commit()
+        # Ohne Versionswechsel: Matrix aus dem Cache
+        assert has_module_permission(staff_user, module.name, 'delete') is False
+
+        bump_permission_version()
+        db.session.commit()
+        assert has_module_permission(staff_user, module.name, 'delete') is True
+        assert module in get_user_modules(staff_user)
@@ -0,0 +1,68 @@
+"""
+Unit Tests für die versionierten Schema-Migrationen
+"""
+
+from sqlalchemy import text
+
+from src.models.models import db
+from src.models.schema_version import SchemaVersion
+from src.utils import schema_migrations
+from src.utils.schema_migrations import (
+    MIGRATIONS,
+    LATEST_VERSION,
+    ensure_schema,
+    get_schema_status,
+)
+
+
+class TestSchemaMigrations:
+    """Tests für ensure_schema"""
+
+    def test_versions_unique_and_ordered(self):
+        """Versionsnummern sind eindeutig und aufsteigend"""
+        versions = [v for v, _, _ in MIGRATIONS]
+        assert versions == sorted(set(versions))
+        assert LATEST_VERSION == versions[-1]
+
+    def test_app_start_applied_all(self, app):
+        """Nach create_app() sind alle Versionen angewendet"""
+        status = get_schema_status(db)
+        assert status['pending'] == []
+        assert status['missing_tables'] == []
+        assert status['applied'][-1] == LATEST_VERSION
+
+    def test_current_schema_only_checks(self, app):
+        """Aktuelles Schema: nur Versions-Check, keine Migration"""
+        report = ensure_schema(db)
+        assert report['migrated'] == []
+        assert list(report['phases']) == ['version_check']
+
+    def test_missing_version_is_applied(self, app):
+        """Fehlende Version wird nachgeholt und protokolliert"""
+        db.session.execute(text("DELETE FROM schema_versions WHERE version = 10"))
+        db.session.commit()
+
+        report = ensure_schema(db)
+
+        assert report['migrated'] == [10]
+        assert db.session.get(SchemaVersion, 10) is not None
+
+    def test_failed_migration_is_not_reported_as_applied(self, app, monkeypatch, capsys):
+        """Fehlgeschlagenes ALTER: Version bleibt offen, Bericht nennt die erreichte Version"""
+        def kaputt(db):
+            schema_migrations._add_columns(db, [('schema_versions', 'kaputt', 'INTEGER NOT NULL')])
+
+        monkeypatch.setattr(schema_migrations, 'MIGRATIONS',
+                            [m if m[0] != 10 else (10, m[1], kaputt) for m in MIGRATIONS])
+        db.session.execute(text("DELETE FROM schema_versions WHERE version = 10"))
+        db.session.commit()
+
+        report = ensure_schema(db)
+
+        assert report['failed'] == 10 and report['migrated'] == []
+        assert report['version'] == 9
+        assert db.session.get(SchemaVersion, 10) is None
+        assert '[OK]' not in capsys.readouterr().out
+
+        monkeypatch.undo()
+        assert ensure_schema(db)['migrated'] == [10]
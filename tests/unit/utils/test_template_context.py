@@ -0,0 +1,97 @@
+"""
+Unit Tests für den Template-Context-Provider
+Testet Request-/Tenant-Cache, Invalidierung und Aufrufzähler
+"""
+
+import pytest
+from flask import g, render_template_string
+
+from src.models.models import db
+from src.models.branding_settings import BrandingSettings
+from src.utils import template_context
+from src.utils.template_context import (
+    build_template_context,
+    get_template_context_stats,
+    invalidate_template_context,
+    reset_template_context_stats,
+)
+
+
+@pytest.fixture
+def fresh_context(app):
+    """Leerer Cache und Zähler vor jedem Test"""
+    invalidate_template_context()
+    reset_template_context_stats()
+    yield
+    invalidate_template_context()
+
+
+class TestTemplateContext:
+    """Tests für build_template_context"""
+
+    def test_registered_only_once(self, app):
+        """Context-Processor wird nur einmal registriert"""
+        template_context.init_template_context(app)
+        processors = [f.__name__ for f in app.template_context_processors[None]]
+        assert processors.count('inject_globals') == 1
+        assert processors.count('inject_permissions') == 1
+
+    def test_context_keys(self, app, fresh_context):
+        """Alle bisherigen Template-Variablen sind vorhanden"""
+        with app.test_request_context('/'):
+            context = build_template_context()
+        for key in ('app_name', 'app_version', 'branding', 'today',
+                    'tenant_plan', 'position_choices', 'design_type_choices'):
+            assert key in context
+
+    def test_request_cache(self, app, fresh_context):
+        """Mehrere Renders im selben Request laden nur einmal"""
+        with app.test_request_context('/'):
+            for _ in range(5):
+                render_template_string('{{ app_name }}')
+        stats = get_template_context_stats()
+        assert stats['invocations'] == 5
+        assert stats['request_hits'] == 4
+        assert stats['tenant_misses'] == 1
+
+    def test_tenant_cache_across_requests(self, app, fresh_context):
+        """Folgende Requests nutzen den Tenant-Cache"""
+        for _ in range(3):
+            with app.test_request_context('/'):
+                render_template_string('{{ app_name }}')
+        stats = get_template_context_stats()
+        assert stats['tenant_misses'] == 1
+        assert stats['tenant_hits'] == 2
+
+    def test_tenant_cache_key_honours_bypass(self, app, fresh_context):
+        """Mit bypass_tenant_filter gilt der tenant-freie Cache-Eintrag (wie bei den Abfragen)"""
+        try:
+            with app.test_request_context('/'):
+                g.current_tenant_id = 7
+                build_template_context()
+            with app.test_request_context('/'):
+                g.current_tenant_id = 7
+                g.bypass_tenant_filter = True
+                build_template_context()
+        finally:
+            # g kann zum App-Kontext des Tests gehoeren
+            g.pop('current_tenant_id', None)
+            g.pop('bypass_tenant_filter', None)
+
+        assert set(template_context._tenant_cache) == {7, None}
+        assert get_template_context_stats()['tenant_misses'] == 2
+
+    def test_invalidation_on_branding_save(self, app, fresh_context):
+        """Speichern der Branding-Settings verwirft den Cache"""
+        with app.test_request_context('/'):
+            build_template_context()
+
+        settings = BrandingSettings.get_settings()
+        settings.primary_color = '#123456'
+        db.session.commit()
+
+        with app.test_request_context('/'):
+            context = build_template_context()
+
+        assert context['branding'].primary_color == '#123456'
+        assert get_template_context_stats()['tenant_misses'] == 2